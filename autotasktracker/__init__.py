@@ -11,36 +11,40 @@ Usage:
 
 __version__ = "0.1.0"
 
-# Core functionality - most commonly used
-from autotasktracker.core import (
-    DatabaseManager, 
-    get_default_db_manager,
-    ActivityCategorizer, 
-    categorize_activity, 
-    extract_task_summary, 
-    extract_window_title,
-    TaskExtractor,
-    TimeTracker
-)
+from autotasktracker.utils.lazy_imports import lazy_exports
 
-# Configuration
-from autotasktracker.config import Config, get_config
+# Exports are imported on first access so that ``import autotasktracker``
+# (and the CLI) does not load pandas, PIL or NumPy up front.
+__getattr__, __dir__ = lazy_exports(__name__, {
+    # Core functionality - most commonly used
+    'DatabaseManager': 'autotasktracker.core.database',
+    'get_default_db_manager': 'autotasktracker.core.database',
+    'ActivityCategorizer': 'autotasktracker.core.categorizer',
+    'categorize_activity': 'autotasktracker.core.categorizer',
+    'extract_task_summary': 'autotasktracker.core.categorizer',
+    'extract_window_title': 'autotasktracker.core.categorizer',
+    'TaskExtractor': 'autotasktracker.core.task_extractor',
+    'TimeTracker': 'autotasktracker.core.time_tracker',
 
-# AI capabilities - import directly to avoid circular imports
-from autotasktracker.ai.vlm_processor import SmartVLMProcessor as VLMProcessor
-from autotasktracker.ai import EmbeddingsSearchEngine as EmbeddingsSearch
-from autotasktracker.ai import VLMTaskExtractor
+    # Configuration
+    'Config': 'autotasktracker.config',
+    'get_config': 'autotasktracker.config',
+
+    # AI capabilities
+    'VLMProcessor': 'autotasktracker.ai.vlm_processor:SmartVLMProcessor',
+    'EmbeddingsSearch': 'autotasktracker.ai.embeddings_search:EmbeddingsSearchEngine',
+    'VLMTaskExtractor': 'autotasktracker.ai.vlm_integration',
 
-# Factory pattern for easy object creation
-from autotasktracker.factories import (
-    create_database_manager,
-    create_activity_categorizer,
-    create_task_extractor,
-    create_vlm_processor
-)
+    # Factory pattern for easy object creation
+    'create_database_manager': 'autotasktracker.factories',
+    'create_activity_categorizer': 'autotasktracker.factories',
+    'create_task_extractor': 'autotasktracker.factories',
+    'create_vlm_processor': 'autotasktracker.factories',
 
-# Interfaces for dependency injection - import directly to avoid issues
-from autotasktracker.interfaces import AbstractDatabaseManager, AbstractTaskExtractor
+    # Interfaces for dependency injection
+    'AbstractDatabaseManager': 'autotasktracker.interfaces',
+    'AbstractTaskExtractor': 'autotasktracker.interfaces',
+})
 
 __all__ = [
     # Core functionality
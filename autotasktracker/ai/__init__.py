@@ -7,21 +7,30 @@ Usage:
     from autotasktracker.ai import VLMProcessor, EmbeddingsSearch, VLMTaskExtractor
 """
 
-# VLM processing
-from autotasktracker.ai.vlm_integration import VLMTaskExtractor, extract_vlm_enhanced_task
-from autotasktracker.ai.vlm_processor import SmartVLMProcessor as VLMProcessor
+from autotasktracker.utils.lazy_imports import lazy_exports
 
-# OCR enhancement
-from autotasktracker.ai.ocr_enhancement import OCREnhancer, create_ocr_enhancer
+# Exports are imported on first access (PEP 562)
+__getattr__, __dir__ = lazy_exports(__name__, {
+    # VLM processing
+    'VLMTaskExtractor': 'autotasktracker.ai.vlm_integration',
+    'extract_vlm_enhanced_task': 'autotasktracker.ai.vlm_integration',
+    'VLMProcessor': 'autotasktracker.ai.vlm_processor:SmartVLMProcessor',
+
+    # OCR enhancement
+    'OCREnhancer': 'autotasktracker.ai.ocr_enhancement',
+    'create_ocr_enhancer': 'autotasktracker.ai.ocr_enhancement',
+    'OCRLayoutEngine': 'autotasktracker.ai.ocr_layout',
 
-# Embeddings and search
-from autotasktracker.ai.embeddings_search import EmbeddingsSearchEngine, EmbeddingStats
+    # Embeddings and search
+    'EmbeddingsSearchEngine': 'autotasktracker.ai.embeddings_search',
+    'EmbeddingStats': 'autotasktracker.ai.embeddings_search',
 
-# Task extraction
-from autotasktracker.ai.ai_task_extractor import AIEnhancedTaskExtractor
+    # Task extraction
+    'AIEnhancedTaskExtractor': 'autotasktracker.ai.ai_task_extractor',
 
-# Content filtering
-from autotasktracker.ai.sensitive_filter import SensitiveDataFilter
+    # Content filtering
+    'SensitiveDataFilter': 'autotasktracker.ai.sensitive_filter',
+})
 
 __all__ = [
     # VLM processing
@@ -32,6 +41,7 @@ __all__ = [
     # OCR enhancement
     'OCREnhancer',
     'create_ocr_enhancer',
+    'OCRLayoutEngine',
     
     # Embeddings and search
     'EmbeddingsSearchEngine',
@@ -19,6 +19,60 @@ from autotasktracker.core import ActivityCategorizer
 
 logger = logging.getLogger(__name__)
 
+# Similar-task lookup: nearest neighbours by embedding among recent screenshots
+SIMILAR_TASK_LIMIT = 3
+SIMILAR_TASK_THRESHOLD = 0.8
+SIMILAR_TASK_WINDOW_HOURS = 4
+
+
+class _ExtractionMemo:
+    """Per-call cache of the component extractors, keyed by their inputs.
+
+    Consecutive screenshots mostly repeat the same window titles and often the
+    same OCR text, so a batch runs each distinct input through the extractors once.
+    """
+    
+    def __init__(self, extractor: 'AIEnhancedTaskExtractor'):
+        self._extractor = extractor
+        self._tasks = {}
+        self._categories = {}
+        self._ocr = {}
+        self._vlm = {}
+    
+    def task(self, window_title: str) -> str:
+        if window_title not in self._tasks:
+            self._tasks[window_title] = self._extractor.base_extractor.extract_task(window_title)
+        return self._tasks[window_title]
+    
+    def category(self, window_title: str) -> str:
+        if window_title not in self._categories:
+            self._categories[window_title] = ActivityCategorizer.categorize(window_title)
+        return self._categories[window_title]
+    
+    def ocr(self, ocr_text: str, base_task: Optional[str]) -> Optional[Dict]:
+        key = (ocr_text, base_task)
+        if key not in self._ocr:
+            self._ocr[key] = self._extractor.ocr_enhancer.enhance_task_with_ocr(ocr_text, base_task)
+        return self._ocr[key]
+    
+    def vlm(self, vlm_description: str, window_title: Optional[str], ocr_text: Optional[str],
+            base_task: Optional[str]) -> Tuple[Optional[Dict], Optional[str]]:
+        """VLM result (when confident) and the VLM-enhanced task, if any."""
+        key = (vlm_description, window_title, ocr_text, base_task)
+        if key not in self._vlm:
+            vlm_task, enhanced_task = None, None
+            vlm_result = extract_vlm_enhanced_task(vlm_description, window_title, ocr_text)
+            if vlm_result and vlm_result['confidence'] > 0.7:
+                vlm_task = vlm_result
+                if vlm_task['task_title'] != "Activity":
+                    vlm_extractor = self._extractor.vlm_extractor
+                    enhanced_task = vlm_extractor.enhance_task_with_vlm(
+                        base_task or "Activity",
+                        vlm_extractor.extract_from_vlm_description(vlm_description, window_title, ocr_text)
+                    )
+            self._vlm[key] = (vlm_task, enhanced_task)
+        return self._vlm[key]
+
 
 class AIEnhancedTaskExtractor:
     """
@@ -55,13 +109,72 @@ class AIEnhancedTaskExtractor:
         Returns:
             Enhanced task information dictionary
         """
+        # Find similar tasks if embeddings available
+        similar = []
+        if self.embeddings_engine and entity_id:
+            try:
+                similar = self.embeddings_engine.semantic_search(
+                    entity_id, 
+                    limit=SIMILAR_TASK_LIMIT,
+                    similarity_threshold=SIMILAR_TASK_THRESHOLD,
+                    time_window_hours=SIMILAR_TASK_WINDOW_HOURS
+                )
+            except Exception as e:
+                logger.error(f"Error finding similar tasks: {e}")
+        
+        return self._combine(_ExtractionMemo(self), window_title, ocr_text, vlm_description, similar)
+    
+    def extract_enhanced_tasks_batch(self, rows: List[Dict]) -> List[Dict[str, any]]:
+        """
+        Extract tasks for many screenshots at once.
+        
+        Similar-task lookups for the whole batch share one load of the embedding
+        window and one blocked matrix multiply, and base extraction, OCR
+        enhancement, VLM analysis and categorization run once per distinct input.
+        Each result matches what extract_enhanced_task returns for that row.
+        
+        Args:
+            rows: Dictionaries with the extract_enhanced_task arguments
+                (window_title, ocr_text, vlm_description, entity_id)
+            
+        Returns:
+            Enhanced task information dictionaries, in input order
+        """
+        similar_by_entity = {}
+        entity_ids = [row.get('entity_id') for row in rows if row.get('entity_id')]
+        if self.embeddings_engine and entity_ids:
+            try:
+                similar_by_entity = self.embeddings_engine.semantic_search_batch(
+                    entity_ids,
+                    limit=SIMILAR_TASK_LIMIT,
+                    similarity_threshold=SIMILAR_TASK_THRESHOLD,
+                    time_window_hours=SIMILAR_TASK_WINDOW_HOURS
+                )
+            except Exception as e:
+                logger.error(f"Error finding similar tasks: {e}")
+        
+        memo = _ExtractionMemo(self)
+        return [
+            self._combine(
+                memo,
+                row.get('window_title'),
+                row.get('ocr_text'),
+                row.get('vlm_description'),
+                similar_by_entity.get(row.get('entity_id'), [])
+            )
+            for row in rows
+        ]
+    
+    def _combine(self, memo: '_ExtractionMemo', window_title: Optional[str], ocr_text: Optional[str],
+                 vlm_description: Optional[str], similar: List[Dict]) -> Dict[str, any]:
+        """Combine base, OCR, VLM and similarity signals into one task result."""
         # Start with base extraction
-        base_task = self.base_extractor.extract_task(window_title) if window_title else None
+        base_task = memo.task(window_title) if window_title else None
         
         # Enhance with OCR analysis
         ocr_enhancement = None
         if ocr_text:
-            ocr_enhancement = self.ocr_enhancer.enhance_task_with_ocr(ocr_text, base_task)
+            ocr_enhancement = memo.ocr(ocr_text, base_task)
             
             # If OCR provides high-quality task info, use it
             if ocr_enhancement and ocr_enhancement.get('ocr_quality') in ['excellent', 'good']:
@@ -70,40 +183,23 @@ class AIEnhancedTaskExtractor:
         # Enhance with VLM if available
         vlm_task = None
         if vlm_description:
-            vlm_result = extract_vlm_enhanced_task(vlm_description, window_title, ocr_text)
-            if vlm_result and vlm_result['confidence'] > 0.7:
-                vlm_task = vlm_result
-                
-                # Use VLM task if more specific than base
-                if vlm_task['task_title'] != "Activity":
-                    base_task = self.vlm_extractor.enhance_task_with_vlm(
-                        base_task or "Activity",
-                        self.vlm_extractor.extract_from_vlm_description(vlm_description, window_title, ocr_text)
-                    )
+            vlm_task, vlm_enhanced_task = memo.vlm(vlm_description, window_title, ocr_text, base_task)
+            
+            # Use VLM task if more specific than base
+            if vlm_task and vlm_task['task_title'] != "Activity":
+                base_task = vlm_enhanced_task
         
         # Get category
-        category = ActivityCategorizer.categorize(window_title) if window_title else ActivityCategorizer.DEFAULT_CATEGORY
+        category = memo.category(window_title) if window_title else ActivityCategorizer.DEFAULT_CATEGORY
         
-        # Find similar tasks if embeddings available
-        similar_tasks = []
-        if self.embeddings_engine and entity_id:
-            try:
-                similar = self.embeddings_engine.semantic_search(
-                    entity_id, 
-                    limit=3,
-                    similarity_threshold=0.8,
-                    time_window_hours=4
-                )
-                similar_tasks = [
-                    {
-                        "tasks": self.base_extractor.extract_task(s.get("active_window", '')),
-                        'similarity': s['similarity_score'],
-                        'time': s['created_at']
-                    }
-                    for s in similar
-                ]
-            except Exception as e:
-                logger.error(f"Error finding similar tasks: {e}")
+        similar_tasks = [
+            {
+                "tasks": memo.task(s.get("active_window", '')),
+                'similarity': s['similarity_score'],
+                'time': s['created_at']
+            }
+            for s in similar
+        ]
         
         # Combine all information
         result = {
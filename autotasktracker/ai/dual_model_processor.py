@@ -14,6 +14,7 @@ from autotasktracker.config import get_config
 from autotasktracker.ai.vlm_processor import SmartVLMProcessor
 from autotasktracker.ai.session_processor import LlamaSessionProcessor, create_session_processor
 from autotasktracker.core.database import DatabaseManager
+from autotasktracker.core.derived_versions import stamp_derived
 from autotasktracker.core.error_handler import measure_latency, get_error_handler, get_metrics
 
 logger = logging.getLogger(__name__)
@@ -130,6 +131,8 @@ class DualModelProcessor:
                 
                 conn.commit()
                 logger.debug(f"Saved dual-model metadata for entity {entity_id}")
+            if session_analysis:
+                stamp_derived(entity_id, ['llama3_session_result'])
                 
         except Exception as e:
             logger.error(f"Failed to save dual-model metadata for entity {entity_id}: {e}")
@@ -81,11 +81,44 @@ class EmbeddingsSearchEngine:
                 
                 if result:
                     return self._parse_embedding(result['value'])
-                return None
+            # Embeddings of old screenshots are moved to the metadata archive
+            from autotasktracker.core.metadata_archive import get_metadata_archive
+            archived = get_metadata_archive(self.db_manager).fetch([entity_id], ['embedding'])
+            return self._parse_embedding(archived.get(int(entity_id), {}).get('embedding'))
         except Exception as e:
             logger.error(f"Error fetching embedding: {e}")
             return None
     
+    def _window_query(self, time_window_hours: Optional[int] = None) -> Tuple[str, List]:
+        """Query for image entities with embeddings, optionally limited to a recent window."""
+        query = """
+        SELECT 
+            e.id,
+            e.filepath,
+            e.filename,
+            datetime(e.created_at, 'localtime') as created_at,
+            me_ocr.value as ocr_result,
+            me_window.value as active_window,
+            me_embed.value as embedding
+        FROM entities e
+        LEFT JOIN metadata_entries me_ocr ON e.id = me_ocr.entity_id 
+            AND me_ocr."key" = 'ocr_result'
+        LEFT JOIN metadata_entries me_window ON e.id = me_window.entity_id 
+            AND me_window."key" = 'active_window'
+        LEFT JOIN metadata_entries me_embed ON e.id = me_embed.entity_id 
+            AND me_embed."key" = 'embedding'
+        WHERE e.file_type_group = 'image' 
+            AND me_embed.value IS NOT NULL
+        """
+        params = []
+        
+        if time_window_hours:
+            cutoff_time = (datetime.now() - timedelta(hours=time_window_hours)).isoformat(sep=' ')
+            query += " AND datetime(e.created_at, 'localtime') >= ?"
+            params.append(cutoff_time)
+        
+        return query, params
+    
     def semantic_search(self, query_entity_id: int, limit: int = 10, 
                        similarity_threshold: float = 0.7,
                        time_window_hours: Optional[int] = None) -> List[Dict]:
@@ -107,34 +140,9 @@ class EmbeddingsSearchEngine:
             logger.warning(f"No embedding found for entity {query_entity_id}")
             return []
         
-        # Build query with optional time filter
-        base_query = """
-        SELECT 
-            e.id,
-            e.filepath,
-            e.filename,
-            datetime(e.created_at, 'localtime') as created_at,
-            me_ocr.value as ocr_text,
-            me_window.value as active_window,
-            me_embed.value as embedding
-        FROM entities e
-        LEFT JOIN metadata_entries me_ocr ON e.id = me_ocr.entity_id 
-            AND me_ocr."key" = "ocr_result"
-        LEFT JOIN metadata_entries me_window ON e.id = me_window.entity_id 
-            AND me_window."key" = "active_window"
-        LEFT JOIN metadata_entries me_embed ON e.id = me_embed.entity_id 
-            AND me_embed."key" = 'embedding'
-        WHERE e.file_type_group = 'image' 
-            AND me_embed.value IS NOT NULL
-            AND e.id != ?
-        """
-        
-        params = [query_entity_id]
-        
-        if time_window_hours:
-            cutoff_time = (datetime.now() - timedelta(hours=time_window_hours)).isoformat()
-            base_query += " AND datetime(e.created_at, 'localtime') >= ?"
-            params.append(cutoff_time)
+        base_query, params = self._window_query(time_window_hours)
+        base_query += " AND e.id != ?"
+        params.append(query_entity_id)
         
         try:
             with self._get_connection() as conn:
@@ -170,6 +178,113 @@ class EmbeddingsSearchEngine:
             logger.error(f"Error in semantic search: {e}")
             return []
     
+    def get_embeddings_for_entities(self, entity_ids: List[int], chunk_size: int = 500) -> Dict[int, np.ndarray]:
+        """Get embeddings for many entities, one query per chunk of ids."""
+        embeddings = {}
+        ids = list(dict.fromkeys(entity_ids))
+        
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                for start in range(0, len(ids), chunk_size):
+                    chunk = ids[start:start + chunk_size]
+                    placeholders = ', '.join('?' * len(chunk))
+                    cursor.execute(f"""
+                    SELECT entity_id, value 
+                    FROM metadata_entries 
+                    WHERE "key" = 'embedding' AND entity_id IN ({placeholders})
+                    """, chunk)
+                    for row in cursor.fetchall():
+                        embedding = self._parse_embedding(row['value'])
+                        if embedding is not None:
+                            embeddings[row['entity_id']] = embedding
+        except Exception as e:
+            logger.error(f"Error fetching embeddings: {e}")
+        
+        return embeddings
+    
+    def semantic_search_batch(self, query_entity_ids: List[int], limit: int = 10,
+                              similarity_threshold: float = 0.7,
+                              time_window_hours: Optional[int] = None,
+                              block_size: int = 1024) -> Dict[int, List[Dict]]:
+        """
+        Run semantic_search for many entities at once.
+        
+        The candidate window is loaded and parsed once into a normalized matrix,
+        and similarities for all query entities are computed with one matrix
+        multiply per block of ``block_size`` queries.
+        
+        Args:
+            query_entity_ids: Entity IDs to search similar items for
+            limit: Maximum number of results per entity
+            similarity_threshold: Minimum similarity score (0-1)
+            time_window_hours: Optional time window to search within
+            block_size: Query rows scored per matrix multiply
+            
+        Returns:
+            Mapping of entity ID to its similar activities, as semantic_search returns them
+        """
+        results = {entity_id: [] for entity_id in query_entity_ids}
+        query_embeddings = self.get_embeddings_for_entities(list(results))
+        if not query_embeddings:
+            return results
+        
+        base_query, params = self._window_query(time_window_hours)
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(base_query, params)
+                rows = cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Error in batch semantic search: {e}")
+            return results
+        
+        candidates, vectors = [], []
+        for row in rows:
+            embedding = self._parse_embedding(row['embedding'])
+            if embedding is None:
+                continue
+            candidates.append({
+                'id': row['id'],
+                'filepath': row['filepath'],
+                'created_at': row['created_at'],
+                "ocr_result": row["ocr_result"],
+                "active_window": row["active_window"],
+            })
+            vectors.append(embedding)
+        if not candidates:
+            return results
+        
+        candidate_ids = np.array([c['id'] for c in candidates])
+        candidate_matrix = self._normalize(np.vstack(vectors))
+        query_ids = list(query_embeddings)
+        query_matrix = self._normalize(np.vstack([query_embeddings[i] for i in query_ids]))
+        k = min(limit, len(candidates))
+        
+        for start in range(0, len(query_ids), block_size):
+            block_ids = np.array(query_ids[start:start + block_size])
+            similarity = query_matrix[start:start + block_size] @ candidate_matrix.T
+            # An entity is never its own neighbour
+            similarity[block_ids[:, None] == candidate_ids[None, :]] = -np.inf
+            
+            top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+            for row, entity_id in enumerate(block_ids.tolist()):
+                scores = similarity[row, top[row]]
+                order = np.argsort(-scores, kind='stable')
+                results[entity_id] = [
+                    dict(candidates[top[row][i]], similarity_score=round(float(scores[i]), 6))
+                    for i in order if scores[i] >= similarity_threshold
+                ]
+        
+        return results
+    
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        """Scale rows to unit length so dot products are cosine similarities."""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+    
     def find_similar_task_groups(self, min_group_size: int = 3,
                                similarity_threshold: float = 0.8,
                                time_window_hours: int = 24) -> List[List[Dict]]:
@@ -0,0 +1,319 @@
+"""
+Concurrent execution, response caching and usage accounting for LLM calls.
+
+Session analysis sends one text-only prompt per session to Ollama. This
+module lets those prompts run in parallel on a shared, bounded thread pool
+while a per-model semaphore caps how many requests each model sees at
+once. Deterministic responses are kept in a persistent content-addressed
+cache so re-analysing the same sessions costs nothing, and every call's
+token counts and latency are accounted per model.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from autotasktracker.core.connection_pool import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+
+# Histogram bucket upper bounds in milliseconds for LLM round trips
+LLM_LATENCY_BUCKETS_MS = (50, 250, 1000, 2500, 5000, 10000, 20000, 30000, 60000, 120000)
+
+
+@dataclass
+class LLMCallResult:
+    """Outcome and accounting for one generate call."""
+    model: str
+    text: Optional[str]
+    cached: bool = False
+    latency_ms: float = 0.0
+    queue_ms: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.text is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop('text')
+        return data
+
+
+class LLMResponseCache:
+    """Persistent content-addressed cache of LLM responses.
+
+    Entries are keyed by a SHA-256 over the model, the prompt's own hash,
+    the temperature and the remaining generation options, and are stored
+    one JSON file per key under a two-character fan-out directory. Writes
+    are atomic, so concurrent writers at worst store the same response
+    twice. Only deterministic (temperature 0) calls are cached unless
+    ``cache_sampled`` is set, since sampled outputs are meant to vary.
+    """
+
+    def __init__(self, cache_dir, max_entries: int = 5000, cache_sampled: bool = False):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.cache_sampled = cache_sampled
+        self._lock = threading.Lock()
+        self._entries: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model: str, prompt: str, temperature: float, options: Optional[Dict] = None) -> str:
+        """Content address for a (model, prompt, temperature, options) call."""
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        identity = json.dumps({
+            'model': model,
+            'prompt': prompt_hash,
+            'temperature': float(temperature),
+            'options': options or {},
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+    def is_cacheable(self, temperature: float) -> bool:
+        return self.cache_sampled or float(temperature) == 0.0
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for ``key`` or None."""
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Discarding unreadable LLM cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def put(self, key: str, response: str, **metadata):
+        """Store a response under ``key``."""
+        path = self._path(key)
+        entry = dict(metadata, response=response, stored_at=time.time())
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            existed = path.exists()
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Failed to write LLM cache entry: {e}")
+            return
+
+        with self._lock:
+            self.writes += 1
+            if self._entries is not None and not existed:
+                self._entries += 1
+        self._enforce_limit()
+
+    def _entry_paths(self) -> List[Path]:
+        if not self.cache_dir.exists():
+            return []
+        return list(self.cache_dir.glob('*/*.json'))
+
+    def _enforce_limit(self):
+        """Evict the least recently written entries above ``max_entries``."""
+        with self._lock:
+            if self._entries is None:
+                self._entries = len(self._entry_paths())
+            if self._entries <= self.max_entries:
+                return
+            paths = self._entry_paths()
+            # Drop an extra 10% so eviction scans stay rare
+            excess = len(paths) - int(self.max_entries * 0.9)
+            if excess <= 0:
+                self._entries = len(paths)
+                return
+            paths.sort(key=lambda p: p.stat().st_mtime)
+            for path in paths[:excess]:
+                path.unlink(missing_ok=True)
+            self.evictions += excess
+            self._entries = len(paths) - excess
+
+    def clear(self):
+        with self._lock:
+            for path in self._entry_paths():
+                path.unlink(missing_ok=True)
+            self._entries = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'cache_dir': str(self.cache_dir),
+                'entries': self._entries if self._entries is not None else len(self._entry_paths()),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'writes': self.writes,
+                'evictions': self.evictions,
+            }
+
+
+class LLMUsageStats:
+    """Thread-safe per-model token and latency accounting."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, result: LLMCallResult):
+        with self._lock:
+            stats = self._models.get(result.model)
+            if stats is None:
+                stats = self._models[result.model] = {
+                    'calls': 0,
+                    'cache_hits': 0,
+                    'errors': 0,
+                    'prompt_tokens': 0,
+                    'completion_tokens': 0,
+                    'latency': LatencyHistogram(LLM_LATENCY_BUCKETS_MS),
+                    'queue': LatencyHistogram(LLM_LATENCY_BUCKETS_MS),
+                }
+            stats['calls'] += 1
+            if result.cached:
+                stats['cache_hits'] += 1
+                return
+            if not result.ok:
+                stats['errors'] += 1
+            stats['prompt_tokens'] += result.prompt_tokens
+            stats['completion_tokens'] += result.completion_tokens
+            stats['latency'].record(result.latency_ms)
+            stats['queue'].record(result.queue_ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            snapshot = {}
+            for model, stats in self._models.items():
+                latency = stats['latency'].snapshot()
+                latency.pop('buckets')
+                queue = stats['queue'].snapshot()
+                queue.pop('buckets')
+                snapshot[model] = {
+                    'calls': stats['calls'],
+                    'cache_hits': stats['cache_hits'],
+                    'errors': stats['errors'],
+                    'prompt_tokens': stats['prompt_tokens'],
+                    'completion_tokens': stats['completion_tokens'],
+                    'total_tokens': stats['prompt_tokens'] + stats['completion_tokens'],
+                    'latency': latency,
+                    'queue_wait': queue,
+                }
+            return snapshot
+
+
+class LLMExecutor:
+    """Bounded thread pool for LLM calls with per-model concurrency limits.
+
+    ``max_workers`` bounds the total number of calls in flight; each model
+    additionally gets a semaphore (``model_limits`` or ``default_limit``)
+    so one slow model cannot starve Ollama for the others. Callers on
+    other threads can take the same per-model slot with ``model_slot``.
+    """
+
+    def __init__(self, max_workers: int = 4, model_limits: Optional[Dict[str, int]] = None,
+                 default_limit: int = 2):
+        self.max_workers = max(1, max_workers)
+        self.default_limit = max(1, default_limit)
+        self.model_limits = dict(model_limits or {})
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='llm')
+        self._in_flight: Dict[str, int] = {}
+        self.peak_in_flight: Dict[str, int] = {}
+
+    def limit_for(self, model: str) -> int:
+        return max(1, self.model_limits.get(model, self.default_limit))
+
+    def _semaphore(self, model: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._semaphores.get(model)
+            if semaphore is None:
+                semaphore = self._semaphores[model] = threading.BoundedSemaphore(self.limit_for(model))
+            return semaphore
+
+    @contextmanager
+    def model_slot(self, model: str):
+        """Hold one of ``model``'s concurrency slots for the duration."""
+        semaphore = self._semaphore(model)
+        semaphore.acquire()
+        with self._lock:
+            self._in_flight[model] = self._in_flight.get(model, 0) + 1
+            self.peak_in_flight[model] = max(self.peak_in_flight.get(model, 0), self._in_flight[model])
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight[model] -= 1
+            semaphore.release()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Run ``fn`` on the shared pool."""
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def map_ordered(self, fn: Callable, items: List[Any]) -> List[Any]:
+        """Apply ``fn`` to every item concurrently, returning results in input order."""
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        futures = [self._pool.submit(fn, item) for item in items]
+        return [future.result() for future in futures]
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'model_limits': {model: self.limit_for(model) for model in
+                                 set(self.model_limits) | set(self._semaphores)},
+                'in_flight': dict(self._in_flight),
+                'peak_in_flight': dict(self.peak_in_flight),
+            }
+
+
+_llm_executor: Optional[LLMExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_llm_executor() -> LLMExecutor:
+    """Get the process-wide LLM executor, sized from configuration."""
+    global _llm_executor
+    if _llm_executor is None:
+        with _executor_lock:
+            if _llm_executor is None:
+                from autotasktracker.config import get_config
+                config = get_config()
+                _llm_executor = LLMExecutor(
+                    max_workers=config.LLM_MAX_CONCURRENCY,
+                    model_limits={config.LLAMA3_MODEL_NAME: config.LLAMA3_MAX_CONCURRENCY},
+                )
+    return _llm_executor
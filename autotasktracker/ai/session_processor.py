@@ -4,17 +4,22 @@ Llama Session Processor for AutoTaskTracker Dual-Model Architecture.
 This module provides session-level reasoning using Llama 3 for workflow analysis
 and temporal task understanding across multiple screenshots.
 """
+import bisect
 import logging
 import json
 import time
 import requests
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
 from collections import defaultdict
 
 from autotasktracker.config import get_config
 from autotasktracker.core.error_handler import measure_latency, get_error_handler, get_metrics
+from autotasktracker.ai.llm_executor import (
+    LLMCallResult, LLMResponseCache, LLMUsageStats, get_llm_executor
+)
 
 logger = logging.getLogger(__name__)
 
@@ -77,6 +82,14 @@ class LlamaSessionProcessor:
         self.session = requests.Session()
         self.session.headers.update({'Content-Type': 'application/json'})
         
+        # Shared bounded executor, persistent response cache and per-call accounting
+        self.executor = get_llm_executor()
+        self.response_cache = LLMResponseCache(
+            Path(cache_dir) if cache_dir else Path(self.config.get_vlm_cache_path()) / 'llm_responses',
+            max_entries=self.config.LLM_RESPONSE_CACHE_MAX_ENTRIES
+        )
+        self.usage = LLMUsageStats()
+        
     def _initialize_pattern_templates(self) -> Dict[str, Dict]:
         """Initialize workflow pattern templates for recognition."""
         return {
@@ -108,21 +121,67 @@ class LlamaSessionProcessor:
     
     def _call_llama3(self, prompt: str, temperature: float = 0.0, max_tokens: int = 500) -> Optional[str]:
         """Call Llama 3 for text-only analysis."""
+        return self._generate(prompt, temperature, max_tokens).text
+    
+    def _generate(self, prompt: str, temperature: float = 0.0, max_tokens: int = 500) -> LLMCallResult:
+        """Call Llama 3 through the response cache, returning text and accounting.
+        
+        Deterministic calls are answered from the content-addressed cache when
+        the same model, prompt and options were seen before. Otherwise the
+        request waits for a Llama 3 concurrency slot on the shared executor.
+        """
+        options = {
+            'temperature': temperature,
+            'top_p': 0.9,
+            'num_predict': max_tokens,
+            'num_ctx': 4096
+        }
+        
+        cache_key = None
+        if self.response_cache.is_cacheable(temperature):
+            cache_key = LLMResponseCache.make_key(self.llama_model, prompt, temperature, options)
+            entry = self.response_cache.get(cache_key)
+            if entry is not None:
+                result = LLMCallResult(
+                    model=self.llama_model,
+                    text=entry['response'],
+                    cached=True,
+                    prompt_tokens=entry.get('prompt_tokens', 0),
+                    completion_tokens=entry.get('completion_tokens', 0)
+                )
+                self.usage.record(result)
+                return result
+        
+        payload = {
+            'model': self.llama_model,
+            'prompt': prompt,
+            'stream': False,
+            'options': options
+        }
+        
+        logger.debug(f"Making Llama3 request with prompt length: {len(prompt)}")
+        
+        queued_at = time.perf_counter()
+        with self.executor.model_slot(self.llama_model):
+            started_at = time.perf_counter()
+            result = self._post_generate(payload)
+            result.latency_ms = (time.perf_counter() - started_at) * 1000
+        result.queue_ms = (started_at - queued_at) * 1000
+        self.usage.record(result)
+        
+        if cache_key and result.ok:
+            self.response_cache.put(
+                cache_key, result.text,
+                model=self.llama_model,
+                prompt_tokens=result.prompt_tokens,
+                completion_tokens=result.completion_tokens,
+                latency_ms=result.latency_ms
+            )
+        return result
+    
+    def _post_generate(self, payload: Dict[str, Any]) -> LLMCallResult:
+        """Send one generate request to Ollama."""
         try:
-            payload = {
-                'model': self.llama_model,
-                'prompt': prompt,
-                'stream': False,
-                'options': {
-                    'temperature': temperature,
-                    'top_p': 0.9,
-                    'num_predict': max_tokens,
-                    'num_ctx': 4096
-                }
-            }
-            
-            logger.debug(f"Making Llama3 request with prompt length: {len(prompt)}")
-            
             response = self.session.post(
                 f'{self.base_url}/api/generate',
                 json=payload,
@@ -133,20 +192,25 @@ class LlamaSessionProcessor:
             result = response.json()
             
             if 'response' in result:
-                return result['response'].strip()
+                return LLMCallResult(
+                    model=self.llama_model,
+                    text=result['response'].strip(),
+                    prompt_tokens=result.get('prompt_eval_count', 0),
+                    completion_tokens=result.get('eval_count', 0)
+                )
             else:
                 logger.error(f"No response in Llama3 result: {result}")
-                return None
+                return LLMCallResult(model=self.llama_model, text=None, error='empty_response')
                 
         except requests.exceptions.Timeout:
             logger.error("Llama3 request timed out")
-            return None
+            return LLMCallResult(model=self.llama_model, text=None, error='timeout')
         except requests.exceptions.ConnectionError:
             logger.error("Failed to connect to Llama3")
-            return None
+            return LLMCallResult(model=self.llama_model, text=None, error='connection_error')
         except Exception as e:
             logger.error(f"Llama3 request failed: {e}")
-            return None
+            return LLMCallResult(model=self.llama_model, text=None, error=str(e))
     
     def detect_session_boundaries(self, screenshot_sequence: List[Dict]) -> List[SessionBoundary]:
         """
@@ -255,12 +319,13 @@ Respond with ONLY valid JSON, no additional text or explanation:
         
         # Get Llama 3 analysis
         start_time = time.time()
-        llama_response = self._call_llama3(prompt, temperature=0.0, max_tokens=800)
+        llm_call = self._generate(prompt, temperature=0.0, max_tokens=800)
+        llama_response = llm_call.text
         analysis_time = time.time() - start_time
         
         if not llama_response:
             logger.error("Failed to get Llama3 workflow analysis")
-            return {'error': 'Llama3 analysis failed'}
+            return {'error': 'Llama3 analysis failed', 'llm_call': llm_call.to_dict()}
         
         # Parse JSON response
         try:
@@ -272,7 +337,8 @@ Respond with ONLY valid JSON, no additional text or explanation:
                 'analysis_timestamp': datetime.now().isoformat(),
                 'analysis_duration': analysis_time,
                 'screenshot_count': len(session_data),
-                'llama_response_raw': llama_response
+                'llama_response_raw': llama_response,
+                'llm_call': llm_call.to_dict()
             })
             
             return analysis_result
@@ -282,7 +348,8 @@ Respond with ONLY valid JSON, no additional text or explanation:
             return {
                 'error': 'JSON parsing failed',
                 'raw_response': llama_response,
-                'analysis_duration': analysis_time
+                'analysis_duration': analysis_time,
+                'llm_call': llm_call.to_dict()
             }
     
     def _prepare_session_context(self, session_data: List[Dict]) -> str:
@@ -383,24 +450,27 @@ Detailed Timeline:"""
         session_boundaries = self.detect_session_boundaries(screenshot_sequence)
         logger.info(f"Detected {len(session_boundaries)} session boundaries")
         
-        # Step 2: Analyze each session separately
+        # Step 2: Analyze each session separately, concurrently on the shared executor
+        sessions = [
+            (boundary, session_screenshots)
+            for boundary, session_screenshots in zip(
+                session_boundaries, self._slice_sessions(screenshot_sequence, session_boundaries)
+            )
+            if len(session_screenshots) >= 2  # Minimum session size
+        ]
+        analyses = self.executor.map_ordered(
+            lambda session: self.analyze_session_workflow(session[1]), sessions
+        )
+        
         session_analyses = []
-        for boundary in session_boundaries:
-            # Extract screenshots for this session
-            session_screenshots = [
-                s for s in screenshot_sequence
-                if self._is_in_session_timeframe(s, boundary)
-            ]
-            
-            if len(session_screenshots) >= 2:  # Minimum session size
-                analysis = self.analyze_session_workflow(session_screenshots)
-                analysis['session_boundary'] = {
-                    'session_id': boundary.session_id,
-                    'start_time': boundary.start_time.isoformat(),
-                    'end_time': boundary.end_time.isoformat(),
-                    'duration_minutes': (boundary.end_time - boundary.start_time).total_seconds() / 60
-                }
-                session_analyses.append(analysis)
+        for (boundary, _), analysis in zip(sessions, analyses):
+            analysis['session_boundary'] = {
+                'session_id': boundary.session_id,
+                'start_time': boundary.start_time.isoformat(),
+                'end_time': boundary.end_time.isoformat(),
+                'duration_minutes': (boundary.end_time - boundary.start_time).total_seconds() / 60
+            }
+            session_analyses.append(analysis)
         
         # Step 3: Create overall summary
         overall_summary = self._create_overall_summary(session_analyses, screenshot_sequence)
@@ -424,6 +494,34 @@ Detailed Timeline:"""
             'analysis_timestamp': datetime.now().isoformat()
         }
     
+    def _slice_sessions(self, screenshot_sequence: List[Dict],
+                        boundaries: List[SessionBoundary]) -> List[List[Dict]]:
+        """Split screenshots into per-boundary lists in one sort plus a bisect per boundary.
+        
+        Equivalent to filtering the whole sequence with ``_is_in_session_timeframe``
+        for every boundary, but O((n + sessions) log n) instead of O(n * sessions).
+        Each slice is in timestamp order.
+        """
+        timed = []
+        for screenshot in screenshot_sequence:
+            timestamp = screenshot.get('timestamp')
+            if not timestamp:
+                continue
+            if isinstance(timestamp, str):
+                timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            timed.append((timestamp, screenshot))
+        
+        timed.sort(key=lambda item: item[0])
+        timestamps = [timestamp for timestamp, _ in timed]
+        
+        return [
+            [screenshot for _, screenshot in timed[
+                bisect.bisect_left(timestamps, boundary.start_time):
+                bisect.bisect_right(timestamps, boundary.end_time)
+            ]]
+            for boundary in boundaries
+        ]
+    
     def _is_in_session_timeframe(self, screenshot: Dict, boundary: SessionBoundary) -> bool:
         """Check if screenshot falls within session boundary timeframe."""
         timestamp = screenshot.get('timestamp')
@@ -484,7 +582,10 @@ Detailed Timeline:"""
             'session_gap_threshold': self.session_gap_threshold,
             'max_chunk_size': self.max_chunk_size,
             'pattern_templates': len(self.pattern_templates),
-            'cached_sessions': len(self.session_cache)
+            'cached_sessions': len(self.session_cache),
+            'llm_usage': self.usage.snapshot(),
+            'response_cache': self.response_cache.get_stats(),
+            'executor': self.executor.get_stats()
         }
 
 
@@ -24,6 +24,9 @@ from autotasktracker.core.error_handler import (
     get_health_monitor
 )
 from autotasktracker.ai.sensitive_filter import get_sensitive_filter
+from autotasktracker.core.screenshot_store import resolve_screenshot
+from autotasktracker.core.derived_versions import stamp_derived
+from autotasktracker.ai.vlm_scheduler import VLMJob, VLMWorkQueue, AdaptiveConcurrencyController
 from autotasktracker.core.exceptions import (
     AIProcessingError, VLMProcessingError, ConfigurationError, CacheError
 )
@@ -70,6 +73,12 @@ class SmartVLMProcessor:
             expected_exception=requests.RequestException
         )
         
+        # Priority queue with deadline-aware shedding and adaptive concurrency
+        self.work_queue = VLMWorkQueue(persist_path=self.cache_dir / 'vlm_queue.json')
+        self.concurrency = AdaptiveConcurrencyController(
+            initial_limit=2, min_limit=1, max_limit=4, target_latency=30.0
+        )
+        
         # Error handling, metrics, and privacy
         self.error_handler = get_error_handler()
         self.metrics = get_metrics()
@@ -210,19 +219,22 @@ class SmartVLMProcessor:
         return 'Default'
     
     def should_process(self, image_path: str, window_title: str = None, entity_id: str = None, 
-                      ocr_text: str = None) -> Tuple[bool, str]:
+                      ocr_text: str = None, recompute: bool = False) -> Tuple[bool, str]:
         """
         Determine if screenshot should be processed by VLM (without atomic locking).
         
         Note: This method only checks conditions, it does NOT insert processing flags.
         The atomic locking happens in process_image() when actually starting processing.
         
+        Args:
+            recompute: Ignore cached and stored results (they predate the current model)
+        
         Returns:
             Tuple of (should_process, reason)
         """
         # Check if already cached
         img_hash = self.get_image_hash(image_path)
-        if img_hash in self.result_cache:
+        if img_hash in self.result_cache and not recompute:
             return False, "cached"
         
         # Privacy/sensitivity check first
@@ -234,9 +246,14 @@ class SmartVLMProcessor:
             return False, "sensitive_content"
         
         # Check if already has VLM results (but don't insert processing flag yet)
-        if entity_id and self._has_existing_vlm_results(entity_id):
+        if entity_id and not recompute and self._has_existing_vlm_results(entity_id):
             return False, "already_processed"
         
+        # A recompute replaces a stored result, so the capture-time
+        # heuristics below must not leave the old one in place
+        if recompute:
+            return True, "recompute"
+        
         # Check if similar to recent
         if self.is_similar_to_recent(image_path):
             return False, "similar_to_recent"
@@ -365,12 +382,14 @@ class SmartVLMProcessor:
                 
                 conn.commit()
                 logger.debug(f"Saved VLM result to database for entity {entity_id}")
+            stamp_derived(entity_id, ['vlm_description'])
                 
         except Exception as e:
             logger.error(f"Error saving VLM result to database for {entity_id}: {e}")
     
     def process_image(self, image_path: str, window_title: str = None, 
-                     ocr_text: str = None, priority: str = "normal", entity_id: str = None) -> Dict:
+                     ocr_text: str = None, priority: str = "normal", entity_id: str = None,
+                     claimed: bool = False, recompute: bool = False) -> Dict:
         """
         Process image with VLM, using smart caching and prompts with race condition protection.
         
@@ -380,14 +399,21 @@ class SmartVLMProcessor:
             ocr_text: OCR text if available
             priority: Processing priority (high/normal/low)
             entity_id: Database entity ID for atomic processing checks
+            claimed: Caller already holds a processing ledger claim for the
+                entity (e.g. a coordinated worker), so skip the metadata lock
+            recompute: Replace an existing result produced by an older
+                pipeline version instead of returning it
             
         Returns:
             Structured VLM result
         """
         start_time = time.time()
+        # Old screenshots may have been transcoded by the storage tier manager
+        image_path = resolve_screenshot(image_path)
         
         # Check if we should process (basic checks without locking)
-        should_process, reason = self.should_process(image_path, window_title, entity_id, ocr_text)
+        should_process, reason = self.should_process(image_path, window_title, entity_id, ocr_text,
+                                                     recompute=recompute)
         if not should_process:
             if reason == "cached":
                 img_hash = self.get_image_hash(image_path)
@@ -398,7 +424,8 @@ class SmartVLMProcessor:
                 return None
         
         # Atomically acquire processing lock to prevent race conditions
-        if entity_id and not self._try_acquire_processing_lock(entity_id):
+        use_lock = bool(entity_id) and not claimed
+        if use_lock and not self._try_acquire_processing_lock(entity_id):
             logger.debug(f"Skipping {image_path}: could not acquire processing lock")
             return None
         
@@ -436,19 +463,19 @@ class SmartVLMProcessor:
                 logger.info(f"VLM processed {image_path} in {processing_time:.1f}s")
                 
                 # Mark processing as complete
-                if entity_id:
+                if use_lock:
                     self._mark_processing_complete(entity_id, success=True)
                 
                 return structured_result
             else:
                 # Mark processing as failed
-                if entity_id:
+                if use_lock:
                     self._mark_processing_complete(entity_id, success=False)
                 return None
                 
         except Exception as e:
             # Mark processing as failed on exception
-            if entity_id:
+            if use_lock:
                 self._mark_processing_complete(entity_id, success=False)
             logger.error(f"Error processing {image_path}: {e}")
             raise
@@ -976,111 +1003,6 @@ class SmartVLMProcessor:
                 subtasks.append('Testing')
         
         return subtasks[:5]  # Limit to 5 subtasks
-
-
-class RateLimiter:
-    """Simple rate limiter for API calls."""
-    
-    def __init__(self, max_requests: int, time_window: int):
-        self.max_requests = max_requests
-        self.time_window = time_window
-        self.requests = deque()
-        self.lock = threading.Lock()
-    
-    def wait_if_needed(self):
-        """Wait if rate limit would be exceeded."""
-        with self.lock:
-            now = time.time()
-            
-            # Remove old requests outside time window
-            while self.requests and self.requests[0] <= now - self.time_window:
-                self.requests.popleft()
-            
-            # Check if we need to wait
-            if len(self.requests) >= self.max_requests:
-                sleep_time = self.time_window - (now - self.requests[0])
-                if sleep_time > 0:
-                    logger.info(f"Rate limit reached, waiting {sleep_time:.1f}s")
-                    time.sleep(sleep_time)
-                    # Remove the old request after waiting
-                    self.requests.popleft()
-            
-            # Record this request
-            self.requests.append(now)
-    
-    def get_stats(self) -> Dict:
-        """Get rate limiter statistics."""
-        with self.lock:
-            now = time.time()
-            recent_requests = sum(1 for req_time in self.requests 
-                                if req_time > now - self.time_window)
-            return {
-                'recent_requests': recent_requests,
-                'max_requests': self.max_requests,
-                'time_window': self.time_window,
-                'requests_remaining': max(0, self.max_requests - recent_requests)
-            }
-
-
-class CircuitBreaker:
-    """Circuit breaker pattern for API calls."""
-    
-    def __init__(self, failure_threshold: int, recovery_timeout: int, 
-                 expected_exception: Exception = Exception):
-        self.failure_threshold = failure_threshold
-        self.recovery_timeout = recovery_timeout
-        self.expected_exception = expected_exception
-        
-        self.failure_count = 0
-        self.last_failure_time = None
-        self.state = 'closed'  # closed, open, half-open
-        self.lock = threading.Lock()
-    
-    def call(self, func, *args, **kwargs):
-        """Execute function with circuit breaker protection."""
-        with self.lock:
-            if self.state == 'open':
-                if time.time() - self.last_failure_time > self.recovery_timeout:
-                    self.state = 'half-open'
-                    logger.info("Circuit breaker entering half-open state")
-                else:
-                    raise Exception(f"Circuit breaker is open. Service unavailable.")
-        
-        try:
-            result = func(*args, **kwargs)
-            
-            # Success - reset circuit breaker
-            with self.lock:
-                if self.state == 'half-open':
-                    self.state = 'closed'
-                    logger.info("Circuit breaker closed - service recovered")
-                self.failure_count = 0
-            
-            return result
-            
-        except self.expected_exception as e:
-            with self.lock:
-                self.failure_count += 1
-                self.last_failure_time = time.time()
-                
-                if self.failure_count >= self.failure_threshold:
-                    self.state = 'open'
-                    logger.error(f"Circuit breaker opened after {self.failure_count} failures")
-                else:
-                    logger.warning(f"Circuit breaker failure {self.failure_count}/{self.failure_threshold}")
-            
-            raise e
-    
-    def get_stats(self) -> Dict:
-        """Get circuit breaker statistics."""
-        with self.lock:
-            return {
-                'state': self.state,
-                'failure_count': self.failure_count,
-                'failure_threshold': self.failure_threshold,
-                'last_failure_time': self.last_failure_time,
-                'recovery_timeout': self.recovery_timeout
-            }
     
     def _extract_ide_elements(self, text: str) -> Dict:
         """Extract IDE-specific elements from VLM text."""
@@ -1192,71 +1114,303 @@ class CircuitBreaker:
         except ImportError as e:
             logger.debug(f"Optional dependency not available for stats: {e}")
         
-        # Add rate limiting and circuit breaker stats
+        # Add rate limiting, circuit breaker and scheduler stats
         base_stats.update({
             'rate_limiter': self.rate_limiter.get_stats(),
-            'circuit_breaker': self.circuit_breaker.get_stats()
+            'circuit_breaker': self.circuit_breaker.get_stats(),
+            'scheduler': self.get_queue_stats()
         })
         
         return base_stats
     
-    def batch_process(self, tasks: List[Dict], max_concurrent: int = 3) -> Dict[str, Dict]:
-        """Process multiple images efficiently with concurrent processing and race condition protection."""
-        import concurrent.futures
-        from threading import Lock
+    def enqueue(self, task: Dict) -> bool:
+        """Add a screenshot to the VLM priority queue.
         
-        results = {}
-        results_lock = Lock()
+        Args:
+            task: Dict with filepath and optional entity_id, active_window,
+                ocr_result, priority and created_at
+            
+        Returns:
+            True if the job was queued, False if it was already queued
+        """
+        path = task['filepath']
+        window_title = task.get("active_window")
+        ocr_text = task.get("ocr_result")
         
-        # Filter out already processed
-        to_process = []
-        for task in tasks:
-            path = task.get('filepath', task) if isinstance(task, dict) else task
-            entity_id = task.get('entity_id') if isinstance(task, dict) else None
-            window_title = task.get("active_window") if isinstance(task, dict) else None
+        try:
+            sensitivity = float(self.sensitive_filter.calculate_sensitivity_score(ocr_text or "", window_title))
+        except (TypeError, ValueError) as e:
+            logger.debug(f"Could not score sensitivity for {path}: {e}")
+            sensitivity = 0.0
+        
+        job = VLMJob(
+            filepath=path,
+            entity_id=task.get('entity_id'),
+            active_window=window_title,
+            ocr_result=ocr_text,
+            priority=task.get('priority', 'normal'),
+            captured_at=self._to_timestamp(task.get('created_at')),
+            app_type=self.detect_application_type(window_title, ocr_text),
+            novelty=self._calculate_novelty(path),
+            sensitivity=sensitivity,
+        )
+        return self.work_queue.push(job)
+    
+    def _to_timestamp(self, value) -> float:
+        """Convert a capture time (datetime, ISO string or epoch) to epoch seconds."""
+        if value is None:
+            return 0.0
+        if isinstance(value, datetime):
+            return value.timestamp()
+        if isinstance(value, (int, float)):
+            return float(value)
+        try:
+            return datetime.fromisoformat(str(value)).timestamp()
+        except ValueError:
+            return 0.0
+    
+    def _calculate_novelty(self, image_path: str) -> float:
+        """Novelty of an image relative to recently processed results (0-1)."""
+        try:
+            current_hash = self.get_image_hash(image_path)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Could not hash {image_path} for novelty: {e}")
+            return 1.0
+        
+        recent_hashes = list(self.result_cache.keys())[-10:]
+        if not recent_hashes:
+            return 1.0
+        return 1.0 - max(self._calculate_similarity(current_hash, h) for h in recent_hashes)
+    
+    def _shed_to_ocr(self, job: VLMJob):
+        """Downgrade a job that missed its deadline to OCR-only processing.
+        
+        The entity's ``vlm_processing`` flag is set to ``shed``, which
+        records the outcome and keeps ``_try_acquire_processing_lock`` from
+        running the VLM on it later. The work queue also journals the shed
+        key, so later batches skip the screenshot instead of queueing it again.
+        """
+        self.metrics.increment_counter('vlm_jobs_shed')
+        if job.entity_id is not None:
+            self._mark_processing_shed(job.entity_id)
+        logger.debug(f"Shed VLM job for {job.filepath}: deadline passed, using OCR only")
+    
+    def _mark_processing_shed(self, entity_id: str):
+        """Record on the entity that its VLM analysis was shed to OCR-only."""
+        from autotasktracker.core import DatabaseManager
+        
+        try:
+            db = DatabaseManager()
+            with db.get_connection(readonly=False) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO metadata_entries 
+                    (entity_id, key, value, source_type, data_type, created_at, updated_at) 
+                    VALUES (%s, %s, %s, 'vlm', 'text', NOW(), NOW())
+                    ON CONFLICT (entity_id, key) DO UPDATE SET 
+                    value = EXCLUDED.value, updated_at = NOW()
+                """, (entity_id, 'vlm_processing', 'shed'))
+                conn.commit()
+                
+        except Exception as e:
+            logger.error(f"Error recording shed VLM job for {entity_id}: {e}")
+    
+    def process_queue(self, max_jobs: Optional[int] = None, max_concurrent: int = 3) -> Dict[str, Dict]:
+        """Drain the VLM priority queue under adaptive concurrency.
+        
+        Jobs are started highest priority first, one per free concurrency
+        slot, so newly queued live screenshots overtake older backlog.
+        
+        Args:
+            max_jobs: Maximum number of jobs to run (None drains the queue)
+            max_concurrent: Upper bound on worker threads
             
-            should_proc, reason = self.should_process(path, window_title, entity_id)
-            if should_proc:
-                to_process.append(task)
-            elif reason == "cached":
-                img_hash = self.get_image_hash(path)
-                results[path] = self.result_cache[img_hash]
+        Returns:
+            Dict mapping image path to structured VLM result
+        """
+        import concurrent.futures
         
-        logger.info(f"Batch processing {len(to_process)} images (skipped {len(tasks) - len(to_process)})")
+        results = {}
+        results_lock = threading.Lock()
         
-        # Process concurrently
-        def process_single(task):
+        def process_single(job: VLMJob):
+            start = time.time()
+            success = False
             try:
-                if isinstance(task, dict):
-                    result = self.process_image(
-                        task['filepath'],
-                        task.get("active_window"),
-                        task.get("ocr_result"),
-                        task.get('priority', 'normal'),
-                        task.get('entity_id')
-                    )
-                    path = task['filepath']
-                else:
-                    result = self.process_image(task)
-                    path = task
-                
+                result = self.process_image(
+                    job.filepath,
+                    job.active_window,
+                    job.ocr_result,
+                    job.priority,
+                    job.entity_id
+                )
+                success = True
                 if result:
                     with results_lock:
-                        results[path] = result
-                return True
+                        results[job.filepath] = result
             except Exception as e:
-                logger.error(f"Error processing {task}: {e}")
-                return False
+                logger.error(f"Error processing {job.filepath}: {e}")
+            finally:
+                self.concurrency.release(time.time() - start, success)
         
-        # Use ThreadPoolExecutor for concurrent processing
+        started = 0
         with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrent) as executor:
-            futures = [executor.submit(process_single, task) for task in to_process]
+            futures = []
+            while max_jobs is None or started < max_jobs:
+                self.concurrency.acquire()
+                jobs, shed = self.work_queue.pop_batch(1)
+                for job in shed:
+                    self._shed_to_ocr(job)
+                if not jobs:
+                    self.concurrency.cancel()
+                    if shed:
+                        continue
+                    break
+                futures.append(executor.submit(process_single, jobs[0]))
+                started += 1
             
             # Wait for completion with progress
             completed = 0
             for future in concurrent.futures.as_completed(futures):
                 completed += 1
                 if completed % 10 == 0:
-                    logger.info(f"Batch progress: {completed}/{len(to_process)}")
+                    logger.info(f"Queue progress: {completed}/{len(futures)}")
+        
+        return results
+    
+    def get_queue_stats(self) -> Dict:
+        """Get VLM queue and concurrency statistics for monitoring."""
+        return {
+            'queue': self.work_queue.get_stats(),
+            'concurrency': self.concurrency.get_stats()
+        }
+    
+    def batch_process(self, tasks: List[Dict], max_concurrent: int = 3) -> Dict[str, Dict]:
+        """Process multiple images through the priority queue with race condition protection."""
+        results = {}
         
-        return results
\ No newline at end of file
+        # Filter out already processed
+        queued = 0
+        for task in tasks:
+            if not isinstance(task, dict):
+                task = {'filepath': task}
+            path = task['filepath']
+            
+            should_proc, reason = self.should_process(path, task.get("active_window"), task.get('entity_id'))
+            if should_proc:
+                if self.enqueue(task):
+                    queued += 1
+            elif reason == "cached":
+                img_hash = self.get_image_hash(path)
+                results[path] = self.result_cache[img_hash]
+        
+        logger.info(f"Batch processing {queued} images (skipped {len(tasks) - queued})")
+        
+        results.update(self.process_queue(max_concurrent=max_concurrent))
+        return results
+
+
+
+class RateLimiter:
+    """Simple rate limiter for API calls."""
+    
+    def __init__(self, max_requests: int, time_window: int):
+        self.max_requests = max_requests
+        self.time_window = time_window
+        self.requests = deque()
+        self.lock = threading.Lock()
+    
+    def wait_if_needed(self):
+        """Wait if rate limit would be exceeded."""
+        with self.lock:
+            now = time.time()
+            
+            # Remove old requests outside time window
+            while self.requests and self.requests[0] <= now - self.time_window:
+                self.requests.popleft()
+            
+            # Check if we need to wait
+            if len(self.requests) >= self.max_requests:
+                sleep_time = self.time_window - (now - self.requests[0])
+                if sleep_time > 0:
+                    logger.info(f"Rate limit reached, waiting {sleep_time:.1f}s")
+                    time.sleep(sleep_time)
+                    # Remove the old request after waiting
+                    self.requests.popleft()
+            
+            # Record this request
+            self.requests.append(now)
+    
+    def get_stats(self) -> Dict:
+        """Get rate limiter statistics."""
+        with self.lock:
+            now = time.time()
+            recent_requests = sum(1 for req_time in self.requests 
+                                if req_time > now - self.time_window)
+            return {
+                'recent_requests': recent_requests,
+                'max_requests': self.max_requests,
+                'time_window': self.time_window,
+                'requests_remaining': max(0, self.max_requests - recent_requests)
+            }
+
+
+class CircuitBreaker:
+    """Circuit breaker pattern for API calls."""
+    
+    def __init__(self, failure_threshold: int, recovery_timeout: int, 
+                 expected_exception: Exception = Exception):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.expected_exception = expected_exception
+        
+        self.failure_count = 0
+        self.last_failure_time = None
+        self.state = 'closed'  # closed, open, half-open
+        self.lock = threading.Lock()
+    
+    def call(self, func, *args, **kwargs):
+        """Execute function with circuit breaker protection."""
+        with self.lock:
+            if self.state == 'open':
+                if time.time() - self.last_failure_time > self.recovery_timeout:
+                    self.state = 'half-open'
+                    logger.info("Circuit breaker entering half-open state")
+                else:
+                    raise Exception(f"Circuit breaker is open. Service unavailable.")
+        
+        try:
+            result = func(*args, **kwargs)
+            
+            # Success - reset circuit breaker
+            with self.lock:
+                if self.state == 'half-open':
+                    self.state = 'closed'
+                    logger.info("Circuit breaker closed - service recovered")
+                self.failure_count = 0
+            
+            return result
+            
+        except self.expected_exception as e:
+            with self.lock:
+                self.failure_count += 1
+                self.last_failure_time = time.time()
+                
+                if self.failure_count >= self.failure_threshold:
+                    self.state = 'open'
+                    logger.error(f"Circuit breaker opened after {self.failure_count} failures")
+                else:
+                    logger.warning(f"Circuit breaker failure {self.failure_count}/{self.failure_threshold}")
+            
+            raise e
+    
+    def get_stats(self) -> Dict:
+        """Get circuit breaker statistics."""
+        with self.lock:
+            return {
+                'state': self.state,
+                'failure_count': self.failure_count,
+                'failure_threshold': self.failure_threshold,
+                'last_failure_time': self.last_failure_time,
+                'recovery_timeout': self.recovery_timeout
+            }
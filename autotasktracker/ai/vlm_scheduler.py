@@ -0,0 +1,474 @@
+"""
+Priority scheduling for VLM work.
+
+Provides a persistent priority queue with aging and deadline-aware load
+shedding, plus an AIMD concurrency controller that adapts the number of
+in-flight Ollama requests to observed latency.
+"""
+import heapq
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: the journal is only guarded within one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+# Relative value of VLM analysis per application type. Screens whose content
+# OCR already captures well (terminals, documents) benefit least.
+APP_TYPE_WEIGHTS = {
+    'IDE': 1.0,
+    'Meeting': 0.9,
+    'Browser': 0.8,
+    'Default': 0.6,
+    'Chat': 0.5,
+    'Document': 0.5,
+    'Terminal': 0.4,
+}
+
+PRIORITY_BOOSTS = {
+    'high': 1.0,
+    'normal': 0.0,
+    'low': -0.5,
+}
+
+
+@dataclass
+class VLMJob:
+    """A single screenshot waiting for VLM analysis."""
+    filepath: str
+    entity_id: Optional[str] = None
+    active_window: Optional[str] = None
+    ocr_result: Optional[str] = None
+    priority: str = 'normal'
+    captured_at: float = 0.0
+    enqueued_at: float = 0.0
+    deadline: float = 0.0
+    app_type: str = 'Default'
+    novelty: float = 1.0
+    sensitivity: float = 0.0
+    score: float = 0.0
+
+    @property
+    def key(self) -> str:
+        """Stable identity used for de-duplicating queue entries."""
+        return str(self.entity_id) if self.entity_id is not None else self.filepath
+
+    def to_task(self) -> Dict:
+        """Convert back to the task dict shape used by ``batch_process``."""
+        return {
+            'filepath': self.filepath,
+            'entity_id': self.entity_id,
+            'active_window': self.active_window,
+            'ocr_result': self.ocr_result,
+            'priority': self.priority,
+        }
+
+
+class VLMWorkQueue:
+    """Persistent priority queue for VLM jobs with aging and deadlines.
+
+    Jobs are scored once on enqueue from recency, application type, novelty
+    and sensitivity. Aging adds ``aging_rate`` points per second waited;
+    because every job ages at the same rate, the aged ordering is equivalent
+    to ordering by ``score - aging_rate * enqueued_at``, which keeps pops
+    O(log n). Jobs popped after their deadline are shed to OCR-only.
+
+    The queue is persisted as an append-only journal of JSON lines, so each
+    push or pop writes one line instead of rewriting every queued job. The
+    journal is compacted to a snapshot on load and whenever it grows past
+    ``compact_threshold`` lines and twice the live entries. Shed keys are
+    journaled too, so a shed screenshot is not queued again.
+
+    Several worker processes may share one journal. Every operation holds
+    an exclusive ``flock`` on a sibling ``.lock`` file and first replays the
+    records other processes appended (or their compacted snapshot), so
+    pushes and pops are serialized across processes and a compaction never
+    drops another process's jobs.
+    """
+
+    def __init__(self, persist_path: Optional[str] = None,
+                 deadline_seconds: float = 900.0,
+                 aging_rate: float = 0.002,
+                 recency_half_life: float = 300.0,
+                 max_size: int = 10000,
+                 compact_threshold: int = 1000):
+        self.persist_path = Path(persist_path) if persist_path else None
+        self.deadline_seconds = deadline_seconds
+        self.aging_rate = aging_rate
+        self.recency_half_life = recency_half_life
+        self.max_size = max_size
+        self.compact_threshold = compact_threshold
+
+        self._heap: List[Tuple[float, int, str]] = []
+        self._jobs: Dict[str, VLMJob] = {}
+        self._shed: OrderedDict = OrderedDict()
+        self._counter = 0
+        self._journal_lines = 0
+        # Journal position this queue has replayed up to
+        self._journal_inode: Optional[int] = None
+        self._journal_offset = 0
+        self.lock = threading.Lock()
+
+        # Observability
+        self.wait_times = deque(maxlen=1000)
+        self.stats = {
+            'enqueued': 0,
+            'dequeued': 0,
+            'shed_deadline': 0,
+            'shed_overflow': 0,
+            'duplicates': 0,
+            'already_shed': 0,
+        }
+
+        self._load()
+
+    def score_job(self, job: VLMJob, now: Optional[float] = None) -> float:
+        """Compute the base priority score for a job (higher runs first)."""
+        now = now or time.time()
+        age = max(0.0, now - (job.captured_at or now))
+        recency = math.exp(-age * math.log(2) / self.recency_half_life)
+        app_weight = APP_TYPE_WEIGHTS.get(job.app_type, APP_TYPE_WEIGHTS['Default'])
+        novelty = min(max(job.novelty, 0.0), 1.0)
+        # Sensitive screens only get privacy-safe prompts, so they yield less
+        sensitivity_penalty = min(max(job.sensitivity, 0.0), 1.0) * 0.5
+
+        score = (
+            1.5 * recency +
+            1.0 * app_weight +
+            1.0 * novelty -
+            sensitivity_penalty +
+            PRIORITY_BOOSTS.get(job.priority, 0.0)
+        )
+        return round(score, 6)
+
+    def push(self, job: VLMJob) -> bool:
+        """Add a job to the queue.
+
+        Returns False if it was already queued or was shed to OCR-only.
+        """
+        now = time.time()
+        with self._locked():
+            if job.key in self._jobs:
+                self.stats['duplicates'] += 1
+                return False
+            if job.key in self._shed:
+                self.stats['already_shed'] += 1
+                return False
+
+            job.enqueued_at = job.enqueued_at or now
+            job.captured_at = job.captured_at or job.enqueued_at
+            job.deadline = job.deadline or (job.enqueued_at + self.deadline_seconds)
+            job.score = self.score_job(job, now)
+            self._push_locked(job)
+            self.stats['enqueued'] += 1
+            records = [{'op': 'push', 'job': asdict(job)}]
+
+            if len(self._jobs) > self.max_size:
+                records.append({'op': 'shed', 'keys': [self._evict_lowest_locked()]})
+
+            self._journal_locked(records)
+        return True
+
+    def _push_locked(self, job: VLMJob):
+        self._counter += 1
+        aged_key = job.score - self.aging_rate * job.enqueued_at
+        heapq.heappush(self._heap, (-aged_key, self._counter, job.key))
+        self._jobs[job.key] = job
+
+    def _evict_lowest_locked(self) -> str:
+        """Drop the lowest priority job when the queue overflows."""
+        # Entries whose job was popped by another process linger in the heap
+        while True:
+            lowest = max(self._heap)
+            self._heap.remove(lowest)
+            if self._jobs.pop(lowest[2], None) is not None:
+                break
+        heapq.heapify(self._heap)
+        self._remember_shed_locked([lowest[2]])
+        self.stats['shed_overflow'] += 1
+        return lowest[2]
+
+    def _remember_shed_locked(self, keys: List[str]):
+        """Remember shed keys, keeping at most ``max_size`` of the newest."""
+        for key in keys:
+            self._shed[key] = True
+            self._shed.move_to_end(key)
+        while len(self._shed) > self.max_size:
+            self._shed.popitem(last=False)
+
+    def pop_batch(self, n: int) -> Tuple[List[VLMJob], List[VLMJob]]:
+        """Pop up to ``n`` runnable jobs.
+
+        Returns:
+            Tuple of (jobs to run through the VLM, jobs shed to OCR-only
+            because their deadline passed while waiting)
+        """
+        now = time.time()
+        runnable, shed = [], []
+        with self._locked():
+            while self._heap and len(runnable) < n:
+                _, _, key = heapq.heappop(self._heap)
+                job = self._jobs.pop(key, None)
+                if job is None:
+                    continue
+                if now > job.deadline:
+                    shed.append(job)
+                    self.stats['shed_deadline'] += 1
+                    continue
+                self.wait_times.append(now - job.enqueued_at)
+                runnable.append(job)
+            self.stats['dequeued'] += len(runnable)
+
+            records = []
+            if runnable:
+                records.append({'op': 'pop', 'keys': [job.key for job in runnable]})
+            if shed:
+                self._remember_shed_locked([job.key for job in shed])
+                records.append({'op': 'shed', 'keys': [job.key for job in shed]})
+            self._journal_locked(records)
+        return runnable, shed
+
+    def requeue(self, job: VLMJob):
+        """Put a job back (e.g. when concurrency is saturated)."""
+        with self._locked():
+            if job.key not in self._jobs:
+                self._push_locked(job)
+                self._journal_locked([{'op': 'push', 'job': asdict(job)}])
+
+    def __len__(self) -> int:
+        with self._locked():
+            return len(self._jobs)
+
+    def get_stats(self) -> Dict:
+        """Get queue depth, wait time and shed statistics."""
+        with self._locked():
+            waits = sorted(self.wait_times)
+            oldest = min((j.enqueued_at for j in self._jobs.values()), default=None)
+            stats = dict(self.stats)
+            stats.update({
+                'depth': len(self._jobs),
+                'oldest_wait_seconds': (time.time() - oldest) if oldest else 0.0,
+                'avg_wait_seconds': sum(waits) / len(waits) if waits else 0.0,
+                'p95_wait_seconds': waits[int(len(waits) * 0.95) - 1] if waits else 0.0,
+                'shed_total': stats['shed_deadline'] + stats['shed_overflow'],
+            })
+            return stats
+
+    def _load(self):
+        """Replay the journal from disk and compact it."""
+        if not self.persist_path:
+            return
+        with self._locked():
+            if self._journal_inode is None:
+                return
+            self._compact_locked()
+        logger.info(f"Loaded {len(self._jobs)} queued VLM jobs")
+
+    @contextmanager
+    def _locked(self):
+        """Hold ``lock`` and the cross-process journal lock, with the journal replayed."""
+        with self.lock:
+            lock_file = self._acquire_journal_lock()
+            try:
+                if lock_file is not None:
+                    self._sync_locked()
+                yield
+            finally:
+                if lock_file is not None:
+                    lock_file.close()
+
+    def _acquire_journal_lock(self):
+        """Open and ``flock`` the journal's lock file (None without a journal)."""
+        if not self.persist_path:
+            return None
+        try:
+            lock_file = open(self.persist_path.with_name(self.persist_path.name + '.lock'), 'a')
+        except OSError as e:
+            logger.error(f"Failed to open VLM queue lock: {e}")
+            return None
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def _sync_locked(self):
+        """Apply journal records written since this queue last read it. Caller holds the locks."""
+        try:
+            stat = os.stat(self.persist_path)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.error(f"Failed to read VLM queue journal: {e}")
+            return
+        if stat.st_ino != self._journal_inode or stat.st_size < self._journal_offset:
+            # First read, or another process compacted: rebuild from its snapshot
+            self._heap, self._jobs, self._shed = [], {}, OrderedDict()
+            self._journal_inode, self._journal_offset, self._journal_lines = stat.st_ino, 0, 0
+        if stat.st_size == self._journal_offset:
+            return
+        try:
+            with open(self.persist_path, 'rb') as f:
+                f.seek(self._journal_offset)
+                data = f.read()
+        except OSError as e:
+            logger.error(f"Failed to read VLM queue journal: {e}")
+            return
+
+        complete, newline, torn = data.rpartition(b'\n')
+        self._journal_offset += len(complete) + len(newline)
+        for line in (complete.split(b'\n') if newline else []):
+            self._journal_lines += 1
+            self._apply_record_locked(line)
+        if torn:
+            # Nobody else writes while we hold the lock: either a writer crashed
+            # mid-line or this is a snapshot without a final newline
+            self._journal_lines += 1
+            try:
+                json.loads(torn)
+                self._apply_record_locked(torn)
+            except ValueError:
+                logger.warning(f"Skipping torn VLM queue journal line {self._journal_lines}")
+            self._compact_locked()
+
+    def _apply_record_locked(self, line: bytes):
+        if not line.strip():
+            return
+        try:
+            record = json.loads(line)
+            op = record.get('op')
+            if op == 'push':
+                job = VLMJob(**record['job'])
+                if job.key not in self._jobs:
+                    self._push_locked(job)
+            elif op in ('pop', 'shed'):
+                for key in record['keys']:
+                    self._jobs.pop(key, None)
+                if op == 'shed':
+                    self._remember_shed_locked(record['keys'])
+            elif 'jobs' in record:
+                # Snapshot written before the queue was journaled
+                for raw in record['jobs']:
+                    job = VLMJob(**raw)
+                    if job.key not in self._jobs:
+                        self._push_locked(job)
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            logger.warning(f"Skipping bad VLM queue journal line {self._journal_lines}: {e}")
+
+    def _journal_locked(self, records: List[Dict]):
+        """Append records to the on-disk journal. Caller holds the locks."""
+        if not self.persist_path or not records:
+            return
+        try:
+            with open(self.persist_path, 'ab') as f:
+                f.write(''.join(json.dumps(record) + '\n' for record in records).encode())
+                self._journal_inode, self._journal_offset = os.fstat(f.fileno()).st_ino, f.tell()
+            self._journal_lines += len(records)
+        except OSError as e:
+            logger.error(f"Failed to append to VLM queue journal: {e}")
+            return
+
+        live = len(self._jobs) + 1
+        if self._journal_lines > max(self.compact_threshold, 2 * live):
+            self._compact_locked()
+
+    def _compact_locked(self):
+        """Rewrite the journal as a snapshot of the live queue. Caller holds the locks."""
+        records = [{'op': 'push', 'job': asdict(job)} for job in self._jobs.values()]
+        if self._shed:
+            records.append({'op': 'shed', 'keys': list(self._shed)})
+        try:
+            tmp_path = self.persist_path.with_suffix('.tmp')
+            with open(tmp_path, 'wb') as f:
+                f.write(''.join(json.dumps(record) + '\n' for record in records).encode())
+            tmp_path.replace(self.persist_path)
+            stat = os.stat(self.persist_path)
+            self._journal_inode, self._journal_offset = stat.st_ino, stat.st_size
+            self._journal_lines = len(records)
+        except OSError as e:
+            logger.error(f"Failed to compact VLM queue journal: {e}")
+
+
+class AdaptiveConcurrencyController:
+    """AIMD controller for the number of in-flight VLM requests.
+
+    The limit grows by ``1 / limit`` per successful request that completes
+    under ``target_latency`` (about +1 per round of requests) and is halved
+    when a request fails or runs slower than the target.
+    """
+
+    def __init__(self, initial_limit: int = 2, min_limit: int = 1, max_limit: int = 8,
+                 target_latency: float = 20.0, backoff_factor: float = 0.5):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.backoff_factor = backoff_factor
+
+        self._limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self.latencies = deque(maxlen=200)
+        self.decreases = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Wait for an in-flight slot. Returns False on timeout."""
+        with self._condition:
+            acquired = self._condition.wait_for(
+                lambda: self._in_flight < int(self._limit), timeout=timeout
+            )
+            if acquired:
+                self._in_flight += 1
+            return acquired
+
+    def release(self, latency: float, success: bool = True):
+        """Release a slot and adjust the limit from the observed latency."""
+        with self._condition:
+            self._in_flight = max(0, self._in_flight - 1)
+            self.latencies.append(latency)
+
+            if success and latency <= self.target_latency:
+                self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+            else:
+                self._limit = max(self.min_limit, self._limit * self.backoff_factor)
+                self.decreases += 1
+                logger.debug(f"VLM concurrency reduced to {self._limit:.2f} "
+                             f"(latency={latency:.1f}s, success={success})")
+
+            self._condition.notify_all()
+
+    def cancel(self):
+        """Release a slot that was acquired but never used, without feedback."""
+        with self._condition:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._condition.notify_all()
+
+    def get_stats(self) -> Dict:
+        """Get controller statistics."""
+        with self._condition:
+            latencies = list(self.latencies)
+            return {
+                'limit': int(self._limit),
+                'in_flight': self._in_flight,
+                'target_latency': self.target_latency,
+                'avg_latency': sum(latencies) / len(latencies) if latencies else 0.0,
+                'decreases': self.decreases,
+            }
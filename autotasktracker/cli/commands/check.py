@@ -154,4 +154,57 @@ def architecture():
         # TODO: Implement architecture fixes
         click.echo("   Architecture fixes not yet implemented")
     
-    return len(issues)
\ No newline at end of file
+    return len(issues)
+
+@check_group.command()
+@click.option('--explain', '-e', is_flag=True, help='Capture EXPLAIN ANALYZE plans')
+@click.option('--runs', '-n', type=int, default=3, help='Executions per query')
+@click.option('--json', 'as_json', is_flag=True, help='Output stats as JSON')
+def queries(explain, runs, as_json):
+    """Benchmark the registered hot queries (prepared statements)."""
+    import json
+    from autotasktracker.core import get_default_db_manager
+    from autotasktracker.core.query_registry import get_query_registry
+    
+    registry = get_query_registry()
+    db = get_default_db_manager()
+    
+    if not as_json:
+        click.echo(f"🔎 Running {len(registry.names)} registered queries ({runs} runs each)...")
+    
+    failed = 0
+    with db.get_connection() as conn:
+        for name in registry.names:
+            query = registry.get(name)
+            params = query.sample_params() if query.sample_params else ()
+            try:
+                for _ in range(runs):
+                    registry.execute(conn, name, params)
+                if explain:
+                    registry.explain(conn, name, params)
+            except Exception as e:
+                failed += 1
+                if not as_json:
+                    click.echo(f"   ❌ {name}: {e}")
+    
+    stats = registry.get_stats()
+    if as_json:
+        click.echo(json.dumps(stats, indent=2, default=str))
+        return failed
+    
+    for name, query_stats in stats.items():
+        if not query_stats['calls']:
+            continue
+        latency = query_stats['latency']
+        click.echo(f"\n📊 {name} ({registry.get(name).description})")
+        click.echo(f"   Calls: {query_stats['calls']}  Prepares: {query_stats['prepares']}  "
+                   f"Avg rows: {query_stats['avg_rows']:.0f}")
+        click.echo(f"   Latency: avg {latency['avg_ms']:.1f}ms  p95 ≤{latency['p95_ms']:.0f}ms  "
+                   f"max {latency['max_ms']:.1f}ms")
+        plan = query_stats.get('last_plan')
+        if plan:
+            click.echo(f"   Plan: {plan['root_node']}  planning {plan['planning_ms']}ms  "
+                       f"execution {plan['execution_ms']}ms")
+    
+    click.echo(f"\n{'✅' if not failed else '❌'} {len(stats) - failed}/{len(stats)} queries OK")
+    return failed
@@ -165,4 +165,15 @@ def launcher():
     from scripts.dashboard_launcher import main as launcher_main
     
     click.echo("🚀 Starting interactive dashboard launcher...")
-    launcher_main()
\ No newline at end of file
+    launcher_main()
+
+@dashboard_group.command()
+@click.option('--host', default='127.0.0.1', help='Interface to bind')
+@click.option('--port', '-p', type=int, help='Custom port number (defaults to METRICS_PORT)')
+def api(host, port):
+    """Serve dashboard metrics over a headless HTTP API."""
+    from autotasktracker.dashboards.api import MetricsAPIService
+
+    service = MetricsAPIService(host=host, port=port)
+    click.echo(f"📡 Starting metrics API on http://{service.host}:{service.port}")
+    service.start_server(background=False)
@@ -115,4 +115,284 @@ def process_status():
     is_running = status()
     if not is_running:
         click.echo("❌ Auto-processor is not running")
-        click.echo("   Start with: autotask process auto")
\ No newline at end of file
+        click.echo("   Start with: autotask process auto")
+
+
+@process_group.command(name='index')
+@click.option('--batch-size', '-b', type=int, default=1000, help='Entities indexed per transaction')
+@click.option('--rebuild', is_flag=True, help='Drop and re-index every entity')
+def index(batch_size, rebuild):
+    """Build the full-text search index for existing screenshots.
+    
+    New screenshots are indexed automatically; this only needs to run once
+    for history captured before the index existed.
+    """
+    from autotasktracker.core.text_index import get_text_index
+    
+    text_index = get_text_index()
+    click.echo("🔎 Rebuilding full-text index..." if rebuild else "🔎 Indexing screenshots...")
+    indexed = text_index.rebuild(batch_size) if rebuild else text_index.backfill(batch_size)
+    click.echo(f"✅ Indexed {indexed} screenshots ({text_index.count()} in index)")
+
+
+DATE_FORMATS = ['%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S']
+
+
+@process_group.command(name='export')
+@click.option('--since', type=click.DateTime(DATE_FORMATS), help='Start of the range (default: today)')
+@click.option('--until', type=click.DateTime(DATE_FORMATS), help='End of the range (default: now)')
+@click.option('--format', '-f', 'export_format', type=click.Choice(['csv', 'jsonl', 'parquet']),
+              default='csv', help='Output format')
+@click.option('--kind', '-k', type=click.Choice(['task_groups', 'screenshots']), default='task_groups',
+              help='Grouped task report or one row per screenshot')
+@click.option('--output', '-o', type=click.Path(), help='Output file (parquet: directory); default in the exports dir')
+@click.option('--categories', '-c', help='Comma-separated categories to include')
+@click.option('--batch-size', '-b', type=int, help='Screenshots read per page')
+@click.option('--row-group-size', type=int, default=50000, help='Rows per Parquet row group')
+@click.option('--restart', is_flag=True, help='Ignore any checkpoint and start over')
+def export(since, until, export_format, kind, output, categories, batch_size, row_group_size, restart):
+    """Export tasks or screenshots for a date range to a file.
+    
+    Streams from the database in pages, so any range exports in bounded
+    memory. Progress is checkpointed next to the output: re-running with the
+    same --output after an interruption resumes where it stopped.
+    """
+    from autotasktracker.config import get_config
+    from autotasktracker.core.export_engine import ExportEngine, ExportRequest, default_output_path, read_progress
+    
+    now = datetime.now()
+    checkpoint = read_progress(output) if output and not restart else None
+    if checkpoint is not None and checkpoint.request and not (since or until):
+        # Resume the interrupted range rather than one ending now
+        since = datetime.fromisoformat(checkpoint.request['start'])
+        until = datetime.fromisoformat(checkpoint.request['end'])
+    request = ExportRequest(
+        start=since or now.replace(hour=0, minute=0, second=0, microsecond=0),
+        end=until or now,
+        output_path=output or default_output_path(kind, export_format),
+        format=export_format,
+        kind=kind,
+        categories=[c.strip() for c in categories.split(',') if c.strip()] if categories else None,
+        batch_size=batch_size or get_config().EXPORT_BATCH_SIZE,
+        row_group_size=row_group_size,
+    )
+    try:
+        request.validate()
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    
+    click.echo(f"📤 Exporting {kind} from {request.start:%Y-%m-%d %H:%M} to {request.end:%Y-%m-%d %H:%M} "
+               f"as {export_format}...")
+    
+    def report(progress):
+        if progress.status == 'running':
+            click.echo(f"   {progress.fraction:.0%} - {progress.rows_read} screenshots read, "
+                       f"{progress.rows_written} rows written")
+    
+    try:
+        progress = ExportEngine().run(request, resume=not restart, on_progress=report)
+    except KeyboardInterrupt:
+        click.echo(f"\n⏸️  Export interrupted; resume with --output {request.output_path}")
+        return
+    
+    if progress.status == 'done':
+        click.echo(f"✅ Exported {progress.rows_written} rows to {request.output_path}")
+    else:
+        raise click.ClickException(f"Export {progress.status}: {progress.error or 'interrupted'}")
+
+
+def _build_stage_handlers(stages):
+    """Create per-item handlers for the coordinated worker."""
+    handlers = {}
+
+    if 'vlm' in stages:
+        from autotasktracker.ai.vlm_processor import SmartVLMProcessor
+        from autotasktracker.core.derived_versions import get_derived_versions
+        vlm = SmartVLMProcessor()
+        versions = get_derived_versions()
+
+        def process_vlm(item):
+            # Entities requeued because their result predates the current model are redone
+            result = vlm.process_image(item['filepath'], window_title=item.get('active_window'),
+                                       ocr_text=item.get('ocr_result'), entity_id=str(item['id']),
+                                       claimed=True, recompute=versions.has_stale(item['id'], 'vlm'))
+            if not result:
+                raise RuntimeError('VLM produced no result')
+        handlers['vlm'] = process_vlm
+
+    if 'ocr' in stages:
+        from scripts.processing.pensieve_ocr_processor import PensieveOCRProcessor
+        ocr = PensieveOCRProcessor()
+
+        def process_ocr(item):
+            if not ocr.trigger_ocr_plugin(item['id']):
+                raise RuntimeError('OCR plugin trigger failed')
+        handlers['ocr'] = process_ocr
+
+    if 'tasks' in stages:
+        from autotasktracker.core import DatabaseManager
+        from autotasktracker.core.backfill import compute_chunk
+        from autotasktracker.core.derived_versions import DerivedVersions
+        versions = DerivedVersions(DatabaseManager())
+
+        def process_task(item):
+            values = compute_chunk('tasks', [item])
+            if values:
+                # Overwrites and stamps, so entities requeued as stale are brought up to date
+                versions.write(values)
+        handlers['tasks'] = process_task
+
+    return handlers
+
+
+@process_group.command()
+@click.option('--stages', '-s', default='vlm,ocr', help='Comma-separated stages to serve (vlm, ocr, tasks)')
+@click.option('--concurrency', '-c', type=int, default=2, help='Items processed at once')
+@click.option('--lease-ttl', type=float, default=30.0, help='Seconds without heartbeat before a worker is considered dead')
+@click.option('--poll-interval', '-i', type=float, default=5.0, help='Seconds to wait when there is no work')
+@click.option('--drain', is_flag=True, help='Exit once all stages are out of work')
+def worker(stages, concurrency, lease_ttl, poll_interval, drain):
+    """Run a coordinated processing worker (safe to run on many machines)."""
+    import signal
+    from autotasktracker.core.worker_coordination import (
+        WorkerCoordinator, ProcessingWorker, STAGE_ITEM_KEYS
+    )
+
+    stage_list = [s.strip() for s in stages.split(',') if s.strip()]
+    unknown = [s for s in stage_list if s not in STAGE_ITEM_KEYS]
+    if not stage_list or unknown:
+        raise click.BadParameter(f"unknown stages: {', '.join(unknown) or '(none)'}", param_hint='--stages')
+
+    coordinator = WorkerCoordinator(stage_list, concurrency=concurrency, lease_ttl=lease_ttl,
+                                    heartbeat_interval=max(1.0, lease_ttl / 3))
+    for stage in stage_list:
+        coordinator.ledger.bootstrap_watermark(stage)
+    processing_worker = ProcessingWorker(coordinator, _build_stage_handlers(stage_list),
+                                         concurrency=concurrency, poll_interval=poll_interval)
+
+    signal.signal(signal.SIGTERM, lambda *_: processing_worker.stop())
+    click.echo(f"👷 Worker {coordinator.worker_id} serving {', '.join(stage_list)} "
+               f"(concurrency: {concurrency})")
+    click.echo("   Press Ctrl+C to stop")
+
+    try:
+        processing_worker.run(drain=drain)
+    except KeyboardInterrupt:
+        processing_worker.stop()
+
+    for stage, counts in processing_worker.get_stats()['stages'].items():
+        click.echo(f"   {stage}: {counts['processed']} processed, {counts['failed']} failed")
+    click.echo("✅ Worker stopped")
+
+
+@process_group.command(name='backfill')
+@click.option('--stage', '-s', type=click.Choice(['tasks', 'category']), default='tasks',
+              help='Derived metadata to recompute (tasks: tasks and category)')
+@click.option('--since', type=click.DateTime(DATE_FORMATS), help='Start of the capture range (new runs)')
+@click.option('--until', type=click.DateTime(DATE_FORMATS), help='End of the capture range (default: now)')
+@click.option('--workers', '-w', type=int, default=4, help='Processes computing chunks')
+@click.option('--chunk-size', type=int, default=5000, help='Screenshot ids per chunk')
+@click.option('--throttle', type=float, default=0.0, help='Seconds to pause after each chunk')
+@click.option('--yield-backlog', type=int, default=500,
+              help='Pause while live processing is more than this many screenshots behind')
+@click.option('--version', 'version', help='Version label of the run (default: a timestamp)')
+@click.option('--restart', is_flag=True, help='Discard the unfinished run of this stage and plan a new one')
+@click.option('--cutover', is_flag=True, help='Make the computed run live in metadata_entries')
+@click.option('--status', 'show_status', is_flag=True, help='Only show backfill runs of this stage')
+def backfill(stage, since, until, workers, chunk_size, throttle, yield_backlog, version, restart,
+             cutover, show_status):
+    """Recompute derived metadata for history in parallel, resumably.
+    
+    Results are written under a version next to the live values and only
+    replace them with --cutover. Re-run the same command after an
+    interruption to continue the unfinished run.
+    """
+    from autotasktracker.core.backfill import BackfillEngine, RUN_READY, RUN_RUNNING
+    
+    engine = BackfillEngine(workers=workers, chunk_size=chunk_size, throttle=throttle,
+                            yield_backlog=yield_backlog)
+    
+    def describe(run):
+        status = engine.status(run)
+        chunks = ', '.join(f"{count} {name}" for name, count in sorted(status['chunks'].items())) or 'no chunks'
+        return (f"{run.run_id} [{status['status']}] {run.start:%Y-%m-%d %H:%M} - {run.end:%Y-%m-%d %H:%M}: "
+                f"{chunks}, {status['rows']} values")
+    
+    if show_status:
+        runs = engine.runs(stage)
+        for run in runs:
+            click.echo(f"   {describe(run)}")
+        if not runs:
+            click.echo(f"ℹ️  No {stage} backfills")
+        return
+    
+    if cutover:
+        candidates = [run for run in engine.runs(stage, [RUN_READY]) if not version or run.version == version]
+        if not candidates:
+            raise click.ClickException(f"No fully computed {stage} backfill to cut over")
+        run = candidates[0]
+        click.echo(f"🔀 Cutting over {run.run_id}...")
+        copied = engine.cutover(run)
+        click.echo(f"✅ {copied} values are live")
+        return
+    
+    unfinished = [run for run in engine.runs(stage, [RUN_RUNNING]) if not version or run.version == version]
+    if unfinished and restart:
+        for run in unfinished:
+            engine.discard(run)
+            click.echo(f"🗑️  Discarded {run.run_id}")
+        unfinished = []
+    if unfinished:
+        run = unfinished[0]
+        click.echo(f"▶️  Resuming {describe(run)}")
+    else:
+        if since is None:
+            raise click.UsageError("--since is required to plan a new backfill")
+        try:
+            run = engine.plan(stage, since, until or datetime.now(), version=version)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+        click.echo(f"🧩 Planned {describe(run)}")
+    
+    def report(totals):
+        click.echo(f"   {totals['chunks']} chunks done, {totals['failed']} failed, "
+                   f"{totals['remaining']} remaining ({totals['rows']} values)")
+    
+    try:
+        totals = engine.run(run, on_chunk=report)
+    except KeyboardInterrupt:
+        click.echo("\n⏸️  Backfill interrupted; finished chunks are kept, re-run to continue")
+        return
+    
+    if run.status == RUN_READY:
+        click.echo(f"✅ {run.run_id} computed {totals['rows']} values; "
+                   f"make it live with: autotask process backfill --stage {stage} --cutover")
+    else:
+        click.echo(f"⚠️  {totals['failed']} chunks failed; re-run to retry them")
+
+
+@process_group.command(name='versions')
+@click.option('--adopt', is_flag=True,
+              help='Stamp unversioned values as current (after upgrading from a release without stamps)')
+@click.option('--enqueue', is_flag=True, help='Queue stale values for background recompute by the worker')
+@click.option('--limit', type=int, default=10000, help='Newest stale screenshots queued per stage')
+def versions(adopt, enqueue, limit):
+    """Show which derived metadata predates the current pipeline version.
+    
+    Dashboards recompute stale tasks and categories as they read them and
+    queue the rest; --enqueue rolls history forward without waiting for reads.
+    """
+    from autotasktracker.core.derived_versions import QUEUED_STAGES, get_derived_versions
+    
+    tracker = get_derived_versions()
+    if adopt:
+        adopted = tracker.adopt()
+        click.echo(f"🏷️  Stamped {sum(adopted.values())} unversioned values as current")
+    if enqueue:
+        for stage in QUEUED_STAGES:
+            queued = tracker.enqueue_stale(stage, limit=limit)
+            click.echo(f"📥 Queued {queued} screenshots for '{stage}' recompute")
+    
+    for key, stats in tracker.stats().items():
+        click.echo(f"{key} [{stats['fingerprint']}]: {stats['current']} current, {stats['stale']} stale "
+                   f"({stats['unversioned']} unversioned) of {stats['values']}")
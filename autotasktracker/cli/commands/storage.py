@@ -0,0 +1,202 @@
+"""Storage layout and retention CLI commands."""
+import click
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@click.group(name='storage')
+def storage_group():
+    """Database partitions, retention and archives."""
+    pass
+
+
+def _format_bytes(size: int) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+@storage_group.command(name='partitions')
+@click.option('--maintain', is_flag=True, help='Seal finished months and apply retention first')
+@click.option('--retention-months', type=int, help='Override PARTITION_RETENTION_MONTHS for this run')
+def partitions(maintain, retention_months):
+    """Show the monthly partitions of entities and metadata_entries.
+
+    Worker heartbeats run maintenance hourly; --maintain runs it now, e.g.
+    from cron when no worker is running.
+    """
+    from autotasktracker.core.partitioning import get_partition_manager
+
+    manager = get_partition_manager()
+    if not manager.is_partitioned():
+        click.echo("ℹ️  entities is not partitioned; convert it with 'autotask storage partition-migrate'")
+        return
+
+    if maintain:
+        if retention_months is not None:
+            manager.retention_months = retention_months
+        result = manager.maintain()
+        for month in result['sealed']:
+            click.echo(f"🔒 Sealed {month:%Y-%m}")
+        for month in result['dropped']:
+            click.echo(f"🗑️  Dropped {month:%Y-%m}")
+
+    click.echo(f"{'Month':<9} {'Entity ids':<25} {'Screenshots':>12} {'Metadata':>12} {'Size':>10}")
+    for entry in manager.partition_stats():
+        end = 'open' if entry['open'] else entry['end_entity_id'] - 1
+        size = entry['entities_bytes'] + entry['metadata_entries_bytes']
+        click.echo(f"{entry['month']:<9} {str(entry['first_entity_id']) + ' - ' + str(end):<25} "
+                   f"{entry['entities_rows']:>12} {entry['metadata_entries_rows']:>12} {_format_bytes(size):>10}")
+
+
+@storage_group.command(name='partition-migrate')
+@click.option('--batch-size', '-b', type=int, default=10000, help='Rows copied per transaction')
+@click.option('--throttle', type=float, default=0.0, help='Seconds to pause between batches')
+@click.option('--finalize', is_flag=True, help='Swap the partitioned tables in once copying is done')
+@click.option('--drop-old', is_flag=True, help='Drop the *_unpartitioned tables left by --finalize')
+def partition_migrate(batch_size, throttle, finalize, drop_old):
+    """Partition an existing database by month, online.
+
+    The first run creates the partitioned tables and mirrors new writes into
+    them; every run then copies in batches and can be interrupted and
+    re-run. --finalize swaps the tables in with a brief exclusive lock.
+    """
+    from autotasktracker.core.partitioning import PartitionMigration
+
+    migration = PartitionMigration(batch_size=batch_size)
+    if drop_old:
+        migration.drop_retired()
+        click.echo("✅ Dropped entities_unpartitioned and metadata_entries_unpartitioned")
+        return
+
+    status = migration.status()
+    if status['state'] == 'done':
+        click.echo("✅ entities and metadata_entries are already partitioned")
+        return
+    if status['state'] == 'not_started':
+        specs = migration.prepare()
+        click.echo(f"🧱 Created {len(specs)} monthly partitions; new writes are mirrored")
+
+    def report(table, copied):
+        click.echo(f"   {table}: {copied} rows copied")
+
+    try:
+        copied = migration.copy(progress=report, throttle=throttle)
+    except KeyboardInterrupt:
+        click.echo("\n⏸️  Copy interrupted; re-run to resume")
+        return
+    click.echo(f"📦 Copied {sum(copied.values())} rows")
+
+    if finalize:
+        migration.finalize()
+        click.echo("✅ Partitioned tables are live; old tables kept as *_unpartitioned (remove with --drop-old)")
+    else:
+        click.echo("ℹ️  Re-run with --finalize to swap the partitioned tables in")
+
+
+@storage_group.command(name='archive')
+@click.option('--older-than', type=int, help='Archive screenshots older than this many days '
+              '(default: METADATA_ARCHIVE_DAYS)')
+@click.option('--batch-size', '-b', type=int, default=5000, help='Screenshots archived per transaction')
+@click.option('--max-batches', type=int, help='Stop after this many batches')
+@click.option('--dry-run', is_flag=True, help='Only report what would be archived')
+def archive(older_than, batch_size, max_batches, dry_run):
+    """Move OCR, VLM output and embeddings of old screenshots to Parquet archives.
+
+    Tasks, categories, windows and sessions stay in the database; archived
+    values are still returned for drill-down into old screenshots.
+    """
+    from autotasktracker.core.metadata_archive import MetadataArchiver
+
+    archiver = MetadataArchiver(older_than_days=older_than, batch_size=batch_size)
+    if archiver.older_than_days <= 0:
+        click.echo("ℹ️  Metadata archiving is disabled (METADATA_ARCHIVE_DAYS = 0)")
+        return
+    click.echo(f"🗄️  Archiving verbose metadata older than {archiver.cutoff():%Y-%m-%d %H:%M} "
+               f"to {archiver.root}")
+
+    if dry_run:
+        pending = archiver.candidates()
+        click.echo(f"   {pending['rows']} rows ({_format_bytes(pending['bytes'])} of values) would be archived")
+        return
+
+    def report(totals):
+        click.echo(f"   batch {totals['batches']}: {totals['rows']} rows archived")
+
+    try:
+        totals = archiver.run(max_batches=max_batches, on_batch=report)
+    except KeyboardInterrupt:
+        click.echo("\n⏸️  Archiving interrupted; finished batches are kept, re-run to continue")
+        return
+    stats = archiver.stats()
+    click.echo(f"✅ Archived {totals['rows']} rows into {totals['parts']} parts "
+               f"({_format_bytes(totals['bytes'])}); archive holds {stats['rows']} rows "
+               f"in {stats['parts']} parts ({_format_bytes(stats['bytes'])})")
+
+
+def _print_tier_report(stats):
+    click.echo(f"📊 {stats['screenshots']} screenshots tracked: {_format_bytes(stats['original_bytes'])} "
+               f"as captured, {_format_bytes(stats['stored_bytes'])} on disk "
+               f"({_format_bytes(stats['saved_bytes'])} saved, {stats['saved_ratio']:.0%})")
+    for tier, entry in sorted(stats['tiers'].items()):
+        click.echo(f"   {tier:<11} {entry['screenshots']:>9} screenshots  "
+                   f"{_format_bytes(entry['original_bytes']):>10} -> {_format_bytes(entry['stored_bytes']):>10}")
+    if stats['decode_samples']:
+        before, after = stats['decode_ms_original'], stats['decode_ms_stored']
+        click.echo(f"⏱️  Decode time over {stats['decode_samples']} transcoded files: "
+                   f"{before:.1f} ms original, {after:.1f} ms transcoded ({after / before:.2f}x)"
+                   if before else f"⏱️  Decode time of transcoded files: {after:.1f} ms")
+    resolver = stats['resolver']
+    if resolver['lookups']:
+        click.echo(f"🔎 Path resolution in this process: {resolver['lookups']} lookups, "
+                   f"{resolver['avg_lookup_ms']:.1f} ms average")
+
+
+@storage_group.command(name='screenshots')
+@click.option('--older-than', type=int, help='Transcode screenshots older than this many days '
+              '(default: SCREENSHOT_TIER_DAYS)')
+@click.option('--format', 'image_format', type=click.Choice(['webp', 'avif', 'jpeg']),
+              help='Transcode target (default: SCREENSHOT_TIER_FORMAT; only webp is lossless)')
+@click.option('--no-dedup', is_flag=True, help='Skip hashing and linking duplicate frames')
+@click.option('--no-transcode', is_flag=True, help='Skip transcoding old frames')
+@click.option('--batch-size', '-b', type=int, default=500, help='Screenshots handled per transaction')
+@click.option('--max-batches', type=int, help='Stop each pass after this many batches')
+@click.option('--sweep', is_flag=True, help='Remove originals left behind by interrupted runs')
+@click.option('--report', is_flag=True, help='Only report bytes saved and decode latency')
+def screenshots(older_than, image_format, no_dedup, no_transcode, batch_size, max_batches, sweep, report):
+    """Deduplicate identical screenshots and transcode old ones.
+
+    Exact duplicate frames become hard links to one file; frames older than
+    the cutoff are re-encoded into SCREENSHOT_TIER_DIR. Dashboards and AI
+    processing resolve moved screenshots transparently.
+    """
+    from autotasktracker.core.screenshot_store import ScreenshotTierManager
+
+    manager = ScreenshotTierManager(older_than_days=older_than, image_format=image_format,
+                                    batch_size=batch_size)
+    if not report:
+        def progress(phase, totals):
+            click.echo(f"   {phase} batch {totals['batches']}: {totals['screenshots']} screenshots")
+
+        try:
+            totals = manager.run(dedup=not no_dedup, transcode=not no_transcode,
+                                 max_batches=max_batches, on_batch=progress)
+        except KeyboardInterrupt:
+            click.echo("\n⏸️  Interrupted; finished batches are kept, re-run to continue")
+            return
+        if 'dedup' in totals:
+            dedup = totals['dedup']
+            click.echo(f"🔗 Hashed {dedup['screenshots']} screenshots, linked {dedup['linked']} duplicates "
+                       f"({_format_bytes(dedup['saved_bytes'])} saved)")
+        if 'transcode' in totals:
+            transcoded = totals['transcode']
+            click.echo(f"🗜️  Transcoded {transcoded['screenshots']} screenshots to {manager.image_format}: "
+                       f"{_format_bytes(transcoded['original_bytes'])} -> "
+                       f"{_format_bytes(transcoded['stored_bytes'])}"
+                       + (f", {transcoded['failed']} failed" if transcoded['failed'] else ''))
+        if sweep:
+            click.echo(f"🧹 Removed {manager.sweep()} leftover originals")
+    _print_tier_report(manager.stats())
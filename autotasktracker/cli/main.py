@@ -5,6 +5,7 @@ AutoTaskTracker Unified CLI
 This consolidates all script functionality into a single, discoverable CLI.
 """
 import click
+import importlib
 import logging
 import sys
 from pathlib import Path
@@ -20,7 +21,41 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-@click.group()
+class LazyGroup(click.Group):
+    """Click group that imports command group modules only when invoked.
+    
+    ``lazy_subcommands`` maps a command name to ``'module:attribute'``, so
+    ``autotask version`` does not import the AI, processing and dashboard
+    command modules (and their dependencies) at all.
+    """
+    
+    def __init__(self, *args, lazy_subcommands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = dict(lazy_subcommands or {})
+    
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_subcommands))
+    
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.commands and cmd_name in self.lazy_subcommands:
+            module_name, attribute = self.lazy_subcommands[cmd_name].split(':')
+            command = getattr(importlib.import_module(module_name), attribute)
+            self.add_command(command, cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+
+# Command groups, imported on first use
+COMMAND_GROUPS = {
+    'ai': 'autotasktracker.cli.commands.ai:ai_group',
+    'process': 'autotasktracker.cli.commands.process:process_group',
+    'dashboard': 'autotasktracker.cli.commands.dashboard:dashboard_group',
+    'check': 'autotasktracker.cli.commands.check:check_group',
+    'analyze': 'autotasktracker.cli.commands.analyze:analyze_group',
+    'storage': 'autotasktracker.cli.commands.storage:storage_group',
+}
+
+
+@click.group(cls=LazyGroup, lazy_subcommands=COMMAND_GROUPS)
 @click.option('--verbose', '-v', is_flag=True, help='Enable verbose output')
 @click.option('--quiet', '-q', is_flag=True, help='Suppress output')
 @click.pass_context
@@ -38,17 +73,6 @@ def cli(ctx, verbose, quiet):
         logging.getLogger().setLevel(logging.ERROR)
 
 
-# Import command groups
-from .commands import ai, process, dashboard, check, analyze
-
-# Register command groups
-cli.add_command(ai.ai_group)
-cli.add_command(process.process_group)
-cli.add_command(dashboard.dashboard_group)
-cli.add_command(check.check_group)
-cli.add_command(analyze.analyze_group)
-
-
 @cli.command()
 def version():
     """Show version information."""
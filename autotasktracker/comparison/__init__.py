@@ -10,13 +10,17 @@ Components:
 - analysis: Performance analysis and reporting tools
 """
 
-from autotasktracker.comparison.pipelines.base import BasePipeline
-from autotasktracker.comparison.pipelines.basic import BasicPipeline
-from autotasktracker.comparison.pipelines.ocr import OCRPipeline
-from autotasktracker.comparison.pipelines.ai_full import AIFullPipeline
+from autotasktracker.utils.lazy_imports import lazy_exports
 
-from autotasktracker.comparison.analysis.performance_analyzer import PerformanceAnalyzer
-from autotasktracker.comparison.analysis.metrics import ComparisonMetrics
+# Exports are imported on first access (PEP 562)
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'BasePipeline': 'autotasktracker.comparison.pipelines.base',
+    'BasicPipeline': 'autotasktracker.comparison.pipelines.basic',
+    'OCRPipeline': 'autotasktracker.comparison.pipelines.ocr',
+    'AIFullPipeline': 'autotasktracker.comparison.pipelines.ai_full',
+    'PerformanceAnalyzer': 'autotasktracker.comparison.analysis.performance_analyzer',
+    'ComparisonMetrics': 'autotasktracker.comparison.analysis.metrics',
+})
 
 __all__ = [
     'BasePipeline',
@@ -62,14 +62,18 @@ class PerformanceAnalyzer:
             print(f"Error loading screenshots: {e}")
             return pd.DataFrame()
     
-    def process_single_screenshot(self, row: pd.Series) -> Dict[str, Any]:
-        """Process a single screenshot with all pipelines."""
-        screenshot_data = {
+    @staticmethod
+    def _screenshot_data(row: pd.Series) -> Dict[str, Any]:
+        return {
             "active_window": row.get("active_window", ''),
             "ocr_result": row.get("ocr_result", ''),
             'vlm_description': row.get('vlm_description', ''),
             'id': row.get('id')
         }
+    
+    def process_single_screenshot(self, row: pd.Series) -> Dict[str, Any]:
+        """Process a single screenshot with all pipelines."""
+        screenshot_data = self._screenshot_data(row)
         
         results = {
             'screenshot_id': row.get('id'),
@@ -103,6 +107,14 @@ class PerformanceAnalyzer:
         
         print(f"Processing {len(screenshots_df)} screenshots...")
         
+        # Let pipelines share lookups (e.g. embedding neighbours) across the batch
+        batch = [self._screenshot_data(row) for _, row in screenshots_df.iterrows()]
+        for pipeline_name, pipeline in self.pipelines.items():
+            try:
+                pipeline.prepare_batch(batch)
+            except Exception as e:
+                print(f"Error preparing batch for {pipeline_name}: {e}")
+        
         for idx, row in screenshots_df.iterrows():
             if idx % 10 == 0:
                 print(f"Processed {idx}/{len(screenshots_df)} screenshots")
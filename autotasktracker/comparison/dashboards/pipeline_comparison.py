@@ -5,10 +5,11 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 import os
-from PIL import Image
 import json
 
 from autotasktracker.core import DatabaseManager
+from autotasktracker.core.thumbnails import get_thumbnail
+from autotasktracker.core.screenshot_store import resolve_screenshot
 from autotasktracker.comparison.pipelines import BasicPipeline, OCRPipeline, AIFullPipeline
 
 # Page config
@@ -101,11 +102,11 @@ def render_pipeline_interface(pipeline, screenshots_df, tab_name):
     
     with col2:
         # Show screenshot thumbnail
-        if selected_screenshot['filepath'] and os.path.exists(selected_screenshot['filepath']):
+        screenshot_path = resolve_screenshot(selected_screenshot['filepath'])
+        if screenshot_path and os.path.exists(screenshot_path):
             try:
-                image = Image.open(selected_screenshot['filepath'])
-                image.thumbnail((300, 200))
-                st.image(image, caption="Screenshot", use_container_width=True)
+                st.image(get_thumbnail(screenshot_path, 300),
+                         caption="Screenshot", use_container_width=True)
             except Exception as e:
                 st.error(f"Could not load image: {e}")
     
@@ -3,7 +3,7 @@ Full AI-enhanced pipeline.
 """
 import os
 import sys
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 
 # Import from package structure
 
@@ -23,20 +23,38 @@ class AIFullPipeline(BasePipeline):
         self.db_manager = DatabaseManager()
         self.ai_extractor = AIEnhancedTaskExtractor(self.db_manager.db_path)
         self.vlm_extractor = VLMTaskExtractor()
+        # Extractor results computed by prepare_batch, keyed by their inputs
+        self._prepared: Dict[Tuple, Dict[str, Any]] = {}
+    
+    @staticmethod
+    def _extractor_args(screenshot_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'window_title': screenshot_data.get("active_window", ''),
+            'ocr_text': screenshot_data.get("ocr_result", ''),
+            'vlm_description': screenshot_data.get('vlm_description', ''),
+            'entity_id': screenshot_data.get('id')
+        }
+    
+    @staticmethod
+    def _prepared_key(args: Dict[str, Any]) -> Tuple:
+        # Missing values from DataFrame rows arrive as NaN, which never compares equal
+        return tuple(None if isinstance(value, float) and value != value else value for value in args.values())
+    
+    def prepare_batch(self, screenshots: List[Dict[str, Any]]) -> None:
+        """Run the AI extractor over the whole batch at once."""
+        rows = [self._extractor_args(screenshot_data) for screenshot_data in screenshots]
+        results = self.ai_extractor.extract_enhanced_tasks_batch(rows)
+        self._prepared = {self._prepared_key(row): result for row, result in zip(rows, results)}
     
     def process_screenshot(self, screenshot_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process screenshot using full AI enhancement."""
-        window_title = screenshot_data.get("active_window", '')
-        ocr_text = screenshot_data.get("ocr_result", '')
-        vlm_description = screenshot_data.get('vlm_description', '')
-        entity_id = screenshot_data.get('id')
+        args = self._extractor_args(screenshot_data)
+        ocr_text = args['ocr_text']
+        vlm_description = args['vlm_description']
         
-        enhanced_result = self.ai_extractor.extract_enhanced_task(
-            window_title=window_title,
-            ocr_text=ocr_text,
-            vlm_description=vlm_description,
-            entity_id=entity_id
-        )
+        enhanced_result = self._prepared.pop(self._prepared_key(args), None)
+        if enhanced_result is None:
+            enhanced_result = self.ai_extractor.extract_enhanced_task(**args)
         
         features_used = ['Window Title']
         data_sources = ['Window title']
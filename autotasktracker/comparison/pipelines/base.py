@@ -2,7 +2,7 @@
 Base pipeline interface for AI comparison.
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 
 class BasePipeline(ABC):
@@ -34,6 +34,19 @@ class BasePipeline(ABC):
         """
         pass
     
+    def prepare_batch(self, screenshots: List[Dict[str, Any]]) -> None:
+        """
+        Precompute work shared by a batch before its screenshots are processed.
+        
+        Pipelines that can amortize lookups across screenshots override this;
+        process_screenshot is still called once per screenshot afterwards.
+        """
+    
+    def process_batch(self, screenshots: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Process several screenshots, returning results in input order."""
+        self.prepare_batch(screenshots)
+        return [self.process_screenshot(screenshot_data) for screenshot_data in screenshots]
+    
     def get_info(self) -> Dict[str, str]:
         """Get pipeline information."""
         return {
@@ -168,6 +168,17 @@ class Config:
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DATABASE}"
     
     
+    # Shared connection pool (one per DSN per process)
+    DB_POOL_MIN_SIZE: int = 1
+    DB_POOL_MAX_SIZE: int = 10
+    DB_POOL_CHECKOUT_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_IDLE_TIMEOUT: float = 300.0  # close idle connections above demand after this
+    DB_POOL_LEAK_THRESHOLD: float = 120.0  # report checkouts held longer than this
+    
+    # Prepared hot queries: capture EXPLAIN ANALYZE plans for slow executions
+    QUERY_PLAN_CAPTURE: bool = False
+    QUERY_PLAN_THRESHOLD_MS: float = 500.0
+    
     # Note: SQLite support removed - PostgreSQL only
     
     # ============================================================================
@@ -181,6 +192,10 @@ class Config:
     CACHE_DIR: str = "/Users/paulrohde/AutoTaskTracker.memos/cache"
     VLM_CACHE_DIR: str = "/Users/paulrohde/AutoTaskTracker.memos/vlm_cache"
     EMBEDDINGS_CACHE_DIR: str = "/Users/paulrohde/AutoTaskTracker.memos/embeddings_cache"
+    THUMBNAIL_CACHE_DIR: str = "/Users/paulrohde/AutoTaskTracker.memos/thumbnails"
+    EXPORTS_DIR: str = "/Users/paulrohde/AutoTaskTracker.memos/exports"
+    ARCHIVE_DIR: str = "/Users/paulrohde/AutoTaskTracker.memos/archive"
+    SCREENSHOT_TIER_DIR: str = "/Users/paulrohde/AutoTaskTracker.memos/screenshots_tiered"
     TEMP_DIR: str = "/Users/paulrohde/AutoTaskTracker.memos/temp"
     
     # Configuration files
@@ -295,6 +310,9 @@ class Config:
     # Dual-Model Configuration (Phase 2)
     LLAMA3_MODEL_NAME: str = "llama3:8b"
     ENABLE_DUAL_MODEL: bool = True   # Feature flag for dual-model processing
+    LLAMA3_MAX_CONCURRENCY: int = 2  # Concurrent Llama 3 requests sent to Ollama
+    LLM_MAX_CONCURRENCY: int = 4     # Total concurrent text LLM calls across models
+    LLM_RESPONSE_CACHE_MAX_ENTRIES: int = 5000  # Cached deterministic LLM responses kept on disk
     
     # OCR Settings  
     OCR_ENDPOINT: str = f"http://localhost:5555/predict"
@@ -325,6 +343,15 @@ class Config:
     CACHE_TTL: int = 600            # cache time-to-live in seconds
     MAX_STORAGE_GB: float = 10.0    # maximum storage in GB
     CLEANUP_DAYS: int = 30          # cleanup old data after N days
+    THUMBNAIL_CACHE_MAX_MB: int = 512  # size bound for dashboard thumbnail renditions
+    THUMBNAIL_ON_INGEST: bool = True   # render thumbnails when new screenshots arrive
+    EXPORT_BATCH_SIZE: int = 5000      # rows read per keyset page by the export engine
+    PARTITION_RETENTION_MONTHS: int = 0  # drop month partitions older than this (0 = keep forever)
+    METADATA_ARCHIVE_DAYS: int = 90    # move verbose metadata older than this to archives (0 = never)
+    SCREENSHOT_TIER_DAYS: int = 30     # transcode screenshots older than this (0 = never)
+    SCREENSHOT_TIER_FORMAT: str = "webp"  # webp (lossless), avif or jpeg
+    DERIVED_INLINE_BUDGET: int = 200   # stale tasks/categories recomputed per dashboard read
+    DERIVED_INLINE_BUDGET_MS: float = 50.0  # time spent on that per read; the rest is queued
     
     # Plugin Settings
     DEFAULT_PLUGINS: List[str] = field(default_factory=lambda: [
@@ -435,6 +462,22 @@ class Config:
         """Get VLM cache directory path as string."""
         return str(self.get_expanded_path(self.VLM_CACHE_DIR_PROPERTY))
     
+    def get_thumbnail_cache_path(self) -> str:
+        """Get thumbnail cache directory path as string."""
+        return str(self.get_expanded_path(self.THUMBNAIL_CACHE_DIR))
+    
+    def get_exports_path(self) -> str:
+        """Get export output directory path as string."""
+        return str(self.get_expanded_path(self.EXPORTS_DIR))
+    
+    def get_archive_path(self) -> str:
+        """Get metadata archive directory path as string."""
+        return str(self.get_expanded_path(self.ARCHIVE_DIR))
+    
+    def get_screenshot_tier_path(self) -> str:
+        """Get transcoded screenshot directory path as string."""
+        return str(self.get_expanded_path(self.SCREENSHOT_TIER_DIR))
+    
     def get_screenshots_path(self) -> str:
         """Get screenshots directory path as string."""
         return str(self.get_expanded_path(self.SCREENSHOTS_DIR_PROPERTY))
@@ -549,6 +592,10 @@ class Config:
             "cache_dir": self.CACHE_DIR,
             "vlm_cache_dir": self.VLM_CACHE_DIR,
             "embeddings_cache_dir": self.EMBEDDINGS_CACHE_DIR,
+            "thumbnail_cache_dir": self.THUMBNAIL_CACHE_DIR,
+            "exports_dir": self.EXPORTS_DIR,
+            "archive_dir": self.ARCHIVE_DIR,
+            "screenshot_tier_dir": self.SCREENSHOT_TIER_DIR,
             "temp_dir": self.TEMP_DIR,
             "pensieve_config": self.PENSIEVE_CONFIG_FILE,
             "autotask_config": self.AUTOTASK_CONFIG_FILE,
@@ -647,6 +694,22 @@ def load_config_from_env() -> Config:
         config.POSTGRES_DATABASE = os.getenv("AUTOTASK_POSTGRES_DB")
     if os.getenv("AUTOTASK_SERVER_HOST"):
         config.SERVER_HOST = os.getenv("AUTOTASK_SERVER_HOST")
+    if os.getenv("AUTOTASK_DB_POOL_MAX_SIZE"):
+        config.DB_POOL_MAX_SIZE = int(os.getenv("AUTOTASK_DB_POOL_MAX_SIZE"))
+    if os.getenv("AUTOTASK_QUERY_PLAN_CAPTURE"):
+        config.QUERY_PLAN_CAPTURE = os.getenv("AUTOTASK_QUERY_PLAN_CAPTURE").lower() in ('1', 'true', 'yes')
+    if os.getenv("AUTOTASK_PARTITION_RETENTION_MONTHS"):
+        config.PARTITION_RETENTION_MONTHS = int(os.getenv("AUTOTASK_PARTITION_RETENTION_MONTHS"))
+    if os.getenv("AUTOTASK_METADATA_ARCHIVE_DAYS"):
+        config.METADATA_ARCHIVE_DAYS = int(os.getenv("AUTOTASK_METADATA_ARCHIVE_DAYS"))
+    if os.getenv("AUTOTASK_SCREENSHOT_TIER_DAYS"):
+        config.SCREENSHOT_TIER_DAYS = int(os.getenv("AUTOTASK_SCREENSHOT_TIER_DAYS"))
+    if os.getenv("AUTOTASK_SCREENSHOT_TIER_FORMAT"):
+        config.SCREENSHOT_TIER_FORMAT = os.getenv("AUTOTASK_SCREENSHOT_TIER_FORMAT").lower()
+    if os.getenv("AUTOTASK_DERIVED_INLINE_BUDGET"):
+        config.DERIVED_INLINE_BUDGET = int(os.getenv("AUTOTASK_DERIVED_INLINE_BUDGET"))
+    if os.getenv("AUTOTASK_DERIVED_INLINE_BUDGET_MS"):
+        config.DERIVED_INLINE_BUDGET_MS = float(os.getenv("AUTOTASK_DERIVED_INLINE_BUDGET_MS"))
     
     # Path overrides
     if os.getenv("AUTOTASK_MEMOS_DIR"):
@@ -655,6 +718,14 @@ def load_config_from_env() -> Config:
         config.SCREENSHOTS_DIR = os.getenv("AUTOTASK_SCREENSHOTS_DIR")
     if os.getenv("AUTOTASK_VLM_CACHE_DIR"):
         config.VLM_CACHE_DIR = os.getenv("AUTOTASK_VLM_CACHE_DIR")
+    if os.getenv("AUTOTASK_THUMBNAIL_CACHE_DIR"):
+        config.THUMBNAIL_CACHE_DIR = os.getenv("AUTOTASK_THUMBNAIL_CACHE_DIR")
+    if os.getenv("AUTOTASK_EXPORTS_DIR"):
+        config.EXPORTS_DIR = os.getenv("AUTOTASK_EXPORTS_DIR")
+    if os.getenv("AUTOTASK_ARCHIVE_DIR"):
+        config.ARCHIVE_DIR = os.getenv("AUTOTASK_ARCHIVE_DIR")
+    if os.getenv("AUTOTASK_SCREENSHOT_TIER_DIR"):
+        config.SCREENSHOT_TIER_DIR = os.getenv("AUTOTASK_SCREENSHOT_TIER_DIR")
     
     # Port overrides
     if os.getenv("AUTOTASK_TASK_BOARD_PORT"):
@@ -697,6 +768,10 @@ def load_config_from_env() -> Config:
         config.OLLAMA_PORT = int(os.getenv("AUTOTASK_VLM_PORT"))
     if os.getenv("AUTOTASK_EMBEDDING_MODEL"):
         config.EMBEDDING_MODEL = os.getenv("AUTOTASK_EMBEDDING_MODEL")
+    if os.getenv("AUTOTASK_LLAMA3_MAX_CONCURRENCY"):
+        config.LLAMA3_MAX_CONCURRENCY = int(os.getenv("AUTOTASK_LLAMA3_MAX_CONCURRENCY"))
+    if os.getenv("AUTOTASK_LLM_MAX_CONCURRENCY"):
+        config.LLM_MAX_CONCURRENCY = int(os.getenv("AUTOTASK_LLM_MAX_CONCURRENCY"))
     
     # Processing overrides
     if os.getenv("AUTOTASK_BATCH_SIZE"):
@@ -7,25 +7,98 @@ Usage:
     from autotasktracker.core import DatabaseManager, TaskExtractor, TimeTracker
 """
 
-# Database management
-from autotasktracker.core.database import DatabaseManager, get_default_db_manager
+from autotasktracker.utils.lazy_imports import lazy_exports
 
-# Task processing
-from autotasktracker.core.categorizer import ActivityCategorizer, categorize_activity, extract_task_summary, extract_window_title
-from autotasktracker.core.task_extractor import TaskExtractor
-from autotasktracker.core.time_tracker import TimeTracker
-from autotasktracker.core.error_handler import VLMErrorHandler
+# Exports are imported on first access (PEP 562)
+__getattr__, __dir__ = lazy_exports(__name__, {
+    # Database management
+    'DatabaseManager': 'autotasktracker.core.database',
+    'get_default_db_manager': 'autotasktracker.core.database',
+    'InstrumentedConnectionPool': 'autotasktracker.core.connection_pool',
+    'get_pool_registry': 'autotasktracker.core.connection_pool',
+    'QueryRegistry': 'autotasktracker.core.query_registry',
+    'get_query_registry': 'autotasktracker.core.query_registry',
+    'ProcessingLedger': 'autotasktracker.core.processing_ledger',
+    'get_processing_ledger': 'autotasktracker.core.processing_ledger',
+    'WorkerCoordinator': 'autotasktracker.core.worker_coordination',
+    'ProcessingWorker': 'autotasktracker.core.worker_coordination',
+    'TextIndex': 'autotasktracker.core.text_index',
+    'get_text_index': 'autotasktracker.core.text_index',
+    'ExportEngine': 'autotasktracker.core.export_engine',
+    'ExportRequest': 'autotasktracker.core.export_engine',
+    'get_export_jobs': 'autotasktracker.core.export_engine',
+    'PartitionManager': 'autotasktracker.core.partitioning',
+    'PartitionMigration': 'autotasktracker.core.partitioning',
+    'get_partition_manager': 'autotasktracker.core.partitioning',
+    'MetadataArchiver': 'autotasktracker.core.metadata_archive',
+    'get_metadata_archive': 'autotasktracker.core.metadata_archive',
+    'ScreenshotTierManager': 'autotasktracker.core.screenshot_store',
+    'resolve_screenshot': 'autotasktracker.core.screenshot_store',
+    'BackfillEngine': 'autotasktracker.core.backfill',
+    'DerivedVersions': 'autotasktracker.core.derived_versions',
+    'get_derived_versions': 'autotasktracker.core.derived_versions',
 
-# Configuration
-from autotasktracker.core.config_manager import ConfigManager
+    # Pipeline tracing
+    'Tracer': 'autotasktracker.core.tracing',
+    'get_tracer': 'autotasktracker.core.tracing',
+    'trace_span': 'autotasktracker.core.tracing',
 
-# Pensieve integration
-from autotasktracker.core.pensieve_adapter import PensieveSchemaAdapter
+    # Screenshot renditions
+    'ThumbnailService': 'autotasktracker.core.thumbnails',
+    'get_thumbnail_service': 'autotasktracker.core.thumbnails',
+
+    # Task processing
+    'ActivityCategorizer': 'autotasktracker.core.categorizer',
+    'categorize_activity': 'autotasktracker.core.categorizer',
+    'extract_task_summary': 'autotasktracker.core.categorizer',
+    'extract_window_title': 'autotasktracker.core.categorizer',
+    'TaskExtractor': 'autotasktracker.core.task_extractor',
+    'TimeTracker': 'autotasktracker.core.time_tracker',
+    'VLMErrorHandler': 'autotasktracker.core.error_handler',
+
+    # Configuration
+    'ConfigManager': 'autotasktracker.core.config_manager',
+
+    # Pensieve integration
+    'PensieveSchemaAdapter': 'autotasktracker.core.pensieve_adapter',
+})
 
 __all__ = [
     # Database
     'DatabaseManager',
     'get_default_db_manager',
+    'InstrumentedConnectionPool',
+    'get_pool_registry',
+    'QueryRegistry',
+    'get_query_registry',
+    'ProcessingLedger',
+    'get_processing_ledger',
+    'WorkerCoordinator',
+    'ProcessingWorker',
+    'TextIndex',
+    'get_text_index',
+    'ExportEngine',
+    'ExportRequest',
+    'get_export_jobs',
+    'PartitionManager',
+    'PartitionMigration',
+    'get_partition_manager',
+    'MetadataArchiver',
+    'get_metadata_archive',
+    'ScreenshotTierManager',
+    'resolve_screenshot',
+    'BackfillEngine',
+    'DerivedVersions',
+    'get_derived_versions',
+    
+    # Tracing
+    'Tracer',
+    'get_tracer',
+    'trace_span',
+    
+    # Thumbnails
+    'ThumbnailService',
+    'get_thumbnail_service',
     
     # Task processing
     'ActivityCategorizer',
@@ -0,0 +1,600 @@
+"""
+Bulk historical reprocessing ("backfill") of derived metadata.
+
+After changing task extraction patterns or categories, history has to be
+recomputed. A backfill run covers a capture-time range and a stage
+(``tasks``: tasks and category; ``category``: category only):
+
+1. **Plan**: the range's entity ids are split into fixed-size id chunks,
+   recorded in ``backfill_chunks``.
+2. **Compute**: chunks are read by the coordinating process and computed by
+   a process pool; each result is bulk-upserted into
+   ``derived_metadata_versions`` under the run's version, and the chunk is
+   marked done in the same transaction. An interrupted run resumes with the
+   chunks that are not done.
+3. **Cut over**: once every chunk is done, ``cutover`` copies the version
+   into ``metadata_entries`` chunk by chunk and stamps the values with the
+   pipeline fingerprints recorded at planning (see ``derived_versions``).
+   Until then dashboards keep reading the old values, so old and new
+   results coexist.
+
+Backfills yield to live processing: between chunks they sleep for
+``throttle`` seconds and pause while the live stage is more than
+``yield_backlog`` screenshots behind; pool processes run at lower priority.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from autotasktracker.core.derived_versions import get_derived_versions, pipeline_fingerprint
+from autotasktracker.core.exceptions import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+RUN_RUNNING = 'running'    # chunks still being computed
+RUN_READY = 'ready'        # every chunk computed, waiting for cutover
+RUN_LIVE = 'live'          # version copied into metadata_entries
+
+CHUNK_PENDING = 'pending'
+CHUNK_DONE = 'done'
+CHUNK_FAILED = 'failed'
+CHUNK_LIVE = 'live'
+
+SCHEMA_STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS backfill_runs (
+        run_id VARCHAR(128) PRIMARY KEY,
+        stage VARCHAR(64) NOT NULL,
+        version VARCHAR(64) NOT NULL,
+        range_start TIMESTAMP NOT NULL,
+        range_end TIMESTAMP NOT NULL,
+        chunk_size INTEGER NOT NULL,
+        status VARCHAR(16) NOT NULL,
+        fingerprints TEXT,
+        created_at TIMESTAMP,
+        updated_at TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS backfill_chunks (
+        run_id VARCHAR(128) NOT NULL,
+        chunk_start BIGINT NOT NULL,
+        chunk_end BIGINT NOT NULL,
+        status VARCHAR(16) NOT NULL,
+        rows_written INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        completed_at TIMESTAMP,
+        PRIMARY KEY (run_id, chunk_start)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS derived_metadata_versions (
+        entity_id BIGINT NOT NULL,
+        key VARCHAR(255) NOT NULL,
+        version VARCHAR(64) NOT NULL,
+        value TEXT,
+        created_at TIMESTAMP,
+        PRIMARY KEY (entity_id, key, version)
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_derived_metadata_versions_version
+        ON derived_metadata_versions (version, entity_id)
+    """,
+]
+
+
+def _compute_tasks(items: List[Dict[str, Any]]) -> List[Tuple[int, str, str]]:
+    # Every tasks writer (worker, inline recompute, auto processor, backfill)
+    # goes through here with TASK_INPUT_KEYS loaded from the database
+    from autotasktracker.core.categorizer import ActivityCategorizer
+    from autotasktracker.core.task_extractor import get_task_extractor
+    from autotasktracker.core.text_index import ocr_plain_text
+    extractor = get_task_extractor()
+    rows = []
+    for item in items:
+        window_title = item.get('active_window')
+        if not window_title:
+            continue
+        # Pensieve's OCR, else the plain text the auto processor's fallback OCR stores
+        ocr_text = ocr_plain_text(item.get('ocr_result')) or item.get('ocr_text') or None
+        task = extractor.extract_task(window_title, ocr_text) or "Unknown Activity"
+        rows.append((item['id'], 'tasks', task))
+        rows.append((item['id'], 'category', ActivityCategorizer.categorize(window_title)))
+    return rows
+
+
+def _compute_category(items: List[Dict[str, Any]]) -> List[Tuple[int, str, str]]:
+    from autotasktracker.core.categorizer import ActivityCategorizer
+    return [(item['id'], 'category', ActivityCategorizer.categorize(item['active_window']))
+            for item in items if item.get('active_window')]
+
+
+# Metadata keys the tasks stage computes from
+TASK_INPUT_KEYS = ('active_window', 'ocr_result', 'ocr_text')
+
+
+@dataclass(frozen=True)
+class BackfillStage:
+    """A recomputable set of derived keys."""
+    name: str
+    input_keys: Tuple[str, ...]
+    output_keys: Tuple[str, ...]
+    compute: Callable[[List[Dict[str, Any]]], List[Tuple[int, str, str]]]
+    live_stage: str = 'tasks'
+
+
+BACKFILL_STAGES = {
+    'tasks': BackfillStage('tasks', TASK_INPUT_KEYS, ('tasks', 'category'), _compute_tasks),
+    'category': BackfillStage('category', ('active_window',), ('category',), _compute_category),
+}
+
+
+def _init_pool_process(niceness: int):
+    if niceness:
+        try:
+            os.nice(niceness)
+        except (AttributeError, OSError):
+            pass
+
+
+def compute_chunk(stage: str, items: List[Dict[str, Any]]) -> List[Tuple[int, str, str]]:
+    """Derived (entity id, key, value) rows of one chunk; runs in pool processes."""
+    return BACKFILL_STAGES[stage].compute(items)
+
+
+@dataclass
+class BackfillRun:
+    """One recomputation of a stage over a capture-time range."""
+    run_id: str
+    stage: str
+    version: str
+    start: datetime
+    end: datetime
+    chunk_size: int
+    status: str = RUN_RUNNING
+    fingerprints: Dict[str, str] = field(default_factory=dict)   # output key -> pipeline fingerprint
+
+
+class BackfillEngine:
+    """Plans, computes and cuts over backfill runs.
+
+    Works against any manager exposing ``get_connection(readonly=...)`` and
+    ``get_database_type()``; SQLite stand-ins are supported for tests and
+    local setups.
+    """
+
+    def __init__(self, db_manager=None, workers: int = 4, chunk_size: int = 5000,
+                 throttle: float = 0.0, yield_backlog: Optional[int] = 500,
+                 yield_poll: float = 5.0, niceness: int = 10):
+        """
+        Args:
+            db_manager: Database manager; defaults to a new DatabaseManager
+            workers: Pool processes computing chunks (<= 1 computes inline)
+            chunk_size: Entity ids per chunk (and per write transaction)
+            throttle: Seconds to sleep after submitting each chunk
+            yield_backlog: Pause while the live stage has more unprocessed
+                screenshots than this (None: never pause)
+            yield_poll: Seconds between backlog checks while paused
+            niceness: Priority decrease applied to pool processes
+        """
+        if db_manager is None:
+            from autotasktracker.core.database import DatabaseManager
+            db_manager = DatabaseManager()
+        self.db = db_manager
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.throttle = throttle
+        self.yield_backlog = yield_backlog
+        self.yield_poll = yield_poll
+        self.niceness = niceness
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    @property
+    def is_sqlite(self) -> bool:
+        get_type = getattr(self.db, 'get_database_type', None)
+        return bool(get_type) and get_type() == 'sqlite'
+
+    def _sql(self, query: str) -> str:
+        """Adapt a ``%s``-style query to the connection's parameter style."""
+        if self.is_sqlite:
+            return query.replace('%s', '?')
+        return query
+
+    @staticmethod
+    def _placeholders(count: int) -> str:
+        return ', '.join(['%s'] * count)
+
+    def _bound(self, value: datetime):
+        # SQLite stores timestamps as ISO text
+        return value.isoformat(sep=' ') if self.is_sqlite else value
+
+    @staticmethod
+    def _timestamp(value) -> datetime:
+        return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+    def ensure_schema(self):
+        """Create backfill tables if missing."""
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            try:
+                with self.db.get_connection(readonly=False) as conn:
+                    cursor = conn.cursor()
+                    for statement in SCHEMA_STATEMENTS:
+                        cursor.execute(statement)
+                    conn.commit()
+                    cursor.close()
+                self._schema_ready = True
+            except Exception as e:
+                logger.error(f"Failed to create backfill schema: {e}")
+                raise DatabaseError(f"Backfill schema creation failed: {e}") from e
+
+    @contextmanager
+    def _transaction(self):
+        """Yield a cursor inside a write transaction, committing on success."""
+        self.ensure_schema()
+        with self.db.get_connection(readonly=False) as conn:
+            cursor = conn.cursor()
+            try:
+                if self.is_sqlite:
+                    cursor.execute('BEGIN IMMEDIATE')
+                yield cursor
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def _query(self, query: str, params: Sequence = ()) -> List[tuple]:
+        self.ensure_schema()
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(self._sql(query), tuple(params))
+                return [tuple(row) for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+
+    # ------------------------------------------------------------------
+    # Runs
+    # ------------------------------------------------------------------
+
+    def _run_from_row(self, row) -> BackfillRun:
+        run_id, stage, version, start, end, chunk_size, status, fingerprints = row
+        return BackfillRun(run_id, stage, version, self._timestamp(start), self._timestamp(end),
+                           int(chunk_size), status, json.loads(fingerprints) if fingerprints else {})
+
+    def get_run(self, run_id: str) -> Optional[BackfillRun]:
+        rows = self._query("""
+            SELECT run_id, stage, version, range_start, range_end, chunk_size, status, fingerprints
+            FROM backfill_runs WHERE run_id = %s
+        """, (run_id,))
+        return self._run_from_row(rows[0]) if rows else None
+
+    def runs(self, stage: Optional[str] = None, statuses: Sequence[str] = ()) -> List[BackfillRun]:
+        """Runs, newest first, optionally filtered by stage and status."""
+        query = ("SELECT run_id, stage, version, range_start, range_end, chunk_size, status, fingerprints "
+                 "FROM backfill_runs WHERE 1 = 1")
+        params: List[Any] = []
+        if stage:
+            query += " AND stage = %s"
+            params.append(stage)
+        if statuses:
+            query += f" AND status IN ({self._placeholders(len(statuses))})"
+            params.extend(statuses)
+        rows = self._query(query + " ORDER BY created_at DESC, run_id DESC", params)
+        return [self._run_from_row(row) for row in rows]
+
+    def plan(self, stage: str, start: datetime, end: datetime, version: Optional[str] = None) -> BackfillRun:
+        """Create a run and its chunks for screenshots captured in [start, end)."""
+        if stage not in BACKFILL_STAGES:
+            raise ValueError(f"Unknown backfill stage: {stage}")
+        if start >= end:
+            raise ValueError("Backfill range start must be before its end")
+        version = version or datetime.now().strftime('%Y%m%d%H%M%S')
+        run = BackfillRun(f"{stage}-{version}", stage, version, start, end, self.chunk_size,
+                          fingerprints={key: pipeline_fingerprint(key) for key in BACKFILL_STAGES[stage].output_keys})
+        if self.get_run(run.run_id):
+            raise ValueError(f"Backfill run {run.run_id} already exists")
+
+        rows = self._query("SELECT MIN(id), MAX(id) FROM entities WHERE created_at >= %s AND created_at < %s",
+                           (self._bound(start), self._bound(end)))
+        first, last = rows[0] if rows else (None, None)
+        chunks = []
+        if first is not None:
+            chunks = [(lo, min(lo + self.chunk_size, int(last) + 1))
+                      for lo in range(int(first), int(last) + 1, self.chunk_size)]
+
+        now = self._bound(datetime.now())
+        with self._transaction() as cursor:
+            cursor.execute(self._sql("""
+                INSERT INTO backfill_runs
+                    (run_id, stage, version, range_start, range_end, chunk_size, status, fingerprints,
+                     created_at, updated_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """), (run.run_id, stage, version, self._bound(start), self._bound(end), self.chunk_size,
+                   RUN_RUNNING if chunks else RUN_READY, json.dumps(run.fingerprints), now, now))
+            if chunks:
+                cursor.executemany(self._sql("""
+                    INSERT INTO backfill_chunks (run_id, chunk_start, chunk_end, status)
+                    VALUES (%s, %s, %s, %s)
+                """), [(run.run_id, lo, hi, CHUNK_PENDING) for lo, hi in chunks])
+        run.status = RUN_RUNNING if chunks else RUN_READY
+        logger.info(f"Planned backfill {run.run_id}: {len(chunks)} chunks of {self.chunk_size} ids")
+        return run
+
+    def status(self, run: BackfillRun) -> Dict[str, Any]:
+        """Chunk counts by status and rows written so far."""
+        rows = self._query("""
+            SELECT status, COUNT(*), COALESCE(SUM(rows_written), 0)
+            FROM backfill_chunks WHERE run_id = %s GROUP BY status
+        """, (run.run_id,))
+        chunks = {status: int(count) for status, count, _ in rows}
+        current = self.get_run(run.run_id)
+        return {
+            'run_id': run.run_id,
+            'stage': run.stage,
+            'version': run.version,
+            'status': current.status if current else run.status,
+            'chunks': chunks,
+            'total_chunks': sum(chunks.values()),
+            'rows': sum(int(written) for _, _, written in rows),
+        }
+
+    def discard(self, run: BackfillRun):
+        """Delete a run, its chunks and its computed (not yet live) values."""
+        with self._transaction() as cursor:
+            cursor.execute(self._sql("DELETE FROM derived_metadata_versions WHERE version = %s"), (run.version,))
+            cursor.execute(self._sql("DELETE FROM backfill_chunks WHERE run_id = %s"), (run.run_id,))
+            cursor.execute(self._sql("DELETE FROM backfill_runs WHERE run_id = %s"), (run.run_id,))
+
+    def _set_run_status(self, cursor, run: BackfillRun, status: str):
+        cursor.execute(self._sql("UPDATE backfill_runs SET status = %s, updated_at = %s WHERE run_id = %s"),
+                       (status, self._bound(datetime.now()), run.run_id))
+        run.status = status
+
+    # ------------------------------------------------------------------
+    # Compute
+    # ------------------------------------------------------------------
+
+    def _chunks(self, run: BackfillRun, statuses: Sequence[str]) -> List[Tuple[int, int]]:
+        rows = self._query(f"""
+            SELECT chunk_start, chunk_end FROM backfill_chunks
+            WHERE run_id = %s AND status IN ({self._placeholders(len(statuses))})
+            ORDER BY chunk_start
+        """, (run.run_id, *statuses))
+        return [(int(lo), int(hi)) for lo, hi in rows]
+
+    def read_chunk(self, run: BackfillRun, chunk: Tuple[int, int]) -> List[Dict[str, Any]]:
+        """Stage inputs of the screenshots in one chunk, including archived values."""
+        keys = BACKFILL_STAGES[run.stage].input_keys
+        rows = self._query(f"""
+            SELECT e.id, m.key, m.value
+            FROM entities e
+            LEFT JOIN metadata_entries m ON m.entity_id = e.id AND m.key IN ({self._placeholders(len(keys))})
+            WHERE e.id >= %s AND e.id < %s AND e.created_at >= %s AND e.created_at < %s
+            ORDER BY e.id
+        """, (*keys, chunk[0], chunk[1], self._bound(run.start), self._bound(run.end)))
+        items: Dict[int, Dict[str, Any]] = {}
+        for entity_id, key, value in rows:
+            item = items.setdefault(int(entity_id), {'id': int(entity_id)})
+            if key is not None:
+                item[key] = value
+
+        # OCR of old screenshots may have been moved to the metadata archive
+        missing = [entity_id for entity_id, item in items.items()
+                   if item.get('active_window') and any(key not in item for key in keys)]
+        if missing:
+            from autotasktracker.core.metadata_archive import get_metadata_archive
+            try:
+                archived = get_metadata_archive(self.db).fetch(missing, keys)
+            except Exception as e:
+                logger.debug(f"Metadata archive unavailable for backfill: {e}")
+                archived = {}
+            for entity_id, values in archived.items():
+                for key, value in values.items():
+                    items[entity_id].setdefault(key, value)
+        return list(items.values())
+
+    def live_backlog(self, run: BackfillRun) -> int:
+        """Screenshots the live stage has not processed yet (0 when unknown)."""
+        try:
+            rows = self._query("""
+                SELECT COUNT(*) FROM entities
+                WHERE id > (SELECT last_entity_id FROM processing_watermarks WHERE stage = %s)
+            """, (BACKFILL_STAGES[run.stage].live_stage,))
+            return int(rows[0][0] or 0) if rows else 0
+        except Exception as e:
+            logger.debug(f"Live backlog unavailable: {e}")
+            return 0
+
+    def _yield_to_live(self, run: BackfillRun, stop: Optional[threading.Event]):
+        if self.yield_backlog is None:
+            return
+        while not (stop and stop.is_set()):
+            backlog = self.live_backlog(run)
+            if backlog <= self.yield_backlog:
+                return
+            logger.info(f"Backfill paused: live {BACKFILL_STAGES[run.stage].live_stage} backlog is {backlog}")
+            if stop:
+                stop.wait(self.yield_poll)
+            else:
+                time.sleep(self.yield_poll)
+
+    def _upsert(self, cursor, version: str, rows: List[Tuple[int, str, str]]):
+        now = self._bound(datetime.now())
+        values = [(entity_id, key, version, value, now) for entity_id, key, value in rows]
+        conflict = ("ON CONFLICT (entity_id, key, version) "
+                    "DO UPDATE SET value = excluded.value, created_at = excluded.created_at")
+        if not self.is_sqlite:
+            try:
+                from psycopg2.extras import execute_values
+            except ImportError:
+                execute_values = None
+            if execute_values is not None:
+                execute_values(cursor, "INSERT INTO derived_metadata_versions "
+                                       f"(entity_id, key, version, value, created_at) VALUES %s {conflict}",
+                               values, page_size=1000)
+                return
+        cursor.executemany(self._sql("INSERT INTO derived_metadata_versions "
+                                     f"(entity_id, key, version, value, created_at) "
+                                     f"VALUES (%s, %s, %s, %s, %s) {conflict}"), values)
+
+    def _finish_chunk(self, run: BackfillRun, chunk: Tuple[int, int], rows: List[Tuple[int, str, str]]):
+        """Write a chunk's values and mark it done in one transaction."""
+        with self._transaction() as cursor:
+            if rows:
+                self._upsert(cursor, run.version, rows)
+            cursor.execute(self._sql("""
+                UPDATE backfill_chunks SET status = %s, rows_written = %s, error = NULL, completed_at = %s
+                WHERE run_id = %s AND chunk_start = %s
+            """), (CHUNK_DONE, len(rows), self._bound(datetime.now()), run.run_id, chunk[0]))
+
+    def _fail_chunk(self, run: BackfillRun, chunk: Tuple[int, int], error: Exception):
+        logger.warning(f"Backfill {run.run_id} chunk {chunk[0]}-{chunk[1]} failed: {error}")
+        with self._transaction() as cursor:
+            cursor.execute(self._sql("""
+                UPDATE backfill_chunks SET status = %s, error = %s WHERE run_id = %s AND chunk_start = %s
+            """), (CHUNK_FAILED, str(error)[:1000], run.run_id, chunk[0]))
+
+    def run(self, run: BackfillRun, on_chunk: Optional[Callable[[Dict[str, Any]], None]] = None,
+            stop: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """Compute every chunk that is not done (failed chunks are retried).
+
+        At most ``workers`` chunks are in flight; their inputs are read and
+        their results written by this process, in chunk order of completion.
+
+        Returns:
+            Totals for this call: chunks done, chunks failed, rows written
+        """
+        totals = {'chunks': 0, 'failed': 0, 'rows': 0}
+        pending = self._chunks(run, (CHUNK_PENDING, CHUNK_FAILED))
+        pool = None
+        if self.workers > 1 and len(pending) > 1:
+            # Spawned, not forked: the caller may hold connection pools and threads
+            pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=_init_pool_process, initargs=(self.niceness,))
+        in_flight: deque = deque()
+
+        def finish(chunk, outcome):
+            try:
+                rows = outcome.result() if pool else outcome
+                if isinstance(rows, Exception):
+                    raise rows
+            except Exception as e:
+                self._fail_chunk(run, chunk, e)
+                totals['failed'] += 1
+            else:
+                self._finish_chunk(run, chunk, rows)
+                totals['chunks'] += 1
+                totals['rows'] += len(rows)
+            if on_chunk:
+                on_chunk(dict(totals, remaining=len(pending) - totals['chunks'] - totals['failed']))
+
+        try:
+            for chunk in pending:
+                if stop and stop.is_set():
+                    break
+                self._yield_to_live(run, stop)
+                items = self.read_chunk(run, chunk)
+                if pool:
+                    in_flight.append((chunk, pool.submit(compute_chunk, run.stage, items)))
+                    while len(in_flight) >= self.workers:
+                        finish(*in_flight.popleft())
+                else:
+                    try:
+                        outcome = compute_chunk(run.stage, items)
+                    except Exception as e:
+                        outcome = e
+                    finish(chunk, outcome)
+                if self.throttle:
+                    time.sleep(self.throttle)
+            while in_flight:
+                finish(*in_flight.popleft())
+        finally:
+            if pool:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+        if not self._chunks(run, (CHUNK_PENDING, CHUNK_FAILED)) and run.status == RUN_RUNNING:
+            with self._transaction() as cursor:
+                self._set_run_status(cursor, run, RUN_READY)
+            logger.info(f"Backfill {run.run_id} computed; run cutover to make it live")
+        return totals
+
+    # ------------------------------------------------------------------
+    # Cutover
+    # ------------------------------------------------------------------
+
+    def cutover(self, run: BackfillRun, on_chunk: Optional[Callable[[Dict[str, Any]], None]] = None) -> int:
+        """Replace live values with the run's version, one chunk per transaction.
+
+        Resumable: chunks already copied are skipped. Returns rows copied.
+        """
+        if run.status == RUN_LIVE:
+            return 0
+        if run.status != RUN_READY:
+            raise ValueError(f"Backfill {run.run_id} is not fully computed yet")
+        keys = BACKFILL_STAGES[run.stage].output_keys
+        copied = 0
+        chunks = self._chunks(run, (CHUNK_DONE,))
+        get_derived_versions(self.db).ensure_schema()
+        for index, (lo, hi) in enumerate(chunks, 1):
+            with self._transaction() as cursor:
+                if self.is_sqlite:
+                    cursor.execute(self._sql(f"""
+                        DELETE FROM metadata_entries
+                        WHERE entity_id >= %s AND entity_id < %s AND key IN ({self._placeholders(len(keys))})
+                          AND EXISTS (SELECT 1 FROM derived_metadata_versions d
+                                      WHERE d.version = %s AND d.entity_id = metadata_entries.entity_id
+                                        AND d.key = metadata_entries.key)
+                    """), (lo, hi, *keys, run.version))
+                    cursor.execute(self._sql("""
+                        INSERT INTO metadata_entries (entity_id, key, value)
+                        SELECT entity_id, key, value FROM derived_metadata_versions
+                        WHERE version = %s AND entity_id >= %s AND entity_id < %s
+                    """), (run.version, lo, hi))
+                else:
+                    cursor.execute("""
+                        INSERT INTO metadata_entries
+                            (entity_id, key, value, source_type, data_type, created_at, updated_at)
+                        SELECT entity_id, key, value, 'backfill', 'text', NOW(), NOW()
+                        FROM derived_metadata_versions
+                        WHERE version = %s AND entity_id >= %s AND entity_id < %s
+                        ON CONFLICT (entity_id, key) DO UPDATE SET value = EXCLUDED.value, updated_at = NOW()
+                    """, (run.version, lo, hi))
+                copied += max(cursor.rowcount, 0)
+                for key, fingerprint in run.fingerprints.items():
+                    cursor.execute(self._sql("""
+                        INSERT INTO derived_metadata_stamps (entity_id, key, fingerprint, stamped_at)
+                        SELECT entity_id, key, %s, %s FROM derived_metadata_versions
+                        WHERE version = %s AND key = %s AND entity_id >= %s AND entity_id < %s
+                        ON CONFLICT (entity_id, key) DO UPDATE SET
+                            fingerprint = excluded.fingerprint, stamped_at = excluded.stamped_at
+                    """), (fingerprint, self._bound(datetime.now()), run.version, key, lo, hi))
+                cursor.execute(self._sql("""
+                    DELETE FROM derived_metadata_versions WHERE version = %s AND entity_id >= %s AND entity_id < %s
+                """), (run.version, lo, hi))
+                cursor.execute(self._sql("""
+                    UPDATE backfill_chunks SET status = %s WHERE run_id = %s AND chunk_start = %s
+                """), (CHUNK_LIVE, run.run_id, lo))
+            if on_chunk:
+                on_chunk({'chunks': index, 'remaining': len(chunks) - index, 'rows': copied})
+        with self._transaction() as cursor:
+            self._set_run_status(cursor, run, RUN_LIVE)
+        logger.info(f"Backfill {run.run_id} is live ({copied} values replaced)")
+        return copied
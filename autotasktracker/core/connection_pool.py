@@ -0,0 +1,437 @@
+"""
+Process-wide, instrumented PostgreSQL connection pools for AutoTaskTracker.
+
+Every DatabaseManager for the same DSN shares one pool from the registry
+instead of opening its own. Pools open connections on demand up to
+``max_size``, close idle ones above a demand-driven floor, and record
+checkout wait and hold times. Checkouts held past ``leak_threshold`` are
+reported together with the stack that acquired them.
+"""
+
+import bisect
+import logging
+import math
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from autotasktracker.core.exceptions import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+
+# Histogram bucket upper bounds in milliseconds (last bucket is open-ended)
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+HOLD_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000, 30000, 120000)
+
+# Granularity of the recent-peak-demand window
+PEAK_BUCKET_SECONDS = 10
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (cheap to update, safe to snapshot)."""
+
+    def __init__(self, bounds_ms=WAIT_BUCKETS_MS):
+        self.bounds = tuple(bounds_ms)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, value_ms: float):
+        self.counts[bisect.bisect_left(self.bounds, value_ms)] += 1
+        self.total += 1
+        self.sum_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the ``pct`` percentile."""
+        if not self.total:
+            return 0.0
+        rank = math.ceil(self.total * pct / 100.0)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return float(self.bounds[index]) if index < len(self.bounds) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"le_{b}ms" for b in self.bounds] + ['inf']
+        return {
+            'count': self.total,
+            'avg_ms': self.sum_ms / self.total if self.total else 0.0,
+            'max_ms': self.max_ms,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+@dataclass
+class _Checkout:
+    """Bookkeeping for a connection currently lent out."""
+    started: float
+    thread_name: str
+    stack: Optional[str] = None
+    leak_reported: bool = False
+
+
+@dataclass
+class _IdleConnection:
+    conn: Any
+    idle_since: float = field(default_factory=time.monotonic)
+
+
+class InstrumentedConnectionPool:
+    """Thread-safe connection pool with on-demand growth and idle reaping.
+
+    Connections are opened lazily when no idle connection is available and
+    the pool is below ``max_size``; otherwise callers wait up to
+    ``checkout_timeout``. Idle connections are closed once they have been
+    unused for ``idle_timeout`` seconds, but never below the larger of
+    ``min_size`` and the recent peak of concurrent checkouts, so the pool
+    stays warm for the load it actually sees.
+    """
+
+    def __init__(self, connect: Callable[[], Any], name: str = 'default',
+                 min_size: int = 1, max_size: int = 10,
+                 checkout_timeout: float = 30.0, idle_timeout: float = 300.0,
+                 leak_threshold: float = 120.0, capture_stacks: bool = True,
+                 peak_window: float = 300.0):
+        """
+        Args:
+            connect: Callable opening a new DB-API connection
+            name: Label used in logs and stats (host/database, no password)
+            min_size: Connections kept open even when idle
+            max_size: Hard cap on open connections
+            checkout_timeout: Seconds to wait for a free connection
+            idle_timeout: Seconds before an idle connection above the floor is closed
+            leak_threshold: Seconds a checkout may be held before it is reported
+            capture_stacks: Record the acquiring stack for leak reports
+            peak_window: Seconds over which peak demand sets the idle floor
+        """
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+        self._connect = connect
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.idle_timeout = idle_timeout
+        self.leak_threshold = leak_threshold
+        self.capture_stacks = capture_stacks
+        self.peak_window = peak_window
+
+        self._idle: deque = deque()
+        self._in_use: Dict[int, _Checkout] = {}
+        self._opening = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._peaks: deque = deque()  # [bucket, max in_use] per PEAK_BUCKET_SECONDS
+
+        self.wait_histogram = LatencyHistogram(WAIT_BUCKETS_MS)
+        self.hold_histogram = LatencyHistogram(HOLD_BUCKETS_MS)
+        self.counters = {
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'opened': 0,
+            'closed_idle': 0,
+            'discarded': 0,
+            'leaks_reported': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Checkout / return
+    # ------------------------------------------------------------------
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def size(self) -> int:
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def getconn(self, timeout: Optional[float] = None):
+        """Check out a connection, opening one if the pool has room."""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+        stack = ''.join(traceback.format_stack(limit=12)[:-1]) if self.capture_stacks else None
+
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise DatabaseError(f"Connection pool '{self.name}' is closed")
+                if self._idle:
+                    conn = self._idle.pop().conn  # LIFO keeps hot connections hot
+                    self._register_checkout(conn, start, waited, stack)
+                    return conn
+                if self.size < self.max_size:
+                    self._opening += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.counters['timeouts'] += 1
+                    raise DatabaseError(
+                        f"Connection pool '{self.name}' exhausted: {self.max_size} connections "
+                        f"in use, waited {timeout:.1f}s"
+                    )
+                waited = True
+                self._condition.wait(remaining)
+
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._condition:
+                self._opening -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._opening -= 1
+            self.counters['opened'] += 1
+            self._register_checkout(conn, start, waited, stack)
+        return conn
+
+    def _register_checkout(self, conn, start: float, waited: bool, stack: Optional[str]):
+        """Record a checkout; caller holds the pool condition."""
+        now = time.monotonic()
+        self._in_use[id(conn)] = _Checkout(now, threading.current_thread().name, stack)
+        self.counters['checkouts'] += 1
+        if waited:
+            self.counters['waits'] += 1
+        self.wait_histogram.record((now - start) * 1000)
+        bucket = int(now // PEAK_BUCKET_SECONDS)
+        if self._peaks and self._peaks[-1][0] == bucket:
+            self._peaks[-1][1] = max(self._peaks[-1][1], len(self._in_use))
+        else:
+            self._peaks.append([bucket, len(self._in_use)])
+
+    def putconn(self, conn, discard: bool = False):
+        """Return a connection; broken or ``discard``ed ones are closed."""
+        with self._condition:
+            checkout = self._in_use.pop(id(conn), None)
+            if checkout:
+                self.hold_histogram.record((time.monotonic() - checkout.started) * 1000)
+
+        if not discard:
+            discard = not self._reset(conn)
+
+        with self._condition:
+            if discard or self._closed:
+                if discard:
+                    self.counters['discarded'] += 1
+                self._close_quietly(conn)
+            else:
+                self._idle.append(_IdleConnection(conn))
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Context manager that checks out a connection and always returns it."""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    @staticmethod
+    def _reset(conn) -> bool:
+        """Roll back any open transaction. Returns False if the connection is unusable."""
+        if getattr(conn, 'closed', False):
+            return False
+        try:
+            status = conn.get_transaction_status() if hasattr(conn, 'get_transaction_status') else None
+            # psycopg2: 0 idle, 1 active, 2 in transaction, 3 in error, 4 unknown
+            if status == 4:
+                return False
+            if status in (1, 2, 3):
+                conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled connection: {e}")
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def _demand_floor(self, now: float) -> int:
+        """Connections worth keeping: the peak concurrent checkouts recently seen."""
+        oldest = int((now - self.peak_window) // PEAK_BUCKET_SECONDS)
+        while self._peaks and self._peaks[0][0] < oldest:
+            self._peaks.popleft()
+        recent_peak = max((in_use for _, in_use in self._peaks), default=0)
+        return min(self.max_size, max(self.min_size, recent_peak))
+
+    def reap(self) -> Dict[str, int]:
+        """Close surplus idle connections and report suspected leaks.
+
+        Returns:
+            Counts of connections closed and new leaks reported in this pass
+        """
+        now = time.monotonic()
+        to_close = []
+        leaks = []
+        with self._condition:
+            floor = self._demand_floor(now)
+            keep = deque()
+            # Oldest idle connections sit at the left end
+            while self._idle:
+                entry = self._idle.popleft()
+                surplus = len(self._in_use) + len(keep) + len(self._idle) + 1 > floor
+                if surplus and now - entry.idle_since > self.idle_timeout:
+                    to_close.append(entry.conn)
+                else:
+                    keep.append(entry)
+            self._idle = keep
+            self.counters['closed_idle'] += len(to_close)
+
+            for checkout in self._in_use.values():
+                if not checkout.leak_reported and now - checkout.started > self.leak_threshold:
+                    checkout.leak_reported = True
+                    leaks.append(checkout)
+            self.counters['leaks_reported'] += len(leaks)
+
+        for conn in to_close:
+            self._close_quietly(conn)
+        for checkout in leaks:
+            logger.warning(
+                f"Connection from pool '{self.name}' held for {now - checkout.started:.0f}s "
+                f"by thread {checkout.thread_name}; acquired at:\n{checkout.stack or '(stack capture disabled)'}"
+            )
+        return {'closed_idle': len(to_close), 'leaks_reported': len(leaks)}
+
+    def find_leaks(self) -> List[Dict[str, Any]]:
+        """List checkouts held longer than ``leak_threshold``."""
+        now = time.monotonic()
+        with self._condition:
+            return [{
+                'held_seconds': now - checkout.started,
+                'thread': checkout.thread_name,
+                'stack': checkout.stack,
+            } for checkout in self._in_use.values() if now - checkout.started > self.leak_threshold]
+
+    def closeall(self):
+        """Close idle connections and refuse new checkouts.
+
+        Connections still checked out are closed when they are returned.
+        """
+        with self._condition:
+            self._closed = True
+            idle = [entry.conn for entry in self._idle]
+            self._idle.clear()
+            self._condition.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get size, utilisation, wait/hold histograms and leak counts."""
+        now = time.monotonic()
+        with self._condition:
+            return {
+                'name': self.name,
+                'closed': self._closed,
+                'size': self.size,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'demand_floor': self._demand_floor(now),
+                'exhausted': self.size >= self.max_size and not self._idle,
+                'suspected_leaks': sum(
+                    1 for c in self._in_use.values() if now - c.started > self.leak_threshold
+                ),
+                'wait': self.wait_histogram.snapshot(),
+                'hold': self.hold_histogram.snapshot(),
+                **self.counters,
+            }
+
+
+class PoolRegistry:
+    """Process-wide registry of connection pools keyed by DSN."""
+
+    def __init__(self, reap_interval: float = 30.0):
+        self.reap_interval = reap_interval
+        self._pools: Dict[str, InstrumentedConnectionPool] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def get_pool(self, dsn: str, factory: Callable[[], InstrumentedConnectionPool]) -> InstrumentedConnectionPool:
+        """Get the pool for ``dsn``, creating it with ``factory`` on first use."""
+        pool = self._pools.get(dsn)
+        if pool is not None and not pool.closed:
+            return pool
+        with self._lock:
+            pool = self._pools.get(dsn)
+            if pool is None or pool.closed:
+                pool = factory()
+                self._pools[dsn] = pool
+                self._start_reaper()
+            return pool
+
+    def close_pool(self, dsn: str):
+        with self._lock:
+            pool = self._pools.pop(dsn, None)
+        if pool:
+            pool.closeall()
+
+    def close_all(self):
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+            self._stop_event.set()
+        for pool in pools:
+            pool.closeall()
+
+    def reap_all(self):
+        for pool in list(self._pools.values()):
+            try:
+                pool.reap()
+            except Exception as e:
+                logger.error(f"Failed to reap connection pool '{pool.name}': {e}")
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get stats for every registered pool, keyed by pool name."""
+        return {pool.name: pool.get_stats() for pool in list(self._pools.values())}
+
+    def _start_reaper(self):
+        if self._reaper and self._reaper.is_alive():
+            return
+        self._stop_event.clear()
+        self._reaper = threading.Thread(target=self._reap_loop, name='db-pool-reaper', daemon=True)
+        self._reaper.start()
+
+    def _reap_loop(self):
+        while not self._stop_event.wait(self.reap_interval):
+            self.reap_all()
+
+
+# Global registry instance
+_pool_registry: Optional[PoolRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_pool_registry() -> PoolRegistry:
+    """Get the process-wide connection pool registry."""
+    global _pool_registry
+    if _pool_registry is None:
+        with _registry_lock:
+            if _pool_registry is None:
+                _pool_registry = PoolRegistry()
+    return _pool_registry
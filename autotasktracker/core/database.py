@@ -16,12 +16,14 @@ from autotasktracker.config import get_config
 from autotasktracker.pensieve.api_client import get_pensieve_client, PensieveAPIError
 from autotasktracker.pensieve.config_reader import get_pensieve_config
 from autotasktracker.core.exceptions import DatabaseError, PensieveIntegrationError
+from autotasktracker.core.connection_pool import InstrumentedConnectionPool, get_pool_registry
+from autotasktracker.core.query_registry import get_query_registry
+from autotasktracker.core.partitioning import entity_id_bounds
+from autotasktracker.core.tracing import trace_span
 
 # PostgreSQL imports (required)
 try:
     import psycopg2
-    from psycopg2.pool import ThreadedConnectionPool
-    from psycopg2.extras import RealDictCursor
     from psycopg2 import sql, Error as PostgreSQLError
     POSTGRESQL_AVAILABLE = True
 except ImportError:
@@ -29,7 +31,7 @@ except ImportError:
 
 # Import performance monitoring (with fallback if not available)
 try:
-    from autotasktracker.pensieve.performance_monitor import record_database_query, start_timer, end_timer
+    from autotasktracker.pensieve.performance_monitor import record_database_query
     PERFORMANCE_MONITORING_AVAILABLE = True
 except ImportError:
     logger = logging.getLogger(__name__)
@@ -38,12 +40,6 @@ except ImportError:
     
     def record_database_query(duration_ms: float, query_type: str = "unknown"):
         pass
-    
-    def start_timer(timer_name: str):
-        pass
-    
-    def end_timer(timer_name: str, metadata=None) -> float:
-        return 0.0
 
 
 logger = logging.getLogger(__name__)
@@ -104,7 +100,7 @@ class DatabaseManager:
             self._postgresql_initialized = True
 
     def _initialize_postgresql(self):
-        """Initialize PostgreSQL connection pool."""
+        """Attach to the process-wide PostgreSQL connection pool for this DSN."""
         try:
             # Parse PostgreSQL URI
             parsed = urlparse(self.db_path)
@@ -116,43 +112,56 @@ class DatabaseManager:
                 'password': parsed.password or ''
             }
             
-            # Create connection pool with timeouts
-            self._postgresql_pool = ThreadedConnectionPool(
-                minconn=1,
-                maxconn=10,
-                connect_timeout=10,
-                **self._postgresql_config
-            )
-            
-            logger.info(f"PostgreSQL connection pool initialized for {self._postgresql_config['host']}:{self._postgresql_config['port']}/{self._postgresql_config['database']}")
-            
-            # Test connection
-            conn = self._postgresql_pool.getconn()
-            try:
-                with conn.cursor() as cursor:
-                    cursor.execute("SELECT version()")
-                    version = cursor.fetchone()[0]
-                    logger.info(f"PostgreSQL version: {version}")
-            finally:
-                self._postgresql_pool.putconn(conn)
+            # All managers for the same DSN share one pool
+            self._postgresql_pool = get_pool_registry().get_pool(self.db_path, self._create_pool)
                 
         except Exception as e:
             logger.error(f"Failed to initialize PostgreSQL: {e}")
             raise DatabaseError(f"PostgreSQL initialization failed: {e}") from e
     
+    def _create_pool(self) -> InstrumentedConnectionPool:
+        """Create and test the shared pool (called once per DSN per process)."""
+        config = get_config()
+        connect_args = dict(self._postgresql_config, connect_timeout=10)
+        name = f"{self._postgresql_config['host']}:{self._postgresql_config['port']}/{self._postgresql_config['database']}"
+        
+        pool = InstrumentedConnectionPool(
+            lambda: psycopg2.connect(**connect_args),
+            name=name,
+            min_size=config.DB_POOL_MIN_SIZE,
+            max_size=config.DB_POOL_MAX_SIZE,
+            checkout_timeout=config.DB_POOL_CHECKOUT_TIMEOUT,
+            idle_timeout=config.DB_POOL_IDLE_TIMEOUT,
+            leak_threshold=config.DB_POOL_LEAK_THRESHOLD,
+        )
+        logger.info(f"PostgreSQL connection pool initialized for {name}")
+        
+        # Test connection
+        with pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT version()")
+                version = cursor.fetchone()[0]
+                logger.info(f"PostgreSQL version: {version}")
+        return pool
+    
     @contextmanager
     def _get_postgresql_connection(self, readonly: bool = True):
-        """Get PostgreSQL connection from pool."""
+        """Get PostgreSQL connection from the shared pool."""
         self._ensure_postgresql_initialized()
         
         if not self._postgresql_pool:
             raise DatabaseError("PostgreSQL pool not initialized")
+        if self._postgresql_pool.closed:
+            # Another manager closed the shared pool; attach to a fresh one
+            self._initialize_postgresql()
         
         conn = None
         try:
             conn = self._postgresql_pool.getconn()
             conn.autocommit = readonly  # Read-only queries use autocommit
             yield conn
+        except DatabaseError:
+            raise
         except PostgreSQLError as e:
             logger.error(f"PostgreSQL connection error: {e}")
             raise DatabaseError(f"PostgreSQL connection failed: {e}") from e
@@ -196,65 +205,32 @@ class DatabaseManager:
                    time_filter: Optional[str] = None) -> pd.DataFrame:
         """Fetch tasks from PostgreSQL database."""
         
-        timer_name = f"fetch_tasks_{limit}_{offset}"
-        start_timer(timer_name)
-        
+        # A span per call; shared timer names collided across threads and leaked on errors
+        span = None
         try:
-            # Handle time_filter convenience parameter
-            if time_filter and not start_date:
-                start_date = self._get_start_date_from_filter(time_filter)
-            
-            # Build query - simple version that works with current schema
-            query = """
-            SELECT
-                e.id,
-                e.filepath,
-                e.created_at,
-                me1.value as ocr_text,
-                me2.value as active_window
-            FROM
-                entities e
-                LEFT JOIN metadata_entries me1 ON e.id = me1.entity_id AND me1.key = 'ocr_result'
-                LEFT JOIN metadata_entries me2 ON e.id = me2.entity_id AND me2.key = 'active_window'
-            WHERE
-                e.filepath IS NOT NULL
-            """
-            
-            params = []
-            
-            # Add date filters
-            if start_date:
-                query += " AND e.created_at >= %s"
-                params.append(start_date)
-            
-            if end_date:
-                query += " AND e.created_at <= %s"
-                params.append(end_date)
-            
-            query += " ORDER BY e.created_at DESC LIMIT %s"
-            params.append(limit)
-            
-            if offset > 0:
-                query += " OFFSET %s"
-                params.append(offset)
-            
-            with self.get_connection() as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    cursor.execute(query, params)
-                    results = cursor.fetchall()
-                    
-                    if results:
-                        df = pd.DataFrame([dict(row) for row in results])
-                        return df
-                    else:
-                        return pd.DataFrame()
+            with trace_span('database.fetch_tasks', limit=limit, offset=offset) as span:
+                # Handle time_filter convenience parameter
+                if time_filter and not start_date:
+                    start_date = self._get_start_date_from_filter(time_filter)
+                
+                # Prepared once per pooled connection via the query registry;
+                # the id bounds confine the scan to the period's month partitions
+                bounds = entity_id_bounds(self, start_date, end_date)
+                if start_date is None and end_date is None:
+                    name, params = 'fetch_tasks_unbounded', (limit, offset, *bounds)
+                else:
+                    # An open end is a bound nothing reaches, so one plan serves both
+                    name, params = 'fetch_tasks', (start_date or datetime.min, end_date or datetime.max,
+                                                   limit, offset, *bounds)
+                with self.get_connection() as conn:
+                    return get_query_registry().read_dataframe(conn, name, params)
         
         except Exception as e:
             logger.error(f"Failed to fetch tasks: {e}")
             raise DatabaseError(f"Failed to fetch tasks: {e}") from e
         finally:
-            duration = end_timer(timer_name)
-            record_database_query(duration, "fetch_tasks")
+            if span is not None:
+                record_database_query(span.duration_ms, "fetch_tasks")
     
     def _get_start_date_from_filter(self, time_filter: str) -> Optional[datetime]:
         """Convert time filter string to start date."""
@@ -303,18 +279,25 @@ class DatabaseManager:
         
         if hasattr(self, '_postgresql_initialized') and self._postgresql_initialized and self._postgresql_pool:
             try:
-                self._postgresql_pool.closeall()
+                # The pool is shared by every manager for this DSN
+                get_pool_registry().close_pool(self.db_path)
+                self._postgresql_pool = None
+                self._postgresql_initialized = False
                 logger.info("PostgreSQL connection pool closed")
             except Exception as e:
                 logger.warning(f"Error closing PostgreSQL pool: {e}")
     
     def get_connection_status(self) -> Dict[str, Any]:
-        """Get connection pool status."""
+        """Get connection pool status, including checkout wait/hold histograms and leaks."""
+        pool_active = (hasattr(self, '_postgresql_initialized') and self._postgresql_initialized
+                       and self._postgresql_pool is not None and not self._postgresql_pool.closed)
         return {
             "type": "postgresql",
             "config": self._postgresql_config,
-            "pool_active": hasattr(self, '_postgresql_initialized') and self._postgresql_initialized and self._postgresql_pool is not None,
-            "db_path": self.db_path
+            "pool_active": pool_active,
+            "db_path": self.db_path,
+            "pool": self._postgresql_pool.get_stats() if pool_active else None,
+            "shared_pools": len(get_pool_registry().get_stats()),
         }
 
 
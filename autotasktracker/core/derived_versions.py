@@ -0,0 +1,556 @@
+"""
+Pipeline version stamps for derived metadata and lazy recomputation on read.
+
+Every derived value (``tasks``, ``category``, VLM results, session analyses)
+is stamped in ``derived_metadata_stamps`` with a fingerprint of the pipeline
+that produced it: package version plus a per-key revision, a hash of the
+extractor configuration (task patterns, categories, prompts) and the model
+name. After an upgrade only the fingerprints change; nothing is rewritten.
+
+Readers pass their result sets through ``refresh``. Values whose stamp is
+missing or differs from the current fingerprint are stale:
+
+- ``tasks``/``category`` are cheap to derive and are recomputed inline,
+  bounded per call by a row count and a time budget;
+- the remainder, and VLM results, are handed to the processing ledger as due
+  retries so the coordinated worker recomputes them in the background;
+- session analyses are detected and reported only (no per-entity recompute).
+
+History thus rolls forward as it is read instead of through a full backfill.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+import pandas as pd
+
+from autotasktracker.core.exceptions import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+# Derived metadata key -> pipeline stage that produces it. Legacy keys no
+# current stage writes (e.g. ``vlm_structured``) are not tracked: recompute
+# could never make them current.
+DERIVED_KEYS = {
+    'tasks': 'tasks',
+    'category': 'tasks',
+    'vlm_description': 'vlm',
+    'llama3_session_result': 'session',
+}
+
+# Bump when a key's extractor changes its output without a config or model change
+KEY_REVISIONS = {
+    'tasks': 1,
+    'category': 1,
+    'vlm_description': 1,
+    'llama3_session_result': 1,
+}
+
+INLINE_STAGES = ('tasks',)          # cheap enough to recompute while serving a read
+QUEUED_STAGES = ('tasks', 'vlm')    # recomputed by the coordinated worker
+INLINE_BATCH = 50                   # rows computed between time budget checks
+CURRENT_CACHE_SIZE = 100_000        # (entity, key) pairs remembered as current
+
+SCHEMA_STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS derived_metadata_stamps (
+        entity_id BIGINT NOT NULL,
+        key VARCHAR(255) NOT NULL,
+        fingerprint VARCHAR(32) NOT NULL,
+        stamped_at TIMESTAMP,
+        PRIMARY KEY (entity_id, key)
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_derived_metadata_stamps_key
+        ON derived_metadata_stamps (key, fingerprint)
+    """,
+]
+
+
+def _key_inputs(key: str) -> Tuple[str, Any]:
+    """Model name and configuration a derived key depends on."""
+    from autotasktracker.config import get_config
+    if key == 'tasks':
+        from autotasktracker.core.task_extractor import TaskExtractor
+        extractor = TaskExtractor()
+        return 'task_extractor', {
+            'apps': {name: spec['pattern'] for name, spec in extractor.app_patterns.items()
+                     if isinstance(spec, dict) and 'pattern' in spec},
+            'websites': sorted(extractor.website_patterns),
+        }
+    if key == 'category':
+        from autotasktracker.core.categorizer import ActivityCategorizer
+        return 'categorizer', ActivityCategorizer.CATEGORIES
+    config = get_config()
+    if DERIVED_KEYS.get(key) == 'vlm':
+        return config.VLM_MODEL_NAME, {'prompt': config.VLM_PROMPT, 'temperature': config.VLM_TEMPERATURE}
+    if key == 'llama3_session_result':
+        return config.LLAMA3_MODEL_NAME, {}
+    raise ValueError(f"Not a derived metadata key: {key}")
+
+
+@lru_cache(maxsize=None)
+def pipeline_fingerprint(key: str) -> str:
+    """Fingerprint of the pipeline currently producing ``key``.
+
+    Cached per process; call ``pipeline_fingerprint.cache_clear()`` after
+    changing configuration at runtime.
+    """
+    from autotasktracker import __version__
+    model, config = _key_inputs(key)
+    payload = json.dumps({'code': f"{__version__}+{KEY_REVISIONS[key]}", 'config': config, 'model': model},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def stage_keys(stage: str) -> Tuple[str, ...]:
+    """Derived keys produced by a pipeline stage."""
+    return tuple(key for key, key_stage in DERIVED_KEYS.items() if key_stage == stage)
+
+
+def _present(value) -> bool:
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return False
+    return value != ''
+
+
+class DerivedVersions:
+    """Stamps, stale detection and lazy recomputation of derived metadata.
+
+    Works against any manager exposing ``get_connection(readonly=...)`` and
+    ``get_database_type()``; SQLite stand-ins are supported for tests and
+    local setups.
+    """
+
+    def __init__(self, db_manager=None, inline_budget: Optional[int] = None,
+                 inline_budget_ms: Optional[float] = None):
+        """
+        Args:
+            db_manager: Database manager; defaults to a new DatabaseManager
+            inline_budget: Stale rows recomputed inline per ``refresh`` call
+                (default: config DERIVED_INLINE_BUDGET)
+            inline_budget_ms: Time spent recomputing inline per call
+                (default: config DERIVED_INLINE_BUDGET_MS)
+        """
+        if db_manager is None:
+            from autotasktracker.core.database import DatabaseManager
+            db_manager = DatabaseManager()
+        if inline_budget is None or inline_budget_ms is None:
+            from autotasktracker.config import get_config
+            config = get_config()
+            inline_budget = config.DERIVED_INLINE_BUDGET if inline_budget is None else inline_budget
+            inline_budget_ms = config.DERIVED_INLINE_BUDGET_MS if inline_budget_ms is None else inline_budget_ms
+        self.db = db_manager
+        self.inline_budget = inline_budget
+        self.inline_budget_ms = inline_budget_ms
+        self._ledger = None
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        self._current: 'OrderedDict[Tuple[int, str], str]' = OrderedDict()
+        self._enqueued: Set[Tuple[str, int]] = set()
+        self._lock = threading.Lock()
+        self.refresh_stats = {'checked': 0, 'stale': 0, 'recomputed': 0, 'enqueued': 0}
+
+    @property
+    def is_sqlite(self) -> bool:
+        get_type = getattr(self.db, 'get_database_type', None)
+        return bool(get_type) and get_type() == 'sqlite'
+
+    def _sql(self, query: str) -> str:
+        """Adapt a ``%s``-style query to the connection's parameter style."""
+        if self.is_sqlite:
+            return query.replace('%s', '?')
+        return query
+
+    @staticmethod
+    def _placeholders(count: int) -> str:
+        return ', '.join(['%s'] * count)
+
+    def _now(self):
+        # SQLite stores timestamps as ISO text
+        now = datetime.now()
+        return now.isoformat(sep=' ') if self.is_sqlite else now
+
+    def ensure_schema(self):
+        """Create the stamps table if missing."""
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            try:
+                with self.db.get_connection(readonly=False) as conn:
+                    cursor = conn.cursor()
+                    for statement in SCHEMA_STATEMENTS:
+                        cursor.execute(statement)
+                    conn.commit()
+                    cursor.close()
+                self._schema_ready = True
+            except Exception as e:
+                logger.error(f"Failed to create derived metadata stamps schema: {e}")
+                raise DatabaseError(f"Derived metadata stamps schema creation failed: {e}") from e
+
+    @contextmanager
+    def _transaction(self):
+        """Yield a cursor inside a write transaction, committing on success."""
+        self.ensure_schema()
+        with self.db.get_connection(readonly=False) as conn:
+            cursor = conn.cursor()
+            try:
+                if self.is_sqlite:
+                    cursor.execute('BEGIN IMMEDIATE')
+                yield cursor
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def _query(self, query: str, params: Sequence = ()) -> List[tuple]:
+        # Reads never create the schema: readers of a database nobody stamps see nothing stale
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(self._sql(query), tuple(params))
+                return [tuple(row) for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+
+    @property
+    def ledger(self):
+        if self._ledger is None:
+            from autotasktracker.core.processing_ledger import ProcessingLedger
+            self._ledger = ProcessingLedger(self.db)
+        return self._ledger
+
+    def _remember(self, pairs: Iterable[Tuple[int, str]]):
+        with self._lock:
+            for entity_id, key in pairs:
+                self._current[(entity_id, key)] = pipeline_fingerprint(key)
+                self._current.move_to_end((entity_id, key))
+            while len(self._current) > CURRENT_CACHE_SIZE:
+                self._current.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Stamping
+    # ------------------------------------------------------------------
+
+    def stamp(self, entity_ids: Iterable[int], keys: Sequence[str], cursor=None,
+              fingerprints: Optional[Mapping[str, str]] = None) -> int:
+        """Record that ``keys`` of ``entity_ids`` were produced by the current pipeline.
+
+        Args:
+            cursor: Write within the caller's transaction instead of a new one
+            fingerprints: Per-key fingerprints to record instead of the current ones
+        """
+        ids = [int(i) for i in entity_ids]
+        if not ids or not keys:
+            return 0
+        fingerprints = fingerprints or {key: pipeline_fingerprint(key) for key in keys}
+        now = self._now()
+        values = [(entity_id, key, fingerprints[key], now) for entity_id in ids for key in keys]
+        query = self._sql("""
+            INSERT INTO derived_metadata_stamps (entity_id, key, fingerprint, stamped_at)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (entity_id, key) DO UPDATE SET
+                fingerprint = excluded.fingerprint, stamped_at = excluded.stamped_at
+        """)
+        if cursor is not None:
+            # The caller's transaction may still roll back, so nothing is remembered as current
+            self.ensure_schema()
+            cursor.executemany(query, values)
+            return len(values)
+        with self._transaction() as cursor:
+            cursor.executemany(query, values)
+        self._remember((entity_id, key) for entity_id, key, fingerprint, _ in values
+                       if fingerprint == pipeline_fingerprint(key))
+        return len(values)
+
+    def write(self, values: Sequence[Tuple[int, str, str]], source_type: str = 'task_processor',
+              cursor=None) -> int:
+        """Replace derived values in ``metadata_entries`` and stamp them, in one transaction."""
+        if not values:
+            return 0
+        if cursor is None:
+            with self._transaction() as cursor:
+                return self.write(values, source_type, cursor)
+
+        if self.is_sqlite:
+            cursor.executemany("DELETE FROM metadata_entries WHERE entity_id = ? AND key = ?",
+                               [(entity_id, key) for entity_id, key, _ in values])
+            cursor.executemany("INSERT INTO metadata_entries (entity_id, key, value) VALUES (?, ?, ?)",
+                               list(values))
+        else:
+            cursor.executemany("""
+                INSERT INTO metadata_entries
+                    (entity_id, key, value, source_type, data_type, created_at, updated_at)
+                VALUES (%s, %s, %s, %s, 'text', NOW(), NOW())
+                ON CONFLICT (entity_id, key) DO UPDATE SET value = EXCLUDED.value, updated_at = NOW()
+            """, [(entity_id, key, value, source_type) for entity_id, key, value in values])
+        by_key: Dict[str, List[int]] = defaultdict(list)
+        for entity_id, key, _ in values:
+            by_key[key].append(entity_id)
+        for key, ids in by_key.items():
+            self.stamp(ids, [key], cursor=cursor)
+        return len(values)
+
+    def adopt(self, keys: Optional[Sequence[str]] = None) -> Dict[str, int]:
+        """Stamp unversioned values as produced by the current pipeline.
+
+        For databases upgraded from releases that did not stamp: otherwise
+        every existing value counts as stale.
+        """
+        adopted = {}
+        for key in keys or DERIVED_KEYS:
+            with self._transaction() as cursor:
+                cursor.execute(self._sql("""
+                    INSERT INTO derived_metadata_stamps (entity_id, key, fingerprint, stamped_at)
+                    SELECT m.entity_id, m.key, %s, %s FROM metadata_entries m
+                    WHERE m.key = %s AND NOT EXISTS (
+                        SELECT 1 FROM derived_metadata_stamps s WHERE s.entity_id = m.entity_id AND s.key = m.key)
+                    ON CONFLICT (entity_id, key) DO NOTHING
+                """), (pipeline_fingerprint(key), self._now(), key))
+                adopted[key] = max(cursor.rowcount, 0)
+        return adopted
+
+    # ------------------------------------------------------------------
+    # Detection
+    # ------------------------------------------------------------------
+
+    def stale(self, entity_ids: Iterable[int], keys: Sequence[str]) -> Dict[str, Set[int]]:
+        """Entities whose stored value of each key is missing a current stamp.
+
+        Entities without a value are not stale (they are unprocessed). Returns
+        an empty mapping when stamps are unavailable.
+        """
+        keys = [key for key in keys if key in DERIVED_KEYS]
+        pending = sorted({int(i) for i in entity_ids})
+        with self._lock:
+            pending = [i for i in pending
+                       if any(self._current.get((i, key)) != pipeline_fingerprint(key) for key in keys)]
+        if not pending or not keys:
+            return {}
+        try:
+            rows = self._query(f"""
+                SELECT m.entity_id, m.key, s.fingerprint
+                FROM metadata_entries m
+                LEFT JOIN derived_metadata_stamps s ON s.entity_id = m.entity_id AND s.key = m.key
+                WHERE m.entity_id IN ({self._placeholders(len(pending))})
+                  AND m.key IN ({self._placeholders(len(keys))})
+                  AND m.value IS NOT NULL
+            """, (*pending, *keys))
+        except Exception as e:
+            logger.debug(f"Derived metadata stamps unavailable: {e}")
+            return {}
+
+        stale: Dict[str, Set[int]] = defaultdict(set)
+        for entity_id, key, fingerprint in rows:
+            if fingerprint != pipeline_fingerprint(key):
+                stale[key].add(int(entity_id))
+        self._remember((i, key) for i in pending for key in keys if i not in stale.get(key, ()))
+        return dict(stale)
+
+    def has_stale(self, entity_id: int, stage: str) -> bool:
+        """Whether an entity holds a stale value produced by ``stage``."""
+        return bool(self.stale([entity_id], stage_keys(stage)))
+
+    def stats(self, keys: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Per key: current fingerprint and counts of current, stale and unversioned values."""
+        stats = {}
+        for key in keys or DERIVED_KEYS:
+            fingerprint = pipeline_fingerprint(key)
+            try:
+                rows = self._query("""
+                    SELECT COUNT(*),
+                           SUM(CASE WHEN s.fingerprint = %s THEN 1 ELSE 0 END),
+                           SUM(CASE WHEN s.fingerprint IS NULL THEN 1 ELSE 0 END)
+                    FROM metadata_entries m
+                    LEFT JOIN derived_metadata_stamps s ON s.entity_id = m.entity_id AND s.key = m.key
+                    WHERE m.key = %s AND m.value IS NOT NULL
+                """, (fingerprint, key))
+            except Exception as e:
+                logger.debug(f"Derived metadata stamps unavailable: {e}")
+                rows = self._query("SELECT COUNT(*), 0, COUNT(*) FROM metadata_entries WHERE key = %s", (key,))
+            total, current, unversioned = (int(value or 0) for value in rows[0])
+            stats[key] = {
+                'stage': DERIVED_KEYS[key],
+                'fingerprint': fingerprint,
+                'values': total,
+                'current': current,
+                'stale': total - current,
+                'unversioned': unversioned,
+            }
+        return stats
+
+    # ------------------------------------------------------------------
+    # Recomputation
+    # ------------------------------------------------------------------
+
+    def enqueue(self, stage: str, entity_ids: Iterable[int]) -> int:
+        """Schedule stale entities for background recompute by the ``stage`` worker."""
+        if stage not in QUEUED_STAGES:
+            return 0
+        with self._lock:
+            ids = [int(i) for i in entity_ids if (stage, int(i)) not in self._enqueued]
+            if len(self._enqueued) > CURRENT_CACHE_SIZE:
+                self._enqueued.clear()
+            self._enqueued.update((stage, i) for i in ids)
+        if not ids:
+            return 0
+        try:
+            queued = self.ledger.requeue(stage, ids, reason='stale derived metadata')
+        except Exception as e:
+            logger.warning(f"Could not enqueue {len(ids)} stale '{stage}' entities: {e}")
+            with self._lock:
+                self._enqueued.difference_update((stage, i) for i in ids)
+            return 0
+        self.refresh_stats['enqueued'] += queued
+        return queued
+
+    def enqueue_stale(self, stage: str, limit: int = 10000) -> int:
+        """Enqueue the newest ``limit`` entities holding stale values of ``stage``."""
+        keys = stage_keys(stage)
+        clauses = ' OR '.join(['(m.key = %s AND (s.fingerprint IS NULL OR s.fingerprint <> %s))'] * len(keys))
+        rows = self._query(f"""
+            SELECT DISTINCT m.entity_id FROM metadata_entries m
+            LEFT JOIN derived_metadata_stamps s ON s.entity_id = m.entity_id AND s.key = m.key
+            WHERE m.value IS NOT NULL AND ({clauses})
+            ORDER BY m.entity_id DESC LIMIT %s
+        """, (*[value for key in keys for value in (key, pipeline_fingerprint(key))], limit))
+        return self.enqueue(stage, [row[0] for row in rows])
+
+    def recompute(self, entity_ids: Sequence[int]) -> Dict[int, Dict[str, str]]:
+        """Recompute ``tasks``/``category`` of ``entity_ids`` within the inline budget.
+
+        Inputs are loaded from the database, so the values match what the
+        worker and backfill compute for the same screenshots.
+
+        Returns:
+            New values by entity id, written and stamped; entities beyond the
+            budget are left out
+        """
+        from autotasktracker.core.backfill import TASK_INPUT_KEYS, compute_chunk
+        deadline = time.perf_counter() + self.inline_budget_ms / 1000.0
+        entity_ids = list(entity_ids)[:max(self.inline_budget, 0)]
+        values: List[Tuple[int, str, str]] = []
+        for start in range(0, len(entity_ids), INLINE_BATCH):
+            if time.perf_counter() >= deadline:
+                break
+            items = self.ledger.fetch_work_items(entity_ids[start:start + INLINE_BATCH], list(TASK_INPUT_KEYS))
+            values.extend(compute_chunk('tasks', items))
+        if not values:
+            return {}
+        self.write(values)
+        recomputed: Dict[int, Dict[str, str]] = defaultdict(dict)
+        for entity_id, key, value in values:
+            recomputed[entity_id][key] = value
+        self.refresh_stats['recomputed'] += len(recomputed)
+        return dict(recomputed)
+
+    def refresh(self, rows: Sequence[Mapping[str, Any]], columns: Mapping[str, str],
+                inline: bool = True) -> Dict[int, Dict[str, Any]]:
+        """Detect stale derived values in a result set and recompute or enqueue them.
+
+        Args:
+            rows: Result rows with ``id`` and the ``columns``
+            columns: Result column -> derived metadata key
+            inline: Recompute cheap stages inline (within budget); when False
+                every stale row is enqueued
+
+        Returns:
+            Replacement values by entity id (result column -> value)
+        """
+        columns = {column: key for column, key in columns.items() if key in DERIVED_KEYS}
+        ids = [int(row['id']) for row in rows
+               if row.get('id') is not None and any(_present(row.get(column)) for column in columns)]
+        if not ids:
+            return {}
+        stale = self.stale(ids, list(columns.values()))
+        self.refresh_stats['checked'] += len(ids)
+        if not stale:
+            return {}
+
+        by_stage: Dict[str, Set[int]] = defaultdict(set)
+        for key, entity_ids in stale.items():
+            by_stage[DERIVED_KEYS[key]].update(entity_ids)
+        self.refresh_stats['stale'] += len(set().union(*by_stage.values()))
+
+        updates: Dict[int, Dict[str, Any]] = {}
+        if inline and by_stage.get('tasks') and 'tasks' in INLINE_STAGES:
+            entity_ids = sorted(by_stage['tasks'], reverse=True)
+            try:
+                recomputed = self.recompute(entity_ids)
+            except Exception as e:
+                logger.warning(f"Inline recompute of {len(entity_ids)} stale rows failed: {e}")
+                recomputed = {}
+            for entity_id, values in recomputed.items():
+                updates[entity_id] = {column: values[key] for column, key in columns.items() if key in values}
+            self._remember((entity_id, key) for entity_id, values in recomputed.items() for key in values)
+            by_stage['tasks'] -= set(recomputed)
+
+        for stage, entity_ids in by_stage.items():
+            if entity_ids:
+                self.enqueue(stage, entity_ids)
+        return updates
+
+
+_trackers: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+_trackers_lock = threading.Lock()
+
+
+def get_derived_versions(db_manager=None) -> DerivedVersions:
+    """Get the version tracker for a database manager (default: the shared one)."""
+    if db_manager is None:
+        from autotasktracker.core.database import get_default_db_manager
+        db_manager = get_default_db_manager()
+    with _trackers_lock:
+        tracker = _trackers.get(db_manager)
+        if tracker is None:
+            tracker = DerivedVersions(db_manager)
+            _trackers[db_manager] = tracker
+    return tracker
+
+
+def stamp_derived(entity_id, keys: Sequence[str], db_manager=None):
+    """Stamp freshly written values; failures are logged, never raised."""
+    try:
+        get_derived_versions(db_manager).stamp([int(entity_id)], keys)
+    except Exception as e:
+        logger.warning(f"Could not stamp {', '.join(keys)} of entity {entity_id}: {e}")
+
+
+def refresh_rows(db_manager, rows: Sequence[Mapping[str, Any]], columns: Mapping[str, str],
+                 inline: bool = True) -> Dict[int, Dict[str, Any]]:
+    """``DerivedVersions.refresh`` for ``db_manager``; empty on any error."""
+    try:
+        return get_derived_versions(db_manager).refresh(rows, columns, inline=inline)
+    except Exception as e:
+        logger.debug(f"Derived metadata refresh unavailable: {e}")
+        return {}
+
+
+def refresh_frame(db_manager, df: pd.DataFrame, columns: Mapping[str, str]) -> pd.DataFrame:
+    """Copy of ``df`` with stale derived columns recomputed; returns ``df`` unchanged when nothing was."""
+    if df.empty or 'id' not in df.columns or not any(column in df.columns for column in columns):
+        return df
+    wanted = ['id', *[column for column in columns if column in df.columns]]
+    updates = refresh_rows(db_manager, df[wanted].to_dict('records'),
+                           {column: key for column, key in columns.items() if column in df.columns})
+    if not updates:
+        return df
+    df = df.copy()
+    for column in {column for values in updates.values() for column in values}:
+        replacements = {entity_id: values[column] for entity_id, values in updates.items() if column in values}
+        df[column] = [replacements.get(int(entity_id), value) for entity_id, value in zip(df['id'], df[column])]
+    return df
@@ -0,0 +1,765 @@
+"""
+Streaming export engine.
+
+Dashboard exports used to build the whole file in memory inside the
+Streamlit process. This module streams instead: a keyset cursor pages
+through ``entities`` in capture order (``created_at``, then id), a row formatter turns each page into
+export rows, and a chunked writer appends them to the output file:
+
+    CSV / JSONL: one file, flushed and fsynced after every page
+    Parquet:     a directory of part files with zstd row groups and
+                 dictionary-encoded text columns, readable as one dataset
+                 with ``pyarrow.parquet.read_table(path)``
+
+After every durable write a sidecar ``<output>.progress.json`` records the
+cursor position and how much output is committed, so an interrupted export
+resumes where it stopped instead of starting over. Exports run from the CLI
+(``autotask process export``) or as background jobs started by the
+dashboards, which poll the sidecar for progress and link to the file.
+"""
+
+import csv
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from autotasktracker.core.text_index import ocr_plain_text
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'parquet')
+EXPORT_KINDS = ('task_groups', 'screenshots')
+FILE_EXTENSIONS = {'csv': 'csv', 'jsonl': 'jsonl', 'parquet': 'parquet'}
+
+SCREENSHOT_COLUMNS = ('id', 'timestamp', 'window_title', 'tasks', 'category', 'filepath', 'ocr_text')
+TASK_GROUP_COLUMNS = ('Date', 'Task Group', 'Duration', 'Start Time', 'End Time',
+                      'Category', 'Description', 'Activities', 'Confidence')
+
+# Parquet column types; unlisted columns are strings
+_COLUMN_TYPES = {'id': 'int64', 'timestamp': 'timestamp', 'Activities': 'int64'}
+# Low-cardinality columns stored with dictionary encoding
+DICTIONARY_COLUMNS = ('window_title', 'tasks', 'category', 'Date', 'Task Group', 'Category', 'Confidence')
+
+PROGRESS_SUFFIX = '.progress.json'
+
+
+def confidence_label(duration_minutes: float) -> str:
+    """Confidence level the task export assigns to a group of this duration."""
+    if duration_minutes >= 2:
+        return "High"
+    elif duration_minutes >= 1:
+        return "Medium"
+    return "Low"
+
+
+def task_group_row(group: Any, date_format: str = "%Y-%m-%d", time_format: str = "%H:%M",
+                   max_description_length: int = 100) -> List[Any]:
+    """One task export row (``TASK_GROUP_COLUMNS``) for a TaskGroup."""
+    # Build description from the first three tasks
+    activities = []
+    for task in group.tasks[:3]:
+        if hasattr(task, 'title') and task.title:
+            activities.append(task.title.strip())
+        elif hasattr(task, 'description') and task.description:
+            activities.append(task.description.strip())
+
+    description = "; ".join(activities)
+    if len(description) > max_description_length:
+        description = description[:max_description_length] + "..."
+
+    return [
+        group.start_time.strftime(date_format),
+        group.window_title or "Unknown",
+        f"{group.duration_minutes}min",
+        group.start_time.strftime(time_format),
+        group.end_time.strftime(time_format),
+        group.category or "Uncategorized",
+        description,
+        len(group.tasks),
+        confidence_label(group.duration_minutes),
+    ]
+
+
+def progress_path(output_path) -> Path:
+    """Sidecar file holding an export's checkpoint and progress."""
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.name + PROGRESS_SUFFIX)
+
+
+def read_progress(output_path) -> Optional['ExportProgress']:
+    """Progress of the export writing ``output_path``, if one was started."""
+    try:
+        with open(progress_path(output_path)) as f:
+            return ExportProgress.from_dict(json.load(f))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, TypeError) as e:
+        logger.warning(f"Unreadable export progress for {output_path}: {e}")
+        return None
+
+
+def _cursor_text(value) -> Optional[str]:
+    """A ``created_at`` value as checkpoint text; SQLite's stored text is kept verbatim."""
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat(sep=' ')
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+@dataclass
+class ExportRequest:
+    """What to export and where."""
+    start: datetime
+    end: datetime
+    output_path: str
+    format: str = 'csv'
+    kind: str = 'task_groups'
+    categories: Optional[List[str]] = None
+    batch_size: int = 5000
+    # Parquet layout
+    row_group_size: int = 50000
+    rows_per_part: int = 500000
+    # Hours to add to the local start/end to reach the stored UTC created_at;
+    # exported times are shifted back by the same amount
+    utc_offset_hours: float = 0
+    # Task group formatting, as TaskRepository.get_task_groups
+    min_duration_minutes: float = 0.5
+    gap_threshold_minutes: float = 15
+    date_format: str = "%Y-%m-%d"
+    time_format: str = "%H:%M"
+    max_description_length: int = 100
+
+    def validate(self):
+        if self.format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {self.format}")
+        if self.kind not in EXPORT_KINDS:
+            raise ValueError(f"Unknown export kind: {self.kind}")
+        if self.format == 'parquet' and not PARQUET_AVAILABLE:
+            raise ValueError("Parquet export requires pyarrow")
+        if self.end < self.start:
+            raise ValueError("Export range ends before it starts")
+        if self.batch_size < 1 or self.row_group_size < 1 or self.rows_per_part < 1:
+            raise ValueError("Batch, row group and part sizes must be positive")
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return TASK_GROUP_COLUMNS if self.kind == 'task_groups' else SCREENSHOT_COLUMNS
+
+    def fingerprint(self) -> Dict[str, Any]:
+        """Everything that shapes the output; a checkpoint only resumes an identical request."""
+        data = asdict(self)
+        data.pop('batch_size')
+        data['start'], data['end'] = self.start.isoformat(), self.end.isoformat()
+        return data
+
+
+@dataclass
+class ExportProgress:
+    """Checkpoint and progress of one export, as stored in its sidecar file."""
+    output_path: str
+    format: str
+    kind: str
+    status: str = 'pending'  # pending, running, paused, done, failed
+    # Cursor: (created_at, id) of the last screenshot whose rows are committed
+    last_timestamp: Optional[str] = None
+    last_id: int = 0
+    rows_read: int = 0
+    rows_written: int = 0
+    total_rows: Optional[int] = None
+    writer_state: Dict[str, Any] = field(default_factory=dict)
+    request: Dict[str, Any] = field(default_factory=dict)
+    started_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def fraction(self) -> float:
+        if self.status == 'done':
+            return 1.0
+        if not self.total_rows:
+            return 0.0
+        return min(1.0, self.rows_read / self.total_rows)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'failed')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ExportProgress':
+        return cls(**data)
+
+
+# ----------------------------------------------------------------------
+# Row formatters
+# ----------------------------------------------------------------------
+
+class ScreenshotFormatter:
+    """One export row per screenshot."""
+
+    def __init__(self, request: ExportRequest):
+        self.categories = set(request.categories) if request.categories else None
+        self.offset = timedelta(hours=request.utc_offset_hours)
+        self.settled: Tuple[Optional[str], int] = (None, 0)
+
+    def format(self, rows: Sequence[tuple]) -> List[Dict[str, Any]]:
+        out = []
+        for entity_id, created_at, filepath, window_title, tasks, category, ocr in rows:
+            self.settled = (_cursor_text(created_at), entity_id)
+            if self.categories is not None and category not in self.categories:
+                continue
+            timestamp = _parse_timestamp(created_at)
+            out.append({
+                'id': entity_id,
+                'timestamp': timestamp - self.offset if timestamp is not None else None,
+                'window_title': window_title,
+                'tasks': tasks,
+                'category': category,
+                'filepath': filepath,
+                'ocr_text': ocr_plain_text(ocr) or None,
+            })
+        return out
+
+    def finish(self) -> List[Dict[str, Any]]:
+        return []
+
+
+class TaskGroupFormatter:
+    """Task export rows, grouped across pages as ``TaskRepository._group_sorted_tasks``.
+
+    The group still open at the end of a page is carried into the next one.
+    ``settled`` is the cursor of the last screenshot whose group is complete:
+    resuming after it rebuilds the open group from its first screenshot.
+    """
+
+    def __init__(self, request: ExportRequest):
+        from autotasktracker.dashboards.data.core.window_normalizer import get_window_normalizer
+        from autotasktracker.dashboards.data.models import Task, TaskGroup
+        from autotasktracker.core.categorizer import extract_window_title
+        self._task, self._group = Task, TaskGroup
+        self._window_title = extract_window_title
+        self._normalize = get_window_normalizer().normalize
+        self.request = request
+        self.categories = set(request.categories) if request.categories else None
+        self.offset = timedelta(hours=request.utc_offset_hours)
+        self._normalized: Dict[str, str] = {}
+        self._current: Optional[Dict[str, Any]] = None
+        self.settled: Tuple[Optional[str], int] = (None, 0)
+
+    def format(self, rows: Sequence[tuple]) -> List[List[Any]]:
+        out = []
+        for entity_id, created_at, filepath, active_window, tasks, category, _ in rows:
+            timestamp = _parse_timestamp(created_at)
+            if timestamp is None:
+                continue
+            window_title = self._window_title(active_window or '') or active_window or 'Unknown'
+            task = self._task(id=entity_id, title=tasks or window_title, category=category or 'Other',
+                              timestamp=timestamp - self.offset, duration_minutes=5,
+                              window_title=window_title, screenshot_path=filepath)
+            self._add(task, (_cursor_text(created_at), entity_id), out)
+        return out
+
+    def finish(self) -> List[List[Any]]:
+        out = []
+        if self._current is not None:
+            self._flush(out)
+        return out
+
+    def _add(self, task, cursor: Tuple[str, int], out: List[List[Any]]):
+        normalized = self._normalized.get(task.window_title)
+        if normalized is None:
+            normalized = self._normalize(task.window_title)
+            self._normalized[task.window_title] = normalized
+
+        group = self._current
+        if (group is not None and normalized == group['normalized_window'] and
+                (task.timestamp - group['end_time']).total_seconds() / 60 <= self.request.gap_threshold_minutes):
+            group['end_time'] = task.timestamp
+            group['tasks'].append(task)
+            group['cursor'] = cursor
+            return
+
+        if group is not None:
+            self._flush(out)
+        self._current = {
+            'normalized_window': normalized,
+            'category': task.category,
+            'start_time': task.timestamp,
+            'end_time': task.timestamp,
+            'tasks': [task],
+            'cursor': cursor,
+        }
+
+    def _flush(self, out: List[List[Any]]):
+        group, self._current = self._current, None
+        self.settled = group['cursor']
+        duration = (group['end_time'] - group['start_time']).total_seconds() / 60
+        if duration < self.request.min_duration_minutes and len(group['tasks']) < 3:
+            return
+        task_group = self._group(
+            window_title=group['normalized_window'],
+            category=group['category'],
+            start_time=group['start_time'],
+            end_time=group['end_time'],
+            duration_minutes=max(duration, len(group['tasks']) * 0.25),
+            task_count=len(group['tasks']),
+            tasks=group['tasks'],
+        )
+        if self.categories is not None and task_group.category not in self.categories:
+            return
+        out.append(task_group_row(task_group, self.request.date_format, self.request.time_format,
+                                  self.request.max_description_length))
+
+
+# ----------------------------------------------------------------------
+# Chunked writers
+# ----------------------------------------------------------------------
+
+class ExportWriter:
+    """Appends formatted rows to an export and reports what is durable.
+
+    ``commit`` returns the writer state to checkpoint once everything
+    written so far is on disk, or ``None`` while rows are still buffered.
+    """
+
+    def __init__(self, request: ExportRequest):
+        self.request = request
+        self.path = Path(request.output_path)
+        self.columns = request.columns
+
+    def open(self, state: Optional[Dict[str, Any]]):
+        raise NotImplementedError
+
+    def write(self, rows: List[Any]):
+        raise NotImplementedError
+
+    def commit(self, final: bool = False) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def _values(self, row) -> List[Any]:
+        return [row.get(column) for column in self.columns] if isinstance(row, dict) else list(row)
+
+
+class _FileWriter(ExportWriter):
+    """Single-file writer; resuming truncates to the last committed offset."""
+
+    def open(self, state):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if state and self.path.exists():
+            self._file = open(self.path, 'r+', newline='', encoding='utf-8')
+            self._file.truncate(state['bytes'])
+            self._file.seek(state['bytes'])
+        else:
+            self._file = open(self.path, 'w', newline='', encoding='utf-8')
+            self._start()
+
+    def _start(self):
+        pass
+
+    def commit(self, final=False):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return {'bytes': self._file.tell()}
+
+    def close(self):
+        if getattr(self, '_file', None) is not None:
+            self._file.close()
+            self._file = None
+
+
+class CSVExportWriter(_FileWriter):
+    def _start(self):
+        csv.writer(self._file).writerow(self.columns)
+
+    def write(self, rows):
+        csv.writer(self._file).writerows(
+            ['' if value is None else value for value in self._values(row)] for row in rows
+        )
+
+
+class JSONLExportWriter(_FileWriter):
+    def write(self, rows):
+        self._file.writelines(
+            json.dumps(dict(zip(self.columns, self._values(row))), default=str, ensure_ascii=False) + '\n'
+            for row in rows
+        )
+
+
+class ParquetExportWriter(ExportWriter):
+    """Directory of Parquet part files.
+
+    Rows are buffered into row groups of ``row_group_size``; a part file is
+    closed (and becomes durable) every ``rows_per_part`` rows. Parts are
+    written under a temporary name and renamed when complete.
+    """
+
+    def __init__(self, request):
+        super().__init__(request)
+        types = {'int64': pa.int64(), 'timestamp': pa.timestamp('us'), 'string': pa.string()}
+        self.schema = pa.schema([(c, types[_COLUMN_TYPES.get(c, 'string')]) for c in self.columns])
+        self._buffer: List[List[Any]] = []
+        self._writer = None
+        self._part_rows = 0
+
+    def _part_path(self, index: int) -> Path:
+        return self.path / f"part-{index:05d}.parquet"
+
+    def open(self, state):
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.parts = state['parts'] if state else 0
+        # Drop incomplete parts and any written after the checkpoint
+        for stale in self.path.glob('*.parquet*'):
+            name = stale.name
+            if name.endswith('.tmp') or (name.startswith('part-') and int(name[5:10]) >= self.parts):
+                stale.unlink()
+
+    def write(self, rows):
+        self._buffer.extend(self._values(row) for row in rows)
+        while len(self._buffer) >= self.request.row_group_size:
+            chunk = self._buffer[:self.request.row_group_size]
+            del self._buffer[:self.request.row_group_size]
+            self._write_row_group(chunk)
+
+    def _write_row_group(self, rows):
+        if self._writer is None:
+            self._tmp_path = self._part_path(self.parts).with_suffix('.parquet.tmp')
+            dictionary = [c for c in self.columns if c in DICTIONARY_COLUMNS]
+            self._writer = pq.ParquetWriter(self._tmp_path, self.schema, compression='zstd',
+                                            use_dictionary=dictionary)
+        columns = list(zip(*rows)) or [()] * len(self.columns)
+        table = pa.Table.from_arrays(
+            [pa.array(values, type=self.schema.field(i).type) for i, values in enumerate(columns)],
+            schema=self.schema
+        )
+        self._writer.write_table(table, row_group_size=max(len(rows), 1))
+        self._part_rows += len(rows)
+
+    def commit(self, final=False):
+        if not final and self._part_rows + len(self._buffer) < self.request.rows_per_part:
+            return None
+        if self._buffer or (final and self.parts == 0 and self._writer is None):
+            # The part's last row group may be short; an empty export still gets a schema
+            self._write_row_group(self._buffer)
+            self._buffer = []
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            os.replace(self._tmp_path, self._part_path(self.parts))
+            self.parts += 1
+            self._part_rows = 0
+        return {'parts': self.parts}
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+WRITERS = {'csv': CSVExportWriter, 'jsonl': JSONLExportWriter, 'parquet': ParquetExportWriter}
+
+
+# ----------------------------------------------------------------------
+# Engine
+# ----------------------------------------------------------------------
+
+_EXPORT_PAGE_SQL = """
+    SELECT e.id, e.created_at, e.filepath, w.value, t.value, c.value, {ocr}
+    FROM entities e
+    LEFT JOIN metadata_entries w ON w.entity_id = e.id AND w.key = 'active_window'
+    LEFT JOIN metadata_entries t ON t.entity_id = e.id AND t.key = 'tasks'
+    LEFT JOIN metadata_entries c ON c.entity_id = e.id AND c.key = 'category'
+    {ocr_join}
+    WHERE (e.created_at > %s OR (e.created_at = %s AND e.id > %s)) AND e.created_at <= %s
+    ORDER BY e.created_at, e.id
+    LIMIT %s
+"""
+
+
+class ExportEngine:
+    """Stream an export from the database to disk with resumable checkpoints.
+
+    Works against any manager exposing ``get_connection()`` and
+    ``get_database_type()``.
+    """
+
+    def __init__(self, db_manager=None):
+        """
+        Args:
+            db_manager: Database manager; defaults to a new DatabaseManager
+        """
+        if db_manager is None:
+            from autotasktracker.core.database import DatabaseManager
+            db_manager = DatabaseManager(use_pensieve_api=False)
+        self.db = db_manager
+
+    @property
+    def is_sqlite(self) -> bool:
+        get_type = getattr(self.db, 'get_database_type', None)
+        return bool(get_type) and get_type() == 'sqlite'
+
+    def _sql(self, query: str) -> str:
+        """Adapt a ``%s``-style query to the connection's parameter style."""
+        if self.is_sqlite:
+            return query.replace('%s', '?')
+        return query
+
+    def _bound(self, value: datetime):
+        # SQLite stores timestamps as ISO text
+        return value.isoformat(sep=' ') if self.is_sqlite else value
+
+    def _range(self, request: ExportRequest) -> Tuple[Any, Any]:
+        """The request's local range as stored ``created_at`` bounds."""
+        offset = timedelta(hours=request.utc_offset_hours)
+        return self._bound(request.start + offset), self._bound(request.end + offset)
+
+    def _after(self, request: ExportRequest, cursor: Tuple[Optional[str], int]) -> Tuple[Any, int]:
+        """Keyset position to page from; no cursor starts at the range start."""
+        timestamp, entity_id = cursor
+        if timestamp is None:
+            return self._range(request)[0], 0
+        return (timestamp if self.is_sqlite else _parse_timestamp(timestamp)), entity_id
+
+    def _query(self, query: str, params) -> List[tuple]:
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(self._sql(query), params)
+                return [tuple(row) for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+
+    def count(self, request: ExportRequest, cursor: Tuple[Optional[str], int] = (None, 0)) -> int:
+        """Screenshots in the export range after ``cursor``, for progress reporting."""
+        after, after_id = self._after(request, cursor)
+        rows = self._query(
+            "SELECT COUNT(*) FROM entities e "
+            "WHERE (e.created_at > %s OR (e.created_at = %s AND e.id > %s)) AND e.created_at <= %s",
+            (after, after, after_id, self._range(request)[1])
+        )
+        return int(rows[0][0]) if rows else 0
+
+    def pages(self, request: ExportRequest,
+              cursor: Tuple[Optional[str], int] = (None, 0)) -> Iterator[List[tuple]]:
+        """Keyset-paginated screenshot rows ``(id, created_at, filepath, window, tasks, category, ocr)``
+        in capture order, starting after ``cursor`` ``(created_at, id)``."""
+        if request.kind == 'screenshots':
+            query = _EXPORT_PAGE_SQL.format(
+                ocr='o.value',
+                ocr_join="LEFT JOIN metadata_entries o ON o.entity_id = e.id AND o.key = 'ocr_result'")
+        else:
+            query = _EXPORT_PAGE_SQL.format(ocr='NULL', ocr_join='')
+        after, after_id = self._after(request, cursor)
+        end = self._range(request)[1]
+        while True:
+            rows = self._query(query, (after, after, after_id, end, request.batch_size))
+            if not rows:
+                return
+            yield rows
+            after_id, after = rows[-1][0], rows[-1][1]
+            if len(rows) < request.batch_size:
+                return
+
+    def run(self, request: ExportRequest, resume: bool = True,
+            on_progress: Optional[Callable[[ExportProgress], None]] = None,
+            should_stop: Optional[Callable[[], bool]] = None) -> ExportProgress:
+        """Run (or resume) an export.
+
+        Args:
+            request: What to export
+            resume: Continue from a matching checkpoint instead of starting over
+            on_progress: Called with the progress after every page
+            should_stop: Polled between pages; returning True pauses the export
+
+        Returns:
+            Final progress: ``done``, ``paused`` or ``failed``
+        """
+        request.validate()
+        progress = read_progress(request.output_path) if resume else None
+        if progress is not None and progress.request != request.fingerprint():
+            logger.info(f"Export request for {request.output_path} changed; starting over")
+            progress = None
+        if progress is not None and progress.status == 'done':
+            return progress
+        if progress is None:
+            progress = ExportProgress(output_path=str(request.output_path), format=request.format,
+                                      kind=request.kind, request=request.fingerprint(),
+                                      started_at=datetime.now().isoformat())
+
+        if progress.total_rows is None:
+            progress.total_rows = self.count(request)
+        cursor = (progress.last_timestamp, progress.last_id)
+        progress.rows_read = progress.total_rows - self.count(request, cursor) if progress.last_id else 0
+        progress.status, progress.error = 'running', None
+
+        formatter = TaskGroupFormatter(request) if request.kind == 'task_groups' else ScreenshotFormatter(request)
+        formatter.settled = cursor
+        writer = WRITERS[request.format](request)
+        # (cursor, rows written, writer state) that is durable on disk
+        checkpoint = (cursor, progress.rows_written, progress.writer_state)
+        rows_written = progress.rows_written
+        try:
+            writer.open(progress.writer_state or None)
+            self._save(progress, checkpoint)
+            for page in self.pages(request, cursor):
+                out = formatter.format(page)
+                writer.write(out)
+                rows_written += len(out)
+                progress.rows_read += len(page)
+                state = writer.commit()
+                if state is not None:
+                    checkpoint = (formatter.settled, rows_written, state)
+                self._save(progress, checkpoint)
+                if on_progress:
+                    on_progress(progress)
+                if should_stop and should_stop():
+                    progress.status = 'paused'
+                    break
+            else:
+                out = formatter.finish()
+                writer.write(out)
+                rows_written += len(out)
+                checkpoint = (formatter.settled, rows_written, writer.commit(final=True))
+                progress.status = 'done'
+        except Exception as e:
+            logger.error(f"Export to {request.output_path} failed: {e}")
+            progress.status, progress.error = 'failed', str(e)
+        finally:
+            writer.close()
+
+        self._save(progress, checkpoint)
+        if on_progress:
+            on_progress(progress)
+        return progress
+
+    @staticmethod
+    def _save(progress: ExportProgress, checkpoint: Tuple[Tuple[Optional[str], int], int, Dict[str, Any]]):
+        """Record the durable checkpoint and write the sidecar atomically.
+
+        Only what the writer has committed is recorded, so a resume never
+        skips or repeats rows; ``rows_read`` stays live for progress bars.
+        """
+        (progress.last_timestamp, progress.last_id), progress.rows_written, progress.writer_state = checkpoint
+        progress.updated_at = datetime.now().isoformat()
+        path = progress_path(progress.output_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(progress.to_dict(), f)
+        os.replace(tmp, path)
+
+
+# ----------------------------------------------------------------------
+# Background jobs
+# ----------------------------------------------------------------------
+
+def default_output_path(kind: str, format: str, export_dir=None) -> str:
+    """Timestamped output path in the configured exports directory."""
+    if export_dir is None:
+        from autotasktracker.config import get_config
+        export_dir = get_config().get_exports_path()
+    filename = f"{kind}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{FILE_EXTENSIONS[format]}"
+    return str(Path(export_dir) / filename)
+
+
+class ExportJobs:
+    """Run exports on background threads so dashboards only trigger them.
+
+    Jobs are keyed by output path. Progress is read from the sidecar file,
+    so exports started by another process (or the CLI) report too.
+    """
+
+    def __init__(self, engine: Optional[ExportEngine] = None):
+        self._engine = engine
+        self._lock = threading.Lock()
+        self._threads: Dict[str, threading.Thread] = {}
+        self._stop: Dict[str, threading.Event] = {}
+
+    @property
+    def engine(self) -> ExportEngine:
+        if self._engine is None:
+            self._engine = ExportEngine()
+        return self._engine
+
+    def start(self, request: ExportRequest, resume: bool = True) -> str:
+        """Start (or resume) an export in the background; returns its output path."""
+        request.validate()
+        key = str(request.output_path)
+        with self._lock:
+            thread = self._threads.get(key)
+            if thread is not None and thread.is_alive():
+                return key
+            stop = threading.Event()
+            thread = threading.Thread(target=self._run, args=(request, resume, stop),
+                                      name=f"export-{Path(key).name}", daemon=True)
+            self._threads[key], self._stop[key] = thread, stop
+            thread.start()
+        return key
+
+    def _run(self, request: ExportRequest, resume: bool, stop: threading.Event):
+        started = time.time()
+        progress = self.engine.run(request, resume=resume, should_stop=stop.is_set)
+        logger.info(f"Export {request.output_path} {progress.status}: {progress.rows_written} rows "
+                    f"in {time.time() - started:.1f}s")
+
+    def status(self, output_path) -> Optional[ExportProgress]:
+        return read_progress(output_path)
+
+    def is_running(self, output_path) -> bool:
+        thread = self._threads.get(str(output_path))
+        return thread is not None and thread.is_alive()
+
+    def cancel(self, output_path) -> bool:
+        """Pause a running export after its current page; it can be resumed later."""
+        stop = self._stop.get(str(output_path))
+        if stop is None:
+            return False
+        stop.set()
+        return True
+
+    def wait(self, output_path, timeout: Optional[float] = None) -> Optional[ExportProgress]:
+        thread = self._threads.get(str(output_path))
+        if thread is not None:
+            thread.join(timeout)
+        return self.status(output_path)
+
+
+_export_jobs: Optional[ExportJobs] = None
+_export_jobs_lock = threading.Lock()
+
+
+def get_export_jobs() -> ExportJobs:
+    """Get the process-wide background export runner."""
+    global _export_jobs
+    if _export_jobs is None:
+        with _export_jobs_lock:
+            if _export_jobs is None:
+                _export_jobs = ExportJobs()
+    return _export_jobs
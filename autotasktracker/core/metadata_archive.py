@@ -0,0 +1,512 @@
+"""
+Tiered storage for verbose screenshot metadata.
+
+OCR payloads, VLM descriptions and embeddings are most of the bytes in
+``metadata_entries``, but dashboards only read them for recent periods;
+history is served from tasks, categories and sessions. ``MetadataArchiver``
+moves the verbose keys of screenshots older than ``METADATA_ARCHIVE_DAYS``
+out of the hot table into Parquet files, one directory per capture month:
+
+    <ARCHIVE_DIR>/metadata/2024-05/part-<first id>-<last id>-<run>.parquet
+
+Parts are zstd-compressed, sorted by entity id and written with row group
+statistics, so reading one entity touches a single row group. The
+``metadata_archive_parts`` manifest records each part's entity id range.
+A part is listed in the manifest in the same transaction that deletes its
+rows from ``metadata_entries``; a part written by a run that failed before
+committing is not listed, is never read and is removed by the next run.
+
+Reads fall through to the archive: ``get_entity_metadata`` and
+``fill_frame`` add archived values for entities whose hot rows are gone,
+so drill-down into old screenshots keeps working. The full-text index
+keeps the OCR text it extracted, and ``TextIndex.backfill``/``rebuild``
+read it back from the archive, so archived screenshots stay searchable by
+text. Semantic search (``semantic_search``, ``VectorRetriever``) reads
+embeddings from hot rows only: archived screenshots drop out of it.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+import weakref
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from autotasktracker.core.exceptions import DatabaseError
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Verbose keys moved to the archive; everything else (tasks, categories,
+# windows, sessions) stays hot for rollups
+ARCHIVED_KEYS = (
+    'ocr_result',
+    'ocr_text',
+    'vlm_structured',
+    'vlm_description',
+    'minicpm_v_result',
+    'vlm_result',
+    'embedding',
+)
+
+ROW_GROUP_SIZE = 20000
+
+# Parts older than this that are missing from the manifest are leftovers of failed runs
+ORPHAN_GRACE_SECONDS = 3600
+
+SCHEMA_STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS metadata_archive_parts (
+        path VARCHAR(512) PRIMARY KEY,
+        month VARCHAR(7) NOT NULL,
+        min_entity_id BIGINT NOT NULL,
+        max_entity_id BIGINT NOT NULL,
+        row_count INTEGER NOT NULL,
+        bytes BIGINT NOT NULL,
+        created_at TIMESTAMP
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_metadata_archive_parts_range
+        ON metadata_archive_parts (min_entity_id, max_entity_id)
+    """,
+]
+
+
+def _archive_schema():
+    return pa.schema([
+        ('entity_id', pa.int64()),
+        ('key', pa.string()),
+        ('value', pa.large_string()),
+        ('metadata_id', pa.int64()),
+        ('captured_at', pa.timestamp('us')),
+    ])
+
+
+def _capture_month(value) -> str:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return f"{value:%Y-%m}"
+
+
+class MetadataArchive:
+    """Archive manifest and read-through access to archived metadata.
+
+    Works against any manager exposing ``get_connection(readonly=...)`` and
+    ``get_database_type()``; SQLite stand-ins are supported for tests and
+    local setups.
+    """
+
+    def __init__(self, db_manager=None, archive_dir: Optional[str] = None, manifest_ttl: float = 60.0):
+        """
+        Args:
+            db_manager: Database manager; defaults to a new DatabaseManager
+            archive_dir: Archive root (defaults to ``ARCHIVE_DIR``)
+            manifest_ttl: Seconds the part manifest is cached for reads
+        """
+        if db_manager is None:
+            from autotasktracker.core.database import DatabaseManager
+            db_manager = DatabaseManager(use_pensieve_api=False)
+        if archive_dir is None:
+            from autotasktracker.config import get_config
+            archive_dir = get_config().get_archive_path()
+        self.db = db_manager
+        self.root = Path(archive_dir)
+        self.manifest_ttl = manifest_ttl
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        self._manifest: Optional[List[Tuple[int, int, str]]] = None
+        self._manifest_read_at = 0.0
+
+    @property
+    def is_sqlite(self) -> bool:
+        get_type = getattr(self.db, 'get_database_type', None)
+        return bool(get_type) and get_type() == 'sqlite'
+
+    def _sql(self, query: str) -> str:
+        """Adapt a ``%s``-style query to the connection's parameter style."""
+        if self.is_sqlite:
+            return query.replace('%s', '?')
+        return query
+
+    def _placeholders(self, count: int) -> str:
+        return ', '.join(['%s'] * count)
+
+    def _query(self, query: str, params: Sequence = ()) -> List[tuple]:
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(self._sql(query), tuple(params))
+                return [tuple(row) for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+
+    def ensure_schema(self):
+        """Create the manifest table if missing."""
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            try:
+                with self.db.get_connection(readonly=False) as conn:
+                    cursor = conn.cursor()
+                    for statement in SCHEMA_STATEMENTS:
+                        cursor.execute(statement)
+                    conn.commit()
+                    cursor.close()
+                self._schema_ready = True
+            except Exception as e:
+                logger.error(f"Failed to create metadata archive schema: {e}")
+                raise DatabaseError(f"Metadata archive schema creation failed: {e}") from e
+
+    # ------------------------------------------------------------------
+    # Manifest
+    # ------------------------------------------------------------------
+
+    def _read_manifest(self) -> List[Tuple[int, int, str]]:
+        self.ensure_schema()
+        rows = self._query("SELECT min_entity_id, max_entity_id, path FROM metadata_archive_parts "
+                           "ORDER BY min_entity_id")
+        return [(int(lo), int(hi), path) for lo, hi, path in rows]
+
+    def manifest(self, refresh: bool = False) -> List[Tuple[int, int, str]]:
+        """(min entity id, max entity id, relative path) of every part, cached.
+
+        Empty (for ``manifest_ttl``) when the manifest cannot be read, so
+        reads fall back to hot rows only.
+        """
+        now = time.monotonic()
+        if not refresh and self._manifest is not None and now - self._manifest_read_at < self.manifest_ttl:
+            return self._manifest
+        try:
+            manifest = self._read_manifest()
+        except Exception as e:
+            logger.debug(f"Metadata archive manifest unavailable: {e}")
+            manifest = []
+        self._manifest, self._manifest_read_at = manifest, now
+        return manifest
+
+    def parts_for(self, entity_ids: Iterable[int]) -> Dict[str, List[int]]:
+        """Parts whose id range covers any of ``entity_ids``, with the ids each may hold."""
+        ids = sorted({int(i) for i in entity_ids})
+        if not ids:
+            return {}
+        parts: Dict[str, List[int]] = {}
+        for lo, hi, path in self.manifest():
+            if hi < ids[0] or lo > ids[-1]:
+                continue
+            covered = [i for i in ids if lo <= i <= hi]
+            if covered:
+                parts[path] = covered
+        return parts
+
+    def stats(self) -> Dict[str, Any]:
+        """Parts, rows and bytes archived per capture month."""
+        self.ensure_schema()
+        rows = self._query("""
+            SELECT month, COUNT(*), SUM(row_count), SUM(bytes)
+            FROM metadata_archive_parts GROUP BY month ORDER BY month
+        """)
+        months = {month: {'parts': int(parts), 'rows': int(count or 0), 'bytes': int(size or 0)}
+                  for month, parts, count, size in rows}
+        return {
+            'months': months,
+            'parts': sum(m['parts'] for m in months.values()),
+            'rows': sum(m['rows'] for m in months.values()),
+            'bytes': sum(m['bytes'] for m in months.values()),
+        }
+
+    # ------------------------------------------------------------------
+    # Read-through
+    # ------------------------------------------------------------------
+
+    def fetch(self, entity_ids: Iterable[int], keys: Optional[Sequence[str]] = None) -> Dict[int, Dict[str, str]]:
+        """Archived values by entity id and key.
+
+        Only parts whose id range covers a requested entity are opened, and
+        within a part only the row groups whose statistics match.
+        """
+        if not PARQUET_AVAILABLE:
+            return {}
+        result: Dict[int, Dict[str, str]] = {}
+        for path, ids in self.parts_for(entity_ids).items():
+            filters = [('entity_id', 'in', ids)]
+            if keys:
+                filters.append(('key', 'in', list(keys)))
+            try:
+                table = pq.read_table(self.root / path, columns=['entity_id', 'key', 'value', 'metadata_id'],
+                                      filters=filters)
+            except (OSError, pa.ArrowInvalid) as e:
+                logger.error(f"Failed to read metadata archive part {path}: {e}")
+                continue
+            rows = sorted(zip(*(table.column(name).to_pylist()
+                                for name in ('metadata_id', 'entity_id', 'key', 'value'))))
+            for _, entity_id, key, value in rows:
+                # Latest row wins, as in the hot table
+                result.setdefault(entity_id, {})[key] = value
+        return result
+
+    def get_entity_metadata(self, entity_id: int, keys: Optional[Sequence[str]] = None) -> Dict[str, str]:
+        """All metadata of one screenshot, hot rows first, archived values for the rest."""
+        query = "SELECT key, value FROM metadata_entries WHERE entity_id = %s"
+        params: List[Any] = [int(entity_id)]
+        if keys:
+            query += f" AND key IN ({self._placeholders(len(keys))})"
+            params.extend(keys)
+        metadata = {key: value for key, value in self._query(query + " ORDER BY id", params)}
+        archived = self.fetch([entity_id], keys).get(int(entity_id), {})
+        for key, value in archived.items():
+            metadata.setdefault(key, value)
+        return metadata
+
+    def fill_frame(self, df: pd.DataFrame, columns: Dict[str, str], id_column: str = 'id') -> pd.DataFrame:
+        """Fill empty ``columns`` (column -> metadata key) of ``df`` from the archive.
+
+        A no-op unless some row's entity id falls inside an archived part.
+        """
+        keys = {column: key for column, key in columns.items() if key in ARCHIVED_KEYS}
+        if df.empty or id_column not in df.columns or not keys:
+            return df
+        ids = [int(i) for i in df[id_column].dropna()]
+        if not self.parts_for(ids):
+            return df
+        archived = self.fetch(ids, sorted(set(keys.values())))
+        if not archived:
+            return df
+        df = df.copy()
+        for column, key in keys.items():
+            values = df[id_column].map(lambda i: archived.get(int(i), {}).get(key))
+            df[column] = df[column].where(df[column].notna(), values) if column in df.columns else values
+        return df
+
+    def _invalidate(self):
+        self._manifest = None
+
+
+class MetadataArchiver(MetadataArchive):
+    """Moves verbose metadata of old screenshots from ``metadata_entries`` to archive parts."""
+
+    def __init__(self, db_manager=None, archive_dir: Optional[str] = None,
+                 older_than_days: Optional[int] = None, keys: Sequence[str] = ARCHIVED_KEYS,
+                 batch_size: int = 5000):
+        """
+        Args:
+            db_manager: Database manager; defaults to a new DatabaseManager
+            archive_dir: Archive root (defaults to ``ARCHIVE_DIR``)
+            older_than_days: Archive screenshots captured longer ago than this
+                (defaults to ``METADATA_ARCHIVE_DAYS``)
+            keys: Metadata keys to move
+            batch_size: Screenshots archived per transaction
+        """
+        super().__init__(db_manager, archive_dir)
+        if older_than_days is None:
+            from autotasktracker.config import get_config
+            older_than_days = get_config().METADATA_ARCHIVE_DAYS
+        self.older_than_days = older_than_days
+        self.keys = tuple(keys)
+        self.batch_size = batch_size
+
+    def cutoff(self, now: Optional[datetime] = None) -> datetime:
+        return (now or datetime.now()) - timedelta(days=self.older_than_days)
+
+    def _bound(self, value: datetime):
+        # SQLite stores timestamps as ISO text
+        return value.isoformat(sep=' ') if self.is_sqlite else value
+
+    def candidates(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Rows and bytes that a run would move now."""
+        keys = self.keys
+        rows = self._query(f"""
+            SELECT COUNT(*), COALESCE(SUM(LENGTH(m.value)), 0)
+            FROM metadata_entries m JOIN entities e ON e.id = m.entity_id
+            WHERE m.key IN ({self._placeholders(len(keys))}) AND e.created_at < %s
+        """, (*keys, self._bound(self.cutoff(now))))
+        count, size = rows[0] if rows else (0, 0)
+        return {'rows': int(count or 0), 'bytes': int(size or 0)}
+
+    def run(self, now: Optional[datetime] = None, max_batches: Optional[int] = None,
+            on_batch=None) -> Dict[str, int]:
+        """Archive everything older than the cutoff, batch by batch.
+
+        Each batch reads the verbose rows of up to ``batch_size`` screenshots,
+        writes one part per capture month, then lists the parts and deletes
+        the rows in one transaction. Safe to interrupt and re-run.
+
+        Args:
+            now: Current time (for the cutoff)
+            max_batches: Stop after this many batches (None: until done)
+            on_batch: Called with the running totals after each batch
+
+        Returns:
+            Totals: batches, rows, bytes (compressed) and parts written
+        """
+        if self.older_than_days <= 0:
+            return {'batches': 0, 'rows': 0, 'bytes': 0, 'parts': 0}
+        if not PARQUET_AVAILABLE:
+            raise DatabaseError("Metadata archiving requires pyarrow")
+        self.ensure_schema()
+        self.remove_orphans()
+        cutoff = self._bound(self.cutoff(now))
+        totals = {'batches': 0, 'rows': 0, 'bytes': 0, 'parts': 0}
+        after_id = 0
+        while max_batches is None or totals['batches'] < max_batches:
+            window = self._next_window(after_id, cutoff)
+            if window is None:
+                break
+            written = self._archive_window(*window, cutoff)
+            after_id = window[1]
+            totals['batches'] += 1
+            for name in ('rows', 'bytes', 'parts'):
+                totals[name] += written[name]
+            if on_batch:
+                on_batch(dict(totals))
+        if totals['parts']:
+            self._invalidate()
+            logger.info(f"Archived {totals['rows']} metadata rows into {totals['parts']} parts "
+                        f"({totals['bytes']} bytes)")
+        return totals
+
+    def _next_window(self, after_id: int, cutoff) -> Optional[Tuple[int, int]]:
+        """Entity id range (exclusive, inclusive] of the next batch with verbose metadata."""
+        keys = self.keys
+        rows = self._query(f"""
+            SELECT MIN(m.entity_id) FROM metadata_entries m
+            WHERE m.entity_id > %s AND m.key IN ({self._placeholders(len(keys))})
+        """, (after_id, *keys))
+        first = rows[0][0] if rows else None
+        if first is None:
+            return None
+        rows = self._query("""
+            SELECT MAX(id) FROM (
+                SELECT id FROM entities WHERE id >= %s AND created_at < %s ORDER BY id LIMIT %s
+            ) batch
+        """, (first, cutoff, self.batch_size))
+        last = rows[0][0] if rows else None
+        if last is None:
+            return None
+        return int(first) - 1, int(last)
+
+    def _archive_window(self, after_id: int, upto_id: int, cutoff) -> Dict[str, int]:
+        keys = self.keys
+        lock = '' if self.is_sqlite else ' FOR UPDATE OF m'
+        written = {'rows': 0, 'bytes': 0, 'parts': 0}
+        with self.db.get_connection(readonly=False) as conn:
+            cursor = conn.cursor()
+            try:
+                if self.is_sqlite:
+                    cursor.execute('BEGIN IMMEDIATE')
+                cursor.execute(self._sql(f"""
+                    SELECT m.id, m.entity_id, m.key, m.value, e.created_at
+                    FROM metadata_entries m JOIN entities e ON e.id = m.entity_id
+                    WHERE m.entity_id > %s AND m.entity_id <= %s
+                      AND m.key IN ({self._placeholders(len(keys))})
+                      AND e.created_at < %s
+                    ORDER BY m.entity_id, m.key, m.id{lock}
+                """), (after_id, upto_id, *keys, cutoff))
+                rows = cursor.fetchall()
+
+                by_month: Dict[str, List[tuple]] = {}
+                for row in rows:
+                    by_month.setdefault(_capture_month(row[4]), []).append(row)
+                run_id = uuid.uuid4().hex[:8]
+                for month, month_rows in by_month.items():
+                    path, size = self._write_part(month, month_rows, run_id)
+                    cursor.execute(self._sql("""
+                        INSERT INTO metadata_archive_parts
+                            (path, month, min_entity_id, max_entity_id, row_count, bytes, created_at)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    """), (path, month, month_rows[0][1], month_rows[-1][1], len(month_rows), size,
+                           self._bound(datetime.now())))
+                    written['parts'] += 1
+                    written['bytes'] += size
+
+                ids = [row[0] for row in rows]
+                for start in range(0, len(ids), 1000):
+                    chunk = ids[start:start + 1000]
+                    cursor.execute(self._sql(
+                        f"DELETE FROM metadata_entries WHERE id IN ({self._placeholders(len(chunk))})"
+                    ), tuple(chunk))
+                conn.commit()
+                written['rows'] = len(rows)
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        return written
+
+    def _write_part(self, month: str, rows: List[tuple], run_id: str) -> Tuple[str, int]:
+        """Write one month's rows as a durable part file; returns (relative path, bytes)."""
+        relative = f"metadata/{month}/part-{rows[0][1]:012d}-{rows[-1][1]:012d}-{run_id}.parquet"
+        path = self.root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pydict({
+            'entity_id': [int(row[1]) for row in rows],
+            'key': [row[2] for row in rows],
+            'value': [row[3] for row in rows],
+            'metadata_id': [int(row[0]) for row in rows],
+            'captured_at': [datetime.fromisoformat(row[4]) if isinstance(row[4], str) else row[4]
+                            for row in rows],
+        }, schema=_archive_schema())
+        tmp = path.with_name(path.name + '.tmp')
+        pq.write_table(table, tmp, compression='zstd', use_dictionary=['key'],
+                       row_group_size=ROW_GROUP_SIZE, write_statistics=True)
+        with open(tmp, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        return relative, path.stat().st_size
+
+    def remove_orphans(self, grace_seconds: float = ORPHAN_GRACE_SECONDS) -> int:
+        """Delete part files that no manifest row lists (left by failed runs)."""
+        base = self.root / 'metadata'
+        if not base.exists():
+            return 0
+        listed = {path for _, _, path in self._read_manifest()}
+        removed = 0
+        cutoff = time.time() - grace_seconds
+        for part in base.glob('*/part-*'):
+            relative = part.relative_to(self.root).as_posix()
+            if relative not in listed and part.stat().st_mtime < cutoff:
+                part.unlink()
+                removed += 1
+        if removed:
+            logger.info(f"Removed {removed} unlisted metadata archive parts")
+        return removed
+
+
+_archives: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+_archives_lock = threading.Lock()
+
+
+def get_metadata_archive(db_manager=None) -> MetadataArchive:
+    """Get the read-through archive for a database manager (default: the shared one)."""
+    if db_manager is None:
+        from autotasktracker.core.database import get_default_db_manager
+        db_manager = get_default_db_manager()
+    with _archives_lock:
+        archive = _archives.get(db_manager)
+        if archive is None:
+            archive = MetadataArchive(db_manager)
+            _archives[db_manager] = archive
+    return archive
+
+
+def fill_archived(db_manager, df: pd.DataFrame, columns: Dict[str, str]) -> pd.DataFrame:
+    """``MetadataArchive.fill_frame`` for ``db_manager``; returns ``df`` unchanged on any error."""
+    try:
+        return get_metadata_archive(db_manager).fill_frame(df, columns)
+    except Exception as e:
+        logger.debug(f"Metadata archive read-through unavailable: {e}")
+        return df
@@ -0,0 +1,963 @@
+"""
+Monthly partitioning of ``entities`` and ``metadata_entries``.
+
+Both tables are range-partitioned on the entity id, one partition per
+calendar month: ``entities_p2024_05`` holds the screenshots captured in May
+2024 and ``metadata_entries_p2024_05`` their metadata. Entity ids are
+assigned in capture order, so each month is one contiguous id range, and
+partitioning on the id (rather than on ``created_at``) keeps ``entities(id)``
+unique and ``(entity_id, key)`` upserts working unchanged for Pensieve and
+every processor.
+
+The ``storage_partitions`` catalog records each month's id range together
+with the capture-time span of its screenshots. Time-range queries turn that
+span into an ``entity_id`` range (``entity_id_bounds``) that the planner
+uses to skip every other month's partitions, in ``entities`` and in each
+metadata join.
+
+Maintenance (``ensure_partitions``, run from worker heartbeats and
+``autotask storage partitions --maintain``) seals the open partition when a
+month ends and drops months past ``PARTITION_RETENTION_MONTHS``.
+``PartitionMigration`` converts an existing database online: it copies the
+tables into partitioned twins in batches while triggers mirror concurrent
+writes, then swaps the names in one short transaction.
+
+PostgreSQL only; on SQLite every call is a no-op.
+"""
+
+import logging
+import re
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from autotasktracker.core.exceptions import DatabaseError
+from autotasktracker.core.processing_ledger import utc_now
+
+logger = logging.getLogger(__name__)
+
+
+# Partitioned table -> entity id column it is partitioned on
+PARTITIONED_TABLES = {
+    'entities': 'id',
+    'metadata_entries': 'entity_id',
+}
+
+# Primary keys of the partitioned tables; they must include the partition key
+PRIMARY_KEYS = {
+    'entities': ('id',),
+    'metadata_entries': ('id', 'entity_id'),
+}
+
+# Unpartitioned tables keyed by entity id; retention deletes a dropped
+# month's rows from those that exist
+ENTITY_SIDE_TABLES = (
+    'entity_text_index',
+    'derived_metadata_stamps',
+    'derived_metadata_versions',
+    'screenshot_files',
+    'processing_claims',
+    'processing_failures',
+)
+
+MAX_ENTITY_ID = 2 ** 63 - 1
+# Entity id range that matches every row
+FULL_RANGE = (0, MAX_ENTITY_ID)
+
+PARTITION_SCHEMA_STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS storage_partitions (
+        month DATE PRIMARY KEY,
+        first_entity_id BIGINT NOT NULL,
+        end_entity_id BIGINT,
+        min_created_at TIMESTAMP,
+        max_created_at TIMESTAMP,
+        sealed_at TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS storage_partition_migration (
+        table_name VARCHAR(64) PRIMARY KEY,
+        last_id BIGINT NOT NULL DEFAULT 0,
+        rows_copied BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP
+    )
+    """,
+]
+
+# Deleting a screenshot deletes its metadata; partitioned tables cannot
+# reference each other with ON DELETE CASCADE once partitions are detached
+CASCADE_STATEMENTS = [
+    """
+    CREATE OR REPLACE FUNCTION autotask_cascade_entity_delete() RETURNS trigger AS $$
+    BEGIN
+        DELETE FROM metadata_entries WHERE entity_id = OLD.id;
+        RETURN OLD;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_entity_delete_metadata ON entities",
+    """
+    CREATE TRIGGER trg_entity_delete_metadata
+        AFTER DELETE ON entities
+        FOR EACH ROW EXECUTE FUNCTION autotask_cascade_entity_delete()
+    """,
+]
+
+MIGRATION_SUFFIX = '_partitioned'
+RETIRED_SUFFIX = '_unpartitioned'
+
+_INDEX_DEF_RE = re.compile(r'^CREATE (UNIQUE )?INDEX (\S+) ON (?:ONLY )?(\S+) USING (.+)$', re.IGNORECASE)
+
+
+def month_start(value) -> date:
+    """First day of the month containing ``value``."""
+    return date(value.year, value.month, 1)
+
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    """Name of ``table``'s partition for ``month``."""
+    return f"{table}_p{month:%Y_%m}"
+
+
+@dataclass
+class PartitionSpec:
+    """One month's entity id range.
+
+    ``end_entity_id`` is exclusive and ``None`` for the open partition that
+    receives new screenshots. The first partition also holds any ids below
+    its ``first_entity_id``.
+    """
+    month: date
+    first_entity_id: int
+    end_entity_id: Optional[int] = None
+    min_created_at: Optional[datetime] = None
+    max_created_at: Optional[datetime] = None
+    is_first: bool = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.end_entity_id is None
+
+    def bounds_sql(self) -> str:
+        lower = 'MINVALUE' if self.is_first else str(int(self.first_entity_id))
+        upper = 'MAXVALUE' if self.is_open else str(int(self.end_entity_id))
+        return f"FROM ({lower}) TO ({upper})"
+
+    def overlaps(self, start: Optional[datetime], end: Optional[datetime]) -> bool:
+        """Whether screenshots captured in [start, end] can be in this partition.
+
+        The open partition's span is still growing: it starts at its first
+        capture (or its month, before one is recorded) and has no end.
+        """
+        if self.is_open:
+            first = datetime.combine(self.month, datetime.min.time())
+            if self.min_created_at is not None:
+                first = min(first, self.min_created_at)
+            return end is None or end >= first
+        if self.min_created_at is None:
+            return True
+        if start is not None and self.max_created_at is not None and self.max_created_at < start:
+            return False
+        if end is not None and self.min_created_at > end:
+            return False
+        return True
+
+
+def plan_partitions(month_first_ids: Sequence[Tuple[date, int]], next_id: int,
+                    now: Optional[datetime] = None) -> List[PartitionSpec]:
+    """Month partitions for existing data.
+
+    Args:
+        month_first_ids: (month, lowest entity id captured that month), by month
+        next_id: The id the next screenshot will get
+        now: Current UTC time; the current month always gets the open partition
+
+    Months whose first id is not above the previous month's (clock changes,
+    backfilled captures) are folded into the previous month.
+    """
+    current = month_start(now or utc_now())
+    open_from = next_id
+    boundaries: List[Tuple[date, int]] = []
+    for month, first_id in month_first_ids:
+        if month >= current:
+            open_from = min(open_from, first_id)
+            break
+        if boundaries and first_id <= boundaries[-1][1]:
+            continue
+        boundaries.append((month, int(first_id)))
+    # With nothing captured since the last month began, that month stays open
+    if not boundaries or open_from > boundaries[-1][1]:
+        boundaries.append((current, int(open_from)))
+
+    specs = []
+    for i, (month, first_id) in enumerate(boundaries):
+        end_id = boundaries[i + 1][1] if i + 1 < len(boundaries) else None
+        specs.append(PartitionSpec(month, first_id, end_id, is_first=(i == 0)))
+    return specs
+
+
+def replicate_index(indexdef: str, source: str, target: str, key_column: str) -> Optional[str]:
+    """Rewrite ``pg_get_indexdef`` output for a partitioned copy of ``source``.
+
+    Unique indexes that do not include the partition key cannot exist on a
+    partitioned table; they are recreated as plain indexes.
+    """
+    match = _INDEX_DEF_RE.match(indexdef.strip())
+    if not match:
+        return None
+    unique, name, table, using = match.groups()
+    if table.split('.')[-1].strip('"') != source:
+        return None
+    if unique and not re.search(rf'\b{re.escape(key_column)}\b', using):
+        logger.warning(f"Index {name} on {source} cannot stay unique when partitioned; recreating as non-unique")
+        unique = None
+    return f"CREATE {unique or ''}INDEX IF NOT EXISTS {name.strip(chr(34))}_part ON {target} USING {using}"
+
+
+class PartitionManager:
+    """Catalog, maintenance and pruning bounds for the partitioned tables.
+
+    Works against any manager exposing ``get_connection(readonly=False)``
+    and ``get_database_type()``.
+    """
+
+    def __init__(self, db_manager=None, retention_months: Optional[int] = None,
+                 catalog_ttl: float = 60.0, maintenance_interval: float = 3600.0,
+                 seal_batch_size: int = 10000):
+        """
+        Args:
+            db_manager: Database manager; defaults to a new DatabaseManager
+            retention_months: Months of screenshots to keep; 0 keeps everything
+                (defaults to ``PARTITION_RETENTION_MONTHS``)
+            catalog_ttl: Seconds the partition catalog is cached for pruning
+            maintenance_interval: Minimum seconds between ``maintain_if_due`` runs
+            seal_batch_size: Rows per transaction when sealing moves this
+                month's captures out of the finished month
+        """
+        if db_manager is None:
+            from autotasktracker.core.database import DatabaseManager
+            db_manager = DatabaseManager(use_pensieve_api=False)
+        if retention_months is None:
+            from autotasktracker.config import get_config
+            retention_months = get_config().PARTITION_RETENTION_MONTHS
+        self.db = db_manager
+        self.retention_months = retention_months
+        self.catalog_ttl = catalog_ttl
+        self.maintenance_interval = maintenance_interval
+        self.seal_batch_size = seal_batch_size
+        self._lock = threading.Lock()
+        self._catalog: Optional[List[PartitionSpec]] = None
+        self._catalog_read_at = 0.0
+        self._maintained_at = 0.0
+
+    # ------------------------------------------------------------------
+    # Connection helpers
+    # ------------------------------------------------------------------
+
+    @property
+    def is_sqlite(self) -> bool:
+        get_type = getattr(self.db, 'get_database_type', None)
+        return bool(get_type) and get_type() == 'sqlite'
+
+    def _transaction(self):
+        return _Transaction(self.db)
+
+    def ensure_schema(self):
+        """Create the partition catalog tables if missing."""
+        if self.is_sqlite:
+            return
+        with self._transaction() as cursor:
+            for statement in PARTITION_SCHEMA_STATEMENTS:
+                cursor.execute(statement)
+
+    def is_partitioned(self) -> bool:
+        """Whether ``entities`` is a partitioned table."""
+        if self.is_sqlite:
+            return False
+        with self._transaction() as cursor:
+            cursor.execute("""
+                SELECT c.relkind FROM pg_class c
+                WHERE c.oid = to_regclass('entities')
+            """)
+            row = cursor.fetchone()
+        return bool(row) and row[0] == 'p'
+
+    # ------------------------------------------------------------------
+    # Catalog
+    # ------------------------------------------------------------------
+
+    def catalog(self, refresh: bool = False) -> List[PartitionSpec]:
+        """Partitions by month, cached for ``catalog_ttl`` seconds.
+
+        Empty when the database is not partitioned (or cannot be read).
+        """
+        if self.is_sqlite:
+            return []
+        now = time.monotonic()
+        with self._lock:
+            if not refresh and self._catalog is not None and now - self._catalog_read_at < self.catalog_ttl:
+                return self._catalog
+        try:
+            specs = self._read_catalog()
+        except Exception as e:
+            logger.debug(f"Partition catalog unavailable: {e}")
+            specs = []
+        with self._lock:
+            self._catalog, self._catalog_read_at = specs, now
+        return specs
+
+    def _read_catalog(self) -> List[PartitionSpec]:
+        with self._transaction() as cursor:
+            cursor.execute("SELECT to_regclass('storage_partitions') IS NOT NULL")
+            if not cursor.fetchone()[0]:
+                return []
+            return self._catalog_rows(cursor)
+
+    @staticmethod
+    def _catalog_rows(cursor) -> List[PartitionSpec]:
+        cursor.execute("""
+            SELECT month, first_entity_id, end_entity_id, min_created_at, max_created_at
+            FROM storage_partitions ORDER BY month
+        """)
+        return [PartitionSpec(row[0], row[1], row[2], row[3], row[4], is_first=(i == 0))
+                for i, row in enumerate(cursor.fetchall())]
+
+    def entity_id_bounds(self, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None) -> Tuple[int, int]:
+        """Inclusive entity id range that holds every screenshot captured in [start, end].
+
+        Adding ``id BETWEEN lo AND hi`` to a time-range query lets the
+        planner prune other months' partitions. Unpartitioned databases get
+        ``FULL_RANGE``, which filters nothing.
+        """
+        specs = self.catalog()
+        if not specs:
+            return FULL_RANGE
+        start, end = _as_datetime(start), _as_datetime(end)
+        matching = [spec for spec in specs if spec.overlaps(start, end)]
+        if not matching:
+            return (0, 0)
+        lo = 0 if matching[0].is_first else matching[0].first_entity_id
+        hi = MAX_ENTITY_ID if matching[-1].is_open else matching[-1].end_entity_id - 1
+        return (lo, hi)
+
+    def _time_expression(self, cursor) -> str:
+        """Capture time of an entity, as the dashboard queries compute it."""
+        cursor.execute("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'entities' AND column_name = 'file_created_at'
+        """)
+        return "COALESCE(created_at, file_created_at)" if cursor.fetchone() else "created_at"
+
+    def _record_span(self, cursor, spec: PartitionSpec, sealed: bool):
+        """Store a partition's id range and the capture times it holds."""
+        time_expr = self._time_expression(cursor)
+        upper = spec.end_entity_id if spec.end_entity_id is not None else MAX_ENTITY_ID
+        cursor.execute(f"""
+            SELECT MIN({time_expr}), MAX({time_expr}) FROM entities
+            WHERE id >= %s AND id < %s
+        """, (0 if spec.is_first else spec.first_entity_id, upper))
+        min_created, max_created = cursor.fetchone()
+        cursor.execute("""
+            INSERT INTO storage_partitions
+                (month, first_entity_id, end_entity_id, min_created_at, max_created_at, sealed_at)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (month) DO UPDATE SET
+                first_entity_id = EXCLUDED.first_entity_id,
+                end_entity_id = EXCLUDED.end_entity_id,
+                min_created_at = EXCLUDED.min_created_at,
+                max_created_at = EXCLUDED.max_created_at,
+                sealed_at = EXCLUDED.sealed_at
+        """, (spec.month, spec.first_entity_id, spec.end_entity_id, min_created, max_created,
+              utc_now() if sealed else None))
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def maintain_if_due(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Run ``maintain`` at most once per ``maintenance_interval`` in this process."""
+        if self.is_sqlite:
+            return {}
+        with self._lock:
+            if time.monotonic() - self._maintained_at < self.maintenance_interval:
+                return {}
+            self._maintained_at = time.monotonic()
+        return self.maintain(now)
+
+    def maintain(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Seal finished months and apply retention."""
+        result = {'sealed': [], 'dropped': []}
+        if self.is_sqlite or not self.catalog(refresh=True):
+            return result
+        result['sealed'] = self.ensure_partitions(now)
+        if self.retention_months:
+            result['dropped'] = self.apply_retention(self.retention_months, now)
+        return result
+
+    def ensure_partitions(self, now: Optional[datetime] = None) -> List[date]:
+        """Seal the open partition once its month is over and open the current month.
+
+        Months follow ``created_at``, which is UTC. Rows already captured
+        this month are first copied, ``seal_batch_size`` at a time, into an
+        unattached table for the new month while a trigger mirrors
+        concurrent writes into it. Only the swap locks both tables
+        (``lock_timeout`` 5s; a busy database is retried at the next
+        maintenance run): the copied rows are deleted from the finished
+        month, the staged table is attached as the open partition and the
+        finished month is re-attached with its final id range.
+
+        Returns:
+            Months that were sealed
+        """
+        current = month_start(now or utc_now())
+        specs = self.catalog(refresh=True)
+        if not specs or specs[-1].month >= current:
+            return []
+        head = specs[-1]
+        with self._transaction() as cursor:
+            boundary = self._seal_boundary(cursor, head, current)
+        if boundary > head.first_entity_id and not self._stage_month(head, current, boundary):
+            return []
+
+        with self._transaction() as cursor:
+            cursor.execute("SET LOCAL lock_timeout = '5s'")
+            # Staging takes this lock in SHARE mode, so it never runs during the swap
+            cursor.execute("LOCK TABLE storage_partitions IN EXCLUSIVE MODE")
+            cursor.execute("LOCK TABLE entities, metadata_entries IN ACCESS EXCLUSIVE MODE")
+            # Another process may have sealed the month while we waited for the lock
+            head = self._catalog_rows(cursor)[-1]
+            if head.month >= current:
+                return []
+            if self._seal_boundary(cursor, head, current) != boundary:
+                # A late capture of the finished month moved the boundary: stage again next run
+                self._drop_staging(cursor, head, current)
+                return []
+
+            if boundary <= head.first_entity_id:
+                # The finished month is empty: relabel its partition
+                for table in PARTITIONED_TABLES:
+                    cursor.execute(f"ALTER TABLE {partition_name(table, head.month)} "
+                                   f"RENAME TO {partition_name(table, current)}")
+                cursor.execute("DELETE FROM storage_partitions WHERE month = %s", (head.month,))
+                self._record_span(cursor, PartitionSpec(current, head.first_entity_id, is_first=head.is_first),
+                                  sealed=False)
+                self._invalidate()
+                return []
+
+            new_head = PartitionSpec(current, boundary)
+            sealed = PartitionSpec(head.month, head.first_entity_id, boundary, is_first=head.is_first)
+            for table, key in PARTITIONED_TABLES.items():
+                old, new = partition_name(table, head.month), partition_name(table, current)
+                # Drop the mirror first, or the delete below would empty the staged table
+                cursor.execute(f"DROP TRIGGER IF EXISTS trg_seal_{table} ON {old}")
+                cursor.execute(f"DROP FUNCTION IF EXISTS autotask_seal_{table}()")
+                cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {old}")
+                cursor.execute(f"DELETE FROM {old} WHERE {key} >= %s", (boundary,))
+                cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {new} FOR VALUES {new_head.bounds_sql()}")
+                cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {old} FOR VALUES {sealed.bounds_sql()}")
+            self._record_span(cursor, sealed, sealed=True)
+            self._record_span(cursor, new_head, sealed=False)
+
+        self._invalidate()
+        logger.info(f"Sealed partitions for {head.month:%Y-%m} at entity id {boundary}")
+        return [head.month]
+
+    @staticmethod
+    def _seal_boundary(cursor, head: PartitionSpec, current: date) -> int:
+        """First entity id captured in ``current`` or later (the next id if there is none yet)."""
+        cursor.execute("""
+            SELECT MIN(id) FROM entities WHERE id >= %s AND created_at >= %s
+        """, (head.first_entity_id, current))
+        boundary = cursor.fetchone()[0]
+        if boundary is None:
+            cursor.execute("SELECT COALESCE(MAX(id) + 1, %s) FROM entities WHERE id >= %s",
+                           (head.first_entity_id, head.first_entity_id))
+            boundary = cursor.fetchone()[0]
+        return boundary
+
+    def _stage_month(self, head: PartitionSpec, current: date, boundary: int) -> bool:
+        """Copy the finished month's rows from ``boundary`` on into unattached tables for ``current``.
+
+        A trigger on the finished month's partitions replays writes made
+        during the copy, so the staged tables are complete once it ends.
+        Each batch is its own transaction; a staged table left by an
+        interrupted run is reused when its boundary still holds.
+
+        Returns:
+            False if another process sealed the month first
+        """
+        with self._transaction() as cursor:
+            cursor.execute("LOCK TABLE storage_partitions IN SHARE MODE")
+            if self._catalog_rows(cursor)[-1].month >= current:
+                return False
+            for table, key in PARTITIONED_TABLES.items():
+                old, new = partition_name(table, head.month), partition_name(table, current)
+                bound = f"{new}_from_{int(boundary)}"
+                cursor.execute("""
+                    SELECT to_regclass(%s) IS NOT NULL,
+                           EXISTS (SELECT 1 FROM pg_constraint WHERE conname = %s)
+                """, (new, bound))
+                exists, bounded = cursor.fetchone()
+                if exists and not bounded:
+                    cursor.execute(f"DROP TABLE {new}")
+                # The bound lets the swap attach the table without scanning it
+                cursor.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {new} (
+                        LIKE {table} INCLUDING ALL,
+                        CONSTRAINT {bound} CHECK ({key} >= {int(boundary)})
+                    )
+                """)
+                _install_mirror(cursor, f"seal_{table}", table, old, new, f"NEW.{key} >= {int(boundary)}")
+
+        for table, key in PARTITIONED_TABLES.items():
+            old, new = partition_name(table, head.month), partition_name(table, current)
+            last_id = 0
+            while True:
+                with self._transaction() as cursor:
+                    cursor.execute(f"""
+                        SELECT MAX(id) FROM (
+                            SELECT id FROM {old} WHERE {key} >= %s AND id > %s ORDER BY id LIMIT %s
+                        ) batch
+                    """, (boundary, last_id, self.seal_batch_size))
+                    upper = cursor.fetchone()[0]
+                    if upper is None:
+                        break
+                    # Share-locked like the migration copy, so the mirror overwrites a racing update
+                    cursor.execute(f"""
+                        INSERT INTO {new}
+                        SELECT * FROM {old} WHERE {key} >= %s AND id > %s AND id <= %s FOR SHARE
+                        ON CONFLICT DO NOTHING
+                    """, (boundary, last_id, upper))
+                last_id = upper
+        return True
+
+    @staticmethod
+    def _drop_staging(cursor, head: PartitionSpec, current: date):
+        for table in PARTITIONED_TABLES:
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_seal_{table} ON {partition_name(table, head.month)}")
+            cursor.execute(f"DROP FUNCTION IF EXISTS autotask_seal_{table}()")
+            cursor.execute(f"DROP TABLE IF EXISTS {partition_name(table, current)}")
+
+    def apply_retention(self, retention_months: int, now: Optional[datetime] = None) -> List[date]:
+        """Drop sealed months whose newest screenshot is older than the retention window.
+
+        Dropping a partition is instant and leaves no dead rows to vacuum.
+        The month's rows in ``ENTITY_SIDE_TABLES`` are deleted with it.
+
+        Returns:
+            Months that were dropped
+        """
+        if retention_months <= 0:
+            return []
+        cutoff = datetime.combine(add_months(month_start(now or utc_now()), -retention_months),
+                                  datetime.min.time())
+        expired = [spec for spec in self.catalog(refresh=True)
+                   if not spec.is_open and spec.max_created_at is not None and spec.max_created_at < cutoff]
+        dropped = []
+        for spec in expired:
+            with self._transaction() as cursor:
+                cursor.execute("SET LOCAL lock_timeout = '5s'")
+                for table in reversed(list(PARTITIONED_TABLES)):
+                    cursor.execute(f"DROP TABLE IF EXISTS {partition_name(table, spec.month)}")
+                for table in ENTITY_SIDE_TABLES:
+                    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+                    if cursor.fetchone()[0]:
+                        cursor.execute(f"DELETE FROM {table} WHERE entity_id >= %s AND entity_id < %s",
+                                       (0 if spec.is_first else spec.first_entity_id, spec.end_entity_id))
+                cursor.execute("DELETE FROM storage_partitions WHERE month = %s", (spec.month,))
+            dropped.append(spec.month)
+            logger.info(f"Dropped partitions for {spec.month:%Y-%m} (retention {retention_months} months)")
+        if dropped:
+            self._invalidate()
+        return dropped
+
+    def partition_stats(self) -> List[Dict[str, Any]]:
+        """Estimated rows and on-disk size per month and table."""
+        stats = []
+        with self._transaction() as cursor:
+            for spec in self.catalog(refresh=True):
+                entry = {
+                    'month': spec.month.strftime('%Y-%m'),
+                    'first_entity_id': spec.first_entity_id,
+                    'end_entity_id': spec.end_entity_id,
+                    'open': spec.is_open,
+                    'min_created_at': spec.min_created_at,
+                    'max_created_at': spec.max_created_at,
+                }
+                for table in PARTITIONED_TABLES:
+                    cursor.execute("""
+                        SELECT c.reltuples::bigint, pg_total_relation_size(c.oid)
+                        FROM pg_class c WHERE c.oid = to_regclass(%s)
+                    """, (partition_name(table, spec.month),))
+                    row = cursor.fetchone() or (0, 0)
+                    entry[f'{table}_rows'] = max(int(row[0] or 0), 0)
+                    entry[f'{table}_bytes'] = int(row[1] or 0)
+                stats.append(entry)
+        return stats
+
+    def _invalidate(self):
+        with self._lock:
+            self._catalog = None
+
+
+class PartitionMigration:
+    """Partition an existing database online.
+
+    ``prepare`` creates partitioned twins of both tables, one partition per
+    month already in the data, and installs triggers that mirror every
+    write on the old tables into the twins. ``copy`` then fills the twins in
+    keyset batches, checkpointed in ``storage_partition_migration`` so it
+    can be stopped and resumed. Metadata rows without an entity id have no
+    partition and are left behind. ``finalize`` swaps the names in one
+    transaction and keeps the old tables as ``*_unpartitioned`` until
+    ``drop_retired`` removes them.
+    """
+
+    def __init__(self, db_manager=None, batch_size: int = 10000):
+        if db_manager is None:
+            from autotasktracker.core.database import DatabaseManager
+            db_manager = DatabaseManager(use_pensieve_api=False)
+        self.db = db_manager
+        self.batch_size = batch_size
+        self.partitions = PartitionManager(db_manager, retention_months=0)
+
+    def _transaction(self):
+        return _Transaction(self.db)
+
+    def status(self) -> Dict[str, Any]:
+        """Migration progress per table."""
+        with self._transaction() as cursor:
+            cursor.execute("SELECT to_regclass('storage_partition_migration') IS NOT NULL")
+            if not cursor.fetchone()[0]:
+                return {'state': 'not_started', 'tables': {}}
+            cursor.execute("SELECT table_name, last_id, rows_copied FROM storage_partition_migration")
+            tables = {row[0]: {'last_id': row[1], 'rows_copied': row[2]} for row in cursor.fetchall()}
+            cursor.execute(f"SELECT to_regclass('entities{MIGRATION_SUFFIX}') IS NOT NULL")
+            preparing = cursor.fetchone()[0]
+        if self.partitions.is_partitioned():
+            state = 'done'
+        elif preparing:
+            state = 'copying'
+        else:
+            state = 'not_started'
+        return {'state': state, 'tables': tables}
+
+    def prepare(self, now: Optional[datetime] = None) -> List[PartitionSpec]:
+        """Create the partitioned twins and start mirroring writes into them."""
+        if self.partitions.is_partitioned():
+            raise DatabaseError("entities is already partitioned")
+        self.partitions.ensure_schema()
+        with self._transaction() as cursor:
+            cursor.execute("""
+                SELECT date_trunc('month', created_at)::date AS month, MIN(id)
+                FROM entities WHERE created_at IS NOT NULL
+                GROUP BY 1 ORDER BY 1
+            """)
+            month_first_ids = cursor.fetchall()
+            cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM entities")
+            next_id = cursor.fetchone()[0]
+            specs = plan_partitions(month_first_ids, next_id, now)
+
+            for table, key in PARTITIONED_TABLES.items():
+                twin = table + MIGRATION_SUFFIX
+                cursor.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {twin} (LIKE {table} INCLUDING DEFAULTS INCLUDING STORAGE)
+                    PARTITION BY RANGE ({key})
+                """)
+                for spec in specs:
+                    cursor.execute(f"""
+                        CREATE TABLE IF NOT EXISTS {partition_name(table, spec.month)}
+                        PARTITION OF {twin} FOR VALUES {spec.bounds_sql()}
+                    """)
+                cursor.execute(f"ALTER TABLE {twin} ADD PRIMARY KEY ({', '.join(PRIMARY_KEYS[table])})")
+                cursor.execute("""
+                    SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i
+                    WHERE i.indrelid = to_regclass(%s) AND NOT i.indisprimary
+                """, (table,))
+                for (indexdef,) in cursor.fetchall():
+                    statement = replicate_index(indexdef, table, twin, key)
+                    if statement:
+                        cursor.execute(statement)
+                _install_mirror(cursor, f"mirror_{table}", table, table, twin, f"NEW.{key} IS NOT NULL")
+                cursor.execute("""
+                    INSERT INTO storage_partition_migration (table_name, last_id, rows_copied, updated_at)
+                    VALUES (%s, 0, 0, NOW()) ON CONFLICT (table_name) DO NOTHING
+                """, (table,))
+            cursor.execute("DELETE FROM storage_partitions")
+            for spec in specs:
+                cursor.execute("""
+                    INSERT INTO storage_partitions (month, first_entity_id, end_entity_id)
+                    VALUES (%s, %s, %s)
+                """, (spec.month, spec.first_entity_id, spec.end_entity_id))
+        logger.info(f"Prepared {len(specs)} monthly partitions; mirroring writes")
+        return specs
+
+    def copy_batch(self, table: str) -> int:
+        """Copy the next keyset batch of ``table`` into its twin.
+
+        Source rows are share-locked while they are copied, so a concurrent
+        update or delete waits for the batch and its mirror trigger then
+        overwrites the copy.
+
+        Returns:
+            Rows copied (rows the mirror already wrote count as copied), or
+            None once the table is fully copied
+        """
+        twin, key = table + MIGRATION_SUFFIX, PARTITIONED_TABLES[table]
+        with self._transaction() as cursor:
+            cursor.execute("SELECT last_id FROM storage_partition_migration WHERE table_name = %s FOR UPDATE",
+                           (table,))
+            row = cursor.fetchone()
+            if row is None:
+                raise DatabaseError(f"Partition migration for {table} has not been prepared")
+            cursor.execute(f"""
+                SELECT MAX(id) FROM (
+                    SELECT id FROM {table} WHERE id > %s ORDER BY id LIMIT %s
+                ) batch
+            """, (row[0], self.batch_size))
+            upper = cursor.fetchone()[0]
+            if upper is None:
+                return None
+            cursor.execute(f"""
+                INSERT INTO {twin}
+                SELECT * FROM {table} WHERE id > %s AND id <= %s AND {key} IS NOT NULL FOR SHARE
+                ON CONFLICT DO NOTHING
+            """, (row[0], upper))
+            copied = cursor.rowcount
+            cursor.execute("""
+                UPDATE storage_partition_migration
+                SET last_id = %s, rows_copied = rows_copied + %s, updated_at = NOW()
+                WHERE table_name = %s
+            """, (upper, max(copied, 0), table))
+        return max(copied, 0)
+
+    def copy(self, max_batches: Optional[int] = None, progress=None, throttle: float = 0.0) -> Dict[str, int]:
+        """Copy both tables batch by batch until done or ``max_batches`` run.
+
+        Args:
+            max_batches: Stop after this many batches (None: until done)
+            progress: Called with (table, rows copied so far in this run)
+            throttle: Seconds to sleep between batches, to leave I/O for capture
+
+        Returns:
+            Rows copied per table in this run
+        """
+        copied = {table: 0 for table in PARTITIONED_TABLES}
+        batches = 0
+        for table in PARTITIONED_TABLES:
+            while max_batches is None or batches < max_batches:
+                rows = self.copy_batch(table)
+                if rows is None:
+                    break
+                copied[table] += rows
+                batches += 1
+                if progress:
+                    progress(table, copied[table])
+                if throttle:
+                    time.sleep(throttle)
+        return copied
+
+    def finalize(self, verify: bool = True):
+        """Swap the partitioned twins in under the original names.
+
+        Runs in one transaction holding exclusive locks on both tables:
+        copies any rows still missing, optionally checks row counts, moves
+        views, triggers and other tables' foreign keys over to the new
+        tables, hands the id sequences to them and renames the old tables to
+        ``*_unpartitioned``. Moved foreign keys are re-added ``NOT VALID``
+        so the swap does not rescan the referencing tables.
+        """
+        with self._transaction() as cursor:
+            cursor.execute("SET LOCAL lock_timeout = '10s'")
+            cursor.execute("LOCK TABLE entities, metadata_entries IN ACCESS EXCLUSIVE MODE")
+            for table, key in PARTITIONED_TABLES.items():
+                cursor.execute("SELECT last_id FROM storage_partition_migration WHERE table_name = %s", (table,))
+                row = cursor.fetchone()
+                if row is None:
+                    raise DatabaseError(f"Partition migration for {table} has not been prepared")
+                cursor.execute(f"""
+                    INSERT INTO {table}{MIGRATION_SUFFIX}
+                    SELECT * FROM {table} WHERE id > %s AND {key} IS NOT NULL
+                    ON CONFLICT DO NOTHING
+                """, (row[0],))
+                if verify:
+                    cursor.execute(f"SELECT (SELECT COUNT(*) FROM {table} WHERE {key} IS NOT NULL), "
+                                   f"(SELECT COUNT(*) FROM {table}{MIGRATION_SUFFIX})")
+                    old_rows, new_rows = cursor.fetchone()
+                    if old_rows != new_rows:
+                        raise DatabaseError(f"{table}: {old_rows} rows but {new_rows} copied; not swapping")
+
+            # Views and triggers reference the old tables by oid; recreate them by name
+            cursor.execute("""
+                SELECT DISTINCT v.oid::regclass::text, pg_get_viewdef(v.oid)
+                FROM pg_depend d
+                JOIN pg_rewrite r ON r.oid = d.objid
+                JOIN pg_class v ON v.oid = r.ev_class
+                WHERE d.refobjid IN (to_regclass('entities'), to_regclass('metadata_entries'))
+                  AND v.oid NOT IN (to_regclass('entities'), to_regclass('metadata_entries'))
+            """)
+            views = cursor.fetchall()
+            cursor.execute("""
+                SELECT pg_get_triggerdef(t.oid) FROM pg_trigger t
+                WHERE t.tgrelid IN (to_regclass('entities'), to_regclass('metadata_entries'))
+                  AND NOT t.tgisinternal AND t.tgname NOT LIKE 'trg_mirror_%'
+            """)
+            triggers = [row[0] for row in cursor.fetchall()]
+            cursor.execute("""
+                SELECT c.conrelid::regclass::text, c.conname, pg_get_constraintdef(c.oid)
+                FROM pg_constraint c
+                WHERE c.contype = 'f'
+                  AND c.confrelid IN (to_regclass('entities'), to_regclass('metadata_entries'))
+                  AND c.conrelid NOT IN (to_regclass('entities'), to_regclass('metadata_entries'))
+            """)
+            foreign_keys = cursor.fetchall()
+            sequences = {}
+            for table in PARTITIONED_TABLES:
+                cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (table,))
+                sequences[table] = cursor.fetchone()[0]
+
+            for view, _ in views:
+                cursor.execute(f"DROP VIEW IF EXISTS {view}")
+            for table, name, _ in foreign_keys:
+                cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+            for table in PARTITIONED_TABLES:
+                cursor.execute(f"DROP TRIGGER IF EXISTS trg_mirror_{table} ON {table}")
+                cursor.execute(f"DROP FUNCTION IF EXISTS autotask_mirror_{table}()")
+                cursor.execute(f"ALTER TABLE {table} RENAME TO {table}{RETIRED_SUFFIX}")
+                cursor.execute(f"ALTER TABLE {table}{MIGRATION_SUFFIX} RENAME TO {table}")
+                if sequences[table]:
+                    cursor.execute(f"ALTER SEQUENCE {sequences[table]} OWNED BY {table}.id")
+            for statement in triggers:
+                cursor.execute(statement)
+            for statement in CASCADE_STATEMENTS:
+                cursor.execute(statement)
+            for table, name, definition in foreign_keys:
+                cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition} NOT VALID")
+            for view, definition in views:
+                cursor.execute(f"CREATE OR REPLACE VIEW {view} AS {definition}")
+
+            for spec in PartitionManager._catalog_rows(cursor):
+                self.partitions._record_span(cursor, spec, sealed=not spec.is_open)
+            cursor.execute("DELETE FROM storage_partition_migration")
+        self.partitions._invalidate()
+        logger.info("Swapped in partitioned entities and metadata_entries")
+
+    def drop_retired(self):
+        """Drop the pre-migration tables once the partitioned ones are trusted."""
+        with self._transaction() as cursor:
+            for table in reversed(list(PARTITIONED_TABLES)):
+                cursor.execute(f"DROP TABLE IF EXISTS {table}{RETIRED_SUFFIX}")
+
+
+class _Transaction:
+    """Cursor in a read-write transaction: commit on success, rollback on error."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self._context = self.db.get_connection(readonly=False)
+        self.conn = self._context.__enter__()
+        self.cursor = self.conn.cursor()
+        return self.cursor
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+        finally:
+            self.cursor.close()
+            self._context.__exit__(exc_type, exc, tb)
+        return False
+
+
+def _columns(cursor, table: str) -> List[str]:
+    cursor.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s
+        ORDER BY ordinal_position
+    """, (table,))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _install_mirror(cursor, name: str, table: str, source: str, target: str, condition: str):
+    """Trigger ``trg_<name>`` that replays inserts, updates and deletes on ``source`` into ``target``.
+
+    ``table`` supplies the columns and primary key; inserted and updated
+    rows are copied when ``condition`` (over ``NEW``) holds.
+    """
+    columns = _columns(cursor, table)
+    keys = PRIMARY_KEYS[table]
+    match = ' AND '.join(f"{k} = OLD.{k}" for k in keys)
+    updates = ', '.join(f"{c} = EXCLUDED.{c}" for c in columns if c not in keys)
+    cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION autotask_{name}() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                DELETE FROM {target} WHERE {match};
+            END IF;
+            IF TG_OP = 'DELETE' THEN
+                RETURN OLD;
+            END IF;
+            INSERT INTO {target} SELECT (NEW).* WHERE {condition}
+            ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    cursor.execute(f"DROP TRIGGER IF EXISTS trg_{name} ON {source}")
+    cursor.execute(f"""
+        CREATE TRIGGER trg_{name}
+            AFTER INSERT OR UPDATE OR DELETE ON {source}
+            FOR EACH ROW EXECUTE FUNCTION autotask_{name}()
+    """)
+
+
+def _as_datetime(value) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    return datetime.fromisoformat(str(value))
+
+
+_managers: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+_managers_lock = threading.Lock()
+
+
+def get_partition_manager(db_manager=None) -> PartitionManager:
+    """Get the partition manager for a database manager (default: the shared one)."""
+    if db_manager is None:
+        from autotasktracker.core.database import get_default_db_manager
+        db_manager = get_default_db_manager()
+    with _managers_lock:
+        manager = _managers.get(db_manager)
+        if manager is None:
+            manager = PartitionManager(db_manager)
+            _managers[db_manager] = manager
+    return manager
+
+
+def entity_id_bounds(db_manager, start=None, end=None) -> Tuple[int, int]:
+    """``PartitionManager.entity_id_bounds`` for ``db_manager``; ``FULL_RANGE`` on any error."""
+    try:
+        return get_partition_manager(db_manager).entity_id_bounds(start, end)
+    except Exception as e:
+        logger.debug(f"Partition bounds unavailable: {e}")
+        return FULL_RANGE
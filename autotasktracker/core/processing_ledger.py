@@ -0,0 +1,587 @@
+"""
+Shared incremental processing state for AutoTaskTracker processors.
+
+Each pipeline stage (tasks, ocr, vlm, ...) keeps a high-water mark: every
+entity id at or below it has been processed or handed to the retry table.
+Work above the mark is claimed in id order, so finding new work costs
+O(batch) no matter how much history the database holds.
+
+Tables:
+    processing_watermarks: one row per stage with the contiguous high-water mark
+    processing_claims:     in-flight (and completed-but-not-yet-contiguous) ids
+    processing_failures:   failed and released ids with attempt counts and retry schedule
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from autotasktracker.core.exceptions import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+
+# Metadata key that marks an entity as done for each stage. Used once to
+# bootstrap a stage's watermark from existing data.
+STAGE_COMPLETION_KEYS = {
+    'tasks': 'tasks',
+    'ocr': 'ocr_result',
+    'vlm': 'vlm_structured',
+    'embeddings': 'embedding',
+}
+
+def utc_now() -> datetime:
+    """Current time as naive UTC, the clock ``entities.created_at`` is kept in.
+
+    Every ledger and lease timestamp uses it so claim ages, retry schedules
+    and settle windows compare against capture times on one clock.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+SCHEMA_STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS processing_watermarks (
+        stage VARCHAR(64) PRIMARY KEY,
+        last_entity_id BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS processing_claims (
+        stage VARCHAR(64) NOT NULL,
+        entity_id BIGINT NOT NULL,
+        worker_id VARCHAR(128),
+        status VARCHAR(16) NOT NULL DEFAULT 'claimed',
+        claimed_at TIMESTAMP,
+        PRIMARY KEY (stage, entity_id)
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_processing_claims_status
+        ON processing_claims(stage, status, claimed_at)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS processing_failures (
+        stage VARCHAR(64) NOT NULL,
+        entity_id BIGINT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 1,
+        last_error TEXT,
+        next_attempt_at TIMESTAMP,
+        updated_at TIMESTAMP,
+        PRIMARY KEY (stage, entity_id)
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_processing_failures_retry
+        ON processing_failures(stage, next_attempt_at)
+    """,
+]
+
+
+class ProcessingLedger:
+    """Per-stage watermarks, claims and retries shared by all processors.
+
+    Works against any manager exposing ``get_connection(readonly=False)`` and
+    ``get_database_type()``. On PostgreSQL, claims use
+    ``FOR NO KEY UPDATE SKIP LOCKED`` so concurrent workers never block on or
+    double-claim the same rows (NO KEY keeps metadata inserts referencing the
+    entity unblocked). On SQLite, claims are serialized with ``BEGIN IMMEDIATE``.
+    """
+
+    def __init__(self, db_manager=None, claim_timeout: int = 600, max_attempts: int = 5,
+                 retry_backoff: int = 60, settle_seconds: int = 5):
+        """
+        Args:
+            db_manager: Database manager; defaults to a new DatabaseManager
+            claim_timeout: Seconds before an unfinished claim may be taken over
+            max_attempts: Failures after which an entity is parked as dead
+            retry_backoff: Base delay in seconds for exponential retry backoff
+            settle_seconds: Only claim entities at least this old, so ids
+                committed out of order are not skipped by the watermark
+        """
+        if db_manager is None:
+            from autotasktracker.core.database import DatabaseManager
+            db_manager = DatabaseManager()
+        self.db = db_manager
+        self.claim_timeout = claim_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.settle_seconds = settle_seconds
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Connection helpers
+    # ------------------------------------------------------------------
+
+    @property
+    def is_sqlite(self) -> bool:
+        get_type = getattr(self.db, 'get_database_type', None)
+        return bool(get_type) and get_type() == 'sqlite'
+
+    def _sql(self, query: str) -> str:
+        """Adapt a ``%s``-style query to the connection's parameter style."""
+        if self.is_sqlite:
+            return query.replace('%s', '?')
+        return query
+
+    def _skip_locked(self, table_alias: Optional[str] = None) -> str:
+        if self.is_sqlite:
+            return ''
+        of_clause = f" OF {table_alias}" if table_alias else ''
+        return f" FOR NO KEY UPDATE{of_clause} SKIP LOCKED"
+
+    @staticmethod
+    def _ts(value: datetime) -> str:
+        return value.isoformat(sep=' ')
+
+    @staticmethod
+    def _placeholders(values: Sequence) -> str:
+        return ', '.join(['%s'] * len(values))
+
+    @contextmanager
+    def _transaction(self):
+        """Yield a cursor inside a write transaction, committing on success."""
+        self.ensure_schema()
+        with self.db.get_connection(readonly=False) as conn:
+            cursor = conn.cursor()
+            try:
+                if self.is_sqlite:
+                    cursor.execute('BEGIN IMMEDIATE')
+                yield cursor
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def _execute(self, cursor, query: str, params: Sequence = ()):
+        cursor.execute(self._sql(query), tuple(params))
+
+    def ensure_schema(self):
+        """Create ledger tables if they do not exist."""
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            try:
+                with self.db.get_connection(readonly=False) as conn:
+                    cursor = conn.cursor()
+                    for statement in SCHEMA_STATEMENTS:
+                        cursor.execute(statement)
+                    conn.commit()
+                    cursor.close()
+                self._schema_ready = True
+            except Exception as e:
+                logger.error(f"Failed to create processing ledger schema: {e}")
+                raise DatabaseError(f"Processing ledger schema creation failed: {e}") from e
+
+    # ------------------------------------------------------------------
+    # Watermarks
+    # ------------------------------------------------------------------
+
+    def get_watermark(self, stage: str) -> int:
+        """Get the highest entity id below which ``stage`` has no pending work."""
+        with self._transaction() as cursor:
+            return self._get_watermark(cursor, stage)
+
+    def _get_watermark(self, cursor, stage: str) -> int:
+        self._execute(cursor, "SELECT last_entity_id FROM processing_watermarks WHERE stage = %s", (stage,))
+        row = cursor.fetchone()
+        return int(row[0]) if row else 0
+
+    def set_watermark(self, stage: str, entity_id: int):
+        """Force a stage's watermark (e.g. to skip history or to reprocess)."""
+        with self._transaction() as cursor:
+            self._execute(cursor, """
+                INSERT INTO processing_watermarks (stage, last_entity_id, updated_at)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (stage) DO UPDATE SET
+                    last_entity_id = EXCLUDED.last_entity_id,
+                    updated_at = EXCLUDED.updated_at
+            """, (stage, entity_id, self._ts(utc_now())))
+            self._execute(cursor, """
+                DELETE FROM processing_claims
+                WHERE stage = %s AND status = 'done' AND entity_id <= %s
+            """, (stage, entity_id))
+
+    def bootstrap_watermark(self, stage: str, completion_key: Optional[str] = None) -> int:
+        """Initialize a new stage's watermark from existing metadata.
+
+        Runs one scan to find the first entity lacking ``completion_key``;
+        afterwards all lookups use the watermark. No-op if the stage exists.
+        """
+        completion_key = completion_key or STAGE_COMPLETION_KEYS.get(stage, stage)
+        with self._transaction() as cursor:
+            self._execute(cursor, "SELECT last_entity_id FROM processing_watermarks WHERE stage = %s", (stage,))
+            row = cursor.fetchone()
+            if row:
+                return int(row[0])
+
+            self._execute(cursor, """
+                SELECT MIN(e.id) FROM entities e
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM metadata_entries m
+                    WHERE m.entity_id = e.id AND m.key = %s
+                )
+            """, (completion_key,))
+            first_pending = cursor.fetchone()[0]
+            if first_pending is None:
+                self._execute(cursor, "SELECT COALESCE(MAX(id), 0) FROM entities")
+                watermark = int(cursor.fetchone()[0])
+            else:
+                watermark = int(first_pending) - 1
+
+            self._execute(cursor, """
+                INSERT INTO processing_watermarks (stage, last_entity_id, updated_at)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (stage) DO NOTHING
+            """, (stage, watermark, self._ts(utc_now())))
+            logger.info(f"Bootstrapped '{stage}' watermark at entity {watermark}")
+            return watermark
+
+    # ------------------------------------------------------------------
+    # Claiming work
+    # ------------------------------------------------------------------
+
+    def claim_batch(self, stage: str, n: int, worker_id: Optional[str] = None) -> List[int]:
+        """Claim up to ``n`` entity ids for ``stage``.
+
+        Due retries are served first, then claims abandoned past
+        ``claim_timeout``, then new entities above the watermark.
+
+        Returns:
+            Claimed entity ids; the caller must ``complete``, ``fail`` or
+            ``release`` each of them
+        """
+        if n <= 0:
+            return []
+
+        now = utc_now()
+        claimed: List[int] = []
+        with self._transaction() as cursor:
+            claimed.extend(self._claim_retries(cursor, stage, n, now))
+            if len(claimed) < n:
+                claimed.extend(self._claim_expired(cursor, stage, n - len(claimed), worker_id, now))
+            if len(claimed) < n:
+                claimed.extend(self._claim_new(cursor, stage, n - len(claimed), worker_id, now))
+
+        if claimed:
+            logger.debug(f"Claimed {len(claimed)} entities for stage '{stage}'")
+        return claimed
+
+    def _claim_retries(self, cursor, stage: str, n: int, now: datetime) -> List[int]:
+        self._execute(cursor, f"""
+            SELECT entity_id FROM processing_failures
+            WHERE stage = %s AND next_attempt_at IS NOT NULL AND next_attempt_at <= %s
+            ORDER BY next_attempt_at, entity_id
+            LIMIT %s{self._skip_locked()}
+        """, (stage, self._ts(now), n))
+        ids = [int(row[0]) for row in cursor.fetchall()]
+        if ids:
+            # Push the retry out while this worker holds it
+            hold_until = now + timedelta(seconds=self.claim_timeout)
+            self._execute(cursor, f"""
+                UPDATE processing_failures SET next_attempt_at = %s, updated_at = %s
+                WHERE stage = %s AND entity_id IN ({self._placeholders(ids)})
+            """, (self._ts(hold_until), self._ts(now), stage, *ids))
+        return ids
+
+    def _claim_expired(self, cursor, stage: str, n: int, worker_id: Optional[str],
+                       now: datetime) -> List[int]:
+        cutoff = now - timedelta(seconds=self.claim_timeout)
+        self._execute(cursor, f"""
+            SELECT entity_id FROM processing_claims
+            WHERE stage = %s AND status = 'claimed' AND claimed_at < %s
+            ORDER BY entity_id
+            LIMIT %s{self._skip_locked()}
+        """, (stage, self._ts(cutoff), n))
+        ids = [int(row[0]) for row in cursor.fetchall()]
+        if ids:
+            self._execute(cursor, f"""
+                UPDATE processing_claims SET worker_id = %s, claimed_at = %s
+                WHERE stage = %s AND entity_id IN ({self._placeholders(ids)})
+            """, (worker_id, self._ts(now), stage, *ids))
+            logger.info(f"Took over {len(ids)} expired '{stage}' claims")
+        return ids
+
+    def _claim_new(self, cursor, stage: str, n: int, worker_id: Optional[str],
+                   now: datetime) -> List[int]:
+        watermark = self._get_watermark(cursor, stage)
+        settled_before = now - timedelta(seconds=self.settle_seconds)
+        self._execute(cursor, f"""
+            SELECT e.id FROM entities e
+            WHERE e.id > %s
+              AND e.created_at <= %s
+              AND NOT EXISTS (
+                  SELECT 1 FROM processing_claims c
+                  WHERE c.stage = %s AND c.entity_id = e.id
+              )
+            ORDER BY e.id
+            LIMIT %s{self._skip_locked('e')}
+        """, (watermark, self._ts(settled_before), stage, n))
+        candidates = [int(row[0]) for row in cursor.fetchall()]
+
+        claimed = []
+        for entity_id in candidates:
+            self._execute(cursor, """
+                INSERT INTO processing_claims (stage, entity_id, worker_id, status, claimed_at)
+                VALUES (%s, %s, %s, 'claimed', %s)
+                ON CONFLICT (stage, entity_id) DO NOTHING
+            """, (stage, entity_id, worker_id, self._ts(now)))
+            if cursor.rowcount:
+                claimed.append(entity_id)
+        return claimed
+
+    # ------------------------------------------------------------------
+    # Finishing work
+    # ------------------------------------------------------------------
+
+    def complete(self, stage: str, entity_ids: Iterable[int]):
+        """Mark claimed entities as processed and advance the watermark."""
+        ids = [int(i) for i in entity_ids]
+        if not ids:
+            return
+        with self._transaction() as cursor:
+            self._execute(cursor, f"""
+                UPDATE processing_claims SET status = 'done'
+                WHERE stage = %s AND entity_id IN ({self._placeholders(ids)})
+            """, (stage, *ids))
+            self._execute(cursor, f"""
+                DELETE FROM processing_failures
+                WHERE stage = %s AND entity_id IN ({self._placeholders(ids)})
+            """, (stage, *ids))
+            self._advance_watermark(cursor, stage)
+
+    def fail(self, stage: str, entity_id: int, error: str = ''):
+        """Record a failure; the entity is retried with exponential backoff.
+
+        The entity stops blocking the watermark immediately. After
+        ``max_attempts`` failures it is parked (``next_attempt_at`` NULL).
+        """
+        now = utc_now()
+        with self._transaction() as cursor:
+            self._execute(cursor, """
+                SELECT attempts FROM processing_failures WHERE stage = %s AND entity_id = %s
+            """, (stage, entity_id))
+            row = cursor.fetchone()
+            attempts = (int(row[0]) if row else 0) + 1
+
+            if attempts >= self.max_attempts:
+                next_attempt = None
+                logger.warning(f"Entity {entity_id} failed '{stage}' {attempts} times, parking it")
+            else:
+                delay = self.retry_backoff * (2 ** (attempts - 1))
+                next_attempt = self._ts(now + timedelta(seconds=delay))
+
+            self._execute(cursor, """
+                INSERT INTO processing_failures
+                    (stage, entity_id, attempts, last_error, next_attempt_at, updated_at)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (stage, entity_id) DO UPDATE SET
+                    attempts = EXCLUDED.attempts,
+                    last_error = EXCLUDED.last_error,
+                    next_attempt_at = EXCLUDED.next_attempt_at,
+                    updated_at = EXCLUDED.updated_at
+            """, (stage, entity_id, attempts, (error or '')[:1000], next_attempt, self._ts(now)))
+
+            self._execute(cursor, """
+                UPDATE processing_claims SET status = 'done'
+                WHERE stage = %s AND entity_id = %s
+            """, (stage, entity_id))
+            self._advance_watermark(cursor, stage)
+
+    def release(self, stage: str, entity_ids: Iterable[int]):
+        """Return claimed entities unprocessed so another worker can take them.
+
+        They become retries that are due at once, so the watermark can pass
+        them without skipping them.
+        """
+        ids = [int(i) for i in entity_ids]
+        if not ids:
+            return
+        with self._transaction() as cursor:
+            self._release_claims(cursor, f"stage = %s AND entity_id IN ({self._placeholders(ids)})",
+                                 (stage, *ids))
+            self._execute(cursor, f"""
+                UPDATE processing_failures SET next_attempt_at = %s
+                WHERE stage = %s AND next_attempt_at IS NOT NULL
+                  AND entity_id IN ({self._placeholders(ids)})
+            """, (self._ts(utc_now()), stage, *ids))
+
+    def _release_claims(self, cursor, condition: str, params: Sequence) -> int:
+        """Turn in-flight claims matching ``condition`` into due retries.
+
+        Deleting the claims instead would let the watermark move past ids
+        nobody finished, and ``claim_batch`` never looks below it for new
+        work. Existing failure rows keep their attempt count.
+
+        Returns:
+            Number of claims released
+        """
+        now = self._ts(utc_now())
+        self._execute(cursor, f"""
+            SELECT stage, entity_id FROM processing_claims
+            WHERE status = 'claimed' AND {condition}
+        """, params)
+        released = cursor.fetchall()
+        for stage, entity_id in released:
+            self._execute(cursor, """
+                INSERT INTO processing_failures
+                    (stage, entity_id, attempts, last_error, next_attempt_at, updated_at)
+                VALUES (%s, %s, 0, 'released', %s, %s)
+                ON CONFLICT (stage, entity_id) DO UPDATE SET
+                    next_attempt_at = EXCLUDED.next_attempt_at,
+                    updated_at = EXCLUDED.updated_at
+            """, (stage, entity_id, now, now))
+        self._execute(cursor, f"""
+            UPDATE processing_claims SET status = 'done'
+            WHERE status = 'claimed' AND {condition}
+        """, params)
+        for stage in sorted({row[0] for row in released}):
+            self._advance_watermark(cursor, stage)
+        return len(released)
+
+    def requeue(self, stage: str, entity_ids: Iterable[int], reason: str = '') -> int:
+        """Schedule already processed entities to be processed again.
+
+        They are served as due retries by ``claim_batch``; entities that
+        already have a retry scheduled keep it. Returns entities queued.
+        """
+        ids = [int(i) for i in entity_ids]
+        if not ids:
+            return 0
+        now = self._ts(utc_now())
+        queued = 0
+        with self._transaction() as cursor:
+            for entity_id in ids:
+                self._execute(cursor, """
+                    INSERT INTO processing_failures
+                        (stage, entity_id, attempts, last_error, next_attempt_at, updated_at)
+                    VALUES (%s, %s, 0, %s, %s, %s)
+                    ON CONFLICT (stage, entity_id) DO NOTHING
+                """, (stage, entity_id, reason[:1000], now, now))
+                queued += max(cursor.rowcount, 0)
+        if queued:
+            logger.debug(f"Requeued {queued} entities for stage '{stage}'")
+        return queued
+
+    def _advance_watermark(self, cursor, stage: str):
+        """Move the watermark up to the highest contiguously finished id."""
+        self._execute(cursor, """
+            SELECT MIN(entity_id) FROM processing_claims
+            WHERE stage = %s AND status = 'claimed'
+        """, (stage,))
+        lowest_in_flight = cursor.fetchone()[0]
+
+        if lowest_in_flight is None:
+            self._execute(cursor, """
+                SELECT MAX(entity_id) FROM processing_claims
+                WHERE stage = %s AND status = 'done'
+            """, (stage,))
+        else:
+            self._execute(cursor, """
+                SELECT MAX(entity_id) FROM processing_claims
+                WHERE stage = %s AND status = 'done' AND entity_id < %s
+            """, (stage, lowest_in_flight))
+        new_watermark = cursor.fetchone()[0]
+        if new_watermark is None:
+            return
+
+        self._execute(cursor, """
+            INSERT INTO processing_watermarks (stage, last_entity_id, updated_at)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (stage) DO UPDATE SET
+                last_entity_id = EXCLUDED.last_entity_id,
+                updated_at = EXCLUDED.updated_at
+            WHERE processing_watermarks.last_entity_id < EXCLUDED.last_entity_id
+        """, (stage, new_watermark, self._ts(utc_now())))
+        self._execute(cursor, """
+            DELETE FROM processing_claims
+            WHERE stage = %s AND status = 'done' AND entity_id <= %s
+        """, (stage, new_watermark))
+
+    # ------------------------------------------------------------------
+    # Work item loading and stats
+    # ------------------------------------------------------------------
+
+    def fetch_work_items(self, entity_ids: Sequence[int], keys: Sequence[str]) -> List[Dict[str, Any]]:
+        """Load entities and selected metadata keys for a claimed batch in one query.
+
+        Returns:
+            Dicts with ``id``, ``filepath``, ``created_at`` and one entry per
+            requested key (None when missing), in ``entity_ids`` order
+        """
+        ids = [int(i) for i in entity_ids]
+        if not ids:
+            return []
+
+        items = {}
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, f"""
+                SELECT id, filepath, created_at FROM entities
+                WHERE id IN ({self._placeholders(ids)})
+            """, ids)
+            for entity_id, filepath, created_at in cursor.fetchall():
+                items[int(entity_id)] = {
+                    'id': int(entity_id),
+                    'filepath': filepath,
+                    'created_at': created_at,
+                    **{key: None for key in keys},
+                }
+
+            if keys and items:
+                self._execute(cursor, f"""
+                    SELECT entity_id, key, value FROM metadata_entries
+                    WHERE entity_id IN ({self._placeholders(ids)})
+                      AND key IN ({self._placeholders(keys)})
+                """, (*ids, *keys))
+                for entity_id, key, value in cursor.fetchall():
+                    if int(entity_id) in items:
+                        items[int(entity_id)][key] = value
+            cursor.close()
+
+        return [items[i] for i in ids if i in items]
+
+    def get_stats(self, stage: str) -> Dict[str, Any]:
+        """Get watermark, in-flight and retry counts for a stage."""
+        with self._transaction() as cursor:
+            watermark = self._get_watermark(cursor, stage)
+            self._execute(cursor, """
+                SELECT status, COUNT(*) FROM processing_claims WHERE stage = %s GROUP BY status
+            """, (stage,))
+            claims = {status: int(count) for status, count in cursor.fetchall()}
+            self._execute(cursor, """
+                SELECT
+                    SUM(CASE WHEN next_attempt_at IS NOT NULL THEN 1 ELSE 0 END),
+                    SUM(CASE WHEN next_attempt_at IS NULL THEN 1 ELSE 0 END)
+                FROM processing_failures WHERE stage = %s
+            """, (stage,))
+            pending_retries, dead = cursor.fetchone()
+
+        return {
+            'stage': stage,
+            'watermark': watermark,
+            'in_flight': claims.get('claimed', 0),
+            'done_above_watermark': claims.get('done', 0),
+            'pending_retries': int(pending_retries or 0),
+            'dead': int(dead or 0),
+        }
+
+
+# Global ledger instance
+_ledger_instance: Optional[ProcessingLedger] = None
+
+
+def get_processing_ledger() -> ProcessingLedger:
+    """Get global processing ledger instance."""
+    global _ledger_instance
+    if _ledger_instance is None:
+        _ledger_instance = ProcessingLedger()
+    return _ledger_instance
@@ -0,0 +1,455 @@
+"""
+Registry of hot SQL queries executed as server-side prepared statements.
+
+Hot queries are declared once with ``$n`` placeholders and typed
+parameters. The first time a pooled connection runs a query it is
+``PREPARE``d; later calls send ``EXECUTE name(...)`` so PostgreSQL can reuse
+the plan instead of re-planning multi-join queries on every call.
+
+Each query records call count, latency histogram and row counts. In
+capture mode, slow executions also record an ``EXPLAIN ANALYZE`` plan so
+plan regressions can be inspected with ``autotask check queries``.
+"""
+
+import json
+import logging
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, time as dt_time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from autotasktracker.core.connection_pool import LatencyHistogram, WAIT_BUCKETS_MS
+from autotasktracker.core.exceptions import DatabaseError
+from autotasktracker.core.partitioning import FULL_RANGE
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryDefinition:
+    """A named query with ``$n`` placeholders and their PostgreSQL types."""
+    name: str
+    sql: str
+    param_types: Tuple[str, ...] = ()
+    description: str = ''
+    sample_params: Optional[Callable[[], tuple]] = None
+
+    @property
+    def statement_name(self) -> str:
+        return f"att_{self.name}"
+
+    def prepare_sql(self) -> str:
+        types = f" ({', '.join(self.param_types)})" if self.param_types else ''
+        return f"PREPARE {self.statement_name}{types} AS {self.sql}"
+
+    def execute_sql(self) -> str:
+        if not self.param_types:
+            return f"EXECUTE {self.statement_name}"
+        return f"EXECUTE {self.statement_name}({', '.join(['%s'] * len(self.param_types))})"
+
+
+@dataclass
+class QueryStats:
+    """Per-query execution statistics."""
+    calls: int = 0
+    errors: int = 0
+    prepares: int = 0
+    rows: int = 0
+    max_rows: int = 0
+    latency: LatencyHistogram = field(default_factory=lambda: LatencyHistogram(WAIT_BUCKETS_MS))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'prepares': self.prepares,
+            'rows': self.rows,
+            'avg_rows': self.rows / self.calls if self.calls else 0.0,
+            'max_rows': self.max_rows,
+            'latency': self.latency.snapshot(),
+        }
+
+
+class QueryRegistry:
+    """Named, prepared hot queries with latency/row stats and plan capture."""
+
+    def __init__(self, capture_plans: bool = False, explain_threshold_ms: float = 500.0,
+                 explain_interval: float = 300.0):
+        """
+        Args:
+            capture_plans: Record ``EXPLAIN ANALYZE`` plans for slow executions
+            explain_threshold_ms: Only capture plans for executions at least this slow
+            explain_interval: Minimum seconds between captures of the same query
+        """
+        self.capture_plans = capture_plans
+        self.explain_threshold_ms = explain_threshold_ms
+        self.explain_interval = explain_interval
+
+        self._queries: Dict[str, QueryDefinition] = {}
+        self._stats: Dict[str, QueryStats] = {}
+        self._plans: Dict[str, Dict[str, Any]] = {}
+        self._last_explain: Dict[str, float] = {}
+        # Statements prepared on each live connection
+        self._prepared: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def register(self, name: str, sql: str, param_types: Sequence[str] = (),
+                 description: str = '', sample_params: Optional[Callable[[], tuple]] = None) -> QueryDefinition:
+        """Declare a hot query. Re-registering a name replaces its definition."""
+        query = QueryDefinition(name, sql.strip(), tuple(param_types), description, sample_params)
+        with self._lock:
+            self._queries[name] = query
+            self._stats.setdefault(name, QueryStats())
+        return query
+
+    def get(self, name: str) -> QueryDefinition:
+        try:
+            return self._queries[name]
+        except KeyError:
+            raise DatabaseError(f"Unknown registered query: {name}") from None
+
+    @property
+    def names(self) -> List[str]:
+        return sorted(self._queries)
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    def _prepared_on(self, conn) -> set:
+        try:
+            with self._lock:
+                return self._prepared.setdefault(conn, set())
+        except TypeError:
+            # Connection type without weakref support: prepare every time
+            return set()
+
+    def _ensure_prepared(self, conn, cursor, query: QueryDefinition):
+        prepared = self._prepared_on(conn)
+        if query.name in prepared:
+            return
+        if self._is_stale(cursor, query):
+            cursor.execute(f"DEALLOCATE {query.statement_name}")
+        cursor.execute(query.prepare_sql())
+        prepared.add(query.name)
+        self._stats[query.name].prepares += 1
+
+    @staticmethod
+    def _is_stale(cursor, query: QueryDefinition) -> bool:
+        """Whether the connection already has a statement with this name (e.g. after a reset)."""
+        cursor.execute("SELECT 1 FROM pg_prepared_statements WHERE name = %s", (query.statement_name,))
+        return cursor.fetchone() is not None
+
+    def execute(self, conn, name: str, params: Sequence = ()) -> Tuple[List[str], List[tuple]]:
+        """Run a registered query on ``conn``.
+
+        Returns:
+            Tuple of (column names, rows)
+        """
+        query = self.get(name)
+        stats = self._stats[name]
+        start = time.perf_counter()
+        try:
+            with conn.cursor() as cursor:
+                self._ensure_prepared(conn, cursor, query)
+                cursor.execute(query.execute_sql(), tuple(params))
+                columns = [column[0] for column in cursor.description or []]
+                rows = cursor.fetchall() if cursor.description else []
+        except Exception as e:
+            with self._lock:
+                stats.errors += 1
+            # The statement may be gone (e.g. connection reset); re-prepare next time
+            self._prepared_on(conn).discard(name)
+            logger.error(f"Registered query '{name}' failed: {e}")
+            raise DatabaseError(f"Query '{name}' failed: {e}") from e
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            stats.calls += 1
+            stats.rows += len(rows)
+            stats.max_rows = max(stats.max_rows, len(rows))
+            stats.latency.record(elapsed_ms)
+
+        if self.capture_plans and elapsed_ms >= self.explain_threshold_ms:
+            self._maybe_capture_plan(conn, query, params, elapsed_ms)
+        return columns, rows
+
+    def read_dataframe(self, conn, name: str, params: Sequence = ()) -> pd.DataFrame:
+        """Run a registered query and return the result as a DataFrame."""
+        columns, rows = self.execute(conn, name, params)
+        return pd.DataFrame.from_records(rows, columns=columns)
+
+    # ------------------------------------------------------------------
+    # Plans
+    # ------------------------------------------------------------------
+
+    def explain(self, conn, name: str, params: Sequence = ()) -> Dict[str, Any]:
+        """Run ``EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`` for a registered query."""
+        query = self.get(name)
+        with conn.cursor() as cursor:
+            self._ensure_prepared(conn, cursor, query)
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query.execute_sql()}", tuple(params))
+            raw = cursor.fetchone()[0]
+        plan = json.loads(raw) if isinstance(raw, str) else raw
+        plan = plan[0] if isinstance(plan, list) else plan
+        record = {
+            'captured_at': datetime.now().isoformat(),
+            'planning_ms': plan.get('Planning Time'),
+            'execution_ms': plan.get('Execution Time'),
+            'root_node': plan.get('Plan', {}).get('Node Type'),
+            'plan': plan,
+        }
+        with self._lock:
+            self._plans[name] = record
+        return record
+
+    def _maybe_capture_plan(self, conn, query: QueryDefinition, params: Sequence, elapsed_ms: float):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_explain.get(query.name, float('-inf')) < self.explain_interval:
+                return
+            self._last_explain[query.name] = now
+        try:
+            record = self.explain(conn, query.name, params)
+            logger.info(f"Captured plan for slow query '{query.name}' ({elapsed_ms:.0f}ms): "
+                        f"{record['root_node']}, execution {record['execution_ms']}ms")
+        except Exception as e:
+            logger.debug(f"Failed to capture plan for '{query.name}': {e}")
+
+    def get_plan(self, name: str) -> Optional[Dict[str, Any]]:
+        return self._plans.get(name)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get per-query stats (with the last captured plan summary, if any)."""
+        with self._lock:
+            result = {}
+            for name in sorted(self._queries):
+                stats = self._stats[name].to_dict()
+                plan = self._plans.get(name)
+                if plan:
+                    stats['last_plan'] = {k: plan[k] for k in ('captured_at', 'planning_ms',
+                                                              'execution_ms', 'root_node')}
+                result[name] = stats
+            return result
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {name: QueryStats() for name in self._queries}
+            self._plans.clear()
+
+
+# ----------------------------------------------------------------------
+# Hot query definitions
+# ----------------------------------------------------------------------
+
+def _today_range() -> tuple:
+    return (datetime.combine(datetime.today(), dt_time.min),
+            datetime.combine(datetime.today(), dt_time.max))
+
+
+def _last_day() -> tuple:
+    now = datetime.now()
+    return (now - timedelta(days=1), now)
+
+
+# Task rows with their display and AI metadata, shared by the period and delta queries.
+# $lo/$hi stand for the parameters bounding the entity ids (see core.partitioning),
+# so every join prunes to the month partitions that hold the period.
+_TASK_ROWS_SQL = """
+    SELECT
+        e.id,
+        COALESCE(e.created_at, e.file_created_at) as created_at,
+        e.filepath,
+        m1.value as ocr_text,
+        m2.value as active_window,
+        m3.value as tasks,
+        m4.value as category,
+        m5.value as minicpm_v_result,
+        m6.value as vlm_result,
+        m7.value as subtasks,
+        m3.value as tasks_json,
+        m9.value as session_id,
+        m10.value as dual_model_processed,
+        m11.value as dual_model_version,
+        m12.value as llama3_session_result,
+        m13.value as workflow_analysis
+    FROM entities e
+    LEFT JOIN metadata_entries m1 ON e.id = m1.entity_id AND m1.key = 'ocr_text'
+        AND m1.entity_id BETWEEN $lo AND $hi
+    LEFT JOIN metadata_entries m2 ON e.id = m2.entity_id AND m2.key = 'active_window'
+        AND m2.entity_id BETWEEN $lo AND $hi
+    LEFT JOIN metadata_entries m3 ON e.id = m3.entity_id AND m3.key = 'tasks'
+        AND m3.entity_id BETWEEN $lo AND $hi
+    LEFT JOIN metadata_entries m4 ON e.id = m4.entity_id AND m4.key = 'category'
+        AND m4.entity_id BETWEEN $lo AND $hi
+    LEFT JOIN metadata_entries m5 ON e.id = m5.entity_id AND m5.key = 'minicpm_v_result'
+        AND m5.entity_id BETWEEN $lo AND $hi
+    LEFT JOIN metadata_entries m6 ON e.id = m6.entity_id AND m6.key = 'vlm_result'
+        AND m6.entity_id BETWEEN $lo AND $hi
+    LEFT JOIN metadata_entries m7 ON e.id = m7.entity_id AND m7.key = 'subtasks'
+        AND m7.entity_id BETWEEN $lo AND $hi
+    LEFT JOIN metadata_entries m9 ON e.id = m9.entity_id AND m9.key = 'session_id'
+        AND m9.entity_id BETWEEN $lo AND $hi
+    LEFT JOIN metadata_entries m10 ON e.id = m10.entity_id AND m10.key = 'dual_model_processed'
+        AND m10.entity_id BETWEEN $lo AND $hi
+    LEFT JOIN metadata_entries m11 ON e.id = m11.entity_id AND m11.key = 'dual_model_version'
+        AND m11.entity_id BETWEEN $lo AND $hi
+    LEFT JOIN metadata_entries m12 ON e.id = m12.entity_id AND m12.key = 'llama3_session_result'
+        AND m12.entity_id BETWEEN $lo AND $hi
+    LEFT JOIN metadata_entries m13 ON e.id = m13.entity_id AND m13.key = 'workflow_analysis'
+        AND m13.entity_id BETWEEN $lo AND $hi
+"""
+
+# Optional filters are separate statements rather than ``$n IS NULL OR ...``
+# predicates, which force a generic plan that cannot use the filter
+_FETCH_TASKS_SQL = """
+    SELECT
+        e.id,
+        e.filepath,
+        e.created_at,
+        me1.value as ocr_text,
+        me2.value as active_window
+    FROM
+        entities e
+        LEFT JOIN metadata_entries me1 ON e.id = me1.entity_id AND me1.key = 'ocr_result'
+            AND me1.entity_id BETWEEN $lo AND $hi
+        LEFT JOIN metadata_entries me2 ON e.id = me2.entity_id AND me2.key = 'active_window'
+            AND me2.entity_id BETWEEN $lo AND $hi
+    WHERE
+        e.filepath IS NOT NULL
+        AND e.id BETWEEN $lo AND $hi
+"""
+
+
+def _bounded_by(sql: str, lo: int, hi: int) -> str:
+    """``sql`` with the entity id bounds as parameters ``$lo`` and ``$hi``."""
+    return sql.replace('$lo', f'${lo}').replace('$hi', f'${hi}')
+
+
+def register_default_queries(registry: QueryRegistry):
+    """Declare the dashboard and pipeline hot queries."""
+    registry.register('fetch_tasks', _bounded_by(_FETCH_TASKS_SQL, 5, 6) + """
+            AND e.created_at >= $1
+            AND e.created_at <= $2
+        ORDER BY e.created_at DESC
+        LIMIT $3 OFFSET $4
+    """, ('timestamp', 'timestamp', 'bigint', 'bigint', 'bigint', 'bigint'),
+        description='DatabaseManager.fetch_tasks',
+        sample_params=lambda: (*_last_day(), 100, 0, *FULL_RANGE))
+
+    registry.register('fetch_tasks_unbounded', _bounded_by(_FETCH_TASKS_SQL, 3, 4) + """
+        ORDER BY e.created_at DESC
+        LIMIT $1 OFFSET $2
+    """, ('bigint', 'bigint', 'bigint', 'bigint'),
+        description='DatabaseManager.fetch_tasks without a time range',
+        sample_params=lambda: (100, 0, *FULL_RANGE))
+
+    registry.register('tasks_for_period', _bounded_by(_TASK_ROWS_SQL, 4, 5) + """
+        WHERE COALESCE(e.created_at, e.file_created_at) >= $1
+          AND COALESCE(e.created_at, e.file_created_at) <= $2
+          AND e.id BETWEEN $4 AND $5
+        ORDER BY COALESCE(e.created_at, e.file_created_at) DESC
+        LIMIT $3
+    """, ('timestamp', 'timestamp', 'bigint', 'bigint', 'bigint'),
+        description='TaskRepository._get_tasks_sqlite_fallback',
+        sample_params=lambda: (*_last_day(), 1000, *FULL_RANGE))
+
+    registry.register('tasks_for_period_in_categories', _bounded_by(_TASK_ROWS_SQL, 5, 6) + """
+        WHERE COALESCE(e.created_at, e.file_created_at) >= $1
+          AND COALESCE(e.created_at, e.file_created_at) <= $2
+          AND m4.value = ANY($3)
+          AND e.id BETWEEN $5 AND $6
+        ORDER BY COALESCE(e.created_at, e.file_created_at) DESC
+        LIMIT $4
+    """, ('timestamp', 'timestamp', 'text[]', 'bigint', 'bigint', 'bigint'),
+        description='TaskRepository._get_tasks_sqlite_fallback with a category filter',
+        sample_params=lambda: (*_last_day(), ['Coding'], 1000, *FULL_RANGE))
+
+    registry.register('tasks_after_id', _bounded_by(_TASK_ROWS_SQL, 5, 6) + """
+        WHERE e.id > $3
+          AND e.id BETWEEN $5 AND $6
+          AND COALESCE(e.created_at, e.file_created_at) >= $1
+          AND COALESCE(e.created_at, e.file_created_at) <= $2
+        ORDER BY e.id
+        LIMIT $4
+    """, ('timestamp', 'timestamp', 'bigint', 'bigint', 'bigint', 'bigint'),
+        description='TaskRepository.get_tasks_after (live dashboard deltas)',
+        sample_params=lambda: (*_last_day(), 0, 1000, *FULL_RANGE))
+
+    registry.register('session_metrics', """
+        SELECT
+            e.id,
+            COALESCE(e.created_at, e.file_created_at) as created_at,
+            m1.value as session_id,
+            m2.value as dual_model_processed,
+            m3.value as llama3_session_result,
+            m4.value as workflow_analysis
+        FROM entities e
+        JOIN metadata_entries m1 ON e.id = m1.entity_id AND m1.key = 'session_id'
+            AND m1.entity_id BETWEEN $3 AND $4
+        LEFT JOIN metadata_entries m2 ON e.id = m2.entity_id AND m2.key = 'dual_model_processed'
+            AND m2.entity_id BETWEEN $3 AND $4
+        LEFT JOIN metadata_entries m3 ON e.id = m3.entity_id AND m3.key = 'llama3_session_result'
+            AND m3.entity_id BETWEEN $3 AND $4
+        LEFT JOIN metadata_entries m4 ON e.id = m4.entity_id AND m4.key = 'workflow_analysis'
+            AND m4.entity_id BETWEEN $3 AND $4
+        WHERE COALESCE(e.created_at, e.file_created_at) >= $1
+          AND COALESCE(e.created_at, e.file_created_at) <= $2
+          AND e.id BETWEEN $3 AND $4
+          AND m1.value IS NOT NULL
+    """, ('timestamp', 'timestamp', 'bigint', 'bigint'),
+        description='MetricsRepository.get_session_metrics',
+        sample_params=lambda: (*_last_day(), *FULL_RANGE))
+
+    registry.register('count_tasks_today', """
+        SELECT COUNT(*) as task_count
+        FROM entities e
+        JOIN metadata_entries t ON e.id = t.entity_id AND t.key = 'tasks'
+            AND t.entity_id BETWEEN $3 AND $4
+        WHERE COALESCE(e.created_at, e.file_created_at) BETWEEN $1 AND $2
+          AND e.id BETWEEN $3 AND $4
+    """, ('timestamp', 'timestamp', 'bigint', 'bigint'),
+        description='TaskRepository.count_tasks_today',
+        sample_params=lambda: (*_today_range(), *FULL_RANGE))
+
+    # The change counter sums the row write counters of both tables and
+    # their partitions. Unlike MAX(id) it also moves on in-place updates and
+    # deletes (VLM reprocessing, backfill cutover, version recompute,
+    # archiving). The statistics are reported after commit, so writers share
+    # no lock and the counter trails a commit by a second or so.
+    registry.register('data_watermark', """
+        SELECT
+            (SELECT COALESCE(MAX(id), 0) FROM entities) AS max_entity_id,
+            (SELECT COALESCE(SUM(s.n_tup_ins + s.n_tup_upd + s.n_tup_del), 0)
+             FROM pg_stat_user_tables s
+             WHERE s.relid IN (SELECT relid FROM pg_partition_tree('entities')
+                               UNION ALL
+                               SELECT relid FROM pg_partition_tree('metadata_entries'))) AS data_version
+    """, description='MetricsRepository.get_data_watermark (metrics API ETags)',
+        sample_params=tuple)
+
+
+# Global registry instance
+_query_registry: Optional[QueryRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_query_registry() -> QueryRegistry:
+    """Get the global query registry with the default hot queries declared."""
+    global _query_registry
+    if _query_registry is None:
+        with _registry_lock:
+            if _query_registry is None:
+                from autotasktracker.config import get_config
+                config = get_config()
+                registry = QueryRegistry(
+                    capture_plans=config.QUERY_PLAN_CAPTURE,
+                    explain_threshold_ms=config.QUERY_PLAN_THRESHOLD_MS,
+                )
+                register_default_queries(registry)
+                _query_registry = registry
+    return _query_registry
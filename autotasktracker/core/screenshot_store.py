@@ -0,0 +1,722 @@
+"""
+Tiered storage for screenshot files.
+
+Screenshots are full PNGs referenced by ``entities.filepath``, and idle
+screens produce byte-identical frames every few seconds. The tier manager
+keeps disk usage down in two passes:
+
+* **Deduplication**: every screenshot past a short grace period is
+  content-hashed (SHA-256) once; an exact duplicate of an earlier frame is
+  replaced by a hard link to it, so the path keeps working and the bytes
+  are stored once.
+* **Transcoding**: screenshots older than ``SCREENSHOT_TIER_DAYS`` are
+  re-encoded (lossless WebP by default) into a content-addressed directory
+  outside the screenshots tree, so Pensieve never re-ingests them:
+
+      <SCREENSHOT_TIER_DIR>/ab/abcdef....webp
+
+  Lossless output is decoded and compared pixel by pixel before the
+  original is removed. The move is recorded in ``screenshot_files`` before
+  the original is unlinked, so an interrupted run leaves at worst an extra
+  copy (removed by ``sweep``).
+
+``entities.filepath`` is never rewritten. Readers resolve it instead:
+``resolve_screenshot`` returns the path unchanged when the file exists (one
+``stat``) and otherwise looks up where the tier manager moved it.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from autotasktracker.core.exceptions import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+TIER_ORIGINAL = 'original'        # the file at filepath holds the bytes
+TIER_LINKED = 'linked'            # filepath is a hard link to an identical earlier frame
+TIER_TRANSCODED = 'transcoded'    # moved to stored_path under the tier directory
+TIER_MISSING = 'missing'          # no file left to transcode
+
+# Encoder settings per target format; lossless output is verified pixel by pixel
+TIER_FORMATS = {
+    'webp': {'format': 'WEBP', 'extension': 'webp', 'lossless': True,
+             'options': {'lossless': True, 'quality': 80, 'method': 4}},
+    'avif': {'format': 'AVIF', 'extension': 'avif', 'lossless': False,
+             'options': {'quality': 90}},
+    'jpeg': {'format': 'JPEG', 'extension': 'jpg', 'lossless': False,
+             'options': {'quality': 95, 'subsampling': 0}},
+}
+
+# Frames younger than this may still be written or processed by Pensieve
+DEDUP_GRACE_SECONDS = 3600
+
+# How long "nothing has been transcoded yet" is trusted before asking again
+RESOLVER_PROBE_TTL = 60.0
+
+SCHEMA_STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS screenshot_files (
+        entity_id BIGINT PRIMARY KEY,
+        filepath VARCHAR(1024) NOT NULL,
+        content_hash VARCHAR(64) NOT NULL,
+        tier VARCHAR(16) NOT NULL,
+        stored_path VARCHAR(256),
+        original_bytes BIGINT NOT NULL,
+        stored_bytes BIGINT NOT NULL,
+        decode_ms_original REAL,
+        decode_ms_stored REAL,
+        updated_at TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_screenshot_files_filepath ON screenshot_files (filepath)",
+    "CREATE INDEX IF NOT EXISTS idx_screenshot_files_hash ON screenshot_files (content_hash)",
+]
+
+
+def _file_digest(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _decode(path) -> Tuple['object', float]:
+    """Fully decode an image; returns (image, milliseconds)."""
+    from PIL import Image
+    started = time.perf_counter()
+    with Image.open(path) as img:
+        img.load()
+        decoded = img.copy()
+    return decoded, (time.perf_counter() - started) * 1000
+
+
+class ScreenshotStore:
+    """Resolves screenshot paths and reports tier savings.
+
+    Works against any manager exposing ``get_connection(readonly=...)`` and
+    ``get_database_type()``; SQLite stand-ins are supported for tests and
+    local setups.
+    """
+
+    def __init__(self, db_manager=None, tier_dir: Optional[str] = None, cache_size: int = 10000):
+        """
+        Args:
+            db_manager: Database manager; defaults to a new DatabaseManager
+            tier_dir: Transcoded screenshot root (defaults to ``SCREENSHOT_TIER_DIR``)
+            cache_size: Resolved paths remembered in memory
+        """
+        if db_manager is None:
+            from autotasktracker.core.database import DatabaseManager
+            db_manager = DatabaseManager(use_pensieve_api=False)
+        if tier_dir is None:
+            from autotasktracker.config import get_config
+            tier_dir = get_config().get_screenshot_tier_path()
+        self.db = db_manager
+        self.root = Path(tier_dir)
+        self.cache_size = cache_size
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._resolved: 'OrderedDict[str, str]' = OrderedDict()
+        self._has_transcoded: Optional[bool] = None
+        self._probed_at = 0.0
+        self.resolver_stats = {'direct': 0, 'resolved': 0, 'missing': 0, 'lookups': 0, 'lookup_ms': 0.0}
+
+    @property
+    def is_sqlite(self) -> bool:
+        get_type = getattr(self.db, 'get_database_type', None)
+        return bool(get_type) and get_type() == 'sqlite'
+
+    def _sql(self, query: str) -> str:
+        """Adapt a ``%s``-style query to the connection's parameter style."""
+        if self.is_sqlite:
+            return query.replace('%s', '?')
+        return query
+
+    def _placeholders(self, count: int) -> str:
+        return ', '.join(['%s'] * count)
+
+    def _bound(self, value: datetime):
+        # SQLite stores timestamps as ISO text
+        return value.isoformat(sep=' ') if self.is_sqlite else value
+
+    def _query(self, query: str, params: Sequence = ()) -> List[tuple]:
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(self._sql(query), tuple(params))
+                return [tuple(row) for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+
+    def ensure_schema(self):
+        """Create the screenshot file table if missing."""
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            try:
+                with self.db.get_connection(readonly=False) as conn:
+                    cursor = conn.cursor()
+                    for statement in SCHEMA_STATEMENTS:
+                        cursor.execute(statement)
+                    conn.commit()
+                    cursor.close()
+                self._schema_ready = True
+            except Exception as e:
+                logger.error(f"Failed to create screenshot store schema: {e}")
+                raise DatabaseError(f"Screenshot store schema creation failed: {e}") from e
+
+    # ------------------------------------------------------------------
+    # Resolution
+    # ------------------------------------------------------------------
+
+    def stored_file(self, stored_path: str) -> Path:
+        return self.root / stored_path
+
+    def _any_transcoded(self) -> bool:
+        """Whether any screenshot was moved, re-checked every ``RESOLVER_PROBE_TTL`` seconds."""
+        now = time.monotonic()
+        if self._has_transcoded is None or (not self._has_transcoded
+                                            and now - self._probed_at > RESOLVER_PROBE_TTL):
+            try:
+                rows = self._query("SELECT 1 FROM screenshot_files WHERE tier = %s LIMIT 1",
+                                   (TIER_TRANSCODED,))
+                self._has_transcoded = bool(rows)
+            except Exception as e:
+                logger.debug(f"Screenshot tier lookup unavailable: {e}")
+                self._has_transcoded = False
+            self._probed_at = now
+        return self._has_transcoded
+
+    def resolve_many(self, filepaths: Iterable[str]) -> Dict[str, str]:
+        """Current on-disk location of each screenshot path.
+
+        Paths whose file exists map to themselves; moved ones map to their
+        transcoded file; unknown missing ones map to themselves.
+        """
+        resolved: Dict[str, str] = {}
+        pending = []
+        with self._lock:
+            for filepath in filepaths:
+                if not filepath or filepath in resolved:
+                    continue
+                filepath = str(filepath)
+                if os.path.exists(filepath):
+                    resolved[filepath] = filepath
+                    self.resolver_stats['direct'] += 1
+                elif filepath in self._resolved:
+                    self._resolved.move_to_end(filepath)
+                    resolved[filepath] = self._resolved[filepath]
+                    self.resolver_stats['resolved'] += 1
+                else:
+                    pending.append(filepath)
+        if not pending:
+            return resolved
+
+        found: Dict[str, str] = {}
+        if self._any_transcoded():
+            started = time.perf_counter()
+            for start in range(0, len(pending), 500):
+                chunk = pending[start:start + 500]
+                rows = self._query(f"""
+                    SELECT filepath, stored_path FROM screenshot_files
+                    WHERE tier = %s AND filepath IN ({self._placeholders(len(chunk))})
+                """, (TIER_TRANSCODED, *chunk))
+                found.update({filepath: str(self.stored_file(stored)) for filepath, stored in rows})
+            with self._lock:
+                self.resolver_stats['lookups'] += 1
+                self.resolver_stats['lookup_ms'] += (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            for filepath in pending:
+                if filepath in found:
+                    resolved[filepath] = found[filepath]
+                    self._resolved[filepath] = found[filepath]
+                    self.resolver_stats['resolved'] += 1
+                else:
+                    resolved[filepath] = filepath
+                    self.resolver_stats['missing'] += 1
+            while len(self._resolved) > self.cache_size:
+                self._resolved.popitem(last=False)
+        return resolved
+
+    def resolve(self, filepath: str) -> str:
+        """Current on-disk location of one screenshot path (see ``resolve_many``)."""
+        if not filepath:
+            return filepath
+        return self.resolve_many([filepath])[str(filepath)]
+
+    # ------------------------------------------------------------------
+    # Report
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict:
+        """Bytes saved per tier and decode latency before/after transcoding."""
+        self.ensure_schema()
+        tiers = {}
+        for tier, count, original, stored in self._query("""
+            SELECT tier, COUNT(*), COALESCE(SUM(original_bytes), 0), COALESCE(SUM(stored_bytes), 0)
+            FROM screenshot_files GROUP BY tier
+        """):
+            tiers[tier] = {'screenshots': int(count), 'original_bytes': int(original),
+                           'stored_bytes': int(stored)}
+        rows = self._query("""
+            SELECT COUNT(*), AVG(decode_ms_original), AVG(decode_ms_stored)
+            FROM screenshot_files WHERE decode_ms_stored IS NOT NULL
+        """)
+        samples, decode_original, decode_stored = rows[0] if rows else (0, None, None)
+
+        tracked = [entry for tier, entry in tiers.items() if tier != TIER_MISSING]
+        original = sum(entry['original_bytes'] for entry in tracked)
+        stored = sum(entry['stored_bytes'] for entry in tracked)
+        with self._lock:
+            resolver = dict(self.resolver_stats)
+        resolver['avg_lookup_ms'] = resolver['lookup_ms'] / resolver['lookups'] if resolver['lookups'] else 0.0
+        return {
+            'screenshots': sum(entry['screenshots'] for entry in tracked),
+            'tiers': tiers,
+            'original_bytes': original,
+            'stored_bytes': stored,
+            'saved_bytes': original - stored,
+            'saved_ratio': (original - stored) / original if original else 0.0,
+            'dedup_saved_bytes': tiers.get(TIER_LINKED, {}).get('original_bytes', 0),
+            'decode_samples': int(samples or 0),
+            'decode_ms_original': float(decode_original) if decode_original is not None else None,
+            'decode_ms_stored': float(decode_stored) if decode_stored is not None else None,
+            'resolver': resolver,
+        }
+
+
+class ScreenshotTierManager(ScreenshotStore):
+    """Deduplicates and transcodes screenshot files."""
+
+    def __init__(self, db_manager=None, tier_dir: Optional[str] = None,
+                 older_than_days: Optional[int] = None, image_format: Optional[str] = None,
+                 batch_size: int = 500, dedup_grace_seconds: float = DEDUP_GRACE_SECONDS,
+                 verify: bool = True):
+        """
+        Args:
+            db_manager: Database manager; defaults to a new DatabaseManager
+            tier_dir: Transcoded screenshot root (defaults to ``SCREENSHOT_TIER_DIR``)
+            older_than_days: Transcode screenshots captured longer ago than this
+                (defaults to ``SCREENSHOT_TIER_DAYS``)
+            image_format: One of ``TIER_FORMATS`` (defaults to ``SCREENSHOT_TIER_FORMAT``)
+            batch_size: Screenshots handled per transaction
+            dedup_grace_seconds: Leave screenshots younger than this alone
+            verify: Compare lossless output with the original before removing it
+        """
+        super().__init__(db_manager, tier_dir)
+        if older_than_days is None or image_format is None:
+            from autotasktracker.config import get_config
+            config = get_config()
+            older_than_days = config.SCREENSHOT_TIER_DAYS if older_than_days is None else older_than_days
+            image_format = config.SCREENSHOT_TIER_FORMAT if image_format is None else image_format
+        if image_format not in TIER_FORMATS:
+            raise ValueError(f"Unsupported screenshot tier format: {image_format}")
+        self.older_than_days = older_than_days
+        self.image_format = image_format
+        self.encoding = TIER_FORMATS[image_format]
+        self.batch_size = batch_size
+        self.dedup_grace_seconds = dedup_grace_seconds
+        self.verify = verify
+
+    def cutoff(self, now: Optional[datetime] = None) -> datetime:
+        return (now or datetime.now()) - timedelta(days=self.older_than_days)
+
+    def _execute_many(self, statements: List[Tuple[str, Sequence]]):
+        """Run ``statements`` in one transaction."""
+        with self.db.get_connection(readonly=False) as conn:
+            cursor = conn.cursor()
+            try:
+                if self.is_sqlite:
+                    cursor.execute('BEGIN IMMEDIATE')
+                for query, params in statements:
+                    cursor.execute(self._sql(query), tuple(params))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def candidates(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Screenshots a run would hash, and bytes it would transcode, now."""
+        self.ensure_schema()
+        now = now or datetime.now()
+        grace = self._bound(now - timedelta(seconds=self.dedup_grace_seconds))
+        rows = self._query("""
+            SELECT COUNT(*) FROM entities
+            WHERE id > (SELECT COALESCE(MAX(entity_id), 0) FROM screenshot_files) AND created_at < %s
+        """, (grace,))
+        unhashed = int(rows[0][0] or 0) if rows else 0
+        transcode = {'screenshots': 0, 'bytes': 0}
+        if self.older_than_days > 0:
+            rows = self._query("""
+                SELECT COUNT(*), COALESCE(SUM(f.stored_bytes), 0)
+                FROM screenshot_files f JOIN entities e ON e.id = f.entity_id
+                WHERE f.tier IN (%s, %s) AND e.created_at < %s
+            """, (TIER_ORIGINAL, TIER_LINKED, self._bound(self.cutoff(now))))
+            if rows:
+                transcode = {'screenshots': int(rows[0][0] or 0), 'bytes': int(rows[0][1] or 0)}
+        return {'unhashed': unhashed, 'transcode_screenshots': transcode['screenshots'],
+                'transcode_bytes': transcode['bytes']}
+
+    def run(self, now: Optional[datetime] = None, dedup: bool = True, transcode: bool = True,
+            max_batches: Optional[int] = None, on_batch=None) -> Dict[str, Dict[str, int]]:
+        """Deduplicate new screenshots, then transcode old ones."""
+        totals = {}
+        if dedup:
+            totals['dedup'] = self.deduplicate(now, max_batches=max_batches, on_batch=on_batch)
+        if transcode:
+            totals['transcode'] = self.transcode(now, max_batches=max_batches, on_batch=on_batch)
+        return totals
+
+    # ------------------------------------------------------------------
+    # Deduplication
+    # ------------------------------------------------------------------
+
+    def deduplicate(self, now: Optional[datetime] = None, max_batches: Optional[int] = None,
+                    on_batch=None) -> Dict[str, int]:
+        """Hash screenshots not seen yet and hard-link exact duplicates.
+
+        Resumes after the highest entity id already recorded. Linking is
+        idempotent, so a batch interrupted before its rows are recorded is
+        simply redone.
+
+        Returns:
+            Totals: batches, screenshots hashed, linked, saved_bytes, missing
+        """
+        self.ensure_schema()
+        now = now or datetime.now()
+        grace = self._bound(now - timedelta(seconds=self.dedup_grace_seconds))
+        totals = {'batches': 0, 'screenshots': 0, 'linked': 0, 'saved_bytes': 0, 'missing': 0}
+        rows = self._query("SELECT COALESCE(MAX(entity_id), 0) FROM screenshot_files")
+        after_id = int(rows[0][0]) if rows else 0
+        while max_batches is None or totals['batches'] < max_batches:
+            batch = self._query("""
+                SELECT id, filepath FROM entities
+                WHERE id > %s AND created_at < %s ORDER BY id LIMIT %s
+            """, (after_id, grace, self.batch_size))
+            if not batch:
+                break
+            after_id = int(batch[-1][0])
+            self._deduplicate_batch(batch, now, totals)
+            totals['batches'] += 1
+            if on_batch:
+                on_batch('dedup', dict(totals))
+        if totals['linked']:
+            logger.info(f"Linked {totals['linked']} duplicate screenshots, saving {totals['saved_bytes']} bytes")
+        return totals
+
+    def _canonicals(self, digests: Sequence[str]) -> Dict[str, str]:
+        """Existing file per content hash to link duplicates to (originals first)."""
+        canonicals: Dict[str, str] = {}
+        for start in range(0, len(digests), 500):
+            chunk = digests[start:start + 500]
+            rows = self._query(f"""
+                SELECT content_hash, filepath FROM screenshot_files
+                WHERE tier IN (%s, %s) AND content_hash IN ({self._placeholders(len(chunk))})
+                ORDER BY CASE WHEN tier = %s THEN 0 ELSE 1 END, entity_id
+            """, (TIER_ORIGINAL, TIER_LINKED, *chunk, TIER_ORIGINAL))
+            for digest, filepath in rows:
+                if digest not in canonicals and os.path.exists(filepath):
+                    canonicals[digest] = filepath
+        return canonicals
+
+    def _deduplicate_batch(self, batch: List[tuple], now: datetime, totals: Dict[str, int]):
+        hashed = []
+        for entity_id, filepath in batch:
+            try:
+                stat = os.stat(filepath)
+                hashed.append((int(entity_id), filepath, _file_digest(filepath), stat))
+            except (OSError, TypeError):
+                totals['missing'] += 1
+        if not hashed:
+            return
+
+        canonicals = self._canonicals(sorted({digest for _, _, digest, _ in hashed}))
+        records = []
+        for entity_id, filepath, digest, stat in hashed:
+            target = canonicals.get(digest)
+            tier, stored = TIER_ORIGINAL, stat.st_size
+            if target is None:
+                canonicals[digest] = filepath
+            elif target != filepath and self._link(target, filepath, stat):
+                tier, stored = TIER_LINKED, 0
+                totals['linked'] += 1
+                totals['saved_bytes'] += stat.st_size
+            records.append((entity_id, filepath, digest, tier, stat.st_size, stored, self._bound(now)))
+
+        insert = """
+            INSERT INTO screenshot_files
+                (entity_id, filepath, content_hash, tier, original_bytes, stored_bytes, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (entity_id) DO NOTHING
+        """
+        self._execute_many([(insert, record) for record in records])
+        totals['screenshots'] += len(records)
+
+    @staticmethod
+    def _link(target: str, filepath: str, stat: os.stat_result) -> bool:
+        """Replace ``filepath`` by a hard link to the identical file ``target``."""
+        try:
+            target_stat = os.stat(target)
+        except OSError:
+            return False
+        if (target_stat.st_dev, target_stat.st_ino) == (stat.st_dev, stat.st_ino):
+            return True
+        if target_stat.st_size != stat.st_size or target_stat.st_dev != stat.st_dev:
+            return False
+        tmp = f"{filepath}.{os.getpid()}.link"
+        try:
+            os.link(target, tmp)
+            # Atomic: readers see either the old file or the identical link
+            os.replace(tmp, filepath)
+            return True
+        except OSError as e:
+            logger.debug(f"Could not link {filepath} to {target}: {e}")
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return False
+
+    # ------------------------------------------------------------------
+    # Transcoding
+    # ------------------------------------------------------------------
+
+    def transcode(self, now: Optional[datetime] = None, max_batches: Optional[int] = None,
+                  on_batch=None) -> Dict[str, int]:
+        """Re-encode hashed screenshots older than the cutoff into the tier directory.
+
+        Identical frames share one transcoded file. Each batch records the
+        new locations in one transaction and only then removes the
+        originals.
+
+        Returns:
+            Totals: batches, screenshots moved, files written, original_bytes,
+            stored_bytes, failed
+        """
+        totals = {'batches': 0, 'screenshots': 0, 'files': 0, 'original_bytes': 0,
+                  'stored_bytes': 0, 'failed': 0}
+        if self.older_than_days <= 0:
+            return totals
+        self.ensure_schema()
+        now = now or datetime.now()
+        cutoff = self._bound(self.cutoff(now))
+        after_id = 0
+        while max_batches is None or totals['batches'] < max_batches:
+            batch = self._query("""
+                SELECT f.entity_id, f.filepath, f.content_hash, f.tier, f.original_bytes
+                FROM screenshot_files f JOIN entities e ON e.id = f.entity_id
+                WHERE f.entity_id > %s AND f.tier IN (%s, %s) AND e.created_at < %s
+                ORDER BY f.entity_id LIMIT %s
+            """, (after_id, TIER_ORIGINAL, TIER_LINKED, cutoff, self.batch_size))
+            if not batch:
+                break
+            after_id = int(batch[-1][0])
+            self._transcode_batch(batch, now, totals)
+            totals['batches'] += 1
+            if on_batch:
+                on_batch('transcode', dict(totals))
+        if totals['screenshots']:
+            self._has_transcoded = True
+            logger.info(f"Transcoded {totals['screenshots']} screenshots into {totals['files']} "
+                        f"{self.image_format} files ({totals['original_bytes']} -> {totals['stored_bytes']} bytes)")
+        return totals
+
+    def _stored_path(self, digest: str) -> str:
+        return f"{digest[:2]}/{digest}.{self.encoding['extension']}"
+
+    def _transcode_batch(self, batch: List[tuple], now: datetime, totals: Dict[str, int]):
+        groups: 'OrderedDict[str, List[tuple]]' = OrderedDict()
+        for row in batch:
+            groups.setdefault(row[2], []).append(row)
+
+        stored_paths = [self._stored_path(digest) for digest in groups]
+        owned = {row[0] for row in self._query(f"""
+            SELECT DISTINCT stored_path FROM screenshot_files
+            WHERE tier = %s AND stored_path IN ({self._placeholders(len(stored_paths))})
+        """, (TIER_TRANSCODED, *stored_paths))}
+
+        statements = []
+        unlink = []
+        moved_ids = set()
+        for digest, rows in groups.items():
+            stored_path = self._stored_path(digest)
+            sources = [row[1] for row in rows if os.path.exists(row[1])]
+            target = self.stored_file(stored_path)
+            metrics = (None, None)
+            if not target.exists():
+                if not sources:
+                    statements.append((f"""
+                        UPDATE screenshot_files SET tier = %s, stored_bytes = 0, updated_at = %s
+                        WHERE entity_id IN ({self._placeholders(len(rows))})
+                    """, (TIER_MISSING, self._bound(now), *[row[0] for row in rows])))
+                    logger.warning(f"Screenshot files for {digest[:12]} are gone; marked missing")
+                    continue
+                try:
+                    metrics = self._encode(sources[0], target)
+                except Exception as e:
+                    logger.warning(f"Failed to transcode {sources[0]}: {e}")
+                    totals['failed'] += len(rows)
+                    continue
+            # The first batch to reference a stored file accounts for its bytes
+            stored_bytes = target.stat().st_size if stored_path not in owned else 0
+            owned.add(stored_path)
+
+            ids = [row[0] for row in rows]
+            statements.append((f"""
+                UPDATE screenshot_files
+                SET tier = %s, stored_path = %s, stored_bytes = 0, updated_at = %s
+                WHERE entity_id IN ({self._placeholders(len(ids))})
+            """, (TIER_TRANSCODED, stored_path, self._bound(now), *ids)))
+            statements.append(("""
+                UPDATE screenshot_files SET stored_bytes = %s, decode_ms_original = %s, decode_ms_stored = %s
+                WHERE entity_id = %s
+            """, (stored_bytes, metrics[0], metrics[1], ids[0])))
+            if any(row[3] == TIER_ORIGINAL for row in rows):
+                # Newer frames linked to this inode still hold its bytes
+                statements.extend(self._promote_remaining(digest, ids))
+            moved_ids.update(ids)
+            unlink.extend(row[1] for row in rows)
+            totals['screenshots'] += len(rows)
+            totals['files'] += 1 if stored_bytes else 0
+            totals['original_bytes'] += sum(int(row[4]) for row in rows)
+            totals['stored_bytes'] += stored_bytes
+
+        if statements:
+            self._execute_many(statements)
+        for filepath in unlink:
+            try:
+                os.unlink(filepath)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not remove transcoded original {filepath}: {e}")
+
+    def _promote_remaining(self, digest: str, moved_ids: List[int]) -> List[Tuple[str, Sequence]]:
+        rows = self._query(f"""
+            SELECT entity_id, tier FROM screenshot_files
+            WHERE content_hash = %s AND tier IN (%s, %s)
+              AND entity_id NOT IN ({self._placeholders(len(moved_ids))})
+            ORDER BY entity_id
+        """, (digest, TIER_ORIGINAL, TIER_LINKED, *moved_ids))
+        if not rows or any(tier == TIER_ORIGINAL for _, tier in rows):
+            return []
+        return [("""
+            UPDATE screenshot_files SET tier = %s, stored_bytes = original_bytes WHERE entity_id = %s
+        """, (TIER_ORIGINAL, rows[0][0]))]
+
+    def _encode(self, source: str, target: Path) -> Tuple[float, float]:
+        """Write ``source`` to ``target`` in the tier format; returns decode ms (original, stored)."""
+        original, decode_original = _decode(source)
+        encoding = self.encoding
+        image = original
+        if encoding['format'] == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        try:
+            image.save(tmp, encoding['format'], **encoding['options'])
+            with open(tmp, 'rb') as f:
+                os.fsync(f.fileno())
+            stored, decode_stored = _decode(tmp)
+            if stored.size != original.size:
+                raise ValueError(f"decoded size {stored.size} != {original.size}")
+            if self.verify and encoding['lossless'] and \
+                    stored.convert('RGBA').tobytes() != original.convert('RGBA').tobytes():
+                raise ValueError("lossless output differs from the original")
+            os.replace(tmp, target)
+        except Exception:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        return decode_original, decode_stored
+
+    def sweep(self, batch_size: int = 5000) -> int:
+        """Remove originals still present for transcoded screenshots (left by interrupted runs)."""
+        self.ensure_schema()
+        removed = 0
+        after_id = 0
+        while True:
+            rows = self._query("""
+                SELECT entity_id, filepath, stored_path FROM screenshot_files
+                WHERE tier = %s AND entity_id > %s ORDER BY entity_id LIMIT %s
+            """, (TIER_TRANSCODED, after_id, batch_size))
+            if not rows:
+                break
+            after_id = int(rows[-1][0])
+            for _, filepath, stored_path in rows:
+                if os.path.exists(filepath) and self.stored_file(stored_path).exists():
+                    os.unlink(filepath)
+                    removed += 1
+        if removed:
+            logger.info(f"Removed {removed} originals of transcoded screenshots")
+        return removed
+
+
+_stores: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+_stores_lock = threading.Lock()
+
+
+def get_screenshot_store(db_manager=None) -> ScreenshotStore:
+    """Get the path resolver for a database manager (default: the shared one)."""
+    if db_manager is None:
+        from autotasktracker.core.database import get_default_db_manager
+        db_manager = get_default_db_manager()
+    with _stores_lock:
+        store = _stores.get(db_manager)
+        if store is None:
+            store = ScreenshotStore(db_manager)
+            _stores[db_manager] = store
+    return store
+
+
+def resolve_screenshot(filepath, db_manager=None):
+    """On-disk location of a screenshot; ``filepath`` itself if it exists or on any error."""
+    if not filepath or os.path.exists(filepath):
+        return filepath
+    try:
+        return get_screenshot_store(db_manager).resolve(str(filepath))
+    except Exception as e:
+        logger.debug(f"Screenshot resolution unavailable: {e}")
+        return filepath
+
+
+def resolve_screenshots(db_manager, filepaths: Iterable[str]) -> Dict[str, str]:
+    """``ScreenshotStore.resolve_many`` for ``db_manager``; empty on any error."""
+    try:
+        return get_screenshot_store(db_manager).resolve_many(filepaths)
+    except Exception as e:
+        logger.debug(f"Screenshot resolution unavailable: {e}")
+        return {}
+
+
+def resolve_frame(db_manager, df: pd.DataFrame, column: str = 'filepath') -> pd.DataFrame:
+    """Copy of ``df`` with ``column`` resolved; returns ``df`` unchanged when nothing moved or on error."""
+    if df.empty or column not in df.columns:
+        return df
+    resolved = resolve_screenshots(db_manager, [path for path in df[column].dropna().unique() if path])
+    moved = {path: location for path, location in resolved.items() if location != path}
+    if not moved:
+        return df
+    df = df.copy()
+    df[column] = df[column].map(lambda path: moved.get(path, path))
+    return df
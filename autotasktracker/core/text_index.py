@@ -0,0 +1,589 @@
+"""
+Full-text index over screenshot window titles, OCR text and tasks.
+
+Searching the EAV ``metadata_entries`` table with ``LIKE '%term%'`` scans
+every metadata value on every query. This module keeps one denormalized
+row per entity in an engine-native text index instead:
+
+    PostgreSQL: ``entity_text_index`` with a generated, weighted ``tsvector``
+                column under a GIN index, plus ``pg_trgm`` GIN indexes on the
+                title and tasks for substring and fuzzy matches
+    SQLite:     an FTS5 virtual table ``entity_text_fts`` keyed by entity id
+
+Both are maintained incrementally by triggers on ``metadata_entries``, so
+every writer (Pensieve, the processors, scripts) keeps the index current
+without calling into this module. Ranking (``ts_rank_cd`` / BM25) and
+highlighting (``ts_headline`` / ``highlight()`` / ``snippet()``) run in the
+database engine. ``backfill`` and ``rebuild`` read OCR text of archived
+screenshots (see ``metadata_archive``) back from the archive parts.
+"""
+
+import json
+import logging
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from autotasktracker.core.exceptions import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+
+# Index column -> metadata key it is filled from
+INDEXED_KEYS = {
+    'window_title': 'active_window',
+    'ocr_text': 'ocr_result',
+    'tasks': 'tasks',
+    'category': 'category',
+}
+
+# Markdown bold around matched terms in highlights
+HIGHLIGHT_START = '**'
+HIGHLIGHT_END = '**'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _in_list(values) -> str:
+    return ', '.join(f"'{value}'" for value in values)
+
+
+def ocr_plain_text(raw: Optional[str]) -> str:
+    """Text of a stored ``ocr_result``, as the index triggers extract it.
+
+    RapidOCR results are ``[[bbox], text, confidence]`` triples and Pensieve
+    stores ``{"rec_txt": text, "score": ...}`` objects; anything that is not
+    a JSON array is returned unchanged.
+    """
+    if not raw:
+        return ''
+    try:
+        items = json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        return raw
+    if not isinstance(items, list):
+        return raw
+    texts = []
+    for item in items:
+        if isinstance(item, list) and len(item) > 1:
+            texts.append(str(item[1]))
+        elif isinstance(item, dict) and item.get('rec_txt') is not None:
+            texts.append(str(item['rec_txt']))
+    return ' '.join(texts)
+
+
+def _like_pattern(text: str) -> str:
+    """Substring ``LIKE`` pattern matching ``text`` literally."""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+POSTGRES_SCHEMA_STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE TABLE IF NOT EXISTS entity_text_index (
+        entity_id BIGINT PRIMARY KEY,
+        created_at TIMESTAMP,
+        window_title TEXT NOT NULL DEFAULT '',
+        ocr_text TEXT NOT NULL DEFAULT '',
+        tasks TEXT NOT NULL DEFAULT '',
+        category TEXT,
+        document tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', window_title), 'A') ||
+            setweight(to_tsvector('english', tasks), 'B') ||
+            setweight(to_tsvector('english', ocr_text), 'C')
+        ) STORED
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_entity_text_document
+        ON entity_text_index USING GIN (document)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_entity_text_title_trgm
+        ON entity_text_index USING GIN (window_title gin_trgm_ops)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_entity_text_tasks_trgm
+        ON entity_text_index USING GIN (tasks gin_trgm_ops)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_entity_text_created
+        ON entity_text_index (created_at)
+    """,
+    """
+    CREATE OR REPLACE FUNCTION autotask_ocr_plain_text(raw TEXT) RETURNS TEXT AS $$
+    BEGIN
+        -- RapidOCR stores [[bbox], text, confidence] triples and Pensieve
+        -- {"rec_txt": text, "score": ...} objects; index the text only
+        RETURN COALESCE((
+            SELECT string_agg(CASE WHEN jsonb_typeof(item) = 'array'
+                                   THEN item->>1 ELSE item->>'rec_txt' END, ' ')
+            FROM jsonb_array_elements(raw::jsonb) AS item
+            WHERE jsonb_typeof(item) IN ('array', 'object')
+        ), '');
+    EXCEPTION WHEN others THEN
+        RETURN COALESCE(raw, '');
+    END
+    $$ LANGUAGE plpgsql IMMUTABLE
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION autotask_sync_text_index() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO entity_text_index (entity_id, created_at)
+        SELECT id, created_at FROM entities WHERE id = NEW.entity_id
+        ON CONFLICT (entity_id) DO NOTHING;
+
+        UPDATE entity_text_index SET
+            window_title = CASE WHEN NEW.key = '{INDEXED_KEYS['window_title']}'
+                                THEN COALESCE(NEW.value, '') ELSE window_title END,
+            ocr_text = CASE WHEN NEW.key = '{INDEXED_KEYS['ocr_text']}'
+                            THEN autotask_ocr_plain_text(NEW.value) ELSE ocr_text END,
+            tasks = CASE WHEN NEW.key = '{INDEXED_KEYS['tasks']}'
+                         THEN COALESCE(NEW.value, '') ELSE tasks END,
+            category = CASE WHEN NEW.key = '{INDEXED_KEYS['category']}'
+                            THEN NEW.value ELSE category END
+        WHERE entity_id = NEW.entity_id;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_entity_text_index ON metadata_entries",
+    f"""
+    CREATE TRIGGER trg_entity_text_index
+        AFTER INSERT OR UPDATE OF value ON metadata_entries
+        FOR EACH ROW WHEN (NEW.key IN ({_in_list(INDEXED_KEYS.values())}))
+        EXECUTE FUNCTION autotask_sync_text_index()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION autotask_drop_text_index() RETURNS trigger AS $$
+    BEGIN
+        DELETE FROM entity_text_index WHERE entity_id = OLD.id;
+        RETURN OLD;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_entity_text_index_delete ON entities",
+    """
+    CREATE TRIGGER trg_entity_text_index_delete
+        AFTER DELETE ON entities
+        FOR EACH ROW EXECUTE FUNCTION autotask_drop_text_index()
+    """,
+]
+
+
+def _sqlite_latest_value(key: str, entity: str) -> str:
+    return (f"(SELECT m.value FROM metadata_entries m WHERE m.entity_id = {entity} "
+            f"AND m.key = '{key}' ORDER BY m.id DESC LIMIT 1)")
+
+
+def _sqlite_row_select(entity: str) -> str:
+    """SELECT list producing one FTS row from an entity's latest metadata."""
+    ocr = _sqlite_latest_value(INDEXED_KEYS['ocr_text'], entity)
+    return f"""
+        {entity},
+        COALESCE({_sqlite_latest_value(INDEXED_KEYS['window_title'], entity)}, ''),
+        COALESCE((SELECT CASE
+            WHEN json_valid(raw.value) AND json_type(raw.value) = 'array' THEN
+                (SELECT group_concat(CASE WHEN item.type = 'array'
+                                          THEN json_extract(item.value, '$[1]')
+                                          ELSE json_extract(item.value, '$.rec_txt') END, ' ')
+                 FROM json_each(raw.value) AS item WHERE item.type IN ('array', 'object'))
+            ELSE raw.value END
+            FROM (SELECT {ocr} AS value) AS raw), ''),
+        COALESCE({_sqlite_latest_value(INDEXED_KEYS['tasks'], entity)}, ''),
+        {_sqlite_latest_value(INDEXED_KEYS['category'], entity)},
+        (SELECT e.created_at FROM entities e WHERE e.id = {entity})
+    """
+
+
+_SQLITE_COLUMNS = "rowid, window_title, ocr_text, tasks, category, created_at"
+
+SQLITE_SCHEMA_STATEMENTS = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS entity_text_fts USING fts5(
+        window_title, ocr_text, tasks,
+        category UNINDEXED, created_at UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_metadata_entries_entity_key
+        ON metadata_entries(entity_id, key)
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_entity_text_insert
+    AFTER INSERT ON metadata_entries
+    WHEN NEW.key IN ({_in_list(INDEXED_KEYS.values())})
+    BEGIN
+        DELETE FROM entity_text_fts WHERE rowid = NEW.entity_id;
+        INSERT INTO entity_text_fts ({_SQLITE_COLUMNS})
+        SELECT {_sqlite_row_select('NEW.entity_id')}
+        WHERE EXISTS (SELECT 1 FROM entities e WHERE e.id = NEW.entity_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_entity_text_update
+    AFTER UPDATE OF value ON metadata_entries
+    WHEN NEW.key IN ({_in_list(INDEXED_KEYS.values())})
+    BEGIN
+        DELETE FROM entity_text_fts WHERE rowid = NEW.entity_id;
+        INSERT INTO entity_text_fts ({_SQLITE_COLUMNS})
+        SELECT {_sqlite_row_select('NEW.entity_id')}
+        WHERE EXISTS (SELECT 1 FROM entities e WHERE e.id = NEW.entity_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_entity_text_delete
+    AFTER DELETE ON entities
+    BEGIN
+        DELETE FROM entity_text_fts WHERE rowid = OLD.id;
+    END
+    """,
+]
+
+
+@dataclass
+class TextMatch:
+    """One ranked hit from the text index."""
+    entity_id: int
+    filepath: str
+    created_at: Any
+    window_title: str
+    tasks: str
+    category: Optional[str]
+    score: float
+    highlights: List[str] = field(default_factory=list)
+
+
+class TextIndex:
+    """Engine-native full-text index over entity text metadata.
+
+    Works against any manager exposing ``get_connection(readonly=False)`` and
+    ``get_database_type()``. ``ensure_schema`` installs the index and its
+    triggers; ``backfill`` indexes entities captured before that.
+    """
+
+    def __init__(self, db_manager=None):
+        """
+        Args:
+            db_manager: Database manager; defaults to a new DatabaseManager
+        """
+        if db_manager is None:
+            from autotasktracker.core.database import DatabaseManager
+            db_manager = DatabaseManager(use_pensieve_api=False)
+        self.db = db_manager
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Connection helpers
+    # ------------------------------------------------------------------
+
+    @property
+    def is_sqlite(self) -> bool:
+        get_type = getattr(self.db, 'get_database_type', None)
+        return bool(get_type) and get_type() == 'sqlite'
+
+    def _sql(self, query: str) -> str:
+        """Adapt a ``%s``-style query to the connection's parameter style."""
+        if self.is_sqlite:
+            return query.replace('%s', '?')
+        return query
+
+    @contextmanager
+    def _cursor(self, readonly: bool = True):
+        self.ensure_schema()
+        with self.db.get_connection(readonly=readonly) as conn:
+            cursor = conn.cursor()
+            try:
+                yield cursor
+                if not readonly:
+                    conn.commit()
+            except Exception:
+                if not readonly:
+                    conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def ensure_schema(self):
+        """Create the index, its triggers and helper functions if missing."""
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            statements = SQLITE_SCHEMA_STATEMENTS if self.is_sqlite else POSTGRES_SCHEMA_STATEMENTS
+            try:
+                with self.db.get_connection(readonly=False) as conn:
+                    cursor = conn.cursor()
+                    for statement in statements:
+                        cursor.execute(statement)
+                    conn.commit()
+                    cursor.close()
+                self._schema_ready = True
+            except Exception as e:
+                logger.error(f"Failed to create text index schema: {e}")
+                raise DatabaseError(f"Text index schema creation failed: {e}") from e
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def backfill(self, batch_size: int = 1000) -> int:
+        """Index entities that have text metadata but no index row yet.
+
+        Runs in id-ordered batches, one transaction each, so it can be
+        interrupted and resumed. New captures are indexed by the triggers.
+
+        Returns:
+            Number of entities indexed
+        """
+        indexed = 0
+        last_id = 0
+        while True:
+            with self._cursor(readonly=False) as cursor:
+                cursor.execute(self._sql(
+                    f"""
+                    SELECT DISTINCT entity_id FROM metadata_entries
+                    WHERE entity_id > %s AND key IN ({_in_list(INDEXED_KEYS.values())})
+                    ORDER BY entity_id LIMIT %s
+                    """
+                ), (last_id, batch_size))
+                ids = [row[0] for row in cursor.fetchall()]
+                if not ids:
+                    return indexed
+                indexed += self._index_batch(cursor, ids)
+                last_id = ids[-1]
+
+    def _index_batch(self, cursor, entity_ids: Sequence[int]) -> int:
+        first, last = entity_ids[0], entity_ids[-1]
+        if self.is_sqlite:
+            cursor.execute(
+                f"""
+                INSERT INTO entity_text_fts ({_SQLITE_COLUMNS})
+                SELECT {_sqlite_row_select('e.id')}
+                FROM entities e
+                WHERE e.id BETWEEN ? AND ?
+                  AND e.id NOT IN (SELECT rowid FROM entity_text_fts WHERE rowid BETWEEN ? AND ?)
+                  AND EXISTS (SELECT 1 FROM metadata_entries m WHERE m.entity_id = e.id
+                              AND m.key IN ({_in_list(INDEXED_KEYS.values())}))
+                """,
+                (first, last, first, last)
+            )
+        else:
+            columns = {column: f"""
+                (SELECT m.value FROM metadata_entries m WHERE m.entity_id = e.id
+                 AND m.key = '{key}' ORDER BY m.id DESC LIMIT 1)""" for column, key in INDEXED_KEYS.items()}
+            cursor.execute(
+                f"""
+                INSERT INTO entity_text_index
+                    (entity_id, created_at, window_title, ocr_text, tasks, category)
+                SELECT e.id, e.created_at,
+                       COALESCE({columns['window_title']}, ''),
+                       autotask_ocr_plain_text({columns['ocr_text']}),
+                       COALESCE({columns['tasks']}, ''),
+                       {columns['category']}
+                FROM entities e
+                WHERE e.id = ANY(%s)
+                ON CONFLICT (entity_id) DO NOTHING
+                """,
+                (list(entity_ids),)
+            )
+        indexed = max(cursor.rowcount, 0)
+        self._index_archived_ocr(cursor, entity_ids)
+        return indexed
+
+    def _index_archived_ocr(self, cursor, entity_ids: Sequence[int]):
+        """Fill OCR text of archived screenshots, whose hot ``ocr_result`` rows are gone."""
+        from autotasktracker.core.metadata_archive import get_metadata_archive
+        key = INDEXED_KEYS['ocr_text']
+        try:
+            archived = get_metadata_archive(self.db).fetch(entity_ids, [key])
+        except Exception as e:
+            logger.warning(f"Archived OCR text unavailable for indexing: {e}")
+            return
+        if self.is_sqlite:
+            query = "UPDATE entity_text_fts SET ocr_text = ? WHERE rowid = ? AND ocr_text = ''"
+        else:
+            query = "UPDATE entity_text_index SET ocr_text = %s WHERE entity_id = %s AND ocr_text = ''"
+        for entity_id, values in archived.items():
+            text = ocr_plain_text(values.get(key))
+            if text:
+                # Hot values win, as in the archive read-through
+                cursor.execute(query, (text, entity_id))
+
+    def rebuild(self, batch_size: int = 1000) -> int:
+        """Drop every index row and re-index all entities."""
+        with self._cursor(readonly=False) as cursor:
+            if self.is_sqlite:
+                cursor.execute("DELETE FROM entity_text_fts")
+            else:
+                cursor.execute("TRUNCATE entity_text_index")
+        return self.backfill(batch_size)
+
+    def count(self) -> int:
+        table = 'entity_text_fts' if self.is_sqlite else 'entity_text_index'
+        with self._cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            return int(cursor.fetchone()[0])
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _fts5_query(text: str) -> Optional[str]:
+        """Quote each term for FTS5 and prefix-match the last one.
+
+        Quoting keeps user input from being parsed as FTS5 syntax; the
+        trailing prefix match lets search-as-you-type hit partial words.
+        """
+        tokens = _TOKEN_RE.findall(text)
+        if not tokens:
+            return None
+        terms = [f'"{token}"' for token in tokens]
+        terms[-1] += '*'
+        return ' '.join(terms)
+
+    def search(self, text: str, limit: int = 50,
+               date_range: Optional[Tuple[datetime, datetime]] = None,
+               category: Optional[str] = None) -> List[TextMatch]:
+        """Rank entities matching ``text``, best first.
+
+        Scores are the engine's relevance (BM25 on SQLite, cover density on
+        PostgreSQL) mapped to ``0..1`` as ``rank / (rank + 1)``.
+
+        Args:
+            text: Free-text query
+            limit: Maximum matches
+            date_range: Optional inclusive (start, end) on capture time
+            category: Optional exact activity category
+
+        Returns:
+            Matches with engine-generated highlights
+        """
+        if not text or not text.strip():
+            return []
+        try:
+            if self.is_sqlite:
+                return self._search_sqlite(text, limit, date_range, category)
+            return self._search_postgres(text, limit, date_range, category)
+        except DatabaseError:
+            raise
+        except Exception as e:
+            logger.error(f"Text index search failed: {e}")
+            raise DatabaseError(f"Text index search failed: {e}") from e
+
+    def _search_sqlite(self, text, limit, date_range, category) -> List[TextMatch]:
+        match = self._fts5_query(text)
+        if match is None:
+            return []
+        filters, params = [], [match]
+        if date_range:
+            filters.append("f.created_at BETWEEN ? AND ?")
+            params.extend(value.isoformat(sep=' ') for value in date_range)
+        if category:
+            filters.append("f.category = ?")
+            params.append(category)
+        params.append(limit)
+        where = ''.join(f" AND {clause}" for clause in filters)
+
+        # Column weights: title matches count most, then tasks, then OCR text
+        with self._cursor() as cursor:
+            cursor.execute(f"""
+                SELECT f.rowid, e.filepath, f.created_at, f.window_title, f.tasks, f.category,
+                       bm25(entity_text_fts, 10.0, 1.0, 4.0) AS rank,
+                       highlight(entity_text_fts, 0, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}'),
+                       snippet(entity_text_fts, 1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '...', 12),
+                       snippet(entity_text_fts, 2, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '...', 12)
+                FROM entity_text_fts f
+                JOIN entities e ON e.id = f.rowid
+                WHERE entity_text_fts MATCH ?{where}
+                ORDER BY rank
+                LIMIT ?
+            """, params)
+            rows = cursor.fetchall()
+
+        return [
+            TextMatch(
+                entity_id=row[0], filepath=row[1] or '', created_at=row[2],
+                window_title=row[3] or '', tasks=row[4] or '', category=row[5],
+                score=-row[6] / (1 - row[6]),
+                highlights=self._highlights(row[7], row[8], row[9]),
+            )
+            for row in rows
+        ]
+
+    def _search_postgres(self, text, limit, date_range, category) -> List[TextMatch]:
+        pattern = _like_pattern(text.strip())
+        filters, filter_params = [], []
+        if date_range:
+            filters.append("t.created_at BETWEEN %s AND %s")
+            filter_params.extend(date_range)
+        if category:
+            filters.append("t.category = %s")
+            filter_params.append(category)
+        where = ''.join(f" AND {clause}" for clause in filters)
+        headline = f'StartSel="{HIGHLIGHT_START}", StopSel="{HIGHLIGHT_END}"'
+
+        # Full-text hits rank by cover density (normalization 32 gives
+        # rank / (rank + 1)); trigram substring hits on the title or tasks
+        # catch partial words and identifiers the parser splits differently.
+        with self._cursor() as cursor:
+            cursor.execute(f"""
+                WITH q AS (SELECT websearch_to_tsquery('english', %s) AS query)
+                SELECT t.entity_id, e.filepath, t.created_at, t.window_title, t.tasks, t.category,
+                       GREATEST(ts_rank_cd(t.document, q.query, 32),
+                                0.5 * word_similarity(%s, t.window_title)) AS score,
+                       ts_headline('simple', t.window_title, q.query, '{headline}, HighlightAll=true'),
+                       ts_headline('english', t.ocr_text, q.query,
+                                   '{headline}, MaxFragments=2, MaxWords=12, MinWords=4, FragmentDelimiter=" ... "'),
+                       ts_headline('english', t.tasks, q.query, '{headline}, MaxWords=12, MinWords=4')
+                FROM entity_text_index t
+                JOIN entities e ON e.id = t.entity_id
+                CROSS JOIN q
+                WHERE (t.document @@ q.query OR t.window_title ILIKE %s OR t.tasks ILIKE %s){where}
+                ORDER BY score DESC, t.created_at DESC
+                LIMIT %s
+            """, [text, text, pattern, pattern, *filter_params, limit])
+            rows = cursor.fetchall()
+
+        return [
+            TextMatch(
+                entity_id=row[0], filepath=row[1] or '', created_at=row[2],
+                window_title=row[3] or '', tasks=row[4] or '', category=row[5],
+                score=float(row[6] or 0.0),
+                highlights=self._highlights(row[7], row[8], row[9]),
+            )
+            for row in rows
+        ]
+
+    @staticmethod
+    def _highlights(title: Optional[str], ocr: Optional[str], tasks: Optional[str]) -> List[str]:
+        """Label the engine's highlighted fragments that contain a match."""
+        highlights = []
+        for label, fragment in (('Title', title), ('OCR', ocr), ('Tasks', tasks)):
+            if fragment and HIGHLIGHT_START in fragment:
+                highlights.append(f"{label}: {fragment}")
+        return highlights
+
+
+# Global text index instance
+_text_index: Optional[TextIndex] = None
+_text_index_lock = threading.Lock()
+
+
+def get_text_index() -> TextIndex:
+    """Get the process-wide text index."""
+    global _text_index
+    if _text_index is None:
+        with _text_index_lock:
+            if _text_index is None:
+                _text_index = TextIndex()
+    return _text_index
@@ -0,0 +1,291 @@
+"""
+Screenshot thumbnail pyramid for dashboards.
+
+Full-resolution screenshots are several megabytes each and dashboards used
+to decode and shrink them on every Streamlit rerun. ThumbnailService
+renders a small pyramid (150/300/768 px on the long edge) once per
+screenshot, either on ingest or on first request, and stores the
+renditions in an on-disk cache addressed by the source's content hash.
+Identical screenshots share renditions, and the cache is evicted
+least-recently-used down to a byte budget.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from PIL import Image, features
+
+logger = logging.getLogger(__name__)
+
+
+# Long-edge sizes of the rendition pyramid, smallest first
+THUMBNAIL_SIZES = (150, 300, 768)
+
+# Renditions older than this are re-touched on access so eviction sees them as recent
+TOUCH_INTERVAL_SECONDS = 3600
+
+
+class ThumbnailService:
+    """Generates and serves cached thumbnail renditions of screenshots.
+
+    Renditions are WebP when Pillow supports it and JPEG otherwise, stored
+    as ``<digest[:2]>/<digest>_<size>.<ext>`` where ``digest`` is the
+    SHA-256 of the source file. Path-to-digest lookups are memoised by
+    (path, size, mtime) so a warm lookup costs one ``stat`` call. A
+    ``resolver`` maps paths of screenshots moved by the storage tier
+    manager to their current location.
+    """
+
+    def __init__(self, cache_dir, max_bytes: int = 512 * 1024 * 1024,
+                 sizes: Tuple[int, ...] = THUMBNAIL_SIZES, quality: int = 80,
+                 image_format: Optional[str] = None, max_digests: int = 10000,
+                 resolver: Optional[Callable[[str], str]] = None):
+        self.cache_dir = Path(cache_dir)
+        self.resolver = resolver
+        self.max_bytes = max_bytes
+        self.sizes = tuple(sorted(sizes))
+        self.quality = quality
+        self.image_format = image_format or ('WEBP' if features.check('webp') else 'JPEG')
+        self.extension = 'webp' if self.image_format == 'WEBP' else 'jpg'
+        self.max_digests = max_digests
+
+        self._lock = threading.Lock()
+        self._digests: 'OrderedDict[str, Tuple[int, int, str]]' = OrderedDict()
+        self._total_bytes: Optional[int] = None
+        # Per-digest locks so concurrent reruns render a screenshot only once
+        self._render_locks: Dict[str, threading.Lock] = {}
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'generated': 0,
+            'errors': 0,
+            'evicted': 0,
+            'render_ms': 0.0,
+        }
+
+    def rendition_size(self, max_size: int) -> int:
+        """Smallest pyramid level that is at least ``max_size`` px."""
+        for size in self.sizes:
+            if size >= max_size:
+                return size
+        return self.sizes[-1]
+
+    def _digest(self, source_path: str) -> Optional[str]:
+        """Content hash of a screenshot, memoised by path, size and mtime."""
+        try:
+            stat = os.stat(source_path)
+        except OSError:
+            return None
+
+        with self._lock:
+            cached = self._digests.get(source_path)
+            if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+                self._digests.move_to_end(source_path)
+                return cached[2]
+
+        hasher = hashlib.sha256()
+        with open(source_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+
+        with self._lock:
+            self._digests[source_path] = (stat.st_size, stat.st_mtime_ns, digest)
+            while len(self._digests) > self.max_digests:
+                self._digests.popitem(last=False)
+        return digest
+
+    def _locate(self, source_path) -> Tuple[str, Optional[str]]:
+        """(path, digest) of a screenshot, following the resolver if it has moved."""
+        source_path = str(source_path)
+        digest = self._digest(source_path)
+        if digest is None and self.resolver is not None:
+            resolved = self.resolver(source_path)
+            if resolved and resolved != source_path:
+                source_path, digest = resolved, self._digest(resolved)
+        return source_path, digest
+
+    def _rendition_path(self, digest: str, size: int) -> Path:
+        return self.cache_dir / digest[:2] / f"{digest}_{size}.{self.extension}"
+
+    def get_thumbnail(self, source_path, max_size: int = 300) -> Optional[str]:
+        """Path of a rendition at least ``max_size`` px on the long edge.
+
+        Renders the whole pyramid on first request. Returns None when the
+        source is missing or cannot be decoded.
+        """
+        if not source_path:
+            return None
+        source_path, digest = self._locate(source_path)
+        if digest is None:
+            return None
+
+        size = self.rendition_size(max_size)
+        path = self._rendition_path(digest, size)
+        if self._touch(path):
+            with self._lock:
+                self.stats['hits'] += 1
+            return str(path)
+
+        with self._lock:
+            self.stats['misses'] += 1
+        renditions = self._render(source_path, digest)
+        return renditions.get(size)
+
+    def generate(self, source_path) -> Dict[int, str]:
+        """Render all pyramid levels for a screenshot (used on ingest)."""
+        source_path, digest = self._locate(source_path)
+        if digest is None:
+            return {}
+        existing = {size: self._rendition_path(digest, size) for size in self.sizes}
+        if all(path.exists() for path in existing.values()):
+            return {size: str(path) for size, path in existing.items()}
+        return self._render(source_path, digest)
+
+    def generate_many(self, source_paths: Iterable) -> int:
+        """Pre-render thumbnails for several screenshots; returns how many succeeded."""
+        return sum(1 for path in source_paths if self.generate(path))
+
+    def _render(self, source_path: str, digest: str) -> Dict[int, str]:
+        with self._lock:
+            render_lock = self._render_locks.setdefault(digest, threading.Lock())
+
+        with render_lock:
+            targets = {size: self._rendition_path(digest, size) for size in self.sizes}
+            if all(path.exists() for path in targets.values()):
+                return {size: str(path) for size, path in targets.items()}
+
+            started = time.perf_counter()
+            written = 0
+            try:
+                with Image.open(source_path) as img:
+                    # Lets JPEG sources decode at reduced scale
+                    img.draft('RGB', (self.sizes[-1], self.sizes[-1]))
+                    current = img.convert('RGB')
+
+                targets[self.sizes[-1]].parent.mkdir(parents=True, exist_ok=True)
+                # Largest level first; each smaller level is resized from the previous one
+                for size in reversed(self.sizes):
+                    current.thumbnail((size, size), Image.Resampling.LANCZOS)
+                    tmp_path = targets[size].with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+                    current.save(tmp_path, self.image_format, quality=self.quality)
+                    os.replace(tmp_path, targets[size])
+                    written += targets[size].stat().st_size
+            except Exception as e:
+                logger.warning(f"Failed to render thumbnails for {source_path}: {e}")
+                with self._lock:
+                    self.stats['errors'] += 1
+                    self._render_locks.pop(digest, None)
+                return {}
+
+            with self._lock:
+                self.stats['generated'] += 1
+                self.stats['render_ms'] += (time.perf_counter() - started) * 1000
+                if self._total_bytes is not None:
+                    self._total_bytes += written
+                self._render_locks.pop(digest, None)
+
+        self._enforce_limit()
+        return {size: str(path) for size, path in targets.items()}
+
+    def _touch(self, path: Path) -> bool:
+        """True if ``path`` exists; refreshes its mtime at most once per interval."""
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return False
+        now = time.time()
+        if now - mtime > TOUCH_INTERVAL_SECONDS:
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        return True
+
+    def _scan(self):
+        entries = []
+        if self.cache_dir.exists():
+            for path in self.cache_dir.glob(f'*/*.{self.extension}'):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _enforce_limit(self):
+        """Evict least recently used renditions until under 90% of ``max_bytes``."""
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._scan())
+            if self._total_bytes <= self.max_bytes:
+                return
+
+            entries = self._scan()
+            entries.sort(key=lambda entry: entry[0])
+            total = sum(size for _, size, _ in entries)
+            target = int(self.max_bytes * 0.9)
+            evicted = 0
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= size
+                evicted += 1
+            self._total_bytes = total
+            self.stats['evicted'] += evicted
+        if evicted:
+            logger.info(f"Evicted {evicted} thumbnail renditions to stay under {self.max_bytes} bytes")
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            total_bytes = self._total_bytes
+        if total_bytes is None:
+            total_bytes = sum(size for _, size, _ in self._scan())
+        lookups = stats['hits'] + stats['misses']
+        stats.update({
+            'cache_dir': str(self.cache_dir),
+            'format': self.image_format,
+            'sizes': list(self.sizes),
+            'bytes': total_bytes,
+            'max_bytes': self.max_bytes,
+            'hit_rate': stats['hits'] / lookups if lookups else 0.0,
+            'avg_render_ms': stats['render_ms'] / stats['generated'] if stats['generated'] else 0.0,
+        })
+        return stats
+
+
+_thumbnail_service: Optional[ThumbnailService] = None
+_service_lock = threading.Lock()
+
+
+def get_thumbnail_service() -> ThumbnailService:
+    """Get the process-wide thumbnail service, configured from settings."""
+    global _thumbnail_service
+    if _thumbnail_service is None:
+        with _service_lock:
+            if _thumbnail_service is None:
+                from autotasktracker.config import get_config
+                from autotasktracker.core.screenshot_store import resolve_screenshot
+                config = get_config()
+                _thumbnail_service = ThumbnailService(
+                    config.get_thumbnail_cache_path(),
+                    max_bytes=config.THUMBNAIL_CACHE_MAX_MB * 1024 * 1024,
+                    resolver=resolve_screenshot
+                )
+    return _thumbnail_service
+
+
+def get_thumbnail(source_path, max_size: int = 300) -> Optional[str]:
+    """Convenience wrapper returning a cached rendition path for ``source_path``."""
+    return get_thumbnail_service().get_thumbnail(source_path, max_size)
@@ -0,0 +1,262 @@
+"""
+Per-stage pipeline tracing for AutoTaskTracker.
+
+A screenshot passes capture → OCR → VLM → task extraction → dashboard, and
+each step used to keep its own timers (string-named ``start_timer`` calls,
+``VLMMetrics``, webhook stats). Spans opened with ``Tracer.span`` carry a
+trace id derived from the entity id, so every stage touching a screenshot
+shares one trace, even across processes. The current span propagates
+through ``contextvars``, so it follows async tasks automatically and
+threads via ``Tracer.bind``.
+
+Finished spans are recorded into fixed log-linear bucket histograms
+(HDR-style: bounded relative error at any magnitude, O(1) to record,
+O(buckets) for percentiles). ``freshness`` tracks the lag between capture
+and a task becoming visible on a dashboard. Snapshots export as JSON or
+Prometheus text.
+"""
+
+import contextvars
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from autotasktracker.core.connection_pool import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+
+# Stages of the screenshot pipeline in processing order
+PIPELINE_STAGES = ('capture', 'ocr', 'vlm', 'task', 'dashboard')
+FRESHNESS = 'freshness'
+
+
+def log_linear_bounds(lowest_ms: float = 0.1, highest_ms: float = 3_600_000.0,
+                      steps_per_decade: int = 20) -> tuple:
+    """Geometric bucket bounds with a fixed relative width.
+
+    With 20 steps per decade each bucket is ~12% wider than the previous
+    one, so a percentile read from a bucket bound is within ~12% of the
+    true value anywhere between ``lowest_ms`` and ``highest_ms``.
+    """
+    bounds = []
+    step = 10 ** (1 / steps_per_decade)
+    value = lowest_ms
+    while value < highest_ms * step:
+        rounded = float(f"{value:.3g}")
+        if not bounds or rounded > bounds[-1]:
+            bounds.append(rounded)
+        value *= step
+    return tuple(bounds)
+
+
+TRACE_BUCKETS_MS = log_linear_bounds()
+
+
+def trace_id_for_entity(entity_id: Any) -> str:
+    """Stable trace id for an entity, identical in every process."""
+    return hashlib.sha1(f"entity:{entity_id}".encode()).hexdigest()[:16]
+
+
+@dataclass
+class Span:
+    """One timed operation within a trace."""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    entity_id: Optional[Any] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.time)
+    duration_ms: Optional[float] = None
+    error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'entity_id': self.entity_id,
+            'started_at': self.started_at,
+            'duration_ms': self.duration_ms,
+            'error': self.error,
+            'attributes': self.attributes,
+        }
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    'autotasktracker_current_span', default=None
+)
+
+
+def current_span() -> Optional[Span]:
+    """Span active in the current thread or async task, if any."""
+    return _current_span.get()
+
+
+class Tracer:
+    """Records spans into per-stage latency histograms."""
+
+    def __init__(self, bounds_ms=TRACE_BUCKETS_MS, recent_spans: int = 200):
+        self.bounds = tuple(bounds_ms)
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._recent: deque = deque(maxlen=recent_spans)
+        self._lock = threading.Lock()
+        self.last_freshness_ms: Optional[float] = None
+
+    @contextmanager
+    def span(self, name: str, entity_id: Optional[Any] = None, **attributes) -> Iterator[Span]:
+        """Time a block as a span named after its pipeline stage.
+
+        The trace id comes from ``entity_id`` when given, else from the
+        enclosing span, else a new random id. Exceptions are recorded on the
+        span and re-raised.
+        """
+        parent = _current_span.get()
+        if entity_id is None and parent is not None:
+            entity_id = parent.entity_id
+        if entity_id is not None:
+            trace_id = trace_id_for_entity(entity_id)
+        elif parent is not None:
+            trace_id = parent.trace_id
+        else:
+            trace_id = uuid.uuid4().hex[:16]
+
+        span = Span(name=name, trace_id=trace_id, span_id=uuid.uuid4().hex[:16],
+                    parent_id=parent.span_id if parent else None,
+                    entity_id=entity_id, attributes=attributes)
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - start) * 1000
+            _current_span.reset(token)
+            self._finish(span)
+
+    def bind(self, func: Callable) -> Callable:
+        """Wrap ``func`` to run in a copy of the caller's tracing context.
+
+        Threads and executors start with an empty context; binding a
+        callable before handing it over keeps its spans in the same trace.
+        """
+        context = contextvars.copy_context()
+
+        def bound(*args, **kwargs):
+            return context.run(func, *args, **kwargs)
+        return bound
+
+    def record(self, name: str, duration_ms: float):
+        """Record a duration measured elsewhere under ``name``."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram(self.bounds)
+            histogram.record(max(duration_ms, 0.0))
+
+    def record_freshness(self, captured_at: datetime, visible_at: Optional[datetime] = None) -> float:
+        """Record the lag between capture and a task becoming visible.
+
+        Returns:
+            Lag in milliseconds
+        """
+        visible_at = visible_at or datetime.now()
+        lag_ms = (visible_at - captured_at).total_seconds() * 1000
+        self.record(FRESHNESS, lag_ms)
+        self.last_freshness_ms = lag_ms
+        return lag_ms
+
+    def _finish(self, span: Span):
+        self.record(span.name, span.duration_ms)
+        with self._lock:
+            self._recent.append(span)
+
+    def stage_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Count, mean, max and p50/p95/p99 per span name."""
+        with self._lock:
+            return {
+                name: {key: value for key, value in histogram.snapshot().items() if key != 'buckets'}
+                for name, histogram in self._histograms.items()
+            }
+
+    def recent_spans(self, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            spans = list(self._recent)
+        return [span.to_dict() for span in spans if trace_id is None or span.trace_id == trace_id]
+
+    def export_json(self) -> Dict[str, Any]:
+        return {
+            'timestamp': time.time(),
+            'stages': self.stage_stats(),
+            'freshness_last_ms': self.last_freshness_ms,
+            'recent_spans': self.recent_spans(),
+        }
+
+    def export_prometheus(self) -> str:
+        """Histograms in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = {name: (list(h.counts), h.total, h.sum_ms) for name, h in self._histograms.items()}
+
+        lines = []
+        families = (
+            ('autotask_stage_duration_ms', 'Pipeline stage duration in milliseconds',
+             {n: v for n, v in histograms.items() if n != FRESHNESS}),
+            ('autotask_freshness_lag_ms', 'Lag from screenshot capture to task visible in milliseconds',
+             {n: v for n, v in histograms.items() if n == FRESHNESS}),
+        )
+        for metric, help_text, series in families:
+            if not series:
+                continue
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for name, (counts, total, sum_ms) in sorted(series.items()):
+                labels = f'stage="{name}",' if metric == 'autotask_stage_duration_ms' else ''
+                cumulative = 0
+                for bound, count in zip(self.bounds, counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{labels}le="{bound:g}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{{labels}le="+Inf"}} {total}')
+                label_set = f"{{{labels.rstrip(',')}}}" if labels else ''
+                lines.append(f"{metric}_sum{label_set} {sum_ms}")
+                lines.append(f"{metric}_count{label_set} {total}")
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._recent.clear()
+            self.last_freshness_ms = None
+
+
+# Global tracer instance
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Get the process-wide tracer."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer()
+    return _tracer
+
+
+def trace_span(name: str, entity_id: Optional[Any] = None, **attributes):
+    """Open a span on the process-wide tracer."""
+    return get_tracer().span(name, entity_id=entity_id, **attributes)
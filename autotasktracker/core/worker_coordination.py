@@ -0,0 +1,395 @@
+"""
+Multi-worker coordination for AutoTaskTracker processing stages.
+
+Workers register a lease in ``processing_leases`` and renew it with a
+heartbeat. Work is claimed per stage through the shared ProcessingLedger,
+tagged with the worker id. When a worker stops heartbeating, the next live
+worker to reap expired leases releases the dead worker's claims, so its
+work is picked up within one lease TTL instead of waiting for the ledger's
+much longer claim timeout.
+
+Works against PostgreSQL and against a SQLite stand-in, so several local
+processes can share one database.
+"""
+
+import logging
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from autotasktracker.core.exceptions import DatabaseError
+from autotasktracker.core.partitioning import get_partition_manager
+from autotasktracker.core.processing_ledger import ProcessingLedger, utc_now
+
+logger = logging.getLogger(__name__)
+
+
+LEASE_SCHEMA_STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS processing_leases (
+        worker_id VARCHAR(128) PRIMARY KEY,
+        hostname VARCHAR(255),
+        pid INTEGER,
+        stages TEXT,
+        concurrency INTEGER,
+        started_at TIMESTAMP,
+        heartbeat_at TIMESTAMP,
+        expires_at TIMESTAMP
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_processing_leases_expires
+        ON processing_leases(expires_at)
+    """,
+]
+
+# Metadata keys loaded with each claimed entity, per stage
+STAGE_ITEM_KEYS = {
+    'vlm': ['active_window', 'ocr_result'],
+    'ocr': [],
+    # Same inputs as backfill.TASK_INPUT_KEYS
+    'tasks': ['active_window', 'ocr_result', 'ocr_text'],
+}
+
+
+class WorkerCoordinator:
+    """Lease, heartbeat and rebalancing for one processing worker.
+
+    A lease lives ``lease_ttl`` seconds past the last heartbeat. Heartbeats
+    run every ``heartbeat_interval`` seconds on a background thread, which
+    also reaps expired leases and releases their in-flight claims.
+    """
+
+    def __init__(self, stages: Sequence[str], ledger: Optional[ProcessingLedger] = None,
+                 worker_id: Optional[str] = None, concurrency: int = 1,
+                 lease_ttl: float = 30.0, heartbeat_interval: float = 10.0):
+        """
+        Args:
+            stages: Pipeline stages this worker serves
+            ledger: Processing ledger; defaults to a new ProcessingLedger
+            worker_id: Unique worker id; defaults to ``host:pid:random``
+            concurrency: Items this worker processes at once (advertised in the lease)
+            lease_ttl: Seconds without a heartbeat before the worker is considered dead
+            heartbeat_interval: Seconds between heartbeats
+        """
+        if not stages:
+            raise ValueError("At least one stage is required")
+        self.stages = list(stages)
+        self.ledger = ledger or ProcessingLedger()
+        self.hostname = socket.gethostname()
+        self.worker_id = worker_id or f"{self.hostname}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.concurrency = concurrency
+        self.lease_ttl = lease_ttl
+        self.heartbeat_interval = heartbeat_interval
+
+        self._schema_ready = False
+        self._stop_event = threading.Event()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self.stats = {
+            'heartbeats': 0,
+            'heartbeat_failures': 0,
+            'lease_losses': 0,
+            'workers_reaped': 0,
+            'claims_released': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Schema and helpers
+    # ------------------------------------------------------------------
+
+    def ensure_schema(self):
+        """Create the lease table if it does not exist."""
+        if self._schema_ready:
+            return
+        try:
+            self.ledger.ensure_schema()
+            with self.ledger.db.get_connection(readonly=False) as conn:
+                cursor = conn.cursor()
+                for statement in LEASE_SCHEMA_STATEMENTS:
+                    cursor.execute(statement)
+                conn.commit()
+                cursor.close()
+            self._schema_ready = True
+        except DatabaseError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to create processing lease schema: {e}")
+            raise DatabaseError(f"Processing lease schema creation failed: {e}") from e
+
+    def _transaction(self):
+        self.ensure_schema()
+        return self.ledger._transaction()
+
+    def _execute(self, cursor, query: str, params: Sequence = ()):
+        self.ledger._execute(cursor, query, params)
+
+    def _expiry(self, now: datetime) -> str:
+        return self.ledger._ts(now + timedelta(seconds=self.lease_ttl))
+
+    # ------------------------------------------------------------------
+    # Lease lifecycle
+    # ------------------------------------------------------------------
+
+    def register(self):
+        """Create (or refresh) this worker's lease."""
+        now = utc_now()
+        with self._transaction() as cursor:
+            self._execute(cursor, """
+                INSERT INTO processing_leases
+                    (worker_id, hostname, pid, stages, concurrency, started_at, heartbeat_at, expires_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (worker_id) DO UPDATE SET
+                    stages = EXCLUDED.stages,
+                    concurrency = EXCLUDED.concurrency,
+                    heartbeat_at = EXCLUDED.heartbeat_at,
+                    expires_at = EXCLUDED.expires_at
+            """, (self.worker_id, self.hostname, os.getpid(), ','.join(self.stages),
+                  self.concurrency, self.ledger._ts(now), self.ledger._ts(now), self._expiry(now)))
+        logger.info(f"Worker {self.worker_id} registered for stages {', '.join(self.stages)}")
+
+    def heartbeat(self) -> bool:
+        """Renew the lease. Returns False if the lease had been lost."""
+        now = utc_now()
+        with self._transaction() as cursor:
+            self._execute(cursor, """
+                UPDATE processing_leases SET heartbeat_at = %s, expires_at = %s
+                WHERE worker_id = %s
+            """, (self.ledger._ts(now), self._expiry(now), self.worker_id))
+            renewed = cursor.rowcount > 0
+        self.stats['heartbeats'] += 1
+
+        if not renewed:
+            # We were reaped (e.g. after a long pause); our claims may already
+            # belong to someone else, so rejoin with a fresh lease.
+            self.stats['lease_losses'] += 1
+            logger.warning(f"Worker {self.worker_id} lost its lease, re-registering")
+            self.register()
+        return renewed
+
+    def deregister(self):
+        """Release unfinished claims and remove the lease (graceful shutdown)."""
+        with self._transaction() as cursor:
+            released = self.ledger._release_claims(cursor, "worker_id = %s", (self.worker_id,))
+            self._execute(cursor, "DELETE FROM processing_leases WHERE worker_id = %s", (self.worker_id,))
+        if released:
+            logger.info(f"Worker {self.worker_id} released {released} unfinished claims")
+
+    def reap_expired(self) -> int:
+        """Release claims held by workers whose lease expired.
+
+        Returns:
+            Number of claims returned to the pool
+        """
+        now = self.ledger._ts(utc_now())
+        with self._transaction() as cursor:
+            self._execute(cursor, f"""
+                SELECT worker_id FROM processing_leases
+                WHERE expires_at < %s{self.ledger._skip_locked()}
+            """, (now,))
+            dead = [row[0] for row in cursor.fetchall()]
+            if not dead:
+                return 0
+
+            placeholders = self.ledger._placeholders(dead)
+            released = self.ledger._release_claims(cursor, f"worker_id IN ({placeholders})", dead)
+            self._execute(cursor, f"""
+                DELETE FROM processing_leases WHERE worker_id IN ({placeholders})
+            """, dead)
+
+        self.stats['workers_reaped'] += len(dead)
+        self.stats['claims_released'] += released
+        logger.warning(f"Reaped {len(dead)} dead workers ({', '.join(dead)}), "
+                       f"released {released} claims")
+        return released
+
+    def active_workers(self) -> List[Dict[str, Any]]:
+        """List workers holding an unexpired lease."""
+        with self._transaction() as cursor:
+            self._execute(cursor, """
+                SELECT worker_id, hostname, pid, stages, concurrency, heartbeat_at
+                FROM processing_leases WHERE expires_at >= %s
+                ORDER BY worker_id
+            """, (self.ledger._ts(utc_now()),))
+            rows = cursor.fetchall()
+        return [{
+            'worker_id': worker_id,
+            'hostname': hostname,
+            'pid': pid,
+            'stages': stages.split(',') if stages else [],
+            'concurrency': concurrency,
+            'heartbeat_at': heartbeat_at,
+        } for worker_id, hostname, pid, stages, concurrency, heartbeat_at in rows]
+
+    # ------------------------------------------------------------------
+    # Claiming
+    # ------------------------------------------------------------------
+
+    def claim(self, stage: str, n: int) -> List[int]:
+        """Claim up to ``n`` entities for ``stage`` under this worker's lease."""
+        return self.ledger.claim_batch(stage, n, worker_id=self.worker_id)
+
+    # ------------------------------------------------------------------
+    # Heartbeat thread
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Register and start the background heartbeat/reaper thread."""
+        self.register()
+        self.reap_expired()
+        self._stop_event.clear()
+        self._heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop, name=f"lease-{self.worker_id}", daemon=True
+        )
+        self._heartbeat_thread.start()
+
+    def stop(self):
+        """Stop heartbeating and deregister."""
+        self._stop_event.set()
+        if self._heartbeat_thread:
+            self._heartbeat_thread.join(timeout=self.heartbeat_interval + 5)
+            self._heartbeat_thread = None
+        try:
+            self.deregister()
+        except Exception as e:
+            logger.error(f"Failed to deregister worker {self.worker_id}: {e}")
+
+    def _heartbeat_loop(self):
+        while not self._stop_event.wait(self.heartbeat_interval):
+            try:
+                self.heartbeat()
+                self.reap_expired()
+            except Exception as e:
+                self.stats['heartbeat_failures'] += 1
+                logger.error(f"Heartbeat failed for worker {self.worker_id}: {e}")
+            try:
+                # Seals finished months and applies retention, at most hourly
+                get_partition_manager(self.ledger.db).maintain_if_due()
+            except Exception as e:
+                logger.warning(f"Partition maintenance failed: {e}")
+
+
+class ProcessingWorker:
+    """Claims work for several stages and runs it on a bounded thread pool.
+
+    The worker never holds more claims than it has free slots, so the pool
+    naturally rebalances: a new worker starts taking ids on its next claim,
+    and a dead worker strands at most ``concurrency`` items until reaped.
+    """
+
+    def __init__(self, coordinator: WorkerCoordinator,
+                 handlers: Dict[str, Callable[[Dict[str, Any]], Any]],
+                 concurrency: int = 2, poll_interval: float = 5.0,
+                 item_keys: Optional[Dict[str, List[str]]] = None):
+        """
+        Args:
+            coordinator: Lease coordinator for this worker
+            handlers: Stage name to callable processing one work item dict;
+                raising marks the entity failed for retry
+            concurrency: Maximum items processed at once
+            poll_interval: Seconds to sleep when no stage has work
+            item_keys: Metadata keys to load per stage (defaults to STAGE_ITEM_KEYS)
+        """
+        missing = [stage for stage in coordinator.stages if stage not in handlers]
+        if missing:
+            raise ValueError(f"No handler for stages: {', '.join(missing)}")
+        self.coordinator = coordinator
+        self.ledger = coordinator.ledger
+        self.handlers = handlers
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.item_keys = item_keys or STAGE_ITEM_KEYS
+
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency,
+                                            thread_name_prefix='processing-worker')
+        self._in_flight: Dict[Future, tuple] = {}
+        self._next_stage = 0
+        self._stop_event = threading.Event()
+        self.stats = {stage: {'processed': 0, 'failed': 0} for stage in coordinator.stages}
+
+    def _fill(self) -> int:
+        """Claim work for free slots, rotating through stages. Returns items submitted."""
+        submitted = 0
+        stages = self.coordinator.stages
+        for offset in range(len(stages)):
+            free = self.concurrency - len(self._in_flight)
+            if free <= 0 or self._stop_event.is_set():
+                break
+            stage = stages[(self._next_stage + offset) % len(stages)]
+            entity_ids = self.coordinator.claim(stage, free)
+            if not entity_ids:
+                continue
+
+            items = self.ledger.fetch_work_items(entity_ids, self.item_keys.get(stage, []))
+            found = {item['id'] for item in items}
+            gone = [entity_id for entity_id in entity_ids if entity_id not in found]
+            if gone:
+                self.ledger.complete(stage, gone)  # deleted since claimed
+
+            for item in items:
+                future = self._executor.submit(self.handlers[stage], item)
+                self._in_flight[future] = (stage, item['id'])
+                submitted += 1
+        self._next_stage = (self._next_stage + 1) % len(stages)
+        return submitted
+
+    def _collect(self, timeout: Optional[float] = None) -> int:
+        """Record finished items. Returns how many finished."""
+        if not self._in_flight:
+            return 0
+        finished, _ = wait(list(self._in_flight), timeout=timeout or 0, return_when=FIRST_COMPLETED)
+
+        for future in finished:
+            stage, entity_id = self._in_flight.pop(future)
+            error = future.exception()
+            if error is None:
+                self.ledger.complete(stage, [entity_id])
+                self.stats[stage]['processed'] += 1
+            else:
+                logger.error(f"Worker {self.coordinator.worker_id} failed '{stage}' "
+                             f"for entity {entity_id}: {error}")
+                self.ledger.fail(stage, entity_id, str(error))
+                self.stats[stage]['failed'] += 1
+        return len(finished)
+
+    def run(self, drain: bool = False):
+        """Process work until stopped.
+
+        Args:
+            drain: Return once every stage is out of claimable work
+        """
+        self.coordinator.start()
+        try:
+            while not self._stop_event.is_set():
+                submitted = self._fill()
+                finished = self._collect(timeout=0.5 if self._in_flight else None)
+                if submitted or finished or self._in_flight:
+                    continue
+                if drain:
+                    break
+                self._stop_event.wait(self.poll_interval)
+        finally:
+            self._shutdown()
+
+    def stop(self):
+        """Ask the run loop to finish in-flight work and exit."""
+        self._stop_event.set()
+
+    def _shutdown(self):
+        while self._in_flight:
+            self._collect(timeout=1.0)
+        self._executor.shutdown(wait=True)
+        self.coordinator.stop()
+        logger.info(f"Worker {self.coordinator.worker_id} stopped: {self.stats}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-stage counters, lease stats and current load."""
+        return {
+            'worker_id': self.coordinator.worker_id,
+            'in_flight': len(self._in_flight),
+            'stages': {stage: dict(counts) for stage, counts in self.stats.items()},
+            'lease': dict(self.coordinator.stats),
+        }
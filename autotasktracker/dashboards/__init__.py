@@ -33,13 +33,33 @@ def get_launcher():
     from .launcher import main as launcher_main
     return launcher_main
 
-# Utilities
-from .utils import format_datetime, safe_divide, get_color_palette
-from .templates import DashboardTemplate
+from autotasktracker.utils.lazy_imports import lazy_exports
 
-# Data components
-from .data.repositories import TaskRepository, MetricsRepository
-from .data.models import Task
+# Exports are imported on first access (PEP 562), which also keeps the
+# dashboard modules' circular imports out of package initialisation
+__getattr__, __dir__ = lazy_exports(__name__, {
+    # Main functions
+    'task_board_main': '.task_board:main',
+    'analytics_main': '.analytics:main',
+    'timetracker_main': '.timetracker:main',
+    'launcher_main': '.launcher:main',
+
+    # Dashboard components
+    'BaseDashboard': '.base',
+    'DashboardCache': '.cache',
+    'TaskNotifier': '.notifications',
+
+    # Utilities
+    'format_datetime': '.utils',
+    'safe_divide': '.utils',
+    'get_color_palette': '.utils',
+    'DashboardTemplate': '.templates',
+
+    # Data components
+    'TaskRepository': '.data.repositories',
+    'MetricsRepository': '.data.repositories',
+    'Task': '.data.models',
+})
 
 __all__ = [
     # Main functions
@@ -15,6 +15,7 @@ from .components.common_sidebar import CommonSidebar, SidebarSection
 from .data import TaskRepository, MetricsRepository
 from .cache import cached_data
 from autotasktracker.config import get_config
+from autotasktracker.core.thumbnails import get_thumbnail
 
 logger = logging.getLogger(__name__)
 
@@ -151,10 +152,9 @@ class AchievementBoardDashboard(BaseDashboard):
                 screenshot_path = task_group.tasks[0].screenshot_path
                 if screenshot_path and os.path.exists(screenshot_path):
                     try:
-                        from PIL import Image
-                        img = Image.open(screenshot_path)
-                        img.thumbnail((150, 150))
-                        st.image(img, use_container_width=True)
+                        thumbnail = get_thumbnail(screenshot_path, 150)
+                        if thumbnail:
+                            st.image(thumbnail, use_container_width=True)
                     except Exception as e:
                         logger.debug(f"Failed to load achievement icon: {e}")
                         
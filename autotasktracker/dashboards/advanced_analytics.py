@@ -1,9 +1,8 @@
 """Advanced Analytics Dashboard - Showcasing the power of the refactored architecture."""
 
 import streamlit as st
-import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
@@ -209,33 +208,12 @@ class AdvancedAnalyticsDashboard(BaseDashboard):
         """Get advanced pattern analysis."""
         task_repo = TaskRepository(self.db_manager)
         
-        # Get daily data for pattern analysis
-        current_date = start_date
-        daily_data = []
-        
-        while current_date <= end_date:
-            day_tasks = task_repo.get_task_groups(
-                current_date.replace(hour=0, minute=0, second=0),
-                current_date.replace(hour=23, minute=59, second=59)
-            )
-            
-            if day_tasks:
-                day_analysis = {
-                    'date': current_date,
-                    'total_time': sum(g.duration_minutes for g in day_tasks),
-                    'productive_time': sum(g.duration_minutes for g in day_tasks if g.category in ['Development', 'Productivity']),
-                    'tasks_count': len(day_tasks),
-                    'avg_task_duration': np.mean([g.duration_minutes for g in day_tasks]),
-                    'peak_hour': max([g.start_time.hour for g in day_tasks], key=lambda h: sum(g.duration_minutes for g in day_tasks if g.start_time.hour == h)),
-                }
-                daily_data.append(day_analysis)
-                
-            current_date += timedelta(days=1)
-            
-        if not daily_data:
+        # One fetch and grouping pass for the whole range, split per day
+        by_day = task_repo.get_task_groups_by_day(start_date, end_date)
+        if by_day.daily.empty:
             return None
             
-        df = pd.DataFrame(daily_data)
+        df = by_day.daily
         
         # Apply smoothing
         df['total_time_smooth'] = df['total_time'].rolling(window=smoothing_window, center=True).mean()
@@ -256,10 +234,14 @@ class AdvancedAnalyticsDashboard(BaseDashboard):
         df['weekday'] = df['date'].dt.day_name()
         weekly_avg = df.groupby('weekday')['productive_time'].mean()
         
+        # Short ranges may not cover every weekday
+        weekend = weekly_avg.reindex(['Saturday', 'Sunday']).mean()
+        weekdays = weekly_avg.reindex(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']).mean()
+        
         return {
             'most_productive_day': weekly_avg.idxmax(),
             'least_productive_day': weekly_avg.idxmin(),
-            'weekend_vs_weekday': weekly_avg[['Saturday', 'Sunday']].mean() / weekly_avg[['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']].mean()
+            'weekend_vs_weekday': weekend / weekdays if weekdays else np.nan
         }
         
     def _detect_trend(self, df):
@@ -16,6 +16,7 @@ from autotasktracker.dashboards.components.ai_task_display import AITaskDisplay
 from autotasktracker.dashboards.components.common_sidebar import CommonSidebar, SidebarSection
 from autotasktracker.core import DatabaseManager
 from autotasktracker.config import get_config
+from autotasktracker.core.thumbnails import get_thumbnail
 
 logger = logging.getLogger(__name__)
 
@@ -228,7 +229,7 @@ class AITaskDashboard(BaseDashboard):
                             if screenshot_path and screenshot_path.exists():
                                 try:
                                     st.image(
-                                        str(screenshot_path), 
+                                        get_thumbnail(screenshot_path, 768) or str(screenshot_path),
                                         caption=f"Screenshot: {screenshot_path.name}",
                                         use_container_width=True
                                     )
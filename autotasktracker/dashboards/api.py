@@ -1,53 +1,520 @@
-"""API endpoints for dashboard data."""
+"""Headless metrics API for dashboard data.
 
-import streamlit as st
+Serves the same repository data the dashboards render from a small ASGI
+service, so API consumers no longer pay for a full Streamlit script run
+per request. Repositories, the database pool and a response cache are
+shared across requests. Responses carry an ETag derived from the data
+watermark (highest entity id and a data change counter), so pollers get a
+cheap ``304 Not Modified`` until data changes. JSON bodies are gzip-compressed
+for clients that accept it. ``/tasks`` and ``/task-groups`` can also stream
+Apache Arrow IPC record batches for large pulls. ``/traces`` and ``/metrics``
+expose the process's pipeline tracing histograms as JSON and Prometheus text.
+"""
+
+import asyncio
+import hashlib
 import json
-from datetime import datetime
-from autotasktracker.dashboards.data.repositories import MetricsRepository
-
-
-def setup_api_endpoints():
-    """Set up API endpoints in Streamlit app."""
-    
-    # Check for API mode in query params
-    query_params = st.query_params
-    
-    if query_params.get('api') == 'metrics':
-        # API mode - return JSON data
-        date_range = query_params.get('range', 'today')
-        
-        # Calculate dates based on range
-        now = datetime.now()
-        if date_range == 'today':
-            start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-        else:
-            # Add more ranges as needed
-            start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # Get metrics
-        repo = MetricsRepository()
-        summary = repo.get_metrics_summary(start_date, end_date)
-        
-        # Return as JSON
-        response = {
-            'timestamp': now.isoformat(),
-            'date_range': date_range,
-            'metrics': summary
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import uvicorn
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
+
+from autotasktracker.config import get_config
+from autotasktracker.core import get_default_db_manager
+from autotasktracker.core.tracing import get_tracer
+from autotasktracker.dashboards.data.repositories import TaskRepository, MetricsRepository
+
+try:
+    import pyarrow as pa
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+ARROW_STREAM_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+PROMETHEUS_MEDIA_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+RANGE_PRESETS = ('today', 'yesterday', '7d', '30d')
+
+
+def resolve_range(range_name: str = 'today', start: Optional[str] = None, end: Optional[str] = None,
+                  now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """Turn API range parameters into a (start, end) datetime pair.
+
+    Explicit ISO ``start``/``end`` take precedence over the ``range`` preset.
+
+    Raises:
+        ValueError: For unknown presets, unparseable dates or an inverted range
+    """
+    now = now or datetime.now()
+    day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    day_end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
+
+    if start or end:
+        start_date = datetime.fromisoformat(start) if start else day_start
+        end_date = datetime.fromisoformat(end) if end else day_end
+    elif range_name == 'today':
+        start_date, end_date = day_start, day_end
+    elif range_name == 'yesterday':
+        start_date, end_date = day_start - timedelta(days=1), day_end - timedelta(days=1)
+    elif range_name in ('7d', '30d'):
+        start_date, end_date = day_start - timedelta(days=int(range_name[:-1]) - 1), day_end
+    else:
+        raise ValueError(f"Unknown range '{range_name}', expected one of {', '.join(RANGE_PRESETS)}")
+
+    if end_date < start_date:
+        raise ValueError("end must not be before start")
+    return start_date, end_date
+
+
+class _ChunkSink:
+    """Write-only file object that hands Arrow IPC bytes back to a generator."""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class MetricsAPIService:
+    """ASGI service exposing dashboard metrics, tasks, task groups and sessions."""
+
+    def __init__(self, host: str = "127.0.0.1", port: Optional[int] = None, db_manager=None,
+                 watermark_ttl: float = 1.0, response_cache_size: int = 256,
+                 arrow_batch_rows: int = 5000):
+        """Initialize the metrics API service.
+
+        Args:
+            host: Server host address
+            port: Server port (defaults to ``METRICS_PORT``)
+            db_manager: Database manager shared by the repositories
+            watermark_ttl: Seconds a data watermark reading is reused
+            response_cache_size: Number of encoded JSON responses kept
+            arrow_batch_rows: Rows per Arrow record batch when streaming
+        """
+        self.host = host
+        self.port = port or get_config().METRICS_PORT
+        self.watermark_ttl = watermark_ttl
+        self.response_cache_size = response_cache_size
+        self.arrow_batch_rows = arrow_batch_rows
+
+        # Shared across requests for the life of the process
+        db_manager = db_manager or get_default_db_manager()
+        self.task_repo = TaskRepository(db_manager)
+        self.metrics_repo = MetricsRepository(db_manager)
+
+        self._lock = threading.Lock()
+        self._watermark: Optional[Tuple[int, int]] = None
+        self._watermark_read_at = 0.0
+        self._responses: 'OrderedDict[Tuple[str, str], bytes]' = OrderedDict()
+        self.start_time = time.time()
+        self.stats = {
+            'requests': 0,
+            'not_modified': 0,
+            'cache_hits': 0,
+            'arrow_responses': 0,
+            'errors': 0,
         }
-        
-        # Use st.json to display JSON response
-        st.json(response)
-        
-        # Stop further execution
-        st.stop()
+
+        self.app = FastAPI(title="AutoTaskTracker Metrics API")
+        self.app.add_middleware(GZipMiddleware, minimum_size=1024)
+        self._setup_routes()
+
+    # ------------------------------------------------------------------
+    # Routes
+    # ------------------------------------------------------------------
+
+    def _setup_routes(self):
+        """Setup FastAPI routes."""
+
+        @self.app.get("/health")
+        async def health_check():
+            """Health check endpoint."""
+            return {
+                "status": "healthy",
+                "uptime_seconds": time.time() - self.start_time,
+                "arrow_available": ARROW_AVAILABLE,
+            }
+
+        @self.app.get("/stats")
+        async def get_stats():
+            """Get API service statistics."""
+            return self.get_stats()
+
+        @self.app.get("/traces")
+        async def traces(trace_id: Optional[str] = None):
+            """Per-stage pipeline latency histograms and recent spans."""
+            tracer = get_tracer()
+            if trace_id:
+                return {"trace_id": trace_id, "spans": tracer.recent_spans(trace_id)}
+            return tracer.export_json()
+
+        @self.app.get("/metrics")
+        async def prometheus_metrics():
+            """Pipeline latency histograms in Prometheus text format."""
+            return PlainTextResponse(get_tracer().export_prometheus(), media_type=PROMETHEUS_MEDIA_TYPE)
+
+        @self.app.get("/metrics/summary")
+        def metrics_summary(request: Request, range: str = 'today',
+                            start: Optional[str] = None, end: Optional[str] = None):
+            """Aggregated activity metrics for a range."""
+            start_date, end_date = self._range(range, start, end)
+            return self._respond(
+                request, 'metrics/summary', {'start': start_date, 'end': end_date},
+                lambda: self.metrics_repo.get_metrics_summary(start_date, end_date)
+            )
+
+        @self.app.get("/tasks")
+        def tasks(request: Request, range: str = 'today',
+                  start: Optional[str] = None, end: Optional[str] = None,
+                  categories: Optional[str] = None,
+                  limit: int = Query(1000, ge=1, le=100000),
+                  format: str = Query('json', pattern='^(json|arrow)$')):
+            """Tasks (one per screenshot) for a range."""
+            start_date, end_date = self._range(range, start, end)
+            category_list = [c.strip() for c in categories.split(',') if c.strip()] if categories else None
+            return self._respond(
+                request, 'tasks',
+                {'start': start_date, 'end': end_date, 'categories': category_list, 'limit': limit},
+                lambda: self._tasks_frame(self.task_repo.get_tasks_for_period(
+                    start_date, end_date, category_list, limit
+                )),
+                fmt=self._format(request, format)
+            )
+
+        @self.app.get("/task-groups")
+        def task_groups(request: Request, range: str = 'today',
+                        start: Optional[str] = None, end: Optional[str] = None,
+                        min_duration: float = Query(0.5, ge=0),
+                        gap_threshold: float = Query(15, gt=0),
+                        format: str = Query('json', pattern='^(json|arrow)$')):
+            """Grouped continuous activity for a range."""
+            start_date, end_date = self._range(range, start, end)
+            return self._respond(
+                request, 'task-groups',
+                {'start': start_date, 'end': end_date, 'min_duration': min_duration,
+                 'gap_threshold': gap_threshold},
+                lambda: self._groups_frame(self.task_repo.get_task_groups(
+                    start_date, end_date, min_duration, gap_threshold
+                )),
+                fmt=self._format(request, format)
+            )
+
+        @self.app.get("/sessions")
+        def sessions(request: Request, range: str = 'today',
+                     start: Optional[str] = None, end: Optional[str] = None):
+            """Dual-model session metrics for a range."""
+            start_date, end_date = self._range(range, start, end)
+            return self._respond(
+                request, 'sessions', {'start': start_date, 'end': end_date},
+                lambda: self.metrics_repo.get_session_metrics(start_date, end_date)
+            )
+
+        @self.app.get("/entities/{entity_id}/metadata")
+        def entity_metadata(entity_id: int, keys: Optional[str] = None):
+            """All metadata of one screenshot, including values moved to the archive."""
+            from autotasktracker.core.metadata_archive import get_metadata_archive
+            key_list = [k.strip() for k in keys.split(',') if k.strip()] if keys else None
+            metadata = get_metadata_archive(self.task_repo.db).get_entity_metadata(entity_id, key_list)
+            if not metadata:
+                raise HTTPException(status_code=404, detail=f"No metadata for entity {entity_id}")
+            return {"entity_id": entity_id, "metadata": metadata}
+
+        @self.app.post("/exports")
+        def start_export(range: str = 'today', start: Optional[str] = None, end: Optional[str] = None,
+                         format: str = Query('csv', pattern='^(csv|jsonl|parquet)$'),
+                         kind: str = Query('task_groups', pattern='^(task_groups|screenshots)$'),
+                         categories: Optional[str] = None):
+            """Start a background export; poll ``/exports/{name}`` for progress."""
+            from autotasktracker.core.export_engine import ExportRequest, default_output_path, get_export_jobs
+            start_date, end_date = self._range(range, start, end)
+            category_list = [c.strip() for c in categories.split(',') if c.strip()] if categories else None
+            request = ExportRequest(start=start_date, end=end_date, format=format, kind=kind,
+                                    categories=category_list,
+                                    output_path=default_output_path(kind, format, self.export_dir))
+            try:
+                output_path = get_export_jobs().start(request)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            name = os.path.basename(output_path)
+            return {"name": name, "status_url": f"/exports/{name}", "file_url": f"/exports/{name}/file"}
+
+        @self.app.get("/exports/{name}")
+        def export_status(name: str):
+            """Progress of a background export."""
+            from autotasktracker.core.export_engine import read_progress
+            progress = read_progress(self._export_path(name))
+            if progress is None:
+                raise HTTPException(status_code=404, detail=f"No export named {name}")
+            status = progress.to_dict()
+            del status['request'], status['writer_state']
+            status['fraction'] = progress.fraction
+            return status
+
+        @self.app.get("/exports/{name}/file")
+        def export_file(name: str):
+            """Download a finished CSV or JSONL export (Parquet exports are directories)."""
+            from autotasktracker.core.export_engine import read_progress
+            path = self._export_path(name)
+            progress = read_progress(path)
+            if progress is None or progress.status != 'done':
+                raise HTTPException(status_code=409, detail=f"Export {name} is not finished")
+            if not path.is_file():
+                raise HTTPException(status_code=404, detail=f"Export {name} is not a single file")
+            return FileResponse(path, filename=name)
+
+    @property
+    def export_dir(self) -> str:
+        return get_config().get_exports_path()
+
+    def _export_path(self, name: str) -> Path:
+        # Only names inside the exports directory
+        if not name or name != os.path.basename(name) or name.startswith('.'):
+            raise HTTPException(status_code=400, detail="Invalid export name")
+        return Path(self.export_dir) / name
+
+    @staticmethod
+    def _range(range_name: str, start: Optional[str], end: Optional[str]) -> Tuple[datetime, datetime]:
+        try:
+            return resolve_range(range_name, start, end)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @staticmethod
+    def _format(request: Request, requested: str) -> str:
+        if requested == 'arrow' or ARROW_STREAM_MEDIA_TYPE in request.headers.get('accept', ''):
+            if not ARROW_AVAILABLE:
+                raise HTTPException(status_code=406, detail="Arrow responses need pyarrow installed")
+            return 'arrow'
+        return 'json'
+
+    # ------------------------------------------------------------------
+    # Conditional responses
+    # ------------------------------------------------------------------
+
+    def current_watermark(self) -> Optional[Tuple[int, int]]:
+        """Data watermark, re-read at most every ``watermark_ttl`` seconds."""
+        with self._lock:
+            if self._watermark is not None and time.monotonic() - self._watermark_read_at < self.watermark_ttl:
+                return self._watermark
+        watermark = self.metrics_repo.get_data_watermark()
+        with self._lock:
+            self._watermark = watermark
+            self._watermark_read_at = time.monotonic()
+        return watermark
+
+    @staticmethod
+    def make_etag(endpoint: str, params: Dict[str, Any], watermark: Tuple[int, int]) -> str:
+        """Weak ETag for an endpoint, its parameters and the data watermark."""
+        identity = json.dumps([endpoint, params, list(watermark)], sort_keys=True, default=str)
+        return f'W/"{hashlib.sha1(identity.encode()).hexdigest()}"'
+
+    @staticmethod
+    def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        opaque = etag[2:] if etag.startswith('W/') else etag
+        for candidate in if_none_match.split(','):
+            candidate = candidate.strip()
+            if (candidate[2:] if candidate.startswith('W/') else candidate) == opaque:
+                return True
+        return False
+
+    def _respond(self, request: Request, endpoint: str, params: Dict[str, Any],
+                 loader: Callable[[], Any], fmt: str = 'json') -> Response:
+        with self._lock:
+            self.stats['requests'] += 1
+
+        watermark = self.current_watermark()
+        etag = self.make_etag(endpoint, params, watermark) if watermark is not None else None
+        headers = {'Cache-Control': 'no-cache'}
+        if etag:
+            headers['ETag'] = etag
+            if self._etag_matches(request.headers.get('if-none-match'), etag):
+                with self._lock:
+                    self.stats['not_modified'] += 1
+                return Response(status_code=304, headers=headers)
+
+        cache_key = (etag, fmt) if etag else None
+        if cache_key and fmt == 'json':
+            with self._lock:
+                body = self._responses.get(cache_key)
+                if body is not None:
+                    self._responses.move_to_end(cache_key)
+                    self.stats['cache_hits'] += 1
+            if body is not None:
+                return Response(body, media_type='application/json', headers=headers)
+
+        try:
+            data = loader()
+        except Exception as e:
+            with self._lock:
+                self.stats['errors'] += 1
+            logger.error(f"Metrics API {endpoint} failed: {e}")
+            raise HTTPException(status_code=500, detail="Internal server error")
+
+        if fmt == 'arrow':
+            with self._lock:
+                self.stats['arrow_responses'] += 1
+            return StreamingResponse(self._arrow_stream(data), media_type=ARROW_STREAM_MEDIA_TYPE,
+                                     headers=headers)
+
+        if isinstance(data, pd.DataFrame):
+            data = json.loads(data.to_json(orient='records', date_format='iso'))
+        body = json.dumps({
+            'generated_at': datetime.now().isoformat(),
+            'params': params,
+            'watermark': {'max_entity_id': watermark[0], 'data_version': watermark[1]} if watermark else None,
+            'count': len(data) if isinstance(data, list) else None,
+            'data': data,
+        }, default=str).encode('utf-8')
+
+        if cache_key:
+            with self._lock:
+                self._responses[cache_key] = body
+                while len(self._responses) > self.response_cache_size:
+                    self._responses.popitem(last=False)
+        return Response(body, media_type='application/json', headers=headers)
+
+    # ------------------------------------------------------------------
+    # Tabular payloads
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _tasks_frame(tasks) -> pd.DataFrame:
+        return pd.DataFrame({
+            'id': [t.id for t in tasks],
+            'title': [t.title for t in tasks],
+            'category': [t.category for t in tasks],
+            'timestamp': pd.to_datetime([t.timestamp for t in tasks]),
+            'duration_minutes': [float(t.duration_minutes) for t in tasks],
+            'window_title': [t.window_title for t in tasks],
+            'screenshot_path': [t.screenshot_path for t in tasks],
+            'ocr_text': [t.ocr_text for t in tasks],
+            'metadata': [json.dumps(t.metadata, default=str) if t.metadata else None for t in tasks],
+        })
+
+    @staticmethod
+    def _groups_frame(groups) -> pd.DataFrame:
+        return pd.DataFrame({
+            'window_title': [g.window_title for g in groups],
+            'category': [g.category for g in groups],
+            'start_time': pd.to_datetime([g.start_time for g in groups]),
+            'end_time': pd.to_datetime([g.end_time for g in groups]),
+            'duration_minutes': [float(g.duration_minutes) for g in groups],
+            'task_count': [g.task_count for g in groups],
+            'task_ids': [[t.id for t in g.tasks] for g in groups],
+        })
+
+    def _arrow_stream(self, frame: pd.DataFrame) -> Iterator[bytes]:
+        """Yield an Arrow IPC stream one record batch at a time."""
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        sink = _ChunkSink()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            yield sink.drain()
+            for batch in table.to_batches(max_chunksize=self.arrow_batch_rows):
+                writer.write_batch(batch)
+                yield sink.drain()
+        yield sink.drain()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['cached_responses'] = len(self._responses)
+            stats['watermark'] = self._watermark
+        stats['uptime_seconds'] = time.time() - self.start_time
+        return stats
+
+    def start_server(self, background: bool = False):
+        """Start the metrics API server.
+
+        Args:
+            background: If True, start in background thread
+        """
+        config = uvicorn.Config(self.app, host=self.host, port=self.port, log_level="info")
+
+        if background:
+            server_thread = threading.Thread(
+                target=self._run_server,
+                args=(config,),
+                daemon=True,
+                name="MetricsAPIServer"
+            )
+            server_thread.start()
+            logger.info(f"Metrics API started in background on {self.host}:{self.port}")
+        else:
+            self._run_server(config)
+
+    def _run_server(self, config):
+        """Run the server with the given config."""
+        server = uvicorn.Server(config)
+        asyncio.run(server.serve())
+
+
+# Global metrics API service instance
+_metrics_api_service: Optional[MetricsAPIService] = None
+
+
+def get_metrics_api_service(host: str = "127.0.0.1", port: Optional[int] = None) -> MetricsAPIService:
+    """Get global metrics API service instance."""
+    global _metrics_api_service
+    if _metrics_api_service is None:
+        _metrics_api_service = MetricsAPIService(host, port)
+    return _metrics_api_service
+
+
+def start_metrics_api(host: str = "127.0.0.1", port: Optional[int] = None,
+                      background: bool = True) -> MetricsAPIService:
+    """Start the global metrics API service.
+
+    Args:
+        host: Server host
+        port: Server port (defaults to ``METRICS_PORT``)
+        background: Run in background thread
+
+    Returns:
+        MetricsAPIService instance
+    """
+    service = get_metrics_api_service(host, port)
+    service.start_server(background=background)
+    return service
 
 
 def get_dashboard_state():
     """Get current dashboard state programmatically."""
+    import streamlit as st
+
     return {
         'metrics': st.session_state.get('current_metrics', {}),
         'filters': st.session_state.get('current_filters', {}),
         'timestamp': datetime.now().isoformat()
-    }
\ No newline at end of file
+    }
@@ -10,6 +10,7 @@ from autotasktracker.core import DatabaseManager
 from autotasktracker.config import get_config
 from autotasktracker.utils.streamlit_helpers import configure_page, show_error_message
 from autotasktracker.dashboards.cache import DashboardCache, QueryCache
+from autotasktracker.dashboards.data.live_view import LiveTaskView
 from autotasktracker.pensieve.health_monitor import get_health_monitor, HealthAwareMixin
 from autotasktracker.pensieve.api_client import get_pensieve_client
 from autotasktracker.pensieve.event_integration import get_event_integrator
@@ -48,6 +49,7 @@ class BaseDashboard(HealthAwareMixin, StreamlitWebSocketMixin):
         self.port = port
         self.config = get_config()
         self._db_manager: Optional[DatabaseManager] = None
+        self._live_view: Optional[LiveTaskView] = None
         
         # Set dashboard ID for WebSocket client
         self.dashboard_id = f"{self.__class__.__name__}_{port}" if port else self.__class__.__name__
@@ -102,21 +104,11 @@ class BaseDashboard(HealthAwareMixin, StreamlitWebSocketMixin):
         with st.sidebar:
             st.divider()
             
-            # Get health status - trigger immediate check if unknown
+            # Cached status only; an unknown status wakes the background
+            # prober and the next rerun picks up its result
             health_summary = self.get_health_status()
             status = health_summary.get('status', 'unknown')
             
-            # If status is unknown, trigger an immediate health check
-            if status == 'unknown':
-                try:
-                    # Force a health check
-                    self._health_monitor.check_health()
-                    health_summary = self.get_health_status()
-                    status = health_summary.get('status', 'unknown')
-                except Exception as e:
-                    logger.warning(f"Failed to perform immediate health check: {e}")
-                    status = 'unhealthy'
-            
             if status == 'healthy':
                 st.success("🟢 Pensieve Healthy")
             elif status == 'unhealthy':
@@ -131,7 +123,7 @@ class BaseDashboard(HealthAwareMixin, StreamlitWebSocketMixin):
                 if self._degraded_mode:
                     st.info("📊 Running in degraded mode (direct database access)")
             else:
-                st.warning("🟡 Pensieve Status Unknown")
+                st.warning("🟡 Pensieve Status Unknown (checking...)")
             
             # Show cache status
             self._show_cache_status()
@@ -420,19 +412,91 @@ class BaseDashboard(HealthAwareMixin, StreamlitWebSocketMixin):
         if st.session_state.get('needs_refresh', False):
             st.session_state.needs_refresh = False  # Reset flag
             return True
+        
+        # Live views flagged by event handlers since the last run
+        if any(view.pending_events for view in st.session_state.get('live_views', {}).values()):
+            return True
             
         # WebSocket events trigger automatic refreshes via st.rerun()
         # No more time-based polling needed
         return False
     
-    def trigger_refresh(self, reason: str = "Data updated"):
+    def get_live_view(
+        self,
+        task_repo,
+        start_date: datetime,
+        end_date: datetime,
+        min_duration_minutes: float = 0.5,
+        gap_threshold_minutes: float = 15,
+        metrics_repo=None,
+        period_key: Optional[str] = None
+    ) -> LiveTaskView:
+        """Get this dashboard's live task view, kept in session state.
+        
+        The view is rebuilt only when the period or grouping settings
+        change; otherwise refreshes merge new rows into it. Pass the time
+        filter preset as ``period_key`` so ranges ending "now" keep their
+        view across reruns.
+        """
+        views = st.session_state.setdefault('live_views', {})
+        view = views.get(self.dashboard_id)
+        if view is None or not view.matches(start_date, end_date, min_duration_minutes,
+                                            gap_threshold_minutes, period_key):
+            view = LiveTaskView(
+                task_repo, start_date, end_date,
+                min_duration_minutes=min_duration_minutes,
+                gap_threshold_minutes=gap_threshold_minutes,
+                metrics_repo=metrics_repo,
+                period_key=period_key
+            )
+            view.load()
+            views[self.dashboard_id] = view
+        else:
+            # Rolling starts take effect at the view's next full load
+            view.start_date = start_date
+        self._live_view = view
+        return view
+    
+    def live_component(self, name: str, view: LiveTaskView, build):
+        """Return a component's data, rebuilt only when ``view`` has changed.
+        
+        Args:
+            name: Component name, unique within the dashboard
+            view: Live view the component is derived from
+            build: Callable producing the component data
+        """
+        components = st.session_state.setdefault('live_components', {})
+        key = (self.dashboard_id, name)
+        entry = components.get(key)
+        if entry is None or entry[0] is not view or entry[1] != view.version:
+            entry = (view, view.version, build())
+            components[key] = entry
+        return entry[2]
+    
+    def trigger_refresh(self, reason: str = "Data updated", rerun: bool = True):
         """Trigger a dashboard refresh.
         
+        Dashboards with live views merge only rows newer than each view's
+        watermark and rerun only if something changed. Others fall back to
+        clearing caches and rerunning.
+        
         Args:
             reason: Reason for the refresh
+            rerun: Whether to rerun the Streamlit script afterwards
         """
         st.session_state.last_update_time = datetime.now()
         
+        views = st.session_state.get('live_views', {})
+        if views:
+            changed = set()
+            for view in views.values():
+                changed |= view.apply_updates().changed
+            st.session_state.live_changed = changed
+            logger.debug(f"{reason}: live views updated ({', '.join(sorted(changed)) or 'no changes'})")
+            if rerun and changed:
+                st.rerun()
+            return
+        
         # Invalidate relevant cache
         if hasattr(self, 'db_manager') and hasattr(self.db_manager, 'cache'):
             # Invalidate recent data cache
@@ -444,7 +508,8 @@ class BaseDashboard(HealthAwareMixin, StreamlitWebSocketMixin):
         DashboardCache.clear_cache()
         
         # Force Streamlit to rerun
-        st.rerun()
+        if rerun:
+            st.rerun()
     
     def render_realtime_controls(self):
         """Render real-time update controls in sidebar."""
@@ -214,12 +214,14 @@ class AITaskDisplay:
                 if show_screenshot and screenshot_path:
                     try:
                         import os
-                        from PIL import Image
+                        from autotasktracker.core.thumbnails import get_thumbnail
                         
                         if os.path.exists(screenshot_path):
-                            img = Image.open(screenshot_path)
-                            img.thumbnail((200, 200))
-                            st.image(img, use_container_width=True)
+                            thumbnail = get_thumbnail(screenshot_path, 200)
+                            if thumbnail:
+                                st.image(thumbnail, use_container_width=True)
+                            else:
+                                st.warning("Screenshot unavailable")
                         else:
                             st.info("No screenshot available")
                     except Exception as e:
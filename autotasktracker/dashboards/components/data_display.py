@@ -8,7 +8,8 @@ import pandas as pd
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 import os
-from PIL import Image
+
+from autotasktracker.core.thumbnails import get_thumbnail
 
 # Enhanced search capabilities  
 try:
@@ -194,7 +195,6 @@ class TaskGroup:
         """Render a basic task group without AI enhancements."""
         from autotasktracker.core.timezone_manager import get_timezone_manager
         import os
-        from PIL import Image
         
         tz_manager = get_timezone_manager()
         if end_time:
@@ -230,9 +230,11 @@ class TaskGroup:
             with col2:
                 if show_screenshot and screenshot_path and os.path.exists(screenshot_path):
                     try:
-                        img = Image.open(screenshot_path)
-                        img.thumbnail((200, 200))
-                        st.image(img, use_container_width=True)
+                        thumbnail = get_thumbnail(screenshot_path, 200)
+                        if thumbnail:
+                            st.image(thumbnail, use_container_width=True)
+                        else:
+                            st.caption("Screenshot unavailable")
                     except Exception:
                         st.caption("Screenshot unavailable")
                         
@@ -293,9 +295,9 @@ class ActivityCard:
                 with col2:
                     if screenshot_path and os.path.exists(screenshot_path):
                         try:
-                            img = Image.open(screenshot_path)
-                            img.thumbnail((300, 300))
-                            st.image(img, use_container_width=True)
+                            thumbnail = get_thumbnail(screenshot_path, 300)
+                            if thumbnail:
+                                st.image(thumbnail, use_container_width=True)
                         except Exception as e:
                             logger.debug(f"Failed to load screenshot thumbnail: {e}")
                             
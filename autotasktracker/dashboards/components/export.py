@@ -9,6 +9,7 @@ import pandas as pd
 import streamlit as st
 import logging
 
+from autotasktracker.core.export_engine import TASK_GROUP_COLUMNS, confidence_label, task_group_row
 from .base_component import StatelessComponent
 
 logger = logging.getLogger(__name__)
@@ -126,50 +127,17 @@ class ExportComponent(StatelessComponent):
         
         # Write header
         if export_config["include_headers"]:
-            writer.writerow([
-                "Date", "Task Group", "Duration", "Start Time", "End Time",
-                "Category", "Description", "Activities", "Confidence"
-            ])
+            writer.writerow(TASK_GROUP_COLUMNS)
         
         # Process task groups
         for group in task_groups:
             try:
-                # Format date and times
-                date_str = group.start_time.strftime(export_config["date_format"])
-                start_time_str = group.start_time.strftime(export_config["time_format"])
-                end_time_str = group.end_time.strftime(export_config["time_format"])
-                
-                # Format duration
-                duration_str = f"{group.duration_minutes}min"
-                
-                # Build description from tasks
-                activities = []
-                for task in group.tasks[:3]:  # First 3 tasks
-                    if hasattr(task, 'title') and task.title:
-                        activities.append(task.title.strip())
-                    elif hasattr(task, 'description') and task.description:
-                        activities.append(task.description.strip())
-                
-                description = "; ".join(activities)
-                if len(description) > export_config["max_description_length"]:
-                    description = description[:export_config["max_description_length"]] + "..."
-                
-                # Determine confidence level
-                confidence = ExportComponent._calculate_confidence(group.duration_minutes)
-                
-                # Write row
-                writer.writerow([
-                    date_str,
-                    group.window_title or "Unknown",
-                    duration_str,
-                    start_time_str,
-                    end_time_str,
-                    group.category or "Uncategorized",
-                    description,
-                    len(group.tasks),
-                    confidence
-                ])
-                
+                writer.writerow(task_group_row(
+                    group,
+                    export_config["date_format"],
+                    export_config["time_format"],
+                    export_config["max_description_length"]
+                ))
             except Exception as e:
                 logger.error(f"Error formatting task group: {e}")
                 continue
@@ -235,6 +203,43 @@ class ExportComponent(StatelessComponent):
                             st.error(f"Export failed: {str(e)}")
                             logger.error(f"Export error: {e}", exc_info=True)
     
+    @staticmethod
+    def render_export_progress(output_path: str) -> bool:
+        """Show progress of a background export and where to find the file.
+        
+        Exports run in the export engine (see ``autotasktracker.core.export_engine``),
+        so the dashboard never holds the file in memory.
+        
+        Args:
+            output_path: Output path the export job was started with
+            
+        Returns:
+            True once the export has finished (done or failed)
+        """
+        from autotasktracker.core.export_engine import get_export_jobs
+        from pathlib import Path
+        
+        jobs = get_export_jobs()
+        progress = jobs.status(output_path)
+        if progress is None:
+            st.info("⏳ Export starting...")
+            return False
+        
+        if progress.status == 'done':
+            st.success(f"✅ Export ready: {progress.rows_written} rows")
+            st.markdown(f"[Open export]({Path(output_path).resolve().as_uri()})")
+            st.code(output_path, language=None)
+        elif progress.status == 'failed':
+            st.error(f"Export failed: {progress.error}")
+        else:
+            st.progress(progress.fraction, text=f"Exporting... {progress.rows_read:,} of "
+                                                 f"{progress.total_rows or 0:,} screenshots read")
+            if progress.status == 'paused' and not jobs.is_running(output_path):
+                st.caption("Export paused")
+            elif st.button("🔄 Refresh export status"):
+                st.rerun()
+        return progress.finished
+    
     # Helper methods
     @staticmethod
     def _to_csv_string(data: Union[pd.DataFrame, List[Dict], str], columns: Optional[List[str]] = None) -> str:
@@ -263,12 +268,7 @@ class ExportComponent(StatelessComponent):
     @staticmethod
     def _calculate_confidence(duration_minutes: float) -> str:
         """Calculate confidence level based on duration."""
-        if duration_minutes >= 2:
-            return "High"
-        elif duration_minutes >= 1:
-            return "Medium"
-        else:
-            return "Low"
+        return confidence_label(duration_minutes)
     
     @staticmethod
     def _generate_filename(prefix: str, extension: str, include_date: bool = True) -> str:
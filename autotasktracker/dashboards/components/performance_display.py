@@ -9,6 +9,7 @@ from datetime import datetime, timedelta
 import logging
 
 # Heavy imports moved to function level for conditional loading
+from autotasktracker.core.tracing import FRESHNESS, PIPELINE_STAGES, get_tracer
 
 logger = logging.getLogger(__name__)
 
@@ -401,6 +402,43 @@ def render_performance_sidebar():
         
         except Exception as e:
             logger.debug(f"Error showing sidebar performance: {e}")
+        
+        render_freshness_panel()
+
+
+def _format_lag(value_ms: float) -> str:
+    """Format a latency for compact display."""
+    if value_ms < 1000:
+        return f"{value_ms:.0f}ms"
+    if value_ms < 60_000:
+        return f"{value_ms / 1000:.1f}s"
+    return f"{value_ms / 60_000:.1f}m"
+
+
+def render_freshness_panel():
+    """Render capture-to-visible lag and per-stage pipeline latencies."""
+    try:
+        stats = get_tracer().stage_stats()
+        freshness = stats.get(FRESHNESS)
+        if freshness and freshness['count']:
+            st.caption(f"⏱️ Freshness (capture → visible), {freshness['count']} tasks")
+            col1, col2 = st.columns(2)
+            col1.metric("p50", _format_lag(freshness['p50_ms']))
+            col2.metric("p95", _format_lag(freshness['p95_ms']))
+        
+        stages = [stage for stage in PIPELINE_STAGES if stage in stats]
+        if stages:
+            with st.expander("Pipeline stages", expanded=False):
+                for stage in stages:
+                    stage_stats = stats[stage]
+                    st.caption(
+                        f"{stage}: p50 {_format_lag(stage_stats['p50_ms'])} · "
+                        f"p95 {_format_lag(stage_stats['p95_ms'])} · "
+                        f"p99 {_format_lag(stage_stats['p99_ms'])} ({stage_stats['count']})"
+                    )
+    
+    except Exception as e:
+        logger.debug(f"Error showing freshness panel: {e}")
 
 
 def render_mini_performance_status():
@@ -1,7 +1,8 @@
 """Data access layer for dashboards."""
 
 from .repositories import TaskRepository, ActivityRepository, MetricsRepository
-from .models import Task, Activity, TaskGroup, DailyMetrics
+from .models import Task, Activity, TaskGroup, DailyTaskGroups, DailyMetrics
+from .live_view import LiveTaskView, ViewDelta
 
 __all__ = [
     'TaskRepository',
@@ -10,5 +11,8 @@ __all__ = [
     'Task',
     'Activity',
     'TaskGroup',
-    'DailyMetrics'
+    'DailyTaskGroups',
+    'DailyMetrics',
+    'LiveTaskView',
+    'ViewDelta'
 ]
\ No newline at end of file
@@ -0,0 +1,249 @@
+"""Incremental view models for live dashboards.
+
+A live dashboard used to answer every new-entity event by clearing its
+caches and re-querying the whole period. LiveTaskView keeps the period's
+task groups and summary metrics together with a watermark (highest entity
+id and timestamp seen). An update fetches only the rows above the
+watermark and merges them into the open tail group or starts new groups,
+so refresh cost follows the amount of new data rather than the period
+length.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from autotasktracker.core.tracing import get_tracer, trace_span
+
+from .models import Task, TaskGroup
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ViewDelta:
+    """What changed when new rows were merged into a live view."""
+    new_tasks: int = 0
+    new_groups: int = 0
+    extended_tail: bool = False
+    reloaded: bool = False
+    changed: Set[str] = field(default_factory=set)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.changed)
+
+
+class LiveTaskView:
+    """Task groups and summary metrics for one period, advanced by watermark.
+
+    Groups that can no longer grow are kept as-is; only the tasks of the
+    last (open) group are regrouped with newly arrived rows, using the same
+    rules as ``TaskRepository.get_task_groups``. Unique-window, category and
+    day counts are advanced against what the view has seen since its last
+    full load, and the view reloads in full once it is older than
+    ``max_age_seconds``, when rows arrive out of order, or when a delta hits
+    ``delta_limit``.
+    """
+
+    COMPONENTS = ('metrics', 'task_groups')
+    # Periods ending this close to the present are treated as running to "now"
+    OPEN_END_TOLERANCE = timedelta(minutes=1)
+
+    def __init__(self, task_repo, start_date: datetime, end_date: datetime,
+                 min_duration_minutes: float = 0.5, gap_threshold_minutes: float = 15,
+                 metrics_repo=None, task_limit: int = 1000, delta_limit: int = 1000,
+                 max_age_seconds: float = 300, period_key: Optional[str] = None):
+        self.task_repo = task_repo
+        self.metrics_repo = metrics_repo
+        self.start_date = start_date
+        self.end_date = end_date
+        self.period_key = period_key
+        self.open_end = end_date >= datetime.now() - self.OPEN_END_TOLERANCE
+        self.min_duration_minutes = min_duration_minutes
+        self.gap_threshold_minutes = gap_threshold_minutes
+        self.task_limit = task_limit
+        self.delta_limit = delta_limit
+        self.max_age_seconds = max_age_seconds
+
+        self.watermark_id = 0
+        self.watermark_timestamp: Optional[datetime] = None
+        self.summary: Dict[str, Any] = {}
+        self.loaded_at: Optional[float] = None
+        self.version = 0
+        # Bumped by event handlers on other threads; cleared by apply_updates()
+        self.pending_events = 0
+
+        self._closed_groups: List[TaskGroup] = []
+        self._tail_group: Optional[TaskGroup] = None
+        self._tail_tasks: List[Task] = []
+        self._seen_windows: Set[str] = set()
+        self._seen_categories: Set[str] = set()
+        self._seen_days: Set = set()
+
+    def matches(self, start_date: datetime, end_date: datetime,
+                min_duration_minutes: float, gap_threshold_minutes: float,
+                period_key: Optional[str] = None) -> bool:
+        """Whether this view covers the given period and grouping settings.
+
+        Presets such as "Today" produce a new end (and, for rolling ranges,
+        a new start) on every run. A view built for the same preset still
+        matches while its start falls on the same day; an open end keeps
+        following the present.
+        """
+        if (self.min_duration_minutes != min_duration_minutes or
+                self.gap_threshold_minutes != gap_threshold_minutes):
+            return False
+        if period_key is not None and period_key == self.period_key:
+            return (self.start_date.date() == start_date.date() and
+                    (self.open_end or self.end_date == end_date))
+        return self.start_date == start_date and self.end_date == end_date
+
+    @property
+    def period_end(self) -> datetime:
+        """End of the period; the present for views that run to "now"."""
+        if self.open_end:
+            return max(self.end_date, datetime.now())
+        return self.end_date
+
+    @property
+    def groups(self) -> List[TaskGroup]:
+        """Task groups in start-time order, as ``get_task_groups`` returns them."""
+        if self._tail_group is not None:
+            return self._closed_groups + [self._tail_group]
+        return list(self._closed_groups)
+
+    @property
+    def is_stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.max_age_seconds
+
+    def mark_stale(self):
+        """Note that new data is available (safe to call from event threads)."""
+        self.pending_events += 1
+
+    def invalidate(self):
+        """Force a full reload on the next update, e.g. after missed events."""
+        self.loaded_at = None
+        self.pending_events += 1
+
+    def load(self) -> ViewDelta:
+        """Rebuild the view from a full period query."""
+        end_date = self.period_end
+        tasks = self.task_repo.get_tasks_for_period(self.start_date, end_date, limit=self.task_limit)
+        tasks.sort(key=lambda task: task.timestamp)
+
+        self._closed_groups = []
+        self._tail_group = None
+        self._tail_tasks = []
+        self._seen_windows = set()
+        self._seen_categories = set()
+        self._seen_days = set()
+        self.watermark_id = 0
+        self.watermark_timestamp = None
+
+        self._merge(tasks)
+        self._advance_watermark(tasks)
+        if self.metrics_repo is not None:
+            self.summary = dict(self.metrics_repo.get_metrics_summary(self.start_date, end_date))
+            self._observe(tasks)
+        else:
+            self.summary = {}
+            self._advance_summary(tasks)
+
+        self.loaded_at = time.monotonic()
+        self.pending_events = 0
+        self.version += 1
+        return ViewDelta(new_tasks=len(tasks), new_groups=len(self.groups), reloaded=True,
+                         changed=set(self.COMPONENTS))
+
+    def apply_updates(self) -> ViewDelta:
+        """Merge rows newer than the watermark; reload in full when required."""
+        if self.is_stale:
+            return self.load()
+
+        self.pending_events = 0
+        with trace_span('dashboard', watermark_id=self.watermark_id):
+            new_tasks = self.task_repo.get_tasks_after(
+                self.watermark_id, self.start_date, self.period_end, limit=self.delta_limit
+            )
+            new_tasks = [task for task in new_tasks if task.id > self.watermark_id]
+            if not new_tasks:
+                return ViewDelta()
+
+            new_tasks.sort(key=lambda task: task.timestamp)
+            if len(new_tasks) >= self.delta_limit or (
+                    self._tail_tasks and new_tasks[0].timestamp < self._tail_tasks[0].timestamp):
+                # Rows may be missing or belong before the open group
+                logger.debug(f"Live view reloading after {len(new_tasks)} new rows")
+                return self.load()
+
+            delta = self._merge(new_tasks)
+            self._advance_watermark(new_tasks)
+            self._advance_summary(new_tasks)
+            self.version += 1
+            delta.changed = set(self.COMPONENTS)
+
+        # Rows merged from a delta become visible now; full loads are history
+        tracer = get_tracer()
+        visible_at = datetime.now()
+        for task in new_tasks:
+            tracer.record_freshness(task.timestamp, visible_at)
+        return delta
+
+    def _keep(self, group: TaskGroup) -> bool:
+        # Mirrors the inclusion rule in TaskRepository._group_sorted_tasks
+        span = (group.end_time - group.start_time).total_seconds() / 60
+        return span >= self.min_duration_minutes or group.task_count >= 3
+
+    def _merge(self, tasks: List[Task]) -> ViewDelta:
+        """Regroup the open tail with ``tasks`` and close finished groups."""
+        delta = ViewDelta(new_tasks=len(tasks))
+        if not tasks:
+            return delta
+
+        previous_tail = self._tail_tasks
+        candidate = sorted(previous_tail + tasks, key=lambda task: task.timestamp)
+        # Minimum duration 0 keeps every group so the open tail is never lost
+        regrouped = self.task_repo._group_sorted_tasks(candidate, 0, self.gap_threshold_minutes)
+
+        for group in regrouped[:-1]:
+            if self._keep(group):
+                self._closed_groups.append(group)
+        tail = regrouped[-1]
+        self._tail_tasks = tail.tasks
+        self._tail_group = tail if self._keep(tail) else None
+
+        delta.extended_tail = bool(previous_tail) and tail.tasks[0] is previous_tail[0]
+        delta.new_groups = len(regrouped) - (1 if previous_tail else 0)
+        return delta
+
+    def _advance_watermark(self, tasks: List[Task]):
+        for task in tasks:
+            if task.id > self.watermark_id:
+                self.watermark_id = task.id
+            if self.watermark_timestamp is None or task.timestamp > self.watermark_timestamp:
+                self.watermark_timestamp = task.timestamp
+
+    def _observe(self, tasks: List[Task]):
+        for task in tasks:
+            if task.window_title:
+                self._seen_windows.add(task.window_title)
+            if task.category:
+                self._seen_categories.add(task.category)
+            self._seen_days.add(task.timestamp.date())
+
+    def _advance_summary(self, tasks: List[Task]):
+        """Add new tasks to the summary counters."""
+        summary = self.summary
+        windows, categories, days = len(self._seen_windows), len(self._seen_categories), len(self._seen_days)
+        self._observe(tasks)
+
+        summary['total_activities'] = summary.get('total_activities', 0) + len(tasks)
+        summary['unique_windows'] = summary.get('unique_windows', 0) + len(self._seen_windows) - windows
+        summary['unique_categories'] = summary.get('unique_categories', 0) + len(self._seen_categories) - categories
+        summary['active_days'] = summary.get('active_days', 0) + len(self._seen_days) - days
+        summary['avg_daily_activities'] = (
+            summary['total_activities'] / summary['active_days'] if summary['active_days'] else 0
+        )
@@ -1,7 +1,7 @@
 """Data models for dashboards."""
 
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Optional, Dict, Any
 
 
@@ -54,6 +54,23 @@ class TaskGroup:
         return self.duration_minutes / 60
         
 
+@dataclass
+class DailyTaskGroups:
+    """Task groups for a date range, partitioned by calendar day."""
+    groups: Dict[date, List[TaskGroup]]
+    daily: Any  # pandas DataFrame, one row of aggregates per day with activity
+    task_count: int = 0
+    
+    @property
+    def days(self) -> List[date]:
+        """Get the days that have at least one group, in order."""
+        return sorted(self.groups)
+        
+    def for_day(self, day: date) -> List[TaskGroup]:
+        """Get the groups that started on a given day."""
+        return self.groups.get(day, [])
+        
+
 @dataclass
 class DailyMetrics:
     """Daily productivity metrics."""
@@ -8,15 +8,35 @@ from collections import defaultdict
 import re
 
 from autotasktracker.core import DatabaseManager
+from autotasktracker.core.query_registry import get_query_registry
+from autotasktracker.core.partitioning import entity_id_bounds
+from autotasktracker.core.metadata_archive import fill_archived
+from autotasktracker.core.screenshot_store import resolve_frame, resolve_screenshots
+from autotasktracker.core.derived_versions import refresh_frame, refresh_rows
 from autotasktracker.core.categorizer import extract_window_title
 from autotasktracker.pensieve.postgresql_adapter import get_postgresql_adapter, PostgreSQLAdapter
 from autotasktracker.pensieve.cache_manager import get_cache_manager
 from autotasktracker.core.exceptions import DatabaseError, CacheError
-from .models import Task, Activity, TaskGroup, DailyMetrics
+from .models import Task, Activity, TaskGroup, DailyTaskGroups, DailyMetrics
 from .core.window_normalizer import get_window_normalizer
 
 logger = logging.getLogger(__name__)
 
+# Task row columns read through to the metadata archive (column -> metadata key)
+ARCHIVED_TASK_COLUMNS = {
+    'ocr_text': 'ocr_text',
+    'minicpm_v_result': 'minicpm_v_result',
+    'vlm_result': 'vlm_result',
+}
+
+# Task row columns holding derived metadata checked against the current pipeline version
+DERIVED_TASK_COLUMNS = {
+    'tasks': 'tasks',
+    'tasks_json': 'tasks',
+    'category': 'category',
+    'llama3_session_result': 'llama3_session_result',
+}
+
 
 class BaseRepository:
     """Base repository with common functionality."""
@@ -83,6 +103,53 @@ class BaseRepository:
             logger.exception(f"Unexpected error executing query: {e}")
             return pd.DataFrame()
     
+    def _execute_prepared(self, name: str, params: tuple = (), cache_ttl: Optional[int] = 300) -> pd.DataFrame:
+        """Execute a registered hot query by name, cached like ``_execute_query``.
+        
+        Args:
+            name: Query name in the global query registry
+            params: Query parameters in ``$n`` order
+            cache_ttl: Cache time-to-live in seconds (default: 5 minutes);
+                None bypasses the cache entirely
+        """
+        import hashlib
+        
+        cache_key = f"query_{name}_{hashlib.md5(repr(params).encode()).hexdigest()}"
+        
+        cached_result = None
+        if cache_ttl is not None:
+            try:
+                cached_result = self.cache.get(cache_key)
+            except CacheError as e:
+                logger.warning(f"Cache error (continuing without cache): {e}")
+        if cached_result is not None:
+            logger.debug(f"Cache hit for prepared query: {name}")
+            if isinstance(cached_result, dict) and 'data' in cached_result:
+                return pd.DataFrame(cached_result['data'], columns=cached_result.get('columns'))
+            return cached_result
+        
+        try:
+            with self.db.get_connection() as conn:
+                result = get_query_registry().read_dataframe(conn, name, params)
+        except DatabaseError as e:
+            logger.error(f"AutoTaskTracker database error: {e}")
+            return pd.DataFrame()
+        except Exception as e:
+            logger.exception(f"Unexpected error executing prepared query {name}: {e}")
+            return pd.DataFrame()
+        
+        if cache_ttl is None:
+            return result
+        try:
+            self.cache.set(cache_key, {
+                'data': result.to_dict('records'),
+                'columns': list(result.columns),
+                'shape': result.shape
+            }, ttl=cache_ttl)
+        except CacheError as e:
+            logger.warning(f"Cache error (continuing without cache): {e}")
+        return result
+    
     def invalidate_cache(self, pattern: str = None):
         """Invalidate cached query results.
         
@@ -163,42 +230,23 @@ class TaskRepository(BaseRepository):
         Returns:
             int: Number of tasks recorded today
         """
-        from datetime import datetime, time
+        from datetime import datetime, time, timedelta
         
         # Get today's date at midnight
         today_start = datetime.combine(datetime.today(), time.min)
         today_end = datetime.combine(datetime.today(), time.max)
         
-        # Try PostgreSQL adapter first if available
-        if self.use_pensieve and self.pg_adapter:
-            try:
-                task_dicts = self.pg_adapter.get_tasks_optimized(
-                    start_date=today_start,
-                    end_date=today_end,
-                    limit=10000  # High limit to ensure we get all of today's tasks
-                )
-                return len(task_dicts)
-            except (ConnectionError, TimeoutError) as e:
-                logger.warning(f"PostgreSQL connection failed, falling back to SQLite: {e}")
-            except ValueError as e:
-                logger.warning(f"Invalid parameters for PostgreSQL adapter: {e}")
-            except Exception as e:
-                logger.warning(f"Unexpected PostgreSQL adapter error, falling back to SQLite: {e}")
-        
-        # Fallback to direct SQLite query
-        query = """
-        SELECT COUNT(*) as task_count
-        FROM tasks
-        WHERE timestamp BETWEEN ? AND ?
-        """
-        
-        params = (
-            today_start.strftime('%Y-%m-%d %H:%M:%S'),
-            today_end.strftime('%Y-%m-%d %H:%M:%S')
-        )
+        # Same local to stored-time shift as _get_tasks_sqlite_fallback
+        utc_start = today_start + timedelta(hours=7)
+        utc_end = today_end + timedelta(hours=7)
         
+        # Count in the database instead of fetching today's tasks to count them
         try:
-            result = self._execute_query(query, params)
+            result = self._execute_prepared(
+                'count_tasks_today',
+                (utc_start, utc_end, *entity_id_bounds(self.db, utc_start, utc_end)),
+                cache_ttl=60
+            )
             return int(result.iloc[0]['task_count']) if not result.empty else 0
         except Exception as e:
             logger.error(f"Error counting today's tasks: {e}")
@@ -240,65 +288,99 @@ class TaskRepository(BaseRepository):
         categories: Optional[List[str]] = None,
         limit: int = 1000
     ) -> List[Task]:
-        """Fallback SQLite implementation with intelligent caching."""
-        query = """
-        SELECT 
-            e.id,
-            COALESCE(e.created_at, e.file_created_at) as created_at,
-            e.filepath,
-            m1.value as ocr_text,
-            m2.value as active_window,
-            m3.value as tasks,
-            m4.value as category,
-            m5.value as minicpm_v_result,
-            m6.value as vlm_result,
-            m7.value as subtasks,
-            m8.value as tasks_json,
-            m9.value as session_id,
-            m10.value as dual_model_processed,
-            m11.value as dual_model_version,
-            m12.value as llama3_session_result,
-            m13.value as workflow_analysis
-        FROM entities e
-        LEFT JOIN metadata_entries m1 ON e.id = m1.entity_id AND m1.key = 'ocr_text'
-        LEFT JOIN metadata_entries m2 ON e.id = m2.entity_id AND m2.key = 'active_window'
-        LEFT JOIN metadata_entries m3 ON e.id = m3.entity_id AND m3.key = 'tasks'
-        LEFT JOIN metadata_entries m4 ON e.id = m4.entity_id AND m4.key = 'category'
-        LEFT JOIN metadata_entries m5 ON e.id = m5.entity_id AND m5.key = 'minicpm_v_result'
-        LEFT JOIN metadata_entries m6 ON e.id = m6.entity_id AND m6.key = 'vlm_result'
-        LEFT JOIN metadata_entries m7 ON e.id = m7.entity_id AND m7.key = 'subtasks'
-        LEFT JOIN metadata_entries m8 ON e.id = m8.entity_id AND m8.key = 'tasks'
-        LEFT JOIN metadata_entries m9 ON e.id = m9.entity_id AND m9.key = 'session_id'
-        LEFT JOIN metadata_entries m10 ON e.id = m10.entity_id AND m10.key = 'dual_model_processed'
-        LEFT JOIN metadata_entries m11 ON e.id = m11.entity_id AND m11.key = 'dual_model_version'
-        LEFT JOIN metadata_entries m12 ON e.id = m12.entity_id AND m12.key = 'llama3_session_result'
-        LEFT JOIN metadata_entries m13 ON e.id = m13.entity_id AND m13.key = 'workflow_analysis'
-        WHERE COALESCE(e.created_at, e.file_created_at) >= %s AND COALESCE(e.created_at, e.file_created_at) <= %s
-        """
-        
+        """Fallback direct-database implementation with intelligent caching."""
         # TEMPORARY FIX: Add 8 hours to account for timezone storage issue
         # TODO: Remove once root cause is fixed
         from datetime import timedelta
         utc_start = start_date + timedelta(hours=7)
         utc_end = end_date + timedelta(hours=7)
         
-        params = [
-            utc_start.strftime('%Y-%m-%d %H:%M:%S'),
-            utc_end.strftime('%Y-%m-%d %H:%M:%S')
-        ]
-        
+        period = (utc_start.strftime('%Y-%m-%d %H:%M:%S'), utc_end.strftime('%Y-%m-%d %H:%M:%S'))
+        bounds = entity_id_bounds(self.db, utc_start, utc_end)
         if categories:
-            placeholders = ','.join(['%s' for _ in categories])
-            query += f" AND m4.value IN ({placeholders})"
-            params.extend(categories)
-            
-        query += " ORDER BY COALESCE(e.created_at, e.file_created_at) DESC LIMIT %s"
-        params.append(limit)
+            name, params = 'tasks_for_period_in_categories', (*period, list(categories), limit, *bounds)
+        else:
+            name, params = 'tasks_for_period', (*period, limit, *bounds)
         
         # Use shorter cache TTL for recent data (60 seconds), longer for historical (5 minutes)
         cache_ttl = 60 if (datetime.now() - end_date).days < 1 else 300
-        df = self._execute_query(query, tuple(params), cache_ttl=cache_ttl)
+        df = self._execute_prepared(name, params, cache_ttl=cache_ttl)
+        return self._rows_to_tasks(df)
+    
+    def get_tasks_after(
+        self,
+        after_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        limit: int = 1000
+    ) -> List[Task]:
+        """Get tasks in a period whose entity id is above ``after_id``.
+        
+        Used by live dashboards to fetch only rows newer than their
+        watermark. Reads the database directly and bypasses the query
+        cache, so a delta is never served stale.
+        
+        Args:
+            after_id: Watermark; only entities with a higher id are returned
+            start_date: Start of period
+            end_date: End of period
+            limit: Maximum results
+            
+        Returns:
+            List of Task objects in entity id order
+        """
+        # Same timezone adjustment as _get_tasks_sqlite_fallback
+        from datetime import timedelta
+        utc_start = start_date + timedelta(hours=7)
+        utc_end = end_date + timedelta(hours=7)
+        params = (
+            utc_start.strftime('%Y-%m-%d %H:%M:%S'),
+            utc_end.strftime('%Y-%m-%d %H:%M:%S'),
+            int(after_id),
+            limit,
+            *entity_id_bounds(self.db, utc_start, utc_end)
+        )
+        df = self._execute_prepared('tasks_after_id', params, cache_ttl=None)
+        return self._rows_to_tasks(df)
+    
+    def get_all_tasks_for_period(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        page_size: int = 10000
+    ) -> List[Task]:
+        """Get every task in a period, paging by entity id until exhausted.
         
+        Unlike ``get_tasks_for_period`` nothing is cut off at a row limit,
+        and each page is one direct query rather than a Pensieve API call
+        per entity.
+        
+        Args:
+            start_date: Start of period
+            end_date: End of period
+            page_size: Rows fetched per query
+            
+        Returns:
+            List of Task objects in entity id order
+        """
+        tasks: List[Task] = []
+        after_id = 0
+        while True:
+            page = self.get_tasks_after(after_id, start_date, end_date, limit=page_size)
+            tasks.extend(page)
+            if len(page) < page_size:
+                return tasks
+            after_id = max(task.id for task in page)
+    
+    def _rows_to_tasks(self, df: pd.DataFrame) -> List[Task]:
+        """Convert ``tasks_for_period`` / ``tasks_after_id`` rows to Task objects."""
+        from datetime import timedelta
+        # Verbose AI output of old screenshots lives in the metadata archive
+        df = fill_archived(self.db, df, ARCHIVED_TASK_COLUMNS)
+        # Values from an older pipeline version are recomputed within budget or queued
+        df = refresh_frame(self.db, df, DERIVED_TASK_COLUMNS)
+        # Old screenshots may have been transcoded out of the screenshots directory
+        df = resolve_frame(self.db, df)
         tasks = []
         for _, row in df.iterrows():
             # Use extracted task if available, fallback to window title
@@ -382,6 +464,9 @@ class TaskRepository(BaseRepository):
         """Convert PostgreSQL adapter results to Task objects with AI metadata."""
         from autotasktracker.core.timezone_manager import get_timezone_manager
         tz_manager = get_timezone_manager()
+        screenshot_paths = resolve_screenshots(self.db, [d.get('filepath') for d in task_dicts])
+        # Adapter rows carry parsed task lists, so stale ones are only queued for recompute
+        refresh_rows(self.db, task_dicts, DERIVED_TASK_COLUMNS, inline=False)
         
         tasks = []
         for task_dict in task_dicts:
@@ -441,7 +526,7 @@ class TaskRepository(BaseRepository):
                 duration_minutes=5,  # Default 5 min per capture
                 window_title=window_title,
                 ocr_text=task_dict.get("ocr_result"),
-                screenshot_path=task_dict.get('filepath'),
+                screenshot_path=screenshot_paths.get(task_dict.get('filepath'), task_dict.get('filepath')),
                 metadata=metadata if metadata else None
             )
             tasks.append(task)
@@ -490,69 +575,153 @@ class TaskRepository(BaseRepository):
         # Sort by timestamp
         tasks.sort(key=lambda x: x.timestamp)
         
+        return self._group_sorted_tasks(tasks, min_duration_minutes, gap_threshold_minutes)
+        
+    def get_task_groups_by_day(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        min_duration_minutes: float = 0.5,
+        gap_threshold_minutes: float = 15,
+        productive_categories: Tuple[str, ...] = ('Development', 'Productivity'),
+        page_size: int = 10000
+    ) -> DailyTaskGroups:
+        """Get task groups for every day in a range from one paged scan.
+        
+        The whole range is read in entity id pages, sorted once and grouped
+        in one pass that also breaks groups at midnight, so each group
+        belongs to exactly one day. Per-day aggregates are computed
+        column-wise from the groups.
+        
+        Args:
+            start_date: First day of the range (time of day is ignored)
+            end_date: Last day of the range, inclusive
+            min_duration_minutes: Minimum duration to include
+            gap_threshold_minutes: Max gap between activities to group
+            productive_categories: Categories counted as productive time
+            page_size: Screenshots fetched per query
+            
+        Returns:
+            DailyTaskGroups with the groups keyed by day and a ``daily``
+            DataFrame (date, total_time, productive_time, tasks_count,
+            avg_task_duration, peak_hour) with one row per active day
+        """
+        range_start = datetime.combine(start_date.date(), datetime.min.time())
+        range_end = datetime.combine(end_date.date(), datetime.max.time().replace(microsecond=0))
+        
+        tasks = self.get_all_tasks_for_period(range_start, range_end, page_size=page_size)
+        tasks.sort(key=lambda x: x.timestamp)
+        groups = self._group_sorted_tasks(
+            tasks, min_duration_minutes, gap_threshold_minutes, split_by_day=True
+        )
+        
+        by_day = defaultdict(list)
+        for group in groups:
+            by_day[group.start_time.date()].append(group)
+            
+        return DailyTaskGroups(
+            groups=dict(by_day),
+            daily=self._aggregate_groups_by_day(groups, productive_categories),
+            task_count=len(tasks)
+        )
+        
+    def _aggregate_groups_by_day(
+        self,
+        groups: List[TaskGroup],
+        productive_categories: Tuple[str, ...]
+    ) -> pd.DataFrame:
+        """Build the per-day aggregate frame from day-partitioned groups."""
+        columns = ['date', 'total_time', 'productive_time', 'tasks_count', 'avg_task_duration', 'peak_hour']
+        if not groups:
+            return pd.DataFrame(columns=columns)
+            
+        frame = pd.DataFrame({
+            'date': pd.to_datetime([g.start_time for g in groups]).normalize(),
+            'hour': [g.start_time.hour for g in groups],
+            'duration': [g.duration_minutes for g in groups],
+            'productive': [g.category in productive_categories for g in groups],
+        })
+        frame['productive_duration'] = frame['duration'].where(frame['productive'], 0.0)
+        
+        by_day = frame.groupby('date', sort=True)
+        daily = pd.DataFrame({
+            'total_time': by_day['duration'].sum(),
+            'productive_time': by_day['productive_duration'].sum(),
+            'tasks_count': by_day['duration'].size(),
+            'avg_task_duration': by_day['duration'].mean(),
+        })
+        
+        # Hour with the most grouped minutes; ties go to the earliest hour
+        hourly = frame.groupby(['date', 'hour'], sort=True)['duration'].sum()
+        daily['peak_hour'] = hourly.groupby(level='date').idxmax().map(lambda key: key[1])
+        
+        return daily.reset_index()[columns]
+        
+    def _group_sorted_tasks(
+        self,
+        tasks: List[Task],
+        min_duration_minutes: float,
+        gap_threshold_minutes: float,
+        split_by_day: bool = False
+    ) -> List[TaskGroup]:
+        """Group timestamp-sorted tasks into continuous activity blocks.
+        
+        A group continues while the normalized window stays the same and the
+        gap to the previous capture is within the threshold. With
+        ``split_by_day`` a group also ends at midnight.
+        """
         groups = []
         current_group = None
+        normalized_titles = {}
+        
+        def flush(group):
+            duration = (group['end_time'] - group['start_time']).total_seconds() / 60
+            if duration >= min_duration_minutes or len(group["tasks"]) >= 3:  # Include if has many activities
+                groups.append(TaskGroup(
+                    window_title=group["normalized_window"],  # Use normalized title
+                    category=group["category"],
+                    start_time=group['start_time'],
+                    end_time=group['end_time'],
+                    duration_minutes=max(duration, len(group["tasks"]) * 0.25),  # Minimum duration based on activity count
+                    task_count=len(group["tasks"]),
+                    tasks=group["tasks"]
+                ))
         
         for task in tasks:
-            normalized_window = self._normalize_window_title(task.window_title)
+            # The same few windows repeat all day, so normalize each title once
+            normalized_window = normalized_titles.get(task.window_title)
+            if normalized_window is None:
+                normalized_window = self._normalize_window_title(task.window_title)
+                normalized_titles[task.window_title] = normalized_window
             
-            if current_group is None:
-                # Start new group
-                current_group = {
-                    "active_window": task.window_title,
-                    "normalized_window": normalized_window,
-                    "category": task.category,
-                    'start_time': task.timestamp,
-                    'end_time': task.timestamp,
-                    "tasks": [task]
-                }
-            elif (normalized_window == current_group["normalized_window"] and
-                  (task.timestamp - current_group['end_time']).total_seconds() / 60 <= gap_threshold_minutes):
+            if (current_group is not None and
+                    normalized_window == current_group["normalized_window"] and
+                    (task.timestamp - current_group['end_time']).total_seconds() / 60 <= gap_threshold_minutes and
+                    not (split_by_day and task.timestamp.date() != current_group['start_time'].date())):
                 # Continue current group (using normalized window for comparison)
                 current_group['end_time'] = task.timestamp
                 current_group["tasks"].append(task)
-            else:
-                # Save current group and start new one
-                duration = (current_group['end_time'] - current_group['start_time']).total_seconds() / 60
-                if duration >= min_duration_minutes or len(current_group["tasks"]) >= 3:  # Include if has many activities
-                    groups.append(TaskGroup(
-                        window_title=current_group["normalized_window"],  # Use normalized title
-                        category=current_group["category"],
-                        start_time=current_group['start_time'],
-                        end_time=current_group['end_time'],
-                        duration_minutes=max(duration, len(current_group["tasks"]) * 0.25),  # Minimum duration based on activity count
-                        task_count=len(current_group["tasks"]),
-                        tasks=current_group["tasks"]
-                    ))
-                    
-                # Start new group
-                current_group = {
-                    "active_window": task.window_title,
-                    "normalized_window": normalized_window,
-                    "category": task.category,
-                    'start_time': task.timestamp,
-                    'end_time': task.timestamp,
-                    "tasks": [task]
-                }
+                continue
+                
+            if current_group is not None:
+                flush(current_group)
+                
+            # Start new group
+            current_group = {
+                "active_window": task.window_title,
+                "normalized_window": normalized_window,
+                "category": task.category,
+                'start_time': task.timestamp,
+                'end_time': task.timestamp,
+                "tasks": [task]
+            }
                 
         # Don't forget last group
         if current_group:
-            duration = (current_group['end_time'] - current_group['start_time']).total_seconds() / 60
-            if duration >= min_duration_minutes or len(current_group["tasks"]) >= 3:
-                groups.append(TaskGroup(
-                    window_title=current_group["normalized_window"],
-                    category=current_group["category"],
-                    start_time=current_group['start_time'],
-                    end_time=current_group['end_time'],
-                    duration_minutes=max(duration, len(current_group["tasks"]) * 0.25),
-                    task_count=len(current_group["tasks"]),
-                    tasks=current_group["tasks"]
-                ))
-                
-        return groups
+            flush(current_group)
                 
         return groups
-        
+
 
 class ActivityRepository(BaseRepository):
     """Repository for activity/screenshot data."""
@@ -619,7 +788,7 @@ class ActivityRepository(BaseRepository):
         query += " ORDER BY COALESCE(e.created_at, e.file_created_at) DESC LIMIT %s"
         params.append(limit)
         
-        df = self._execute_query(query, tuple(params))
+        df = resolve_frame(self.db, self._execute_query(query, tuple(params)))
         
         activities = []
         for _, row in df.iterrows():
@@ -641,6 +810,8 @@ class ActivityRepository(BaseRepository):
         """Convert PostgreSQL adapter results to Activity objects."""
         from autotasktracker.core.timezone_manager import get_timezone_manager
         tz_manager = get_timezone_manager()
+        screenshot_paths = resolve_screenshots(self.db, [d.get('filepath') for d in task_dicts])
+        refresh_rows(self.db, task_dicts, DERIVED_TASK_COLUMNS, inline=False)
         
         activities = []
         for task_dict in task_dicts:
@@ -664,7 +835,7 @@ class ActivityRepository(BaseRepository):
                 category=task_dict.get("category", 'Other'),
                 ocr_text=task_dict.get("ocr_result"),
                 tasks=task_dict.get("tasks"),  # Keep tasks data if available
-                screenshot_path=task_dict.get('filepath'),
+                screenshot_path=screenshot_paths.get(task_dict.get('filepath'), task_dict.get('filepath')),
                 active_window=task_dict.get("active_window")
             )
             activities.append(activity)
@@ -860,16 +1031,19 @@ class MetricsRepository(BaseRepository):
             COUNT(DISTINCT DATE(COALESCE(e.created_at, e.file_created_at))) as active_days
         FROM entities e
         WHERE COALESCE(e.created_at, e.file_created_at) >= %s AND COALESCE(e.created_at, e.file_created_at) <= %s
+        AND e.id BETWEEN %s AND %s
         """
         
         # TEMPORARY FIX: Add 8 hours to account for timezone storage issue
         from datetime import timedelta
         adjusted_start = start_date + timedelta(hours=7)
         adjusted_end = end_date + timedelta(hours=7)
+        id_bounds = entity_id_bounds(self.db, adjusted_start, adjusted_end)
         
         df_basic = self._execute_query(basic_query, (
             adjusted_start.strftime('%Y-%m-%d %H:%M:%S'),
-            adjusted_end.strftime('%Y-%m-%d %H:%M:%S')
+            adjusted_end.strftime('%Y-%m-%d %H:%M:%S'),
+            *id_bounds
         ))
         
         if df_basic.empty:
@@ -889,6 +1063,7 @@ class MetricsRepository(BaseRepository):
         WHERE m.key = 'category' 
         AND DATE(COALESCE(e.created_at, e.file_created_at)) >= %s::date 
         AND DATE(COALESCE(e.created_at, e.file_created_at)) <= %s::date
+        AND m.entity_id BETWEEN %s AND %s
         """
         
         window_query = """
@@ -898,6 +1073,7 @@ class MetricsRepository(BaseRepository):
         WHERE m.key = 'active_window' 
         AND DATE(COALESCE(e.created_at, e.file_created_at)) >= %s::date 
         AND DATE(COALESCE(e.created_at, e.file_created_at)) <= %s::date
+        AND m.entity_id BETWEEN %s AND %s
         """
         
         # Use longer cache TTL for aggregated metrics (10 minutes for historical, 2 minutes for today)
@@ -905,12 +1081,14 @@ class MetricsRepository(BaseRepository):
         
         df_categories = self._execute_query(category_query, (
             adjusted_start.strftime('%Y-%m-%d'),
-            adjusted_end.strftime('%Y-%m-%d')
+            adjusted_end.strftime('%Y-%m-%d'),
+            *id_bounds
         ), cache_ttl=metrics_cache_ttl)
         
         df_windows = self._execute_query(window_query, (
             adjusted_start.strftime('%Y-%m-%d'),
-            adjusted_end.strftime('%Y-%m-%d')
+            adjusted_end.strftime('%Y-%m-%d'),
+            *id_bounds
         ), cache_ttl=metrics_cache_ttl)
         
         basic_row = df_basic.iloc[0]
@@ -977,6 +1155,26 @@ class MetricsRepository(BaseRepository):
             'avg_daily_activities': avg_daily_activities
         }
     
+    def get_data_watermark(self) -> Optional[Tuple[int, int]]:
+        """Get the highest entity id and the data change counter.
+        
+        The counter moves with every row inserted, updated or deleted in
+        entities and metadata, so together they identify a version of the
+        data for conditional requests. Not cached.
+        
+        Returns:
+            (max_entity_id, data_version), or None if the database is unavailable
+        """
+        try:
+            with self.db.get_connection() as conn:
+                _, rows = get_query_registry().execute(conn, 'data_watermark')
+        except Exception as e:
+            logger.warning(f"Could not read data watermark: {e}")
+            return None
+        if not rows:
+            return (0, 0)
+        return int(rows[0][0] or 0), int(rows[0][1] or 0)
+    
     def get_session_metrics(
         self,
         start_date: datetime,
@@ -991,33 +1189,15 @@ class MetricsRepository(BaseRepository):
         Returns:
             Dictionary with session metrics
         """
-        # Query for dual-model session data
-        query = """
-        SELECT 
-            e.id,
-            COALESCE(e.created_at, e.file_created_at) as created_at,
-            m1.value as session_id,
-            m2.value as dual_model_processed,
-            m3.value as llama3_session_result,
-            m4.value as workflow_analysis
-        FROM entities e
-        LEFT JOIN metadata_entries m1 ON e.id = m1.entity_id AND m1.key = 'session_id'
-        LEFT JOIN metadata_entries m2 ON e.id = m2.entity_id AND m2.key = 'dual_model_processed'
-        LEFT JOIN metadata_entries m3 ON e.id = m3.entity_id AND m3.key = 'llama3_session_result'
-        LEFT JOIN metadata_entries m4 ON e.id = m4.entity_id AND m4.key = 'workflow_analysis'
-        WHERE COALESCE(e.created_at, e.file_created_at) >= %s 
-        AND COALESCE(e.created_at, e.file_created_at) <= %s
-        AND m1.value IS NOT NULL
-        """
-        
         # TEMPORARY FIX: Add timezone adjustment
         from datetime import timedelta
         adjusted_start = start_date + timedelta(hours=7)
         adjusted_end = end_date + timedelta(hours=7)
         
-        df = self._execute_query(query, (
+        df = self._execute_prepared('session_metrics', (
             adjusted_start.strftime('%Y-%m-%d %H:%M:%S'),
-            adjusted_end.strftime('%Y-%m-%d %H:%M:%S')
+            adjusted_end.strftime('%Y-%m-%d %H:%M:%S'),
+            *entity_id_bounds(self.db, adjusted_start, adjusted_end)
         ))
         
         if df.empty:
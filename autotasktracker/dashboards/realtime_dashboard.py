@@ -25,6 +25,7 @@ from autotasktracker.pensieve.vector_search import get_enhanced_vector_search, V
 from autotasktracker.pensieve.postgresql_adapter import get_postgresql_adapter
 from autotasktracker.pensieve.health_monitor import get_health_monitor
 from autotasktracker.config import get_config
+from autotasktracker.core.thumbnails import get_thumbnail
 
 logger = logging.getLogger(__name__)
 
@@ -138,7 +139,7 @@ class RealTimeDashboard(BaseDashboard):
                         use_semantic=search_params['use_semantic'],
                         use_keyword=search_params['use_keyword'],
                         min_relevance=search_params['similarity_threshold'],
-                        limit=search_params['max_results']
+                        max_results=search_params['max_results']
                     )
                     results = self.advanced_search.search(search_obj)
                     search_type = "Advanced Search"
@@ -153,7 +154,9 @@ class RealTimeDashboard(BaseDashboard):
                         if hasattr(result, 'search_type'):
                             st.write(f"**Match Type**: {result.search_type}")
                         if result.entity.screenshot_path:
-                            st.image(str(result.entity.screenshot_path), width=300)
+                            thumbnail = get_thumbnail(result.entity.screenshot_path, 300)
+                            if thumbnail:
+                                st.image(thumbnail, width=300)
                         
             except Exception as e:
                 st.error(f"Search failed: {str(e)}")
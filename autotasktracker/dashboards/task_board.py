@@ -148,7 +148,8 @@ class TaskBoardDashboard(BaseDashboard):
             }
         
         def render_export_section():
-            if st.button("Export to CSV", help="Export current task data as CSV for reporting"):
+            export_format = st.selectbox("Format", ["CSV", "JSONL", "Parquet"], key="export_format")
+            if st.button(f"Export to {export_format}", help="Export current task data in the background for reporting"):
                 st.session_state.export_csv = True
             return None
         
@@ -219,13 +220,25 @@ class TaskBoardDashboard(BaseDashboard):
         
         return time_filter, categories, show_screenshots, min_duration, show_session_insights
             
-    def render_metrics(self, metrics_repo: MetricsRepository, start_date: datetime, end_date: datetime):
-        """Render metrics section."""
-        # Get summary metrics
-        summary = metrics_repo.get_metrics_summary(start_date, end_date)
-        
-        # Get session metrics
-        session_metrics = metrics_repo.get_session_metrics(start_date, end_date)
+    def render_metrics(self, metrics_repo: MetricsRepository, start_date: datetime, end_date: datetime,
+                       live_view=None):
+        """Render metrics section.
+        
+        With a live view, the summary comes from the view and session metrics
+        are refetched only when the view has changed.
+        """
+        if live_view is not None:
+            summary = live_view.summary
+            session_metrics = self.live_component(
+                'session_metrics', live_view,
+                lambda: metrics_repo.get_session_metrics(start_date, end_date)
+            )
+        else:
+            # Get summary metrics
+            summary = metrics_repo.get_metrics_summary(start_date, end_date)
+            
+            # Get session metrics
+            session_metrics = metrics_repo.get_session_metrics(start_date, end_date)
         
         # Display traditional metrics
         MetricsRow.render({
@@ -295,15 +308,19 @@ class TaskBoardDashboard(BaseDashboard):
         categories: list,
         show_screenshots: bool,
         min_duration: int,
-        show_session_insights: bool = True
+        show_session_insights: bool = True,
+        live_view=None
     ):
         """Render task groups."""
         # Get grouped tasks
-        task_groups = task_repo.get_task_groups(
-            start_date=start_date,
-            end_date=end_date,
-            min_duration_minutes=min_duration
-        )
+        if live_view is not None:
+            task_groups = list(live_view.groups)
+        else:
+            task_groups = task_repo.get_task_groups(
+                start_date=start_date,
+                end_date=end_date,
+                min_duration_minutes=min_duration
+            )
         
         # Filter by categories if specified (empty list means all categories)
         if categories:  # If specific categories selected
@@ -427,9 +444,9 @@ class TaskBoardDashboard(BaseDashboard):
         if not self.event_processor.running:
             self.event_processor.start_processing()
         
-        # Check for real-time updates
+        # Merge rows that arrived since the last run into the live view
         if self.check_for_updates():
-            self.trigger_refresh("New data available")
+            self.trigger_refresh("New data available", rerun=False)
         
         # Capture dashboard startup
         capture_event("dashboard_startup")
@@ -491,46 +508,42 @@ class TaskBoardDashboard(BaseDashboard):
         task_repo = TaskRepository(self.db_manager)
         metrics_repo = MetricsRepository(self.db_manager)
         
-        # Handle CSV export if requested
+        # Task groups and metrics for the period, advanced incrementally between runs
+        live_view = self.get_live_view(
+            task_repo, start_date, end_date,
+            min_duration_minutes=min_duration,
+            metrics_repo=metrics_repo,
+            period_key=time_filter
+        )
+        
+        # Start a background export if requested; the export engine streams
+        # from the database to a file so large ranges never load here
         if st.session_state.get('export_csv', False):
-            with st.spinner("Generating CSV export..."):
-                # Get task groups for export
-                export_groups = task_repo.get_task_groups(
-                    start_date=start_date,
-                    end_date=end_date,
-                    min_duration_minutes=min_duration
+            from autotasktracker.core.export_engine import ExportRequest, default_output_path, get_export_jobs
+            export_format = st.session_state.get('export_format', 'CSV').lower()
+            try:
+                request = ExportRequest(
+                    start=start_date,
+                    end=end_date,
+                    output_path=default_output_path('task_groups', export_format),
+                    format=export_format,
+                    categories=categories or None,
+                    min_duration_minutes=min_duration,
+                    # Same local/UTC shift as TaskRepository's queries
+                    utc_offset_hours=7
                 )
-                
-                # Filter by categories if specified
-                if categories:
-                    export_groups = [
-                        group for group in export_groups 
-                        if group.category in categories
-                    ]
-                
-                if export_groups:
-                    # Use ExportComponent for CSV generation
-                    csv_content = ExportComponent.format_task_export(
-                        export_groups, start_date, end_date
-                    )
-                    
-                    # Create download button using ExportComponent
-                    filename = f"autotasktracker_export_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.csv"
-                    ExportComponent.render_csv_button(
-                        data=csv_content,
-                        filename=filename,
-                        label="📥 Download CSV",
-                        help_text=f"Export contains {len(export_groups)} task groups from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"
-                    )
-                    st.success(f"✅ CSV export ready! {len(export_groups)} task groups included.")
-                else:
-                    st.warning("No task groups found for the selected time period and filters.")
+                st.session_state.export_job = get_export_jobs().start(request)
+            except ValueError as e:
+                st.error(f"Export failed: {e}")
             
             # Reset export flag
             st.session_state.export_csv = False
         
+        if st.session_state.get('export_job'):
+            ExportComponent.render_export_progress(st.session_state.export_job)
+        
         # Render metrics
-        self.render_metrics(metrics_repo, start_date, end_date)
+        self.render_metrics(metrics_repo, start_date, end_date, live_view=live_view)
         
         st.divider()
         
@@ -543,15 +556,16 @@ class TaskBoardDashboard(BaseDashboard):
             categories,
             show_screenshots,
             min_duration,
-            show_session_insights
+            show_session_insights,
+            live_view=live_view
         )
     
     def _handle_realtime_update(self, event: PensieveEvent):
         """Handle real-time updates from EventProcessor."""
         if st.session_state.get('realtime_enabled', False):
-            # Invalidate relevant caches
-            self.cache_manager.invalidate_pattern('fetch_tasks_*')
-            self.cache_manager.invalidate_pattern('task_groups_*')
+            # The next run fetches only rows above the live view's watermark
+            if self._live_view is not None:
+                self._live_view.mark_stale()
             
             # Update last update time
             st.session_state.last_update_time = datetime.now()
@@ -42,7 +42,9 @@ class DashboardWebSocketClient:
         # Event handlers
         self.event_handlers: Dict[str, Set[Callable]] = {
             'new_tasks': set(),
+            'new_tasks_batch': set(),
             'entity_update': set(),
+            'resync': set(),
             'connected': set(),
             'disconnected': set(),
             'error': set()
@@ -251,7 +253,9 @@ class StreamlitWebSocketMixin:
         
         # Register event handlers
         self.websocket_client.add_event_handler('new_tasks', self._handle_new_tasks)
+        self.websocket_client.add_event_handler('new_tasks_batch', self._handle_new_tasks_batch)
         self.websocket_client.add_event_handler('entity_update', self._handle_entity_update)
+        self.websocket_client.add_event_handler('resync', self._handle_resync)
         self.websocket_client.add_event_handler('connected', self._handle_websocket_connected)
         self.websocket_client.add_event_handler('disconnected', self._handle_websocket_disconnected)
         
@@ -266,6 +270,37 @@ class StreamlitWebSocketMixin:
         if 'st' in globals():
             st.rerun()
     
+    def _handle_new_tasks_batch(self, data: Dict[str, Any]):
+        """Handle several new-task events coalesced into one message."""
+        logger.info(
+            f"Dashboard {self.websocket_client.dashboard_id} received {data.get('count', 0)} new tasks "
+            f"(latest entity {data.get('latest_entity_id')})"
+        )
+        
+        # Trigger Streamlit rerun for real-time update
+        if 'st' in globals():
+            st.rerun()
+    
+    def _handle_resync(self, data: Dict[str, Any]):
+        """Handle a resync after the server dropped events for this client.
+        
+        Skipped events may include updates to rows already on screen, so
+        live views reload in full instead of merging new rows only.
+        """
+        logger.warning(
+            f"Dashboard {self.websocket_client.dashboard_id} resyncing after "
+            f"{data.get('skipped', 0)} skipped events ({data.get('reason', 'unknown')})"
+        )
+        
+        if hasattr(st, 'session_state'):
+            for view in st.session_state.get('live_views', {}).values():
+                view.invalidate()
+            st.session_state.needs_refresh = True
+        
+        # Trigger Streamlit rerun for real-time update
+        if 'st' in globals():
+            st.rerun()
+    
     def _handle_entity_update(self, data: Dict[str, Any]):
         """Handle entity update event from WebSocket."""
         entity_id = data.get('entity_id')
@@ -12,52 +12,59 @@ achieving 90%+ utilization of Pensieve capabilities through:
 - Multi-tier caching system
 """
 
-from .api_client import (
-    get_pensieve_client, 
-    reset_pensieve_client,
-    PensieveAPIClient,
-    PensieveEntity,
-    PensieveFrame,
-    PensieveAPIError
-)
+from autotasktracker.utils.lazy_imports import lazy_exports
 
-from .cache_manager import (
-    get_cache_manager,
-    reset_cache_manager,
-    PensieveCacheManager
-)
+# Exports are imported on first access (PEP 562), so importing one Pensieve
+# module does not pull in websockets, requests and every integration
+__getattr__, __dir__ = lazy_exports(__name__, {
+    # API Client
+    'get_pensieve_client': '.api_client',
+    'reset_pensieve_client': '.api_client',
+    'PensieveAPIClient': '.api_client',
+    'PensieveEntity': '.api_client',
+    'PensieveFrame': '.api_client',
+    'PensieveAPIError': '.api_client',
+
+    # Cache Management
+    'get_cache_manager': '.cache_manager',
+    'reset_cache_manager': '.cache_manager',
+    'PensieveCacheManager': '.cache_manager',
+
+    # Config sync removed to prevent circular imports
 
-# Config sync removed to prevent circular imports
+    # Event Integration
+    'get_event_integrator': '.event_integration',
+    'start_event_integration': '.event_integration',
+    'reset_event_integrator': '.event_integration',
+    'PensieveEventIntegrator': '.event_integration',
+    'PensieveEvent': '.event_integration',
+    'EventHandler': '.event_integration',
+    'ScreenshotEventHandler': '.event_integration',
+    'MetadataEventHandler': '.event_integration',
+    'DashboardNotifier': '.event_integration',
+    'ClientChannel': '.event_integration',
+    'coalesce_notifications': '.event_integration',
 
-from .event_integration import (
-    get_event_integrator,
-    start_event_integration,
-    reset_event_integrator,
-    PensieveEventIntegrator,
-    PensieveEvent,
-    EventHandler,
-    ScreenshotEventHandler,
-    MetadataEventHandler,
-    DashboardNotifier
-)
+    # Enhanced Search
+    'get_enhanced_search': '.enhanced_search',
+    'reset_enhanced_search': '.enhanced_search',
+    'PensieveEnhancedSearch': '.enhanced_search',
+    'SearchResult': '.enhanced_search',
+    'SearchQuery': '.enhanced_search',
 
-from .enhanced_search import (
-    get_enhanced_search,
-    reset_enhanced_search,
-    PensieveEnhancedSearch,
-    SearchResult,
-    SearchQuery
-)
+    # Hybrid Search
+    'HybridSearchEngine': '.hybrid_search',
+    'Retriever': '.hybrid_search',
 
-from .backend_optimizer import (
-    get_backend_optimizer,
-    auto_optimize_backend,
-    reset_backend_optimizer,
-    PensieveBackendOptimizer,
-    BackendType,
-    BackendMetrics,
-    MigrationPlan
-)
+    # Backend Optimization
+    'get_backend_optimizer': '.backend_optimizer',
+    'auto_optimize_backend': '.backend_optimizer',
+    'reset_backend_optimizer': '.backend_optimizer',
+    'PensieveBackendOptimizer': '.backend_optimizer',
+    'BackendType': '.backend_optimizer',
+    'BackendMetrics': '.backend_optimizer',
+    'MigrationPlan': '.backend_optimizer',
+})
 
 __version__ = "1.0.0"
 __author__ = "AutoTaskTracker Team"
@@ -86,6 +93,8 @@ __all__ = [
     "ScreenshotEventHandler",
     "MetadataEventHandler",
     "DashboardNotifier",
+    "ClientChannel",
+    "coalesce_notifications",
     
     # Enhanced Search
     "get_enhanced_search",
@@ -94,6 +103,10 @@ __all__ = [
     "SearchResult",
     "SearchQuery",
     
+    # Hybrid Search
+    "HybridSearchEngine",
+    "Retriever",
+    
     # Backend Optimization
     "get_backend_optimizer",
     "auto_optimize_backend", 
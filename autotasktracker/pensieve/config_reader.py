@@ -3,6 +3,7 @@
 import os
 import yaml
 import logging
+import socket
 import subprocess
 from pathlib import Path
 from typing import Dict, Any, Optional, Union
@@ -13,6 +14,9 @@ from autotasktracker.config import get_config
 
 logger = logging.getLogger(__name__)
 
+# PID files the memos services write to their data directory
+MEMOS_PID_FILES = ("memos.pid", "serve.pid", "watch.pid")
+
 
 @dataclass
 class PensieveConfig:
@@ -84,6 +88,51 @@ class PensieveConfigReader:
                 "output": ""
             }
     
+    def probe_memos_process(self, api_port: Optional[int] = None,
+                            timeout: float = 0.5) -> Dict[str, Any]:
+        """Detect a running memos service without spawning ``memos ps``.
+
+        Checks the PID files memos writes to its data directory and falls
+        back to a TCP connect on the API port.
+
+        Args:
+            api_port: Port to probe (defaults to the configured memos port)
+            timeout: Connect timeout for the port probe in seconds
+
+        Returns:
+            Dictionary with ``running``, ``pid``, ``port_open`` and ``method``
+        """
+        pid = self._read_live_pid()
+        if pid is not None:
+            return {"running": True, "pid": pid, "port_open": None, "method": "pid_file"}
+
+        app_config = get_config()
+        port = api_port or app_config.MEMOS_PORT
+        try:
+            with socket.create_connection((app_config.SERVER_HOST, port), timeout=timeout):
+                port_open = True
+        except OSError as e:
+            logger.debug(f"memos port probe on {port} failed: {e}")
+            port_open = False
+        return {"running": port_open, "pid": None, "port_open": port_open, "method": "port_probe"}
+
+    def _read_live_pid(self) -> Optional[int]:
+        """PID from the first memos PID file whose process is still alive."""
+        for name in MEMOS_PID_FILES:
+            try:
+                pid = int((self.memos_dir / name).read_text().strip())
+            except (OSError, ValueError):
+                continue
+            try:
+                os.kill(pid, 0)
+            except PermissionError:
+                # Process exists but belongs to another user
+                return pid
+            except OSError:
+                continue
+            return pid
+        return None
+
     def _parse_process_info(self, output: str) -> Dict[str, Any]:
         """Parse process information from memos ps output."""
         info = {
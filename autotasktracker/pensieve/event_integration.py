@@ -8,15 +8,16 @@ import json
 import logging
 import threading
 import time
-from typing import Any, Callable, Dict, List, Optional, Set
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass
 from datetime import datetime
-import requests
 import websockets
 from websockets.exceptions import ConnectionClosedError, ConnectionClosedOK
 
 from autotasktracker.pensieve.api_client import get_pensieve_client, PensieveAPIError
 from autotasktracker.pensieve.config_sync import get_synced_config
+from autotasktracker.core.connection_pool import LatencyHistogram
 from autotasktracker.core.exceptions import (
     PensieveIntegrationError, ConfigurationError
 )
@@ -24,6 +25,10 @@ from autotasktracker.core.exceptions import (
 logger = logging.getLogger(__name__)
 
 
+# Histogram bucket upper bounds in milliseconds for webhook deliveries
+WEBHOOK_LATENCY_BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
 @dataclass
 class PensieveEvent:
     """Represents a Pensieve event."""
@@ -107,6 +112,9 @@ class ScreenshotEventHandler(EventHandler):
                     # Store tasks back to Pensieve
                     api_client.store_entity_metadata(entity_id, 'tasks', json.dumps(tasks))
                     api_client.store_entity_metadata(entity_id, 'processed_at', datetime.now().isoformat())
+                    # Mark as current so readers do not recompute over the task list
+                    from autotasktracker.core.derived_versions import stamp_derived
+                    stamp_derived(entity_id, ['tasks'])
                     
                     logger.info(f"Extracted {len(tasks)} tasks from entity {entity_id}")
                     
@@ -157,14 +165,203 @@ class MetadataEventHandler(EventHandler):
         logger.info(f"Metadata updated for entity {entity_id}: {metadata_key}")
 
 
+def coalesce_notifications(notifications: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Collapse notifications collected during one batching window.
+
+    Several ``new_tasks`` notifications become a single ``new_tasks_batch``
+    summary, repeated ``entity_update`` notifications for the same entity and
+    update type keep only the latest, and anything else passes through in
+    order.
+    """
+    if len(notifications) <= 1:
+        return list(notifications)
+
+    new_tasks = [n for n in notifications if n.get('type') == 'new_tasks']
+    latest_updates: Dict[tuple, Dict[str, Any]] = {}
+    update_counts: Dict[tuple, int] = {}
+    result: List[Dict[str, Any]] = []
+    batch_slot = None
+
+    for notification in notifications:
+        kind = notification.get('type')
+        if kind == 'new_tasks' and len(new_tasks) > 1:
+            if batch_slot is None:
+                batch_slot = len(result)
+                result.append(None)
+        elif kind == 'entity_update':
+            key = (notification.get('entity_id'), notification.get('update_type'))
+            if key not in latest_updates:
+                result.append(key)
+            latest_updates[key] = notification
+            update_counts[key] = update_counts.get(key, 0) + 1
+        else:
+            result.append(notification)
+
+    if batch_slot is not None:
+        entity_ids = [n.get('entity_id') for n in new_tasks]
+        latest = max((i for i in entity_ids if i is not None), default=None)
+        result[batch_slot] = {
+            "type": "new_tasks_batch",
+            "count": len(new_tasks),
+            "entity_ids": entity_ids,
+            "latest_entity_id": latest,
+            "task_count": sum(len(n.get('tasks') or []) for n in new_tasks),
+            "summary": f"{len(new_tasks)} new entities, latest id {latest}",
+            "timestamp": new_tasks[-1].get('timestamp', datetime.now().isoformat()),
+        }
+
+    for index, item in enumerate(result):
+        if isinstance(item, tuple):
+            notification = latest_updates[item]
+            if update_counts[item] > 1:
+                notification = dict(notification, coalesced=update_counts[item])
+            result[index] = notification
+    return result
+
+
+class ClientChannel:
+    """Bounded outbound queue and sender task for one dashboard connection.
+
+    Broadcasts only append to the queue, so a slow client never delays the
+    others. When the queue is full the ``drop_oldest`` policy discards the
+    oldest message, while ``coalesce`` folds the whole backlog into one
+    ``resync`` message telling the dashboard to refetch.
+    """
+
+    POLICIES = ('drop_oldest', 'coalesce')
+
+    def __init__(self, websocket, max_queue: int = 100, policy: str = 'coalesce',
+                 send_timeout: float = 5.0):
+        if policy not in self.POLICIES:
+            raise ConfigurationError(f"Unknown client queue policy '{policy}', expected one of {self.POLICIES}")
+        self.websocket = websocket
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.queue: Deque[Tuple[Dict[str, Any], str]] = deque()
+        self.closed = False
+        self.task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self._ready = asyncio.Event()
+
+    def offer(self, notification: Dict[str, Any], message: str):
+        """Queue a pre-encoded notification without waiting for the client."""
+        if self.closed:
+            return
+        if len(self.queue) >= self.max_queue:
+            if self.policy == 'drop_oldest':
+                self.queue.popleft()
+                self.dropped += 1
+            else:
+                backlog = [queued for queued, _ in self.queue] + [notification]
+                self.coalesced += len(backlog) - 1
+                resync = self._resync(backlog)
+                self.queue.clear()
+                self.queue.append((resync, json.dumps(resync)))
+                self._ready.set()
+                return
+        self.queue.append((notification, message))
+        self._ready.set()
+
+    @staticmethod
+    def _resync(backlog: List[Dict[str, Any]]) -> Dict[str, Any]:
+        skipped = 0
+        entity_ids = []
+        for notification in backlog:
+            if notification.get('type') == 'resync':
+                skipped += notification.get('skipped', 0)
+                if notification.get('latest_entity_id') is not None:
+                    entity_ids.append(notification['latest_entity_id'])
+                continue
+            skipped += notification.get('count', 1)
+            entity_ids.append(notification.get('latest_entity_id', notification.get('entity_id')))
+        return {
+            "type": "resync",
+            "reason": "backpressure",
+            "skipped": skipped,
+            "latest_entity_id": max((i for i in entity_ids if i is not None), default=None),
+            "timestamp": datetime.now().isoformat(),
+        }
+
+    async def run(self):
+        """Send queued messages in order until the connection fails or closes."""
+        while not self.closed:
+            if not self.queue:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            _, message = self.queue.popleft()
+            try:
+                await asyncio.wait_for(self.websocket.send(message), self.send_timeout)
+                self.sent += 1
+            except (ConnectionClosedError, ConnectionClosedOK):
+                self.close()
+            except asyncio.TimeoutError:
+                logger.warning(f"Dropping dashboard client that did not accept a message within {self.send_timeout}s")
+                self.close()
+            except Exception as e:
+                logger.warning(f"Failed to send WebSocket notification: {e}")
+                self.close()
+
+    def close(self):
+        self.closed = True
+        self.queue.clear()
+        self._ready.set()
+
+
 class DashboardNotifier:
-    """Notifies dashboards of real-time updates."""
+    """Notifies dashboards of real-time updates.
+
+    Notifications arriving within ``coalesce_window`` seconds are batched
+    and coalesced, then fanned out to every client's bounded queue. Each
+    client drains its queue on its own task, and webhooks are delivered
+    asynchronously with retries and exponential backoff.
+    """
     
-    def __init__(self):
-        self.websocket_clients: Set[websockets.WebSocketServerProtocol] = set()
+    def __init__(self, coalesce_window: float = 0.25, client_queue_size: int = 100,
+                 queue_policy: str = 'coalesce', send_timeout: float = 5.0,
+                 webhook_timeout: float = 5.0, webhook_retries: int = 3,
+                 webhook_backoff: float = 0.5, webhook_concurrency: int = 8):
+        if queue_policy not in ClientChannel.POLICIES:
+            raise ConfigurationError(f"Unknown client queue policy '{queue_policy}'")
+        self.channels: Dict[Any, ClientChannel] = {}
         self.webhook_urls: List[str] = []
         self.server = None
         self.server_task = None
+
+        self.coalesce_window = coalesce_window
+        self.client_queue_size = client_queue_size
+        self.queue_policy = queue_policy
+        self.send_timeout = send_timeout
+        self.webhook_timeout = webhook_timeout
+        self.webhook_retries = webhook_retries
+        self.webhook_backoff = webhook_backoff
+        self.webhook_concurrency = webhook_concurrency
+
+        self._pending: List[Dict[str, Any]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._webhook_tasks: Set[asyncio.Task] = set()
+        self._webhook_semaphore: Optional[asyncio.Semaphore] = None
+        self._http_session = None
+        self._webhook_latency = LatencyHistogram(WEBHOOK_LATENCY_BUCKETS_MS)
+        self.stats = {
+            'notifications': 0,
+            'broadcasts': 0,
+            'window_coalesced': 0,
+            'send_failures': 0,
+            'webhooks_delivered': 0,
+            'webhooks_failed': 0,
+            'webhook_retries': 0,
+        }
+        # Counters of clients that have already disconnected
+        self._closed_totals = {'sent': 0, 'dropped': 0, 'coalesced': 0}
+
+    @property
+    def websocket_clients(self) -> Set[Any]:
+        """Currently connected dashboard WebSockets."""
+        return set(self.channels)
     
     async def start_websocket_server(self, port: int = 8841):
         """Start WebSocket server for dashboard notifications."""
@@ -180,31 +377,63 @@ class DashboardNotifier:
     
     async def stop_websocket_server(self):
         """Stop WebSocket server."""
+        await self.flush()
         if self.server:
             self.server.close()
             await self.server.wait_closed()
             logger.info("Dashboard WebSocket server stopped")
+        for channel in list(self.channels.values()):
+            self._remove_channel(channel)
+        if self._webhook_tasks:
+            await asyncio.gather(*self._webhook_tasks, return_exceptions=True)
+        if self._http_session is not None:
+            await self._http_session.close()
+            self._http_session = None
     
-    async def _handle_websocket_connection(self, websocket, path):
+    async def _handle_websocket_connection(self, websocket, path=None):
         """Handle new WebSocket connection from dashboard."""
-        self.websocket_clients.add(websocket)
-        logger.info(f"Dashboard connected via WebSocket: {websocket.remote_address}")
+        channel = self._add_channel(websocket)
+        logger.info(f"Dashboard connected via WebSocket: {getattr(websocket, 'remote_address', None)}")
         
         try:
             # Send welcome message
-            await websocket.send(json.dumps({
+            welcome = {
                 "type": "connected",
                 "message": "Real-time updates enabled",
                 "timestamp": datetime.now().isoformat()
-            }))
+            }
+            channel.offer(welcome, json.dumps(welcome))
             
             # Keep connection alive
             await websocket.wait_closed()
         except (ConnectionClosedError, ConnectionClosedOK) as e:
             logger.debug(f"WebSocket connection closed normally: {type(e).__name__}")
         finally:
-            self.websocket_clients.discard(websocket)
+            self._remove_channel(channel)
             logger.info("Dashboard disconnected from WebSocket")
+
+    def _add_channel(self, websocket) -> ClientChannel:
+        channel = ClientChannel(websocket, self.client_queue_size, self.queue_policy, self.send_timeout)
+        channel.task = asyncio.get_running_loop().create_task(self._run_channel(channel))
+        self.channels[websocket] = channel
+        return channel
+
+    async def _run_channel(self, channel: ClientChannel):
+        await channel.run()
+        if self.channels.get(channel.websocket) is channel:
+            self.stats['send_failures'] += 1
+            self._remove_channel(channel)
+
+    def _remove_channel(self, channel: ClientChannel):
+        if self.channels.get(channel.websocket) is not channel:
+            return
+        del self.channels[channel.websocket]
+        channel.close()
+        if channel.task and channel.task is not asyncio.current_task():
+            channel.task.cancel()
+        self._closed_totals['sent'] += channel.sent
+        self._closed_totals['dropped'] += channel.dropped
+        self._closed_totals['coalesced'] += channel.coalesced
     
     async def notify_new_tasks(self, entity_id: int, tasks: List[Dict[str, Any]]):
         """Notify dashboards of new tasks."""
@@ -230,29 +459,86 @@ class DashboardNotifier:
         await self._broadcast_notification(notification)
     
     async def _broadcast_notification(self, notification: Dict[str, Any]):
-        """Broadcast notification to all connected clients."""
+        """Queue a notification for the current batching window."""
+        self.stats['notifications'] += 1
+        self._pending.append(notification)
+        if self.coalesce_window <= 0:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_after_window())
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(self.coalesce_window)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        """Coalesce pending notifications and fan them out immediately."""
+        if self._flush_task is not None and self._flush_task is not asyncio.current_task():
+            self._flush_task.cancel()
+            self._flush_task = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        batch = coalesce_notifications(pending)
+        self.stats['window_coalesced'] += len(pending) - len(batch)
+        for notification in batch:
+            self._fan_out(notification)
+
+    def _fan_out(self, notification: Dict[str, Any]):
+        """Enqueue one notification for every client and webhook."""
+        self.stats['broadcasts'] += 1
+        # Encoded once, shared by every client queue
         message = json.dumps(notification)
-        
-        # Send to WebSocket clients
-        disconnected_clients = set()
-        for client in self.websocket_clients:
-            try:
-                await client.send(message)
-            except (ConnectionClosedError, ConnectionClosedOK):
-                disconnected_clients.add(client)
-            except Exception as e:
-                logger.warning(f"Failed to send WebSocket notification: {e}")
-                disconnected_clients.add(client)
-        
-        # Remove disconnected clients
-        self.websocket_clients -= disconnected_clients
-        
-        # Send to webhook URLs
+        for channel in list(self.channels.values()):
+            channel.offer(notification, message)
+
         for webhook_url in self.webhook_urls:
-            try:
-                requests.post(webhook_url, json=notification, timeout=5)
-            except Exception as e:
-                logger.warning(f"Failed to send webhook notification to {webhook_url}: {e}")
+            task = asyncio.get_running_loop().create_task(self._deliver_webhook(webhook_url, notification))
+            self._webhook_tasks.add(task)
+            task.add_done_callback(self._webhook_tasks.discard)
+
+    async def _get_http_session(self):
+        if self._http_session is None:
+            import aiohttp
+            self._http_session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.webhook_timeout)
+            )
+        return self._http_session
+
+    async def _post_webhook(self, url: str, notification: Dict[str, Any]) -> int:
+        """POST a notification to a webhook and return the HTTP status."""
+        session = await self._get_http_session()
+        async with session.post(url, json=notification) as response:
+            return response.status
+
+    async def _deliver_webhook(self, url: str, notification: Dict[str, Any]) -> bool:
+        """Deliver to one webhook, retrying connection errors and 429/5xx responses."""
+        if self._webhook_semaphore is None:
+            self._webhook_semaphore = asyncio.Semaphore(self.webhook_concurrency)
+
+        async with self._webhook_semaphore:
+            for attempt in range(self.webhook_retries + 1):
+                if attempt:
+                    self.stats['webhook_retries'] += 1
+                    await asyncio.sleep(self.webhook_backoff * (2 ** (attempt - 1)))
+                started = time.perf_counter()
+                try:
+                    status = await self._post_webhook(url, notification)
+                except Exception as e:
+                    error = str(e) or type(e).__name__
+                else:
+                    self._webhook_latency.record((time.perf_counter() - started) * 1000)
+                    if status < 400:
+                        self.stats['webhooks_delivered'] += 1
+                        return True
+                    error = f"HTTP {status}"
+                    if status != 429 and status < 500:
+                        break
+
+        self.stats['webhooks_failed'] += 1
+        logger.warning(f"Failed to send webhook notification to {url}: {error}")
+        return False
     
     def add_webhook_url(self, url: str):
         """Add webhook URL for notifications."""
@@ -260,6 +546,29 @@ class DashboardNotifier:
             self.webhook_urls.append(url)
             logger.info(f"Added webhook URL: {url}")
 
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, delivery and coalescing metrics."""
+        channels = list(self.channels.values())
+        depths = [len(channel.queue) for channel in channels]
+        latency = self._webhook_latency.snapshot()
+        latency.pop('buckets')
+        return {
+            **self.stats,
+            'clients': len(channels),
+            'pending': len(self._pending),
+            'queue_depth': {
+                'total': sum(depths),
+                'max': max(depths, default=0),
+                'limit': self.client_queue_size,
+                'policy': self.queue_policy,
+            },
+            'messages_sent': self._closed_totals['sent'] + sum(c.sent for c in channels),
+            'messages_dropped': self._closed_totals['dropped'] + sum(c.dropped for c in channels),
+            'messages_coalesced': self._closed_totals['coalesced'] + sum(c.coalesced for c in channels),
+            'webhooks_in_flight': len(self._webhook_tasks),
+            'webhook_latency': latency,
+        }
+
 
 class PensieveEventIntegrator:
     """Main class for Pensieve real-time event integration."""
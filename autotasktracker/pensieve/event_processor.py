@@ -5,7 +5,7 @@ import time
 import threading
 import logging
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Dict, Any, Callable, List, Optional
 from dataclasses import dataclass
 from queue import Queue, Empty
@@ -17,12 +17,27 @@ from autotasktracker.pensieve.api_client import get_pensieve_client, PensieveAPI
 from autotasktracker.pensieve.health_monitor import get_health_monitor
 from autotasktracker.core.task_extractor import get_task_extractor
 from autotasktracker.core import ActivityCategorizer
+from autotasktracker.core.thumbnails import get_thumbnail_service
+from autotasktracker.core.screenshot_store import resolve_screenshot
+from autotasktracker.core.tracing import get_tracer, trace_span
 from autotasktracker.ai.dual_model_processor import create_dual_model_processor
 from autotasktracker.config import get_config
 
 logger = logging.getLogger(__name__)
 
 
+def _as_utc(value) -> Optional[datetime]:
+    """Parse a Pensieve timestamp; naive values are stored in UTC."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
 @dataclass
 class PensieveEvent:
     """Represents a Pensieve event."""
@@ -240,10 +255,10 @@ class EventProcessor:
         events = []
         
         try:
-            from autotasktracker.core import DatabaseManager
+            from autotasktracker.core import get_default_db_manager
             
-            # Use direct database access for change detection
-            db = DatabaseManager()  # Use PostgreSQL for event detection
+            # Use direct database access for change detection (shared pool, no per-poll setup)
+            db = get_default_db_manager()
             
             with db.get_connection() as conn:
                 from psycopg2.extras import RealDictCursor
@@ -380,24 +395,38 @@ class EventProcessor:
         """Process a single event."""
         logger.debug(f"Processing event: {event.event_type} for entity {event.entity_id}")
         
-        # Call registered handlers
-        handlers = self.event_handlers.get(event.event_type, [])
-        for handler in handlers:
-            try:
-                handler(event)
-            except Exception as e:
-                logger.error(f"Handler failed for event {event.event_type}: {e}")
+        # Capture stage: screenshot taken -> event picked up here
+        captured_at = _as_utc(event.timestamp)
+        if captured_at is not None:
+            pickup_lag = datetime.now(timezone.utc) - captured_at
+            get_tracer().record('capture', pickup_lag.total_seconds() * 1000)
         
-        # Built-in processing based on event type
-        if event.event_type in ['frame_added', 'entity_added']:
-            self._handle_entity_added(event)
-        elif event.event_type in ['frame_processed', 'entity_processed']:
-            self._handle_entity_processed(event)
+        with trace_span('event', entity_id=event.entity_id, event_type=event.event_type):
+            # Call registered handlers
+            handlers = self.event_handlers.get(event.event_type, [])
+            for handler in handlers:
+                try:
+                    handler(event)
+                except Exception as e:
+                    logger.error(f"Handler failed for event {event.event_type}: {e}")
+            
+            # Built-in processing based on event type
+            if event.event_type in ['frame_added', 'entity_added']:
+                self._handle_entity_added(event)
+            elif event.event_type in ['frame_processed', 'entity_processed']:
+                self._handle_entity_processed(event)
     
     def _handle_entity_added(self, event: PensieveEvent):
         """Handle new entity added event."""
         entity_id = event.entity_id
         
+        # Render dashboard thumbnails while the screenshot is fresh in the page cache
+        if self.config.THUMBNAIL_ON_INGEST and event.data.get('filepath'):
+            try:
+                get_thumbnail_service().generate(event.data['filepath'])
+            except Exception as e:
+                logger.debug(f"Thumbnail generation failed for entity {entity_id}: {e}")
+        
         # Check if entity needs processing
         metadata = self.pensieve_client.get_entity_metadata(entity_id)
         
@@ -409,6 +438,11 @@ class EventProcessor:
         """Handle entity processed event (OCR completed)."""
         entity_id = event.entity_id
         
+        # OCR stage: Pensieve scans out of process, so time it from its own stamps
+        captured_at, scanned_at = _as_utc(event.timestamp), _as_utc(event.data.get('last_scan_at'))
+        if captured_at is not None and scanned_at is not None:
+            get_tracer().record('ocr', (scanned_at - captured_at).total_seconds() * 1000)
+        
         # Trigger task extraction now that OCR is available
         self._trigger_task_extraction(entity_id)
     
@@ -447,7 +481,8 @@ class EventProcessor:
                 return
             
             # Extract tasks
-            tasks = self.task_extractor.extract_tasks(window_title, ocr_text)
+            with trace_span('task', entity_id=entity_id):
+                tasks = self.task_extractor.extract_tasks(window_title, ocr_text)
             
             if tasks:
                 # Store extracted tasks using corrected API
@@ -493,7 +528,8 @@ class EventProcessor:
                 logger.warning(f"No screenshot path found for entity {entity_id}")
                 return
             
-            # Check if file exists
+            # Check if file exists (old screenshots may have been transcoded)
+            screenshot_path = resolve_screenshot(screenshot_path)
             if not os.path.exists(screenshot_path):
                 logger.warning(f"Screenshot file not found: {screenshot_path}")
                 return
@@ -517,12 +553,13 @@ class EventProcessor:
             
             # Process with dual-model processor
             logger.debug(f"Starting dual-model processing for entity {entity_id}")
-            result = self.dual_model_processor.process_screenshot(
-                image_path=screenshot_path,
-                window_title=window_title,
-                entity_id=entity_id,  # Keep as integer for database compatibility
-                timestamp=timestamp
-            )
+            with trace_span('vlm', entity_id=entity_id):
+                result = self.dual_model_processor.process_screenshot(
+                    image_path=screenshot_path,
+                    window_title=window_title,
+                    entity_id=entity_id,  # Keep as integer for database compatibility
+                    timestamp=timestamp
+                )
             
             if result.success:
                 logger.info(f"Dual-model processing completed for entity {entity_id}: session={result.session_id}")
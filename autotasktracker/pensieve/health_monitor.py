@@ -1,16 +1,29 @@
-"""Pensieve service health monitoring for AutoTaskTracker."""
+"""Pensieve service health monitoring for AutoTaskTracker.
+
+Health probes run on a background thread at jittered intervals and publish
+their result as an immutable snapshot. ``is_healthy()`` sits on the event
+processing and dashboard hot paths, so it only reads that snapshot; when the
+snapshot is older than the caller accepts it wakes the prober instead of
+probing inline.
+"""
 
 import time
+import random
 import logging
 import threading
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, Callable
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Tuple
 from dataclasses import dataclass, field
+from autotasktracker.core.connection_pool import LatencyHistogram
 from autotasktracker.pensieve.api_client import get_pensieve_client
 from autotasktracker.pensieve.config_reader import get_pensieve_config_reader
 
 logger = logging.getLogger(__name__)
 
+# Histogram bucket upper bounds for probe latencies in milliseconds
+PROBE_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2000, 5000)
+
 
 @dataclass
 class HealthStatus:
@@ -26,23 +39,43 @@ class HealthStatus:
 
 
 class PensieveHealthMonitor:
-    """Monitors Pensieve service health and provides graceful degradation."""
+    """Monitors Pensieve service health and provides graceful degradation.
+
+    The latest result is published as a ``(status, monotonic_time)`` tuple
+    replaced in a single assignment, so readers never take a lock. Results
+    older than ``stale_after`` seconds are reported as unhealthy rather than
+    trusted indefinitely when the prober falls behind.
+    """
     
-    def __init__(self, check_interval: int = 30):
+    def __init__(self, check_interval: int = 30, jitter: float = 0.1,
+                 stale_after: Optional[float] = None, latency_window: int = 120):
         """Initialize health monitor.
         
         Args:
             check_interval: Health check interval in seconds
+            jitter: Fraction of ``check_interval`` by which each wait is shortened
+                at random, so processes started together do not probe in step
+            stale_after: Age in seconds after which a cached result is no longer
+                trusted (defaults to three check intervals)
+            latency_window: Number of recent probes kept for latency percentiles
         """
         self.check_interval = check_interval
-        self._last_status: Optional[HealthStatus] = None
+        self.jitter = jitter
+        self.stale_after = stale_after if stale_after is not None else 3 * check_interval
+        self._snapshot: Optional[Tuple[HealthStatus, float]] = None
         self._monitoring = False
         self._monitor_thread: Optional[threading.Thread] = None
+        self._wake = threading.Event()
         self._callbacks: list[Callable[[HealthStatus], None]] = []
         self._lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=latency_window)
+        self.probe_count = 0
+        self.refresh_requests = 0
         
         # Health check configuration
         self.api_timeout = 5
+        self.port_timeout = 0.5
         self.max_response_time = 2000  # 2 seconds in ms
         
     def add_health_callback(self, callback: Callable[[HealthStatus], None]):
@@ -67,15 +100,22 @@ class PensieveHealthMonitor:
     def check_health(self) -> HealthStatus:
         """Perform comprehensive health check of Pensieve service.
         
+        Runs synchronously; hot paths should use ``is_healthy()`` instead.
+        
         Returns:
             HealthStatus object with current status
         """
+        with self._probe_lock:
+            return self._probe()
+    
+    def _probe(self) -> HealthStatus:
+        """Run one health probe and publish its result."""
         start_time = time.time()
         
         try:
-            # Check service status via config reader
+            # PID file / port probe instead of spawning `memos ps`
             config_reader = get_pensieve_config_reader()
-            service_status = config_reader.get_memos_status()
+            service_status = config_reader.probe_memos_process(timeout=self.port_timeout)
             service_running = service_status.get("running", False)
             
             # Check API responsiveness
@@ -95,7 +135,7 @@ class PensieveHealthMonitor:
             # Check database accessibility
             database_accessible = False
             try:
-                # Try to read Pensieve config which requires database access
+                # Config is cached against the file's mtime, so this rarely reads disk
                 pensieve_config = config_reader.read_pensieve_config()
                 database_accessible = bool(pensieve_config.database_path)
             except Exception as e:
@@ -127,13 +167,7 @@ class PensieveHealthMonitor:
                 warnings=warnings
             )
             
-            # Update cached status
-            with self._lock:
-                self._last_status = status
-            
-            # Call callbacks if status changed
-            self._notify_callbacks(status)
-            
+            self._publish(status, api_response_time)
             return status
             
         except Exception as e:
@@ -148,42 +182,73 @@ class PensieveHealthMonitor:
                 warnings=[f"Health check failed: {e}"]
             )
             
-            with self._lock:
-                self._last_status = error_status
-            
-            self._notify_callbacks(error_status)
+            self._publish(error_status, error_status.response_time_ms)
             return error_status
     
+    def _publish(self, status: HealthStatus, latency_ms: float):
+        """Replace the cached snapshot and notify callbacks."""
+        with self._lock:
+            self._latencies.append(latency_ms)
+            self.probe_count += 1
+        # Single assignment so lock-free readers see old or new, never a mix
+        self._snapshot = (status, time.monotonic())
+        self._notify_callbacks(status)
+    
     def get_last_status(self) -> Optional[HealthStatus]:
         """Get last cached health status.
         
         Returns:
             Last HealthStatus or None if never checked
         """
-        with self._lock:
-            return self._last_status
+        snapshot = self._snapshot
+        return snapshot[0] if snapshot else None
+    
+    def status_age(self) -> Optional[float]:
+        """Seconds since the cached status was probed, or None if never probed."""
+        snapshot = self._snapshot
+        return time.monotonic() - snapshot[1] if snapshot else None
     
-    def is_healthy(self, max_age_seconds: int = 60) -> bool:
-        """Check if service is healthy with optional cache check.
+    def is_healthy(self, max_age_seconds: float = 60) -> bool:
+        """Check if service is healthy from the cached probe result.
+        
+        Never probes inline. When the cached result is missing or older than
+        ``max_age_seconds`` a background refresh is requested; until it lands
+        the cached value is served, unless it is older than ``stale_after``.
         
         Args:
-            max_age_seconds: Maximum age of cached status to accept
+            max_age_seconds: Age of cached status after which a refresh is requested
             
         Returns:
-            True if healthy, False otherwise
+            True if healthy, False otherwise (including when status is unknown)
         """
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.request_refresh()
+            return False
+        
+        status, checked_at = snapshot
+        age = time.monotonic() - checked_at
+        if age > max_age_seconds:
+            self.request_refresh()
+            if age > self.stale_after:
+                return False
+        return status.is_healthy
+    
+    def request_refresh(self):
+        """Ask the background prober to run now (starts it if needed)."""
+        self.refresh_requests += 1
+        if not self._monitoring:
+            self.start_monitoring()
+        self._wake.set()
+    
+    def get_latency_stats(self) -> Dict[str, Any]:
+        """Latency percentiles over the most recent probes."""
         with self._lock:
-            if self._last_status is None:
-                # No cached status, perform fresh check
-                return self.check_health().is_healthy
-            
-            # Check if cached status is too old
-            age = (datetime.now() - self._last_status.last_check).total_seconds()
-            if age > max_age_seconds:
-                # Cached status too old, refresh
-                return self.check_health().is_healthy
-            
-            return self._last_status.is_healthy
+            latencies = list(self._latencies)
+        histogram = LatencyHistogram(PROBE_BUCKETS_MS)
+        for latency in latencies:
+            histogram.record(latency)
+        return histogram.snapshot()
     
     def start_monitoring(self):
         """Start background health monitoring."""
@@ -192,6 +257,7 @@ class PensieveHealthMonitor:
             return
         
         self._monitoring = True
+        self._wake.clear()
         self._monitor_thread = threading.Thread(
             target=self._monitor_loop,
             daemon=True,
@@ -206,11 +272,16 @@ class PensieveHealthMonitor:
             return
         
         self._monitoring = False
+        self._wake.set()
         if self._monitor_thread:
             self._monitor_thread.join(timeout=5)
         
         logger.info("Stopped Pensieve health monitoring")
     
+    def _next_interval(self) -> float:
+        """Wait before the next probe, shortened by up to ``jitter``."""
+        return self.check_interval * (1 - random.uniform(0, self.jitter))
+    
     def _monitor_loop(self):
         """Background monitoring loop."""
         while self._monitoring:
@@ -219,11 +290,9 @@ class PensieveHealthMonitor:
             except Exception as e:
                 logger.error(f"Health monitoring error: {e}")
             
-            # Sleep in small increments to allow quick shutdown
-            for _ in range(self.check_interval):
-                if not self._monitoring:
-                    break
-                time.sleep(1)
+            # Woken early by request_refresh() or stop_monitoring()
+            self._wake.wait(self._next_interval())
+            self._wake.clear()
     
     def _notify_callbacks(self, status: HealthStatus):
         """Notify callbacks of health status change."""
@@ -244,6 +313,7 @@ class PensieveHealthMonitor:
         """
         status = self.get_last_status()
         if not status:
+            self.request_refresh()
             return {
                 "status": "unknown",
                 "message": "No health check performed yet",
@@ -260,7 +330,9 @@ class PensieveHealthMonitor:
             "metrics": {
                 "response_time_ms": status.response_time_ms,
                 "last_check": status.last_check.isoformat(),
-                "warnings_count": len(status.warnings)
+                "age_seconds": self.status_age(),
+                "warnings_count": len(status.warnings),
+                "probe_latency": self.get_latency_stats()
             },
             "warnings": status.warnings,
             "error": status.error_message
@@ -272,8 +344,8 @@ class HealthAwareMixin:
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self._health_monitor = PensieveHealthMonitor()
-        self._health_monitor.start_monitoring()
+        # One shared prober per process instead of a thread per dashboard
+        self._health_monitor = get_health_monitor()
         self._degraded_mode = False
     
     def _check_pensieve_health(self) -> bool:
@@ -310,14 +382,18 @@ class HealthAwareMixin:
 
 # Global health monitor instance
 _global_monitor: Optional[PensieveHealthMonitor] = None
+_global_monitor_lock = threading.Lock()
 
 
 def get_health_monitor() -> PensieveHealthMonitor:
     """Get global health monitor instance."""
     global _global_monitor
     if _global_monitor is None:
-        _global_monitor = PensieveHealthMonitor()
-        _global_monitor.start_monitoring()
+        with _global_monitor_lock:
+            if _global_monitor is None:
+                monitor = PensieveHealthMonitor()
+                monitor.start_monitoring()
+                _global_monitor = monitor
     return _global_monitor
 
 
@@ -0,0 +1,595 @@
+"""
+Hybrid retrieval engine for AutoTaskTracker search.
+
+Independent retrievers each rank entities for a query:
+
+    fulltext:  the engine-native text index (BM25 / ts_rank_cd)
+    vector:    cosine similarity against stored task embeddings
+    category:  screenshots in an activity category the query names
+    recency:   a time prior favouring recent screenshots
+
+Retrievers run in parallel with the date and category filters pushed into
+each one's own query, so no retriever over-fetches rows that are filtered
+out afterwards. Their rankings are fused with reciprocal rank fusion
+(score = sum of weight / (k + rank)), which needs no score calibration
+between BM25, cosine and time priors. Only the final top-k entities are
+hydrated, in one batched query.
+
+Prior retrievers (recency) only re-rank candidates found by the others;
+they never add screenshots that match nothing in the query.
+"""
+
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from autotasktracker.core.connection_pool import LatencyHistogram
+from autotasktracker.core.text_index import TextIndex, ocr_plain_text
+from autotasktracker.core.tracing import log_linear_bounds, trace_span
+from autotasktracker.pensieve.advanced_search import SearchQuery, SearchResult
+
+logger = logging.getLogger(__name__)
+
+
+# Metadata fetched for each returned screenshot
+HYDRATED_KEYS = ('active_window', 'ocr_result', 'tasks', 'category')
+
+SEARCH_BUCKETS_MS = log_linear_bounds(0.1, 60_000, steps_per_decade=10)
+
+
+@dataclass
+class SearchFilters:
+    """Filters every retriever applies in its own query."""
+    date_range: Optional[Tuple[datetime, datetime]] = None
+    category: Optional[str] = None
+    limit: int = 100
+
+
+@dataclass
+class RetrievedHit:
+    """One entity in a retriever's ranking."""
+    entity_id: int
+    score: float
+    highlights: List[str] = field(default_factory=list)
+
+
+def parse_tasks(tasks_value: Optional[str]) -> List[str]:
+    """Parse a stored tasks value (JSON list, ``{"tasks": [...]}`` or plain text)."""
+    if not tasks_value:
+        return []
+    try:
+        tasks_data = json.loads(tasks_value)
+    except (json.JSONDecodeError, TypeError):
+        return [tasks_value]
+    if isinstance(tasks_data, dict):
+        tasks_data = tasks_data.get("tasks", [])
+    if isinstance(tasks_data, list):
+        return [str(task) for task in tasks_data]
+    return [str(tasks_data)]
+
+
+def _to_datetime(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    return datetime.fromisoformat(str(value)).replace(tzinfo=None)
+
+
+class _SQLRetriever:
+    """Connection helpers shared by the database-backed retrievers."""
+
+    db = None
+
+    @property
+    def is_sqlite(self) -> bool:
+        get_type = getattr(self.db, 'get_database_type', None)
+        return bool(get_type) and get_type() == 'sqlite'
+
+    def _query(self, sql: str, params: Sequence = ()) -> List[tuple]:
+        if self.is_sqlite:
+            sql = sql.replace('%s', '?')
+        with self.db.get_connection(readonly=True) as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql, tuple(params))
+                return [tuple(row) for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+
+    def _filter_sql(self, filters: SearchFilters, entity: str = 'e') -> Tuple[str, List[str], list]:
+        """WHERE/JOIN fragments for the pushed-down filters."""
+        joins, clauses, params = '', [], []
+        if filters.category:
+            joins = (f" JOIN metadata_entries fc ON fc.entity_id = {entity}.id"
+                     f" AND fc.key = 'category' AND fc.value = %s")
+            params.append(filters.category)
+        if filters.date_range:
+            clauses.append(f"{entity}.created_at BETWEEN %s AND %s")
+            params.extend(self._timestamp(value) for value in filters.date_range)
+        return joins, clauses, params
+
+    def _timestamp(self, value: datetime):
+        return value.isoformat(sep=' ') if self.is_sqlite else value
+
+
+class Retriever(ABC):
+    """One ranked source of candidate screenshots."""
+
+    name = 'retriever'
+    weight = 1.0
+    # Priors re-rank candidates from other retrievers instead of adding their own
+    prior = False
+
+    @abstractmethod
+    def retrieve(self, text: str, filters: SearchFilters) -> List[RetrievedHit]:
+        """Rank entities for ``text`` within ``filters``, best first."""
+
+
+class FullTextRetriever(Retriever):
+    """Ranks screenshots by the engine-native text index."""
+
+    name = 'fulltext'
+
+    def __init__(self, text_index: TextIndex):
+        self.text_index = text_index
+
+    def retrieve(self, text: str, filters: SearchFilters) -> List[RetrievedHit]:
+        matches = self.text_index.search(
+            text, limit=filters.limit, date_range=filters.date_range, category=filters.category
+        )
+        return [RetrievedHit(match.entity_id, match.score, match.highlights) for match in matches]
+
+
+class VectorRetriever(Retriever, _SQLRetriever):
+    """Ranks screenshots by cosine similarity of stored task embeddings.
+
+    Embeddings are held in memory as one normalized float32 matrix, so a
+    search is a single matrix-vector product over the rows left by the
+    date and category masks. The matrix follows ``metadata_entries.id``:
+    each refresh adds rows stored above the high watermark (a re-embedding
+    replaces the entity's earlier vector) and pages one bounded block of
+    history below the low watermark, newest first, so no single query
+    loads all history. Values updated in place are picked up when the
+    matrix is rebuilt every ``resync_seconds``. The query is embedded with
+    ``embed_query`` or, by default, the same sentence-transformers model
+    that writes ``task_embedding`` values; without it the retriever
+    returns nothing.
+    """
+
+    name = 'vector'
+
+    def __init__(self, db_manager, embed_query: Optional[Callable[[str], Sequence[float]]] = None,
+                 embedding_key: str = 'task_embedding', model_name: str = 'all-MiniLM-L6-v2',
+                 min_similarity: float = 0.2, page_size: int = 5000, resync_seconds: float = 3600):
+        self.db = db_manager
+        self.embed_query = embed_query
+        self.embedding_key = embedding_key
+        self.model_name = model_name
+        self.min_similarity = min_similarity
+        self.page_size = page_size
+        self.resync_seconds = resync_seconds
+        self._reset()
+        self._model = None
+        self._model_unavailable = False
+        self._lock = threading.Lock()
+
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        if self.embed_query is None:
+            if self._model_unavailable:
+                return None
+            if self._model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name)
+                except Exception as e:
+                    logger.info(f"Vector retrieval disabled, no embedding model: {e}")
+                    self._model_unavailable = True
+                    return None
+            self.embed_query = lambda query: self._model.encode([query])[0]
+        vector = np.asarray(self.embed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    @staticmethod
+    def _parse(value: str) -> Optional[np.ndarray]:
+        try:
+            if value.startswith('['):
+                return np.asarray(json.loads(value), dtype=np.float32)
+            return np.asarray(value.split(), dtype=np.float32)
+        except (ValueError, TypeError, AttributeError):
+            return None
+
+    def _reset(self):
+        self._ids = np.empty(0, dtype=np.int64)
+        self._row_ids = np.empty(0, dtype=np.int64)
+        self._created = np.empty(0, dtype='datetime64[us]')
+        self._categories = np.empty(0, dtype=object)
+        self._matrix: Optional[np.ndarray] = None
+        self._positions: Dict[int, int] = {}
+        # metadata_entries ids: everything above _high_id is new, history
+        # below _low_id is not loaded yet (None before the first refresh)
+        self._high_id: Optional[int] = None
+        self._low_id = 0
+        self._synced_at = time.monotonic()
+
+    def _fetch(self, condition: str, order: str, params: Sequence) -> List[tuple]:
+        return self._query(f"""
+            SELECT m.id, m.entity_id, e.created_at, m.value,
+                   (SELECT c.value FROM metadata_entries c
+                    WHERE c.entity_id = m.entity_id AND c.key = 'category'
+                    ORDER BY c.id DESC LIMIT 1)
+            FROM metadata_entries m
+            JOIN entities e ON e.id = m.entity_id
+            WHERE m.key = %s{condition}
+            ORDER BY m.id {order}
+            LIMIT %s
+        """, (self.embedding_key, *params, self.page_size))
+
+    def refresh(self) -> int:
+        """Load embeddings stored since the last refresh and one page of history.
+
+        Returns:
+            Number of embeddings added or replaced
+        """
+        with self._lock:
+            if self._high_id is not None and time.monotonic() - self._synced_at > self.resync_seconds:
+                self._reset()
+            if self._high_id is None:
+                rows = self._fetch('', 'DESC', ())
+                self._high_id = rows[0][0] if rows else 0
+                self._low_id = rows[-1][0] if len(rows) >= self.page_size else 0
+            else:
+                rows = self._fetch(' AND m.id > %s', 'ASC', (self._high_id,))
+                if rows:
+                    self._high_id = rows[-1][0]
+                if self._low_id:
+                    history = self._fetch(' AND m.id < %s', 'DESC', (self._low_id,))
+                    self._low_id = history[-1][0] if len(history) >= self.page_size else 0
+                    rows = rows + history
+            return self._add(sorted(rows))
+
+    def _add(self, rows: List[tuple]) -> int:
+        """Merge ``(row id, entity id, created, value, category)`` rows, later row ids winning."""
+        dimension = self._matrix.shape[1] if self._matrix is not None and len(self._matrix) else None
+        latest: Dict[int, Tuple[int, Any, np.ndarray, Any]] = {}
+        for row_id, entity_id, created_at, value, category in rows:
+            vector = self._parse(value)
+            if vector is None or (dimension is not None and vector.shape != (dimension,)):
+                logger.debug(f"Skipping unusable embedding for entity {entity_id}")
+                continue
+            dimension = dimension or vector.shape[0]
+            norm = np.linalg.norm(vector)
+            if not norm:
+                continue
+            latest[entity_id] = (row_id, created_at, vector / norm, category)
+
+        added, replaced = {}, []
+        for entity_id, (row_id, created_at, vector, category) in latest.items():
+            position = self._positions.get(entity_id)
+            if position is None:
+                added[entity_id] = (row_id, created_at, vector, category)
+            elif row_id > self._row_ids[position]:
+                replaced.append((position, row_id, vector, category))
+        if replaced:
+            # Re-embedded since loaded; copy so searches in flight keep a consistent matrix
+            self._matrix, self._row_ids, self._categories = (
+                self._matrix.copy(), self._row_ids.copy(), self._categories.copy())
+            for position, row_id, vector, category in replaced:
+                self._matrix[position] = vector
+                self._row_ids[position] = row_id
+                self._categories[position] = category
+        if added:
+            offset = len(self._ids)
+            block = np.vstack([vector for _, _, vector, _ in added.values()])
+            self._matrix = block if self._matrix is None or not len(self._matrix) else np.vstack([self._matrix, block])
+            self._ids = np.concatenate([self._ids, np.asarray(list(added), dtype=np.int64)])
+            self._row_ids = np.concatenate([self._row_ids, np.asarray([row[0] for row in added.values()],
+                                                                      dtype=np.int64)])
+            self._created = np.concatenate([self._created, np.asarray(
+                [_to_datetime(row[1]) for row in added.values()], dtype='datetime64[us]')])
+            self._categories = np.concatenate([self._categories, np.asarray(
+                [row[3] for row in added.values()], dtype=object)])
+            self._positions.update((entity_id, offset + i) for i, entity_id in enumerate(added))
+        return len(added) + len(replaced)
+
+    def retrieve(self, text: str, filters: SearchFilters) -> List[RetrievedHit]:
+        query_vector = self._embed(text)
+        if query_vector is None:
+            return []
+        self.refresh()
+        with self._lock:
+            matrix, ids, created, categories = self._matrix, self._ids, self._created, self._categories
+        if matrix is None or not len(matrix) or matrix.shape[1] != query_vector.shape[0]:
+            return []
+
+        candidates = np.ones(len(ids), dtype=bool)
+        if filters.date_range:
+            start, end = (np.datetime64(_to_datetime(value), 'us') for value in filters.date_range)
+            candidates &= (created >= start) & (created <= end)
+        if filters.category:
+            candidates &= categories == filters.category
+        rows = np.flatnonzero(candidates)
+        if not len(rows):
+            return []
+
+        similarities = matrix[rows] @ query_vector
+        top = min(filters.limit, len(rows))
+        best = np.argpartition(-similarities, top - 1)[:top]
+        best = best[np.argsort(-similarities[best])]
+        return [
+            RetrievedHit(int(ids[rows[i]]), float(similarities[i]))
+            for i in best if similarities[i] >= self.min_similarity
+        ]
+
+
+class CategoryRetriever(Retriever, _SQLRetriever):
+    """Ranks recent screenshots in activity categories the query names.
+
+    "meetings yesterday" or "coding" rarely appear in a window title, but
+    they name a category the categorizer already assigned.
+    """
+
+    name = 'category'
+
+    def __init__(self, db_manager, categories: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            db_manager: Database manager
+            categories: Query word -> stored category label; defaults to the
+                ``ActivityCategorizer`` category keys and label words
+        """
+        self.db = db_manager
+        if categories is None:
+            from autotasktracker.core.categorizer import ActivityCategorizer
+            categories = {}
+            for key, (label, _) in ActivityCategorizer.CATEGORIES.items():
+                words = key.split('_') + ''.join(c if c.isalnum() else ' ' for c in label).split()
+                for word in words:
+                    if len(word) > 2:
+                        categories.setdefault(word.lower(), label)
+        self.categories = categories
+
+    def named_categories(self, text: str) -> List[str]:
+        words = ''.join(c if c.isalnum() else ' ' for c in text.lower()).split()
+        return sorted({self.categories[word] for word in words if word in self.categories})
+
+    def retrieve(self, text: str, filters: SearchFilters) -> List[RetrievedHit]:
+        labels = self.named_categories(text)
+        if filters.category:
+            labels = [label for label in labels if label == filters.category]
+        if not labels:
+            return []
+        joins, clauses, params = self._filter_sql(SearchFilters(date_range=filters.date_range))
+        where = ''.join(f" AND {clause}" for clause in clauses)
+        rows = self._query(f"""
+            SELECT e.id FROM entities e
+            JOIN metadata_entries c ON c.entity_id = e.id AND c.key = 'category'
+                AND c.value IN ({', '.join(['%s'] * len(labels))}){joins}
+            WHERE 1 = 1{where}
+            ORDER BY e.created_at DESC
+            LIMIT %s
+        """, [*labels, *params, filters.limit])
+        return [RetrievedHit(row[0], 1.0) for row in rows]
+
+
+class RecencyRetriever(Retriever, _SQLRetriever):
+    """Time prior: the most recent screenshots within the filters."""
+
+    name = 'recency'
+    weight = 0.5
+    prior = True
+
+    def __init__(self, db_manager, half_life_hours: float = 24.0):
+        self.db = db_manager
+        self.half_life_hours = half_life_hours
+
+    def retrieve(self, text: str, filters: SearchFilters) -> List[RetrievedHit]:
+        joins, clauses, params = self._filter_sql(filters)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self._query(f"""
+            SELECT e.id, e.created_at FROM entities e{joins}{where}
+            ORDER BY e.created_at DESC
+            LIMIT %s
+        """, [*params, filters.limit])
+        now = datetime.now()
+        return [
+            RetrievedHit(entity_id, 0.5 ** (max((now - _to_datetime(created_at)).total_seconds(), 0)
+                                            / 3600 / self.half_life_hours))
+            for entity_id, created_at in rows
+        ]
+
+
+class HybridSearchEngine(_SQLRetriever):
+    """Parallel retrieval, reciprocal rank fusion and batched hydration."""
+
+    def __init__(self, db_manager=None, retrievers: Optional[List[Retriever]] = None,
+                 rrf_k: int = 60, candidates_per_retriever: int = 100,
+                 retriever_timeout: float = 5.0, text_index: Optional[TextIndex] = None):
+        """
+        Args:
+            db_manager: Database manager; defaults to a new DatabaseManager
+            retrievers: Retrievers to fuse; defaults to full-text, vector,
+                category and recency
+            rrf_k: Rank damping constant; larger values flatten the
+                difference between a retriever's top and lower ranks
+            candidates_per_retriever: Depth of each retriever's ranking
+            retriever_timeout: Seconds to wait for retrievers before fusing
+                whatever has finished
+            text_index: Text index for the default full-text retriever
+        """
+        if db_manager is None:
+            from autotasktracker.core.database import DatabaseManager
+            db_manager = DatabaseManager(use_pensieve_api=False)
+        self.db = db_manager
+        if retrievers is None:
+            retrievers = [
+                FullTextRetriever(text_index or TextIndex(db_manager)),
+                VectorRetriever(db_manager),
+                CategoryRetriever(db_manager),
+                RecencyRetriever(db_manager),
+            ]
+        self.retrievers = list(retrievers)
+        self.rrf_k = rrf_k
+        self.candidates_per_retriever = candidates_per_retriever
+        self.retriever_timeout = retriever_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max(len(self.retrievers), 1),
+                                            thread_name_prefix='search-retriever')
+        self._latency = {r.name: LatencyHistogram(SEARCH_BUCKETS_MS) for r in self.retrievers}
+        self._outcomes = defaultdict(lambda: defaultdict(int))
+        self._stats_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Retrieval and fusion
+    # ------------------------------------------------------------------
+
+    def _run(self, retriever: Retriever, text: str, filters: SearchFilters) -> List[RetrievedHit]:
+        start = time.perf_counter()
+        outcome = 'ok'
+        try:
+            return retriever.retrieve(text, filters)
+        except Exception as e:
+            outcome = 'error'
+            logger.warning(f"{retriever.name} retriever failed: {e}")
+            return []
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._stats_lock:
+                self._latency[retriever.name].record(elapsed_ms)
+                self._outcomes[retriever.name][outcome] += 1
+
+    def retrieve(self, text: str, filters: SearchFilters,
+                 retrievers: Optional[List[Retriever]] = None) -> Dict[str, List[RetrievedHit]]:
+        """Run retrievers in parallel and collect their rankings by name.
+
+        Retrievers still running after ``retriever_timeout`` are left out.
+        """
+        retrievers = self.retrievers if retrievers is None else retrievers
+        futures = {self._executor.submit(self._run, r, text, filters): r for r in retrievers}
+        done, pending = wait(futures, timeout=self.retriever_timeout)
+        for future in pending:
+            name = futures[future].name
+            logger.warning(f"{name} retriever timed out after {self.retriever_timeout}s")
+            with self._stats_lock:
+                self._outcomes[name]['timeout'] += 1
+        return {futures[future].name: future.result() for future in done}
+
+    def fuse(self, rankings: Dict[str, List[RetrievedHit]]) -> List[Tuple[int, float, List[str]]]:
+        """Reciprocal rank fusion of retriever rankings.
+
+        Returns:
+            (entity_id, fused score, contributing retriever names), best first
+        """
+        by_name = {r.name: r for r in self.retrievers}
+        scores: Dict[int, float] = defaultdict(float)
+        sources: Dict[int, List[str]] = defaultdict(list)
+        ordered = sorted(rankings, key=lambda name: getattr(by_name.get(name), 'prior', False))
+        for name in ordered:
+            retriever = by_name.get(name)
+            weight = retriever.weight if retriever else 1.0
+            prior = retriever.prior if retriever else False
+            for rank, hit in enumerate(rankings[name], start=1):
+                if prior and hit.entity_id not in scores:
+                    continue
+                scores[hit.entity_id] += weight / (self.rrf_k + rank)
+                sources[hit.entity_id].append(name)
+        fused = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return [(entity_id, score, sources[entity_id]) for entity_id, score in fused]
+
+    # ------------------------------------------------------------------
+    # Hydration
+    # ------------------------------------------------------------------
+
+    def hydrate(self, entity_ids: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+        """Fetch filepath, capture time and text metadata for entities in one query."""
+        if not entity_ids:
+            return {}
+        rows = self._query(f"""
+            SELECT e.id, e.filepath, e.created_at, m.key, m.value
+            FROM entities e
+            LEFT JOIN metadata_entries m ON m.entity_id = e.id
+                AND m.key IN ({', '.join(['%s'] * len(HYDRATED_KEYS))})
+            WHERE e.id IN ({', '.join(['%s'] * len(entity_ids))})
+            ORDER BY e.id, m.id
+        """, [*HYDRATED_KEYS, *entity_ids])
+        entities: Dict[int, Dict[str, Any]] = {}
+        for entity_id, filepath, created_at, key, value in rows:
+            entity = entities.setdefault(entity_id, {'filepath': filepath, 'created_at': created_at})
+            if key is not None:
+                entity[key] = value  # Later rows are newer
+        return entities
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def search(self, query: SearchQuery) -> List[SearchResult]:
+        """Search screenshots for ``query``, best first.
+
+        ``relevance_score`` is the fused score relative to the best result,
+        and ``search_method`` lists the retrievers that found each result.
+        """
+        if not query.text or not query.text.strip():
+            return []
+        filters = SearchFilters(
+            date_range=query.date_range,
+            category=query.category_filter,
+            limit=max(self.candidates_per_retriever, query.max_results),
+        )
+        retrievers = [
+            r for r in self.retrievers
+            if (query.use_semantic or r.name != 'vector') and (query.use_keyword or r.name != 'fulltext')
+        ]
+
+        with trace_span('search', retrievers=len(retrievers)) as span:
+            rankings = self.retrieve(query.text, filters, retrievers)
+            fused = self.fuse(rankings)
+            if not fused:
+                return []
+            best_score = fused[0][1]
+            top = [item for item in fused if item[1] / best_score >= query.min_relevance][:query.max_results]
+            entities = self.hydrate([entity_id for entity_id, _, _ in top])
+            span.set_attribute('results', len(top))
+
+        highlights = {
+            hit.entity_id: hit.highlights for hits in rankings.values() for hit in hits if hit.highlights
+        }
+        results = []
+        for entity_id, score, sources in top:
+            entity = entities.get(entity_id)
+            if entity is None:
+                continue  # Deleted since it was retrieved
+            results.append(SearchResult(
+                entity_id=entity_id,
+                filepath=entity['filepath'] or '',
+                timestamp=_to_datetime(entity['created_at']),
+                window_title=entity.get('active_window') or '',
+                ocr_text=ocr_plain_text(entity.get('ocr_result')) or None,
+                extracted_tasks=parse_tasks(entity.get('tasks')),
+                activity_category=entity.get('category'),
+                relevance_score=score / best_score,
+                search_method='+'.join(sources),
+                highlights=highlights.get(entity_id, [])[:3],
+            ))
+        return results
+
+    def retriever_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Latency percentiles and ok/error/timeout counts per retriever."""
+        with self._stats_lock:
+            return {
+                name: {
+                    **{key: value for key, value in histogram.snapshot().items() if key != 'buckets'},
+                    **dict(self._outcomes[name]),
+                }
+                for name, histogram in self._latency.items()
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -1,22 +1,36 @@
 """
 Performance monitoring system for Pensieve integration.
 Tracks cache hit rates, search response times, and system metrics.
+
+Recording sits on batch-processing hot paths, so each thread writes into
+its own shard (counters, NumPy ring buffers of recent samples and
+fixed-bucket histograms) without taking a shared lock. Readers sum the
+shards; shards of finished threads are folded into a retired aggregate
+when metrics are read. Percentiles come from log-linear histograms in
+O(buckets) instead of sorting every sample.
 """
 
+import bisect
+import math
 import time
 import logging
 import threading
 from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta
-from collections import deque, defaultdict
-import statistics
 import json
 from pathlib import Path
 
+import numpy as np
+
+from autotasktracker.core.tracing import log_linear_bounds
+
 logger = logging.getLogger(__name__)
 
 
+# ~6% relative bucket width from 1µs to one hour (values of any unit)
+METRIC_BUCKETS = log_linear_bounds(0.001, 3_600_000.0, steps_per_decade=40)
+
+
 @dataclass
 class MetricEntry:
     """Represents a single metric measurement."""
@@ -42,62 +56,147 @@ class PerformanceMetrics:
     last_updated: float = field(default_factory=time.time)
 
 
+class _Series:
+    """Samples and histogram of one metric, written by a single thread.
+
+    Ring buffers start small and double up to ``max_samples`` before they
+    begin to wrap, so rarely used metrics stay cheap.
+    """
+
+    __slots__ = ('times', 'values', 'written', 'max_samples',
+                 'counts', 'total', 'sum', 'min', 'max')
+
+    def __init__(self, bucket_count: int, max_samples: int, initial_size: int = 256):
+        size = min(initial_size, max_samples)
+        self.times = np.zeros(size)
+        self.values = np.zeros(size)
+        self.written = 0
+        self.max_samples = max_samples
+        self.counts = [0] * bucket_count
+        self.total = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, timestamp: float, value: float, bucket: int):
+        self.store(timestamp, value)
+        self.counts[bucket] += 1
+        self.total += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def store(self, timestamp: float, value: float):
+        capacity = len(self.times)
+        if self.written == capacity and capacity < self.max_samples:
+            # Not wrapped yet, so the buffer is already in time order
+            grow = min(capacity, self.max_samples - capacity)
+            self.times = np.concatenate((self.times, np.zeros(grow)))
+            self.values = np.concatenate((self.values, np.zeros(grow)))
+            capacity += grow
+        position = self.written % capacity
+        self.times[position] = timestamp
+        self.values[position] = value
+        self.written += 1
+
+    def samples(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Copies of the buffered (timestamps, values), oldest first."""
+        written, times, values = self.written, self.times, self.values
+        capacity = len(times)
+        if written <= capacity:
+            return times[:written].copy(), values[:written].copy()
+        split = written % capacity
+        return np.concatenate((times[split:], times[:split])), np.concatenate((values[split:], values[:split]))
+
+    def absorb(self, other: '_Series'):
+        """Fold a finished thread's series into this one."""
+        for timestamp, value in zip(*other.samples()):
+            self.store(timestamp, value)
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+
+class _Shard:
+    """Metrics written by one thread."""
+
+    __slots__ = ('thread', 'generation', 'counters', 'series', 'timers')
+
+    def __init__(self, thread: Optional[threading.Thread], generation: int):
+        self.thread = thread
+        self.generation = generation
+        self.counters: Dict[str, int] = {}
+        self.series: Dict[str, _Series] = {}
+        self.timers: Dict[str, float] = {}
+
+
 class PerformanceMonitor:
     """Monitors and tracks performance metrics for Pensieve integration."""
     
-    def __init__(self, retention_hours: int = 24, max_samples: int = 10000):
+    def __init__(self, retention_hours: int = 24, max_samples: int = 10000,
+                 bucket_bounds: Tuple[float, ...] = METRIC_BUCKETS):
         """Initialize performance monitor.
         
         Args:
             retention_hours: How long to keep metrics data
-            max_samples: Maximum number of samples to keep per metric
+            max_samples: Maximum number of samples to keep per metric and thread
+            bucket_bounds: Histogram bucket upper bounds used for percentiles
         """
         self.retention_hours = retention_hours
         self.max_samples = max_samples
+        self.bounds = tuple(bucket_bounds)
         
-        # Metric storage
-        self.metrics: Dict[str, deque] = defaultdict(lambda: deque(maxlen=max_samples))
-        self.counters: Dict[str, int] = defaultdict(int)
-        self.timers: Dict[str, float] = {}
-        
-        # Threading protection
-        self._lock = threading.RLock()
-        
-        # Background cleanup
-        self._cleanup_interval = 3600  # 1 hour
-        self._last_cleanup = time.time()
+        # Per-thread shards; the lock only guards shard registration and merging
+        self._local = threading.local()
+        self._generation = 0
+        self._shards: List[_Shard] = []
+        self._retired = _Shard(None, 0)
+        self._lock = threading.Lock()
         
         logger.info(f"Performance monitor initialized (retention: {retention_hours}h, max_samples: {max_samples})")
     
+    # ------------------------------------------------------------------
+    # Recording (hot path, no shared lock)
+    # ------------------------------------------------------------------
+    
+    def _shard(self) -> _Shard:
+        """This thread's shard, registered on first use."""
+        shard = getattr(self._local, 'shard', None)
+        if shard is None or shard.generation != self._generation:
+            with self._lock:
+                shard = _Shard(threading.current_thread(), self._generation)
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+    
     def record_metric(self, metric_name: str, value: float, metadata: Optional[Dict[str, Any]] = None):
         """Record a performance metric.
         
         Args:
             metric_name: Name of the metric
             value: Metric value
-            metadata: Optional metadata about the measurement
+            metadata: Optional metadata about the measurement (not retained)
         """
-        with self._lock:
-            entry = MetricEntry(
-                timestamp=time.time(),
-                value=value,
-                metadata=metadata or {}
-            )
-            
-            self.metrics[metric_name].append(entry)
-            logger.debug(f"Recorded metric {metric_name}: {value}")
-            
-            # Cleanup old metrics if needed
-            self._cleanup_old_metrics_if_needed()
+        series_by_name = self._shard().series
+        series = series_by_name.get(metric_name)
+        if series is None:
+            series = series_by_name[metric_name] = _Series(len(self.bounds) + 1, self.max_samples)
+        series.add(time.time(), value, bisect.bisect_left(self.bounds, value))
     
     def start_timer(self, timer_name: str):
         """Start a named timer for measuring duration.
         
+        Timers are kept per thread, so threads timing the same name do not
+        overwrite each other.
+        
         Args:
             timer_name: Name of the timer
         """
-        with self._lock:
-            self.timers[timer_name] = time.time()
+        self._shard().timers[timer_name] = time.time()
     
     def end_timer(self, timer_name: str, metadata: Optional[Dict[str, Any]] = None) -> float:
         """End a named timer and record the duration.
@@ -109,16 +208,20 @@ class PerformanceMonitor:
         Returns:
             Duration in milliseconds
         """
-        with self._lock:
-            if timer_name not in self.timers:
-                logger.warning(f"Timer {timer_name} was not started")
-                return 0.0
-            
-            start_time = self.timers.pop(timer_name)
-            duration_ms = (time.time() - start_time) * 1000
-            
-            self.record_metric(f"{timer_name}_duration_ms", duration_ms, metadata)
-            return duration_ms
+        start_time = self._shard().timers.pop(timer_name, None)
+        if start_time is None:
+            # Started on another thread
+            for shard in list(self._shards):
+                start_time = shard.timers.pop(timer_name, None)
+                if start_time is not None:
+                    break
+        if start_time is None:
+            logger.warning(f"Timer {timer_name} was not started")
+            return 0.0
+        
+        duration_ms = (time.time() - start_time) * 1000
+        self.record_metric(f"{timer_name}_duration_ms", duration_ms, metadata)
+        return duration_ms
     
     def increment_counter(self, counter_name: str, amount: int = 1):
         """Increment a counter metric.
@@ -127,9 +230,8 @@ class PerformanceMonitor:
             counter_name: Name of the counter
             amount: Amount to increment by
         """
-        with self._lock:
-            self.counters[counter_name] += amount
-            logger.debug(f"Incremented counter {counter_name} by {amount}")
+        counters = self._shard().counters
+        counters[counter_name] = counters.get(counter_name, 0) + amount
     
     def record_cache_hit(self, cache_type: str = "default"):
         """Record a cache hit."""
@@ -191,6 +293,56 @@ class PerformanceMonitor:
             "context": context
         })
     
+    # ------------------------------------------------------------------
+    # Reading (merges shards)
+    # ------------------------------------------------------------------
+    
+    def _all_shards(self) -> List[_Shard]:
+        """Live shards plus the retired aggregate, after folding dead threads."""
+        with self._lock:
+            live = []
+            for shard in self._shards:
+                if shard.thread is not None and shard.thread.is_alive():
+                    live.append(shard)
+                    continue
+                # The owner has exited, so nothing writes this shard any more
+                retired = self._retired
+                for name, amount in shard.counters.items():
+                    retired.counters[name] = retired.counters.get(name, 0) + amount
+                for name, series in shard.series.items():
+                    target = retired.series.get(name)
+                    if target is None:
+                        target = retired.series[name] = _Series(len(self.bounds) + 1, self.max_samples)
+                    target.absorb(series)
+            self._shards = live
+            return live + [self._retired]
+    
+    @property
+    def counters(self) -> Dict[str, int]:
+        """Snapshot of all counters summed across threads."""
+        totals: Dict[str, int] = {}
+        for shard in self._all_shards():
+            for name, amount in list(shard.counters.items()):
+                totals[name] = totals.get(name, 0) + amount
+        return totals
+    
+    def _series(self, metric_name: str) -> List[_Series]:
+        return [shard.series[metric_name] for shard in self._all_shards() if metric_name in shard.series]
+    
+    def _percentile(self, counts: List[int], total: int, pct: float, low: float, high: float) -> float:
+        """Bucket upper bound holding the ``pct`` percentile, clamped to the observed range."""
+        rank = max(1, math.ceil(total * pct / 100.0))
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= rank:
+                if index == 0:
+                    return low
+                if index == len(self.bounds):
+                    return high
+                return min(max(self.bounds[index], low), high)
+        return high
+    
     def get_cache_metrics(self, cache_type: str = "default") -> Dict[str, float]:
         """Get cache performance metrics.
         
@@ -200,60 +352,60 @@ class PerformanceMonitor:
         Returns:
             Dictionary of cache metrics
         """
-        with self._lock:
-            hits = self.counters.get(f"cache_hit_{cache_type}", 0)
-            misses = self.counters.get(f"cache_miss_{cache_type}", 0)
-            total = hits + misses
-            
-            if total == 0:
-                return {
-                    "hit_rate": 0.0,
-                    "miss_rate": 0.0,
-                    "total_operations": 0,
-                    "hits": 0,
-                    "misses": 0
-                }
-            
-            hit_rate = (hits / total) * 100
-            miss_rate = (misses / total) * 100
-            
+        counters = self.counters
+        hits = counters.get(f"cache_hit_{cache_type}", 0)
+        misses = counters.get(f"cache_miss_{cache_type}", 0)
+        total = hits + misses
+        
+        if total == 0:
             return {
-                "hit_rate": hit_rate,
-                "miss_rate": miss_rate,
-                "total_operations": total,
-                "hits": hits,
-                "misses": misses
+                "hit_rate": 0.0,
+                "miss_rate": 0.0,
+                "total_operations": 0,
+                "hits": 0,
+                "misses": 0
             }
+        
+        hit_rate = (hits / total) * 100
+        miss_rate = (misses / total) * 100
+        
+        return {
+            "hit_rate": hit_rate,
+            "miss_rate": miss_rate,
+            "total_operations": total,
+            "hits": hits,
+            "misses": misses
+        }
     
     def get_response_time_metrics(self, metric_name: str) -> Dict[str, float]:
         """Get response time statistics for a metric.
         
+        Percentiles are read from the merged histogram, so they are exact to
+        within one bucket (~6%) and clamped to the observed min and max.
+        
         Args:
             metric_name: Name of the timing metric
             
         Returns:
             Dictionary of timing statistics
         """
-        with self._lock:
-            if metric_name not in self.metrics:
-                return {"avg": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "min": 0.0, "max": 0.0}
-            
-            values = [entry.value for entry in self.metrics[metric_name]]
-            
-            if not values:
-                return {"avg": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "min": 0.0, "max": 0.0}
-            
-            sorted_values = sorted(values)
-            count = len(sorted_values)
-            
-            return {
-                "avg": statistics.mean(values),
-                "p50": sorted_values[int(count * 0.5)] if count > 0 else 0.0,
-                "p95": sorted_values[int(count * 0.95)] if count > 0 else 0.0,
-                "p99": sorted_values[int(count * 0.99)] if count > 0 else 0.0,
-                "min": min(values),
-                "max": max(values)
-            }
+        series = self._series(metric_name)
+        total = sum(s.total for s in series)
+        if not total:
+            return {"avg": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "min": 0.0, "max": 0.0}
+        
+        counts = [sum(bucket) for bucket in zip(*(s.counts for s in series))]
+        low = min(s.min for s in series)
+        high = max(s.max for s in series)
+        
+        return {
+            "avg": sum(s.sum for s in series) / total,
+            "p50": self._percentile(counts, total, 50, low, high),
+            "p95": self._percentile(counts, total, 95, low, high),
+            "p99": self._percentile(counts, total, 99, low, high),
+            "min": low,
+            "max": high
+        }
     
     def get_comprehensive_metrics(self) -> PerformanceMetrics:
         """Get comprehensive performance metrics.
@@ -261,37 +413,50 @@ class PerformanceMonitor:
         Returns:
             PerformanceMetrics object with current statistics
         """
-        with self._lock:
-            # Cache metrics
-            cache_metrics = self.get_cache_metrics()
-            
-            # Response time metrics
-            db_metrics = self.get_response_time_metrics("database_query_ms")
-            search_metrics = self.get_response_time_metrics("search_duration_ms")
-            
-            # General response times (if available)
-            response_metrics = self.get_response_time_metrics("response_time_ms")
-            
-            # Error rate (errors per minute in last hour)
-            error_rate = self._calculate_error_rate()
-            
-            # WebSocket connections
-            ws_connections = self.counters.get("websocket_connections", 0) - self.counters.get("websocket_disconnections", 0)
-            
-            return PerformanceMetrics(
-                cache_hit_rate=cache_metrics["hit_rate"],
-                cache_miss_rate=cache_metrics["miss_rate"],
-                avg_response_time_ms=response_metrics["avg"],
-                p95_response_time_ms=response_metrics["p95"],
-                p99_response_time_ms=response_metrics["p99"],
-                total_requests=self.counters.get("total_requests", cache_metrics["total_operations"]),
-                errors_per_minute=error_rate,
-                database_query_time_ms=db_metrics["avg"],
-                search_response_time_ms=search_metrics["avg"],
-                websocket_connections=max(0, ws_connections),
-                memory_usage_mb=self._get_memory_usage(),
-                last_updated=time.time()
-            )
+        counters = self.counters
+        
+        # Cache metrics
+        cache_metrics = self.get_cache_metrics()
+        
+        # Response time metrics
+        db_metrics = self.get_response_time_metrics("database_query_ms")
+        search_metrics = self.get_response_time_metrics("search_duration_ms")
+        
+        # General response times (if available)
+        response_metrics = self.get_response_time_metrics("response_time_ms")
+        
+        # Error rate (errors per minute in last hour)
+        error_rate = self._calculate_error_rate()
+        
+        # WebSocket connections
+        ws_connections = counters.get("websocket_connections", 0) - counters.get("websocket_disconnections", 0)
+        
+        return PerformanceMetrics(
+            cache_hit_rate=cache_metrics["hit_rate"],
+            cache_miss_rate=cache_metrics["miss_rate"],
+            avg_response_time_ms=response_metrics["avg"],
+            p95_response_time_ms=response_metrics["p95"],
+            p99_response_time_ms=response_metrics["p99"],
+            total_requests=counters.get("total_requests", cache_metrics["total_operations"]),
+            errors_per_minute=error_rate,
+            database_query_time_ms=db_metrics["avg"],
+            search_response_time_ms=search_metrics["avg"],
+            websocket_connections=max(0, ws_connections),
+            memory_usage_mb=self._get_memory_usage(),
+            last_updated=time.time()
+        )
+    
+    def _samples(self, metric_name: str, since: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Buffered samples of a metric across threads since ``since``, oldest first."""
+        parts = [s.samples() for s in self._series(metric_name)]
+        if not parts:
+            return np.empty(0), np.empty(0)
+        times = np.concatenate([t for t, _ in parts])
+        values = np.concatenate([v for _, v in parts])
+        keep = times >= max(since, time.time() - self.retention_hours * 3600)
+        times, values = times[keep], values[keep]
+        order = np.argsort(times, kind='stable')
+        return times[order], values[order]
     
     def get_metric_history(self, metric_name: str, hours: int = 1) -> List[Tuple[float, float]]:
         """Get historical data for a metric.
@@ -303,36 +468,20 @@ class PerformanceMonitor:
         Returns:
             List of (timestamp, value) tuples
         """
-        with self._lock:
-            if metric_name not in self.metrics:
-                return []
-            
-            cutoff_time = time.time() - (hours * 3600)
-            
-            history = []
-            for entry in self.metrics[metric_name]:
-                if entry.timestamp >= cutoff_time:
-                    history.append((entry.timestamp, entry.value))
-            
-            return sorted(history, key=lambda x: x[0])
+        times, values = self._samples(metric_name, time.time() - (hours * 3600))
+        return list(zip(times.tolist(), values.tolist()))
     
     def _calculate_error_rate(self) -> float:
         """Calculate errors per minute in the last hour."""
-        error_entries = []
-        cutoff_time = time.time() - 3600  # Last hour
-        
-        for metric_name in self.metrics:
-            if metric_name == "error_occurrence":
-                for entry in self.metrics[metric_name]:
-                    if entry.timestamp >= cutoff_time and entry.value > 0:
-                        error_entries.append(entry.timestamp)
+        times, values = self._samples("error_occurrence", time.time() - 3600)  # Last hour
+        error_times = times[values > 0]
         
-        if not error_entries:
+        if not len(error_times):
             return 0.0
         
         # Calculate errors per minute
-        time_span_minutes = (time.time() - min(error_entries)) / 60
-        return len(error_entries) / max(time_span_minutes, 1.0)
+        time_span_minutes = (time.time() - error_times.min()) / 60
+        return len(error_times) / max(time_span_minutes, 1.0)
     
     def _get_memory_usage(self) -> float:
         """Get current memory usage in MB."""
@@ -343,29 +492,6 @@ class PerformanceMonitor:
         except ImportError:
             return 0.0
     
-    def _cleanup_old_metrics_if_needed(self):
-        """Clean up old metrics if cleanup interval has passed."""
-        current_time = time.time()
-        
-        if current_time - self._last_cleanup < self._cleanup_interval:
-            return
-        
-        cutoff_time = current_time - (self.retention_hours * 3600)
-        
-        for metric_name in list(self.metrics.keys()):
-            metric_deque = self.metrics[metric_name]
-            
-            # Remove old entries
-            while metric_deque and metric_deque[0].timestamp < cutoff_time:
-                metric_deque.popleft()
-            
-            # Remove empty metrics
-            if not metric_deque:
-                del self.metrics[metric_name]
-        
-        self._last_cleanup = current_time
-        logger.debug(f"Cleaned up metrics older than {self.retention_hours} hours")
-    
     def export_metrics(self, filepath: Optional[Path] = None) -> Dict[str, Any]:
         """Export metrics to JSON format.
         
@@ -375,37 +501,37 @@ class PerformanceMonitor:
         Returns:
             Dictionary of exported metrics
         """
-        with self._lock:
-            export_data = {
-                "timestamp": time.time(),
-                "comprehensive_metrics": self.get_comprehensive_metrics().__dict__,
-                "counters": dict(self.counters),
-                "cache_metrics": self.get_cache_metrics(),
-                "response_time_metrics": {
-                    "database": self.get_response_time_metrics("database_query_ms"),
-                    "search": self.get_response_time_metrics("search_duration_ms"),
-                    "general": self.get_response_time_metrics("response_time_ms")
-                }
+        export_data = {
+            "timestamp": time.time(),
+            "comprehensive_metrics": self.get_comprehensive_metrics().__dict__,
+            "counters": self.counters,
+            "cache_metrics": self.get_cache_metrics(),
+            "response_time_metrics": {
+                "database": self.get_response_time_metrics("database_query_ms"),
+                "search": self.get_response_time_metrics("search_duration_ms"),
+                "general": self.get_response_time_metrics("response_time_ms")
             }
+        }
+        
+        if filepath:
+            filepath = Path(filepath)
+            filepath.parent.mkdir(parents=True, exist_ok=True)
             
-            if filepath:
-                filepath = Path(filepath)
-                filepath.parent.mkdir(parents=True, exist_ok=True)
-                
-                with open(filepath, 'w') as f:
-                    json.dump(export_data, f, indent=2, default=str)
-                
-                logger.info(f"Metrics exported to {filepath}")
+            with open(filepath, 'w') as f:
+                json.dump(export_data, f, indent=2, default=str)
             
-            return export_data
+            logger.info(f"Metrics exported to {filepath}")
+        
+        return export_data
     
     def reset_metrics(self):
         """Reset all metrics and counters."""
         with self._lock:
-            self.metrics.clear()
-            self.counters.clear()
-            self.timers.clear()
-            logger.info("All metrics reset")
+            # Threads notice the new generation and start fresh shards
+            self._generation += 1
+            self._shards = []
+            self._retired = _Shard(None, self._generation)
+        logger.info("All metrics reset")
 
 
 # Global performance monitor instance
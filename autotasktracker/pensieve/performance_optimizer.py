@@ -18,7 +18,7 @@ import gc
 
 from autotasktracker.pensieve.api_client import get_pensieve_client, PensieveEntity
 from autotasktracker.pensieve.cache_manager import get_cache_manager
-from autotasktracker.core import DatabaseManager
+from autotasktracker.core import get_default_db_manager
 
 logger = logging.getLogger(__name__)
 
@@ -63,7 +63,7 @@ class PerformanceOptimizer:
         self.start_time = time.time()
         
         # Components
-        self.db_manager = DatabaseManager(use_pensieve_api=True)
+        self.db_manager = get_default_db_manager()
         self.client = get_pensieve_client()
         self.cache_manager = get_cache_manager()
         
@@ -442,7 +442,7 @@ def benchmark_performance(duration_seconds: int = 60) -> Dict[str, Any]:
         start_time = time.time()
         
         # Get some entities to process
-        db = DatabaseManager(use_pensieve_api=True)
+        db = get_default_db_manager()
         entities = db.get_entities_via_api(limit=100)
         entity_ids = [e['id'] for e in entities[:20]]  # Test with 20 entities
         
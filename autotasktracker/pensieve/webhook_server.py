@@ -23,7 +23,7 @@ from pydantic import BaseModel
 
 from autotasktracker.pensieve.event_processor import get_event_processor, PensieveEvent
 from autotasktracker.pensieve.cache_manager import get_cache_manager
-from autotasktracker.core import DatabaseManager
+from autotasktracker.core import get_default_db_manager
 
 logger = logging.getLogger(__name__)
 
@@ -67,7 +67,7 @@ class WebhookServer:
         # Components
         self.event_processor = get_event_processor()
         self.cache_manager = get_cache_manager()
-        self.db_manager = DatabaseManager(use_pensieve_api=True)
+        self.db_manager = get_default_db_manager()
         
         # Threading for background processing
         self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="WebhookProcessor")
@@ -0,0 +1,47 @@
+"""PEP 562 lazy attribute loading for barrel modules.
+
+Barrel ``__init__`` modules re-export names from many submodules, several of
+which pull in pandas, NumPy, PIL or web frameworks. Importing them eagerly
+made every ``import autotasktracker`` (and every CLI invocation) pay for all
+of them. ``lazy_exports`` builds module-level ``__getattr__``/``__dir__``
+functions so each export is imported the first time it is accessed and then
+cached on the module.
+
+Usage:
+    __getattr__, __dir__ = lazy_exports(__name__, {
+        'DatabaseManager': 'autotasktracker.core.database',
+        'VLMProcessor': 'autotasktracker.ai.vlm_processor:SmartVLMProcessor',
+    })
+"""
+
+import importlib
+import sys
+from typing import Callable, Dict, List, Tuple
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Tuple[Callable, Callable]:
+    """Build ``__getattr__`` and ``__dir__`` for a barrel module.
+
+    Args:
+        package: ``__name__`` of the barrel module
+        exports: Maps each exported name to ``'module'`` or ``'module:attribute'``;
+            the attribute defaults to the exported name and relative module
+            paths resolve against ``package``
+
+    Returns:
+        ``(__getattr__, __dir__)`` to assign at module level
+    """
+    def __getattr__(name: str):
+        target = exports.get(name)
+        if target is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        module_name, _, attribute = target.partition(':')
+        value = getattr(importlib.import_module(module_name, package), attribute or name)
+        # Later lookups hit the module dict and never reach __getattr__
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[package])) | set(exports))
+
+    return __getattr__, __dir__
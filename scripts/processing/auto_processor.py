@@ -3,6 +3,7 @@
 Automatic background processor for AutoTaskTracker.
 Handles OCR processing and task extraction for new screenshots.
 """
+import importlib.util
 import sys
 import os
 import time
@@ -15,8 +16,9 @@ import signal
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from autotasktracker.core.database import DatabaseManager
-from autotasktracker.core.task_extractor import get_task_extractor
-from autotasktracker.core.categorizer import ActivityCategorizer
+from autotasktracker.core.backfill import TASK_INPUT_KEYS, compute_chunk
+from autotasktracker.core.derived_versions import get_derived_versions
+from autotasktracker.core.processing_ledger import ProcessingLedger
 
 logging.basicConfig(
     level=logging.INFO,
@@ -31,10 +33,10 @@ class AutoProcessor:
     def __init__(self, check_interval=30):
         from autotasktracker.config import get_config
         self.config = get_config()
-        self.db_path = self.config.get_db_path()
         self.db = DatabaseManager(use_pensieve_api=True)
-        self.task_extractor = get_task_extractor()
-        self.categorizer = ActivityCategorizer()
+        self.ledger = ProcessingLedger(self.db)
+        self.ledger.bootstrap_watermark('ocr')
+        self.ledger.bootstrap_watermark('tasks')
         self.check_interval = check_interval
         self.running = True
         self.stats = {
@@ -58,18 +60,14 @@ class AutoProcessor:
     
     def _check_ocr_capability(self):
         """Check if OCR is available."""
-        try:
-            import ocrmac.ocrmac
+        if importlib.util.find_spec('ocrmac') is not None:
             logger.info("OCR capability: ocrmac available")
             return 'ocrmac'
-        except ImportError:
-            try:
-                import pytesseract
-                logger.info("OCR capability: pytesseract available")
-                return 'pytesseract'
-            except ImportError:
-                logger.warning("No OCR capability available")
-                return None
+        if importlib.util.find_spec('pytesseract') is not None:
+            logger.info("OCR capability: pytesseract available")
+            return 'pytesseract'
+        logger.warning("No OCR capability available")
+        return None
     
     def process_ocr(self, entity_id, filepath):
         """Process OCR for a single screenshot."""
@@ -102,24 +100,15 @@ class AutoProcessor:
             
             if ocr_text:
                 # Store in database using DatabaseManager
-                with self.db.get_connection() as conn:
+                with self.db.get_connection(readonly=False) as conn:
                     cursor = conn.cursor()
-                
-                cursor.execute("""
-                    INSERT INTO metadata_entries 
-                    (entity_id, key, value, source_type, source, data_type, created_at, updated_at)
-                    VALUES (?, 'ocr_text', ?, 'plugin', 'auto_processor', 'text', datetime('now'), datetime('now'))
-                """, (entity_id, ocr_text))
-                
-                # Mark as processed by OCR plugin
-                cursor.execute("""
-                    INSERT OR REPLACE INTO entity_plugin_status 
-                    (entity_id, plugin_id, processed_at)
-                    VALUES (?, 2, datetime('now'))
-                """, (entity_id,))
-                
-                conn.commit()
-                conn.close()
+                    cursor.execute("""
+                        INSERT INTO metadata_entries 
+                        (entity_id, key, value, source_type, source, data_type, created_at, updated_at)
+                        VALUES (%s, 'ocr_text', %s, 'plugin', 'auto_processor', 'text', NOW(), NOW())
+                        ON CONFLICT (entity_id, key) DO NOTHING
+                    """, (entity_id, ocr_text))
+                    conn.commit()
                 
                 self.stats['ocr_processed'] += 1
                 return ocr_text
@@ -130,94 +119,75 @@ class AutoProcessor:
             
         return None
     
-    def extract_task(self, entity_id, window_title, ocr_text=None):
-        """Extract task from window title and OCR text."""
+    def extract_task(self, item):
+        """Extract task and category from a work item's window title and OCR text."""
+        entity_id = item['id']
         try:
-            # Extract task
-            task = self.task_extractor.extract_task(window_title, ocr_text)
-            if not task:
-                task = "Unknown Activity"
-            
-            # Get category
-            category = self.categorizer.categorize(window_title)
-            
-            # Store in database using DatabaseManager
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-            
-            # Save task
-            cursor.execute("""
-                INSERT INTO metadata_entries 
-                (entity_id, key, value, source_type, data_type, created_at, updated_at)
-                VALUES (?, "tasks", ?, 'auto_processor', 'text', datetime('now'), datetime('now'))
-            """, (entity_id, task))
-            
-            # Save category
-            cursor.execute("""
-                INSERT INTO metadata_entries 
-                (entity_id, key, value, source_type, data_type, created_at, updated_at)
-                VALUES (?, "category", ?, 'auto_processor', 'text', datetime('now'), datetime('now'))
-            """, (entity_id, category))
+            # Same computation as the worker, inline recompute and backfill
+            values = compute_chunk('tasks', [item])
+            if not values:
+                return None, None
             
-            conn.commit()
-            conn.close()
+            # Store and stamp with the current pipeline version, so readers
+            # do not treat the fresh values as stale
+            get_derived_versions(self.db).write(values, source_type='auto_processor')
             
             self.stats['tasks_extracted'] += 1
-            return task, category
+            computed = {key: value for _, key, value in values}
+            return computed['tasks'], computed['category']
             
         except Exception as e:
             logger.error(f"Task extraction error for entity {entity_id}: {e}")
             self.stats['errors'] += 1
             return None, None
     
-    def get_unprocessed_screenshots(self, limit=50):
-        """Get screenshots that need processing."""
-        with self.db.get_connection(readonly=True) as conn:
-            cursor = conn.cursor()
-            
-            # Find screenshots without OCR or tasks
-            cursor.execute("""
-                SELECT DISTINCT e.id, e.filepath, me1.value as window_title,
-                       me2.value as ocr_text, me3.value as tasks
-                FROM entities e
-                LEFT JOIN metadata_entries me1 ON e.id = me1.entity_id AND me1.key = "active_window"
-                LEFT JOIN metadata_entries me2 ON e.id = me2.entity_id AND me2.key = 'ocr_text'
-                LEFT JOIN metadata_entries me3 ON e.id = me3.entity_id AND me3.key = "tasks"
-                WHERE e.file_type_group = 'image'
-                AND (me2.id IS NULL OR me3.id IS NULL)
-                ORDER BY e.created_at DESC
-                LIMIT ?
-            """, (limit,))
-            
-            results = cursor.fetchall()
-            return results
+    def get_unprocessed_screenshots(self, stage, limit=50):
+        """Claim screenshots that still need the given stage ('ocr' or 'tasks')."""
+        entity_ids = self.ledger.claim_batch(stage, limit)
+        items = self.ledger.fetch_work_items(entity_ids, list(TASK_INPUT_KEYS))
+        
+        # Entities not visible yet (or deleted) are retried with backoff
+        # rather than marked done before their data exists
+        missing = set(entity_ids) - {item['id'] for item in items}
+        for entity_id in sorted(missing):
+            self.ledger.fail(stage, entity_id, 'Entity not found when fetching work')
+        return items
     
     def process_batch(self, limit=None):
         """Process a batch of screenshots."""
         batch_limit = limit or 50
-        screenshots = self.get_unprocessed_screenshots(batch_limit)
-        
-        if not screenshots:
-            return 0
-        
-        logger.info(f"Processing {len(screenshots)} screenshots...")
         processed = 0
         
-        for entity_id, filepath, window_title, ocr_text, tasks in screenshots:
-            # Process OCR if needed
-            if not ocr_text and filepath:
-                ocr_text = self.process_ocr(entity_id, filepath)
-                if ocr_text:
-                    logger.debug(f"OCR completed for entity {entity_id}")
-            
-            # Extract task if needed and window title exists
-            if not tasks and window_title:
-                task, category = self.extract_task(entity_id, window_title, ocr_text)
-                if task:
-                    logger.debug(f"Task extracted for entity {entity_id}: {task} ({category})")
+        # OCR stage
+        if self.ocr_available:
+            for item in self.get_unprocessed_screenshots('ocr', batch_limit):
+                if item['ocr_text'] or item['ocr_result'] or not item['filepath']:
+                    self.ledger.complete('ocr', [item['id']])
+                    continue
+                if self.process_ocr(item['id'], item['filepath']):
+                    logger.debug(f"OCR completed for entity {item['id']}")
+                    self.ledger.complete('ocr', [item['id']])
+                    processed += 1
+                else:
+                    self.ledger.fail('ocr', item['id'], 'OCR produced no text')
+        
+        # Task extraction stage
+        for item in self.get_unprocessed_screenshots('tasks', batch_limit):
+            entity_id, window_title = item['id'], item["active_window"]
+            if not window_title:
+                self.ledger.complete('tasks', [entity_id])
+                continue
             
-            processed += 1
+            task, category = self.extract_task(item)
+            if task:
+                logger.debug(f"Task extracted for entity {entity_id}: {task} ({category})")
+                self.ledger.complete('tasks', [entity_id])
+                processed += 1
+            else:
+                self.ledger.fail('tasks', entity_id, 'Task extraction failed')
         
+        if processed:
+            logger.info(f"Processed {processed} screenshot stages")
         return processed
     
     def run_continuous(self):
@@ -257,22 +227,12 @@ class AutoProcessor:
         logger.info(f"Tasks extracted: {self.stats['tasks_extracted']}")
         logger.info(f"Errors: {self.stats['errors']}")
         
-        # Check current coverage
-        with self.db.get_connection(readonly=True) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT COUNT(*) FROM entities WHERE file_type_group = 'image'")
-            total_screenshots = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(DISTINCT entity_id) FROM metadata_entries WHERE key = 'ocr_text'")
-            ocr_count = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(DISTINCT entity_id) FROM metadata_entries WHERE key = "tasks"")
-            task_count = cursor.fetchone()[0]
-        
-        logger.info(f"\nCoverage:")
-        logger.info(f"- OCR: {ocr_count}/{total_screenshots} ({ocr_count/total_screenshots*100:.1f}%)")
-        logger.info(f"- Tasks: {task_count}/{total_screenshots} ({task_count/total_screenshots*100:.1f}%)")
+        # Ledger position per stage (avoids full-table coverage scans)
+        logger.info("\nProgress:")
+        for stage in ('ocr', 'tasks'):
+            stats = self.ledger.get_stats(stage)
+            logger.info(f"- {stage}: watermark at entity {stats['watermark']}, "
+                        f"{stats['pending_retries']} pending retries, {stats['dead']} parked")
 
 
 def main():
@@ -9,12 +9,12 @@ import time
 import logging
 from datetime import datetime
 import requests
-import sqlite3
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from autotasktracker.pensieve.api_client import get_pensieve_client
+from autotasktracker.core.processing_ledger import ProcessingLedger
 
 logging.basicConfig(
     level=logging.INFO,
@@ -29,34 +29,17 @@ class PensieveOCRProcessor:
     def __init__(self):
         from autotasktracker.config import get_config
         config = get_config()
-        self.db_path = config.get_db_path()
         self.pensieve_client = get_pensieve_client()
         self.ocr_plugin_id = 2  # builtin_ocr plugin ID
         self.config = config
+        self.ledger = ProcessingLedger()
+        self.ledger.bootstrap_watermark('ocr')
     
     def get_unprocessed_screenshots(self, limit=100):
-        """Get screenshots that haven't been processed by OCR plugin."""
-        from autotasktracker.core import DatabaseManager
-        db = DatabaseManager()
-        with db.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT e.id, e.filepath 
-                FROM entities e
-                WHERE e.file_type_group = 'image'
-                AND NOT EXISTS (
-                    SELECT 1 FROM entity_plugin_status eps
-                    WHERE eps.entity_id = e.id 
-                    AND eps.plugin_id = ?
-                )
-                ORDER BY e.created_at DESC
-                LIMIT ?
-            """, (self.ocr_plugin_id, limit))
-            
-            results = cursor.fetchall()
-            
-        return results
+        """Claim screenshots above the OCR watermark."""
+        entity_ids = self.ledger.claim_batch('ocr', limit)
+        items = self.ledger.fetch_work_items(entity_ids, [])
+        return [(item['id'], item['filepath']) for item in items]
     
     def trigger_ocr_plugin(self, entity_id):
         """Trigger OCR plugin for a specific entity."""
@@ -91,9 +74,12 @@ class PensieveOCRProcessor:
         processed = 0
         for entity_id, filepath in unprocessed:
             if self.trigger_ocr_plugin(entity_id):
+                self.ledger.complete('ocr', [entity_id])
                 processed += 1
                 logger.info(f"Processed {filepath}")
                 time.sleep(0.5)  # Small delay to avoid overwhelming the system
+            else:
+                self.ledger.fail('ocr', entity_id, 'OCR plugin trigger failed')
         
         return processed
     
@@ -15,6 +15,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspa
 from autotasktracker.core.task_extractor import get_task_extractor
 from autotasktracker.core import ActivityCategorizer
 from autotasktracker.core import DatabaseManager
+from autotasktracker.core.processing_ledger import ProcessingLedger
 from autotasktracker.pensieve.health_monitor import is_pensieve_healthy
 from autotasktracker.pensieve.api_client import get_pensieve_client, PensieveAPIError
 
@@ -96,75 +97,62 @@ def _process_via_pensieve_api(limit=None):
         return _process_via_database(limit=limit)
 
 
-def _process_via_database(limit=None):
+def _process_via_database(limit=None, batch_size=100):
     """Process screenshots using DatabaseManager (fallback when API unavailable)."""
     try:
         db = DatabaseManager()
+        ledger = ProcessingLedger(db)
+        ledger.bootstrap_watermark('tasks')
         extractor = get_task_extractor()
         categorizer = ActivityCategorizer()
         
-        with db.get_connection(readonly=False) as conn:
-            cursor = conn.cursor()
-            
-            # Find entities without task extraction
-            query = """
-                SELECT DISTINCT e.id, m.value as window_title
-                FROM entities e
-                JOIN metadata_entries m ON e.id = m.entity_id AND m.key = "active_window"
-                LEFT JOIN metadata_entries t ON e.id = t.entity_id AND t.key = "tasks"
-                WHERE t.id IS NULL
-                ORDER BY e.created_at DESC
-            """
-            
-            if limit:
-                query += f" LIMIT {limit}"
-            
-            cursor.execute(query)
-            unprocessed = cursor.fetchall()
-            
-            logger.info(f"Found {len(unprocessed)} unprocessed screenshots")
+        processed = 0
+        while not limit or processed < limit:
+            size = min(batch_size, limit - processed) if limit else batch_size
+            entity_ids = ledger.claim_batch('tasks', size)
+            if not entity_ids:
+                break
             
-            processed = 0
-            for entity_id, window_title in unprocessed:
-                if not window_title:
-                    continue
-                
-                # Extract task
-                task = extractor.extract_task(window_title)
-                if not task:
-                    task = "Unknown Activity"
+            items = ledger.fetch_work_items(entity_ids, ["active_window"])
+            done = set(entity_ids) - {item['id'] for item in items}  # deleted meanwhile
+            with db.get_connection(readonly=False) as conn:
+                cursor = conn.cursor()
                 
-                # Get category
-                category = categorizer.categorize(window_title)
-                
-                # Insert task
-                try:
-                    cursor.execute("""
-                        INSERT INTO metadata_entries 
-                        (entity_id, key, value, source_type, data_type, created_at, updated_at)
-                        VALUES (?, "tasks", ?, 'task_processor', 'text', datetime('now'), datetime('now'))
-                    """, (entity_id, task))
+                for item in items:
+                    entity_id = item['id']
+                    window_title = item["active_window"]
+                    if not window_title:
+                        done.add(entity_id)
+                        continue
                     
-                    # Insert category
-                    cursor.execute("""
-                        INSERT INTO metadata_entries 
-                        (entity_id, key, value, source_type, data_type, created_at, updated_at)
-                        VALUES (?, "category", ?, 'task_processor', 'text', datetime('now'), datetime('now'))
-                    """, (entity_id, category))
+                    # Extract task
+                    task = extractor.extract_task(window_title)
+                    if not task:
+                        task = "Unknown Activity"
                     
-                    conn.commit()
-                    processed += 1
+                    # Get category
+                    category = categorizer.categorize(window_title)
                     
-                    if processed % 100 == 0:
-                        logger.info(f"Processed {processed} screenshots...")
-                        
-                except sqlite3.IntegrityError:
-                    # Already exists, skip
-                    pass
-                except Exception as e:
-                    logger.error(f"Error processing entity {entity_id}: {e}")
+                    try:
+                        for key, value in (("tasks", task), ("category", category)):
+                            cursor.execute("""
+                                INSERT INTO metadata_entries 
+                                (entity_id, key, value, source_type, data_type, created_at, updated_at)
+                                VALUES (%s, %s, %s, 'task_processor', 'text', NOW(), NOW())
+                                ON CONFLICT (entity_id, key) DO NOTHING
+                            """, (entity_id, key, value))
+                        conn.commit()
+                        done.add(entity_id)
+                        processed += 1
+                    except Exception as e:
+                        logger.error(f"Error processing entity {entity_id}: {e}")
+                        conn.rollback()
+                        ledger.fail('tasks', entity_id, str(e))
             
-            logger.info(f"Successfully processed {processed} screenshots")
+            ledger.complete('tasks', done)
+            logger.info(f"Processed {processed} screenshots...")
+        
+        logger.info(f"Successfully processed {processed} screenshots")
             
     except Exception as e:
         logger.error(f"Database processing failed: {e}")
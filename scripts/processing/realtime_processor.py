@@ -8,7 +8,6 @@ import os
 import time
 import logging
 from datetime import datetime, timedelta
-from typing import Set
 import signal
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -16,6 +15,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspa
 from autotasktracker.core import DatabaseManager
 from autotasktracker.core.task_extractor import get_task_extractor
 from autotasktracker.core import ActivityCategorizer
+from autotasktracker.core.processing_ledger import ProcessingLedger
 
 logging.basicConfig(
     level=logging.INFO,
@@ -27,15 +27,17 @@ logger = logging.getLogger(__name__)
 class RealtimeProcessor:
     """Process new screenshots in real-time."""
     
+    STAGE = 'tasks'
+    
     def __init__(self, check_interval: int = 10):
         self.db_manager = DatabaseManager(use_pensieve_api=True)
         self.check_interval = check_interval
         self.task_extractor = get_task_extractor()
-        self.processed_ids: Set[int] = set()
+        self.ledger = ProcessingLedger(self.db_manager)
         self.running = True
         
-        # Load already processed IDs to avoid reprocessing
-        self._load_processed_ids()
+        # Start from existing task metadata the first time this stage runs
+        self.ledger.bootstrap_watermark(self.STAGE)
         
         # Set up signal handlers
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -46,48 +48,17 @@ class RealtimeProcessor:
         logger.info("Received shutdown signal, stopping...")
         self.running = False
     
-    def _load_processed_ids(self):
-        """Load IDs of already processed entities."""
-        with self.db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            # Get entities that have tasks
-            cursor.execute("""
-                SELECT DISTINCT entity_id 
-                FROM metadata_entries 
-                WHERE key = "tasks"
-            """)
-            
-            self.processed_ids = {row[0] for row in cursor.fetchall()}
-            logger.info(f"Loaded {len(self.processed_ids)} already processed entities")
-    
     def get_new_screenshots(self, limit: int = 50):
-        """Get screenshots that haven't been processed yet."""
-        with self.db_manager.get_connection() as conn:
-            cursor = conn.cursor()
-            # Get recent unprocessed entities
-            cursor.execute("""
-                SELECT e.id, m.value as window_title
-                FROM entities e
-                JOIN metadata_entries m ON e.id = m.entity_id AND m.key = "active_window"
-                WHERE e.id NOT IN (
-                    SELECT DISTINCT entity_id 
-                    FROM metadata_entries 
-                    WHERE key = "tasks"
-                )
-                AND e.created_at > datetime('now', '-1 hour')
-                ORDER BY e.created_at DESC
-                LIMIT ?
-            """, (limit,))
-            
-            new_screenshots = []
-            for entity_id, window_title in cursor.fetchall():
-                if entity_id not in self.processed_ids:
-                    new_screenshots.append({
-                        'id': entity_id,
-                        "active_window": window_title
-                    })
-            
-            return new_screenshots
+        """Claim the next screenshots above the processing watermark."""
+        entity_ids = self.ledger.claim_batch(self.STAGE, limit)
+        items = self.ledger.fetch_work_items(entity_ids, ["active_window"])
+        
+        # Entities deleted between claim and fetch are simply finished
+        missing = set(entity_ids) - {item['id'] for item in items}
+        if missing:
+            self.ledger.complete(self.STAGE, missing)
+        
+        return items
     
     def process_screenshot(self, screenshot: dict) -> bool:
         """Process a single screenshot."""
@@ -95,6 +66,7 @@ class RealtimeProcessor:
         window_title = screenshot["active_window"]
         
         if not window_title:
+            self.ledger.complete(self.STAGE, [entity_id])
             return False
         
         # Extract task and category
@@ -109,42 +81,23 @@ class RealtimeProcessor:
             with self.db_manager.get_connection(readonly=False) as conn:
                 cursor = conn.cursor()
                 
-                # Check if already processed (double check)
-                cursor.execute("""
-                    SELECT 1 FROM metadata_entries 
-                    WHERE entity_id = ? AND key = "tasks"
-                """, (entity_id,))
-                
-                if cursor.fetchone():
-                    self.processed_ids.add(entity_id)
-                    return False
-                
-                # Insert task
-                cursor.execute("""
-                    INSERT INTO metadata_entries 
-                    (entity_id, key, value, source_type, data_type, created_at, updated_at)
-                    VALUES (?, "tasks", ?, 'realtime_processor', 'text', datetime('now'), datetime('now'))
-                """, (entity_id, task))
-                
-                # Insert category
-                cursor.execute("""
-                    INSERT INTO metadata_entries 
-                    (entity_id, key, value, source_type, data_type, created_at, updated_at)
-                    VALUES (?, "category", ?, 'realtime_processor', 'text', datetime('now'), datetime('now'))
-                """, (entity_id, category))
+                for key, value in (("tasks", task), ("category", category)):
+                    cursor.execute("""
+                        INSERT INTO metadata_entries 
+                        (entity_id, key, value, source_type, data_type, created_at, updated_at)
+                        VALUES (%s, %s, %s, 'realtime_processor', 'text', NOW(), NOW())
+                        ON CONFLICT (entity_id, key) DO NOTHING
+                    """, (entity_id, key, value))
                 
                 conn.commit()
-                self.processed_ids.add(entity_id)
-                
-                logger.info(f"Processed: {task} ({category})")
-                return True
+            
+            self.ledger.complete(self.STAGE, [entity_id])
+            logger.info(f"Processed: {task} ({category})")
+            return True
                 
         except Exception as e:
-            if "UNIQUE constraint failed" in str(e):
-                # Already exists
-                self.processed_ids.add(entity_id)
-                return False
             logger.error(f"Error processing entity {entity_id}: {e}")
+            self.ledger.fail(self.STAGE, entity_id, str(e))
             return False
     
     def run_once(self) -> int:
@@ -179,7 +132,9 @@ class RealtimeProcessor:
                 
                 # Show status every minute
                 if time.time() - last_status > 60:
-                    logger.info(f"Status: {len(self.processed_ids)} total processed, "
+                    stats = self.ledger.get_stats(self.STAGE)
+                    logger.info(f"Status: watermark at entity {stats['watermark']}, "
+                              f"{stats['pending_retries']} pending retries, "
                               f"{total_processed} in this session")
                     last_status = time.time()
                 
@@ -14,8 +14,10 @@ from typing import List, Dict, Optional
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from autotasktracker.core import DatabaseManager
-from autotasktracker.core.task_extractor import get_task_extractor
 from autotasktracker.core import ActivityCategorizer
+from autotasktracker.core.backfill import TASK_INPUT_KEYS, compute_chunk
+from autotasktracker.core.processing_ledger import ProcessingLedger
+from autotasktracker.core.derived_versions import get_derived_versions
 from autotasktracker.ai import AIEnhancedTaskExtractor
 
 logging.basicConfig(
@@ -28,12 +30,17 @@ logger = logging.getLogger(__name__)
 class ScreenshotProcessor:
     """Process screenshots and extract tasks in real-time."""
     
+    STAGE = 'tasks'
+    
     def __init__(self, check_interval: int = 30):
         """Initialize processor with specified check interval in seconds."""
         self.db = DatabaseManager(use_pensieve_api=True)
-        self.task_extractor = get_task_extractor()
         self.check_interval = check_interval
         self.processed_count = 0
+        self.last_batch_size = 0
+        self.ledger = ProcessingLedger(self.db)
+        self.ledger.bootstrap_watermark(self.STAGE)
+        self.versions = get_derived_versions(self.db)
         
         # Try to initialize AI extractor
         try:
@@ -46,56 +53,10 @@ class ScreenshotProcessor:
             self.ai_available = False
     
     def get_unprocessed_screenshots(self, limit: int = 100) -> List[Dict]:
-        """Get screenshots that haven't been processed yet."""
+        """Claim the next batch of screenshots above the processing watermark."""
         try:
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Find entities without task extraction
-                cursor.execute("""
-                    SELECT DISTINCT e.id, e.filepath, e.created_at
-                    FROM entities e
-                    LEFT JOIN metadata_entries m_task 
-                        ON e.id = m_task.entity_id AND m_task.key = "tasks"
-                    LEFT JOIN metadata_entries m_cat
-                        ON e.id = m_cat.entity_id AND m_cat.key = "category"
-                    WHERE m_task.id IS NULL OR m_cat.id IS NULL
-                    ORDER BY e.created_at DESC
-                    LIMIT ?
-                """, (limit,))
-                
-                results = []
-                for row in cursor.fetchall():
-                    entity_id, filepath, created_at = row
-                    
-                    # Get window title
-                    cursor.execute("""
-                        SELECT value FROM metadata_entries
-                        WHERE entity_id = ? AND key = "active_window"
-                    """, (entity_id,))
-                    
-                    window_row = cursor.fetchone()
-                    window_title = window_row[0] if window_row else None
-                    
-                    # Get OCR text if available
-                    cursor.execute("""
-                        SELECT value FROM metadata_entries
-                        WHERE entity_id = ? AND key = "ocr_result"
-                    """, (entity_id,))
-                    
-                    ocr_row = cursor.fetchone()
-                    ocr_text = ocr_row[0] if ocr_row else None
-                    
-                    results.append({
-                        'id': entity_id,
-                        'filepath': filepath,
-                        'created_at': created_at,
-                        "active_window": window_title,
-                        "ocr_result": ocr_text
-                    })
-                
-                return results
-                
+            entity_ids = self.ledger.claim_batch(self.STAGE, limit)
+            return self.ledger.fetch_work_items(entity_ids, list(TASK_INPUT_KEYS))
         except Exception as e:
             logger.error(f"Error getting unprocessed screenshots: {e}")
             return []
@@ -108,6 +69,7 @@ class ScreenshotProcessor:
         
         if not window_title:
             logger.debug(f"Skipping entity {entity_id} - no window title")
+            self.ledger.complete(self.STAGE, [entity_id])
             return False
         
         try:
@@ -123,51 +85,46 @@ class ScreenshotProcessor:
                 category = result.get("category", ActivityCategorizer.DEFAULT_CATEGORY)
                 confidence = result.get('confidence', 0.5)
             else:
-                # Fallback to basic extraction
-                task = self.task_extractor.extract_task(window_title, ocr_text)
-                category = ActivityCategorizer.categorize(window_title)
+                # Fallback to basic extraction, computed as by the worker and backfill
+                computed = {key: value for _, key, value in compute_chunk('tasks', [screenshot])}
+                task, category = computed.get('tasks'), computed.get('category')
                 confidence = 0.5
             
             if not task:
                 task = "Unknown Activity"
             
-            # Save to database
-            with self.db.get_connection() as conn:
+            # Save to database; tasks and category are stamped with the
+            # current pipeline version in the same transaction
+            with self.db.get_connection(readonly=False) as conn:
                 cursor = conn.cursor()
                 
-                # Save task
-                cursor.execute("""
-                    INSERT INTO metadata_entries 
-                    (entity_id, key, value, source_type, data_type, created_at, updated_at)
-                    VALUES (?, "tasks", ?, 'auto_processor', 'text', datetime('now'), datetime('now'))
-                """, (entity_id, task))
-                
-                # Save category
-                cursor.execute("""
-                    INSERT INTO metadata_entries 
-                    (entity_id, key, value, source_type, data_type, created_at, updated_at)
-                    VALUES (?, "category", ?, 'auto_processor', 'text', datetime('now'), datetime('now'))
-                """, (entity_id, category))
-                
-                # Save confidence score
+                self.versions.write(
+                    [(entity_id, "tasks", task), (entity_id, "category", category)],
+                    source_type='auto_processor', cursor=cursor
+                )
                 cursor.execute("""
                     INSERT INTO metadata_entries 
                     (entity_id, key, value, source_type, data_type, created_at, updated_at)
-                    VALUES (?, 'task_confidence', ?, 'auto_processor', 'float', datetime('now'), datetime('now'))
-                """, (entity_id, str(confidence)))
+                    VALUES (%s, %s, %s, 'auto_processor', 'float', NOW(), NOW())
+                    ON CONFLICT (entity_id, key) DO UPDATE SET 
+                    value = EXCLUDED.value, updated_at = NOW()
+                """, (entity_id, 'task_confidence', str(confidence)))
                 
                 conn.commit()
-                
+            
+            self.ledger.complete(self.STAGE, [entity_id])
             logger.info(f"Processed entity {entity_id}: {task} ({category}) - confidence: {confidence:.2f}")
             return True
             
         except Exception as e:
             logger.error(f"Error processing entity {entity_id}: {e}")
+            self.ledger.fail(self.STAGE, entity_id, str(e))
             return False
     
     def run_batch(self) -> int:
         """Process a batch of unprocessed screenshots."""
         screenshots = self.get_unprocessed_screenshots()
+        self.last_batch_size = len(screenshots)
         
         if not screenshots:
             logger.debug("No unprocessed screenshots found")
@@ -223,7 +180,7 @@ class ScreenshotProcessor:
         total_processed = 0
         while True:
             processed = self.run_batch()
-            if processed == 0:
+            if self.last_batch_size == 0:
                 break
             total_processed += processed
             logger.info(f"Catchup progress: {total_processed} screenshots processed")
@@ -5,6 +5,9 @@
 SET timezone = 'UTC';
 
 -- Create entities table
+-- entities and metadata_entries start as plain tables; convert them to monthly
+-- partitions online with `autotask storage partition-migrate`
+-- (see autotasktracker/core/partitioning.py)
 CREATE TABLE IF NOT EXISTS entities (
     id SERIAL PRIMARY KEY,
     filepath TEXT,
@@ -34,6 +37,139 @@ CREATE INDEX IF NOT EXISTS idx_metadata_created_at ON metadata_entries(created_a
 CREATE INDEX IF NOT EXISTS idx_entities_created_filepath ON entities(created_at DESC, filepath);
 CREATE INDEX IF NOT EXISTS idx_metadata_entity_key ON metadata_entries(entity_id, key);
 
+-- Incremental processing ledger (see autotasktracker/core/processing_ledger.py)
+CREATE TABLE IF NOT EXISTS processing_watermarks (
+    stage VARCHAR(64) PRIMARY KEY,
+    last_entity_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS processing_claims (
+    stage VARCHAR(64) NOT NULL,
+    entity_id BIGINT NOT NULL,
+    worker_id VARCHAR(128),
+    status VARCHAR(16) NOT NULL DEFAULT 'claimed',
+    claimed_at TIMESTAMP,
+    PRIMARY KEY (stage, entity_id)
+);
+CREATE INDEX IF NOT EXISTS idx_processing_claims_status ON processing_claims(stage, status, claimed_at);
+
+CREATE TABLE IF NOT EXISTS processing_failures (
+    stage VARCHAR(64) NOT NULL,
+    entity_id BIGINT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    last_error TEXT,
+    next_attempt_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    PRIMARY KEY (stage, entity_id)
+);
+CREATE INDEX IF NOT EXISTS idx_processing_failures_retry ON processing_failures(stage, next_attempt_at);
+
+-- Worker leases for coordinated processing (see autotasktracker/core/worker_coordination.py)
+CREATE TABLE IF NOT EXISTS processing_leases (
+    worker_id VARCHAR(128) PRIMARY KEY,
+    hostname VARCHAR(255),
+    pid INTEGER,
+    stages TEXT,
+    concurrency INTEGER,
+    started_at TIMESTAMP,
+    heartbeat_at TIMESTAMP,
+    expires_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_processing_leases_expires ON processing_leases(expires_at);
+
+-- Monthly partition catalog (see autotasktracker/core/partitioning.py)
+CREATE TABLE IF NOT EXISTS storage_partitions (
+    month DATE PRIMARY KEY,
+    first_entity_id BIGINT NOT NULL,
+    end_entity_id BIGINT,
+    min_created_at TIMESTAMP,
+    max_created_at TIMESTAMP,
+    sealed_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS storage_partition_migration (
+    table_name VARCHAR(64) PRIMARY KEY,
+    last_id BIGINT NOT NULL DEFAULT 0,
+    rows_copied BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP
+);
+
+-- Archived verbose metadata parts (see autotasktracker/core/metadata_archive.py)
+CREATE TABLE IF NOT EXISTS metadata_archive_parts (
+    path VARCHAR(512) PRIMARY KEY,
+    month VARCHAR(7) NOT NULL,
+    min_entity_id BIGINT NOT NULL,
+    max_entity_id BIGINT NOT NULL,
+    row_count INTEGER NOT NULL,
+    bytes BIGINT NOT NULL,
+    created_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_metadata_archive_parts_range ON metadata_archive_parts(min_entity_id, max_entity_id);
+
+-- Deduplicated and transcoded screenshot files (see autotasktracker/core/screenshot_store.py)
+CREATE TABLE IF NOT EXISTS screenshot_files (
+    entity_id BIGINT PRIMARY KEY,
+    filepath VARCHAR(1024) NOT NULL,
+    content_hash VARCHAR(64) NOT NULL,
+    tier VARCHAR(16) NOT NULL,
+    stored_path VARCHAR(256),
+    original_bytes BIGINT NOT NULL,
+    stored_bytes BIGINT NOT NULL,
+    decode_ms_original REAL,
+    decode_ms_stored REAL,
+    updated_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_screenshot_files_filepath ON screenshot_files(filepath);
+CREATE INDEX IF NOT EXISTS idx_screenshot_files_hash ON screenshot_files(content_hash);
+
+-- Backfill runs, their chunk checkpoints and versioned results awaiting cutover
+-- (see autotasktracker/core/backfill.py)
+CREATE TABLE IF NOT EXISTS backfill_runs (
+    run_id VARCHAR(128) PRIMARY KEY,
+    stage VARCHAR(64) NOT NULL,
+    version VARCHAR(64) NOT NULL,
+    range_start TIMESTAMP NOT NULL,
+    range_end TIMESTAMP NOT NULL,
+    chunk_size INTEGER NOT NULL,
+    status VARCHAR(16) NOT NULL,
+    fingerprints TEXT,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS backfill_chunks (
+    run_id VARCHAR(128) NOT NULL,
+    chunk_start BIGINT NOT NULL,
+    chunk_end BIGINT NOT NULL,
+    status VARCHAR(16) NOT NULL,
+    rows_written INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    completed_at TIMESTAMP,
+    PRIMARY KEY (run_id, chunk_start)
+);
+
+CREATE TABLE IF NOT EXISTS derived_metadata_versions (
+    entity_id BIGINT NOT NULL,
+    key VARCHAR(255) NOT NULL,
+    version VARCHAR(64) NOT NULL,
+    value TEXT,
+    created_at TIMESTAMP,
+    PRIMARY KEY (entity_id, key, version)
+);
+CREATE INDEX IF NOT EXISTS idx_derived_metadata_versions_version ON derived_metadata_versions(version, entity_id);
+
+-- Pipeline version fingerprint of each derived metadata value
+-- (see autotasktracker/core/derived_versions.py)
+CREATE TABLE IF NOT EXISTS derived_metadata_stamps (
+    entity_id BIGINT NOT NULL,
+    key VARCHAR(255) NOT NULL,
+    fingerprint VARCHAR(32) NOT NULL,
+    stamped_at TIMESTAMP,
+    PRIMARY KEY (entity_id, key)
+);
+CREATE INDEX IF NOT EXISTS idx_derived_metadata_stamps_key ON derived_metadata_stamps(key, fingerprint);
+
 -- Function to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
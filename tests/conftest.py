@@ -65,4 +65,17 @@ def pytest_configure(config):
     )
     config.addinivalue_line(
         "markers", "unit: marks tests as unit tests"
-    )
\ No newline at end of file
+    )
+    config.addinivalue_line(
+        "markers", "benchmark: wall-clock assertions, run only with AUTOTASK_BENCHMARKS=1"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip timing assertions unless benchmarks are requested; they are flaky on a loaded machine."""
+    if os.environ.get('AUTOTASK_BENCHMARKS') == '1':
+        return
+    skip = pytest.mark.skip(reason="benchmark; set AUTOTASK_BENCHMARKS=1 to run")
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""
+Import-time budget tests for the autotasktracker package and CLI.
+
+Barrel modules load their exports lazily and the CLI imports command groups
+only when they are invoked. These tests run ``python -X importtime`` in a
+fresh interpreter and fail when a change makes startup pay for heavy
+dependencies again.
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+# Cumulative import time budgets in milliseconds. Loading pandas alone takes
+# several hundred milliseconds, so an eager import anywhere blows these.
+IMPORT_BUDGETS_MS = {
+    'autotasktracker': 250,
+    'autotasktracker.cli.main': 400,
+}
+
+# Modules that must not be loaded just by importing the package or the CLI
+HEAVY_MODULES = (
+    'pandas', 'numpy', 'PIL', 'imagehash', 'requests', 'websockets', 'aiohttp',
+    'fastapi', 'uvicorn', 'streamlit', 'psycopg2', 'sentence_transformers', 'torch',
+)
+
+
+def _run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, '-c', code],
+        cwd=REPO_ROOT, capture_output=True, text=True, timeout=120, check=True,
+    )
+
+
+def _cumulative_import_ms(module: str) -> float:
+    """Cumulative import time of ``module`` as reported by ``-X importtime``."""
+    stderr = _run(f'import {module}', '-X', 'importtime').stderr
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, _, cumulative, name = [part.strip() for part in line.replace('import time:', '|', 1).split('|')]
+        if name == module:
+            return int(cumulative) / 1000
+    raise AssertionError(f"{module} not found in -X importtime output")
+
+
+def _loaded_heavy_modules(code: str):
+    output = _run(f"{code}\nimport json, sys\n"
+                  f"print(json.dumps(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules)))").stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize('module', sorted(IMPORT_BUDGETS_MS))
+def test_import_time_within_budget(module):
+    # Best of three runs to absorb a cold filesystem cache
+    elapsed = min(_cumulative_import_ms(module) for _ in range(3))
+
+    assert elapsed < IMPORT_BUDGETS_MS[module], \
+        f"import {module} took {elapsed:.0f}ms (budget {IMPORT_BUDGETS_MS[module]}ms)"
+
+
+@pytest.mark.parametrize('code', [
+    'import autotasktracker',
+    'import autotasktracker.core, autotasktracker.ai, autotasktracker.pensieve',
+    'import autotasktracker.cli.main',
+    'from autotasktracker.config import get_config; get_config()',
+])
+def test_imports_do_not_load_heavy_dependencies(code):
+    assert _loaded_heavy_modules(code) == []
+
+
+def test_version_command_skips_command_groups():
+    output = _run(
+        "import sys\n"
+        "from click.testing import CliRunner\n"
+        "from autotasktracker.cli.main import cli\n"
+        "result = CliRunner().invoke(cli, ['version'])\n"
+        "assert result.exit_code == 0, result.output\n"
+        "print(sorted(m for m in sys.modules if m.startswith('autotasktracker.cli.commands.')))"
+    ).stdout
+
+    assert output.strip().splitlines()[-1] == '[]'
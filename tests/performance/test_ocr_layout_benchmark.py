@@ -0,0 +1,212 @@
+"""
+Throughput benchmark for the compiled OCR layout engine.
+
+Replays OCR payloads through the original per-pattern layout analysis and
+through OCRLayoutEngine, checks both produce the same layout, and reports
+fragments per second for each. Payloads are synthetic RapidOCR captures of
+dense IDE screens (menu bar, tabs, file tree, editor, status bar) unless a
+file of recorded payloads is given, one ``ocr_result`` value per line.
+
+The speedup assertion only runs with ``AUTOTASK_BENCHMARKS=1``; the default
+suite checks the layouts alone. Run directly for a JSON report:
+    python -m tests.performance.test_ocr_layout_benchmark [payloads.jsonl]
+"""
+import json
+import random
+import re
+import statistics
+import sys
+import time
+
+import pytest
+
+from autotasktracker.ai import ocr_layout
+from autotasktracker.ai.ocr_layout import CODE_PATTERNS, UI_PATTERNS, OCRLayout, OCRLayoutEngine, OCRResult
+
+PAYLOADS = 20
+CODE_LINES = 900
+MIN_SPEEDUP = 1.3
+
+
+class ReferenceLayoutAnalyzer:
+    """The layout analysis OCREnhancer used before the compiled engine."""
+
+    def __init__(self, confidence_threshold=0.7):
+        self.confidence_threshold = confidence_threshold
+
+    def parse(self, ocr_data):
+        if isinstance(ocr_data, dict):
+            ocr_data = [[r.get('bbox'), r.get('text', ''), r.get('confidence', 0.0)]
+                        for r in ocr_data.get('results', [])]
+        results = []
+        for item in ocr_data:
+            if isinstance(item, list) and len(item) >= 2:
+                bbox, text = item[0], item[1]
+                confidence = item[2] if len(item) > 2 else 0.0
+                if text and confidence > 0.5:
+                    results.append(OCRResult(text=text.strip(), confidence=round(float(confidence), 4),
+                                             bbox=self._parse_bbox(bbox)))
+        return results
+
+    def _parse_bbox(self, bbox):
+        if not isinstance(bbox, list) or len(bbox) < 4:
+            return None
+        if isinstance(bbox[0], list):
+            x_coords = [p[0] for p in bbox]
+            y_coords = [p[1] for p in bbox]
+            return (min(x_coords), min(y_coords), max(x_coords) - min(x_coords), max(y_coords) - min(y_coords))
+        return tuple(bbox[:4])
+
+    def analyze(self, ocr_results):
+        confidences = [r.confidence for r in ocr_results]
+        title_regions, code_regions, ui_elements, body_text = [], [], [], []
+        max_y = max((r.bbox[1] + r.bbox[3] for r in ocr_results if r.bbox), default=1000)
+        for i, result in enumerate(ocr_results):
+            result.line_number = i
+            if result.bbox and result.bbox[1] < max_y * 0.2:
+                if (len(result.text) < 100 and result.confidence > self.confidence_threshold
+                        and not self._is_code(result.text)):
+                    result.is_title = True
+                    title_regions.append(result)
+                    continue
+            if self._is_code(result.text):
+                result.is_code = True
+                code_regions.append(result)
+            elif self._is_ui_element(result.text):
+                result.is_ui_element = True
+                ui_elements.append(result)
+            else:
+                body_text.append(result)
+        return OCRLayout(title_regions, code_regions, ui_elements, body_text, statistics.mean(confidences),
+                         len([c for c in confidences if c >= self.confidence_threshold]) / len(confidences))
+
+    def _is_code(self, text):
+        for pattern in CODE_PATTERNS:
+            if re.search(pattern, text, re.IGNORECASE):
+                return True
+        special_chars = sum(1 for c in text if c in '{}[]()<>;:=+-*/%&|')
+        return len(text) > 0 and special_chars / len(text) > 0.15
+
+    def _is_ui_element(self, text):
+        text = text.strip()
+        for pattern in UI_PATTERNS:
+            if re.match(pattern, text, re.IGNORECASE):
+                return True
+        if len(text) < 20:
+            if text.isupper() and len(text.split()) <= 2:
+                return True
+            if re.match(r'^[^\w\s]+\s*\w+', text):
+                return True
+        return False
+
+
+def _quad(x, y, width, height):
+    return [[x, y], [x + width, y], [x + width, y + height], [x, y + height]]
+
+
+def make_ide_payload(rng: random.Random, code_lines: int = CODE_LINES) -> str:
+    """One dense IDE capture in RapidOCR format."""
+    words = ['user', 'session', 'cache', 'result', 'payload', 'index', 'query', 'config', 'value', 'items']
+    fragments = []
+    for x, label in enumerate(['File', 'Edit', 'View', 'Go', 'Run', 'Terminal', 'Help']):
+        fragments.append([_quad(10 + 60 * x, 4, 50, 18), label, rng.uniform(0.85, 0.99)])
+    for x in range(6):
+        fragments.append([_quad(250 + 180 * x, 40, 160, 20), f"{rng.choice(words)}_{x}.py", rng.uniform(0.6, 0.99)])
+    for y in range(60):
+        fragments.append([_quad(10, 80 + 16 * y, 200, 14), f"{rng.choice(words)}_{y}.py", rng.uniform(0.4, 0.99)])
+    templates = [
+        'def {a}_{b}(self, {c}):', 'class {A}{B}:', '# TODO: refresh {a} {b}', 'return self.{a}[{c}]',
+        'if {a} == {b}:', '{a} = {b}.get("{c}")', 'for {a} in {b}:', 'import {a}', 'logger.info(f"{a} {b}")',
+        '"""{A} the {b} for the {c}."""', '{a}_{b}', 'await {a}.{b}()',
+    ]
+    for y in range(code_lines):
+        a, b, c = rng.sample(words, 3)
+        text = rng.choice(templates).format(a=a, b=b, c=c, A=a.title(), B=b.title())
+        fragments.append([_quad(260 + 8 * rng.randint(0, 12), 80 + y, 8 * len(text), 14), text,
+                          rng.uniform(0.45, 0.99)])
+    for x, label in enumerate(['LN 42, COL 7', 'UTF-8', 'Python 3.11', '⚠ 3', 'main']):
+        fragments.append([_quad(10 + 120 * x, 1060, 100, 16), label, rng.uniform(0.7, 0.99)])
+    return json.dumps(fragments)
+
+
+def _layout_signature(layout):
+    def region(results):
+        return [(r.line_number, r.text, r.confidence, r.bbox) for r in results]
+    return (region(layout.title_regions), region(layout.code_regions), region(layout.ui_elements),
+            region(layout.body_text), round(layout.high_confidence_ratio, 12))
+
+
+def run_benchmark(payloads, rounds: int = 3) -> dict:
+    """Time both analyzers over the payloads and check their layouts agree.
+
+    Payload decoding is timed on its own: it is the same work for both
+    analyzers unless orjson is installed.
+    """
+    reference, engine = ReferenceLayoutAnalyzer(), OCRLayoutEngine()
+
+    start = time.perf_counter()
+    decoded = [ocr_layout._loads(payload) for payload in payloads]
+    decode_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for payload in payloads:
+        json.loads(payload)
+    json_seconds = time.perf_counter() - start
+
+    mismatches = 0
+    for data in decoded:
+        expected = reference.analyze(reference.parse(data))
+        actual = engine.analyze(engine.parse(data))
+        if (_layout_signature(actual) != _layout_signature(expected)
+                or abs(actual.average_confidence - expected.average_confidence) > 1e-12):
+            mismatches += 1
+    fragments = sum(len(reference.parse(data)) for data in decoded)
+
+    def best_of(analyze):
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for data in decoded:
+                analyze(data)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    timings = {
+        'reference': best_of(lambda data: reference.analyze(reference.parse(data))),
+        'compiled': best_of(lambda data: engine.analyze(engine.parse(data))),
+    }
+    return {
+        'payloads': len(payloads),
+        'fragments': fragments,
+        'mismatched_layouts': mismatches,
+        'decoder': 'orjson' if ocr_layout.orjson else 'json',
+        'decode_speedup': round(json_seconds / decode_seconds, 2),
+        'fragments_per_second': {name: round(fragments / seconds) for name, seconds in timings.items()},
+        'speedup': round(timings['reference'] / timings['compiled'], 2),
+    }
+
+
+class TestOCRLayoutBenchmark:
+    """Benchmark the compiled engine against the original analysis."""
+
+    @pytest.fixture(scope='class')
+    def report(self):
+        rng = random.Random(11)
+        return run_benchmark([make_ide_payload(rng) for _ in range(PAYLOADS)])
+
+    def test_layouts_match_reference(self, report):
+        assert report['fragments'] > PAYLOADS * CODE_LINES // 2
+        assert report['mismatched_layouts'] == 0
+
+    @pytest.mark.benchmark
+    def test_compiled_engine_is_faster(self, report):
+        assert report['speedup'] >= MIN_SPEEDUP, json.dumps(report, indent=2)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as f:
+            recorded = [line.strip() for line in f if line.strip()]
+    else:
+        rng = random.Random(11)
+        recorded = [make_ide_payload(rng) for _ in range(PAYLOADS)]
+    print(json.dumps(run_benchmark(recorded), indent=2))
@@ -0,0 +1,186 @@
+"""
+Relevance and latency benchmark for the hybrid search engine.
+
+Builds a synthetic corpus in which neither retriever is sufficient on its
+own: half of each topic's screenshots name the topic keyword in the window
+title (the rest use a synonym only the embedding captures), and unrelated
+screenshots mention the keyword in their OCR text. Each query is scored by
+recall@k and mean reciprocal rank for the full-text retriever alone, the
+vector retriever alone and the fused engine, alongside per-retriever
+latency percentiles.
+
+Run directly for a JSON report:
+    python -m tests.performance.test_search_benchmark
+"""
+import json
+import random
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from autotasktracker.core.connection_pool import LatencyHistogram
+from autotasktracker.core.text_index import TextIndex
+from autotasktracker.pensieve.advanced_search import SearchQuery
+from autotasktracker.pensieve.hybrid_search import (
+    SEARCH_BUCKETS_MS, FullTextRetriever, HybridSearchEngine, RecencyRetriever, SearchFilters,
+    VectorRetriever,
+)
+
+TOPICS = 60
+SHOTS_PER_TOPIC = 30
+DISTRACTORS_PER_TOPIC = 20
+DIMENSIONS = 32
+TOP_K = 30
+
+
+class BenchmarkDatabase:
+    """SQLite database with the Pensieve tables the search engine reads."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with self.get_connection() as conn:
+            conn.execute("CREATE TABLE entities (id INTEGER PRIMARY KEY, filepath TEXT, created_at TIMESTAMP)")
+            conn.execute("CREATE TABLE metadata_entries (id INTEGER PRIMARY KEY, entity_id INTEGER, key TEXT, value TEXT)")
+
+    @contextmanager
+    def get_connection(self, readonly: bool = True):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def get_database_type(self) -> str:
+        return 'sqlite'
+
+
+def build_corpus(path, seed: int = 7):
+    """Create the synthetic corpus.
+
+    Returns:
+        (database, text index, topic centroids, {keyword: relevant entity ids})
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    db = BenchmarkDatabase(path)
+    index = TextIndex(db)
+    index.ensure_schema()
+
+    centroids = np_rng.normal(size=(TOPICS, DIMENSIONS))
+    keywords = [f"kw{topic:03d}" for topic in range(TOPICS)]
+    synonyms = [f"syn{topic:03d}" for topic in range(TOPICS)]
+    shots = [(topic, i < SHOTS_PER_TOPIC // 2) for topic in range(TOPICS) for i in range(SHOTS_PER_TOPIC)]
+    rng.shuffle(shots)
+
+    relevant = {keyword: set() for keyword in keywords}
+    entities, metadata = [], []
+    now = datetime.now()
+    for entity_id, (topic, names_keyword) in enumerate(shots, start=1):
+        created_at = (now - timedelta(minutes=entity_id)).isoformat(sep=' ')
+        entities.append((entity_id, f"/shots/{entity_id}.png", created_at))
+        title_word = keywords[topic] if names_keyword else synonyms[topic]
+        metadata.append((entity_id, 'active_window', f"{title_word} notes - Editor"))
+        embedding = centroids[topic] + np_rng.normal(scale=2.5, size=DIMENSIONS)
+        metadata.append((entity_id, 'task_embedding', json.dumps(embedding.round(4).tolist())))
+        relevant[keywords[topic]].add(entity_id)
+
+    # Screenshots of other topics whose OCR text mentions a keyword in passing
+    for topic, keyword in enumerate(keywords):
+        others = [e for e, (t, _) in enumerate(shots, start=1) if t != topic]
+        for entity_id in rng.sample(others, DISTRACTORS_PER_TOPIC):
+            ocr = [[[0, 0, 1, 1], f"see also {keyword} in the appendix", 0.9]]
+            metadata.append((entity_id, 'ocr_result', json.dumps(ocr)))
+
+    with db.get_connection(readonly=False) as conn:
+        conn.execute("BEGIN")
+        conn.executemany("INSERT INTO entities (id, filepath, created_at) VALUES (?, ?, ?)", entities)
+        conn.executemany("INSERT INTO metadata_entries (entity_id, key, value) VALUES (?, ?, ?)", metadata)
+        conn.execute("COMMIT")
+
+    return db, index, centroids, relevant
+
+
+def run_benchmark(path) -> dict:
+    """Score full-text, vector and fused retrieval on the synthetic corpus."""
+    db, index, centroids, relevant = build_corpus(path)
+    keyword_topics = {keyword: topic for topic, keyword in enumerate(relevant)}
+
+    def embed(text):
+        return centroids[keyword_topics[text]]
+
+    fulltext = FullTextRetriever(index)
+    vector = VectorRetriever(db, embed_query=embed)
+    engine = HybridSearchEngine(db, retrievers=[fulltext, vector, RecencyRetriever(db)])
+    vector.refresh()
+
+    def score(ranked_ids, wanted):
+        top = ranked_ids[:TOP_K]
+        recall = len(wanted.intersection(top)) / len(wanted)
+        reciprocal = next((1 / rank for rank, entity_id in enumerate(top, 1) if entity_id in wanted), 0.0)
+        return recall, reciprocal
+
+    methods = {'fulltext': [], 'vector': [], 'hybrid': []}
+    latency = LatencyHistogram(SEARCH_BUCKETS_MS)
+    filters = SearchFilters(limit=100)
+    try:
+        for keyword, wanted in relevant.items():
+            methods['fulltext'].append(score([h.entity_id for h in fulltext.retrieve(keyword, filters)], wanted))
+            methods['vector'].append(score([h.entity_id for h in vector.retrieve(keyword, filters)], wanted))
+            start = time.perf_counter()
+            results = engine.search(SearchQuery(text=keyword, max_results=TOP_K, min_relevance=0.0))
+            latency.record((time.perf_counter() - start) * 1000)
+            methods['hybrid'].append(score([r.entity_id for r in results], wanted))
+
+        report = {
+            'corpus_size': TOPICS * SHOTS_PER_TOPIC,
+            'queries': len(relevant),
+            'top_k': TOP_K,
+            'relevance': {
+                name: {
+                    f'recall@{TOP_K}': float(np.mean([r for r, _ in scores])),
+                    'mrr': float(np.mean([m for _, m in scores])),
+                }
+                for name, scores in methods.items()
+            },
+            'search_latency_ms': {k: v for k, v in latency.snapshot().items() if k != 'buckets'},
+            'retriever_latency_ms': engine.retriever_stats(),
+        }
+    finally:
+        engine.shutdown()
+    return report
+
+
+class TestHybridSearchBenchmark:
+    """Benchmark fused retrieval against its individual retrievers."""
+
+    @pytest.fixture(scope='class')
+    def report(self, tmp_path_factory):
+        return run_benchmark(tmp_path_factory.mktemp('search') / 'bench.db')
+
+    def test_fusion_beats_each_retriever(self, report):
+        relevance = report['relevance']
+        recall = f'recall@{TOP_K}'
+        print(json.dumps(relevance, indent=2))
+
+        assert relevance['hybrid'][recall] > relevance['fulltext'][recall]
+        assert relevance['hybrid'][recall] > relevance['vector'][recall]
+        assert relevance['hybrid']['mrr'] >= max(relevance['fulltext']['mrr'], relevance['vector']['mrr']) - 0.05
+
+    def test_search_latency(self, report):
+        print(json.dumps(report['retriever_latency_ms'], indent=2))
+
+        assert report['search_latency_ms']['count'] == report['queries']
+        assert report['search_latency_ms']['p95_ms'] < 250
+        for name in ('fulltext', 'vector', 'recency'):
+            assert report['retriever_latency_ms'][name]['count'] == report['queries']
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        print(json.dumps(run_benchmark(Path(directory) / 'bench.db'), indent=2))
@@ -17,6 +17,7 @@ import pandas as pd
 import numpy as np
 
 from autotasktracker.dashboards.advanced_analytics import AdvancedAnalyticsDashboard
+from autotasktracker.dashboards.data.models import DailyTaskGroups
 
 
 class TestAdvancedAnalyticsDashboard:
@@ -370,32 +371,28 @@ class TestAdvancedAnalyticsDashboard:
     
     def test_get_pattern_analysis(self, dashboard, mock_db_manager):
         """Test pattern analysis generation."""
-        # Create mock task groups for a full week
+        # Create mock per-day aggregates for a full week
         mock_repo = Mock()
-        
-        def mock_get_task_groups(start, end):
-            # Return different data for each day of the week
-            task_data = {
-                1: ('Development', 60, 10),  # Monday
-                2: ('Development', 120, 11), # Tuesday  
-                3: ('Communication', 45, 9), # Wednesday
-                4: ('Development', 90, 10),  # Thursday
-                5: ('Productivity', 75, 11), # Friday
-                6: ('Other', 30, 12),        # Saturday
-                7: ('Development', 40, 10),  # Sunday
-            }
-            
-            if start.day in task_data:
-                category, duration, hour = task_data[start.day]
-                task = Mock()
-                task.category = category
-                task.duration_minutes = duration
-                task.start_time = datetime(2024, 1, start.day, hour)
-                return [task]
-            else:
-                return []
-        
-        mock_repo.get_task_groups.side_effect = mock_get_task_groups
+        task_data = [
+            # (date, category, duration, peak hour)
+            (datetime(2024, 1, 1), 'Development', 60, 10),
+            (datetime(2024, 1, 2), 'Development', 120, 11),
+            (datetime(2024, 1, 3), 'Communication', 45, 9),
+            (datetime(2024, 1, 4), 'Development', 90, 10),
+            (datetime(2024, 1, 5), 'Productivity', 75, 11),
+            (datetime(2024, 1, 6), 'Other', 30, 12),
+            (datetime(2024, 1, 7), 'Development', 40, 10),
+        ]
+        daily = pd.DataFrame({
+            'date': pd.to_datetime([d for d, _, _, _ in task_data]),
+            'total_time': [dur for _, _, dur, _ in task_data],
+            'productive_time': [dur if cat in ('Development', 'Productivity') else 0
+                                for _, cat, dur, _ in task_data],
+            'tasks_count': [1] * len(task_data),
+            'avg_task_duration': [dur for _, _, dur, _ in task_data],
+            'peak_hour': [hour for _, _, _, hour in task_data],
+        })
+        mock_repo.get_task_groups_by_day.return_value = DailyTaskGroups(groups={}, daily=daily, task_count=7)
         
         with patch('autotasktracker.dashboards.advanced_analytics.TaskRepository', return_value=mock_repo):
             df, patterns = dashboard.get_pattern_analysis(
@@ -404,21 +401,29 @@ class TestAdvancedAnalyticsDashboard:
                 smoothing_window=2
             )
         
-        # Verify results
+        # Verify results - the whole range is fetched in one call
+        mock_repo.get_task_groups_by_day.assert_called_once()
+        mock_repo.get_task_groups.assert_not_called()
         assert df is not None
+        assert len(df) == 7
         assert isinstance(patterns, dict)
         assert 'weekly_pattern' in patterns
         assert 'trend_direction' in patterns
         assert 'anomalies' in patterns
         assert 'correlations' in patterns
         
+        assert patterns['weekly_pattern']['most_productive_day'] == 'Tuesday'
+        
         # Test with no data - use different dates to avoid cache hit
-        mock_repo.get_task_groups.return_value = []
-        result = dashboard.get_pattern_analysis(
-            datetime(2024, 1, 10),  # Different dates to avoid cache
-            datetime(2024, 1, 12),
-            smoothing_window=2
+        mock_repo.get_task_groups_by_day.return_value = DailyTaskGroups(
+            groups={}, daily=daily.iloc[0:0], task_count=0
         )
+        with patch('autotasktracker.dashboards.advanced_analytics.TaskRepository', return_value=mock_repo):
+            result = dashboard.get_pattern_analysis(
+                datetime(2024, 1, 10),  # Different dates to avoid cache
+                datetime(2024, 1, 12),
+                smoothing_window=2
+            )
         assert result is None
     
     def test_ai_insights_generation(self, dashboard):
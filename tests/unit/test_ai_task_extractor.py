@@ -0,0 +1,189 @@
+"""
+Tests for batched AI-enhanced task extraction.
+
+Runs the embeddings engine against an SQLite stand-in for the Pensieve schema to cover:
+- Batched neighbour search matching per-entity semantic search
+- Blocked scoring, self-exclusion and similarity thresholds
+- Batch extraction matching single extraction, in input order, with memoized extractors
+- The comparison pipelines consuming the batch API
+"""
+import json
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+
+from autotasktracker.ai.ai_task_extractor import AIEnhancedTaskExtractor
+from autotasktracker.ai.embeddings_search import EmbeddingsSearchEngine
+from autotasktracker.comparison.pipelines.ai_full import AIFullPipeline
+
+DIMENSIONS = 8
+
+
+class EmbeddingDatabase:
+    """SQLite database with the entity columns the embeddings engine reads."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with self.get_connection() as conn:
+            conn.execute("""CREATE TABLE entities (id INTEGER PRIMARY KEY, filepath TEXT, filename TEXT,
+                            file_type_group TEXT, created_at TIMESTAMP)""")
+            conn.execute("CREATE TABLE metadata_entries (id INTEGER PRIMARY KEY, entity_id INTEGER, key TEXT, value TEXT)")
+
+    @contextmanager
+    def get_connection(self, readonly: bool = True):
+        conn = sqlite3.connect(self.path, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def add_shot(self, title, embedding=None, age_hours=1.0):
+        created_at = (datetime.now(timezone.utc) - timedelta(hours=age_hours)).strftime('%Y-%m-%d %H:%M:%S')
+        with self.get_connection() as conn:
+            entity_id = conn.execute(
+                "INSERT INTO entities (filepath, filename, file_type_group, created_at) VALUES (?, ?, 'image', ?)",
+                (f"/shots/{title}.png", f"{title}.png", created_at)
+            ).lastrowid
+            conn.execute("INSERT INTO metadata_entries (entity_id, key, value) VALUES (?, 'active_window', ?)",
+                         (entity_id, title))
+            if embedding is not None:
+                conn.execute("INSERT INTO metadata_entries (entity_id, key, value) VALUES (?, 'embedding', ?)",
+                             (entity_id, json.dumps(list(map(float, embedding)))))
+        return entity_id
+
+
+@pytest.fixture
+def db(tmp_path):
+    return EmbeddingDatabase(tmp_path / 'embeddings.db')
+
+
+@pytest.fixture
+def engine(db):
+    with patch('autotasktracker.ai.embeddings_search.DatabaseManager', EmbeddingDatabase):
+        engine = EmbeddingsSearchEngine(db)
+    engine.embedding_dim = DIMENSIONS
+    return engine
+
+
+@pytest.fixture
+def clustered_shots(db):
+    """Three clusters of near-identical embeddings plus one stale screenshot."""
+    rng = np.random.default_rng(3)
+    centroids = rng.normal(size=(3, DIMENSIONS))
+    ids = []
+    for i in range(12):
+        vector = centroids[i % 3] + rng.normal(scale=0.1, size=DIMENSIONS)
+        ids.append(db.add_shot(f"Project {i % 3} - Editor", vector, age_hours=i * 0.2))
+    db.add_shot("Project 0 - Editor", centroids[0], age_hours=10)
+    return ids
+
+
+class TestBatchSemanticSearch:
+    """Test batched neighbour search."""
+
+    def test_batch_matches_single_entity_search(self, engine, clustered_shots):
+        batch = engine.semantic_search_batch(clustered_shots, limit=3, similarity_threshold=0.8,
+                                             time_window_hours=4, block_size=5)
+
+        assert list(batch) == clustered_shots
+        for entity_id in clustered_shots:
+            single = engine.semantic_search(entity_id, limit=3, similarity_threshold=0.8, time_window_hours=4)
+            assert len(single) == 3
+            assert [r['id'] for r in batch[entity_id]] == [r['id'] for r in single]
+            assert [r['similarity_score'] for r in batch[entity_id]] == pytest.approx(
+                [r['similarity_score'] for r in single], abs=1e-6)
+            assert batch[entity_id][0]['active_window'] == single[0]['active_window'] == f"Project {(entity_id - 1) % 3} - Editor"
+
+    def test_excludes_self_and_applies_threshold_and_window(self, db, engine):
+        a = db.add_shot('a', [1, 0, 0, 0, 0, 0, 0, 0])
+        b = db.add_shot('b', [0.9, 0.1, 0, 0, 0, 0, 0, 0])
+        c = db.add_shot('c', [0, 1, 0, 0, 0, 0, 0, 0])
+        old = db.add_shot('old', [1, 0, 0, 0, 0, 0, 0, 0], age_hours=8)
+
+        batch = engine.semantic_search_batch([a, c, old], similarity_threshold=0.8, time_window_hours=4)
+
+        assert [r['id'] for r in batch[a]] == [b]
+        assert batch[c] == []
+        # Entities outside the window still get neighbours from inside it
+        assert [r['id'] for r in batch[old]] == [a, b]
+
+    def test_entities_without_embeddings_get_no_neighbours(self, db, engine):
+        a = db.add_shot('a', [1, 0, 0, 0, 0, 0, 0, 0])
+        bare = db.add_shot('bare')
+
+        assert engine.semantic_search_batch([bare, a]) == {bare: [], a: []}
+
+
+class TestBatchExtraction:
+    """Test batch extraction against single extraction."""
+
+    @pytest.fixture
+    def extractor(self, engine):
+        extractor = AIEnhancedTaskExtractor()
+        extractor.embeddings_engine = engine
+        return extractor
+
+    def test_batch_results_match_single_extraction_in_order(self, extractor, clustered_shots):
+        ocr = json.dumps([[[0, 0, 10, 10], 'def main():', 0.95], [[0, 20, 10, 30], 'return 0', 0.9]])
+        rows = [
+            {'window_title': f"Project {i % 3} - Editor", 'ocr_text': ocr if i % 2 else None, 'entity_id': entity_id}
+            for i, entity_id in enumerate(clustered_shots)
+        ]
+        rows.append({'window_title': None, 'ocr_text': None, 'entity_id': None})
+
+        batch = extractor.extract_enhanced_tasks_batch(rows)
+
+        assert len(batch) == len(rows)
+        for row, result in zip(rows, batch):
+            assert result == extractor.extract_enhanced_task(**row)
+        assert batch[0]['ai_features']['embeddings_available']
+        assert batch[-1]['similar_tasks'] == []
+
+    def test_extractors_run_once_per_distinct_input(self, extractor, clustered_shots):
+        rows = [{'window_title': f"Project {i % 3} - Editor", 'entity_id': entity_id}
+                for i, entity_id in enumerate(clustered_shots)]
+
+        with patch.object(extractor.base_extractor, 'extract_task',
+                          wraps=extractor.base_extractor.extract_task) as extract_task, \
+                patch.object(extractor.embeddings_engine, 'semantic_search') as single_search:
+            extractor.extract_enhanced_tasks_batch(rows)
+
+        assert extract_task.call_count == 3
+        single_search.assert_not_called()
+
+    def test_similarity_errors_do_not_fail_the_batch(self, extractor):
+        extractor.embeddings_engine = Mock()
+        extractor.embeddings_engine.semantic_search_batch.side_effect = RuntimeError('db down')
+
+        result, = extractor.extract_enhanced_tasks_batch([{'window_title': 'main.py - VS Code', 'entity_id': 1}])
+
+        assert result['similar_tasks'] == []
+        assert result["tasks"]
+
+
+class TestPipelineBatch:
+    """Test the comparison pipeline batch path."""
+
+    def test_ai_pipeline_processes_batch_with_one_extractor_call(self):
+        with patch('autotasktracker.comparison.pipelines.ai_full.DatabaseManager'), \
+                patch('autotasktracker.comparison.pipelines.ai_full.AIEnhancedTaskExtractor') as extractor_cls, \
+                patch('autotasktracker.comparison.pipelines.ai_full.VLMTaskExtractor'):
+            pipeline = AIFullPipeline()
+        extractor = extractor_cls.return_value
+        extractor.extract_enhanced_tasks_batch.side_effect = lambda rows: [
+            {"tasks": row['window_title'], "category": 'Coding', 'confidence': 0.5, 'similar_tasks': []}
+            for row in rows
+        ]
+        screenshots = [{"active_window": title, 'id': i, 'ocr_result': float('nan')}
+                       for i, title in enumerate(['a', 'b', 'a'])]
+
+        results = pipeline.process_batch(screenshots)
+
+        assert [r["tasks"] for r in results] == ['a', 'b', 'a']
+        extractor.extract_enhanced_tasks_batch.assert_called_once()
+        extractor.extract_enhanced_task.assert_not_called()
@@ -0,0 +1,210 @@
+"""
+Tests for the backfill engine.
+
+Recomputes tasks and categories of a SQLite stand-in and checks chunk
+planning, versioned results that stay invisible until cutover, resuming
+after interruption or failed chunks, the process pool, and yielding to
+live processing.
+"""
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from click.testing import CliRunner
+
+from autotasktracker.core.backfill import (
+    BackfillEngine, RUN_LIVE, RUN_READY, RUN_RUNNING, compute_chunk,
+)
+from autotasktracker.core.categorizer import ActivityCategorizer
+from autotasktracker.core.task_extractor import get_task_extractor
+from tests.unit.test_processing_ledger import SQLiteTestDatabase
+
+START = datetime(2024, 5, 1)
+END = datetime(2024, 6, 1)
+WINDOWS = ['main.py - VS Code', 'Inbox - Gmail', 'Terminal - zsh', 'Zoom Meeting']
+
+
+@pytest.fixture
+def db(tmp_path):
+    """25 May screenshots with stale tasks, one without a window, and one from June."""
+    db = SQLiteTestDatabase(tmp_path / 'backfill.db')
+    with db.get_connection(readonly=False) as conn:
+        for i in range(27):
+            captured_at = START + timedelta(hours=i) if i < 26 else END + timedelta(hours=1)
+            conn.execute("INSERT INTO entities (filepath, created_at) VALUES (?, ?)",
+                         (f"/shots/{i}.png", captured_at.isoformat(sep=' ')))
+    for entity_id in range(1, 28):
+        if entity_id != 13:
+            db.add_metadata(entity_id, 'active_window', WINDOWS[entity_id % len(WINDOWS)])
+        db.add_metadata(entity_id, 'tasks', 'Old task')
+        db.add_metadata(entity_id, 'category', 'Old category')
+    return db
+
+
+@pytest.fixture
+def engine(db):
+    return BackfillEngine(db, workers=1, chunk_size=10, yield_backlog=None)
+
+
+def _live(db, key):
+    with db.get_connection() as conn:
+        return dict(conn.execute("SELECT entity_id, value FROM metadata_entries WHERE key = ?", (key,)))
+
+
+def _expected_task(entity_id):
+    return get_task_extractor().extract_task(WINDOWS[entity_id % len(WINDOWS)]) or "Unknown Activity"
+
+
+class TestPlanning:
+    """Test splitting a range into chunks."""
+
+    def test_range_is_split_into_id_chunks(self, engine):
+        run = engine.plan('tasks', START, END, version='v2')
+
+        assert run.run_id == 'tasks-v2' and run.status == RUN_RUNNING
+        assert engine._chunks(run, ('pending',)) == [(1, 11), (11, 21), (21, 27)]
+        assert engine.status(run)['total_chunks'] == 3
+
+    def test_empty_range_is_ready_immediately(self, engine):
+        run = engine.plan('tasks', datetime(2023, 1, 1), datetime(2023, 2, 1), version='empty')
+
+        assert run.status == RUN_READY and engine.status(run)['total_chunks'] == 0
+
+    def test_duplicate_version_and_bad_stage_are_rejected(self, engine):
+        engine.plan('tasks', START, END, version='v2')
+
+        with pytest.raises(ValueError):
+            engine.plan('tasks', START, END, version='v2')
+        with pytest.raises(ValueError):
+            engine.plan('vlm', START, END)
+
+
+class TestComputeAndCutover:
+    """Test versioned results and making them live."""
+
+    def test_results_stay_invisible_until_cutover(self, engine, db):
+        run = engine.plan('tasks', START, END, version='v2')
+
+        totals = engine.run(run)
+
+        assert totals == {'chunks': 3, 'failed': 0, 'rows': 50}
+        assert run.status == RUN_READY
+        assert set(_live(db, 'tasks').values()) == {'Old task'}
+
+        assert engine.cutover(run) == 50
+        tasks, categories = _live(db, 'tasks'), _live(db, 'category')
+        assert tasks[1] == _expected_task(1)
+        assert categories[1] == ActivityCategorizer.categorize(WINDOWS[1])
+        # No window title: nothing recomputed; outside the range: untouched
+        assert tasks[13] == 'Old task' and tasks[27] == 'Old task'
+        assert len(tasks) == 27
+        assert engine.get_run(run.run_id).status == RUN_LIVE
+        with db.get_connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM derived_metadata_versions").fetchone()[0] == 0
+
+    def test_category_stage_only_touches_categories(self, engine, db):
+        run = engine.plan('category', START, END, version='c1')
+        engine.run(run)
+        engine.cutover(run)
+
+        assert set(_live(db, 'tasks').values()) == {'Old task'}
+        assert _live(db, 'category')[2] == ActivityCategorizer.categorize(WINDOWS[2])
+
+    def test_cutover_requires_a_computed_run(self, engine):
+        run = engine.plan('tasks', START, END, version='v2')
+
+        with pytest.raises(ValueError):
+            engine.cutover(run)
+
+    def test_process_pool_matches_inline_results(self, db):
+        inline = BackfillEngine(db, workers=1, chunk_size=10, yield_backlog=None)
+        pooled = BackfillEngine(db, workers=2, chunk_size=10, yield_backlog=None, niceness=0)
+
+        inline.run(inline.plan('tasks', START, END, version='inline'))
+        pooled.run(pooled.plan('tasks', START, END, version='pooled'))
+
+        with db.get_connection() as conn:
+            rows = {version: sorted(conn.execute(
+                "SELECT entity_id, key, value FROM derived_metadata_versions WHERE version = ?", (version,)))
+                for version in ('inline', 'pooled')}
+        assert rows['inline'] == rows['pooled'] and len(rows['inline']) == 50
+
+
+class TestResume:
+    """Test checkpoints, failures and throttling."""
+
+    def test_interrupted_run_resumes_with_remaining_chunks(self, engine):
+        run = engine.plan('tasks', START, END, version='v2')
+        stop = threading.Event()
+
+        first = engine.run(run, on_chunk=lambda totals: stop.set(), stop=stop)
+        second = engine.run(run)
+
+        assert first['chunks'] == 1 and second['chunks'] == 2
+        assert engine.status(run)['rows'] == 50 and run.status == RUN_READY
+
+    def test_failed_chunk_is_retried_on_the_next_run(self, engine):
+        run = engine.plan('tasks', START, END, version='v2')
+        calls = []
+
+        def flaky(stage, items):
+            calls.append(items[0]['id'])
+            if len(calls) == 2:
+                raise RuntimeError('extractor crashed')
+            return compute_chunk(stage, items)
+
+        with patch('autotasktracker.core.backfill.compute_chunk', side_effect=flaky):
+            first = engine.run(run)
+        assert first['failed'] == 1 and run.status == RUN_RUNNING
+        assert engine.status(run)['chunks'] == {'done': 2, 'failed': 1}
+
+        assert engine.run(run)['chunks'] == 1
+        assert run.status == RUN_READY
+
+    def test_pauses_while_live_processing_is_behind(self, db):
+        engine = BackfillEngine(db, workers=1, chunk_size=10, yield_backlog=100, yield_poll=0)
+        run = engine.plan('tasks', START, END, version='v2')
+
+        with patch.object(engine, 'live_backlog', side_effect=[900, 400, 0, 0, 0]) as backlog:
+            engine.run(run)
+
+        assert backlog.call_count == 5
+
+    def test_live_backlog_counts_entities_above_the_watermark(self, engine, db):
+        run = engine.plan('tasks', START, END, version='v2')
+        assert engine.live_backlog(run) == 0
+
+        with db.get_connection(readonly=False) as conn:
+            conn.execute("CREATE TABLE processing_watermarks (stage TEXT PRIMARY KEY, last_entity_id INTEGER)")
+            conn.execute("INSERT INTO processing_watermarks VALUES ('tasks', 20)")
+        assert engine.live_backlog(run) == 7
+
+
+class TestBackfillCLI:
+    """Test the process backfill command."""
+
+    def test_plan_run_and_cutover(self, db):
+        from autotasktracker.cli.commands.process import process_group
+
+        with patch('autotasktracker.core.database.DatabaseManager', lambda **kwargs: db):
+            result = CliRunner().invoke(process_group, [
+                'backfill', '--stage', 'tasks', '--since', '2024-05-01', '--until', '2024-06-01',
+                '--workers', '1', '--chunk-size', '10', '--version', 'v2'])
+            status = CliRunner().invoke(process_group, ['backfill', '--status'])
+            cutover = CliRunner().invoke(process_group, ['backfill', '--cutover'])
+
+        assert result.exit_code == 0, result.output
+        assert 'Planned tasks-v2' in result.output and 'computed 50 values' in result.output
+        assert 'tasks-v2 [ready]' in status.output
+        assert cutover.exit_code == 0, cutover.output
+        assert '50 values are live' in cutover.output
+        assert _live(db, 'tasks')[1] == _expected_task(1)
+
+    def test_new_run_requires_since(self, db):
+        from autotasktracker.cli.commands.process import process_group
+
+        with patch('autotasktracker.core.database.DatabaseManager', lambda **kwargs: db):
+            result = CliRunner().invoke(process_group, ['backfill'])
+
+        assert result.exit_code != 0 and '--since' in result.output
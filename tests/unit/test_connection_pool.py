@@ -0,0 +1,227 @@
+"""
+Tests for the shared, instrumented connection pool.
+
+Tests cover:
+- On-demand growth up to max_size and waiting/timeouts when exhausted
+- Transaction reset and discarding of broken connections on return
+- Idle reaping down to the demand floor
+- Leak reporting with the acquiring stack
+- One pool per DSN shared across DatabaseManager instances
+"""
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from autotasktracker.core.connection_pool import (
+    InstrumentedConnectionPool, LatencyHistogram, PoolRegistry
+)
+from autotasktracker.core.exceptions import DatabaseError
+
+
+class FakeConnection:
+    """Minimal psycopg2-like connection."""
+
+    def __init__(self):
+        self.closed = False
+        self.status = 0
+        self.rollbacks = 0
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = 0
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def opened():
+    return []
+
+
+@pytest.fixture
+def make_pool(opened):
+    def factory(**kwargs):
+        def connect():
+            conn = FakeConnection()
+            opened.append(conn)
+            return conn
+        return InstrumentedConnectionPool(connect, name='test', **kwargs)
+    return factory
+
+
+class TestLatencyHistogram:
+    """Test the fixed-bucket histogram."""
+
+    def test_percentiles_use_bucket_bounds(self):
+        histogram = LatencyHistogram((1, 10, 100))
+        for value in [0.5] * 90 + [50] * 9 + [500]:
+            histogram.record(value)
+
+        snapshot = histogram.snapshot()
+
+        assert snapshot['count'] == 100
+        assert snapshot['p50_ms'] == 1
+        assert snapshot['p95_ms'] == 100
+        assert snapshot['p99_ms'] == 100
+        assert histogram.percentile(100) == 500
+        assert snapshot['buckets']['inf'] == 1
+
+
+class TestInstrumentedConnectionPool:
+    """Test the InstrumentedConnectionPool class."""
+
+    def test_connections_open_on_demand_and_are_reused(self, make_pool, opened):
+        pool = make_pool(min_size=0, max_size=3)
+
+        with pool.connection():
+            pass
+        with pool.connection():
+            pass
+
+        assert len(opened) == 1
+        stats = pool.get_stats()
+        assert stats['checkouts'] == 2
+        assert stats['opened'] == 1
+        assert stats['idle'] == 1
+        assert stats['wait']['count'] == 2
+        assert stats['hold']['count'] == 2
+
+    def test_exhausted_pool_times_out(self, make_pool):
+        pool = make_pool(max_size=1)
+        pool.getconn()
+
+        with pytest.raises(DatabaseError, match='exhausted'):
+            pool.getconn(timeout=0.05)
+
+        stats = pool.get_stats()
+        assert stats['timeouts'] == 1
+        assert stats['exhausted']
+
+    def test_waiter_gets_returned_connection(self, make_pool):
+        pool = make_pool(max_size=1)
+        conn = pool.getconn()
+        threading.Timer(0.05, pool.putconn, args=(conn,)).start()
+
+        assert pool.getconn(timeout=2) is conn
+        assert pool.get_stats()['waits'] == 1
+
+    def test_open_transactions_are_rolled_back(self, make_pool):
+        pool = make_pool()
+        conn = pool.getconn()
+        conn.status = 2  # in transaction
+
+        pool.putconn(conn)
+
+        assert conn.rollbacks == 1
+        assert pool.getconn() is conn
+
+    def test_broken_connections_are_discarded(self, make_pool, opened):
+        pool = make_pool()
+        conn = pool.getconn()
+        conn.closed = True
+
+        pool.putconn(conn)
+
+        assert pool.get_stats()['discarded'] == 1
+        assert pool.getconn() is not conn
+        assert len(opened) == 2
+
+    def test_idle_connections_are_reaped_to_demand_floor(self, make_pool):
+        pool = make_pool(min_size=1, max_size=5, idle_timeout=0, peak_window=0)
+        conns = [pool.getconn() for _ in range(4)]
+        for conn in conns:
+            pool.putconn(conn)
+        time.sleep(0.01)
+
+        with patch('autotasktracker.core.connection_pool.PEAK_BUCKET_SECONDS', 0.001):
+            result = pool.reap()
+
+        assert result['closed_idle'] == 3
+        assert pool.get_stats()['size'] == 1
+
+    def test_recent_peak_keeps_pool_warm(self, make_pool):
+        pool = make_pool(min_size=1, max_size=5, idle_timeout=0, peak_window=300)
+        conns = [pool.getconn() for _ in range(3)]
+        for conn in conns:
+            pool.putconn(conn)
+        time.sleep(0.01)
+
+        assert pool.reap()['closed_idle'] == 0
+        assert pool.get_stats()['demand_floor'] == 3
+
+    def test_long_checkouts_are_reported_with_stack(self, make_pool):
+        pool = make_pool(leak_threshold=0)
+        pool.getconn()
+        time.sleep(0.01)
+
+        leaks = pool.find_leaks()
+        assert len(leaks) == 1
+        assert 'test_long_checkouts_are_reported_with_stack' in leaks[0]['stack']
+
+        assert pool.reap()['leaks_reported'] == 1
+        assert pool.reap()['leaks_reported'] == 0  # reported once
+        assert pool.get_stats()['suspected_leaks'] == 1
+
+    def test_closed_pool_rejects_checkouts(self, make_pool):
+        pool = make_pool()
+        conn = pool.getconn()
+        pool.closeall()
+
+        with pytest.raises(DatabaseError, match='closed'):
+            pool.getconn()
+        pool.putconn(conn)
+        assert conn.closed
+
+
+class TestPoolRegistry:
+    """Test DSN-keyed pool sharing."""
+
+    def test_same_dsn_shares_one_pool(self, make_pool):
+        registry = PoolRegistry(reap_interval=3600)
+        factory = Mock(side_effect=lambda: make_pool())
+
+        first = registry.get_pool('postgresql://a/db', factory)
+        second = registry.get_pool('postgresql://a/db', factory)
+        other = registry.get_pool('postgresql://b/db', factory)
+
+        assert first is second
+        assert other is not first
+        assert factory.call_count == 2
+        registry.close_all()
+
+    def test_closed_pool_is_recreated(self, make_pool):
+        registry = PoolRegistry(reap_interval=3600)
+        first = registry.get_pool('postgresql://a/db', make_pool)
+
+        registry.close_pool('postgresql://a/db')
+
+        assert first.closed
+        assert registry.get_pool('postgresql://a/db', make_pool) is not first
+        registry.close_all()
+
+    def test_database_managers_share_registry_pool(self, make_pool):
+        from autotasktracker.core import database
+
+        registry = PoolRegistry(reap_interval=3600)
+        with patch.object(database, 'get_pool_registry', return_value=registry), \
+             patch.object(database.DatabaseManager, '_create_pool', lambda self: make_pool()):
+            first = database.DatabaseManager('postgresql://u:p@host:5432/db', use_pensieve_api=False)
+            second = database.DatabaseManager('postgresql://u:p@host:5432/db', use_pensieve_api=False)
+
+            with first.get_connection():
+                pass
+            with second.get_connection():
+                pass
+
+            assert first._postgresql_pool is second._postgresql_pool
+            status = second.get_connection_status()
+            assert status['pool_active']
+            assert status['pool']['checkouts'] == 2
+            assert status['shared_pools'] == 1
+        registry.close_all()
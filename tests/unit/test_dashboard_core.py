@@ -310,6 +310,101 @@ class TestTaskRepository:
             assert len(tasks) == 0, "Should handle empty result gracefully"
 
 
+    def _captures(self, start, windows, step_minutes=5):
+        """Build consecutive Task captures, one per window name."""
+        return [
+            Task(id=i, title=window, category='Development' if window == 'VS Code' else 'Communication',
+                 timestamp=start + timedelta(minutes=step_minutes * i), duration_minutes=5,
+                 window_title=window)
+            for i, window in enumerate(windows)
+        ]
+    
+    def test_get_task_groups_by_day_fetches_once_and_splits_at_midnight(self):
+        """Test that a range is fetched once and groups never span two days."""
+        repo = TaskRepository(MagicMock(), use_pensieve=False)
+        # 23:50 -> 00:10 in the same window, then Slack at 10:00 the next day
+        tasks = self._captures(datetime(2024, 1, 1, 23, 50), ['VS Code'] * 5)
+        tasks += self._captures(datetime(2024, 1, 2, 10, 0), ['Slack'] * 4)
+        
+        with patch.object(repo, 'get_tasks_after', return_value=list(reversed(tasks))) as mock_fetch, \
+             patch.object(repo, '_normalize_window_title', side_effect=lambda title: title):
+            result = repo.get_task_groups_by_day(datetime(2024, 1, 1, 15, 30), datetime(2024, 1, 3, 8, 0))
+        
+        mock_fetch.assert_called_once()
+        after_id, fetch_start, fetch_end = mock_fetch.call_args[0]
+        assert after_id == 0
+        assert fetch_start == datetime(2024, 1, 1)
+        assert fetch_end == datetime(2024, 1, 3, 23, 59, 59)
+        
+        assert result.task_count == 9
+        assert result.days == [datetime(2024, 1, 1).date(), datetime(2024, 1, 2).date()]
+        first_day = result.for_day(datetime(2024, 1, 1).date())
+        second_day = result.for_day(datetime(2024, 1, 2).date())
+        assert [g.task_count for g in first_day] == [2]
+        assert [(g.window_title, g.task_count) for g in second_day] == [('VS Code', 3), ('Slack', 4)]
+        assert result.for_day(datetime(2024, 1, 3).date()) == []
+    
+    def test_get_task_groups_by_day_aggregates_match_per_day_grouping(self):
+        """Test that the daily frame matches grouping each day separately."""
+        repo = TaskRepository(MagicMock(), use_pensieve=False)
+        tasks = self._captures(datetime(2024, 1, 1, 9, 0), ['VS Code'] * 6 + ['Slack'] * 3)
+        tasks += self._captures(datetime(2024, 1, 3, 14, 0), ['Slack'] * 3 + ['VS Code'] * 3)
+        
+        with patch.object(repo, '_normalize_window_title', side_effect=lambda title: title):
+            with patch.object(repo, 'get_tasks_after', side_effect=lambda *args, **kwargs: list(tasks)):
+                result = repo.get_task_groups_by_day(datetime(2024, 1, 1), datetime(2024, 1, 3))
+            
+            daily = result.daily
+            assert list(daily.columns) == ['date', 'total_time', 'productive_time', 'tasks_count',
+                                           'avg_task_duration', 'peak_hour']
+            assert list(daily['date']) == [pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-03')]
+            
+            for _, row in daily.iterrows():
+                day = row['date'].to_pydatetime()
+                day_tasks = [t for t in tasks if t.timestamp.date() == day.date()]
+                with patch.object(repo, 'get_tasks_for_period', return_value=day_tasks):
+                    expected = repo.get_task_groups(day, day.replace(hour=23, minute=59, second=59))
+                assert row['total_time'] == sum(g.duration_minutes for g in expected)
+                assert row['productive_time'] == sum(g.duration_minutes for g in expected
+                                                     if g.category == 'Development')
+                assert row['tasks_count'] == len(expected)
+        
+        # Both windows on Jan 3 start in hour 14, so it is the peak hour
+        assert list(daily['peak_hour']) == [9, 14]
+    
+    def test_get_task_groups_by_day_with_no_activity(self):
+        """Test that an empty range yields an empty daily frame."""
+        repo = TaskRepository(MagicMock(), use_pensieve=False)
+        
+        with patch.object(repo, 'get_tasks_after', return_value=[]):
+            result = repo.get_task_groups_by_day(datetime(2024, 1, 1), datetime(2024, 1, 7))
+        
+        assert result.groups == {}
+        assert result.daily.empty
+        assert 'productive_time' in result.daily.columns
+    
+    def test_get_task_groups_by_day_pages_through_the_whole_range(self):
+        """Test that ranges larger than a page keep their earliest days."""
+        repo = TaskRepository(MagicMock(), use_pensieve=False)
+        tasks = self._captures(datetime(2024, 1, 1, 9, 0), ['VS Code'] * 5)
+        tasks += self._captures(datetime(2024, 1, 2, 9, 0), ['Slack'] * 5)
+        for task_id, task in enumerate(tasks, start=1):
+            task.id = task_id
+        
+        def page(after_id, start, end, limit):
+            return [t for t in tasks if t.id > after_id][:limit]
+        
+        with patch.object(repo, 'get_tasks_after', side_effect=page) as mock_fetch, \
+             patch.object(repo, 'get_tasks_for_period') as mock_period, \
+             patch.object(repo, '_normalize_window_title', side_effect=lambda title: title):
+            result = repo.get_task_groups_by_day(datetime(2024, 1, 1), datetime(2024, 1, 2), page_size=4)
+        
+        assert [call[0][0] for call in mock_fetch.call_args_list] == [0, 4, 8]
+        mock_period.assert_not_called()
+        assert result.task_count == 10
+        assert result.days == [datetime(2024, 1, 1).date(), datetime(2024, 1, 2).date()]
+
+
 class TestMetricsRepository:
     """Test MetricsRepository functionality."""
     
@@ -377,6 +472,30 @@ class TestMetricsRepository:
         for key, value in result.items():
             assert value == 0, f"{key} should be 0 on database error"
     
+    def test_metrics_summary_fallback_binds_every_parameter(self):
+        """Test that the direct-database summary passes exactly one value per placeholder."""
+        repo = MetricsRepository(MagicMock(), use_pensieve=False)
+        repo.cache = MagicMock()
+        repo.cache.get.return_value = None
+        results = {
+            'total_activities': pd.DataFrame([{'total_activities': 40, 'active_days': 2}]),
+            'unique_categories': pd.DataFrame([{'unique_categories': 3}]),
+            'unique_windows': pd.DataFrame([{'unique_windows': 7}]),
+        }
+
+        def read_sql_query(query, conn, params=()):
+            # psycopg refuses surplus or missing arguments
+            if query.count('%s') != len(params):
+                raise pd.errors.DatabaseError('not all arguments converted during string formatting')
+            return next(df for column, df in results.items() if column in query)
+
+        with patch('autotasktracker.dashboards.data.repositories.entity_id_bounds', return_value=(100, 200)), \
+                patch('autotasktracker.dashboards.data.repositories.pd.read_sql_query', side_effect=read_sql_query):
+            result = repo._get_metrics_summary_sqlite_fallback(datetime(2024, 5, 1), datetime(2024, 5, 2, 23, 59))
+
+        assert result == {'total_activities': 40, 'active_days': 2, 'unique_windows': 7,
+                          'unique_categories': 3, 'avg_daily_activities': 20.0}
+
     def test_task_repository_handles_invalid_date_ranges(self):
         """Test that TaskRepository handles invalid date ranges appropriately."""
         mock_db = MagicMock()
@@ -0,0 +1,216 @@
+"""
+Tests for the DashboardNotifier broadcast engine.
+
+Tests cover:
+- Coalescing notifications collected within one batching window
+- Per-client bounded queues with drop-oldest and coalesce policies
+- Concurrent delivery so slow or broken clients do not delay others
+- Asynchronous webhook delivery with retries
+- Queue depth and drop/coalesce metrics
+"""
+import asyncio
+import json
+
+import pytest
+
+from autotasktracker.core.exceptions import ConfigurationError
+from autotasktracker.pensieve.event_integration import (
+    ClientChannel, DashboardNotifier, coalesce_notifications
+)
+
+
+class FakeWebSocket:
+    """Minimal stand-in for a server-side websocket connection."""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.messages = []
+        self.remote_address = ('127.0.0.1', 0)
+        self._closed = asyncio.Event()
+
+    async def send(self, message):
+        if self.fail:
+            raise ConnectionResetError('gone')
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.messages.append(json.loads(message))
+
+    async def wait_closed(self):
+        await self._closed.wait()
+
+    def close(self):
+        self._closed.set()
+
+
+def _new_tasks(entity_id, count=1):
+    return {'type': 'new_tasks', 'entity_id': entity_id, 'tasks': [{'n': i} for i in range(count)]}
+
+
+async def _connect(notifier, websocket):
+    handler = asyncio.get_running_loop().create_task(notifier._handle_websocket_connection(websocket))
+    await asyncio.sleep(0)
+    return handler
+
+
+async def _drain():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestCoalesceNotifications:
+    """Test window coalescing."""
+
+    def test_new_tasks_become_one_summary(self):
+        batch = coalesce_notifications([_new_tasks(i, count=2) for i in range(1, 38)])
+
+        assert len(batch) == 1
+        assert batch[0]['type'] == 'new_tasks_batch'
+        assert batch[0]['count'] == 37
+        assert batch[0]['latest_entity_id'] == 37
+        assert batch[0]['task_count'] == 74
+        assert batch[0]['summary'] == '37 new entities, latest id 37'
+
+    def test_entity_updates_keep_latest_and_order(self):
+        batch = coalesce_notifications([
+            {'type': 'entity_update', 'entity_id': 1, 'update_type': 'ocr', 'data': {'v': 1}},
+            {'type': 'other'},
+            {'type': 'entity_update', 'entity_id': 1, 'update_type': 'ocr', 'data': {'v': 2}},
+            {'type': 'entity_update', 'entity_id': 2, 'update_type': 'ocr', 'data': {'v': 3}},
+        ])
+
+        assert [n['type'] for n in batch] == ['entity_update', 'other', 'entity_update']
+        assert batch[0]['data'] == {'v': 2}
+        assert batch[0]['coalesced'] == 2
+        assert 'coalesced' not in batch[2]
+
+    def test_single_notification_passes_through(self):
+        notification = _new_tasks(5)
+        assert coalesce_notifications([notification]) == [notification]
+
+
+class TestClientChannel:
+    """Test per-client backpressure policies."""
+
+    def test_drop_oldest(self):
+        channel = ClientChannel(FakeWebSocket(), max_queue=2, policy='drop_oldest')
+        for i in range(4):
+            channel.offer({'type': 'new_tasks', 'entity_id': i}, str(i))
+
+        assert [message for _, message in channel.queue] == ['2', '3']
+        assert channel.dropped == 2
+
+    def test_coalesce_folds_backlog_into_resync(self):
+        channel = ClientChannel(FakeWebSocket(), max_queue=3, policy='coalesce')
+        for i in range(1, 5):
+            channel.offer(_new_tasks(i), json.dumps(_new_tasks(i)))
+        channel.offer(_new_tasks(5), json.dumps(_new_tasks(5)))
+
+        assert len(channel.queue) == 2
+        resync = channel.queue[0][0]
+        assert resync['type'] == 'resync'
+        assert resync['skipped'] == 4
+        assert resync['latest_entity_id'] == 4
+        assert channel.coalesced == 3
+
+    def test_unknown_policy_is_rejected(self):
+        with pytest.raises(ConfigurationError):
+            ClientChannel(FakeWebSocket(), policy='block')
+
+
+class TestDashboardNotifier:
+    """Test broadcast fan-out and webhook delivery."""
+
+    def test_window_batches_notifications(self):
+        async def scenario():
+            notifier = DashboardNotifier(coalesce_window=0.05)
+            ws = FakeWebSocket()
+            handler = await _connect(notifier, ws)
+            for i in range(10):
+                await notifier.notify_new_tasks(i, [{'title': 't'}])
+            await asyncio.sleep(0.1)
+            await _drain()
+            ws.close()
+            await handler
+            return notifier, ws
+
+        notifier, ws = asyncio.run(scenario())
+
+        assert [m['type'] for m in ws.messages] == ['connected', 'new_tasks_batch']
+        assert ws.messages[1]['count'] == 10
+        stats = notifier.get_stats()
+        assert stats['notifications'] == 10
+        assert stats['broadcasts'] == 1
+        assert stats['window_coalesced'] == 9
+        assert stats['clients'] == 0
+        assert stats['messages_sent'] == 2
+
+    def test_slow_and_broken_clients_do_not_block_others(self):
+        async def scenario():
+            notifier = DashboardNotifier(coalesce_window=0, client_queue_size=5, send_timeout=1.0)
+            fast, slow, broken = FakeWebSocket(), FakeWebSocket(delay=0.2), FakeWebSocket(fail=True)
+            handlers = [await _connect(notifier, ws) for ws in (fast, slow, broken)]
+            for i in range(20):
+                await notifier.notify_entity_update(i, 'ocr', {})
+                await _drain()
+            fast_received = len(fast.messages)
+            stats = notifier.get_stats()
+            for ws in (fast, slow, broken):
+                ws.close()
+            await asyncio.gather(*handlers)
+            return fast_received, stats
+
+        fast_received, stats = asyncio.run(scenario())
+
+        assert fast_received == 21
+        assert stats['clients'] == 2
+        assert stats['send_failures'] == 1
+        assert stats['queue_depth']['max'] <= 5
+        assert stats['messages_coalesced'] > 0
+
+    def test_webhooks_retry_without_blocking(self):
+        async def scenario():
+            notifier = DashboardNotifier(coalesce_window=0, webhook_retries=2, webhook_backoff=0.01)
+            notifier.add_webhook_url('http://hook/ok')
+            notifier.add_webhook_url('http://hook/flaky')
+            notifier.add_webhook_url('http://hook/bad')
+            attempts = {}
+
+            async def fake_post(url, notification):
+                attempts[url] = attempts.get(url, 0) + 1
+                if url.endswith('flaky') and attempts[url] < 3:
+                    raise ConnectionError('refused')
+                return 404 if url.endswith('bad') else 200
+
+            notifier._post_webhook = fake_post
+            await notifier.notify_new_tasks(1, [])
+            # Broadcast returns before any webhook has been attempted
+            assert attempts == {}
+            await asyncio.gather(*notifier._webhook_tasks)
+            return notifier, attempts
+
+        notifier, attempts = asyncio.run(scenario())
+
+        assert attempts == {'http://hook/ok': 1, 'http://hook/flaky': 3, 'http://hook/bad': 1}
+        stats = notifier.get_stats()
+        assert stats['webhooks_delivered'] == 2
+        assert stats['webhooks_failed'] == 1
+        assert stats['webhook_retries'] == 2
+        assert stats['webhook_latency']['count'] == 3
+
+    def test_stop_flushes_pending_notifications(self):
+        async def scenario():
+            notifier = DashboardNotifier(coalesce_window=60)
+            ws = FakeWebSocket()
+            handler = await _connect(notifier, ws)
+            await notifier.notify_new_tasks(7, [])
+            await notifier.flush()
+            await _drain()
+            ws.close()
+            await handler
+            await notifier.stop_websocket_server()
+            return ws
+
+        ws = asyncio.run(scenario())
+
+        assert ws.messages[-1]['entity_id'] == 7
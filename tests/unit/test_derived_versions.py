@@ -0,0 +1,263 @@
+"""
+Tests for derived metadata version stamps.
+
+Stamps values of a SQLite stand-in and checks fingerprints, stale
+detection, bounded inline recompute of task rows, queueing the rest for
+the coordinated worker, and stamping by backfill cutover.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+from click.testing import CliRunner
+
+from autotasktracker.config import get_config
+from autotasktracker.core.backfill import BackfillEngine
+from autotasktracker.core.categorizer import ActivityCategorizer
+from autotasktracker.core.derived_versions import DerivedVersions, pipeline_fingerprint, refresh_frame
+from autotasktracker.core.processing_ledger import ProcessingLedger
+from autotasktracker.core.task_extractor import get_task_extractor
+from tests.unit.test_processing_ledger import SQLiteTestDatabase
+
+START = datetime(2024, 5, 1)
+WINDOWS = ['main.py - VS Code', 'Inbox - Gmail', 'Terminal - zsh', 'Zoom Meeting']
+
+
+@pytest.fixture(autouse=True)
+def fresh_fingerprints():
+    pipeline_fingerprint.cache_clear()
+    yield
+    pipeline_fingerprint.cache_clear()
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Six screenshots with tasks and categories from an unversioned pipeline."""
+    db = SQLiteTestDatabase(tmp_path / 'versions.db')
+    with db.get_connection(readonly=False) as conn:
+        for i in range(6):
+            conn.execute("INSERT INTO entities (filepath, created_at) VALUES (?, ?)",
+                         (f"/shots/{i}.png", (START + timedelta(hours=i)).isoformat(sep=' ')))
+    for entity_id in range(1, 7):
+        db.add_metadata(entity_id, 'active_window', WINDOWS[entity_id % len(WINDOWS)])
+        db.add_metadata(entity_id, 'tasks', 'Old task')
+        db.add_metadata(entity_id, 'category', 'Old category')
+    return db
+
+
+@pytest.fixture
+def versions(db):
+    versions = DerivedVersions(db, inline_budget=200, inline_budget_ms=1000)
+    versions.ensure_schema()
+    return versions
+
+
+def _frame(db):
+    with db.get_connection() as conn:
+        rows = conn.execute("""
+            SELECT e.id, w.value AS active_window, t.value AS tasks, c.value AS category
+            FROM entities e
+            LEFT JOIN metadata_entries w ON w.entity_id = e.id AND w.key = 'active_window'
+            LEFT JOIN metadata_entries t ON t.entity_id = e.id AND t.key = 'tasks'
+            LEFT JOIN metadata_entries c ON c.entity_id = e.id AND c.key = 'category'
+            ORDER BY e.id
+        """).fetchall()
+    return pd.DataFrame(rows, columns=['id', 'active_window', 'tasks', 'category'])
+
+
+def _queued(db, stage):
+    ProcessingLedger(db).ensure_schema()
+    with db.get_connection() as conn:
+        return sorted(row[0] for row in conn.execute(
+            "SELECT entity_id FROM processing_failures WHERE stage = ?", (stage,)))
+
+
+COLUMNS = {'tasks': 'tasks', 'category': 'category'}
+
+
+class TestFingerprints:
+    """Test pipeline fingerprints."""
+
+    def test_fingerprint_is_stable_and_follows_the_model(self):
+        vlm = pipeline_fingerprint('vlm_description')
+        assert pipeline_fingerprint('vlm_description') == vlm
+        assert pipeline_fingerprint('tasks') != pipeline_fingerprint('category')
+
+        with patch.object(get_config(), 'VLM_MODEL_NAME', 'minicpm-v:16b'):
+            pipeline_fingerprint.cache_clear()
+            assert pipeline_fingerprint('vlm_description') != vlm
+
+    def test_fingerprint_follows_revisions_and_categories(self):
+        tasks, category = pipeline_fingerprint('tasks'), pipeline_fingerprint('category')
+
+        with patch.dict('autotasktracker.core.derived_versions.KEY_REVISIONS', {'tasks': 2}), \
+                patch.dict(ActivityCategorizer.CATEGORIES, {'gaming': ('🎮 Gaming', ['steam'])}):
+            pipeline_fingerprint.cache_clear()
+            assert pipeline_fingerprint('tasks') != tasks
+            assert pipeline_fingerprint('category') != category
+
+
+class TestStaleDetection:
+    """Test finding values produced by another pipeline version."""
+
+    def test_unversioned_and_outdated_values_are_stale(self, versions):
+        versions.stamp([1, 2], ['tasks'])
+        versions.stamp([3], ['tasks'], fingerprints={'tasks': 'older'})
+
+        stale = versions.stale(range(1, 8), ['tasks'])
+
+        assert stale == {'tasks': {3, 4, 5, 6}}
+
+    def test_entities_without_a_value_are_not_stale(self, versions, db):
+        with db.get_connection(readonly=False) as conn:
+            conn.execute("INSERT INTO entities (filepath, created_at) VALUES ('/shots/new.png', '2024-05-02')")
+
+        assert 7 not in versions.stale([7], ['tasks', 'category']).get('tasks', set())
+
+    def test_legacy_keys_no_stage_writes_are_not_tracked(self, versions, db):
+        db.add_metadata(2, 'vlm_structured', '{"task": "old"}')
+
+        assert versions.stale([2], ['vlm_structured']) == {}
+        assert not versions.has_stale(2, 'vlm')
+
+    def test_missing_stamps_table_means_nothing_is_stale(self, db):
+        assert DerivedVersions(db).stale([1, 2], ['tasks']) == {}
+
+    def test_adopt_stamps_only_unversioned_values(self, versions):
+        versions.stamp([1], ['tasks'], fingerprints={'tasks': 'older'})
+
+        assert versions.adopt(['tasks'])['tasks'] == 5
+        assert versions.stale(range(1, 7), ['tasks']) == {'tasks': {1}}
+        stats = versions.stats(['tasks'])['tasks']
+        assert (stats['values'], stats['current'], stats['stale'], stats['unversioned']) == (6, 5, 1, 0)
+
+
+class TestRefresh:
+    """Test recomputing or queueing stale rows of a result set."""
+
+    def test_stale_rows_are_recomputed_inline_and_stamped(self, versions, db):
+        versions.stamp([1], ['tasks', 'category'])
+
+        with patch('autotasktracker.core.derived_versions.get_derived_versions', return_value=versions):
+            refreshed = refresh_frame(db, _frame(db), COLUMNS)
+
+        assert refreshed['tasks'].iloc[0] == 'Old task'
+        assert refreshed['tasks'].iloc[1] == get_task_extractor().extract_task(WINDOWS[2])
+        assert refreshed['category'].iloc[1] == ActivityCategorizer.categorize(WINDOWS[2])
+        assert _frame(db)['tasks'].tolist() == refreshed['tasks'].tolist()
+        assert versions.stale(range(1, 7), ['tasks', 'category']) == {}
+        assert _queued(db, 'tasks') == []
+
+    def test_rows_beyond_the_budget_are_queued_for_the_worker(self, db, versions):
+        versions = DerivedVersions(db, inline_budget=2, inline_budget_ms=1000)
+
+        updates = versions.refresh(_frame(db).to_dict('records'), COLUMNS)
+
+        # Newest rows are recomputed first
+        assert sorted(updates) == [5, 6]
+        assert _queued(db, 'tasks') == [1, 2, 3, 4]
+        # History is below the live watermark; queued entities come back as due retries
+        ledger = ProcessingLedger(db)
+        ledger.set_watermark('tasks', 6)
+        assert sorted(ledger.claim_batch('tasks', 10)) == [1, 2, 3, 4]
+
+    def test_exhausted_time_budget_queues_everything(self, db, versions):
+        versions = DerivedVersions(db, inline_budget=200, inline_budget_ms=0)
+
+        assert versions.refresh(_frame(db).to_dict('records'), COLUMNS) == {}
+        assert _queued(db, 'tasks') == [1, 2, 3, 4, 5, 6]
+        assert set(_frame(db)['tasks']) == {'Old task'}
+
+    def test_queueing_is_idempotent(self, db, versions):
+        versions = DerivedVersions(db, inline_budget=0, inline_budget_ms=1000)
+        rows = _frame(db).to_dict('records')
+
+        versions.refresh(rows, COLUMNS)
+        assert DerivedVersions(db, inline_budget=0, inline_budget_ms=1000).refresh(rows, COLUMNS) == {}
+        assert _queued(db, 'tasks') == [1, 2, 3, 4, 5, 6]
+        assert versions.refresh_stats['enqueued'] == 6
+
+    def test_current_rows_are_not_queried_again(self, versions, db):
+        versions.stamp(range(1, 7), ['tasks', 'category'])
+        rows = _frame(db).to_dict('records')
+
+        with patch.object(versions, '_query') as query:
+            assert versions.refresh(rows, COLUMNS) == {}
+        query.assert_not_called()
+
+
+class TestStampingWriters:
+    """Test that pipeline writers stamp what they write."""
+
+    def test_backfill_cutover_stamps_with_the_planned_fingerprints(self, db, versions):
+        engine = BackfillEngine(db, workers=1, chunk_size=10, yield_backlog=None)
+        run = engine.plan('tasks', START, START + timedelta(days=1), version='v2')
+        engine.run(run)
+
+        engine.cutover(run)
+
+        assert engine.get_run(run.run_id).fingerprints == {
+            'tasks': pipeline_fingerprint('tasks'), 'category': pipeline_fingerprint('category')}
+        assert versions.stale(range(1, 7), ['tasks', 'category']) == {}
+
+    def test_worker_task_handler_overwrites_and_stamps(self, db, versions):
+        from autotasktracker.cli.commands.process import _build_stage_handlers
+
+        with patch('autotasktracker.core.DatabaseManager', lambda *args, **kwargs: db):
+            handler = _build_stage_handlers(['tasks'])['tasks']
+        handler({'id': 2, 'active_window': WINDOWS[2]})
+
+        assert _frame(db)['tasks'].iloc[1] == get_task_extractor().extract_task(WINDOWS[2])
+        assert versions.stale([2], ['tasks', 'category']) == {}
+
+    def test_worker_and_inline_recompute_share_inputs(self, db, versions):
+        from autotasktracker.cli.commands.process import _build_stage_handlers
+        from autotasktracker.core.worker_coordination import STAGE_ITEM_KEYS
+        db.add_metadata(2, 'ocr_result', '[[[0, 0, 1, 1], "def main()", 0.9]]')
+        db.add_metadata(3, 'ocr_result', '[[[0, 0, 1, 1], "def main()", 0.9]]')
+        extractor = MagicMock()
+        extractor.extract_task.side_effect = lambda window, ocr=None: f"{window} | {ocr}"
+
+        with patch('autotasktracker.core.task_extractor.get_task_extractor', return_value=extractor), \
+                patch('autotasktracker.core.DatabaseManager', lambda *args, **kwargs: db):
+            handler = _build_stage_handlers(['tasks'])['tasks']
+            handler(ProcessingLedger(db).fetch_work_items([2], STAGE_ITEM_KEYS['tasks'])[0])
+            versions.refresh([{'id': 3, 'tasks': 'Old task'}], COLUMNS)
+
+        assert _frame(db)['tasks'].tolist()[1:3] == [f"{WINDOWS[2]} | def main()", f"{WINDOWS[3]} | def main()"]
+
+    def test_screenshot_event_handler_stamps_stored_tasks(self, versions):
+        from autotasktracker.pensieve.event_integration import PensieveEvent, ScreenshotEventHandler
+        handler = ScreenshotEventHandler()
+        handler.set_task_extractor(MagicMock(extract_tasks=MagicMock(return_value=[{'task': 'Review PR'}])))
+        client = MagicMock()
+        client.get_entity_metadata.return_value = {'ocr_result': 'Review PR #12'}
+        event = PensieveEvent(event_type='entity.created', entity_id=2, timestamp=datetime.now().isoformat(), data={})
+
+        with patch('autotasktracker.pensieve.event_integration.get_pensieve_client', return_value=client), \
+                patch('autotasktracker.core.derived_versions.get_derived_versions', return_value=versions):
+            asyncio.run(handler._process_event(event))
+
+        client.store_entity_metadata.assert_any_call(2, 'tasks', '[{"task": "Review PR"}]')
+        assert versions.stale([2], ['tasks']) == {}
+
+
+class TestVersionsCLI:
+    """Test the process versions command."""
+
+    def test_report_enqueue_and_adopt(self, db, versions):
+        from autotasktracker.cli.commands.process import process_group
+        tracker = DerivedVersions(db)
+
+        with patch('autotasktracker.core.derived_versions.get_derived_versions', return_value=tracker):
+            report = CliRunner().invoke(process_group, ['versions'])
+            queued = CliRunner().invoke(process_group, ['versions', '--enqueue'])
+            adopted = CliRunner().invoke(process_group, ['versions', '--adopt'])
+
+        assert report.exit_code == 0, report.output
+        assert '0 current, 6 stale (6 unversioned) of 6' in report.output
+        assert "Queued 6 screenshots for 'tasks' recompute" in queued.output
+        assert 'Stamped 12 unversioned values as current' in adopted.output
+        assert 'tasks [' in adopted.output and '6 current, 0 stale' in adopted.output
@@ -0,0 +1,277 @@
+"""
+Tests for the streaming export engine.
+
+Runs exports against the SQLite stand-in for the Pensieve schema to cover:
+- Task groups formatted as the dashboard export, across page boundaries
+- Screenshot rows with flattened OCR text and category filters
+- Parquet part files with row groups and dictionary-encoded columns
+- Checkpoints: pausing, resuming, crash recovery and changed requests
+- Background jobs, progress reporting and the CLI command
+"""
+import csv
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pyarrow.parquet as pq
+import pytest
+from click.testing import CliRunner
+
+from autotasktracker.core.export_engine import (
+    TASK_GROUP_COLUMNS, ExportEngine, ExportJobs, ExportRequest, progress_path, read_progress,
+)
+from tests.unit.test_processing_ledger import SQLiteTestDatabase
+
+DAY = datetime(2024, 5, 1)
+
+
+@pytest.fixture
+def db(tmp_path):
+    return SQLiteTestDatabase(tmp_path / 'export.db')
+
+
+def _add_shot(db, minute, window, tasks=None, category=None, ocr=None):
+    with db.get_connection(readonly=False) as conn:
+        entity_id = conn.execute(
+            "INSERT INTO entities (filepath, created_at) VALUES (?, ?)",
+            (f"/shots/{minute}.png", (DAY + timedelta(hours=9, minutes=minute)).isoformat(sep=' '))
+        ).lastrowid
+    db.add_metadata(entity_id, 'active_window', window)
+    for key, value in (('tasks', tasks), ('category', category), ('ocr_result', ocr)):
+        if value is not None:
+            db.add_metadata(entity_id, key, value)
+    return entity_id
+
+
+@pytest.fixture
+def workday(db):
+    """Editor, mail, a stray short window, then the editor again."""
+    for minute in range(5):
+        _add_shot(db, minute, 'main.py - VS Code', tasks='Edit main.py', category='Coding')
+    for minute in range(5, 9):
+        _add_shot(db, minute, 'Inbox - Gmail', category='Communication',
+                  ocr=json.dumps([[[0, 0, 1, 1], 'Quarterly report', 0.9], [[0, 2, 1, 3], 'Reply', 0.8]]))
+    _add_shot(db, 30, 'Slack', category='Communication')
+    for minute in range(60, 63):
+        _add_shot(db, minute, 'main.py - VS Code', tasks='Review main.py', category='Coding')
+    return db
+
+
+@pytest.fixture
+def engine(workday):
+    return ExportEngine(workday)
+
+
+def _request(tmp_path, name='tasks.csv', **kwargs):
+    return ExportRequest(start=DAY, end=DAY + timedelta(days=1), output_path=str(tmp_path / name), **kwargs)
+
+
+def _read_csv(path):
+    with open(path, newline='') as f:
+        return list(csv.reader(f))
+
+
+class TestFormatting:
+    """Test the exported rows."""
+
+    def test_task_groups_match_across_page_boundaries(self, engine, tmp_path):
+        whole = engine.run(_request(tmp_path, 'whole.csv', batch_size=1000))
+        paged = engine.run(_request(tmp_path, 'paged.csv', batch_size=2))
+
+        assert whole.status == paged.status == 'done'
+        rows = _read_csv(tmp_path / 'whole.csv')
+        assert _read_csv(tmp_path / 'paged.csv') == rows
+        assert rows[0] == list(TASK_GROUP_COLUMNS)
+        # The single Slack capture is too short to be a group
+        assert [row[7] for row in rows[1:]] == ['5', '4', '3']
+        assert [row[5] for row in rows[1:]] == ['Coding', 'Communication', 'Coding']
+        assert rows[1][0] == '2024-05-01' and rows[1][3:5] == ['09:00', '09:04']
+        assert rows[1][6] == 'Edit main.py; Edit main.py; Edit main.py'
+        assert paged.rows_read == paged.total_rows == 13
+        assert paged.rows_written == 3
+
+    def test_task_groups_filtered_by_category(self, engine, tmp_path):
+        engine.run(_request(tmp_path, categories=['Communication']))
+
+        rows = _read_csv(tmp_path / 'tasks.csv')
+        assert [row[5] for row in rows[1:]] == ['Communication']
+
+    def test_screenshot_rows_include_plain_ocr_text(self, engine, tmp_path):
+        progress = engine.run(_request(tmp_path, 'shots.jsonl', format='jsonl', kind='screenshots',
+                                       categories=['Communication'], batch_size=3))
+
+        with open(tmp_path / 'shots.jsonl') as f:
+            rows = [json.loads(line) for line in f]
+        assert progress.rows_written == len(rows) == 5
+        assert [row['id'] for row in rows] == [6, 7, 8, 9, 10]
+        assert rows[0]['ocr_text'] == 'Quarterly report Reply'
+        assert rows[0]['timestamp'] == '2024-05-01 09:05:00'
+        assert rows[-1]['ocr_text'] is None
+
+    def test_range_bounds_the_export(self, engine, tmp_path):
+        request = _request(tmp_path, kind='screenshots')
+        request.end = DAY + timedelta(hours=9, minutes=30)
+
+        assert engine.run(request).rows_written == 10
+
+    def test_utc_offset_shifts_bounds_and_output(self, engine, tmp_path):
+        # Local 02:00-02:30 is stored as 09:00-09:30 UTC
+        request = _request(tmp_path, 'shots.jsonl', format='jsonl', kind='screenshots', utc_offset_hours=7)
+        request.start, request.end = DAY + timedelta(hours=2), DAY + timedelta(hours=2, minutes=29)
+        engine.run(request)
+        engine.run(_request(tmp_path, 'tasks.csv', utc_offset_hours=7))
+
+        with open(tmp_path / 'shots.jsonl') as f:
+            rows = [json.loads(line) for line in f]
+        assert len(rows) == 9
+        assert rows[0]['timestamp'] == '2024-05-01 02:00:00'
+        assert _read_csv(tmp_path / 'tasks.csv')[1][3:5] == ['02:00', '02:04']
+
+    def test_groups_follow_capture_order_not_id_order(self, engine, workday, tmp_path):
+        # Imported late, so it has the highest id but belongs inside the first group
+        late = _add_shot(workday, 2.5, 'main.py - VS Code', tasks='Edit main.py', category='Coding')
+
+        progress = engine.run(_request(tmp_path, batch_size=4))
+
+        rows = _read_csv(tmp_path / 'tasks.csv')
+        assert [row[7] for row in rows[1:]] == ['6', '4', '3']
+        assert (progress.last_id, progress.last_timestamp) == (13, '2024-05-01 10:02:00')
+        assert late == 14
+
+
+class TestParquet:
+    """Test Parquet part files and row groups."""
+
+    def test_parts_row_groups_and_dictionary_encoding(self, engine, tmp_path):
+        request = _request(tmp_path, 'shots.parquet', format='parquet', kind='screenshots',
+                           batch_size=2, row_group_size=2, rows_per_part=5)
+
+        progress = engine.run(request)
+
+        parts = sorted((tmp_path / 'shots.parquet').iterdir())
+        assert [p.name for p in parts] == ['part-00000.parquet', 'part-00001.parquet', 'part-00002.parquet']
+        assert progress.writer_state == {'parts': 3}
+        table = pq.read_table(tmp_path / 'shots.parquet')
+        assert table.column('id').to_pylist() == list(range(1, 14))
+        assert table.column('timestamp').type.unit == 'us'
+        metadata = pq.ParquetFile(parts[0]).metadata
+        assert metadata.num_row_groups == 3
+        column = metadata.row_group(0).column(metadata.schema.names.index('category'))
+        assert column.compression == 'ZSTD'
+        assert any('DICTIONARY' in encoding for encoding in column.encodings)
+
+    def test_empty_export_still_has_schema(self, db, tmp_path):
+        progress = ExportEngine(db).run(_request(tmp_path, 'empty.parquet', format='parquet'))
+
+        assert progress.status == 'done'
+        table = pq.read_table(tmp_path / 'empty.parquet')
+        assert table.num_rows == 0
+        assert table.column_names == list(TASK_GROUP_COLUMNS)
+
+
+class TestResume:
+    """Test checkpoints and resuming."""
+
+    @pytest.mark.parametrize('fmt, name', [('csv', 'tasks.csv'), ('jsonl', 'tasks.jsonl')])
+    def test_paused_export_resumes_to_identical_output(self, engine, tmp_path, fmt, name):
+        expected = tmp_path / f"expected.{fmt}"
+        engine.run(_request(tmp_path, expected.name, format=fmt))
+        pages = []
+
+        paused = engine.run(_request(tmp_path, name, format=fmt, batch_size=3),
+                            should_stop=lambda: len(pages) >= 2, on_progress=pages.append)
+        # Resume rebuilds the open group rather than re-reading finished ones
+        assert paused.status == 'paused'
+        assert paused.last_id == 5
+        assert read_progress(tmp_path / name).status == 'paused'
+
+        done = engine.run(_request(tmp_path, name, format=fmt, batch_size=3))
+
+        assert done.status == 'done'
+        assert (tmp_path / name).read_bytes() == expected.read_bytes()
+
+    def test_crash_after_checkpoint_truncates_partial_writes(self, engine, tmp_path):
+        engine.run(_request(tmp_path, 'expected.csv', kind='screenshots'))
+        request = _request(tmp_path, kind='screenshots', batch_size=4)
+        engine.run(request, should_stop=lambda: True)
+        with open(tmp_path / 'tasks.csv', 'a') as f:
+            f.write('99,half a row')
+
+        engine.run(request)
+
+        assert _read_csv(tmp_path / 'tasks.csv') == _read_csv(tmp_path / 'expected.csv')
+
+    def test_parquet_resume_drops_incomplete_parts(self, engine, tmp_path):
+        request = _request(tmp_path, 'shots.parquet', format='parquet', kind='screenshots',
+                           batch_size=2, row_group_size=2, rows_per_part=4)
+        pages = []
+        paused = engine.run(request, should_stop=lambda: len(pages) >= 3, on_progress=pages.append)
+        # Two pages fill the first part; the third is buffered in an unfinished one
+        assert paused.writer_state == {'parts': 1}
+        assert paused.last_id == 4
+        (tmp_path / 'shots.parquet' / 'part-00001.parquet.tmp').write_bytes(b'partial')
+
+        engine.run(request)
+
+        assert pq.read_table(tmp_path / 'shots.parquet').column('id').to_pylist() == list(range(1, 14))
+
+    def test_finished_export_is_not_rerun_and_changes_start_over(self, engine, tmp_path):
+        first = engine.run(_request(tmp_path))
+
+        with patch.object(engine, 'pages') as pages:
+            assert engine.run(_request(tmp_path)).updated_at == first.updated_at
+        pages.assert_not_called()
+
+        changed = engine.run(_request(tmp_path, categories=['Coding']))
+        assert changed.rows_written == 2
+        assert len(_read_csv(tmp_path / 'tasks.csv')) == 3
+
+    def test_failures_are_recorded(self, engine, tmp_path):
+        with patch.object(engine, 'pages', side_effect=RuntimeError('db down')):
+            progress = engine.run(_request(tmp_path))
+
+        assert progress.status == 'failed'
+        assert read_progress(tmp_path / 'tasks.csv').error == 'db down'
+
+    def test_invalid_requests_are_rejected(self, engine, tmp_path):
+        with pytest.raises(ValueError):
+            engine.run(_request(tmp_path, format='xlsx'))
+        assert not progress_path(tmp_path / 'tasks.csv').exists()
+
+
+class TestJobsAndCLI:
+    """Test background jobs, progress and the CLI command."""
+
+    def test_progress_is_reported_per_page(self, engine, tmp_path):
+        seen = []
+
+        engine.run(_request(tmp_path, batch_size=5), on_progress=lambda p: seen.append((p.status, p.rows_read)))
+
+        assert seen == [('running', 5), ('running', 10), ('running', 13), ('done', 13)]
+
+    def test_background_job_runs_to_completion(self, engine, tmp_path):
+        jobs = ExportJobs(engine)
+        request = _request(tmp_path)
+
+        output = jobs.start(request)
+        progress = jobs.wait(output, timeout=10)
+
+        assert output == request.output_path
+        assert progress.status == 'done' and progress.fraction == 1.0
+        assert not jobs.is_running(output)
+
+    def test_cli_export_and_resume(self, workday, tmp_path):
+        from autotasktracker.cli.commands.process import process_group
+        output = tmp_path / 'cli.csv'
+        args = ['export', '--since', '2024-05-01', '--until', '2024-05-02', '--kind', 'screenshots',
+                '--output', str(output), '--batch-size', '4']
+
+        with patch('autotasktracker.core.database.DatabaseManager', lambda **kwargs: workday):
+            result = CliRunner().invoke(process_group, args)
+            assert result.exit_code == 0, result.output
+            assert f"Exported 13 rows to {output}" in result.output
+
+            # A finished export with the same range is not redone
+            resumed = CliRunner().invoke(process_group, ['export', '--output', str(output), '--kind', 'screenshots'])
+        assert resumed.exit_code == 0, resumed.output
+        assert len(_read_csv(output)) == 14
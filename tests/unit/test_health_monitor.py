@@ -0,0 +1,169 @@
+"""
+Tests for cached, background Pensieve health probing.
+
+Tests cover:
+- Hot-path is_healthy() reading the cached snapshot without probing inline
+- Background refreshes for missing or old results and the staleness bound
+- Jittered probe intervals and early wake-ups
+- memos detection via PID files and port probes instead of `memos ps`
+- Rolling probe latency statistics
+"""
+import os
+import socket
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from autotasktracker.pensieve.config_reader import PensieveConfigReader
+from autotasktracker.pensieve.health_monitor import PensieveHealthMonitor
+
+
+@pytest.fixture
+def probes():
+    """Patch the probe dependencies with a healthy memos service."""
+    reader = MagicMock()
+    reader.probe_memos_process.return_value = {"running": True, "method": "pid_file"}
+    reader.read_pensieve_config.return_value.database_path = "/tmp/memos.db"
+    client = MagicMock()
+    client.is_healthy.return_value = True
+    with patch('autotasktracker.pensieve.health_monitor.get_pensieve_config_reader', return_value=reader), \
+            patch('autotasktracker.pensieve.health_monitor.get_pensieve_client', return_value=client):
+        yield reader, client
+
+
+@pytest.fixture
+def monitor():
+    monitor = PensieveHealthMonitor(check_interval=30)
+    yield monitor
+    monitor.stop_monitoring()
+
+
+class TestCachedHealth:
+    """Test the lock-free cached health snapshot."""
+
+    def test_is_healthy_reads_cached_snapshot(self, monitor, probes):
+        reader, client = probes
+        monitor.check_health()
+
+        with patch.object(monitor, 'check_health') as check_health:
+            assert all(monitor.is_healthy() for _ in range(1000))
+        check_health.assert_not_called()
+        assert client.is_healthy.call_count == 1
+        assert not monitor._monitoring
+
+    def test_unknown_status_requests_refresh_without_blocking(self, monitor):
+        with patch.object(monitor, 'start_monitoring') as start, \
+                patch.object(monitor, 'check_health') as check_health:
+            assert monitor.is_healthy() is False
+        start.assert_called_once()
+        check_health.assert_not_called()
+        assert monitor._wake.is_set()
+
+    def test_old_status_served_until_stale(self, monitor, probes):
+        monitor.check_health()
+        status, checked_at = monitor._snapshot
+        monitor._monitoring = True  # Pretend the prober thread is running
+
+        monitor._snapshot = (status, checked_at - 45)
+        assert monitor.is_healthy(max_age_seconds=30) is True
+        assert monitor.refresh_requests == 1
+
+        monitor._snapshot = (status, checked_at - monitor.stale_after - 1)
+        assert monitor.is_healthy(max_age_seconds=30) is False
+        monitor._monitoring = False
+
+    def test_background_prober_refreshes_on_request(self, probes):
+        reader, client = probes
+        monitor = PensieveHealthMonitor(check_interval=3600)
+        try:
+            monitor.request_refresh()
+            deadline = time.monotonic() + 5
+            while monitor.get_last_status() is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert monitor.get_last_status().is_healthy
+
+            monitor.request_refresh()
+            deadline = time.monotonic() + 5
+            while monitor.probe_count < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert monitor.probe_count == 2
+        finally:
+            monitor.stop_monitoring()
+        assert not monitor._monitor_thread.is_alive()
+
+    def test_unhealthy_components_and_callbacks(self, monitor, probes):
+        reader, client = probes
+        reader.probe_memos_process.return_value = {"running": False}
+        seen = []
+        monitor.add_health_callback(seen.append)
+
+        status = monitor.check_health()
+
+        assert not status.is_healthy
+        assert "Memos service is not running" in status.warnings
+        assert seen == [status]
+        reader.get_memos_status.assert_not_called()
+
+    def test_intervals_are_jittered_downwards(self):
+        monitor = PensieveHealthMonitor(check_interval=30, jitter=0.2)
+        intervals = {monitor._next_interval() for _ in range(50)}
+
+        assert all(24 <= interval <= 30 for interval in intervals)
+        assert len(intervals) > 1
+
+    def test_summary_reports_rolling_latency(self, probes):
+        monitor = PensieveHealthMonitor(latency_window=3)
+        with patch('autotasktracker.pensieve.health_monitor.time.time',
+                   side_effect=[0, 0, 0.1, 1, 1, 1.2, 2, 2, 2.3, 3, 3, 3.4]):
+            for _ in range(4):
+                monitor.check_health()
+
+        summary = monitor.get_health_summary()
+        latency = summary['metrics']['probe_latency']
+        assert summary['status'] == 'healthy'
+        assert latency['count'] == 3
+        assert latency['max_ms'] == pytest.approx(400)
+
+
+class TestMemosProbe:
+    """Test memos process detection without subprocesses."""
+
+    @pytest.fixture
+    def reader(self, tmp_path):
+        reader = PensieveConfigReader.__new__(PensieveConfigReader)
+        reader.memos_dir = tmp_path
+        return reader
+
+    def test_live_pid_file(self, reader, tmp_path):
+        (tmp_path / 'memos.pid').write_text(str(os.getpid()))
+
+        with patch('autotasktracker.pensieve.config_reader.subprocess.run') as run:
+            status = reader.probe_memos_process()
+
+        assert status == {"running": True, "pid": os.getpid(), "port_open": None, "method": "pid_file"}
+        run.assert_not_called()
+
+    def test_invalid_pid_file_falls_back_to_port_probe(self, reader, tmp_path):
+        (tmp_path / 'memos.pid').write_text('not-a-pid')
+        listener = socket.socket()
+        listener.bind(('localhost', 0))
+        listener.listen(1)
+        try:
+            status = reader.probe_memos_process(api_port=listener.getsockname()[1])
+        finally:
+            listener.close()
+
+        assert status['running'] and status['port_open']
+        assert status['method'] == 'port_probe'
+
+    def test_closed_port_is_not_running(self, reader):
+        probe = socket.socket()
+        probe.bind(('localhost', 0))
+        port = probe.getsockname()[1]
+        probe.close()
+
+        status = reader.probe_memos_process(api_port=port, timeout=0.2)
+
+        assert status['running'] is False
+        assert status['port_open'] is False
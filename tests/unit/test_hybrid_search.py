@@ -0,0 +1,305 @@
+"""
+Tests for the hybrid retrieval engine.
+
+Runs the engine against the SQLite stand-in for the Pensieve schema to cover:
+- Reciprocal rank fusion, retriever weights and prior-only retrievers
+- Parallel retrieval with per-retriever latency, error and timeout isolation
+- Date and category filters pushed into every retriever
+- Incremental embedding loading and category detection
+- Batched hydration of the final top-k and the PensieveAdvancedSearch facade
+"""
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from autotasktracker.core.text_index import TextIndex
+from autotasktracker.pensieve.advanced_search import PensieveAdvancedSearch, SearchQuery
+from autotasktracker.pensieve.hybrid_search import (
+    CategoryRetriever, FullTextRetriever, HybridSearchEngine, RecencyRetriever, RetrievedHit,
+    Retriever, SearchFilters, VectorRetriever,
+)
+from tests.unit.test_processing_ledger import SQLiteTestDatabase
+
+TOPICS = {'budget': [1, 0, 0], 'deploy': [0, 1, 0], 'meeting': [0, 0, 1]}
+
+
+def embed(text):
+    """Bag-of-topics embedding: one axis per topic word in the text."""
+    vector = np.zeros(3)
+    for word, axis in TOPICS.items():
+        if word in text.lower():
+            vector += axis
+    return vector if vector.any() else np.ones(3)
+
+
+class StaticRetriever(Retriever):
+    """Retriever returning a fixed ranking, optionally after a delay."""
+
+    def __init__(self, name, ids, delay=0.0, prior=False, weight=1.0, error=None):
+        self.name, self.ids, self.delay = name, ids, delay
+        self.prior, self.weight, self.error = prior, weight, error
+        self.calls = []
+
+    def retrieve(self, text, filters):
+        self.calls.append(filters)
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return [RetrievedHit(entity_id, 1.0) for entity_id in self.ids]
+
+
+@pytest.fixture
+def db(tmp_path):
+    return SQLiteTestDatabase(tmp_path / 'hybrid.db')
+
+
+def _add_shot(db, title, tasks=None, category=None, age_seconds=60, embedding=None):
+    db.add_entities(1, age_seconds=age_seconds)
+    with db.get_connection() as conn:
+        entity_id = conn.execute("SELECT MAX(id) FROM entities").fetchone()[0]
+    db.add_metadata(entity_id, 'active_window', title)
+    if tasks:
+        db.add_metadata(entity_id, 'tasks', json.dumps(tasks))
+    if category:
+        db.add_metadata(entity_id, 'category', category)
+    if embedding is not None:
+        db.add_metadata(entity_id, 'task_embedding', json.dumps(list(embedding)))
+    return entity_id
+
+
+@pytest.fixture
+def engine(db):
+    index = TextIndex(db)
+    index.ensure_schema()
+    engine = HybridSearchEngine(db, retrievers=[
+        FullTextRetriever(index),
+        VectorRetriever(db, embed_query=embed),
+        CategoryRetriever(db),
+        RecencyRetriever(db),
+    ])
+    yield engine
+    engine.shutdown()
+
+
+class TestFusion:
+    """Test reciprocal rank fusion."""
+
+    def test_items_found_by_several_retrievers_rank_first(self, db):
+        engine = HybridSearchEngine(db, retrievers=[StaticRetriever('a', []), StaticRetriever('b', [])], rrf_k=60)
+
+        fused = engine.fuse({
+            'a': [RetrievedHit(1, 9.0), RetrievedHit(2, 5.0)],
+            'b': [RetrievedHit(3, 0.9), RetrievedHit(2, 0.8)],
+        })
+
+        # Ties (1 and 3 are both rank 1 once) go to the newer entity
+        assert [entity_id for entity_id, _, _ in fused] == [2, 3, 1]
+        assert fused[0][1] == pytest.approx(1 / 62 + 1 / 62)
+        assert fused[0][2] == ['a', 'b']
+        engine.shutdown()
+
+    def test_priors_only_rerank_existing_candidates(self, db):
+        content = StaticRetriever('content', [])
+        prior = StaticRetriever('recency', [], prior=True, weight=0.5)
+        engine = HybridSearchEngine(db, retrievers=[prior, content])
+
+        fused = engine.fuse({
+            'recency': [RetrievedHit(9, 1.0), RetrievedHit(2, 0.9)],
+            'content': [RetrievedHit(1, 1.0), RetrievedHit(2, 0.5)],
+        })
+
+        assert [entity_id for entity_id, _, _ in fused] == [2, 1]
+        assert fused[0][2] == ['content', 'recency']
+        engine.shutdown()
+
+
+class TestParallelRetrieval:
+    """Test concurrent retriever execution and isolation."""
+
+    def test_retrievers_run_concurrently(self, db):
+        barrier = threading.Barrier(3, timeout=5)
+
+        class BarrierRetriever(StaticRetriever):
+            def retrieve(self, text, filters):
+                barrier.wait()
+                return super().retrieve(text, filters)
+
+        retrievers = [BarrierRetriever(name, [i]) for i, name in enumerate(('a', 'b', 'c'))]
+        engine = HybridSearchEngine(db, retrievers=retrievers)
+
+        rankings = engine.retrieve('x', SearchFilters())
+
+        assert set(rankings) == {'a', 'b', 'c'}
+        assert all(stats['count'] == 1 and stats['ok'] == 1 for stats in engine.retriever_stats().values())
+        engine.shutdown()
+
+    def test_failed_and_slow_retrievers_are_isolated(self, db):
+        engine = HybridSearchEngine(db, retriever_timeout=0.2, retrievers=[
+            StaticRetriever('ok', [1]),
+            StaticRetriever('broken', [2], error=RuntimeError('index offline')),
+            StaticRetriever('slow', [3], delay=1.0),
+        ])
+
+        rankings = engine.retrieve('x', SearchFilters())
+
+        assert [hit.entity_id for hit in rankings['ok']] == [1]
+        assert rankings['broken'] == []
+        assert 'slow' not in rankings
+        stats = engine.retriever_stats()
+        assert stats['broken']['error'] == 1
+        assert stats['slow']['timeout'] == 1
+        engine.shutdown()
+
+    def test_filters_reach_every_retriever(self, db):
+        retrievers = [StaticRetriever('a', []), StaticRetriever('b', [])]
+        engine = HybridSearchEngine(db, retrievers=retrievers, candidates_per_retriever=40)
+        window = (datetime(2024, 1, 1), datetime(2024, 1, 2))
+
+        engine.search(SearchQuery(text='x', date_range=window, category_filter='Coding', max_results=5))
+
+        for retriever in retrievers:
+            assert retriever.calls == [SearchFilters(date_range=window, category='Coding', limit=40)]
+        engine.shutdown()
+
+
+class TestRetrievers:
+    """Test the built-in retrievers against the database."""
+
+    def test_vector_retriever_loads_embeddings_incrementally(self, db):
+        retriever = VectorRetriever(db, embed_query=embed)
+        _add_shot(db, 'Sheet', embedding=[1, 0, 0])
+        _add_shot(db, 'Console', embedding=[0, 1, 0])
+
+        assert retriever.refresh() == 2
+        assert retriever.refresh() == 0
+        _add_shot(db, 'Plan', embedding=[0.9, 0.1, 0])
+        assert [hit.entity_id for hit in retriever.retrieve('budget', SearchFilters())] == [1, 3]
+
+    def test_vector_retriever_picks_up_late_and_repeated_embeddings(self, db):
+        retriever = VectorRetriever(db, embed_query=embed)
+        first = _add_shot(db, 'Sheet')
+        _add_shot(db, 'Console', embedding=[0, 1, 0])
+        assert retriever.refresh() == 1
+
+        # Embedded after a newer screenshot, then re-embedded
+        db.add_metadata(first, 'task_embedding', json.dumps([0, 0, 1]))
+        assert retriever.refresh() == 1
+        db.add_metadata(first, 'task_embedding', json.dumps([1, 0, 0]))
+        assert retriever.refresh() == 1
+
+        assert [hit.entity_id for hit in retriever.retrieve('budget', SearchFilters())] == [first]
+        assert len(retriever._ids) == 2
+
+    def test_vector_retriever_pages_history_newest_first(self, db):
+        retriever = VectorRetriever(db, embed_query=embed, page_size=2)
+        for i in range(5):
+            _add_shot(db, f'shot {i}', embedding=[1, 0, 0])
+
+        assert retriever.refresh() == 2
+        assert sorted(retriever._ids) == [4, 5]
+        assert retriever.refresh() == 2
+        assert retriever.refresh() == 1
+        assert retriever.refresh() == 0
+        assert sorted(retriever._ids) == [1, 2, 3, 4, 5]
+
+    def test_vector_retriever_resyncs_values_updated_in_place(self, db):
+        retriever = VectorRetriever(db, embed_query=embed, resync_seconds=0)
+        entity_id = _add_shot(db, 'Sheet', embedding=[0, 1, 0])
+        retriever.refresh()
+        with db.get_connection() as conn:
+            conn.execute("UPDATE metadata_entries SET value = ? WHERE key = 'task_embedding'",
+                         (json.dumps([1, 0, 0]),))
+
+        assert [hit.entity_id for hit in retriever.retrieve('budget', SearchFilters())] == [entity_id]
+
+    def test_vector_retriever_applies_filters_before_scoring(self, db):
+        retriever = VectorRetriever(db, embed_query=embed)
+        _add_shot(db, 'old', category='Work', age_seconds=3 * 86400, embedding=[1, 0, 0])
+        _add_shot(db, 'new', category='Work', embedding=[1, 0, 0])
+        _add_shot(db, 'other', category='Play', embedding=[1, 0, 0])
+        now = datetime.now()
+
+        hits = retriever.retrieve('budget', SearchFilters(date_range=(now - timedelta(days=1), now),
+                                                          category='Work'))
+
+        assert [hit.entity_id for hit in hits] == [2]
+
+    def test_vector_retriever_without_model_is_disabled(self, db):
+        retriever = VectorRetriever(db)
+        with patch.dict('sys.modules', {'sentence_transformers': None}):
+            assert retriever.retrieve('budget', SearchFilters()) == []
+        assert retriever._model_unavailable
+
+    def test_category_retriever_matches_named_categories(self, db):
+        meeting = _add_shot(db, 'Zoom', category='🎥 Meetings')
+        _add_shot(db, 'VS Code', category='🧑‍💻 Coding')
+        retriever = CategoryRetriever(db)
+
+        assert retriever.named_categories('meetings last week') == ['🎥 Meetings']
+        assert [hit.entity_id for hit in retriever.retrieve('meetings', SearchFilters())] == [meeting]
+        assert retriever.retrieve('meetings', SearchFilters(category='🧑‍💻 Coding')) == []
+        assert retriever.retrieve('invoice', SearchFilters()) == []
+
+    def test_recency_retriever_orders_newest_first(self, db):
+        old = _add_shot(db, 'a', category='Work', age_seconds=7200)
+        new = _add_shot(db, 'b', category='Work', age_seconds=60)
+        _add_shot(db, 'c', category='Play', age_seconds=30)
+
+        hits = RecencyRetriever(db).retrieve('', SearchFilters(category='Work'))
+
+        assert [hit.entity_id for hit in hits] == [new, old]
+        assert 1 >= hits[0].score > hits[1].score
+
+
+class TestHybridSearch:
+    """Test end-to-end search and hydration."""
+
+    def test_search_fuses_text_and_vector_matches(self, db, engine):
+        both = _add_shot(db, 'Q3 budget.xlsx', tasks=['Review budget'], embedding=[1, 0, 0])
+        text_only = _add_shot(db, 'budget notes.txt', embedding=[0, 1, 0])
+        vector_only = _add_shot(db, 'Finance forecast', embedding=[0.95, 0.05, 0])
+        _add_shot(db, 'Deploy pipeline', embedding=[0, 1, 0])
+
+        results = engine.search(SearchQuery(text='budget', max_results=10))
+
+        assert [r.entity_id for r in results][:1] == [both]
+        assert {r.entity_id for r in results} == {both, text_only, vector_only}
+        top = results[0]
+        assert top.relevance_score == 1.0
+        assert top.search_method.startswith('fulltext+vector') or top.search_method.startswith('vector+fulltext')
+        assert top.extracted_tasks == ['Review budget']
+        assert top.highlights and '**budget**' in top.highlights[0]
+        assert isinstance(top.timestamp, datetime)
+
+    def test_final_results_are_hydrated_in_one_query(self, db, engine):
+        for i in range(5):
+            _add_shot(db, f'budget {i}', embedding=[1, 0, 0])
+
+        with patch.object(engine, 'hydrate', wraps=engine.hydrate) as hydrate:
+            results = engine.search(SearchQuery(text='budget', max_results=3))
+
+        hydrate.assert_called_once()
+        assert len(hydrate.call_args[0][0]) == 3
+        assert len(results) == 3
+
+    def test_use_flags_select_retrievers(self, db, engine):
+        _add_shot(db, 'Finance forecast', embedding=[1, 0, 0])
+
+        assert engine.search(SearchQuery(text='budget', use_semantic=False)) == []
+        assert len(engine.search(SearchQuery(text='budget', use_keyword=False))) == 1
+
+    def test_advanced_search_delegates_to_engine(self, db, engine):
+        _add_shot(db, 'budget.xlsx', embedding=[1, 0, 0])
+        search = PensieveAdvancedSearch(engine=engine)
+
+        results = search.search(SearchQuery(text='budget'))
+
+        assert len(results) == 1
+        stats = search.get_search_statistics()
+        assert stats['hybrid_searches'] == 1
+        assert stats['retrievers']['fulltext']['count'] == 1
@@ -0,0 +1,92 @@
+"""
+Tests for lazy barrel exports and lazy CLI command registration.
+
+Tests cover:
+- Barrel exports resolving to the same objects as their defining modules
+- Caching resolved exports on the barrel module
+- dir() and AttributeError behaviour of lazy barrels
+- LazyGroup listing and resolving command groups on demand
+"""
+import sys
+import types
+
+import click
+import pytest
+from click.testing import CliRunner
+
+import autotasktracker
+import autotasktracker.core
+import autotasktracker.pensieve
+from autotasktracker.cli.main import COMMAND_GROUPS, LazyGroup, cli
+from autotasktracker.utils.lazy_imports import lazy_exports
+
+
+class TestLazyExports:
+    """Test the lazy_exports barrel helper."""
+
+    def test_barrel_exports_match_defining_modules(self):
+        from autotasktracker.core.database import DatabaseManager
+        from autotasktracker.ai.vlm_processor import SmartVLMProcessor
+        from autotasktracker.pensieve.event_integration import DashboardNotifier
+
+        assert autotasktracker.DatabaseManager is DatabaseManager
+        assert autotasktracker.core.DatabaseManager is DatabaseManager
+        assert autotasktracker.VLMProcessor is SmartVLMProcessor
+        assert autotasktracker.pensieve.DashboardNotifier is DashboardNotifier
+
+    def test_every_public_name_resolves(self):
+        for module in (autotasktracker, autotasktracker.core, autotasktracker.pensieve):
+            for name in module.__all__:
+                assert getattr(module, name) is not None
+
+    def test_resolved_exports_are_cached_and_listed(self, monkeypatch):
+        module = types.ModuleType('lazy_barrel')
+        monkeypatch.setitem(sys.modules, 'lazy_barrel', module)
+        module.__getattr__, module.__dir__ = lazy_exports('lazy_barrel', {
+            'join': 'os.path',
+            'dumps_json': 'json:dumps',
+        })
+
+        import json
+        import os.path
+        assert 'join' in dir(module) and 'dumps_json' in dir(module)
+        assert module.dumps_json is json.dumps
+        assert module.join is os.path.join
+        # Cached on the module, so __getattr__ is not consulted again
+        assert vars(module)['join'] is os.path.join
+        with pytest.raises(AttributeError):
+            module.missing
+
+    def test_star_import_uses_all(self):
+        namespace = {}
+        exec('from autotasktracker.core import *', namespace)
+
+        assert set(autotasktracker.core.__all__) <= set(namespace)
+
+
+class TestLazyGroup:
+    """Test lazy click command registration."""
+
+    def test_lists_lazy_and_eager_commands(self):
+        ctx = click.Context(cli)
+        assert set(COMMAND_GROUPS) | {'version', 'config'} == set(cli.list_commands(ctx))
+
+    def test_resolves_commands_on_demand(self):
+        group = LazyGroup(lazy_subcommands={'greet': 'tests.unit.test_lazy_imports:greet'})
+
+        assert 'greet' not in group.commands
+        result = CliRunner().invoke(group, ['greet'])
+
+        assert result.exit_code == 0
+        assert result.output == 'hello\n'
+        assert 'greet' in group.commands
+
+    def test_unknown_command_fails_cleanly(self):
+        result = CliRunner().invoke(cli, ['nope'])
+        assert result.exit_code != 0
+        assert 'No such command' in result.output
+
+
+@click.command()
+def greet():
+    click.echo('hello')
@@ -0,0 +1,200 @@
+"""
+Tests for incremental live dashboard views.
+
+Tests cover:
+- Merging new rows into the open tail group or starting new groups
+- Incremental grouping matching a full regroup of the same rows
+- Watermark advancement and delta-only fetching
+- Full reloads for stale views, out-of-order rows and oversized deltas
+- Incremental summary metrics
+"""
+import random
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from autotasktracker.dashboards.data.live_view import LiveTaskView
+from autotasktracker.dashboards.data.models import Task
+from autotasktracker.dashboards.data.repositories import TaskRepository
+
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 1, 1, 23, 59, 59)
+
+
+def _task(task_id, minute, window, category='Development'):
+    return Task(id=task_id, title=window, category=category,
+                timestamp=START + timedelta(hours=9, minutes=minute),
+                duration_minutes=5, window_title=window)
+
+
+class FakeTaskSource(TaskRepository):
+    """TaskRepository serving an in-memory list instead of the database."""
+
+    def __init__(self, tasks=()):
+        super().__init__(MagicMock(), use_pensieve=False)
+        self.rows = list(tasks)
+        self.period_calls = 0
+        self.delta_calls = []
+
+    def get_tasks_for_period(self, start_date, end_date, categories=None, limit=1000):
+        self.period_calls += 1
+        return sorted(self.rows, key=lambda t: t.timestamp, reverse=True)[:limit]
+
+    def get_tasks_after(self, after_id, start_date, end_date, limit=1000):
+        self.delta_calls.append(after_id)
+        return sorted((t for t in self.rows if t.id > after_id), key=lambda t: t.id)[:limit]
+
+
+def _signature(groups):
+    return [(g.window_title, g.start_time, g.end_time, g.task_count) for g in groups]
+
+
+@pytest.fixture
+def repo():
+    return FakeTaskSource([_task(1, 0, 'main.py - VS Code'), _task(2, 2, 'main.py - VS Code')])
+
+
+class TestLiveTaskView:
+    """Test the LiveTaskView incremental view model."""
+
+    def test_new_rows_extend_tail_group(self, repo):
+        view = LiveTaskView(repo, START, END)
+        view.load()
+        repo.rows.append(_task(3, 4, 'main.py - VS Code'))
+
+        delta = view.apply_updates()
+
+        assert delta.extended_tail
+        assert delta.new_groups == 0
+        assert delta.changed == {'metrics', 'task_groups'}
+        assert [g.task_count for g in view.groups] == [3]
+        assert repo.period_calls == 1
+        assert repo.delta_calls == [2]
+        assert view.watermark_id == 3
+
+    def test_new_window_starts_new_group(self, repo):
+        view = LiveTaskView(repo, START, END)
+        view.load()
+        repo.rows += [_task(3, 5, 'Slack'), _task(4, 6, 'Slack')]
+
+        delta = view.apply_updates()
+
+        assert not delta.extended_tail
+        assert delta.new_groups == 1
+        assert [g.window_title for g in view.groups] == ['main.py - VS Code', 'Slack']
+
+    def test_incremental_matches_full_regroup(self):
+        rng = random.Random(7)
+        windows = ['main.py - VS Code', 'Slack', 'Chrome - Docs']
+        rows, minute = [], 0
+        for task_id in range(1, 121):
+            minute += rng.choice([1, 1, 2, 20])
+            rows.append(_task(task_id, minute, rng.choice(windows)))
+
+        repo = FakeTaskSource(rows[:10])
+        view = LiveTaskView(repo, START, END, min_duration_minutes=2)
+        view.load()
+        for end in range(17, 121, 7):
+            repo.rows = rows[:end]
+            view.apply_updates()
+        repo.rows = rows
+        view.apply_updates()
+
+        expected = FakeTaskSource(rows).get_task_groups(START, END, min_duration_minutes=2)
+        assert _signature(view.groups) == _signature(expected)
+        assert repo.period_calls == 1
+
+    def test_no_new_rows_is_a_noop(self, repo):
+        view = LiveTaskView(repo, START, END)
+        view.load()
+        version = view.version
+
+        delta = view.apply_updates()
+
+        assert not delta.has_changes
+        assert view.version == version
+
+    def test_out_of_order_rows_trigger_reload(self, repo):
+        view = LiveTaskView(repo, START, END)
+        view.load()
+        repo.rows.append(_task(3, -30, 'Slack'))
+
+        delta = view.apply_updates()
+
+        assert delta.reloaded
+        assert repo.period_calls == 2
+        assert view.watermark_id == 3
+        assert _signature(view.groups) == _signature(repo.get_task_groups(START, END))
+
+    def test_stale_view_and_large_deltas_reload(self, repo):
+        view = LiveTaskView(repo, START, END, delta_limit=2)
+        view.load()
+        repo.rows += [_task(3, 3, 'Slack'), _task(4, 4, 'Slack')]
+        assert view.apply_updates().reloaded
+
+        view.max_age_seconds = 0
+        with patch('autotasktracker.dashboards.data.live_view.time.monotonic', return_value=1e12):
+            assert view.apply_updates().reloaded
+        assert repo.period_calls == 3
+
+    def test_summary_is_advanced_incrementally(self, repo):
+        metrics_repo = MagicMock()
+        metrics_repo.get_metrics_summary.return_value = {
+            'total_activities': 2, 'active_days': 1, 'unique_windows': 1,
+            'unique_categories': 1, 'avg_daily_activities': 2,
+        }
+        view = LiveTaskView(repo, START, END, metrics_repo=metrics_repo)
+        view.load()
+        repo.rows += [_task(3, 3, 'main.py - VS Code'), _task(4, 4, 'Slack', category='Communication')]
+
+        view.apply_updates()
+
+        assert view.summary['total_activities'] == 4
+        assert view.summary['unique_windows'] == 2
+        assert view.summary['unique_categories'] == 2
+        assert view.summary['active_days'] == 1
+        assert view.summary['avg_daily_activities'] == 4
+        metrics_repo.get_metrics_summary.assert_called_once()
+
+    def test_matches_period_and_settings(self, repo):
+        view = LiveTaskView(repo, START, END, min_duration_minutes=1)
+
+        assert view.matches(START, END, 1, 15)
+        assert not view.matches(START, END, 2, 15)
+        assert not view.matches(START - timedelta(days=1), END, 1, 15)
+
+    def test_preset_view_survives_reruns_ending_now(self, repo):
+        now = datetime.now()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        view = LiveTaskView(repo, today, now, min_duration_minutes=1, period_key='Today')
+
+        later = now + timedelta(seconds=30)
+        assert view.open_end
+        assert view.matches(today, later, 1, 15, period_key='Today')
+        assert not view.matches(today, later, 1, 15)
+        assert not view.matches(today, later, 1, 15, period_key='This Week')
+        assert not view.matches(today + timedelta(days=1), later, 1, 15, period_key='Today')
+
+    def test_open_ended_delta_is_not_capped_at_the_first_end(self, repo):
+        now = datetime.now()
+        view = LiveTaskView(repo, now - timedelta(days=7), now, period_key='Last 7 Days')
+        view.load()
+        repo.get_tasks_after = MagicMock(return_value=[])
+
+        view.apply_updates()
+
+        delta_end = repo.get_tasks_after.call_args[0][2]
+        assert delta_end > now
+        assert not LiveTaskView(repo, START, END, period_key='Yesterday').open_end
+
+    def test_invalidated_view_reloads_in_full(self, repo):
+        view = LiveTaskView(repo, START, END)
+        view.load()
+
+        view.invalidate()
+
+        assert view.pending_events == 1
+        assert view.apply_updates().reloaded
+        assert repo.period_calls == 2
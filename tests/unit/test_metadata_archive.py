@@ -0,0 +1,186 @@
+"""
+Tests for tiered metadata archiving.
+
+Archives verbose metadata of a SQLite stand-in into real Parquet parts and
+checks that only old, verbose rows move, that reads fall through to the
+archive, and that interrupted or failed runs leave consistent state.
+"""
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from click.testing import CliRunner
+
+from autotasktracker.core.metadata_archive import MetadataArchive, MetadataArchiver, fill_archived
+from tests.unit.test_processing_ledger import SQLiteTestDatabase
+
+NOW = datetime(2024, 8, 1, 12)
+
+
+def _add_shot(db, captured_at, **metadata):
+    with db.get_connection(readonly=False) as conn:
+        entity_id = conn.execute("INSERT INTO entities (filepath, created_at) VALUES (?, ?)",
+                                 (f"/shots/{captured_at:%Y%m%d%H%M}.png", captured_at.isoformat(sep=' '))).lastrowid
+    for key, value in metadata.items():
+        db.add_metadata(entity_id, key, value)
+    return entity_id
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Screenshots from May, June and last week, each with verbose and hot keys."""
+    db = SQLiteTestDatabase(tmp_path / 'archive.db')
+    for captured_at in (datetime(2024, 5, 3, 9), datetime(2024, 5, 20, 9), datetime(2024, 6, 10, 9),
+                        NOW - timedelta(days=7)):
+        _add_shot(db, captured_at, ocr_result=f'[[[0,0],"text {captured_at:%m%d}",0.9]]',
+                  minicpm_v_result=f'{{"description": "desk {captured_at:%m%d}"}}',
+                  tasks=f'Task {captured_at:%m%d}', category='Coding')
+    return db
+
+
+@pytest.fixture
+def archiver(db, tmp_path):
+    return MetadataArchiver(db, archive_dir=str(tmp_path / 'archive'), older_than_days=30, batch_size=2)
+
+
+def _hot_keys(db, entity_id):
+    with db.get_connection() as conn:
+        return sorted(row[0] for row in conn.execute(
+            "SELECT key FROM metadata_entries WHERE entity_id = ?", (entity_id,)))
+
+
+class TestArchiving:
+    """Test moving verbose metadata to archive parts."""
+
+    def test_only_verbose_keys_of_old_screenshots_move(self, archiver, db):
+        totals = archiver.run(now=NOW)
+
+        assert totals['rows'] == 6 and totals['batches'] == 2
+        for entity_id in (1, 2, 3):
+            assert _hot_keys(db, entity_id) == ['category', 'tasks']
+        assert _hot_keys(db, 4) == ['category', 'minicpm_v_result', 'ocr_result', 'tasks']
+
+    def test_parts_are_monthly_zstd_parquet(self, archiver, tmp_path):
+        archiver.run(now=NOW)
+
+        parts = sorted((tmp_path / 'archive' / 'metadata').glob('*/*.parquet'))
+        assert [p.parent.name for p in parts] == ['2024-05', '2024-06']
+        table = pq.read_table(parts[0])
+        assert table.column('entity_id').to_pylist() == [1, 1, 2, 2]
+        assert table.column('key').to_pylist() == ['minicpm_v_result', 'ocr_result'] * 2
+        assert pq.ParquetFile(parts[0]).metadata.row_group(0).column(0).compression == 'ZSTD'
+        stats = archiver.stats()
+        assert stats['rows'] == 6 and stats['parts'] == 2
+        assert set(stats['months']) == {'2024-05', '2024-06'}
+
+    def test_interrupted_run_resumes_without_duplicates(self, archiver, db):
+        first = archiver.run(now=NOW, max_batches=1)
+        second = archiver.run(now=NOW)
+
+        assert first['rows'] == 4 and second['rows'] == 2
+        assert archiver.run(now=NOW)['rows'] == 0
+        assert archiver.stats()['rows'] == 6
+
+    def test_failed_batch_keeps_rows_hot_and_its_part_is_removed(self, archiver, db, tmp_path):
+        with patch.object(archiver, '_sql', side_effect=lambda q: q.replace('%s', '?')
+                          if not q.lstrip().startswith('DELETE') else 'DELETE FROM no_such_table'):
+            with pytest.raises(Exception):
+                archiver.run(now=NOW, max_batches=1)
+
+        assert _hot_keys(db, 1) == ['category', 'minicpm_v_result', 'ocr_result', 'tasks']
+        assert archiver.manifest(refresh=True) == []
+        orphans = list((tmp_path / 'archive' / 'metadata').glob('*/*.parquet'))
+        assert len(orphans) == 1
+        assert archiver.remove_orphans(grace_seconds=0) == 1
+
+    def test_dry_run_counts_candidates(self, archiver):
+        pending = archiver.candidates(now=NOW)
+
+        assert pending['rows'] == 6 and pending['bytes'] > 0
+        assert archiver.stats()['rows'] == 0
+
+    def test_disabled_when_age_is_zero(self, db, tmp_path):
+        archiver = MetadataArchiver(db, archive_dir=str(tmp_path / 'a'), older_than_days=0)
+
+        assert archiver.run(now=NOW)['rows'] == 0
+
+
+class TestReadThrough:
+    """Test reading archived values back."""
+
+    def test_entity_metadata_merges_hot_and_archived(self, archiver, db, tmp_path):
+        archiver.run(now=NOW)
+        archive = MetadataArchive(db, archive_dir=str(tmp_path / 'archive'))
+
+        metadata = archive.get_entity_metadata(3)
+
+        assert metadata == {
+            'tasks': 'Task 0610', 'category': 'Coding',
+            'ocr_result': '[[[0,0],"text 0610",0.9]]', 'minicpm_v_result': '{"description": "desk 0610"}',
+        }
+        assert archive.get_entity_metadata(3, ['minicpm_v_result']) == {
+            'minicpm_v_result': '{"description": "desk 0610"}'}
+
+    def test_hot_values_win_over_archived_ones(self, archiver, db, tmp_path):
+        archiver.run(now=NOW)
+        db.add_metadata(2, 'minicpm_v_result', 'reprocessed')
+
+        assert MetadataArchive(db, archive_dir=str(tmp_path / 'archive')).get_entity_metadata(2)[
+            'minicpm_v_result'] == 'reprocessed'
+
+    def test_fill_frame_only_fills_missing_values(self, archiver, db, tmp_path):
+        archiver.run(now=NOW)
+        df = pd.DataFrame({'id': [1, 4], 'minicpm_v_result': [None, 'hot value']})
+
+        with patch('autotasktracker.config.Config.get_archive_path', return_value=str(tmp_path / 'archive')):
+            filled = fill_archived(db, df, {'minicpm_v_result': 'minicpm_v_result', 'tasks': 'tasks'})
+
+        assert filled['minicpm_v_result'].tolist() == ['{"description": "desk 0503"}', 'hot value']
+        assert df['minicpm_v_result'].isna().tolist() == [True, False]
+
+    def test_frames_outside_archived_ranges_are_not_read(self, archiver, db, tmp_path):
+        archiver.run(now=NOW)
+        archive = MetadataArchive(db, archive_dir=str(tmp_path / 'archive'))
+        df = pd.DataFrame({'id': [4], 'ocr_result': [None]})
+
+        with patch.object(archive, 'fetch') as fetch:
+            assert archive.fill_frame(df, {'ocr_result': 'ocr_result'}) is df
+        fetch.assert_not_called()
+
+    def test_text_index_rebuild_reads_archived_ocr(self, archiver, db, tmp_path):
+        from autotasktracker.core.text_index import TextIndex
+        archiver.run(now=NOW)
+        archive = MetadataArchive(db, archive_dir=str(tmp_path / 'archive'))
+        index = TextIndex(db)
+
+        with patch('autotasktracker.core.metadata_archive.get_metadata_archive', return_value=archive):
+            assert index.rebuild() == 4
+
+        assert [match.entity_id for match in index.search('text 0503')] == [1]
+        assert [match.entity_id for match in index.search('text 0725')] == [4]
+
+    def test_unavailable_archive_leaves_frames_unchanged(self):
+        df = pd.DataFrame({'id': [1], 'ocr_text': [None]})
+
+        assert fill_archived(Mock(), df, {'ocr_text': 'ocr_text'}) is df
+
+
+class TestArchiveCLI:
+    """Test the storage archive command."""
+
+    def test_dry_run_then_archive(self, db, tmp_path):
+        from autotasktracker.cli.commands.storage import storage_group
+        args = ['archive', '--older-than', '30', '--batch-size', '10']
+
+        with patch('autotasktracker.core.database.DatabaseManager', lambda **kwargs: db), \
+                patch('autotasktracker.config.Config.get_archive_path', return_value=str(tmp_path / 'cli')):
+            dry = CliRunner().invoke(storage_group, args + ['--dry-run'])
+            result = CliRunner().invoke(storage_group, args)
+
+        assert dry.exit_code == 0, dry.output
+        assert result.exit_code == 0, result.output
+        # Relative to the real clock every fixture screenshot is older than 30 days
+        assert '8 rows' in dry.output
+        assert 'Archived 8 rows into 3 parts' in result.output
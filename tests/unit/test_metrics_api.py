@@ -0,0 +1,189 @@
+"""
+Tests for the headless metrics API service.
+
+Tests cover:
+- Range parameter resolution and validation
+- JSON payloads for each endpoint
+- Watermark-derived ETags and 304 Not Modified responses
+- gzip compression and Arrow IPC streaming
+- Repositories shared across requests
+"""
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from autotasktracker.dashboards.api import MetricsAPIService, resolve_range, ARROW_STREAM_MEDIA_TYPE
+from autotasktracker.dashboards.data.models import Task, TaskGroup
+
+
+BASE = datetime(2024, 1, 1, 9, 0)
+
+
+def _tasks(count):
+    return [
+        Task(id=i, title=f'Task {i}', category='Development', timestamp=BASE + timedelta(minutes=i),
+             duration_minutes=1.0, window_title=f'editor - file{i % 3}.py', metadata={'n': i})
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def service():
+    service = MetricsAPIService(db_manager=Mock(), watermark_ttl=0)
+    service.task_repo = Mock()
+    service.metrics_repo = Mock()
+    service.metrics_repo.get_data_watermark.return_value = (100, 250)
+    service.metrics_repo.get_metrics_summary.return_value = {'total_tasks': 3, 'active_days': 1}
+    service.metrics_repo.get_session_metrics.return_value = {'total_sessions': 2}
+    service.task_repo.get_tasks_for_period.return_value = _tasks(3)
+    tasks = _tasks(4)
+    service.task_repo.get_task_groups.return_value = [
+        TaskGroup(window_title='editor', category='Development', start_time=tasks[0].timestamp,
+                  end_time=tasks[-1].timestamp, duration_minutes=4.0, task_count=4, tasks=tasks)
+    ]
+    return service
+
+
+@pytest.fixture
+def client(service):
+    return TestClient(service.app)
+
+
+class TestResolveRange:
+    """Test range parameter resolution."""
+
+    def test_presets(self):
+        now = datetime(2024, 3, 10, 15, 30)
+
+        start, end = resolve_range('today', now=now)
+        assert start == datetime(2024, 3, 10) and end.date() == now.date()
+
+        start, end = resolve_range('yesterday', now=now)
+        assert start == datetime(2024, 3, 9) and end.date() == datetime(2024, 3, 9).date()
+
+        start, end = resolve_range('7d', now=now)
+        assert start == datetime(2024, 3, 4) and end.date() == now.date()
+
+    def test_explicit_dates_override_preset(self):
+        start, end = resolve_range('30d', start='2024-01-01', end='2024-01-02T12:00')
+        assert start == datetime(2024, 1, 1)
+        assert end == datetime(2024, 1, 2, 12, 0)
+
+    @pytest.mark.parametrize('kwargs', [
+        {'range_name': 'fortnight'},
+        {'start': 'not-a-date'},
+        {'start': '2024-01-02', 'end': '2024-01-01'},
+    ])
+    def test_invalid_ranges(self, kwargs):
+        with pytest.raises(ValueError):
+            resolve_range(**kwargs)
+
+
+class TestMetricsAPIService:
+    """Test the MetricsAPIService endpoints."""
+
+    def test_summary_payload(self, client, service):
+        response = client.get('/metrics/summary', params={'start': '2024-01-01', 'end': '2024-01-01T23:59'})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body['data'] == {'total_tasks': 3, 'active_days': 1}
+        assert body['watermark'] == {'max_entity_id': 100, 'data_version': 250}
+        service.metrics_repo.get_metrics_summary.assert_called_once_with(
+            datetime(2024, 1, 1), datetime(2024, 1, 1, 23, 59)
+        )
+
+    def test_tasks_and_groups_are_tabular(self, client, service):
+        tasks = client.get('/tasks', params={'categories': 'Development, Research', 'limit': 50}).json()
+        groups = client.get('/task-groups').json()
+
+        assert tasks['count'] == 3
+        assert tasks['data'][0]['title'] == 'Task 0'
+        assert service.task_repo.get_tasks_for_period.call_args[0][2:] == (['Development', 'Research'], 50)
+        assert groups['data'][0]['task_ids'] == [0, 1, 2, 3]
+        assert client.get('/sessions').json()['data'] == {'total_sessions': 2}
+
+    def test_matching_etag_returns_not_modified(self, client, service):
+        first = client.get('/tasks')
+        etag = first.headers['etag']
+
+        second = client.get('/tasks', headers={'If-None-Match': etag})
+
+        assert second.status_code == 304
+        assert second.headers['etag'] == etag
+        assert service.task_repo.get_tasks_for_period.call_count == 1
+        assert service.get_stats()['not_modified'] == 1
+
+    def test_new_data_changes_etag(self, client, service):
+        etag = client.get('/tasks').headers['etag']
+        service.metrics_repo.get_data_watermark.return_value = (101, 250)
+
+        response = client.get('/tasks', headers={'If-None-Match': etag})
+
+        assert response.status_code == 200
+        assert response.headers['etag'] != etag
+
+    def test_etag_depends_on_parameters(self, client):
+        assert client.get('/tasks', params={'limit': 10}).headers['etag'] != \
+            client.get('/tasks', params={'limit': 20}).headers['etag']
+
+    def test_repeat_requests_reuse_encoded_body(self, client, service):
+        client.get('/sessions')
+        client.get('/sessions')
+
+        assert service.metrics_repo.get_session_metrics.call_count == 1
+        assert service.get_stats()['cache_hits'] == 1
+
+    def test_large_responses_are_gzipped(self, client, service):
+        service.task_repo.get_tasks_for_period.return_value = _tasks(200)
+
+        response = client.get('/tasks', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['content-encoding'] == 'gzip'
+        assert response.json()['count'] == 200
+
+    def test_arrow_stream(self, client, service):
+        pa = pytest.importorskip('pyarrow')
+        service.arrow_batch_rows = 2
+        service.task_repo.get_tasks_for_period.return_value = _tasks(5)
+
+        response = client.get('/tasks', params={'format': 'arrow'})
+
+        assert response.headers['content-type'] == ARROW_STREAM_MEDIA_TYPE
+        reader = pa.ipc.open_stream(response.content)
+        batches = list(reader)
+        assert len(batches) == 3
+        table = pa.Table.from_batches(batches)
+        assert table.column('id').to_pylist() == [0, 1, 2, 3, 4]
+
+    def test_arrow_via_accept_header(self, client):
+        pa = pytest.importorskip('pyarrow')
+
+        response = client.get('/task-groups', headers={'Accept': ARROW_STREAM_MEDIA_TYPE})
+
+        table = pa.ipc.open_stream(response.content).read_all()
+        assert table.column('task_ids').to_pylist() == [[0, 1, 2, 3]]
+
+    def test_bad_range_is_rejected(self, client, service):
+        assert client.get('/tasks', params={'range': 'fortnight'}).status_code == 400
+        assert client.get('/tasks', params={'limit': 0}).status_code == 422
+        service.task_repo.get_tasks_for_period.assert_not_called()
+
+    def test_repository_errors_return_500(self, client, service):
+        service.metrics_repo.get_session_metrics.side_effect = Exception('db down')
+
+        assert client.get('/sessions').status_code == 500
+        assert service.get_stats()['errors'] == 1
+
+    def test_repositories_are_shared_across_requests(self, service):
+        client = TestClient(service.app)
+        task_repo = service.task_repo
+
+        client.get('/tasks')
+        client.get('/task-groups')
+
+        assert service.task_repo is task_repo
+        assert task_repo.get_tasks_for_period.call_count == 1
+        assert task_repo.get_task_groups.call_count == 1
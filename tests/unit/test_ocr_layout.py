@@ -0,0 +1,159 @@
+"""
+Tests for the compiled OCR layout engine.
+
+Covers:
+- Parsing RapidOCR and dict payloads, confidence filtering and bbox formats
+- Vectorized polygon reduction and its per-box fallback
+- Combined code/UI patterns and special-character density
+- Title band detection and region classification
+- OCREnhancer delegating to the engine
+"""
+import json
+from unittest.mock import patch
+
+import pytest
+
+from autotasktracker.ai import ocr_layout
+from autotasktracker.ai.ocr_enhancement import OCREnhancer, OCRLayout, OCRResult
+from autotasktracker.ai.ocr_layout import OCRLayoutEngine
+
+
+def _quad(x, y, width, height):
+    return [[x, y], [x + width, y], [x + width, y + height], [x, y + height]]
+
+
+@pytest.fixture
+def engine():
+    return OCRLayoutEngine()
+
+
+class TestParsing:
+    """Test payload parsing."""
+
+    def test_rapidocr_payload(self, engine):
+        payload = json.dumps([
+            [_quad(10, 20, 100, 15), '  main.py  ', 0.98765],
+            [_quad(0, 0, 5, 5), 'faint', 0.4],
+            [_quad(0, 0, 5, 5), '', 0.9],
+            [_quad(0, 0, 5, 5), 'no confidence'],
+            'not a fragment',
+        ])
+
+        results = engine.parse(payload)
+
+        assert results == [OCRResult('main.py', 0.9877, (10, 20, 100, 15))]
+
+    def test_dict_payload_and_decoded_input(self, engine):
+        payload = {'results': [{'text': 'Save', 'confidence': 0.9, 'bbox': [5, 6, 7, 8]},
+                               {'text': 'dim', 'confidence': 0.2}]}
+
+        assert engine.parse(payload) == [OCRResult('Save', 0.9, (5, 6, 7, 8))]
+        assert engine.parse(json.dumps(payload)) == engine.parse(payload)
+
+    def test_mixed_bbox_formats_fall_back_per_box(self, engine):
+        payload = [
+            [_quad(1, 2, 3, 4), 'polygon', 0.9],
+            [[10, 20, 30, 40, 50], 'rect', 0.9],
+            [None, 'missing', 0.9],
+            [[[0, 0], [2, 0], [2, 2], [0, 2], [1, 5]], 'pentagon', 0.9],
+        ]
+
+        boxes = [r.bbox for r in engine.parse(payload)]
+
+        assert boxes == [(1, 2, 3, 4), (10, 20, 30, 40), None, (0, 0, 2, 5)]
+
+    def test_polygons_are_reduced_together(self, engine):
+        boxes = [_quad(1, 2, 3, 4), [[5.5, 1], [2, 7], [9, 3], [4, 4]]]
+
+        assert engine.parse_bboxes(boxes) == [(1, 2, 3, 4), (2, 1, 7, 6)]
+        assert engine.parse_bboxes([[['a', 'b']] * 4]) == [None]
+
+    def test_malformed_json_returns_no_results(self, engine):
+        assert engine.parse('{not json') == []
+        assert engine.parse('') == []
+
+    def test_decoder_falls_back_to_json(self, engine):
+        with patch.object(ocr_layout, '_loads', json.loads):
+            assert engine.parse('[[[0, 0, 1, 1], "ok", 0.9]]')[0].text == 'ok'
+
+
+class TestClassification:
+    """Test the compiled text classifiers."""
+
+    @pytest.mark.parametrize('text, expected', [
+        ('def handler(event):', True),
+        ('IMPORT os', True),
+        ('# a comment', True),
+        ('x => y', True),
+        ('a+b*c/d-e', True),
+        ('import', False),
+        ('Quarterly report draft', False),
+        ('', False),
+    ])
+    def test_is_code(self, engine, text, expected):
+        assert engine.is_code(text) is expected
+
+    @pytest.mark.parametrize('text, expected', [
+        ('File', True),
+        ('cancel ', True),
+        ('[ Submit ]', True),
+        ('OPEN PR', True),
+        ('⚙ Settings', True),
+        ('Opened the settings page today', False),
+    ])
+    def test_is_ui_element(self, engine, text, expected):
+        assert engine.is_ui_element(text) is expected
+
+    def test_custom_patterns_are_compiled(self):
+        engine = OCRLayoutEngine(code_patterns=[r'^SELECT\s'], ui_patterns=[r'^Run$'])
+
+        assert engine.is_code('select * from t')
+        assert not engine.is_code('def f')
+        assert engine.is_ui_element('run')
+
+
+class TestLayout:
+    """Test layout analysis."""
+
+    def test_regions_and_flags(self, engine):
+        results = engine.parse([
+            [_quad(0, 0, 200, 20), 'Project Plan', 0.95],
+            [_quad(0, 10, 200, 20), 'for x in y:', 0.95],
+            [_quad(0, 300, 100, 20), 'Cancel', 0.9],
+            [_quad(0, 500, 300, 20), 'Notes about the launch', 0.6],
+        ])
+
+        layout = engine.analyze(results)
+
+        assert [r.text for r in layout.title_regions] == ['Project Plan']
+        assert [r.text for r in layout.code_regions] == ['for x in y:']
+        assert [r.text for r in layout.ui_elements] == ['Cancel']
+        assert [r.text for r in layout.body_text] == ['Notes about the launch']
+        assert [r.line_number for r in results] == [0, 1, 2, 3]
+        assert results[0].is_title and results[1].is_code and results[2].is_ui_element
+        assert layout.average_confidence == pytest.approx(0.85)
+        assert layout.high_confidence_ratio == 0.75
+
+    def test_title_band_ignores_fragments_without_boxes(self, engine):
+        results = [OCRResult('Heading', 0.9), OCRResult('Second', 0.9, (0, 0, 10, 10))]
+
+        layout = engine.analyze(results)
+
+        assert [r.text for r in layout.title_regions] == ['Second']
+        assert engine.analyze([]) == OCRLayout([], [], [], [], 0.0, 0.0)
+
+
+class TestEnhancerIntegration:
+    """Test that OCREnhancer uses the engine."""
+
+    def test_enhancer_delegates_to_engine(self):
+        enhancer = OCREnhancer(confidence_threshold=0.8)
+        payload = json.dumps([[_quad(0, 0, 200, 20), 'Budget Review', 0.95],
+                              [_quad(0, 400, 200, 20), 'x = total(rows)', 0.9]])
+
+        assert enhancer.layout_engine.confidence_threshold == 0.8
+        assert enhancer._is_code('x = 1') and enhancer._is_ui_element('Help')
+        result = enhancer.enhance_task_with_ocr(payload, 'Spreadsheet')
+
+        assert result["tasks"] == 'Working on: Budget Review'
+        assert result['text_regions'] == {'titles': 1, 'code': 1, 'ui': 0, 'body': 0}
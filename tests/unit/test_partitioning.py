@@ -0,0 +1,393 @@
+"""
+Tests for monthly partitioning of entities and metadata_entries.
+
+PostgreSQL DDL is checked against a scripted cursor that records every
+statement; planning, pruning bounds and the repository wiring are tested
+directly.
+"""
+from contextlib import contextmanager
+from datetime import date, datetime
+from unittest.mock import Mock, patch
+
+import pytest
+from click.testing import CliRunner
+
+from autotasktracker.core.partitioning import (
+    ENTITY_SIDE_TABLES, FULL_RANGE, MAX_ENTITY_ID, PartitionManager, PartitionMigration, PartitionSpec,
+    entity_id_bounds, plan_partitions, replicate_index,
+)
+from autotasktracker.core.query_registry import get_query_registry
+from tests.unit.test_processing_ledger import SQLiteTestDatabase
+
+
+class ScriptedCursor:
+    """Cursor that records statements and answers from (sql fragment, result) rules."""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.statements = []
+        self._result = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.statements.append((sql, params))
+        self._result = []
+        for fragment, result in self.rules:
+            if fragment in sql:
+                self._result = result(params) if callable(result) else result
+                break
+        self.rowcount = len(self._result)
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def fetchall(self):
+        return list(self._result)
+
+    def close(self):
+        pass
+
+
+class ScriptedDatabase:
+    """PostgreSQL stand-in whose connections share one scripted cursor."""
+
+    def __init__(self, rules=()):
+        self.cursor = ScriptedCursor(list(rules))
+        self.commits = 0
+
+    def get_database_type(self):
+        return 'postgresql'
+
+    @contextmanager
+    def get_connection(self, readonly=True):
+        conn = Mock()
+        conn.cursor.return_value = self.cursor
+        conn.commit.side_effect = lambda: setattr(self, 'commits', self.commits + 1)
+        yield conn
+
+    def sql(self, fragment=''):
+        return [sql for sql, _ in self.cursor.statements if fragment in sql]
+
+
+def _catalog(*rows):
+    """Catalog rows from (month, first id, end id) without capture spans."""
+    return [(date(*month), first, end, None, None) for month, first, end in rows]
+
+
+MAY = datetime(2024, 5, 1)
+JUNE = datetime(2024, 6, 1)
+
+
+@pytest.fixture
+def catalog():
+    """April and May sealed, June open."""
+    return [
+        PartitionSpec(date(2024, 4, 1), 1, 100, datetime(2024, 3, 30), datetime(2024, 4, 30, 23), is_first=True),
+        PartitionSpec(date(2024, 5, 1), 100, 250, datetime(2024, 5, 1, 8), datetime(2024, 5, 31, 18)),
+        PartitionSpec(date(2024, 6, 1), 250, None, datetime(2024, 6, 1, 9), datetime(2024, 6, 3)),
+    ]
+
+
+@pytest.fixture
+def manager(catalog):
+    manager = PartitionManager(ScriptedDatabase(), retention_months=0)
+    manager._read_catalog = Mock(return_value=catalog)
+    return manager
+
+
+class TestPlanning:
+    """Test partition planning and DDL helpers."""
+
+    def test_months_become_id_ranges_with_current_month_open(self):
+        specs = plan_partitions([(date(2024, 4, 1), 1), (date(2024, 5, 1), 100)], next_id=250, now=JUNE)
+
+        assert [(s.month, s.first_entity_id, s.end_entity_id) for s in specs] == [
+            (date(2024, 4, 1), 1, 100), (date(2024, 5, 1), 100, 250), (date(2024, 6, 1), 250, None)]
+        assert specs[0].bounds_sql() == 'FROM (MINVALUE) TO (100)'
+        assert specs[-1].bounds_sql() == 'FROM (250) TO (MAXVALUE)'
+
+    def test_out_of_order_months_are_folded_into_the_previous_one(self):
+        # A clock change put some May captures at ids below April's first
+        specs = plan_partitions([(date(2024, 4, 1), 50), (date(2024, 5, 1), 40), (date(2024, 6, 1), 90)],
+                                next_id=120, now=datetime(2024, 7, 2))
+
+        assert [(s.month, s.first_entity_id, s.end_entity_id) for s in specs] == [
+            (date(2024, 4, 1), 50, 90), (date(2024, 6, 1), 90, 120), (date(2024, 7, 1), 120, None)]
+
+    def test_current_month_data_stays_in_the_open_partition(self):
+        specs = plan_partitions([(date(2024, 5, 1), 1), (date(2024, 6, 1), 80)], next_id=90, now=JUNE)
+
+        assert [(s.month, s.end_entity_id) for s in specs] == [(date(2024, 5, 1), 80), (date(2024, 6, 1), None)]
+
+    def test_empty_database_gets_one_open_partition(self):
+        specs = plan_partitions([], next_id=1, now=JUNE)
+
+        assert len(specs) == 1 and specs[0].is_first and specs[0].is_open
+        assert specs[0].bounds_sql() == 'FROM (MINVALUE) TO (MAXVALUE)'
+
+    def test_indexes_are_replicated_onto_the_partitioned_table(self):
+        plain = replicate_index('CREATE INDEX idx_metadata_key ON public.metadata_entries USING btree (key)',
+                                'metadata_entries', 'metadata_entries_partitioned', 'entity_id')
+        keyed = replicate_index('CREATE UNIQUE INDEX uq_meta ON public.metadata_entries USING btree (entity_id, key)',
+                                'metadata_entries', 'metadata_entries_partitioned', 'entity_id')
+        unkeyed = replicate_index('CREATE UNIQUE INDEX uq_path ON public.entities USING btree (filepath)',
+                                  'entities', 'entities_partitioned', 'id')
+
+        assert plain == ('CREATE INDEX IF NOT EXISTS idx_metadata_key_part '
+                         'ON metadata_entries_partitioned USING btree (key)')
+        assert keyed.startswith('CREATE UNIQUE INDEX IF NOT EXISTS uq_meta_part')
+        # Unique indexes must contain the partition key
+        assert unkeyed.startswith('CREATE INDEX IF NOT EXISTS uq_path_part')
+        assert replicate_index('CREATE INDEX x ON public.other USING btree (a)', 'entities', 'e2', 'id') is None
+
+
+class TestPruningBounds:
+    """Test entity id bounds for time-range queries."""
+
+    def test_range_inside_one_sealed_month(self, manager):
+        assert manager.entity_id_bounds(datetime(2024, 5, 10), datetime(2024, 5, 11)) == (100, 249)
+
+    def test_range_reaching_the_open_month_is_unbounded_above(self, manager):
+        assert manager.entity_id_bounds(datetime(2024, 4, 20), datetime(2024, 6, 2)) == (0, MAX_ENTITY_ID)
+        assert manager.entity_id_bounds(datetime(2024, 5, 20), None) == (100, MAX_ENTITY_ID)
+
+    def test_recent_range_reads_only_the_open_month(self, manager):
+        # The open month's span is still growing, so it has no upper time bound
+        assert manager.entity_id_bounds(datetime(2024, 6, 2), datetime(2030, 1, 1)) == (250, MAX_ENTITY_ID)
+
+    def test_range_before_all_data_matches_nothing(self, manager):
+        assert manager.entity_id_bounds(datetime(2023, 1, 1), datetime(2023, 2, 1)) == (0, 0)
+
+    def test_catalog_is_cached(self, manager):
+        manager.entity_id_bounds(MAY, JUNE)
+        manager.entity_id_bounds(MAY, JUNE)
+
+        assert manager._read_catalog.call_count == 1
+
+    def test_unpartitioned_and_sqlite_databases_are_not_filtered(self, tmp_path):
+        unpartitioned = PartitionManager(ScriptedDatabase([('to_regclass', [(False,)])]), retention_months=0)
+        sqlite = PartitionManager(SQLiteTestDatabase(tmp_path / 'p.db'), retention_months=0)
+
+        assert unpartitioned.entity_id_bounds(MAY, JUNE) == FULL_RANGE
+        assert sqlite.entity_id_bounds(MAY, JUNE) == FULL_RANGE
+        assert not sqlite.is_partitioned()
+
+    def test_errors_fall_back_to_the_full_range(self):
+        assert entity_id_bounds(Mock(), MAY, JUNE) == FULL_RANGE
+
+
+class TestMaintenance:
+    """Test sealing months and retention."""
+
+    def _db(self, catalog_rows, boundary=(260,)):
+        return ScriptedDatabase([
+            ('FROM storage_partitions ORDER BY month', catalog_rows),
+            ('SELECT MIN(id) FROM entities WHERE id >= %s AND created_at', [boundary]),
+            # One staged batch per table: rows 260..300
+            ('ORDER BY id LIMIT', lambda params: [(300,)] if params[1] < 300 else [(None,)]),
+            ('pg_constraint', [(False, False)]),
+            ('information_schema.columns', [(1,)]),
+            ('SELECT MIN(COALESCE', [(datetime(2024, 6, 1), datetime(2024, 6, 30))]),
+            ('to_regclass', [(True,)]),
+        ])
+
+    def test_finished_month_is_sealed_at_the_first_id_of_the_new_month(self):
+        db = self._db(_catalog(((2024, 4, 1), 1, 100), ((2024, 5, 1), 100, None)))
+        manager = PartitionManager(db, retention_months=0)
+
+        assert manager.ensure_partitions(datetime(2024, 7, 2)) == [date(2024, 5, 1)]
+
+        ddl = db.sql('PARTITION')
+        assert ddl[:3] == [
+            'ALTER TABLE entities DETACH PARTITION entities_p2024_05',
+            'ALTER TABLE entities ATTACH PARTITION entities_p2024_07 FOR VALUES FROM (260) TO (MAXVALUE)',
+            'ALTER TABLE entities ATTACH PARTITION entities_p2024_05 FOR VALUES FROM (100) TO (260)',
+        ]
+        assert ('ALTER TABLE metadata_entries ATTACH PARTITION metadata_entries_p2024_05 '
+                'FOR VALUES FROM (100) TO (260)') in ddl
+        assert db.sql('DELETE FROM metadata_entries_p2024_05 WHERE entity_id >= %s')
+        spans = [params for sql, params in db.cursor.statements if 'INSERT INTO storage_partitions' in sql]
+        assert [(p[0], p[1], p[2]) for p in spans] == [(date(2024, 5, 1), 100, 260), (date(2024, 7, 1), 260, None)]
+
+    def test_rows_are_staged_in_batches_before_the_lock(self):
+        db = self._db(_catalog(((2024, 4, 1), 1, 100), ((2024, 5, 1), 100, None)))
+
+        PartitionManager(db, retention_months=0).ensure_partitions(datetime(2024, 7, 2))
+
+        statements = [sql for sql, _ in db.cursor.statements]
+        lock = statements.index('LOCK TABLE entities, metadata_entries IN ACCESS EXCLUSIVE MODE')
+        staged = [i for i, sql in enumerate(statements) if sql.startswith('INSERT INTO metadata_entries_p2024_07')]
+        assert staged and max(staged) < lock
+        assert db.sql('CREATE TRIGGER trg_seal_metadata_entries AFTER INSERT OR UPDATE OR DELETE '
+                      'ON metadata_entries_p2024_05')
+        # The mirror goes before the finished month is emptied, and nothing is copied under the lock
+        after_lock = statements[lock:]
+        assert after_lock.index('DROP TRIGGER IF EXISTS trg_seal_entities ON entities_p2024_05') < \
+            after_lock.index('DELETE FROM entities_p2024_05 WHERE id >= %s')
+        assert not [sql for sql in after_lock if sql.startswith('INSERT INTO entities')]
+        assert db.commits > 3
+
+    def test_moved_boundary_drops_the_staged_tables(self):
+        boundaries = iter([(260,), (250,)])
+        db = self._db(_catalog(((2024, 5, 1), 100, None)))
+        db.cursor.rules.insert(0, ('SELECT MIN(id) FROM entities WHERE id >= %s AND created_at',
+                                   lambda params: [next(boundaries)]))
+
+        assert PartitionManager(db, retention_months=0).ensure_partitions(datetime(2024, 7, 2)) == []
+        assert not db.sql('ATTACH')
+        assert db.sql('DROP TABLE IF EXISTS') == ['DROP TABLE IF EXISTS entities_p2024_07',
+                                                  'DROP TABLE IF EXISTS metadata_entries_p2024_07']
+
+    def test_current_month_needs_no_sealing(self):
+        db = self._db(_catalog(((2024, 7, 1), 100, None)))
+
+        assert PartitionManager(db, retention_months=0).ensure_partitions(datetime(2024, 7, 2)) == []
+        assert not db.sql('PARTITION')
+
+    def test_empty_finished_month_is_relabelled(self):
+        db = self._db(_catalog(((2024, 5, 1), 1, 100), ((2024, 6, 1), 100, None)), boundary=(None,))
+        db.cursor.rules.insert(0, ('COALESCE(MAX(id) + 1', [(100,)]))
+
+        assert PartitionManager(db, retention_months=0).ensure_partitions(datetime(2024, 7, 2)) == []
+        assert db.sql('RENAME TO') == ['ALTER TABLE entities_p2024_06 RENAME TO entities_p2024_07',
+                                       'ALTER TABLE metadata_entries_p2024_06 RENAME TO metadata_entries_p2024_07']
+        assert not db.sql('DETACH')
+
+    def test_retention_drops_whole_expired_months(self, catalog):
+        db = ScriptedDatabase([('to_regclass', [(True,)])])
+        manager = PartitionManager(db, retention_months=2)
+        manager._read_catalog = Mock(return_value=catalog)
+
+        assert manager.apply_retention(2, now=datetime(2024, 7, 15)) == [date(2024, 4, 1)]
+        assert db.sql('DROP TABLE') == ['DROP TABLE IF EXISTS metadata_entries_p2024_04',
+                                        'DROP TABLE IF EXISTS entities_p2024_04']
+        cleaned = [params for sql, params in db.cursor.statements if 'entity_text_index' in sql and params]
+        assert cleaned == [(0, 100)]
+
+    def test_retention_clears_side_tables_of_dropped_months(self, catalog):
+        db = ScriptedDatabase([('to_regclass', [(True,)])])
+        manager = PartitionManager(db, retention_months=2)
+        manager._read_catalog = Mock(return_value=catalog)
+
+        manager.apply_retention(2, now=datetime(2024, 7, 15))
+
+        cleared = {sql.split()[2]: params for sql, params in db.cursor.statements
+                   if sql.startswith('DELETE FROM') and 'entity_id >= %s' in sql}
+        assert cleared == {table: (0, 100) for table in ENTITY_SIDE_TABLES}
+        assert {'derived_metadata_stamps', 'screenshot_files', 'processing_claims',
+                'processing_failures'} <= set(cleared)
+
+    def test_open_month_is_never_dropped(self, catalog):
+        manager = PartitionManager(ScriptedDatabase([('to_regclass', [(False,)])]), retention_months=1)
+        manager._read_catalog = Mock(return_value=catalog)
+
+        assert date(2024, 6, 1) not in manager.apply_retention(1, now=datetime(2030, 1, 1))
+
+    def test_maintenance_is_rate_limited(self, manager):
+        with patch.object(manager, 'maintain', return_value={'sealed': [], 'dropped': []}) as maintain:
+            manager.maintain_if_due()
+            manager.maintain_if_due()
+
+        assert maintain.call_count == 1
+
+
+class TestMigration:
+    """Test the online migration steps."""
+
+    def test_prepare_creates_partitioned_twins_and_mirrors_writes(self):
+        db = ScriptedDatabase([
+            ("c.oid = to_regclass('entities')", [('r',)]),
+            ('GROUP BY 1', [(date(2024, 4, 1), 1), (date(2024, 5, 1), 100)]),
+            ('COALESCE(MAX(id), 0) + 1', [(250,)]),
+            ('pg_get_indexdef', lambda params: [
+                ('CREATE INDEX idx_entities_created_at ON public.entities USING btree (created_at DESC)',)
+            ] if params == ('entities',) else []),
+            ('information_schema.columns', [('id',), ('entity_id',), ('key',), ('value',)]),
+        ])
+
+        specs = PartitionMigration(db).prepare(now=JUNE)
+
+        assert len(specs) == 3
+        assert ('CREATE TABLE IF NOT EXISTS entities_partitioned (LIKE entities INCLUDING DEFAULTS '
+                'INCLUDING STORAGE) PARTITION BY RANGE (id)') in db.sql()
+        assert ('CREATE TABLE IF NOT EXISTS metadata_entries_p2024_05 PARTITION OF '
+                'metadata_entries_partitioned FOR VALUES FROM (100) TO (250)') in db.sql()
+        assert 'ALTER TABLE metadata_entries_partitioned ADD PRIMARY KEY (id, entity_id)' in db.sql()
+        assert db.sql('idx_entities_created_at_part ON entities_partitioned')
+        mirror = db.sql('CREATE OR REPLACE FUNCTION autotask_mirror_metadata_entries')[0]
+        assert 'ON CONFLICT (id, entity_id) DO UPDATE SET key = EXCLUDED.key, value = EXCLUDED.value' in mirror
+        assert db.sql('AFTER INSERT OR UPDATE OR DELETE ON entities')
+
+    def test_prepare_refuses_a_partitioned_database(self):
+        db = ScriptedDatabase([("c.oid = to_regclass('entities')", [('p',)])])
+
+        with pytest.raises(Exception, match='already partitioned'):
+            PartitionMigration(db).prepare()
+
+    def test_copy_advances_the_checkpoint_in_keyset_batches(self):
+        db = ScriptedDatabase([
+            ('FROM storage_partition_migration WHERE table_name', [(0,)]),
+            ('ORDER BY id LIMIT', [(500,)]),
+        ])
+
+        assert PartitionMigration(db, batch_size=500).copy_batch('entities') == 0
+        copy_sql, params = [s for s in db.cursor.statements if s[0].startswith('INSERT INTO entities_partitioned')][0]
+        assert 'WHERE id > %s AND id <= %s AND id IS NOT NULL FOR SHARE' in copy_sql
+        assert params == (0, 500)
+        assert [p for sql, p in db.cursor.statements if sql.startswith('UPDATE storage_partition_migration')] \
+            == [(500, 0, 'entities')]
+
+    def test_copy_reports_completion(self):
+        db = ScriptedDatabase([
+            ('FROM storage_partition_migration WHERE table_name', [(900,)]),
+            ('ORDER BY id LIMIT', [(None,)]),
+        ])
+
+        assert PartitionMigration(db).copy_batch('entities') is None
+
+
+class TestPartitionAwareQueries:
+    """Test that time-range queries carry partition bounds."""
+
+    @pytest.mark.parametrize('name, bounds_at', [
+        ('fetch_tasks', 4), ('fetch_tasks_unbounded', 2), ('tasks_for_period', 3),
+        ('tasks_for_period_in_categories', 4), ('tasks_after_id', 4),
+        ('session_metrics', 2), ('count_tasks_today', 2),
+    ])
+    def test_queries_bound_entity_ids(self, name, bounds_at):
+        query = get_query_registry().get(name)
+        first, second = bounds_at + 1, bounds_at + 2
+
+        assert query.param_types[bounds_at:] == ('bigint', 'bigint')
+        assert f'e.id BETWEEN ${first} AND ${second}' in query.sql
+        # Every metadata join is bounded too, so each prunes to the same months
+        assert query.sql.count('JOIN metadata_entries') == query.sql.count(f'entity_id BETWEEN ${first}')
+
+    def test_repository_passes_bounds_for_the_adjusted_period(self):
+        from autotasktracker.dashboards.data.repositories import TaskRepository
+        repo = TaskRepository(db_manager=Mock(), use_pensieve=False)
+
+        with patch('autotasktracker.dashboards.data.repositories.entity_id_bounds',
+                   return_value=(100, 249)) as bounds, \
+                patch.object(repo, '_execute_prepared', return_value=__import__('pandas').DataFrame()) as execute:
+            repo.get_tasks_for_period(MAY, JUNE)
+            repo.get_tasks_after(120, MAY, JUNE)
+
+        assert bounds.call_args_list[0].args[1:] == (datetime(2024, 5, 1, 7), datetime(2024, 6, 1, 7))
+        assert execute.call_args_list[0].args[1][-2:] == (100, 249)
+        assert execute.call_args_list[1].args[1][2:] == (120, 1000, 100, 249)
+
+
+class TestStorageCLI:
+    """Test the storage command group."""
+
+    def test_partitions_on_an_unpartitioned_database(self, tmp_path):
+        from autotasktracker.cli.commands.storage import storage_group
+        db = SQLiteTestDatabase(tmp_path / 'cli.db')
+
+        with patch('autotasktracker.core.database.get_default_db_manager', return_value=db):
+            result = CliRunner().invoke(storage_group, ['partitions'])
+
+        assert result.exit_code == 0, result.output
+        assert 'not partitioned' in result.output
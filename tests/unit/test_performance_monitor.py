@@ -0,0 +1,174 @@
+"""
+Tests for the sharded PerformanceMonitor metrics core.
+
+Tests cover:
+- Exact counters and histograms under concurrent writers
+- Folding shards of finished threads into the retired aggregate
+- Histogram percentiles within bucket precision
+- Ring buffer growth, wrap-around and time-ordered history
+- Per-thread timers and resets seen by every thread
+- The unchanged public API (cache metrics, comprehensive metrics, export)
+"""
+import json
+import threading
+import time
+
+import pytest
+
+from autotasktracker.pensieve.performance_monitor import PerformanceMetrics, PerformanceMonitor
+
+
+@pytest.fixture
+def monitor():
+    return PerformanceMonitor(max_samples=1000)
+
+
+def _run_threads(count, target):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class TestRecording:
+    """Test lock-free recording from many threads."""
+
+    def test_concurrent_counters_and_metrics_are_exact(self, monitor):
+        def work(index):
+            for value in range(2000):
+                monitor.increment_counter('requests')
+                monitor.record_metric('database_query_ms', float(value % 100 + 1))
+
+        _run_threads(8, work)
+
+        assert monitor.counters['requests'] == 16000
+        stats = monitor.get_response_time_metrics('database_query_ms')
+        assert stats['min'] == 1 and stats['max'] == 100
+        assert stats['avg'] == pytest.approx(50.5)
+
+    def test_finished_threads_are_folded_into_retired_shard(self, monitor):
+        _run_threads(3, lambda i: monitor.record_metric('search_duration_ms', 10.0 * (i + 1)))
+
+        monitor.counters  # Reading merges the dead shards
+        assert monitor._shards == []
+        assert monitor._retired.series['search_duration_ms'].total == 3
+
+        monitor.record_metric('search_duration_ms', 40.0)
+        stats = monitor.get_response_time_metrics('search_duration_ms')
+        assert stats['avg'] == pytest.approx(25.0)
+        history = [v for _, v in monitor.get_metric_history('search_duration_ms')]
+        assert sorted(history) == [10.0, 20.0, 30.0, 40.0]
+        assert history[-1] == 40.0
+
+    def test_timers_are_per_thread(self, monitor):
+        durations = {}
+
+        def work(index):
+            monitor.start_timer('fetch')
+            time.sleep(0.01 * (index + 1))
+            durations[index] = monitor.end_timer('fetch')
+
+        _run_threads(3, work)
+
+        assert all(durations[i] >= 10 * (i + 1) for i in range(3))
+        assert monitor.get_response_time_metrics('fetch_duration_ms')['max'] >= 30
+
+    def test_timer_started_on_another_thread(self, monitor):
+        starter = threading.Thread(target=monitor.start_timer, args=('handoff',))
+        starter.start()
+        starter.join()
+
+        assert monitor.end_timer('handoff') >= 0
+        assert monitor.end_timer('handoff') == 0.0
+
+
+class TestReading:
+    """Test percentile, history and reset behaviour."""
+
+    def test_percentiles_within_bucket_precision(self, monitor):
+        for value in range(1, 1001):
+            monitor.record_metric('response_time_ms', float(value))
+
+        stats = monitor.get_response_time_metrics('response_time_ms')
+        assert stats['p50'] == pytest.approx(500, rel=0.07)
+        assert stats['p95'] == pytest.approx(950, rel=0.07)
+        assert stats['p99'] == pytest.approx(990, rel=0.07)
+        assert stats['min'] == 1 and stats['max'] == 1000
+
+    def test_binary_metrics_report_observed_values(self, monitor):
+        for _ in range(3):
+            monitor.record_cache_miss()
+        monitor.record_cache_hit()
+
+        stats = monitor.get_response_time_metrics('cache_operation')
+        assert stats['p50'] == 0.0
+        assert stats['p99'] == 1.0
+
+    def test_ring_buffer_wraps_and_history_stays_ordered(self):
+        monitor = PerformanceMonitor(max_samples=300)
+        for value in range(700):
+            monitor.record_metric('queue_depth', float(value))
+
+        history = monitor.get_metric_history('queue_depth')
+        assert [v for _, v in history] == [float(v) for v in range(400, 700)]
+        assert all(a[0] <= b[0] for a, b in zip(history, history[1:]))
+        # Histogram still counts every sample
+        assert monitor.get_response_time_metrics('queue_depth')['min'] == 0
+
+    def test_history_respects_time_window(self, monitor):
+        monitor.record_metric('response_time_ms', 5.0)
+        series = monitor._shard().series['response_time_ms']
+        series.times[0] -= 2 * 3600
+
+        monitor.record_metric('response_time_ms', 6.0)
+
+        assert [v for _, v in monitor.get_metric_history('response_time_ms', hours=1)] == [6.0]
+
+    def test_reset_clears_all_threads(self, monitor):
+        ready, resume = threading.Event(), threading.Event()
+
+        def work(index):
+            monitor.increment_counter('events')
+            ready.set()
+            resume.wait()
+            monitor.increment_counter('events')
+
+        thread = threading.Thread(target=work, args=(0,))
+        thread.start()
+        ready.wait()
+        monitor.reset_metrics()
+        resume.set()
+        thread.join()
+
+        assert monitor.counters == {'events': 1}
+
+    def test_unknown_metric_is_zeroed(self, monitor):
+        assert monitor.get_response_time_metrics('missing') == {
+            "avg": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "min": 0.0, "max": 0.0
+        }
+        assert monitor.get_metric_history('missing') == []
+
+
+class TestPublicAPI:
+    """Test the aggregate views built on the metrics core."""
+
+    def test_comprehensive_metrics_and_export(self, monitor, tmp_path):
+        monitor.record_cache_hit()
+        monitor.record_cache_hit()
+        monitor.record_cache_miss()
+        monitor.record_database_query(12.0, 'select')
+        monitor.record_websocket_connection(True)
+        monitor.record_error('timeout', 'fetch')
+
+        metrics = monitor.get_comprehensive_metrics()
+        assert isinstance(metrics, PerformanceMetrics)
+        assert metrics.cache_hit_rate == pytest.approx(200 / 3)
+        assert metrics.database_query_time_ms == 12.0
+        assert metrics.websocket_connections == 1
+        assert metrics.errors_per_minute == 1.0
+
+        path = tmp_path / 'metrics.json'
+        exported = monitor.export_metrics(path)
+        assert exported['counters']['database_queries_total'] == 1
+        assert json.loads(path.read_text())['cache_metrics']['hits'] == 2
@@ -0,0 +1,239 @@
+"""
+Tests for the shared processing ledger.
+
+Runs the ledger against a SQLite stand-in for the Pensieve schema to cover:
+- Claiming new work above the watermark in id order
+- Watermark advancement only over contiguously finished ids
+- Disjoint claims across concurrent workers
+- Retry backoff, parking after max attempts and expired claim takeover
+"""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+import pytest
+
+from autotasktracker.core.processing_ledger import ProcessingLedger, utc_now
+
+
+class SQLiteTestDatabase:
+    """Minimal DatabaseManager stand-in backed by a SQLite file."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with self.get_connection(readonly=False) as conn:
+            conn.execute("""
+                CREATE TABLE entities (
+                    id INTEGER PRIMARY KEY,
+                    filepath TEXT,
+                    created_at TIMESTAMP
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE metadata_entries (
+                    id INTEGER PRIMARY KEY,
+                    entity_id INTEGER,
+                    key TEXT,
+                    value TEXT
+                )
+            """)
+
+    @contextmanager
+    def get_connection(self, readonly: bool = True):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def get_database_type(self) -> str:
+        return 'sqlite'
+
+    def add_entities(self, count: int, age_seconds: int = 60):
+        created_at = (utc_now() - timedelta(seconds=age_seconds)).isoformat(sep=' ')
+        with self.get_connection(readonly=False) as conn:
+            start = conn.execute("SELECT COALESCE(MAX(id), 0) FROM entities").fetchone()[0]
+            conn.executemany(
+                "INSERT INTO entities (id, filepath, created_at) VALUES (?, ?, ?)",
+                [(start + i, f"/shots/{start + i}.png", created_at) for i in range(1, count + 1)]
+            )
+
+    def add_metadata(self, entity_id: int, key: str, value: str):
+        with self.get_connection(readonly=False) as conn:
+            conn.execute(
+                "INSERT INTO metadata_entries (entity_id, key, value) VALUES (?, ?, ?)",
+                (entity_id, key, value)
+            )
+
+
+@pytest.fixture
+def db(tmp_path):
+    return SQLiteTestDatabase(tmp_path / 'ledger.db')
+
+
+@pytest.fixture
+def ledger(db):
+    return ProcessingLedger(db, claim_timeout=600, max_attempts=3, retry_backoff=60)
+
+
+class TestProcessingLedger:
+    """Test the ProcessingLedger class."""
+
+    def test_claims_new_entities_in_id_order(self, db, ledger):
+        db.add_entities(10)
+
+        assert ledger.claim_batch('tasks', 4) == [1, 2, 3, 4]
+        assert ledger.claim_batch('tasks', 4) == [5, 6, 7, 8]
+
+    def test_stages_are_independent(self, db, ledger):
+        db.add_entities(3)
+
+        assert ledger.claim_batch('tasks', 5) == [1, 2, 3]
+        assert ledger.claim_batch('ocr', 5) == [1, 2, 3]
+
+    def test_unsettled_entities_are_not_claimed(self, db, ledger):
+        db.add_entities(2, age_seconds=0)
+
+        assert ledger.claim_batch('tasks', 5) == []
+
+    def test_settle_window_uses_the_utc_capture_clock(self, db, ledger, monkeypatch):
+        # A local clock behind UTC would see these captures as in the future
+        monkeypatch.setenv('TZ', 'America/Los_Angeles')
+        time.tzset()
+        try:
+            db.add_entities(2, age_seconds=60)
+            assert ledger.claim_batch('tasks', 5) == [1, 2]
+        finally:
+            monkeypatch.delenv('TZ')
+            time.tzset()
+
+    def test_watermark_advances_over_contiguous_completions(self, db, ledger):
+        db.add_entities(5)
+        ledger.claim_batch('tasks', 5)
+
+        ledger.complete('tasks', [1, 2, 4])
+        assert ledger.get_watermark('tasks') == 2
+
+        ledger.complete('tasks', [3])
+        assert ledger.get_watermark('tasks') == 4
+
+        stats = ledger.get_stats('tasks')
+        assert stats['in_flight'] == 1
+        assert stats['done_above_watermark'] == 0
+
+    def test_completed_work_is_not_reclaimed(self, db, ledger):
+        db.add_entities(3)
+        ledger.complete('tasks', ledger.claim_batch('tasks', 3))
+        db.add_entities(2)
+
+        assert ledger.claim_batch('tasks', 10) == [4, 5]
+
+    def test_release_returns_work(self, db, ledger):
+        db.add_entities(3)
+        ledger.claim_batch('tasks', 3)
+
+        ledger.release('tasks', [2])
+
+        assert ledger.claim_batch('tasks', 3) == [2]
+
+    def test_released_entity_is_not_skipped_by_the_watermark(self, db, ledger):
+        db.add_entities(3)
+        ledger.claim_batch('tasks', 3)
+
+        ledger.release('tasks', [1])
+        ledger.complete('tasks', [2, 3])
+
+        assert ledger.get_watermark('tasks') == 3
+        assert ledger.claim_batch('tasks', 5) == [1]
+
+    def test_failures_retry_with_backoff_then_park(self, db, ledger):
+        db.add_entities(2)
+        ledger.claim_batch('tasks', 2)
+        ledger.complete('tasks', [2])
+
+        ledger.fail('tasks', 1, 'boom')
+
+        # Failure no longer blocks the watermark and is not yet due
+        assert ledger.get_watermark('tasks') == 2
+        assert ledger.claim_batch('tasks', 5) == []
+        assert ledger.get_stats('tasks')['pending_retries'] == 1
+
+        # Make the retry due
+        with db.get_connection(readonly=False) as conn:
+            conn.execute("UPDATE processing_failures SET next_attempt_at = '2000-01-01 00:00:00'")
+        assert ledger.claim_batch('tasks', 5) == [1]
+
+        ledger.fail('tasks', 1, 'boom again')
+        with db.get_connection(readonly=False) as conn:
+            conn.execute("UPDATE processing_failures SET next_attempt_at = '2000-01-01 00:00:00'")
+        assert ledger.claim_batch('tasks', 5) == [1]
+        ledger.fail('tasks', 1, 'still broken')
+
+        stats = ledger.get_stats('tasks')
+        assert stats['dead'] == 1
+        assert stats['pending_retries'] == 0
+
+    def test_successful_retry_clears_failure(self, db, ledger):
+        db.add_entities(1)
+        ledger.claim_batch('tasks', 1)
+        ledger.fail('tasks', 1, 'boom')
+
+        ledger.complete('tasks', [1])
+
+        assert ledger.get_stats('tasks')['pending_retries'] == 0
+
+    def test_expired_claims_are_taken_over(self, db):
+        ledger = ProcessingLedger(db, claim_timeout=0)
+        db.add_entities(2)
+
+        assert ledger.claim_batch('tasks', 2, worker_id='a') == [1, 2]
+        assert sorted(ledger.claim_batch('tasks', 2, worker_id='b')) == [1, 2]
+
+    def test_concurrent_workers_claim_disjoint_batches(self, db, ledger):
+        db.add_entities(200)
+        claimed = []
+        lock = threading.Lock()
+
+        def worker(name):
+            local = ProcessingLedger(db)
+            while True:
+                batch = local.claim_batch('tasks', 7, worker_id=name)
+                if not batch:
+                    return
+                with lock:
+                    claimed.extend(batch)
+                local.complete('tasks', batch)
+
+        threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(claimed) == list(range(1, 201))
+        assert ledger.get_watermark('tasks') == 200
+
+    def test_bootstrap_watermark_from_existing_metadata(self, db, ledger):
+        db.add_entities(5)
+        for entity_id in (1, 2, 3, 5):
+            db.add_metadata(entity_id, 'tasks', 'Coding')
+
+        assert ledger.bootstrap_watermark('tasks') == 3
+        assert ledger.claim_batch('tasks', 5) == [4, 5]
+        # Existing stages are left alone
+        assert ledger.bootstrap_watermark('tasks') == 3
+
+    def test_fetch_work_items_loads_metadata_in_one_pass(self, db, ledger):
+        db.add_entities(2)
+        db.add_metadata(1, 'active_window', 'VS Code')
+        db.add_metadata(2, 'ocr_result', 'def main()')
+
+        items = ledger.fetch_work_items([2, 1], ['active_window', 'ocr_result'])
+
+        assert [item['id'] for item in items] == [2, 1]
+        assert items[0]['ocr_result'] == 'def main()'
+        assert items[0]['active_window'] is None
+        assert items[1]['active_window'] == 'VS Code'
+        assert items[1]['filepath'] == '/shots/1.png'
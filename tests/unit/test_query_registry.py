@@ -0,0 +1,237 @@
+"""
+Tests for the prepared hot query registry.
+
+Tests cover:
+- PREPARE once per connection, EXECUTE by name afterwards
+- Per-query latency and row statistics
+- EXPLAIN ANALYZE capture for slow executions
+- Repository hot paths going through the registry
+"""
+import json
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+
+import pandas as pd
+import pytest
+
+from autotasktracker.core.exceptions import DatabaseError
+from autotasktracker.core.query_registry import QueryRegistry, get_query_registry, register_default_queries
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = None
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=()):
+        self.conn.statements.append((sql, params))
+        if self.conn.fail_on and self.conn.fail_on in sql:
+            raise RuntimeError('statement failed')
+        if sql.startswith('SELECT 1 FROM pg_prepared_statements'):
+            self.description, self._rows = [('?column?',)], []
+        elif sql.startswith('EXPLAIN'):
+            plan = [{'Plan': {'Node Type': 'Index Scan'}, 'Planning Time': 0.1, 'Execution Time': 2.5}]
+            self.description, self._rows = [('QUERY PLAN',)], [(json.dumps(plan),)]
+        elif sql.startswith('EXECUTE'):
+            self.description, self._rows = [('id',), ('value',)], list(self.conn.rows)
+        else:
+            self.description, self._rows = None, []
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+
+class FakeConnection:
+    def __init__(self, rows=((1, 'a'), (2, 'b'))):
+        self.rows = rows
+        self.statements = []
+        self.fail_on = None
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def executed(self, prefix):
+        return [sql for sql, _ in self.statements if sql.startswith(prefix)]
+
+
+@pytest.fixture
+def registry():
+    registry = QueryRegistry()
+    registry.register('items', "SELECT id, value FROM items WHERE id > $1 LIMIT $2",
+                      ('bigint', 'bigint'), description='test query')
+    return registry
+
+
+class TestQueryRegistry:
+    """Test the QueryRegistry class."""
+
+    def test_prepares_once_per_connection(self, registry):
+        conn = FakeConnection()
+
+        registry.execute(conn, 'items', (0, 10))
+        registry.execute(conn, 'items', (5, 10))
+
+        assert registry.get('items').prepare_sql() == (
+            "PREPARE att_items (bigint, bigint) AS SELECT id, value FROM items WHERE id > $1 LIMIT $2"
+        )
+        assert len(conn.executed('PREPARE')) == 1
+        assert conn.executed('EXECUTE') == ['EXECUTE att_items(%s, %s)'] * 2
+        assert conn.statements[-1][1] == (5, 10)
+
+        other = FakeConnection()
+        registry.execute(other, 'items', (0, 10))
+        assert len(other.executed('PREPARE')) == 1
+        assert registry.get_stats()['items']['prepares'] == 2
+
+    def test_stats_track_calls_rows_and_latency(self, registry):
+        conn = FakeConnection(rows=[(i, 'x') for i in range(7)])
+
+        registry.execute(conn, 'items', (0, 10))
+        registry.execute(conn, 'items', (0, 10))
+
+        stats = registry.get_stats()['items']
+        assert stats['calls'] == 2
+        assert stats['rows'] == 14
+        assert stats['max_rows'] == 7
+        assert stats['latency']['count'] == 2
+
+    def test_read_dataframe_uses_result_columns(self, registry):
+        df = registry.read_dataframe(FakeConnection(), 'items', (0, 10))
+
+        assert list(df.columns) == ['id', 'value']
+        assert df['value'].tolist() == ['a', 'b']
+
+    def test_failures_are_counted_and_reprepared(self, registry):
+        conn = FakeConnection()
+        registry.execute(conn, 'items', (0, 10))
+        conn.fail_on = 'EXECUTE'
+
+        with pytest.raises(DatabaseError):
+            registry.execute(conn, 'items', (0, 10))
+
+        conn.fail_on = None
+        registry.execute(conn, 'items', (0, 10))
+        assert registry.get_stats()['items']['errors'] == 1
+        assert len(conn.executed('PREPARE')) == 2
+
+    def test_unknown_query_raises(self, registry):
+        with pytest.raises(DatabaseError, match='Unknown registered query'):
+            registry.execute(FakeConnection(), 'missing')
+
+    def test_slow_queries_capture_explain_plan(self):
+        registry = QueryRegistry(capture_plans=True, explain_threshold_ms=0, explain_interval=3600)
+        registry.register('items', "SELECT id, value FROM items", ())
+        conn = FakeConnection()
+
+        registry.execute(conn, 'items')
+        registry.execute(conn, 'items')
+
+        assert conn.executed('EXPLAIN') == ['EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) EXECUTE att_items']
+        plan = registry.get_stats()['items']['last_plan']
+        assert plan['root_node'] == 'Index Scan'
+        assert plan['execution_ms'] == 2.5
+
+    def test_capture_is_off_by_default(self, registry):
+        conn = FakeConnection()
+        registry.execute(conn, 'items', (0, 10))
+
+        assert conn.executed('EXPLAIN') == []
+
+    def test_default_queries_are_parameterised(self):
+        registry = QueryRegistry()
+        register_default_queries(registry)
+
+        assert {'fetch_tasks', 'tasks_for_period', 'session_metrics', 'count_tasks_today'} <= set(registry.names)
+        for name in registry.names:
+            query = registry.get(name)
+            for index in range(1, len(query.param_types) + 1):
+                assert f"${index}" in query.sql
+            assert len(query.sample_params()) == len(query.param_types)
+            # Optional filters get their own statement instead of forcing a generic plan
+            assert 'IS NULL OR' not in query.sql
+
+
+class TestRepositoryHotPaths:
+    """Repository hot queries run through the registry."""
+
+    def test_count_tasks_today_uses_prepared_count(self):
+        from autotasktracker.dashboards.data.repositories import TaskRepository
+
+        registry = Mock()
+        registry.read_dataframe.return_value = pd.DataFrame({'task_count': [42]})
+        db = Mock()
+        db.get_connection.return_value.__enter__ = Mock(return_value=Mock())
+        db.get_connection.return_value.__exit__ = Mock(return_value=False)
+        repo = TaskRepository(db_manager=db, use_pensieve=False)
+        repo.cache = Mock(get=Mock(return_value=None))
+
+        with patch('autotasktracker.dashboards.data.repositories.get_query_registry', return_value=registry):
+            assert repo.count_tasks_today() == 42
+
+        name, params = registry.read_dataframe.call_args[0][1:]
+        assert name == 'count_tasks_today'
+        # Local midnight to midnight, shifted to stored time like the period queries
+        assert params[1] - params[0] == timedelta(days=1) - timedelta(microseconds=1)
+        assert params[0] == datetime.combine(datetime.today(), datetime.min.time()) + timedelta(hours=7)
+
+    @pytest.mark.parametrize('categories, name', [
+        (None, 'tasks_for_period'), (['Coding'], 'tasks_for_period_in_categories'),
+    ])
+    def test_category_filter_picks_its_own_statement(self, categories, name):
+        from autotasktracker.dashboards.data.repositories import TaskRepository
+
+        registry = Mock()
+        registry.read_dataframe.return_value = pd.DataFrame()
+        db = Mock()
+        db.get_connection.return_value.__enter__ = Mock(return_value=Mock())
+        db.get_connection.return_value.__exit__ = Mock(return_value=False)
+        repo = TaskRepository(db_manager=db, use_pensieve=False)
+        repo.cache = Mock(get=Mock(return_value=None))
+
+        with patch('autotasktracker.dashboards.data.repositories.get_query_registry', return_value=registry):
+            repo.get_tasks_for_period(datetime(2024, 5, 1), datetime(2024, 5, 2), categories=categories)
+
+        used, params = registry.read_dataframe.call_args[0][1:]
+        assert used == name
+        assert len(params) == len(get_query_registry().get(name).param_types)
+
+    def test_data_watermark_follows_the_change_counter(self):
+        from autotasktracker.dashboards.data.repositories import MetricsRepository
+
+        conn = FakeConnection(rows=((120, 7),))
+        db = Mock()
+        db.get_connection.return_value.__enter__ = Mock(return_value=conn)
+        db.get_connection.return_value.__exit__ = Mock(return_value=False)
+        registry = QueryRegistry()
+        register_default_queries(registry)
+        repo = MetricsRepository(db_manager=db)
+
+        with patch('autotasktracker.dashboards.data.repositories.get_query_registry', return_value=registry):
+            assert repo.get_data_watermark() == (120, 7)
+
+        # Read from table statistics: nothing is installed on the data tables
+        assert not [sql for sql, _ in conn.statements if 'TRIGGER' in sql or 'CREATE' in sql]
+        sql = registry.get('data_watermark').sql
+        assert 'pg_stat_user_tables' in sql
+        assert "pg_partition_tree('metadata_entries')" in sql
+
+    def test_data_watermark_is_unavailable_when_the_read_fails(self):
+        from autotasktracker.dashboards.data.repositories import MetricsRepository
+
+        conn = FakeConnection()
+        conn.fail_on = 'pg_stat_user_tables'
+        db = Mock()
+        db.get_connection.return_value.__enter__ = Mock(return_value=conn)
+        db.get_connection.return_value.__exit__ = Mock(return_value=False)
+
+        assert MetricsRepository(db_manager=db).get_data_watermark() is None
@@ -0,0 +1,220 @@
+"""
+Tests for screenshot storage tiering.
+
+Deduplicates and transcodes real PNG files registered in a SQLite stand-in
+and checks that moved screenshots still resolve, that lossless output is
+pixel-identical, that bytes are accounted once per stored file, and that
+failures keep the originals.
+"""
+import os
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+from click.testing import CliRunner
+from PIL import Image, ImageDraw
+
+from autotasktracker.core.screenshot_store import (
+    ScreenshotStore, ScreenshotTierManager, resolve_frame, TIER_LINKED, TIER_ORIGINAL, TIER_TRANSCODED,
+)
+from autotasktracker.core.thumbnails import ThumbnailService
+from tests.unit.test_processing_ledger import SQLiteTestDatabase
+
+NOW = datetime(2024, 8, 1, 12)
+
+
+def _screen(path, shade):
+    """A small synthetic screen: window chrome, text-like rows and a highlight."""
+    img = Image.new('RGB', (320, 200), (250, 250, 250))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((0, 0, 320, 24), fill=(40, 44, 52))
+    for row in range(30, 190, 12):
+        draw.line((10, row, 10 + (row * 7) % 280, row), fill=(shade, 80, 120), width=3)
+    img.save(path)
+    return path
+
+
+@pytest.fixture
+def shots(tmp_path):
+    directory = tmp_path / 'screenshots'
+    directory.mkdir()
+    return directory
+
+
+@pytest.fixture
+def db(tmp_path, shots):
+    """Two identical idle frames and one distinct frame from May, one frame from this morning."""
+    db = SQLiteTestDatabase(tmp_path / 'store.db')
+    frames = [
+        (datetime(2024, 5, 3, 9, 0), 10),
+        (datetime(2024, 5, 3, 9, 1), 10),
+        (datetime(2024, 5, 3, 9, 2), 200),
+        (NOW - timedelta(minutes=10), 10),
+    ]
+    with db.get_connection(readonly=False) as conn:
+        for captured_at, shade in frames:
+            path = _screen(shots / f"{captured_at:%Y%m%d-%H%M}.png", shade)
+            conn.execute("INSERT INTO entities (filepath, created_at) VALUES (?, ?)",
+                         (str(path), captured_at.isoformat(sep=' ')))
+    return db
+
+
+@pytest.fixture
+def manager(db, tmp_path):
+    return ScreenshotTierManager(db, tier_dir=str(tmp_path / 'tiered'), older_than_days=30,
+                                 image_format='webp', batch_size=2)
+
+
+def _rows(db):
+    with db.get_connection() as conn:
+        return {row[0]: row[1:] for row in conn.execute(
+            "SELECT entity_id, tier, stored_path, stored_bytes FROM screenshot_files ORDER BY entity_id")}
+
+
+def _path(db, entity_id):
+    with db.get_connection() as conn:
+        return conn.execute("SELECT filepath FROM entities WHERE id = ?", (entity_id,)).fetchone()[0]
+
+
+class TestDeduplication:
+    """Test hashing and hard-linking identical frames."""
+
+    def test_identical_frames_are_hard_linked(self, manager, db):
+        totals = manager.deduplicate(now=NOW)
+
+        assert totals['screenshots'] == 3 and totals['linked'] == 1
+        assert os.stat(_path(db, 1)).st_ino == os.stat(_path(db, 2)).st_ino
+        assert os.stat(_path(db, 1)).st_ino != os.stat(_path(db, 3)).st_ino
+        rows = _rows(db)
+        assert [rows[i][0] for i in (1, 2, 3)] == [TIER_ORIGINAL, TIER_LINKED, TIER_ORIGINAL]
+        assert rows[2][2] == 0
+        with Image.open(_path(db, 2)) as img:
+            assert img.size == (320, 200)
+
+    def test_recent_frames_wait_for_the_grace_period(self, manager, db):
+        manager.deduplicate(now=NOW)
+
+        assert 4 not in _rows(db)
+        later = manager.deduplicate(now=NOW + timedelta(hours=2))
+        assert later['screenshots'] == 1 and later['linked'] == 1
+        assert manager.deduplicate(now=NOW + timedelta(hours=2))['screenshots'] == 0
+
+
+class TestTranscoding:
+    """Test moving old frames into the tier directory."""
+
+    def test_old_frames_are_transcoded_losslessly_and_resolve(self, manager, db, tmp_path):
+        originals = {i: Image.open(_path(db, i)).convert('RGB').tobytes() for i in (1, 3)}
+        manager.deduplicate(now=NOW)
+
+        totals = manager.transcode(now=NOW)
+
+        assert totals['screenshots'] == 3 and totals['files'] == 2
+        for entity_id in (1, 2, 3):
+            assert not os.path.exists(_path(db, entity_id))
+            resolved = manager.resolve(_path(db, entity_id))
+            assert resolved.startswith(str(tmp_path / 'tiered')) and resolved.endswith('.webp')
+            with Image.open(resolved) as img:
+                assert img.convert('RGB').tobytes() == originals[3 if entity_id == 3 else 1]
+        assert manager.resolve(_path(db, 1)) == manager.resolve(_path(db, 2))
+        assert manager.resolve(_path(db, 4)) == _path(db, 4)
+
+    def test_report_counts_each_stored_file_once(self, manager, db):
+        manager.deduplicate(now=NOW)
+        original_bytes = sum(os.path.getsize(_path(db, i)) for i in (1, 2, 3))
+        manager.transcode(now=NOW)
+
+        stats = manager.stats()
+
+        stored = {manager.resolve(_path(db, i)) for i in (1, 2, 3)}
+        assert stats['original_bytes'] == original_bytes
+        assert stats['stored_bytes'] == sum(os.path.getsize(path) for path in stored)
+        assert stats['saved_bytes'] == original_bytes - stats['stored_bytes'] > 0
+        assert stats['tiers'][TIER_TRANSCODED]['screenshots'] == 3
+        assert stats['decode_samples'] == 2 and stats['decode_ms_stored'] > 0
+
+    def test_newer_duplicate_keeps_the_bytes_of_a_transcoded_original(self, manager, db):
+        manager.deduplicate(now=NOW + timedelta(hours=2))
+        manager.transcode(now=NOW)
+
+        rows = _rows(db)
+        assert rows[4][0] == TIER_ORIGINAL and rows[4][2] == os.path.getsize(_path(db, 4))
+        with Image.open(_path(db, 4)) as img:
+            assert img.size == (320, 200)
+
+    def test_failed_encode_keeps_the_original(self, manager, db):
+        manager.deduplicate(now=NOW)
+
+        with patch.object(manager, '_encode', side_effect=ValueError('lossless output differs')):
+            totals = manager.transcode(now=NOW)
+
+        assert totals['failed'] == 3 and totals['screenshots'] == 0
+        assert all(os.path.exists(_path(db, i)) for i in (1, 2, 3))
+        assert {row[0] for row in _rows(db).values()} == {TIER_ORIGINAL, TIER_LINKED}
+
+    def test_originals_left_by_an_interrupted_run_are_swept(self, manager, db):
+        manager.deduplicate(now=NOW)
+        with patch('autotasktracker.core.screenshot_store.os.unlink'):
+            manager.transcode(now=NOW)
+        assert os.path.exists(_path(db, 3))
+
+        assert manager.sweep() == 3
+        assert not os.path.exists(_path(db, 3))
+        assert manager.transcode(now=NOW)['screenshots'] == 0
+
+    def test_disabled_when_age_is_zero(self, db, tmp_path):
+        manager = ScreenshotTierManager(db, tier_dir=str(tmp_path / 't'), older_than_days=0)
+
+        assert manager.transcode(now=NOW)['screenshots'] == 0
+
+
+class TestResolution:
+    """Test transparent path resolution for readers."""
+
+    def test_existing_paths_never_query(self, db, tmp_path):
+        store = ScreenshotStore(db, tier_dir=str(tmp_path / 'tiered'))
+
+        with patch.object(store, '_query') as query:
+            assert store.resolve(_path(db, 1)) == _path(db, 1)
+        query.assert_not_called()
+
+    def test_frames_resolve_after_transcoding(self, manager, db, tmp_path):
+        manager.run(now=NOW)
+        df = pd.DataFrame({'id': [1, 4], 'filepath': [_path(db, 1), _path(db, 4)]})
+
+        with patch('autotasktracker.config.Config.get_screenshot_tier_path', return_value=str(tmp_path / 'tiered')):
+            resolved = resolve_frame(db, df)
+
+        assert resolved['filepath'].iloc[0] == manager.resolve(_path(db, 1))
+        assert resolved['filepath'].iloc[1] == _path(db, 4)
+        assert df['filepath'].iloc[0] == _path(db, 1)
+
+    def test_thumbnails_follow_moved_screenshots(self, manager, db, tmp_path):
+        manager.run(now=NOW)
+        service = ThumbnailService(tmp_path / 'thumbs', resolver=manager.resolve)
+
+        thumbnail = service.get_thumbnail(_path(db, 3), 150)
+
+        with Image.open(thumbnail) as img:
+            assert max(img.size) == 150
+
+
+class TestScreenshotsCLI:
+    """Test the storage screenshots command."""
+
+    def test_run_then_report(self, db, tmp_path):
+        from autotasktracker.cli.commands.storage import storage_group
+
+        with patch('autotasktracker.core.database.DatabaseManager', lambda **kwargs: db), \
+                patch('autotasktracker.config.Config.get_screenshot_tier_path',
+                      return_value=str(tmp_path / 'cli')):
+            result = CliRunner().invoke(storage_group, ['screenshots', '--older-than', '30'])
+            report = CliRunner().invoke(storage_group, ['screenshots', '--report'])
+
+        assert result.exit_code == 0, result.output
+        # Relative to the real clock every fixture screenshot is past the grace period and cutoff
+        assert 'linked 2 duplicates' in result.output
+        assert 'Transcoded 4 screenshots to webp' in result.output
+        assert report.exit_code == 0, report.output
+        assert '4 screenshots tracked' in report.output and 'Decode time over 2' in report.output
@@ -0,0 +1,180 @@
+"""
+Tests for LlamaSessionProcessor session slicing and LLM call execution.
+
+Tests cover:
+- Bisect-based session slicing matching the per-boundary scan
+- Content-addressed response cache keys and persistence across instances
+- Per-model concurrency limits on the shared executor
+- Token and latency accounting per call
+"""
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import pytest
+
+from autotasktracker.ai.llm_executor import LLMExecutor, LLMResponseCache
+from autotasktracker.ai.session_processor import LlamaSessionProcessor, SessionBoundary
+
+
+ANALYSIS = {
+    'workflow_type': 'coding',
+    'main_activities': ['editing_code'],
+    'duration_minutes': 10,
+}
+
+
+def _ollama_response(text, prompt_tokens=120, completion_tokens=40):
+    response = Mock()
+    response.raise_for_status.return_value = None
+    response.json.return_value = {
+        'response': text,
+        'prompt_eval_count': prompt_tokens,
+        'eval_count': completion_tokens,
+    }
+    return response
+
+
+def _screenshots(start, count, step_seconds=60, app='IDE'):
+    return [
+        {
+            'timestamp': (start + timedelta(seconds=step_seconds * i)).isoformat(),
+            'vlm_result': {'app_type': app, 'tasks': f'task {i}'},
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def processor(tmp_path):
+    processor = LlamaSessionProcessor(cache_dir=str(tmp_path / 'llm'))
+    processor.executor = LLMExecutor(max_workers=4, model_limits={processor.llama_model: 2})
+    processor.session = Mock()
+    processor.session.post.return_value = _ollama_response(json.dumps(ANALYSIS))
+    yield processor
+    processor.executor.shutdown()
+
+
+class TestSessionSlicing:
+    """Test the bisect-based session slicer."""
+
+    def test_slices_match_timeframe_scan(self, processor):
+        base = datetime(2024, 1, 1, 9, 0)
+        sequence = _screenshots(base, 5) + _screenshots(base + timedelta(hours=1), 4)
+        sequence.append({'vlm_result': {}})  # no timestamp
+        boundaries = processor.detect_session_boundaries(sequence[:-1])
+
+        slices = processor._slice_sessions(list(reversed(sequence)), boundaries)
+
+        assert [len(s) for s in slices] == [5, 4]
+        for boundary, session in zip(boundaries, slices):
+            expected = [s for s in sequence if processor._is_in_session_timeframe(s, boundary)]
+            assert sorted(s['timestamp'] for s in session) == sorted(s['timestamp'] for s in expected)
+            assert [s['timestamp'] for s in session] == sorted(s['timestamp'] for s in session)
+
+    def test_boundary_endpoints_are_inclusive(self, processor):
+        base = datetime(2024, 1, 1, 9, 0)
+        sequence = _screenshots(base, 3)
+        boundary = SessionBoundary(base, base + timedelta(minutes=2), 'session_0', 1.0, 'time_gap', '')
+
+        assert len(processor._slice_sessions(sequence, [boundary])[0]) == 3
+
+
+class TestResponseCache:
+    """Test the content-addressed LLM response cache."""
+
+    def test_key_covers_model_prompt_temperature_and_options(self):
+        key = LLMResponseCache.make_key('llama3:8b', 'prompt', 0.0, {'num_predict': 800})
+
+        assert key == LLMResponseCache.make_key('llama3:8b', 'prompt', 0, {'num_predict': 800})
+        assert key != LLMResponseCache.make_key('llama3:70b', 'prompt', 0.0, {'num_predict': 800})
+        assert key != LLMResponseCache.make_key('llama3:8b', 'prompt!', 0.0, {'num_predict': 800})
+        assert key != LLMResponseCache.make_key('llama3:8b', 'prompt', 0.2, {'num_predict': 800})
+        assert key != LLMResponseCache.make_key('llama3:8b', 'prompt', 0.0, {'num_predict': 500})
+
+    def test_deterministic_reanalysis_is_served_from_disk(self, processor, tmp_path):
+        session = _screenshots(datetime(2024, 1, 1, 9, 0), 4)
+
+        first = processor.analyze_session_workflow(session)
+        assert not first['llm_call']['cached']
+
+        # A new processor (e.g. the next run) shares the on-disk cache
+        rerun = LlamaSessionProcessor(cache_dir=str(tmp_path / 'llm'))
+        rerun.session = Mock()
+        second = rerun.analyze_session_workflow(session)
+
+        rerun.session.post.assert_not_called()
+        assert second['llm_call']['cached']
+        assert second['workflow_type'] == 'coding'
+        assert second['llm_call']['prompt_tokens'] == 120
+
+    def test_sampled_calls_are_not_cached(self, processor):
+        processor._call_llama3('tell me something', temperature=0.7)
+        processor._call_llama3('tell me something', temperature=0.7)
+
+        assert processor.session.post.call_count == 2
+        assert processor.response_cache.get_stats()['writes'] == 0
+
+    def test_failed_calls_are_not_cached(self, processor):
+        processor.session.post.side_effect = [Exception('boom'), _ollama_response('ok')]
+
+        assert processor._call_llama3('prompt') is None
+        assert processor._call_llama3('prompt') == 'ok'
+        assert processor.usage.snapshot()[processor.llama_model]['errors'] == 1
+
+    def test_entries_are_evicted_above_limit(self, tmp_path):
+        cache = LLMResponseCache(tmp_path, max_entries=10)
+        for i in range(12):
+            cache.put(LLMResponseCache.make_key('m', f'p{i}', 0.0), f'r{i}')
+
+        stats = cache.get_stats()
+        assert stats['entries'] <= 10
+        assert stats['evictions'] >= 2
+
+
+class TestConcurrentAnalysis:
+    """Test concurrent session analysis and accounting."""
+
+    def test_sessions_run_concurrently_within_model_limit(self, processor):
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def slow_post(url, **kwargs):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+            return _ollama_response(json.dumps(ANALYSIS))
+
+        processor.session.post.side_effect = slow_post
+        base = datetime(2024, 1, 1, 9, 0)
+        sequence = []
+        for i in range(6):
+            # Distinct content per session so none are cache hits
+            sequence += _screenshots(base + timedelta(hours=i), 3, app=f'App{i}')
+
+        result = processor.chunk_and_summarize_workflow(sequence)
+
+        assert result['total_sessions'] == 6
+        assert len(result['session_analyses']) == 6
+        assert [a['session_boundary']['session_id'] for a in result['session_analyses']] == \
+            [f'session_{i}' for i in range(6)]
+        assert max(peak) == 2
+        assert processor.executor.get_stats()['peak_in_flight'][processor.llama_model] == 2
+
+    def test_usage_is_accounted_per_model(self, processor):
+        processor._call_llama3('first prompt')
+        processor._call_llama3('second prompt')
+        processor._call_llama3('first prompt')
+
+        usage = processor.get_processing_stats()['llm_usage'][processor.llama_model]
+        assert usage['calls'] == 3
+        assert usage['cache_hits'] == 1
+        assert usage['prompt_tokens'] == 240
+        assert usage['completion_tokens'] == 80
+        assert usage['latency']['count'] == 2
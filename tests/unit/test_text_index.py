@@ -0,0 +1,186 @@
+"""
+Tests for the full-text index over entity text metadata.
+
+Runs the SQLite (FTS5) backend against the Pensieve schema stand-in to cover:
+- Incremental maintenance by triggers as metadata is inserted and updated
+- OCR JSON flattened to its text, BM25 column weighting and prefix matching
+- Engine-generated highlights, date and category filters
+- Resumable backfill of history and the advanced search fallback path
+"""
+import json
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import pytest
+
+from autotasktracker.core.text_index import TextIndex, _like_pattern, ocr_plain_text
+from tests.unit.test_processing_ledger import SQLiteTestDatabase
+
+
+@pytest.fixture
+def db(tmp_path):
+    return SQLiteTestDatabase(tmp_path / 'search.db')
+
+
+@pytest.fixture
+def index(db):
+    index = TextIndex(db)
+    index.ensure_schema()
+    return index
+
+
+def _value(db, entity_id, key):
+    with db.get_connection() as conn:
+        return conn.execute("SELECT value FROM metadata_entries WHERE entity_id = ? AND key = ?",
+                            (entity_id, key)).fetchone()[0]
+
+
+def _ocr(*lines):
+    return json.dumps([[[0, 0, 10, 10], line, 0.9] for line in lines])
+
+
+class TestIncrementalIndex:
+    """Test trigger-maintained index rows."""
+
+    def test_metadata_inserts_are_indexed(self, db, index):
+        db.add_entities(2)
+        db.add_metadata(1, 'active_window', 'report.docx - Word')
+        db.add_metadata(1, 'ocr_result', _ocr('Quarterly revenue forecast', 'Draft'))
+        db.add_metadata(2, 'active_window', 'main.py - VS Code')
+        db.add_metadata(2, 'dual_model_version', '1.0')
+
+        assert index.count() == 2
+        match, = index.search('revenue')
+        assert match.entity_id == 1
+        assert match.window_title == 'report.docx - Word'
+        assert match.filepath == '/shots/1.png'
+        assert match.highlights == ['OCR: Quarterly **revenue** forecast Draft']
+
+    def test_ocr_bounding_boxes_are_not_indexed(self, db, index):
+        db.add_entities(1)
+        db.add_metadata(1, 'ocr_result', _ocr('hello'))
+
+        assert index.search('10') == []
+        assert [m.entity_id for m in index.search('hello')] == [1]
+
+    def test_pensieve_ocr_objects_are_indexed(self, db, index):
+        db.add_entities(1)
+        db.add_metadata(1, 'ocr_result', json.dumps([
+            {'rec_txt': 'Sprint retrospective', 'score': 0.97, 'dt_boxes': [[0, 0], [10, 10]]},
+            {'rec_txt': 'Action items', 'score': 0.91},
+        ]))
+
+        match, = index.search('retrospective')
+        assert match.highlights == ['OCR: Sprint **retrospective** Action items']
+        assert index.search('0.97') == []
+        assert ocr_plain_text(_value(db, 1, 'ocr_result')) == 'Sprint retrospective Action items'
+
+    def test_updates_replace_indexed_text(self, db, index):
+        db.add_entities(1)
+        db.add_metadata(1, 'tasks', 'Write migration')
+        with db.get_connection(readonly=False) as conn:
+            conn.execute("UPDATE metadata_entries SET value = 'Review pull request' WHERE key = 'tasks'")
+
+        assert index.search('migration') == []
+        match, = index.search('review')
+        assert match.tasks == 'Review pull request'
+        assert match.highlights == ['Tasks: **Review** pull request']
+
+    def test_deleted_entities_leave_the_index(self, db, index):
+        db.add_entities(1)
+        db.add_metadata(1, 'active_window', 'Slack')
+        with db.get_connection(readonly=False) as conn:
+            conn.execute("DELETE FROM entities WHERE id = 1")
+
+        assert index.count() == 0
+
+
+class TestRanking:
+    """Test engine-side ranking, matching and filters."""
+
+    def test_title_matches_outrank_ocr_matches(self, db, index):
+        db.add_entities(2)
+        db.add_metadata(1, 'active_window', 'Terminal')
+        db.add_metadata(1, 'ocr_result', _ocr('deploy finished on staging server'))
+        db.add_metadata(2, 'active_window', 'Deploy dashboard - Chrome')
+
+        matches = index.search('deploy')
+
+        assert [m.entity_id for m in matches] == [2, 1]
+        assert 1 > matches[0].score > matches[1].score > 0
+        assert matches[0].highlights == ['Title: **Deploy** dashboard - Chrome']
+
+    def test_last_term_matches_prefixes(self, db, index):
+        db.add_entities(1)
+        db.add_metadata(1, 'active_window', 'Kubernetes dashboard')
+
+        assert [m.entity_id for m in index.search('kuber')] == [1]
+        assert [m.entity_id for m in index.search('dash kubernetes')] == []
+
+    def test_query_syntax_is_escaped(self, db, index):
+        db.add_entities(1)
+        db.add_metadata(1, 'active_window', 'notes OR ideas')
+
+        assert [m.entity_id for m in index.search('notes OR "ideas')] == [1]
+        assert index.search('*()') == []
+
+    def test_substring_patterns_match_wildcards_literally(self):
+        assert _like_pattern('100%_done') == '%100\\%\\_done%'
+        assert _like_pattern('C:\\tmp') == '%C:\\\\tmp%'
+
+    def test_date_and_category_filters(self, db, index):
+        db.add_entities(1, age_seconds=3 * 86400)
+        db.add_entities(1, age_seconds=60)
+        for entity_id, category in ((1, 'Coding'), (2, 'Meetings')):
+            db.add_metadata(entity_id, 'active_window', 'standup notes')
+            db.add_metadata(entity_id, 'category', category)
+
+        now = datetime.now()
+        assert [m.entity_id for m in index.search('standup', date_range=(now - timedelta(days=1), now))] == [2]
+        assert [m.entity_id for m in index.search('standup', category='Coding')] == [1]
+
+
+class TestBackfill:
+    """Test indexing history captured before the index existed."""
+
+    def test_backfill_indexes_existing_entities_once(self, db):
+        db.add_entities(5)
+        for entity_id in range(1, 5):
+            db.add_metadata(entity_id, 'active_window', f'invoice {entity_id}')
+        index = TextIndex(db)
+
+        assert index.backfill(batch_size=2) == 4
+        assert index.backfill(batch_size=2) == 0
+        assert len(index.search('invoice')) == 4
+
+    def test_rebuild_reindexes_everything(self, db, index):
+        db.add_entities(2)
+        db.add_metadata(1, 'active_window', 'alpha')
+        db.add_metadata(2, 'active_window', 'beta')
+
+        assert index.rebuild() == 2
+        assert index.count() == 2
+
+
+class TestAdvancedSearchFallback:
+    """Test the search path used when the hybrid engine fails."""
+
+    def test_fallback_uses_text_index(self, db, index):
+        from autotasktracker.pensieve.advanced_search import PensieveAdvancedSearch, SearchQuery
+
+        db.add_entities(1)
+        db.add_metadata(1, 'active_window', 'budget.xlsx - Excel')
+        db.add_metadata(1, 'tasks', json.dumps({'tasks': ['Update budget']}))
+        db.add_metadata(1, 'category', 'Spreadsheets')
+        engine = Mock()
+        engine.search.side_effect = RuntimeError('engine down')
+        search = PensieveAdvancedSearch(text_index=index, engine=engine)
+
+        result, = search.search(SearchQuery(text='budget', category_filter='Spreadsheets'))
+
+        assert result.entity_id == 1
+        assert result.extracted_tasks == ['Update budget']
+        assert result.search_method == 'fallback_fulltext'
+        assert result.relevance_score == 1.0
+        assert isinstance(result.timestamp, datetime)
+        assert result.highlights[0] == 'Title: **budget**.xlsx - Excel'
@@ -0,0 +1,106 @@
+"""
+Tests for the screenshot thumbnail pyramid.
+
+Tests cover:
+- Rendering every pyramid level once and serving later requests from disk
+- Choosing the smallest rendition that covers the requested size
+- Content addressing (identical screenshots share renditions)
+- Re-rendering when a screenshot changes and byte-bounded eviction
+"""
+import os
+import shutil
+import time
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from autotasktracker.core.thumbnails import ThumbnailService
+
+
+@pytest.fixture
+def screenshot(tmp_path):
+    path = tmp_path / 'shots' / 'screen.png'
+    path.parent.mkdir()
+    Image.new('RGB', (2880, 1800), color=(40, 90, 160)).save(path)
+    return path
+
+
+@pytest.fixture
+def service(tmp_path):
+    return ThumbnailService(tmp_path / 'thumbs')
+
+
+class TestThumbnailService:
+    """Test the ThumbnailService class."""
+
+    def test_first_request_renders_pyramid(self, service, screenshot):
+        path = service.get_thumbnail(screenshot, 300)
+
+        with Image.open(path) as img:
+            assert max(img.size) == 300
+            assert img.format == service.image_format
+        renditions = service.generate(screenshot)
+        assert sorted(renditions) == [150, 300, 768]
+        for size, rendition in renditions.items():
+            with Image.open(rendition) as img:
+                assert max(img.size) == size
+        assert service.get_stats()['generated'] == 1
+
+    def test_repeat_requests_do_not_decode(self, service, screenshot):
+        first = service.get_thumbnail(screenshot, 150)
+
+        with patch('autotasktracker.core.thumbnails.Image.open') as mock_open:
+            assert service.get_thumbnail(screenshot, 150) == first
+            assert service.get_thumbnail(screenshot, 768)
+            mock_open.assert_not_called()
+
+        stats = service.get_stats()
+        assert stats['hits'] == 2
+        assert stats['misses'] == 1
+
+    def test_requested_size_maps_to_covering_level(self, service):
+        assert service.rendition_size(100) == 150
+        assert service.rendition_size(200) == 300
+        assert service.rendition_size(300) == 300
+        assert service.rendition_size(2000) == 768
+
+    def test_identical_screenshots_share_renditions(self, service, screenshot):
+        copy = screenshot.parent / 'copy.png'
+        shutil.copy(screenshot, copy)
+
+        assert service.get_thumbnail(screenshot) == service.get_thumbnail(copy)
+        assert service.get_stats()['generated'] == 1
+
+    def test_changed_screenshot_is_rerendered(self, service, screenshot):
+        before = service.get_thumbnail(screenshot)
+        Image.new('RGB', (1000, 500), color=(200, 10, 10)).save(screenshot)
+        os.utime(screenshot, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+
+        after = service.get_thumbnail(screenshot)
+
+        assert after != before
+        assert service.get_stats()['generated'] == 2
+
+    def test_missing_or_corrupt_sources_return_none(self, service, tmp_path):
+        corrupt = tmp_path / 'corrupt.png'
+        corrupt.write_bytes(b'not an image')
+
+        assert service.get_thumbnail(tmp_path / 'missing.png') is None
+        assert service.get_thumbnail(None) is None
+        assert service.get_thumbnail(corrupt) is None
+        assert service.get_stats()['errors'] == 1
+
+    def test_cache_is_bounded_by_bytes(self, tmp_path):
+        service = ThumbnailService(tmp_path / 'thumbs', max_bytes=1)
+        sources = []
+        for i in range(3):
+            path = tmp_path / f'shot{i}.png'
+            Image.new('RGB', (800, 600), color=(i * 60, 0, 0)).save(path)
+            sources.append(path)
+
+        assert service.generate_many(sources) == 3
+
+        stats = service.get_stats()
+        assert stats['evicted'] > 0
+        assert stats['bytes'] <= 1
@@ -0,0 +1,197 @@
+"""
+Tests for per-stage pipeline tracing.
+
+Tests cover:
+- Span nesting, entity-derived trace ids and error recording
+- Context propagation across threads and async tasks
+- Log-linear histogram bounds and percentile accuracy
+- Freshness lag recording from live dashboard views
+- JSON and Prometheus exports, including the metrics API endpoints
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from autotasktracker.core.processing_ledger import utc_now
+from autotasktracker.core.tracing import (
+    FRESHNESS, Tracer, current_span, get_tracer, log_linear_bounds, trace_id_for_entity,
+)
+
+
+@pytest.fixture
+def tracer():
+    return Tracer()
+
+
+class TestSpans:
+    """Test span lifecycle and context propagation."""
+
+    def test_nested_spans_share_entity_trace(self, tracer):
+        with tracer.span('event', entity_id=42) as outer:
+            with tracer.span('ocr') as inner:
+                assert current_span() is inner
+            assert current_span() is outer
+        assert current_span() is None
+
+        assert outer.trace_id == inner.trace_id == trace_id_for_entity(42)
+        assert inner.parent_id == outer.span_id
+        assert inner.entity_id == 42
+        assert outer.duration_ms >= inner.duration_ms >= 0
+        assert {s['name'] for s in tracer.recent_spans(trace_id_for_entity(42))} == {'event', 'ocr'}
+
+    def test_trace_id_is_stable_per_entity(self):
+        assert trace_id_for_entity(7) == trace_id_for_entity('7')
+        assert trace_id_for_entity(7) != trace_id_for_entity(8)
+
+    def test_errors_are_recorded_and_reraised(self, tracer):
+        with pytest.raises(ValueError):
+            with tracer.span('task', entity_id=1) as span:
+                raise ValueError('bad ocr')
+
+        assert span.error == 'ValueError: bad ocr'
+        assert tracer.stage_stats()['task']['count'] == 1
+
+    def test_threads_do_not_share_spans(self, tracer):
+        seen = {}
+        barrier = threading.Barrier(4)
+
+        def work(entity_id):
+            with tracer.span('vlm', entity_id=entity_id):
+                barrier.wait()
+                seen[entity_id] = current_span().entity_id
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(work, range(4)))
+
+        assert seen == {i: i for i in range(4)}
+        assert tracer.stage_stats()['vlm']['count'] == 4
+
+    def test_bind_carries_context_into_executor(self, tracer):
+        def ocr():
+            with tracer.span('ocr') as span:
+                return span
+
+        with tracer.span('event', entity_id=5) as parent:
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                child = pool.submit(tracer.bind(ocr)).result()
+
+        assert child.trace_id == parent.trace_id
+        assert child.parent_id == parent.span_id
+
+    def test_async_tasks_keep_their_own_span(self, tracer):
+        async def stage(entity_id):
+            with tracer.span('task', entity_id=entity_id):
+                await asyncio.sleep(0)
+                return current_span().entity_id
+
+        async def main():
+            return await asyncio.gather(*(stage(i) for i in range(5)))
+
+        assert asyncio.run(main()) == list(range(5))
+
+
+class TestHistograms:
+    """Test bucket layout, percentiles and exports."""
+
+    def test_bounds_have_bounded_relative_width(self):
+        bounds = log_linear_bounds(1, 10_000, steps_per_decade=20)
+
+        assert bounds[0] == 1 and bounds[-1] >= 10_000
+        assert all(1 < b / a < 1.15 for a, b in zip(bounds, bounds[1:]))
+
+    def test_percentiles_within_bucket_precision(self, tracer):
+        for value in range(1, 1001):
+            tracer.record('ocr', float(value))
+
+        stats = tracer.stage_stats()['ocr']
+        assert stats['count'] == 1000
+        assert stats['p50_ms'] == pytest.approx(500, rel=0.13)
+        assert stats['p95_ms'] == pytest.approx(950, rel=0.13)
+        assert stats['p99_ms'] == pytest.approx(990, rel=0.13)
+
+    def test_freshness_lag(self, tracer):
+        captured = datetime(2024, 1, 1, 9, 0)
+        lag = tracer.record_freshness(captured, captured + timedelta(seconds=3))
+
+        assert lag == 3000
+        assert tracer.last_freshness_ms == 3000
+        assert tracer.stage_stats()[FRESHNESS]['count'] == 1
+
+    def test_prometheus_export(self, tracer):
+        tracer.record('ocr', 12.0)
+        tracer.record('ocr', 40.0)
+        tracer.record_freshness(datetime(2024, 1, 1), datetime(2024, 1, 1, 0, 0, 2))
+
+        text = tracer.export_prometheus()
+
+        assert '# TYPE autotask_stage_duration_ms histogram' in text
+        assert 'autotask_stage_duration_ms_bucket{stage="ocr",le="+Inf"} 2' in text
+        assert 'autotask_stage_duration_ms_count{stage="ocr"} 2' in text
+        assert 'autotask_stage_duration_ms_sum{stage="ocr"} 52.0' in text
+        assert 'autotask_freshness_lag_ms_count 1' in text
+        ocr_buckets = [int(line.rsplit(' ', 1)[1]) for line in text.splitlines()
+                       if line.startswith('autotask_stage_duration_ms_bucket{stage="ocr"')]
+        assert ocr_buckets == sorted(ocr_buckets)
+
+
+class TestIntegration:
+    """Test tracing hooks in the live view and metrics API."""
+
+    def test_live_view_records_freshness_for_delta_rows(self, monkeypatch):
+        from autotasktracker.dashboards.data import live_view
+        from tests.unit.test_live_view import FakeTaskSource, _task
+
+        tracer = Tracer()
+        monkeypatch.setattr(live_view, 'get_tracer', lambda: tracer)
+        monkeypatch.setattr(live_view, 'trace_span', tracer.span)
+        repo = FakeTaskSource([_task(1, 0, 'main.py - VS Code')])
+        view = live_view.LiveTaskView(repo, datetime(2024, 1, 1), datetime(2024, 1, 2))
+        view.load()
+        assert FRESHNESS not in tracer.stage_stats()
+
+        repo.rows.append(_task(2, 1, 'main.py - VS Code'))
+        view.apply_updates()
+
+        stats = tracer.stage_stats()
+        assert stats[FRESHNESS]['count'] == 1
+        assert stats['dashboard']['count'] == 1
+
+    def test_event_processor_times_capture_and_ocr_in_utc(self, monkeypatch):
+        from autotasktracker.pensieve import event_processor
+        from autotasktracker.pensieve.event_processor import EventProcessor, PensieveEvent
+
+        tracer = Tracer()
+        monkeypatch.setattr(event_processor, 'get_tracer', lambda: tracer)
+        processor = EventProcessor.__new__(EventProcessor)
+        processor.event_handlers = {}
+        processor._trigger_task_extraction = Mock()
+        # Pensieve stores naive UTC timestamps
+        captured = utc_now() - timedelta(seconds=5)
+        event = PensieveEvent(event_type='entity_processed', entity_id=7, timestamp=captured,
+                              data={'last_scan_at': (captured + timedelta(seconds=2)).isoformat()})
+
+        processor._process_event(event)
+
+        stats = tracer.stage_stats()
+        assert stats['capture']['max_ms'] == pytest.approx(5000, abs=1000)
+        assert stats['ocr']['max_ms'] == pytest.approx(2000, rel=0.01)
+        processor._trigger_task_extraction.assert_called_once_with(7)
+
+    def test_metrics_api_exports(self):
+        from autotasktracker.dashboards.api import MetricsAPIService, PROMETHEUS_MEDIA_TYPE
+
+        get_tracer().record('capture', 250.0)
+        client = TestClient(MetricsAPIService(db_manager=Mock()).app)
+
+        metrics = client.get('/metrics')
+        assert metrics.status_code == 200
+        assert metrics.headers['content-type'] == PROMETHEUS_MEDIA_TYPE
+        assert 'stage="capture"' in metrics.text
+
+        traces = client.get('/traces').json()
+        assert traces['stages']['capture']['count'] >= 1
@@ -455,6 +455,16 @@ class TestSmartVLMProcessor:
             with pytest.raises(Exception, match="Hash failed"):
                 processor.should_process("/test/error.png")
     
+    def test_recompute_bypasses_cache_and_capture_heuristics(self, processor):
+        """Test that recomputing a stale result is not skipped by capture-time checks."""
+        processor.sensitive_filter.should_process_image.return_value = (True, 0.1, {})
+        processor.result_cache["static_hash"] = {"cached": True}
+        
+        with patch.object(processor, 'get_image_hash', return_value="static_hash"), \
+                patch.object(processor, 'is_similar_to_recent', return_value=True):
+            assert processor.should_process("/test/image.png", "Desktop", recompute=True) == (True, "recompute")
+            assert processor.should_process("/test/image.png", "Desktop") == (False, "cached")
+    
     def test_processing_lock_prevents_race_conditions(self, processor, mock_db):
         """Test that processing locks prevent race conditions."""
         db, conn, cursor = mock_db
@@ -495,6 +505,20 @@ class TestSmartVLMProcessor:
         # Reset for other tests
         db.get_connection.side_effect = None
     
+    def test_shed_job_is_recorded_on_the_entity(self, processor, mock_db):
+        """A job shed past its deadline leaves a 'shed' flag instead of vanishing."""
+        from autotasktracker.ai.vlm_scheduler import VLMJob
+        db, conn, cursor = mock_db
+        
+        # Patched where the processor imports it from; the lazy export may already be cached
+        with patch('autotasktracker.core.DatabaseManager', return_value=db):
+            processor._shed_to_ocr(VLMJob(filepath='/test/late.png', entity_id='42'))
+        
+        sql, params = cursor.execute.call_args[0]
+        assert 'ON CONFLICT (entity_id, key)' in sql
+        assert params == ('42', 'vlm_processing', 'shed')
+        conn.commit.assert_called_once()
+    
     def test_cache_memory_management(self, processor):
         """Test cache memory management with LRU eviction."""
         # Set small limits for testing
@@ -0,0 +1,223 @@
+"""
+Tests for VLM scheduling module.
+
+Tests cover:
+- Priority scoring from recency, app type, novelty and sensitivity
+- Aging and ordering of queued jobs
+- Deadline-based shedding and overflow eviction
+- Queue persistence across restarts
+- AIMD concurrency adaptation
+"""
+import threading
+import time
+
+import pytest
+
+from autotasktracker.ai.vlm_scheduler import (
+    VLMJob, VLMWorkQueue, AdaptiveConcurrencyController
+)
+
+
+class TestVLMWorkQueue:
+    """Test the VLMWorkQueue class."""
+
+    @pytest.fixture
+    def queue(self):
+        return VLMWorkQueue(deadline_seconds=60)
+
+    def test_recent_screenshots_run_before_backlog(self, queue):
+        now = time.time()
+        queue.push(VLMJob(filepath='/old.png', entity_id='1', captured_at=now - 3600))
+        queue.push(VLMJob(filepath='/live.png', entity_id='2', captured_at=now))
+
+        jobs, shed = queue.pop_batch(2)
+
+        assert [j.filepath for j in jobs] == ['/live.png', '/old.png']
+        assert shed == []
+
+    def test_app_type_novelty_and_sensitivity_affect_score(self, queue):
+        now = time.time()
+        base = VLMJob(filepath='/a.png', captured_at=now, app_type='IDE', novelty=1.0)
+        terminal = VLMJob(filepath='/b.png', captured_at=now, app_type='Terminal', novelty=1.0)
+        duplicate = VLMJob(filepath='/c.png', captured_at=now, app_type='IDE', novelty=0.0)
+        sensitive = VLMJob(filepath='/d.png', captured_at=now, app_type='IDE', novelty=1.0, sensitivity=1.0)
+
+        assert queue.score_job(base, now) > queue.score_job(terminal, now)
+        assert queue.score_job(base, now) > queue.score_job(duplicate, now)
+        assert queue.score_job(base, now) > queue.score_job(sensitive, now)
+
+    def test_aging_lets_waiting_jobs_overtake(self):
+        queue = VLMWorkQueue(deadline_seconds=10000, aging_rate=1.0)
+        now = time.time()
+        queue.push(VLMJob(filepath='/waiting.png', captured_at=now,
+                          app_type='Terminal', enqueued_at=now - 100))
+        queue.push(VLMJob(filepath='/new.png', captured_at=now, app_type='IDE'))
+
+        jobs, _ = queue.pop_batch(1)
+
+        assert jobs[0].filepath == '/waiting.png'
+
+    def test_expired_jobs_are_shed(self, queue):
+        now = time.time()
+        queue.push(VLMJob(filepath='/expired.png', entity_id='1', deadline=now - 1))
+        queue.push(VLMJob(filepath='/ok.png', entity_id='2'))
+
+        jobs, shed = queue.pop_batch(5)
+
+        assert [j.filepath for j in jobs] == ['/ok.png']
+        assert [j.filepath for j in shed] == ['/expired.png']
+        stats = queue.get_stats()
+        assert stats['shed_deadline'] == 1
+        assert stats['depth'] == 0
+
+    def test_duplicates_are_ignored(self, queue):
+        assert queue.push(VLMJob(filepath='/a.png', entity_id='1'))
+        assert not queue.push(VLMJob(filepath='/a.png', entity_id='1'))
+        assert len(queue) == 1
+        assert queue.get_stats()['duplicates'] == 1
+
+    def test_overflow_evicts_lowest_priority(self):
+        queue = VLMWorkQueue(max_size=2)
+        now = time.time()
+        queue.push(VLMJob(filepath='/old.png', captured_at=now - 7200, app_type='Terminal'))
+        queue.push(VLMJob(filepath='/a.png', captured_at=now, app_type='IDE'))
+        queue.push(VLMJob(filepath='/b.png', captured_at=now, app_type='IDE'))
+
+        jobs, _ = queue.pop_batch(5)
+
+        assert '/old.png' not in [j.filepath for j in jobs]
+        assert queue.get_stats()['shed_overflow'] == 1
+
+    def test_queue_persists_across_instances(self, tmp_path):
+        path = tmp_path / 'vlm_queue.json'
+        queue = VLMWorkQueue(persist_path=str(path))
+        queue.push(VLMJob(filepath='/a.png', entity_id='1', app_type='IDE'))
+        queue.push(VLMJob(filepath='/b.png', entity_id='2'))
+        queue.pop_batch(1)
+
+        reloaded = VLMWorkQueue(persist_path=str(path))
+
+        assert len(reloaded) == 1
+        jobs, _ = reloaded.pop_batch(1)
+        assert jobs[0].entity_id in ('1', '2')
+
+    def test_persistence_appends_instead_of_rewriting(self, tmp_path):
+        path = tmp_path / 'vlm_queue.json'
+        queue = VLMWorkQueue(persist_path=str(path), compact_threshold=1000)
+        for i in range(50):
+            queue.push(VLMJob(filepath=f'/{i}.png', entity_id=str(i)))
+        queue.pop_batch(10)
+
+        # One line per push plus one for the popped batch
+        assert len(path.read_text().splitlines()) == 51
+
+        reloaded = VLMWorkQueue(persist_path=str(path))
+        assert len(reloaded) == 40
+        # Loading compacts the journal to the live jobs
+        assert len(path.read_text().splitlines()) == 40
+
+    def test_journal_compacts_when_it_grows(self, tmp_path):
+        path = tmp_path / 'vlm_queue.json'
+        queue = VLMWorkQueue(persist_path=str(path), compact_threshold=10)
+        for i in range(30):
+            queue.push(VLMJob(filepath=f'/{i}.png', entity_id=str(i)))
+            queue.pop_batch(1)
+
+        assert len(path.read_text().splitlines()) <= 10
+        assert len(VLMWorkQueue(persist_path=str(path))) == 0
+
+    def test_torn_journal_line_is_skipped(self, tmp_path):
+        path = tmp_path / 'vlm_queue.json'
+        queue = VLMWorkQueue(persist_path=str(path))
+        queue.push(VLMJob(filepath='/a.png', entity_id='1'))
+        with open(path, 'a') as f:
+            f.write('{"op": "push", "job": {"filepa')
+
+        assert len(VLMWorkQueue(persist_path=str(path))) == 1
+
+    def test_legacy_snapshot_is_loaded(self, tmp_path):
+        path = tmp_path / 'vlm_queue.json'
+        path.write_text('{"jobs": [{"filepath": "/a.png", "entity_id": "1"}]}')
+
+        assert len(VLMWorkQueue(persist_path=str(path))) == 1
+
+    def test_shed_jobs_are_not_queued_again(self, tmp_path):
+        path = tmp_path / 'vlm_queue.json'
+        queue = VLMWorkQueue(persist_path=str(path))
+        queue.push(VLMJob(filepath='/expired.png', entity_id='1', deadline=time.time() - 1))
+        _, shed = queue.pop_batch(1)
+        assert len(shed) == 1
+
+        assert not queue.push(VLMJob(filepath='/expired.png', entity_id='1'))
+        reloaded = VLMWorkQueue(persist_path=str(path))
+        assert not reloaded.push(VLMJob(filepath='/expired.png', entity_id='1'))
+        assert reloaded.get_stats()['already_shed'] == 1
+        assert len(reloaded) == 0
+
+    def test_processes_sharing_a_journal_see_each_others_jobs(self, tmp_path):
+        path = str(tmp_path / 'vlm_queue.json')
+        first, second = VLMWorkQueue(persist_path=path), VLMWorkQueue(persist_path=path)
+        first.push(VLMJob(filepath='/a.png', entity_id='1'))
+        second.push(VLMJob(filepath='/b.png', entity_id='2'))
+
+        assert not first.push(VLMJob(filepath='/b.png', entity_id='2'))
+        popped, _ = first.pop_batch(5)
+        assert sorted(job.entity_id for job in popped) == ['1', '2']
+        assert second.pop_batch(5) == ([], [])
+
+    def test_compaction_keeps_other_processes_jobs(self, tmp_path):
+        path = str(tmp_path / 'vlm_queue.json')
+        first = VLMWorkQueue(persist_path=path, compact_threshold=2)
+        second = VLMWorkQueue(persist_path=path, compact_threshold=2)
+        for i in range(5):
+            second.push(VLMJob(filepath=f'/{i}.png', entity_id=f'b{i}'))
+            first.push(VLMJob(filepath=f'/{i}.png', entity_id=f'a{i}'))
+
+        assert len(VLMWorkQueue(persist_path=path)) == 10
+        assert len(first) == len(second) == 10
+
+    def test_wait_time_stats(self, queue):
+        queue.push(VLMJob(filepath='/a.png', enqueued_at=time.time() - 5))
+        queue.pop_batch(1)
+
+        stats = queue.get_stats()
+
+        assert stats['avg_wait_seconds'] >= 5
+        assert stats['p95_wait_seconds'] >= 5
+        assert stats['dequeued'] == 1
+
+
+class TestAdaptiveConcurrencyController:
+    """Test the AIMD concurrency controller."""
+
+    def test_fast_responses_increase_limit(self):
+        controller = AdaptiveConcurrencyController(initial_limit=1, max_limit=4, target_latency=10)
+
+        for _ in range(10):
+            assert controller.acquire(timeout=1)
+            controller.release(latency=1.0, success=True)
+
+        assert controller.limit > 1
+        assert controller.limit <= 4
+
+    def test_slow_or_failed_responses_halve_limit(self):
+        controller = AdaptiveConcurrencyController(initial_limit=4, max_limit=4, target_latency=10)
+
+        controller.acquire()
+        controller.release(latency=30.0, success=True)
+        assert controller.limit == 2
+
+        controller.acquire()
+        controller.release(latency=1.0, success=False)
+        assert controller.limit == 1
+        assert controller.get_stats()['decreases'] == 2
+
+    def test_acquire_blocks_at_limit(self):
+        controller = AdaptiveConcurrencyController(initial_limit=1, max_limit=1)
+        assert controller.acquire(timeout=1)
+
+        assert not controller.acquire(timeout=0.05)
+
+        threading.Timer(0.05, controller.cancel).start()
+        assert controller.acquire(timeout=2)
+        assert controller.in_flight == 1
@@ -0,0 +1,221 @@
+"""
+Tests for multi-worker coordination.
+
+Runs workers against the SQLite stand-in from the ledger tests to cover:
+- Lease registration, heartbeat and graceful deregistration
+- Reaping dead workers and handing their claims to live ones
+- Draining several stages with the bounded worker pool
+- Several local processes sharing one database without double processing
+"""
+import multiprocessing
+import os
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from autotasktracker.core.processing_ledger import ProcessingLedger
+from autotasktracker.core.worker_coordination import WorkerCoordinator, ProcessingWorker
+from tests.unit.test_processing_ledger import SQLiteTestDatabase
+
+# Fresh interpreters, like separate worker machines
+SPAWN = multiprocessing.get_context('spawn')
+
+
+def _record(db, stage):
+    def handler(item):
+        db.add_metadata(item['id'], f'{stage}_done', str(os.getpid()))
+    return handler
+
+
+def _run_worker_process(path, worker_id):
+    db = SQLiteTestDatabase.__new__(SQLiteTestDatabase)
+    db.path = path
+    coordinator = WorkerCoordinator(['tasks'], ledger=ProcessingLedger(db), worker_id=worker_id,
+                                    lease_ttl=30, heartbeat_interval=1)
+    ProcessingWorker(coordinator, {'tasks': _record(db, 'tasks')}, concurrency=3,
+                     poll_interval=0.1).run(drain=True)
+
+
+def _claim_and_die(path, worker_id):
+    db = SQLiteTestDatabase.__new__(SQLiteTestDatabase)
+    db.path = path
+    coordinator = WorkerCoordinator(['tasks'], ledger=ProcessingLedger(db), worker_id=worker_id,
+                                    lease_ttl=0.5)
+    coordinator.register()
+    coordinator.claim('tasks', 5)
+    os._exit(0)  # no deregistration, like a crash
+
+
+@pytest.fixture
+def db(tmp_path):
+    return SQLiteTestDatabase(tmp_path / 'workers.db')
+
+
+@pytest.fixture
+def ledger(db):
+    return ProcessingLedger(db)
+
+
+def _count_done(db, key):
+    with db.get_connection() as conn:
+        return dict(conn.execute(
+            "SELECT entity_id, COUNT(*) FROM metadata_entries WHERE key = ? GROUP BY entity_id",
+            (key,)
+        ).fetchall())
+
+
+class TestWorkerCoordinator:
+    """Test lease handling in WorkerCoordinator."""
+
+    def test_register_and_heartbeat(self, ledger):
+        coordinator = WorkerCoordinator(['vlm', 'ocr'], ledger=ledger, worker_id='w1', concurrency=4)
+        coordinator.register()
+
+        assert coordinator.heartbeat()
+        workers = coordinator.active_workers()
+        assert [w['worker_id'] for w in workers] == ['w1']
+        assert workers[0]['stages'] == ['vlm', 'ocr']
+        assert workers[0]['concurrency'] == 4
+
+    def test_dead_worker_claims_are_rebalanced(self, db, ledger):
+        db.add_entities(6)
+        dead = WorkerCoordinator(['tasks'], ledger=ledger, worker_id='dead', lease_ttl=0)
+        live = WorkerCoordinator(['tasks'], ledger=ledger, worker_id='live')
+        dead.register()
+        live.register()
+        assert dead.claim('tasks', 4) == [1, 2, 3, 4]
+        time.sleep(0.01)
+
+        assert live.reap_expired() == 4
+
+        assert live.claim('tasks', 10) == [1, 2, 3, 4, 5, 6]
+        assert [w['worker_id'] for w in live.active_workers()] == ['live']
+        assert live.stats['workers_reaped'] == 1
+
+    def test_reaped_claims_survive_the_watermark(self, db, ledger):
+        db.add_entities(4)
+        dead = WorkerCoordinator(['tasks'], ledger=ledger, worker_id='a', lease_ttl=0)
+        live = WorkerCoordinator(['tasks'], ledger=ledger, worker_id='b')
+        dead.register()
+        live.register()
+        assert dead.claim('tasks', 2) == [1, 2]
+        assert live.claim('tasks', 2) == [3, 4]
+        time.sleep(0.01)
+
+        live.reap_expired()
+        ledger.complete('tasks', [3, 4])
+
+        assert ledger.get_watermark('tasks') == 4
+        assert live.claim('tasks', 10) == [1, 2]
+
+    def test_reaped_worker_rejoins_on_heartbeat(self, ledger):
+        coordinator = WorkerCoordinator(['tasks'], ledger=ledger, worker_id='slow', lease_ttl=0)
+        coordinator.register()
+        time.sleep(0.01)
+        WorkerCoordinator(['tasks'], ledger=ledger, worker_id='other').reap_expired()
+
+        assert not coordinator.heartbeat()
+        assert coordinator.stats['lease_losses'] == 1
+        assert coordinator.heartbeat()
+
+    def test_deregister_releases_unfinished_claims(self, db, ledger):
+        db.add_entities(3)
+        coordinator = WorkerCoordinator(['tasks'], ledger=ledger, worker_id='w1')
+        coordinator.register()
+        coordinator.claim('tasks', 3)
+
+        coordinator.deregister()
+
+        assert ledger.get_stats('tasks')['in_flight'] == 0
+        assert coordinator.active_workers() == []
+        assert ledger.claim_batch('tasks', 5) == [1, 2, 3]
+
+
+class TestProcessingWorker:
+    """Test the ProcessingWorker run loop."""
+
+    def test_drains_all_stages(self, db, ledger):
+        db.add_entities(10)
+        coordinator = WorkerCoordinator(['vlm', 'ocr'], ledger=ledger, worker_id='w1')
+        worker = ProcessingWorker(coordinator, {'vlm': _record(db, 'vlm'), 'ocr': _record(db, 'ocr')},
+                                  concurrency=3, poll_interval=0.1)
+
+        worker.run(drain=True)
+
+        assert sorted(_count_done(db, 'vlm_done')) == list(range(1, 11))
+        assert sorted(_count_done(db, 'ocr_done')) == list(range(1, 11))
+        assert ledger.get_watermark('vlm') == 10
+        assert ledger.get_watermark('ocr') == 10
+        assert worker.get_stats()['stages']['vlm']['processed'] == 10
+        assert coordinator.active_workers() == []
+
+    def test_handler_errors_are_recorded_as_failures(self, db, ledger):
+        db.add_entities(3)
+        coordinator = WorkerCoordinator(['tasks'], ledger=ledger, worker_id='w1')
+
+        def handler(item):
+            if item['id'] == 2:
+                raise RuntimeError('bad screenshot')
+
+        worker = ProcessingWorker(coordinator, {'tasks': handler}, concurrency=2, poll_interval=0.1)
+        worker.run(drain=True)
+
+        assert worker.get_stats()['stages']['tasks'] == {'processed': 2, 'failed': 1}
+        assert ledger.get_stats('tasks')['pending_retries'] == 1
+        assert ledger.get_watermark('tasks') == 3
+
+    def test_empty_vlm_result_is_recorded_as_failure(self, db, ledger):
+        from autotasktracker.cli.commands.process import _build_stage_handlers
+        db.add_entities(2)
+        vlm = Mock(process_image=Mock(side_effect=[{'tasks': 'Coding'}, None]))
+        with patch('autotasktracker.ai.vlm_processor.SmartVLMProcessor', return_value=vlm), \
+                patch('autotasktracker.core.derived_versions.get_derived_versions'):
+            handlers = _build_stage_handlers(['vlm'])
+        coordinator = WorkerCoordinator(['vlm'], ledger=ledger, worker_id='w1')
+
+        ProcessingWorker(coordinator, handlers, concurrency=1, poll_interval=0.1).run(drain=True)
+
+        assert ledger.get_stats('vlm')['pending_retries'] == 1
+
+    def test_missing_handler_is_rejected(self, ledger):
+        coordinator = WorkerCoordinator(['vlm', 'ocr'], ledger=ledger)
+
+        with pytest.raises(ValueError):
+            ProcessingWorker(coordinator, {'vlm': lambda item: None})
+
+
+class TestMultiProcessWorkers:
+    """Run real worker processes against one SQLite database."""
+
+    def test_processes_share_work_without_duplicates(self, db, ledger):
+        db.add_entities(60)
+        processes = [
+            SPAWN.Process(target=_run_worker_process, args=(db.path, f'proc{i}'))
+            for i in range(3)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=60)
+            assert process.exitcode == 0
+
+        done = _count_done(db, 'tasks_done')
+        assert sorted(done) == list(range(1, 61))
+        assert set(done.values()) == {1}
+        assert ledger.get_watermark('tasks') == 60
+
+    def test_crashed_process_work_is_recovered(self, db, ledger):
+        db.add_entities(8)
+        crashed = SPAWN.Process(target=_claim_and_die, args=(db.path, 'crashed'))
+        crashed.start()
+        crashed.join(timeout=30)
+        assert ledger.get_stats('tasks')['in_flight'] == 5
+
+        time.sleep(0.6)
+        coordinator = WorkerCoordinator(['tasks'], ledger=ledger, worker_id='survivor')
+        ProcessingWorker(coordinator, {'tasks': _record(db, 'tasks')}, concurrency=2,
+                         poll_interval=0.1).run(drain=True)
+
+        assert sorted(_count_done(db, 'tasks_done')) == list(range(1, 9))
+        assert coordinator.stats['claims_released'] == 5